@@ -11,7 +11,6 @@ Punto de entrada limpio. Toda la lógica de negocio vive en:
 """
 from __future__ import annotations
 
-import asyncio
 import logging
 import os
 
@@ -73,12 +72,12 @@ app.include_router(app_settings.router)
 @app.get("/health")
 async def health_check():
     from core.config import WEBHOOK_URL
-    from core.bot_registry import fetch_active_distribuidores, is_transient_supabase_error
+    from core.bot_registry import afetch_active_distribuidores, is_transient_supabase_error
 
     bots_expected: int | None = None
     supabase_ok = True
     try:
-        rows = await asyncio.to_thread(fetch_active_distribuidores, max_retries=2)
+        rows = await afetch_active_distribuidores(max_retries=2)
         bots_expected = len(rows)
     except Exception as e:
         supabase_ok = not is_transient_supabase_error(e)
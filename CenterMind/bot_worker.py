@@ -18,7 +18,7 @@ import sqlite3
 import uuid
 import atexit
 import errno
-from datetime import datetime, timedelta, time as dt_time
+from datetime import datetime, timedelta, time as dt_time, timezone
 from zoneinfo import ZoneInfo
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, DefaultDict
@@ -33,7 +33,7 @@ from telegram import (
     Update,
 )
 from telegram.constants import ParseMode
-from telegram.error import BadRequest
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import (
     Application,
     ApplicationBuilder,
@@ -152,6 +152,7 @@ from core.exhibicion_aggregate import (
     aggregate_ranking_by_vendor,
     integrante_ids_for_erp_vendors,
 )
+from core.exhibicion_rollup import logical_rows_periodo
 from core.tenant_tables import tenant_table_name
 from core.bot_dynamic_messages import (
     build_objetivos_item_line,
@@ -260,6 +261,25 @@ def parse_type_callback(data: str) -> tuple[str, int] | None:
 
 # ============================================================
 
+# ─────────────────────────────────────────────
+# SYNC DE EVALUACIONES (portal → mensaje del grupo)
+# ─────────────────────────────────────────────
+EVAL_ESTADOS_SYNC = ("Aprobado", "Destacado", "Rechazado")
+# Eventos del portal (core/bot_eval_events) editan al instante; el polling RPC queda de respaldo.
+BOT_EVAL_SYNC_POLL_SEC = int(os.getenv("BOT_EVAL_SYNC_POLL_SEC", "1800"))
+# Drain de bot_eval_events: arranca en DRAIN_SEC y duplica la espera mientras no haya eventos.
+BOT_EVAL_EVENTS_DRAIN_SEC = int(os.getenv("BOT_EVAL_EVENTS_DRAIN_SEC", "20"))
+BOT_EVAL_EVENTS_DRAIN_MAX_SEC = int(os.getenv("BOT_EVAL_EVENTS_DRAIN_MAX_SEC", "600"))
+# Evento cuya edición sigue fallando pasado el TTL: se cierra y lo cubre el polling de respaldo.
+BOT_EVAL_EVENTS_TTL_SEC = int(os.getenv("BOT_EVAL_EVENTS_TTL_SEC", "3600"))
+BOT_EVAL_BATCH_MAX = int(os.getenv("BOT_EVAL_BATCH_MAX", "50"))
+BOT_EVAL_BATCH_WINDOW_SEC = float(os.getenv("BOT_EVAL_BATCH_WINDOW_SEC", "0.5"))
+# Telegram: ~30 msg/s por bot y ~20/min por grupo → espaciado global y por chat.
+BOT_EVAL_EDIT_INTERVAL_SEC = float(os.getenv("BOT_EVAL_EDIT_INTERVAL_SEC", "0.05"))
+BOT_EVAL_CHAT_INTERVAL_SEC = float(os.getenv("BOT_EVAL_CHAT_INTERVAL_SEC", "1.0"))
+BOT_HEARTBEAT_SEC = 30
+
+
 # ─────────────────────────────────────────────
 # RUTAS BASE
 # ─────────────────────────────────────────────
@@ -336,11 +356,14 @@ class Database:
     def __init__(self, db_path: Path = DB_PATH):
         self.logger = get_logger("Database")
         try:
-            from db import sb
+            from db import asb, sb
             self.sb = sb
+            # Cliente async (httpx.AsyncClient): lo usan los jobs que corren en el loop del bot.
+            self.asb = asb
         except ImportError as e:
             self.logger.error(f"Error importing Supabase client: {e}")
             self.sb = None
+            self.asb = None
 
     # ── Distribuidores ──────────────────────────────────────────────
     @retry_supabase()
@@ -420,6 +443,9 @@ class Database:
             self.sb.table("integrantes_grupo").update(data).eq("id_integrante", res.data[0]["id_integrante"]).execute()
         else:
             self.sb.table("integrantes_grupo").insert(data).execute()
+            # Integrante nuevo: los mapas integrante → ERP del tenant quedan incompletos
+            from core.identity_cache import invalidate_identity
+            invalidate_identity(distribuidor_id, "nuevo_integrante")
 
     def set_rol(self, distribuidor_id: int, chat_id: int, user_id: int, rol: str) -> None:
         self.sb.table("integrantes_grupo").update({"rol_telegram": rol}).eq("id_distribuidor", distribuidor_id).eq("telegram_group_id", chat_id).eq("telegram_user_id", user_id).execute()
@@ -431,6 +457,16 @@ class Database:
             "id_cliente_pdv" in txt and "violates foreign key constraint" in txt
         )
 
+    def _encolar_renditions(self, distribuidor_id: int, id_exhibicion: Optional[int], drive_link: str) -> None:
+        """Thumb / med WebP de la foto, fuera del handler (core/foto_renditions)."""
+        if not id_exhibicion or not drive_link:
+            return
+        try:
+            from core.foto_renditions import encolar
+            encolar(distribuidor_id, [(id_exhibicion, drive_link)])
+        except Exception as e:
+            self.logger.warning(f"No se pudieron encolar renditions ex={id_exhibicion}: {e}")
+
     def _insert_exhibicion_limbo(
         self,
         distribuidor_id: int,
@@ -493,6 +529,7 @@ class Database:
                 if latest.data:
                     ex_id = latest.data[0].get("id_exhibicion")
 
+            self._encolar_renditions(distribuidor_id, ex_id, drive_link)
             return {
                 "id_exhibicion": ex_id,
                 "estado_final": "PENDIENTE",
@@ -538,6 +575,7 @@ class Database:
                     data = data[0]
 
                 if isinstance(data, dict):
+                    self._encolar_renditions(distribuidor_id, data.get("id_exhibicion"), drive_link)
                     return {**data, "error": None}
 
                 return {"id_exhibicion": None, "estado_final": None, "error": "Formato de respuesta inválido"}
@@ -709,98 +747,235 @@ class Database:
         try:
             ex_ids = [d["id"] for d in data]
             ex_res = self.sb.table("exhibiciones").select("id_exhibicion, cliente_sombra_codigo, id_cliente_pdv, id_integrante, comentario_evaluacion").in_("id_exhibicion", ex_ids).execute()
-            ex_map = {r["id_exhibicion"]: r for r in ex_res.data}
+            self._enrich_pendientes_sync(distribuidor_id, data, ex_res.data or [])
+        except Exception as e:
+            # Si falla el enriquecimiento, devolvemos la data original para no romper el flujo
+            pass
             
-            # Fetch ERP names from integrantes_grupo
-            ig_ids = list(set(r["id_integrante"] for r in ex_res.data if r.get("id_integrante")))
-            ig_map = {}
-            if ig_ids:
-                ig_res = self.sb.table("integrantes_grupo").select("id_integrante, id_vendedor_v2").in_("id_integrante", ig_ids).execute()
-                ig_map = {r["id_integrante"]: r.get("id_vendedor_v2") for r in ig_res.data}
+        return data
+
+    async def aget_pendientes_sync(self, distribuidor_id: int) -> List[Dict]:
+        """get_pendientes_sync sobre el cliente async (polling de respaldo del bot)."""
+        from db import aexecute
+
+        res = await aexecute(self.asb.rpc("fn_bot_pendientes_sync", {"p_distribuidor_id": distribuidor_id}))
+        data = res.data or []
+        if not data:
+            return []
+        try:
+            ex_res = await aexecute(
+                self.asb.table("exhibiciones")
+                .select("id_exhibicion, cliente_sombra_codigo, id_cliente_pdv, id_integrante, comentario_evaluacion")
+                .in_("id_exhibicion", [d["id"] for d in data])
+            )
+            await self._aenrich_pendientes_sync(distribuidor_id, data, ex_res.data or [])
+        except Exception:
+            pass
+        return data
+
+    def _pendientes_sync_ids_query(self, client: Any, distribuidor_id: int, ex_ids: List[str]):
+        return (
+            client.table("exhibiciones")
+            .select(
+                "id_exhibicion, estado, supervisor_nombre, telegram_chat_id, telegram_msg_id, tipo_pdv, "
+                "cliente_sombra_codigo, id_cliente_pdv, id_integrante, comentario_evaluacion"
+            )
+            .eq("id_distribuidor", distribuidor_id)
+            .in_("id_exhibicion", list(ex_ids))
+            .in_("estado", list(EVAL_ESTADOS_SYNC))
+            .eq("synced_telegram", 0)
+            .not_.is_("telegram_msg_id", "null")
+        )
+
+    @staticmethod
+    def _pendientes_from_rows(ex_rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        rows = [r for r in ex_rows if r.get("telegram_chat_id")]
+        data = [
+            {
+                "id": r["id_exhibicion"],
+                "telegram_chat_id": r["telegram_chat_id"],
+                "telegram_msg_id": r["telegram_msg_id"],
+                "estado": r.get("estado"),
+                "supervisor_nombre": r.get("supervisor_nombre"),
+                "tipo_pdv": r.get("tipo_pdv"),
+                "comentarios": r.get("comentario_evaluacion"),
+            }
+            for r in rows
+        ]
+        return data, rows
+
+    def get_pendientes_sync_ids(self, distribuidor_id: int, ex_ids: List[str]) -> List[Dict]:
+        """
+        Igual que get_pendientes_sync pero acotado a exhibiciones concretas (eventos del portal):
+        sin RPC y con una sola lectura de exhibiciones que ya trae lo necesario para enriquecer.
+        """
+        if not ex_ids:
+            return []
+        res = self._pendientes_sync_ids_query(self.sb, distribuidor_id, ex_ids).execute()
+        data, rows = self._pendientes_from_rows(res.data or [])
+        try:
+            self._enrich_pendientes_sync(distribuidor_id, data, rows)
+        except Exception:
+            pass
+        return data
+
+    async def aget_pendientes_sync_ids(self, distribuidor_id: int, ex_ids: List[str]) -> List[Dict]:
+        """get_pendientes_sync_ids sobre el cliente async (consumidor de eventos del bot)."""
+        from db import aexecute
+
+        if not ex_ids:
+            return []
+        res = await aexecute(self._pendientes_sync_ids_query(self.asb, distribuidor_id, ex_ids))
+        data, rows = self._pendientes_from_rows(res.data or [])
+        try:
+            await self._aenrich_pendientes_sync(distribuidor_id, data, rows)
+        except Exception:
+            pass
+        return data
+
+    @staticmethod
+    def _pendientes_ig_query(client: Any, ex_rows: List[Dict]):
+        ig_ids = list(set(r["id_integrante"] for r in ex_rows if r.get("id_integrante")))
+        if not ig_ids:
+            return None
+        return client.table("integrantes_grupo").select("id_integrante, id_vendedor_v2").in_("id_integrante", ig_ids)
+
+    @staticmethod
+    def _pendientes_vendedores_query(client: Any, distribuidor_id: int, ig_map: Dict):
+        v_ids = list(set(v for v in ig_map.values() if v))
+        if not v_ids:
+            return None
+        return client.table(f"vendedores_v2_d{distribuidor_id}").select("id_vendedor, nombre_erp").in_("id_vendedor", v_ids)
+
+    @staticmethod
+    def _pendientes_clientes_queries(client: Any, distribuidor_id: int, ex_rows: List[Dict]) -> List[Any]:
+        client_erp_ids = list(set(r["cliente_sombra_codigo"] for r in ex_rows if r.get("cliente_sombra_codigo")))
+        client_pdv_ids = list(set(r["id_cliente_pdv"] for r in ex_rows if r.get("id_cliente_pdv")))
+        cols = "id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia"
+        t_clientes = f"clientes_pdv_v2_d{distribuidor_id}"
+        # PostgREST no combina OR con IN fácilmente: una consulta por clave.
+        queries = []
+        if client_erp_ids:
+            queries.append(client.table(t_clientes).select(cols).in_("id_cliente_erp", client_erp_ids))
+        if client_pdv_ids:
+            queries.append(client.table(t_clientes).select(cols).in_("id_cliente", client_pdv_ids))
+        return queries
+
+    def _enrich_pendientes_sync(self, distribuidor_id: int, data: List[Dict], ex_rows: List[Dict]) -> None:
+        """Completa vendedor (nombre ERP), cliente y comentario de cada pendiente in-place."""
+        ig_map = {}
+        q = self._pendientes_ig_query(self.sb, ex_rows)
+        if q is not None:
+            ig_map = {r["id_integrante"]: r.get("id_vendedor_v2") for r in q.execute().data}
+
+        v_map = {}
+        q = self._pendientes_vendedores_query(self.sb, distribuidor_id, ig_map)
+        if q is not None:
+            v_map = {r["id_vendedor"]: r.get("nombre_erp") for r in q.execute().data}
+
+        all_clients: List[Dict] = []
+        for q in self._pendientes_clientes_queries(self.sb, distribuidor_id, ex_rows):
+            all_clients.extend(q.execute().data or [])
+
+        self._apply_pendientes_enrichment(data, ex_rows, ig_map, v_map, all_clients)
+
+    async def _aenrich_pendientes_sync(self, distribuidor_id: int, data: List[Dict], ex_rows: List[Dict]) -> None:
+        """_enrich_pendientes_sync async: clientes en paralelo con la cadena integrante → vendedor."""
+        from db import aexecute
+
+        async def _vendedores() -> Tuple[Dict, Dict]:
+            ig_map: Dict = {}
+            q = self._pendientes_ig_query(self.asb, ex_rows)
+            if q is not None:
+                ig_map = {r["id_integrante"]: r.get("id_vendedor_v2") for r in (await aexecute(q)).data}
+            v_map: Dict = {}
+            q = self._pendientes_vendedores_query(self.asb, distribuidor_id, ig_map)
+            if q is not None:
+                v_map = {r["id_vendedor"]: r.get("nombre_erp") for r in (await aexecute(q)).data}
+            return ig_map, v_map
+
+        (ig_map, v_map), *client_res = await asyncio.gather(
+            _vendedores(),
+            *(aexecute(q) for q in self._pendientes_clientes_queries(self.asb, distribuidor_id, ex_rows)),
+        )
+        all_clients = [r for res in client_res for r in (res.data or [])]
+        self._apply_pendientes_enrichment(data, ex_rows, ig_map, v_map, all_clients)
+
+    @staticmethod
+    def _apply_pendientes_enrichment(
+        data: List[Dict],
+        ex_rows: List[Dict],
+        ig_map: Dict,
+        v_map: Dict,
+        all_clients: List[Dict],
+    ) -> None:
+        ex_map = {r["id_exhibicion"]: r for r in ex_rows}
+        c_map_erp = {}
+        c_map_pdv = {}
+        for r in all_clients:
+            if r.get("id_cliente_erp"):
+                c_map_erp[str(r["id_cliente_erp"])] = r
+            if r.get("id_cliente"):
+                c_map_pdv[r["id_cliente"]] = r
+
+        for d in data:
+            ex_data = ex_map.get(d["id"], {})
             
-            # Fetch seller names from vendedores_v2
-            v_ids = list(set(v for v in ig_map.values() if v))
-            v_map = {}
-            if v_ids:
-                v_res = self.sb.table(f"vendedores_v2_d{distribuidor_id}").select("id_vendedor, nombre_erp").in_("id_vendedor", v_ids).execute()
-                v_map = {r["id_vendedor"]: r.get("nombre_erp") for r in v_res.data}
+            # Enrich vendedor
+            id_int = ex_data.get("id_integrante")
+            id_vend = ig_map.get(id_int)
+            nombre_erp = v_map.get(id_vend)
+            if nombre_erp:
+                d["vendedor_nombre"] = nombre_erp
                 
-            # Fetch client names
-            client_erp_ids = list(set(r["cliente_sombra_codigo"] for r in ex_res.data if r.get("cliente_sombra_codigo")))
-            client_pdv_ids = list(set(r["id_cliente_pdv"] for r in ex_res.data if r.get("id_cliente_pdv")))
-            
-            c_map_erp = {}
-            c_map_pdv = {}
+            # Enrich cliente
+            sombra = ex_data.get("cliente_sombra_codigo")
+            id_pdv = ex_data.get("id_cliente_pdv")
             
-            if client_erp_ids or client_pdv_ids:
-                # We can query by both if needed, but it's easier to just query all matching either
-                query = self.sb.table(f"clientes_pdv_v2_d{distribuidor_id}").select("id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia")
-                if client_erp_ids and client_pdv_ids:
-                    # PostgREST doesn't support OR easily with IN, so we do two queries
-                    c_res_erp = self.sb.table(f"clientes_pdv_v2_d{distribuidor_id}").select("id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia").in_("id_cliente_erp", client_erp_ids).execute()
-                    c_res_pdv = self.sb.table(f"clientes_pdv_v2_d{distribuidor_id}").select("id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia").in_("id_cliente", client_pdv_ids).execute()
-                    all_clients = (c_res_erp.data or []) + (c_res_pdv.data or [])
-                elif client_erp_ids:
-                    c_res = self.sb.table(f"clientes_pdv_v2_d{distribuidor_id}").select("id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia").in_("id_cliente_erp", client_erp_ids).execute()
-                    all_clients = c_res.data or []
-                else:
-                    c_res = self.sb.table(f"clientes_pdv_v2_d{distribuidor_id}").select("id_cliente, id_cliente_erp, nombre_razon_social, nombre_fantasia").in_("id_cliente", client_pdv_ids).execute()
-                    all_clients = c_res.data or []
-                    
-                for r in all_clients:
-                    if r.get("id_cliente_erp"):
-                        c_map_erp[str(r["id_cliente_erp"])] = r
-                    if r.get("id_cliente"):
-                        c_map_pdv[r["id_cliente"]] = r
-                
-            for d in data:
-                ex_data = ex_map.get(d["id"], {})
+            c_info = None
+            if sombra and str(sombra) in c_map_erp:
+                c_info = c_map_erp[str(sombra)]
+            elif id_pdv and id_pdv in c_map_pdv:
+                c_info = c_map_pdv[id_pdv]
                 
-                # Enrich vendedor
-                id_int = ex_data.get("id_integrante")
-                id_vend = ig_map.get(id_int)
-                nombre_erp = v_map.get(id_vend)
-                if nombre_erp:
-                    d["vendedor_nombre"] = nombre_erp
-                    
-                # Enrich cliente
-                sombra = ex_data.get("cliente_sombra_codigo")
-                id_pdv = ex_data.get("id_cliente_pdv")
-                
-                c_info = None
-                if sombra and str(sombra) in c_map_erp:
-                    c_info = c_map_erp[str(sombra)]
-                elif id_pdv and id_pdv in c_map_pdv:
-                    c_info = c_map_pdv[id_pdv]
-                    
-                if c_info:
-                    rs = c_info.get("nombre_razon_social") or ""
-                    nf = c_info.get("nombre_fantasia") or ""
-                    erp_code = c_info.get("id_cliente_erp") or sombra or id_pdv
-                    if rs and nf and rs != nf:
-                        d["cliente"] = f"{erp_code} - {rs} ({nf})"
-                    elif rs or nf:
-                        d["cliente"] = f"{erp_code} - {rs or nf}"
-                    else:
-                        d["cliente"] = str(erp_code)
-                elif sombra:
-                    d["cliente"] = str(sombra)
-                elif id_pdv:
-                    d["cliente"] = str(id_pdv)
-                
-                # Enrich comentarios if missing
-                if not d.get("comentarios"):
-                    d["comentarios"] = ex_data.get("comentario_evaluacion")
-                    
-        except Exception as e:
-            # Si falla el enriquecimiento, devolvemos la data original para no romper el flujo
-            pass
+            if c_info:
+                rs = c_info.get("nombre_razon_social") or ""
+                nf = c_info.get("nombre_fantasia") or ""
+                erp_code = c_info.get("id_cliente_erp") or sombra or id_pdv
+                if rs and nf and rs != nf:
+                    d["cliente"] = f"{erp_code} - {rs} ({nf})"
+                elif rs or nf:
+                    d["cliente"] = f"{erp_code} - {rs or nf}"
+                else:
+                    d["cliente"] = str(erp_code)
+            elif sombra:
+                d["cliente"] = str(sombra)
+            elif id_pdv:
+                d["cliente"] = str(id_pdv)
             
-        return data
+            # Enrich comentarios if missing
+            if not d.get("comentarios"):
+                d["comentarios"] = ex_data.get("comentario_evaluacion")
 
     def marcar_synced(self, exhibicion_id: str) -> None:
         self.sb.table("exhibiciones").update({"synced_telegram": 1}).eq("id_exhibicion", exhibicion_id).execute()
 
+    def marcar_synced_many(self, exhibicion_ids: List[str]) -> None:
+        for i in range(0, len(exhibicion_ids), 200):
+            self.sb.table("exhibiciones").update({"synced_telegram": 1}).in_(
+                "id_exhibicion", exhibicion_ids[i : i + 200]
+            ).execute()
+
+    async def amarcar_synced_many(self, exhibicion_ids: List[str]) -> None:
+        from db import aexecute
+
+        for i in range(0, len(exhibicion_ids), 200):
+            await aexecute(
+                self.asb.table("exhibiciones").update({"synced_telegram": 1}).in_(
+                    "id_exhibicion", exhibicion_ids[i : i + 200]
+                )
+            )
+
     def _fetch_exhibiciones(
         self,
         distribuidor_id: int,
@@ -809,27 +984,25 @@ class Database:
         end_iso: str | None = None,
         integrante_ids: list[int] | None = None,
     ) -> list[dict]:
-        rows: list[dict] = []
-        offset = 0
-        while True:
+        from db import PAGE_WORKERS, fetch_all
+
+        def _q():
             q = (
                 self.sb.table("exhibiciones")
                 .select(EXHIBICION_ROW_COLS)
                 .eq("id_distribuidor", distribuidor_id)
                 .gte("timestamp_subida", since_iso)
                 .order("timestamp_subida")
-                .range(offset, offset + 999)
+                .order("id_exhibicion")
             )
             if end_iso:
                 q = q.lt("timestamp_subida", end_iso)
             if integrante_ids:
                 q = q.in_("id_integrante", integrante_ids)
-            batch = q.execute().data or []
-            rows.extend(batch)
-            if len(batch) < 1000:
-                break
-            offset += 1000
-        return rows
+            return q
+
+        # Mes actual + anterior: varias páginas en tenants grandes → en paralelo.
+        return fetch_all(_q, workers=PAGE_WORKERS)
 
     @staticmethod
     def _parse_exhibicion_ts(ts: str) -> datetime:
@@ -896,11 +1069,18 @@ class Database:
                 return None
             integrante_ids = integrante_ids_for_erp_vendors(seed_iids, iid_to_erp)
 
-        all_ex = self._fetch_exhibiciones(
+        all_ex = logical_rows_periodo(
             distribuidor_id,
             start_mes_prev.isoformat(),
             integrante_ids=integrante_ids,
+            sb=self.sb,
         )
+        if all_ex is None:
+            all_ex = self._fetch_exhibiciones(
+                distribuidor_id,
+                start_mes_prev.isoformat(),
+                integrante_ids=integrante_ids,
+            )
 
         if vendor_erp_norm:
             vendor_rows = filter_exhibiciones_for_vendor_erp(
@@ -991,9 +1171,14 @@ class Database:
 
             qa_ids = build_qa_exhibicion_integrante_ids(distribuidor_id)
 
-            exhibiciones = self._fetch_exhibiciones(
-                distribuidor_id, start_date, end_iso=end_date
+            # Rollup diario: un mes pasado es una lectura chica; si no aplica, filas crudas.
+            exhibiciones = logical_rows_periodo(
+                distribuidor_id, start_date, end_date, sb=self.sb
             )
+            if exhibiciones is None:
+                exhibiciones = self._fetch_exhibiciones(
+                    distribuidor_id, start_date, end_iso=end_date
+                )
 
             # 3. Fetch Integrantes y Sucursales para nombres y unificación
             try:
@@ -1167,6 +1352,28 @@ class SupabaseUploader:
         self.logger.error(f"❌ Falló definitivamente la subida: {filename}")
         return ""
 
+    async def aupload(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        distribuidor_nombre: str,
+    ) -> str:
+        """Como upload() pero con el cliente Storage async del loop (sin bloquear hilos)."""
+        if not self._sb:
+            return ""
+        from core.storage_upload import aupload
+
+        date_folder = datetime.now(AR_TZ).strftime("%Y-%m-%d")
+        safe_dist = "".join(c if c.isalnum() or c in "-_ " else "" for c in distribuidor_nombre).strip().replace(" ", "_")
+        storage_path = f"{safe_dist}/{date_folder}/{filename}"
+        try:
+            url = await aupload(self.BUCKET, storage_path, file_bytes, intentos=4)
+        except Exception as e:
+            self.logger.error(f"❌ Falló definitivamente la subida: {filename} ({e})")
+            return ""
+        self.logger.info(f"✅ Foto subida a Supabase: {filename}")
+        return url
+
 
 # ═══════════════════════════════════════════════════════════════════
 # BOT WORKER
@@ -1214,6 +1421,8 @@ class BotWorker:
         self.start_time         = time.time()
         self.monitor            = monitor   # BotMonitor (puede ser None si corre standalone)
         self.application:       Application | None = None  # se inicializa en post_init
+        self._eval_queue:       asyncio.Queue | None = None  # eventos de evaluación del portal
+        self._eval_drain_wait:  float = BOT_EVAL_EVENTS_DRAIN_SEC
 
         self.logger.info(f"✅ BotWorker listo para: {self.nombre_dist}")
 
@@ -1343,6 +1552,31 @@ class BotWorker:
         except Exception as e_pend:
             self.logger.warning(f"[PDVNuevo] No se pudo insertar pendiente aviso: {e_pend}")
 
+    async def _subir_fotos_lote(self, bot, photos: List[Dict], base_name: str) -> List[Any]:
+        """
+        Descarga de Telegram y sube a Storage las fotos del lote en paralelo (acotado por
+        STORAGE_UPLOAD_CONCURRENCY). Retorna, en el orden de `photos`, la URL pública
+        ("" si la subida falló) o la excepción de la descarga.
+        """
+        from core.storage_upload import upload_concurrency
+
+        sem = asyncio.Semaphore(upload_concurrency())
+        sufijo = len(photos) > 1  # mismo segundo: sin sufijo las fotos se pisarían (upsert)
+
+        async def _una(i: int, photo_data: Dict) -> str:
+            async with sem:
+                file_bytes = await _download_telegram_photo_bytes(
+                    bot, photo_data["file_id"], logger=self.logger
+                )
+                self.logger.info(f"✅ Foto descargada: {len(file_bytes)} bytes")
+                filename = f"{base_name}_{int(time.time())}{f'_{i + 1}' if sufijo else ''}.jpg"
+                self.logger.info(f"📤 Subiendo a Supabase: {filename}...")
+                return await self.storage.aupload(bytes(file_bytes), filename, self.nombre_dist)
+
+        return await asyncio.gather(
+            *(_una(i, p) for i, p in enumerate(photos)), return_exceptions=True
+        )
+
     async def _ensure_ready(self, bot) -> None:
         try:
             if not getattr(bot, "_initialized", False) and hasattr(bot, "initialize"):
@@ -2790,24 +3024,15 @@ class BotWorker:
 
         self.logger.info(f"🚀 Iniciando procesamiento de {len(photos)} foto(s)...")
 
-        for photo_data in photos:
-            file_id = photo_data["file_id"]
+        # Descarga + subida en paralelo; el registro sigue en serie y en orden.
+        subidas = await self._subir_fotos_lote(context.bot, photos, f"{nro_cliente}_{clean_code}")
+
+        for photo_data, drive_link in zip(photos, subidas):
             ph_msg_id = photo_data["message_id"]
 
             try:
-                file_bytes = await _download_telegram_photo_bytes(
-                    context.bot, file_id, logger=self.logger
-                )
-                self.logger.info(f"✅ Foto descargada: {len(file_bytes)} bytes")
-
-                filename = f"{nro_cliente}_{clean_code}_{int(time.time())}.jpg"
-                self.logger.info(f"📤 Subiendo a Supabase: {filename}...")
-                drive_link = await asyncio.to_thread(
-                    self.storage.upload,
-                    bytes(file_bytes),
-                    filename,
-                    self.nombre_dist,
-                )
+                if isinstance(drive_link, BaseException):
+                    raise drive_link
 
                 if drive_link:
                     self.logger.info(f"✅ Foto en Supabase: {drive_link[:80]}...")
@@ -3204,28 +3429,15 @@ class BotWorker:
 
         self.logger.info(f"🚀 Iniciando procesamiento de {len(photos)} foto(s)...")
 
-        for photo_data in photos:
-            file_id    = photo_data["file_id"]
+        # Descarga + subida a Supabase Storage en paralelo; el registro sigue en serie y en orden.
+        subidas = await self._subir_fotos_lote(context.bot, photos, f"{nro_cliente}_{clean_code}")
+
+        for photo_data, drive_link in zip(photos, subidas):
             ph_msg_id  = photo_data["message_id"]
 
             try:
-                file_bytes = await _download_telegram_photo_bytes(
-                    context.bot, file_id, logger=self.logger
-                )
-                self.logger.info(f"✅ Foto descargada: {len(file_bytes)} bytes")
-
-                filename = (
-                    f"{nro_cliente}_{clean_code}_{int(time.time())}.jpg"
-                )
-
-                # Subida a Supabase Storage en thread
-                self.logger.info(f"📤 Subiendo a Supabase: {filename}...")
-                drive_link = await asyncio.to_thread(
-                    self.storage.upload,
-                    bytes(file_bytes),
-                    filename,
-                    self.nombre_dist,
-                )
+                if isinstance(drive_link, BaseException):
+                    raise drive_link
 
                 if drive_link:
                     self.logger.info(f"✅ Foto en Supabase: {drive_link[:80]}...")
@@ -3963,108 +4175,224 @@ class BotWorker:
                 user.username or "", user.first_name or "Usuario"
             )
 
-    async def sync_evaluaciones_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """
-        Cada 30s busca exhibiciones evaluadas que no
-        tienen el mensaje de Telegram actualizado y lo edita.
-        """
-        # Heartbeat al monitor de uptime
+    async def heartbeat_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Heartbeat al monitor de uptime (antes viajaba dentro del polling de evaluaciones)."""
         if self.monitor:
             self.monitor.heartbeat(self.distribuidor_id, status="running")
 
+    async def sync_evaluaciones_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Red de seguridad (cada BOT_EVAL_SYNC_POLL_SEC): busca exhibiciones evaluadas que no
+        tienen el mensaje de Telegram actualizado y lo edita. El camino normal son los
+        eventos del portal (eval_events_start_job / eval_events_drain_job).
+        """
         try:
-            pendientes = await asyncio.to_thread(
-                self.db.get_pendientes_sync, self.distribuidor_id
-            )
+            pendientes = await self.db.aget_pendientes_sync(self.distribuidor_id)
             if not pendientes:
                 return
 
-            self.logger.info(f"🔄 Sincronizando {len(pendientes)} evaluaciones...")
-
-            for ex in pendientes:
-                chat_id = ex["telegram_chat_id"]
-                msg_id  = ex["telegram_msg_id"]
-                estado  = ex["estado"]
-                vendedor = ex.get("vendedor_nombre")
-
-                def _clean_text(val: object) -> str:
-                    if val is None:
-                        return ""
-                    txt = str(val).strip()
-                    if not txt:
-                        return ""
-                    # Normalizar placeholders comunes que no sirven para mostrar.
-                    if txt.lower() in {"none", "null", "nan", "sin cliente", "s/c", "0"}:
-                        return ""
-                    return txt
-
-                # El campo "Cliente" debe priorizar el string enriquecido si existe
-                cliente = (
-                    _clean_text(ex.get("cliente"))
-                    or _clean_text(ex.get("nro_cliente"))
-                    or _clean_text(ex.get("id_cliente_erp"))
-                    or _clean_text(ex.get("cliente_sombra_codigo"))
-                    or _clean_text(ex.get("id_cliente_pdv"))
-                )
-                tipo = (
-                    _clean_text(ex.get("tipo_pdv"))
-                    or _clean_text(ex.get("tipo"))
-                    or _clean_text(ex.get("canal"))
-                )
-                comentario = ex.get("comentarios") or ""
-                supervisor = ex.get("supervisor_nombre") or "Supervisor"
-
-                # Evita textos "None"/vacíos en mensajes de evaluación.
-                vendedor_txt = (str(vendedor).strip() if vendedor is not None else "") or "Sin vendedor"
-                cliente_txt = (str(cliente).strip() if cliente is not None else "") or "Sin cliente"
-                tipo_txt = (str(tipo).strip() if tipo is not None else "") or "Sin tipo"
-
-                icon = {"Aprobado": "✅", "Rechazado": "❌", "Destacado": "🔥"}.get(estado, "⏳")
-
-                if estado == "Destacado":
-                    estado_text = self._msg("eval_destacada")
-                elif estado == "Aprobado":
-                    estado_text = self._msg("eval_aprobada", supervisor=supervisor)
-                elif estado == "Rechazado":
-                    estado_text = self._msg("eval_rechazada", supervisor=supervisor)
-                else:
-                    estado_text = f"{icon} <b>{estado}</b> por {supervisor}"
-
-                if comentario:
-                    estado_text += self._msg("eval_nota", comentario=comentario)
-
-                msg_text = self._msg(
-                    "eval_header",
-                    vendedor=vendedor_txt,
-                    cliente=cliente_txt,
-                    tipo=tipo_txt,
-                    estado_bloque=estado_text,
-                    __raw_estado_bloque=True,
-                    __raw_vendedor=True,
-                    __raw_cliente=True,
-                    __raw_tipo=True,
-                )
+            self.logger.info(f"🔄 Sincronizando {len(pendientes)} evaluaciones (polling)...")
+            await self._sync_evaluaciones_batch(context.bot, pendientes)
+
+        except Exception as e:
+            self.logger.error(f"Error en sync_evaluaciones_job: {e}")
+
+    async def eval_events_start_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Registra la cola en memoria del tenant y lanza su consumidor.
+        Va por job_queue porque post_init no corre con el bot embebido (webhook).
+        """
+        if self._eval_queue is not None:
+            return
+        from core.bot_eval_events import register_consumer
+
+        self._eval_queue = register_consumer(self.distribuidor_id)
+        context.application.create_task(
+            self._eval_events_consumer(context.application, self._eval_queue),
+            name=f"eval_events_{self.distribuidor_id}",
+        )
 
+    async def _eval_events_consumer(self, application: Application, queue: asyncio.Queue) -> None:
+        """Drena la cola en lotes (ventana BOT_EVAL_BATCH_WINDOW_SEC) hasta que la app se detiene."""
+        from core.bot_eval_events import unregister_consumer
+
+        loop = asyncio.get_running_loop()
+        try:
+            while application.running:
                 try:
-                    await context.bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=msg_id,
-                        text=msg_text,
-                        parse_mode=ParseMode.HTML,
-                        reply_markup=None,
-                    )
-                    self.logger.info(f"✅ Mensaje {msg_id} actualizado → {estado}")
-                    await asyncio.to_thread(self.db.marcar_synced, ex["id"])
-                except BadRequest as e:
-                    self.logger.warning(f"⚠️ No se pudo editar msg {msg_id}: {e}")
-                    # Mismo contenido → Telegram no edita; evitar reintentos eternos
-                    if "message is not modified" in str(e).lower():
-                        await asyncio.to_thread(self.db.marcar_synced, ex["id"])
+                    ex_id, _ = await asyncio.wait_for(queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                ids = [ex_id]
+                deadline = loop.time() + BOT_EVAL_BATCH_WINDOW_SEC
+                while len(ids) < BOT_EVAL_BATCH_MAX:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        ex_id, _ = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    ids.append(ex_id)
+                try:
+                    await self._sync_evaluaciones_ids(application.bot, list(dict.fromkeys(ids)))
                 except Exception as e:
-                    self.logger.error(f"❌ Error editando msg {msg_id}: {e}")
+                    # Quedan con synced_telegram=0: las toma el polling de respaldo.
+                    self.logger.error(f"Error sincronizando eventos de evaluación: {e}")
+        finally:
+            unregister_consumer(self.distribuidor_id, queue)
+            self._eval_queue = None
 
+    async def eval_events_drain_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Eventos durables (bot_eval_events) publicados cuando este bot no estaba en el proceso.
+        Se reprograma solo (run_once): vuelve a DRAIN_SEC si procesó algo, si no duplica la espera.
+        Un evento se marca procesado sólo si su mensaje quedó editado (o ya no hay nada que editar).
+        """
+        from core.bot_eval_events import afetch_pending_events, amark_events_processed
+
+        wait = min(self._eval_drain_wait * 2, BOT_EVAL_EVENTS_DRAIN_MAX_SEC)
+        try:
+            events = await afetch_pending_events(self.db.asb, self.distribuidor_id, BOT_EVAL_BATCH_MAX)
+            if events:
+                ids = list(dict.fromkeys(str(e["id_exhibicion"]) for e in events))
+                resueltos = await self._sync_evaluaciones_ids(context.bot, ids)
+                vencido = (datetime.now(timezone.utc) - timedelta(seconds=BOT_EVAL_EVENTS_TTL_SEC)).isoformat()
+                done = [
+                    e["id"]
+                    for e in events
+                    if str(e["id_exhibicion"]) in resueltos or str(e.get("created_at") or "") < vencido
+                ]
+                await amark_events_processed(self.db.asb, done)
+                if done:
+                    wait = BOT_EVAL_EVENTS_DRAIN_SEC
         except Exception as e:
-            self.logger.error(f"Error en sync_evaluaciones_job: {e}")
+            self.logger.warning(f"eval_events_drain_job: {e}")
+        finally:
+            self._eval_drain_wait = wait
+            context.job_queue.run_once(self.eval_events_drain_job, when=wait)
+
+    async def _sync_evaluaciones_ids(self, bot: Any, ex_ids: List[str]) -> set:
+        """ids ya reflejados en Telegram: editados ahora o que no tenían nada pendiente."""
+        pendientes = await self.db.aget_pendientes_sync_ids(self.distribuidor_id, ex_ids)
+        if not pendientes:
+            return set(ex_ids)
+        self.logger.info(f"🔄 Sincronizando {len(pendientes)} evaluaciones (eventos)...")
+        synced = await self._sync_evaluaciones_batch(bot, pendientes)
+        fallidos = {str(ex["id"]) for ex in pendientes} - {str(i) for i in synced}
+        return set(ex_ids) - fallidos
+
+    async def _sync_evaluaciones_batch(self, bot: Any, pendientes: List[Dict]) -> List[str]:
+        """Edita los mensajes respetando el rate limit y marca synced en una sola escritura."""
+        loop = asyncio.get_running_loop()
+        last_chat_edit: Dict[Any, float] = {}
+        synced: List[str] = []
+        for ex in pendientes:
+            chat_id = ex["telegram_chat_id"]
+            wait = last_chat_edit.get(chat_id, -1e9) + BOT_EVAL_CHAT_INTERVAL_SEC - loop.time()
+            await asyncio.sleep(max(wait, BOT_EVAL_EDIT_INTERVAL_SEC))
+            if await self._edit_evaluacion_msg(bot, ex):
+                synced.append(ex["id"])
+            last_chat_edit[chat_id] = loop.time()
+        if synced:
+            await self.db.amarcar_synced_many(synced)
+        return synced
+
+    def _evaluacion_msg_text(self, ex: Dict) -> str:
+        """Texto HTML del mensaje de grupo para una exhibición evaluada."""
+        estado  = ex["estado"]
+        vendedor = ex.get("vendedor_nombre")
+
+        def _clean_text(val: object) -> str:
+            if val is None:
+                return ""
+            txt = str(val).strip()
+            if not txt:
+                return ""
+            # Normalizar placeholders comunes que no sirven para mostrar.
+            if txt.lower() in {"none", "null", "nan", "sin cliente", "s/c", "0"}:
+                return ""
+            return txt
+
+        # El campo "Cliente" debe priorizar el string enriquecido si existe
+        cliente = (
+            _clean_text(ex.get("cliente"))
+            or _clean_text(ex.get("nro_cliente"))
+            or _clean_text(ex.get("id_cliente_erp"))
+            or _clean_text(ex.get("cliente_sombra_codigo"))
+            or _clean_text(ex.get("id_cliente_pdv"))
+        )
+        tipo = (
+            _clean_text(ex.get("tipo_pdv"))
+            or _clean_text(ex.get("tipo"))
+            or _clean_text(ex.get("canal"))
+        )
+        comentario = ex.get("comentarios") or ""
+        supervisor = ex.get("supervisor_nombre") or "Supervisor"
+
+        # Evita textos "None"/vacíos en mensajes de evaluación.
+        vendedor_txt = (str(vendedor).strip() if vendedor is not None else "") or "Sin vendedor"
+        cliente_txt = (str(cliente).strip() if cliente is not None else "") or "Sin cliente"
+        tipo_txt = (str(tipo).strip() if tipo is not None else "") or "Sin tipo"
+
+        icon = {"Aprobado": "✅", "Rechazado": "❌", "Destacado": "🔥"}.get(estado, "⏳")
+
+        if estado == "Destacado":
+            estado_text = self._msg("eval_destacada")
+        elif estado == "Aprobado":
+            estado_text = self._msg("eval_aprobada", supervisor=supervisor)
+        elif estado == "Rechazado":
+            estado_text = self._msg("eval_rechazada", supervisor=supervisor)
+        else:
+            estado_text = f"{icon} <b>{estado}</b> por {supervisor}"
+
+        if comentario:
+            estado_text += self._msg("eval_nota", comentario=comentario)
+
+        msg_text = self._msg(
+            "eval_header",
+            vendedor=vendedor_txt,
+            cliente=cliente_txt,
+            tipo=tipo_txt,
+            estado_bloque=estado_text,
+            __raw_estado_bloque=True,
+            __raw_vendedor=True,
+            __raw_cliente=True,
+            __raw_tipo=True,
+        )
+
+        return msg_text
+
+    async def _edit_evaluacion_msg(self, bot: Any, ex: Dict) -> bool:
+        """True si el mensaje quedó reflejando el estado (editado o sin cambios)."""
+        msg_id = ex["telegram_msg_id"]
+        msg_text = self._evaluacion_msg_text(ex)
+        for intento in range(2):
+            try:
+                await bot.edit_message_text(
+                    chat_id=ex["telegram_chat_id"],
+                    message_id=msg_id,
+                    text=msg_text,
+                    parse_mode=ParseMode.HTML,
+                    reply_markup=None,
+                )
+                self.logger.info(f"✅ Mensaje {msg_id} actualizado → {ex['estado']}")
+                return True
+            except RetryAfter as e:
+                ra = e.retry_after
+                secs = ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
+                self.logger.warning(f"⏳ Rate limit Telegram: esperando {secs:.0f}s (msg {msg_id})")
+                if intento:
+                    return False
+                await asyncio.sleep(secs)
+            except BadRequest as e:
+                self.logger.warning(f"⚠️ No se pudo editar msg {msg_id}: {e}")
+                # Mismo contenido → Telegram no edita; evitar reintentos eternos
+                return "message is not modified" in str(e).lower()
+            except Exception as e:
+                self.logger.error(f"❌ Error editando msg {msg_id}: {e}")
+                return False
+        return False
 
     # ─────────────────────────────────────────────────────────────
     # JOB: Limpiar sesiones expiradas
@@ -4299,7 +4627,10 @@ class BotWorker:
         app.add_error_handler(self.error_handler)
 
         # Jobs periódicos
-        app.job_queue.run_repeating(self.sync_evaluaciones_job, interval=30, first=10)
+        app.job_queue.run_repeating(self.heartbeat_job, interval=BOT_HEARTBEAT_SEC, first=10)
+        app.job_queue.run_once(self.eval_events_start_job, when=0)
+        app.job_queue.run_once(self.eval_events_drain_job, when=15)
+        app.job_queue.run_repeating(self.sync_evaluaciones_job, interval=BOT_EVAL_SYNC_POLL_SEC, first=10)
         app.job_queue.run_repeating(self.cleanup_sessions_job,  interval=300, first=60)
         from services.objetivos_notification_service import objetivos_telegram_seguimiento_enabled
         if objetivos_telegram_seguimiento_enabled():
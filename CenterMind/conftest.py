@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartidas de los tests de CenterMind.
+
+`fake_supabase`: cliente PostgREST en memoria (tablas = listas de dicts) con la API de
+builders que usan servicios y core (`sb.table(t).select(...).eq(...).execute()`,
+`sb.rpc(fn, params)`). Cada test arma su estado con la fábrica:
+
+    sb = fake_supabase({"objetivos": [...]}, rpcs={"fn": impl}, max_rows=1000)
+"""
+from __future__ import annotations
+
+import copy
+import threading
+from typing import Any, Callable
+
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class _FakeRequest:
+    def __init__(self) -> None:
+        self.headers: dict[str, str] = {}
+
+
+def _cmp_key(v: Any) -> tuple:
+    # NULL al final (ASC de Postgres); tipos mezclados se comparan como texto.
+    return (v is None, "" if v is None else v)
+
+
+class FakeQuery:
+    """Un builder por `sb.table(name)`: acumula filtros/orden/rango y resuelve en execute()."""
+
+    def __init__(self, sb: "FakeSupabase", name: str):
+        self.sb, self.name = sb, name
+        self.request = _FakeRequest()
+        self.op, self.payload, self.conflict = "select", None, ()
+        self.filters: list[Callable[[dict], bool]] = []
+        self.gts: list[tuple[str, Any]] = []
+        self.orden: list[tuple[str, bool]] = []
+        self.offset, self.lim = 0, None
+        self.thread = ""
+        self._neg = False
+
+    # ── lectura / filtros ────────────────────────────────────────────────────
+    def select(self, cols: str = "*", **_k):
+        self.sb.selects.append((self.name, cols))
+        return self
+
+    def _cmp(self, col: str, val: Any, op: Callable[[Any, Any], bool]):
+        coerce = self.sb.coerce
+
+        def _f(r: dict) -> bool:
+            a = r.get(col)
+            if a is None:
+                return False
+            a, b = coerce(col, a), coerce(col, val)
+            if type(a) is not type(b) and not (isinstance(a, (int, float)) and isinstance(b, (int, float))):
+                a, b = str(a), str(b)
+            return op(a, b)
+
+        self.filters.append(_f)
+        return self
+
+    def eq(self, col, val):
+        return self._cmp(col, val, lambda a, b: a == b)
+
+    def neq(self, col, val):
+        return self._cmp(col, val, lambda a, b: a != b)
+
+    def gt(self, col, val):
+        self.gts.append((col, val))
+        return self._cmp(col, val, lambda a, b: a > b)
+
+    def gte(self, col, val):
+        return self._cmp(col, val, lambda a, b: a >= b)
+
+    def lt(self, col, val):
+        return self._cmp(col, val, lambda a, b: a < b)
+
+    def lte(self, col, val):
+        return self._cmp(col, val, lambda a, b: a <= b)
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filters.append(lambda r: r.get(col) in vals)
+        return self
+
+    @property
+    def not_(self):
+        self._neg = True
+        return self
+
+    def is_(self, col, val):
+        neg, self._neg = self._neg, False
+        assert str(val).lower() == "null"
+        self.filters.append(lambda r: (r.get(col) is None) != neg)
+        return self
+
+    def or_(self, *_a, **_k):
+        # Sin parser de la sintaxis de PostgREST: los tests que dependen del OR no usan este fake.
+        return self
+
+    def order(self, col, desc: bool = False, **_k):
+        self.orden.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.lim = n
+        return self
+
+    def range(self, a, b):
+        self.offset, self.lim = a, b - a + 1
+        return self
+
+    # ── escrituras ───────────────────────────────────────────────────────────
+    def insert(self, rows, **_k):
+        self.op, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", **_k):
+        self.op, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        self.conflict = tuple(c.strip() for c in on_conflict.split(",") if c.strip()) or ("id",)
+        return self
+
+    def update(self, data):
+        self.op, self.payload = "update", data
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def execute(self) -> FakeResponse:
+        sb = self.sb
+        self.thread = threading.current_thread().name
+        with sb.lock:
+            sb.calls.append((self.name, self.op))
+            sb.queries.append(self)
+            tabla = sb.tables.setdefault(self.name, [])
+            if self.op == "insert":
+                for row in self.payload:
+                    tabla.append({"id": sb._next_id(tabla), **copy.deepcopy(row)})
+                return FakeResponse(self.payload)
+            if self.op == "upsert":
+                sb.upserts[self.name] = sb.upserts.get(self.name, 0) + len(self.payload)
+                for row in self.payload:
+                    key = tuple(row.get(c) for c in self.conflict)
+                    previa = next((r for r in tabla if tuple(r.get(c) for c in self.conflict) == key), None)
+                    if previa is None:
+                        nueva = copy.deepcopy(row)
+                        tabla.append(nueva if "id" in nueva else {"id": sb._next_id(tabla), **nueva})
+                    else:
+                        previa.update(copy.deepcopy(row))
+                return FakeResponse(self.payload)
+            rows = [r for r in tabla if all(f(r) for f in self.filters)]
+            if self.op == "update":
+                for r in rows:
+                    r.update(copy.deepcopy(self.payload))
+                return FakeResponse([dict(r) for r in rows])
+            if self.op == "delete":
+                tabla[:] = [r for r in tabla if not any(r is m for m in rows)]
+                return FakeResponse(rows)
+            for col, desc in reversed(self.orden):
+                rows.sort(key=lambda r: _cmp_key(r.get(col)), reverse=desc)
+            total = len(rows)
+            lim = self.lim if self.lim is not None else len(rows)
+            if sb.max_rows is not None:
+                lim = min(lim, sb.max_rows)
+            rows = rows[self.offset : self.offset + lim]
+            count = total if "count=exact" in self.request.headers.get("Prefer", "") else None
+            return FakeResponse([dict(r) for r in rows], count)
+
+
+class _FakeRpc:
+    def __init__(self, sb: "FakeSupabase", fn: str, params: dict):
+        self.sb, self.fn, self.params = sb, fn, params
+
+    def execute(self) -> FakeResponse:
+        self.sb.calls.append((self.fn, "rpc"))
+        impl = self.sb.rpcs.get(self.fn)
+        if impl is None:
+            # Igual que PostgREST sin la migración: el código cae a su camino directo.
+            raise RuntimeError(f"function {self.fn} does not exist")
+        self.sb.rpc_calls.append((self.fn, self.params))
+        return FakeResponse(impl(self.sb, self.params))
+
+
+class FakeSupabase:
+    """
+    Estado: `tables` (nombre → filas). Registro: `calls` [(tabla|fn, op)], `queries` (builders
+    ejecutados), `selects` [(tabla, cols)], `upserts` (filas por tabla), `rpc_calls`.
+    `max_rows` imita el corte por respuesta de PostgREST; `coerce(col, v)` normaliza valores
+    antes de comparar (p.ej. timestamps con distinto offset).
+    """
+
+    def __init__(
+        self,
+        tables: dict[str, list[dict]] | None = None,
+        *,
+        rpcs: dict[str, Callable[["FakeSupabase", dict], Any]] | None = None,
+        max_rows: int | None = None,
+        coerce: Callable[[str, Any], Any] | None = None,
+    ):
+        self.tables: dict[str, list[dict]] = tables if tables is not None else {}
+        self.rpcs = dict(rpcs or {})
+        self.max_rows = max_rows
+        self.coerce = coerce or (lambda _col, v: v)
+        self.calls: list[tuple[str, str]] = []
+        self.queries: list[FakeQuery] = []
+        self.selects: list[tuple[str, str]] = []
+        self.upserts: dict[str, int] = {}
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self.lock = threading.RLock()
+        self._ids = 0
+
+    def _next_id(self, tabla: list[dict]) -> int:
+        # Serial por tabla como en Postgres: nunca repite un id ya cargado por el test.
+        self._ids = max([self._ids, *(r["id"] for r in tabla if isinstance(r.get("id"), int))]) + 1
+        return self._ids
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, fn: str, params: dict | None = None) -> _FakeRpc:
+        return _FakeRpc(self, fn, params or {})
+
+
+@pytest.fixture
+def fake_supabase() -> type[FakeSupabase]:
+    """Fábrica de FakeSupabase (ver docstring del módulo)."""
+    return FakeSupabase
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Eventos de evaluación → bot Telegram (edición del mensaje del grupo sin polling).
+
+El portal publica (id_exhibicion, id_distribuidor) al evaluar:
+- si el bot del tenant corre en este proceso, va a su asyncio.Queue (entrega inmediata);
+- si no (bot caído, otro worker/proceso), se persiste en `bot_eval_events` y el bot
+  lo drena con un SELECT liviano e indexado.
+
+`BotWorker.sync_evaluaciones_job` queda como red de seguridad lenta (BOT_EVAL_SYNC_POLL_SEC).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+logger = logging.getLogger("bot_eval_events")
+
+TABLE = "bot_eval_events"
+
+# dist_id → (loop del bot, cola). La cola sólo se toca desde su loop.
+_CONSUMERS: dict[int, tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+_LOCK = threading.Lock()
+_STATS = {"queued": 0, "persisted": 0, "dropped": 0}
+
+
+def register_consumer(dist_id: int) -> asyncio.Queue:
+    """Registra la cola del bot del tenant. Llamar desde el loop donde corre el bot."""
+    queue: asyncio.Queue = asyncio.Queue()
+    with _LOCK:
+        _CONSUMERS[int(dist_id)] = (asyncio.get_running_loop(), queue)
+    return queue
+
+
+def unregister_consumer(dist_id: int, queue: asyncio.Queue | None = None) -> None:
+    """Quita la cola (sólo si sigue siendo `queue`, para no pisar un bot reiniciado)."""
+    with _LOCK:
+        cur = _CONSUMERS.get(int(dist_id))
+        if cur is not None and (queue is None or cur[1] is queue):
+            _CONSUMERS.pop(int(dist_id), None)
+
+
+def _enqueue(dist_id: int, ids: list[str]) -> bool:
+    with _LOCK:
+        cur = _CONSUMERS.get(dist_id)
+    if cur is None:
+        return False
+    loop, queue = cur
+    if loop.is_closed() or not loop.is_running():
+        unregister_consumer(dist_id, queue)
+        return False
+    try:
+        for ex_id in ids:
+            loop.call_soon_threadsafe(queue.put_nowait, (ex_id, dist_id))
+    except RuntimeError:
+        # Loop cerrado entre el chequeo y el push.
+        unregister_consumer(dist_id, queue)
+        return False
+    _STATS["queued"] += len(ids)
+    return True
+
+
+def _persist(sb, dist_id: int, ids: list[str]) -> bool:
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        sb.table(TABLE).insert(
+            [{"id_distribuidor": dist_id, "id_exhibicion": ex_id, "created_at": now} for ex_id in ids]
+        ).execute()
+    except Exception as e:
+        logger.warning("[bot_eval_events] persist dist=%s n=%s: %s", dist_id, len(ids), e)
+        return False
+    _STATS["persisted"] += len(ids)
+    return True
+
+
+def publish_evaluaciones(dist_id: int, ids_exhibicion: Iterable[Any], *, sb=None) -> str:
+    """
+    Avisa al bot del tenant que estas exhibiciones cambiaron de estado.
+
+    Seguro desde endpoints sync (threadpool). Devuelve "queue" | "table" | "dropped";
+    en "dropped" el polling de respaldo termina editando el mensaje (synced_telegram=0).
+    """
+    dist_id = int(dist_id)
+    ids = list(dict.fromkeys(str(i) for i in ids_exhibicion if i))
+    if not ids:
+        return "dropped"
+    if _enqueue(dist_id, ids):
+        return "queue"
+    if sb is None:
+        from db import sb
+    if _persist(sb, dist_id, ids):
+        return "table"
+    _STATS["dropped"] += len(ids)
+    return "dropped"
+
+
+def fetch_pending_events(sb, dist_id: int, limit: int = 200) -> list[dict[str, Any]]:
+    """Eventos durables sin procesar del tenant (más viejos primero)."""
+    res = (
+        sb.table(TABLE)
+        .select("id, id_exhibicion, created_at")
+        .eq("id_distribuidor", int(dist_id))
+        .is_("processed_at", "null")
+        .order("id")
+        .limit(limit)
+        .execute()
+    )
+    return res.data or []
+
+
+def mark_events_processed(sb, event_ids: list[int]) -> None:
+    if not event_ids:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    for i in range(0, len(event_ids), 200):
+        sb.table(TABLE).update({"processed_at": now}).in_("id", event_ids[i : i + 200]).execute()
+
+
+async def afetch_pending_events(asb, dist_id: int, limit: int = 200) -> list[dict[str, Any]]:
+    """fetch_pending_events sobre el cliente async (`db.asb`), desde el loop del bot."""
+    from db import aexecute
+
+    res = await aexecute(
+        asb.table(TABLE)
+        .select("id, id_exhibicion, created_at")
+        .eq("id_distribuidor", int(dist_id))
+        .is_("processed_at", "null")
+        .order("id")
+        .limit(limit)
+    )
+    return res.data or []
+
+
+async def amark_events_processed(asb, event_ids: list[int]) -> None:
+    from db import aexecute
+
+    if not event_ids:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    for i in range(0, len(event_ids), 200):
+        await aexecute(asb.table(TABLE).update({"processed_at": now}).in_("id", event_ids[i : i + 200]))
+
+
+def eval_events_stats() -> dict[str, Any]:
+    return {**_STATS, "consumers": sorted(_CONSUMERS)}
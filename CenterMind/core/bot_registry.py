@@ -13,7 +13,7 @@ import time
 from typing import Any
 
 from core.config import TELEGRAM_WEBHOOK_ALLOWED_UPDATES, WEBHOOK_URL
-from db import sb
+from db import aexecute, asb, sb
 
 logger = logging.getLogger("bot_registry")
 
@@ -102,6 +102,50 @@ def fetch_active_distribuidores(
     return []
 
 
+async def afetch_active_distribuidores(
+    *,
+    max_retries: int = 8,
+    initial_delay: float = 2.0,
+) -> list[dict[str, Any]]:
+    """Versión async de fetch_active_distribuidores (health check / refresh desde el loop)."""
+    delay = initial_delay
+    for attempt in range(1, max_retries + 1):
+        try:
+            res = await aexecute(
+                asb.table("distribuidores")
+                .select("id_distribuidor, nombre_empresa, token_bot")
+                .eq("estado", "activo")
+            )
+            rows = res.data or []
+            if rows:
+                logger.info(
+                    "[bot_registry] %s distribuidor(es) activo(s) (intento %s/%s)",
+                    len(rows),
+                    attempt,
+                    max_retries,
+                )
+            return rows
+        except Exception as e:
+            if not is_transient_supabase_error(e) or attempt >= max_retries:
+                logger.error(
+                    "[bot_registry] fetch distribuidores (async) falló intento %s/%s: %s",
+                    attempt,
+                    max_retries,
+                    e,
+                )
+                raise
+            logger.warning(
+                "[bot_registry] Supabase transitorio (intento %s/%s): %s — reintento en %.1fs",
+                attempt,
+                max_retries,
+                e,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, 15.0)
+    return []
+
+
 async def start_bot_for_dist(
     dist: dict[str, Any],
     manager: Any,
@@ -152,10 +196,7 @@ async def start_all_bots(
 ) -> dict[str, Any]:
     """Arranca todos los bots activos. Devuelve resumen para health/logs."""
     try:
-        distribuidores = await asyncio.to_thread(
-            fetch_active_distribuidores,
-            max_retries=max_retries,
-        )
+        distribuidores = await afetch_active_distribuidores(max_retries=max_retries)
     except Exception as e:
         logger.error("[bot_registry] No se pudo listar distribuidores: %s", e)
         return {
@@ -194,7 +235,7 @@ async def start_all_bots(
 async def ensure_missing_bots(manager: Any, bots: dict[int, Any]) -> None:
     """Job periódico: levanta bots que quedaron fuera tras error transitorio al deploy."""
     try:
-        distribuidores = await asyncio.to_thread(fetch_active_distribuidores, max_retries=3)
+        distribuidores = await afetch_active_distribuidores(max_retries=3)
     except Exception as e:
         logger.debug("[bot_registry] ensure_missing skip: %s", e)
         return
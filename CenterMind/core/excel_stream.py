@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura en streaming de XLSX/CSV de ERP y padrón (chunks de filas tipadas como texto).
+
+`pd.read_excel` arma la lista completa de filas, después el DataFrame, y los
+callers sumaban copias (`replace` / `dropna` / `fillna`). Acá openpyxl corre en
+modo read-only y cada chunk sale como DataFrame de `EXCEL_STREAM_CHUNK_ROWS` filas.
+
+Semántica = `pd.read_excel(dtype=str, keep_default_na=False)` + filas vacías afuera:
+- celdas vacías → "" (con ``na_empty=True``: NaN, igual que "NA"/"null"/… en read_excel por defecto);
+- floats enteros → "1010" (igual que el lector openpyxl de pandas);
+- header: primera fila de la hoja, "Unnamed: i" para celdas vacías y duplicados "col.1".
+
+Si el archivo no es XLSX: .xls (OLE) va entero por pandas/xlrd y el resto se lee
+como CSV/TSV (sep autodetectado, latin1) también por chunks.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+from collections.abc import Iterator
+from typing import Any
+
+import pandas as pd
+
+logger = logging.getLogger("ShelfyAPI")
+
+EXCEL_STREAM_CHUNK_ROWS = int(os.environ.get("EXCEL_STREAM_CHUNK_ROWS", "5000"))
+
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0"
+
+# Textos que read_excel toma como NaN por defecto (keep_default_na=True).
+_DEFAULT_NA = frozenset((
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+))
+
+
+# Celdas error (#N/A de fórmulas): pandas las toma como vacías. Con values_only no hay
+# data_type, así que un texto idéntico a un código de error también queda vacío.
+_ERROR_CODES = frozenset(("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"))
+
+
+def cell_str(value: Any) -> str:
+    """Valor de celda openpyxl → texto como lo deja read_excel(dtype=str)."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return "" if value in _ERROR_CODES else value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def header_names(raw: list[Any]) -> list[str]:
+    """Nombres de columna estilo pandas: "Unnamed: i" y duplicados "col.1", "col.2"."""
+    names: list[str] = []
+    seen: dict[str, int] = {}
+    for i, v in enumerate(raw):
+        name = cell_str(v) or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _as_buffer(source: Any) -> Any:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _trim(row: list[str]) -> list[str]:
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def _frame(rows: list[list[str]], columns: list[str], na_empty: bool) -> pd.DataFrame:
+    width = len(columns)
+    for r in rows:
+        if len(r) < width:
+            r.extend([""] * (width - len(r)))
+    df = pd.DataFrame(rows, columns=columns, dtype=str)
+    if na_empty:
+        df = df.mask(df.isin(_DEFAULT_NA))
+    return df
+
+
+def _xlsx_chunks(wb: Any, chunk_rows: int, na_empty: bool) -> Iterator[pd.DataFrame]:
+    try:
+        ws = wb.worksheets[0]
+        columns: list[str] | None = None
+        batch: list[list[str]] = []
+        for values in ws.iter_rows(values_only=True):
+            row = _trim([cell_str(v) for v in values])
+            if columns is None:
+                # Como pandas (header=0): la primera fila de la hoja, aunque venga vacía.
+                columns = header_names(row)
+                continue
+            if not row:
+                continue
+            if len(row) > len(columns):
+                # Datos a la derecha del header: pandas los nombra "Unnamed: i".
+                columns = columns + [f"Unnamed: {i}" for i in range(len(columns), len(row))]
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield _frame(batch, columns, na_empty)
+                batch = []
+        if columns is not None:
+            yield _frame(batch, columns, na_empty)
+    finally:
+        wb.close()
+
+
+def _csv_chunks(buf: io.BytesIO, chunk_rows: int, na_empty: bool) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(
+        buf, sep=None, engine="python", dtype=str, encoding="latin1", chunksize=chunk_rows
+    )
+    for chunk in reader:
+        chunk = chunk.dropna(how="all")
+        yield chunk if na_empty else chunk.fillna("")
+
+
+def iter_table_chunks(
+    source: Any,
+    *,
+    chunk_rows: int | None = None,
+    na_empty: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """
+    Itera el archivo (bytes / BytesIO) en DataFrames de texto sin filas vacías.
+
+    Todos los chunks comparten columnas salvo que aparezcan datos a la derecha del
+    header (se agregan "Unnamed: i" desde ese chunk). El último chunk puede venir
+    vacío (sólo header) para que el caller siempre vea las columnas.
+    """
+    chunk_rows = chunk_rows or EXCEL_STREAM_CHUNK_ROWS
+    buf = _as_buffer(source)
+    head = buf.read(4)
+    buf.seek(0)
+    if head == _OLE_MAGIC:
+        df = pd.read_excel(buf, dtype=str)
+        df = df.dropna(how="all")
+        yield df if na_empty else df.fillna("")
+        return
+    try:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(buf, read_only=True, data_only=True)
+    except Exception as exc:
+        logger.warning(f"[excel_stream] No es XLSX ({type(exc).__name__}: {exc}); leyendo como CSV")
+        buf.seek(0)
+        yield from _csv_chunks(buf, chunk_rows, na_empty)
+        return
+    yield from _xlsx_chunks(wb, chunk_rows, na_empty)
+
+
+def read_str_frame(source: Any, *, chunk_rows: int | None = None, na_empty: bool = False) -> pd.DataFrame:
+    """DataFrame completo armado chunk a chunk (sin las copias de replace/dropna/fillna)."""
+    chunks = list(iter_table_chunks(source, chunk_rows=chunk_rows, na_empty=na_empty))
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+    if not na_empty and df.isna().any(axis=None):
+        # Columnas "Unnamed" que aparecieron a mitad de archivo.
+        df = df.fillna("")
+    return df
@@ -16,10 +16,15 @@ Por integrante (casos no-ranking):
 - Si hay varias filas con la misma clave: ganador por score
   (Destacado 3 > Aprobado 2 > Rechazado 1 > Pendiente 0)
 
+Motor columnar (core/exhibicion_columnar): mismos resultados con sort + group-by sobre
+arrays; se usa automáticamente desde EXHIBICION_COLUMNAR_MIN_ROWS filas.
+EXHIBICION_AGG_ENGINE=python|columnar fuerza uno u otro (auto por defecto).
+
 Documentación: CLAUDE.md §5/§9, arquitectura.md § Invariantes.
 """
 from __future__ import annotations
 
+import os
 from collections import defaultdict
 
 EXHIBICION_ROW_COLS = (
@@ -29,6 +34,20 @@ EXHIBICION_ROW_COLS = (
 )
 
 
+_COLUMNAR_MIN_ROWS = int(os.environ.get("EXHIBICION_COLUMNAR_MIN_ROWS", "2000"))
+
+
+def _use_columnar(rows, *, auto: bool = True) -> bool:
+    """
+    Motor columnar sólo para listas grandes (el armado de arrays no paga en lotes chicos).
+    auto=False: el caller sólo lo quiere si se fuerza EXHIBICION_AGG_ENGINE=columnar.
+    """
+    engine = (os.getenv("EXHIBICION_AGG_ENGINE") or "auto").strip().lower()
+    if engine == "python" or not isinstance(rows, list):
+        return False
+    return engine == "columnar" or (auto and len(rows) >= _COLUMNAR_MIN_ROWS)
+
+
 def exhibicion_score(estado: str) -> int:
     """Score de una exhibición según su estado."""
     e = (estado or "").strip().lower()
@@ -170,6 +189,10 @@ def aggregate_exhibicion_counts(rows: list[dict]) -> dict[str, int]:
     Conteos por estado tras dedup lógico (integrante + cliente + día).
     Si hay varias filas para la misma clave, gana la de mayor exhibicion_score.
     """
+    if _use_columnar(rows):
+        from core import exhibicion_columnar
+
+        return exhibicion_columnar.aggregate_exhibicion_counts(rows)
     best: dict[str, dict] = {}
     for row in rows:
         iid_raw = row.get("id_integrante")
@@ -221,6 +244,10 @@ def aggregate_exhibicion_counts_vendor_scope(rows: list[dict]) -> dict[str, int]
     Dedup por (cliente_key, día) sin separar por integrante — misma visita lógica
     aunque haya varias fotos o varios grupos Telegram.
     """
+    if _use_columnar(rows):
+        from core import exhibicion_columnar
+
+        return exhibicion_columnar.aggregate_exhibicion_counts_vendor_scope(rows)
     best: dict[str, dict] = {}
     for row in rows:
         key = vendor_logic_key(row)
@@ -309,6 +336,10 @@ def aggregate_ranking_by_vendor(
     Ranking por nombre ERP: dedup lógico por vendedor (cliente + día, sin separar integrante)
     + puntos (aprobada +1, destacada +2). Mismo criterio que objetivos y stats Telegram.
     """
+    if _use_columnar(rows):
+        from core import exhibicion_columnar
+
+        return exhibicion_columnar.aggregate_ranking_by_vendor(rows, iid_to_erp)
     best: dict[str, dict] = {}
     for row in rows:
         iid_raw = row.get("id_integrante")
@@ -371,6 +402,10 @@ def count_active_vendors(rows: list[dict], iid_to_erp: dict[int, str]) -> int:
     Un vendedor con solo rechazos cuenta (tiene exhibición lógica).
     NO contar integrantes ni fotos; deduplicar a nivel ERP.
     """
+    if _use_columnar(rows):
+        from core import exhibicion_columnar
+
+        return exhibicion_columnar.count_active_vendors(rows, iid_to_erp)
     vendors_with_logical: set[str] = set()
     seen_keys: set[str] = set()
     for row in rows:
@@ -428,6 +463,12 @@ def count_logical_per_client(
     Si se pasa `seen`, se reutiliza para acumular claves (útil cuando
     se procesan múltiples queries por el mismo distribuidor).
     """
+    # Acá el costo es la extracción por fila (y la clave string para `seen`): el columnar
+    # no gana, así que sólo corre si se fuerza (scripts/bench_exhibicion_columnar.py).
+    if _use_columnar(rows, auto=False):
+        from core import exhibicion_columnar
+
+        return exhibicion_columnar.count_logical_per_client(rows, seen=seen)
     if seen is None:
         seen = set()
     counts: dict = {}
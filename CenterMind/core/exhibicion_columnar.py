@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Motor columnar de exhibiciones lógicas (misma regla que core/exhibicion_aggregate).
+
+Las filas se cargan una vez a columnas (cliente_key, día AR, id_integrante, clase/score
+del estado) y el dedup "máx. 1 por clave lógica, gana el mayor score" se resuelve con
+factorize + lexsort: el ganador de cada grupo es la primera fila en orden
+(código de clave, -score, posición), igual que el `score >` estricto del motor Python.
+
+Las claves de fallback (url → chat/msg → id_exhibicion) se arman fila a fila sólo para
+las filas sin cliente o sin día (pocas); el resto se agrupa por códigos enteros.
+Los resultados (incluido el orden de inserción de los dicts) son idénticos a los del
+motor Python; core/exhibicion_aggregate decide cuándo usar cada uno.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from core.exhibicion_aggregate import build_logic_key, exhibicion_score
+
+# Clase de conteo (mismo orden de chequeo que los agregadores: aprobad → destacad → rechaz)
+CLS_PENDIENTE, CLS_APROBADA, CLS_DESTACADA, CLS_RECHAZADA = 0, 1, 2, 3
+
+# iid_state
+_IID_NONE, _IID_OK, _IID_BAD = 0, 1, 2
+
+
+def _estado_class(estado: str) -> int:
+    est = (estado or "").lower()
+    if "aprobad" in est:
+        return CLS_APROBADA
+    if "destacad" in est:
+        return CLS_DESTACADA
+    if "rechaz" in est:
+        return CLS_RECHAZADA
+    return CLS_PENDIENTE
+
+
+def _parse_iid(raw: Any) -> tuple[int, int]:
+    if raw is None:
+        return 0, _IID_NONE
+    try:
+        return int(raw), _IID_OK
+    except (TypeError, ValueError):
+        return 0, _IID_BAD
+
+
+def _factorize(values: list | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Códigos en orden de primera aparición + uniques (objetos Python originales)."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=False)
+    return codes.astype(np.int64, copy=False), np.asarray(uniques, dtype=object)
+
+
+@dataclass(slots=True)
+class ExhibicionColumns:
+    """Columnas tipadas de un lote de filas de exhibiciones (posiciones alineadas con `rows`)."""
+
+    rows: list[dict]
+    client_code: np.ndarray          # factorize de cliente_key ("" incluido)
+    day_code: np.ndarray             # factorize de day_key ("" incluido)
+    has_client_day: np.ndarray       # bool: cliente_key y day_key no vacíos
+    iid: np.ndarray                  # int64 (0 si no parsea)
+    iid_state: np.ndarray            # int8: _IID_NONE / _IID_OK / _IID_BAD
+    score: np.ndarray                # int8 (exhibicion_score)
+    cls: np.ndarray                  # int8 (CLS_*)
+    _n_days: int = field(default=0, repr=False)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "ExhibicionColumns":
+        client_keys = []
+        day_keys = []
+        iids = []
+        states = []
+        estados = []
+        for r in rows:
+            raw = r.get("id_cliente_pdv") or r.get("id_cliente") or r.get("cliente_sombra_codigo")
+            client_keys.append(str(raw).strip() if raw is not None else "")
+            ts = (r.get("timestamp_subida") or "").strip()
+            day_keys.append(ts[:10] if len(ts) >= 10 else "")
+            iid, st = _parse_iid(r.get("id_integrante"))
+            iids.append(iid)
+            states.append(st)
+            estados.append(r.get("estado") or "")
+
+        client_code, client_uniques = _factorize(client_keys)
+        day_code, day_uniques = _factorize(day_keys)
+        client_ok = np.array([bool(u) for u in client_uniques], dtype=bool)
+        day_ok = np.array([bool(u) for u in day_uniques], dtype=bool)
+        has_client_day = (
+            client_ok[client_code] & day_ok[day_code]
+            if len(rows) else np.zeros(0, dtype=bool)
+        )
+
+        est_code, est_uniques = _factorize(estados)
+        est_score = np.array([exhibicion_score(e) for e in est_uniques], dtype=np.int8)
+        est_cls = np.array([_estado_class(e) for e in est_uniques], dtype=np.int8)
+        return cls(
+            rows=rows,
+            client_code=client_code,
+            day_code=day_code,
+            has_client_day=has_client_day,
+            iid=np.asarray(iids, dtype=np.int64),
+            iid_state=np.asarray(states, dtype=np.int8),
+            score=est_score[est_code] if len(rows) else np.zeros(0, dtype=np.int8),
+            cls=est_cls[est_code] if len(rows) else np.zeros(0, dtype=np.int8),
+            _n_days=len(day_uniques),
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def require_int_iids(self) -> None:
+        """Agregadores por integrante: id_integrante no numérico falla igual que int(raw)."""
+        for i in np.flatnonzero(self.iid_state == _IID_BAD).tolist():
+            int(self.rows[i].get("id_integrante"))
+
+    # ── Claves lógicas (como enteros, en orden de primera aparición) ─────────
+
+    def _pair_code(self) -> np.ndarray:
+        return self.client_code * (self._n_days + 1) + self.day_code
+
+    def _with_fallback(self, base: np.ndarray, valid: np.ndarray, fb_keys: list[str]) -> np.ndarray:
+        """Combina clave entera de filas válidas con strings de fallback (espacio disjunto)."""
+        key = base.copy()
+        inv = np.flatnonzero(~valid)
+        if len(inv):
+            fb_code, _ = _factorize(fb_keys)
+            offset = int(base.max(initial=0)) + 1
+            key[inv] = offset + fb_code
+        return key
+
+    def vendor_scope_key(self) -> np.ndarray:
+        """vendor_logic_key: v_{cliente}_{día} o fallback url/msg/id."""
+        valid = self.has_client_day
+        fb = [build_logic_key(None, "", "", self.rows[i]) for i in np.flatnonzero(~valid)]
+        return self._with_fallback(self._pair_code(), valid, fb)
+
+    def integrante_scope_key(self) -> np.ndarray:
+        """build_logic_key(iid, …): {iid}_{cliente}_{día} o fallback (requiere iids válidos)."""
+        valid = self.has_client_day & (self.iid_state == _IID_OK)
+        fb = [build_logic_key(None, "", "", self.rows[i]) for i in np.flatnonzero(~valid)]
+        # (iid, par cliente/día) → entero vía factorize del iid
+        iid_code, _ = _factorize(self.iid.tolist())
+        pair, _ = pd.factorize(self._pair_code(), sort=False)
+        base = iid_code * (int(pair.max(initial=0)) + 1) + pair
+        return self._with_fallback(base, valid, fb)
+
+    def ranking_key(self, vendor_code: np.ndarray, vendor_names: np.ndarray) -> np.ndarray:
+        """_ranking_logic_key: v_{cliente}_{día} compartida; fallback prefijado por vendedor."""
+        valid = self.has_client_day
+        fb = [
+            f"{vendor_names[vendor_code[i]]}_{build_logic_key(None, '', '', self.rows[i])}"
+            for i in np.flatnonzero(~valid)
+        ]
+        return self._with_fallback(self._pair_code(), valid, fb)
+
+
+def _group_winners(key: np.ndarray, score: np.ndarray) -> np.ndarray:
+    """
+    Posición ganadora de cada clave (mayor score; empate → primera fila), en orden
+    de primera aparición de la clave (= orden de inserción del dict `best`).
+    """
+    if not len(key):
+        return np.empty(0, dtype=np.int64)
+    codes, _ = pd.factorize(key, sort=False)
+    pos = np.arange(len(key))
+    order = np.lexsort((pos, -score.astype(np.int16), codes))
+    sorted_codes = codes[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    return order[first]  # ordenado por código → orden de aparición
+
+
+def _counts_from_cls(cls: np.ndarray) -> dict[str, int]:
+    bc = np.bincount(cls, minlength=4)
+    return {
+        "aprobadas": int(bc[CLS_APROBADA]),
+        "destacadas": int(bc[CLS_DESTACADA]),
+        "rechazadas": int(bc[CLS_RECHAZADA]),
+        "pendientes": int(bc[CLS_PENDIENTE]),
+        "puntos": int(bc[CLS_APROBADA] + 2 * bc[CLS_DESTACADA]),
+        "total_logicas": int(len(cls)),
+    }
+
+
+# ─── Agregadores (misma firma / salida que core/exhibicion_aggregate) ──────────
+
+
+def aggregate_exhibicion_counts(rows: list[dict], cols: ExhibicionColumns | None = None) -> dict[str, int]:
+    cols = cols or ExhibicionColumns.from_rows(rows)
+    cols.require_int_iids()
+    win = _group_winners(cols.integrante_scope_key(), cols.score)
+    return _counts_from_cls(cols.cls[win])
+
+
+def aggregate_exhibicion_counts_vendor_scope(
+    rows: list[dict], cols: ExhibicionColumns | None = None
+) -> dict[str, int]:
+    cols = cols or ExhibicionColumns.from_rows(rows)
+    win = _group_winners(cols.vendor_scope_key(), cols.score)
+    return _counts_from_cls(cols.cls[win])
+
+
+def _vendor_columns(cols: ExhibicionColumns, iid_to_erp: dict[int, str]):
+    """(máscara filas con iid válido, código de vendedor por fila, nombres únicos)."""
+    ok = cols.iid_state == _IID_OK
+    iid_codes, iid_uniques = _factorize(cols.iid.tolist())
+    # dict en vez de factorize: el nombre puede ser None y pandas lo volvería NaN
+    name_code: dict[Any, int] = {}
+    vcode_u = np.array(
+        [name_code.setdefault(iid_to_erp.get(int(i), "Desconocido"), len(name_code)) for i in iid_uniques],
+        dtype=np.int64,
+    )
+    vnames = np.empty(len(name_code), dtype=object)
+    for name, code in name_code.items():
+        vnames[code] = name
+    return ok, vcode_u[iid_codes], vnames
+
+
+def aggregate_ranking_by_vendor(
+    rows: list[dict],
+    iid_to_erp: dict[int, str],
+    cols: ExhibicionColumns | None = None,
+) -> dict[str, dict[str, int]]:
+    cols = cols or ExhibicionColumns.from_rows(rows)
+    ok, vcode, vnames = _vendor_columns(cols, iid_to_erp)
+    sel = np.flatnonzero(ok)
+    if not len(sel):
+        return {}
+    key = cols.ranking_key(vcode, vnames)[sel]
+    win = sel[_group_winners(key, cols.score[sel])]
+    w_cls = cols.cls[win]
+    w_vendor = vcode[win]
+    counted = w_cls != CLS_PENDIENTE
+    w_cls, w_vendor = w_cls[counted], w_vendor[counted]
+    if not len(w_cls):
+        return {}
+    # Orden de inserción del defaultdict: primer ganador contado de cada vendedor.
+    v_order, first_idx = np.unique(w_vendor, return_index=True)
+    v_order = v_order[np.argsort(first_idx, kind="stable")]
+    nv = len(vnames)
+    by = np.zeros((nv, 4), dtype=np.int64)
+    np.add.at(by, (w_vendor, w_cls), 1)
+    out: dict[str, dict[str, int]] = {}
+    for v in v_order.tolist():
+        a, d, r = int(by[v, CLS_APROBADA]), int(by[v, CLS_DESTACADA]), int(by[v, CLS_RECHAZADA])
+        out[vnames[v]] = {"aprobadas": a, "destacadas": d, "rechazadas": r, "puntos": a + 2 * d}
+    return out
+
+
+def count_active_vendors(
+    rows: list[dict], iid_to_erp: dict[int, str], cols: ExhibicionColumns | None = None
+) -> int:
+    cols = cols or ExhibicionColumns.from_rows(rows)
+    ok, vcode, vnames = _vendor_columns(cols, iid_to_erp)
+    sel = np.flatnonzero(ok)
+    if not len(sel):
+        return 0
+    key = cols.ranking_key(vcode, vnames)[sel]
+    # Primera fila de cada clave (sin score: gana la que aparece primero)
+    _, first = np.unique(key, return_index=True)
+    return int(len(np.unique(vcode[sel][first])))
+
+
+def count_logical_per_client(
+    rows: list[dict],
+    *,
+    seen: set[str] | None = None,
+) -> dict:
+    """Igual que el motor Python; `seen` recibe las claves string como antes."""
+    with_cid = [r for r in rows if r.get("id_cliente_pdv") is not None]
+    if not with_cid:
+        return {}
+    cols = ExhibicionColumns.from_rows(with_cid)
+    cols.require_int_iids()
+    key = cols.integrante_scope_key()
+    # Sólo la primera fila de cada clave puede sumar; el resto ya está en `seen`.
+    _, first = np.unique(key, return_index=True)
+    counts: dict = {}
+    if seen is None:
+        for i in np.sort(first).tolist():
+            cid = with_cid[i]["id_cliente_pdv"]
+            counts[cid] = counts.get(cid, 0) + 1
+        return counts
+    for i in np.sort(first).tolist():
+        row = with_cid[i]
+        k = _logic_key_str(cols, i)
+        if k in seen:
+            continue
+        seen.add(k)
+        cid = row["id_cliente_pdv"]
+        counts[cid] = counts.get(cid, 0) + 1
+    return counts
+
+
+def _logic_key_str(cols: ExhibicionColumns, i: int) -> str:
+    row = cols.rows[i]
+    iid = int(cols.iid[i]) if cols.iid_state[i] == _IID_OK else None
+    raw = row.get("id_cliente_pdv") or row.get("id_cliente") or row.get("cliente_sombra_codigo")
+    client_key = str(raw).strip() if raw is not None else ""
+    ts = (row.get("timestamp_subida") or "").strip()
+    return build_logic_key(iid, client_key, ts[:10] if len(ts) >= 10 else "", row)
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+"""
+Rollup diario de exhibiciones lógicas (migrations/20260614_exhibicion_rollup.sql).
+
+Por (tenant, día AR, id_integrante, build_logic_key) guarda la fila ganadora del dedup
+(mayor exhibicion_score, empate → la primera por timestamp_subida, id_exhibicion) y la
+primera fila del grupo. Es la partición más fina de todas las claves de exhibicion_aggregate,
+así que `logical_rows_periodo` devuelve filas "tipo exhibiciones" (ganadora + primera, en
+el orden original) sobre las que aggregate_ranking_by_vendor / *_vendor_scope /
+aggregate_exhibicion_counts / count_active_vendors dan lo mismo que con las filas crudas.
+No sirve para contar fotos ni listar exhibiciones.
+
+El vendedor ERP se resuelve al leer (iid_to_erp vigente), no al construir: un cambio de
+binding no deja el rollup viejo.
+
+Días a recalcular: trigger sobre exhibiciones → exhibicion_rollup_dirty. Los días sin
+construir (exhibicion_rollup_dias) se arman en la primera lectura. Meses cerrados
+(fin de mes + EXHIBICION_ROLLUP_CLOSED_GRACE_DAYS) se leen en una sola query; sus días
+sucios los recalcula `refresh_dirty_rollups` (scheduler).
+
+EXHIBICION_ROLLUP=0 desactiva (los callers caen al fetch crudo).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from core.exhibicion_aggregate import (
+    EXHIBICION_ROW_COLS,
+    build_logic_key,
+    exhibicion_score,
+    resolve_client_key,
+    resolve_day_key,
+)
+
+logger = logging.getLogger("ShelfyAPI")
+
+ROLLUP_TABLE = "exhibicion_rollup_diaria"
+DIAS_TABLE = "exhibicion_rollup_dias"
+DIRTY_TABLE = "exhibicion_rollup_dirty"
+ROLLUP_CONFLICT = "id_distribuidor,dia,id_integrante,logic_key"
+
+AR_TZ = timezone(timedelta(hours=-3))
+
+EXHIBICION_ROLLUP_CLOSED_GRACE_DAYS = int(os.environ.get("EXHIBICION_ROLLUP_CLOSED_GRACE_DAYS", "3"))
+# Margen contra desfase de reloj app ↔ DB al limpiar marcas dirty (ver _write_days).
+EXHIBICION_ROLLUP_CLOCK_SKEW_SEC = float(os.environ.get("EXHIBICION_ROLLUP_CLOCK_SKEW_SEC", "5"))
+_WRITE_CHUNK = 500
+_FETCH_WINDOW_DAYS = 7
+
+_ROW_FIELDS = tuple(EXHIBICION_ROW_COLS.split(","))
+
+# (dist, desde, hasta) de rangos cerrados ya verificados completos → lectura en 1 query.
+# LRU acotado: cada combinación de filtros de fecha del portal agrega una clave.
+_CLOSED_READY: "OrderedDict[tuple[int, date, date], None]" = OrderedDict()
+_CLOSED_READY_MAX = int(os.environ.get("EXHIBICION_ROLLUP_CLOSED_READY_MAX", "4096"))
+_LOCK = threading.Lock()
+_STATS = {
+    "reads": 0,
+    "closed_reads": 0,
+    "days_rebuilt": 0,
+    "raw_rows_scanned": 0,
+    "rollup_rows_read": 0,
+    "fallbacks": 0,
+}
+
+
+def rollup_enabled() -> bool:
+    return (os.getenv("EXHIBICION_ROLLUP") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _sb(sb):
+    if sb is not None:
+        return sb
+    from db import sb as _default
+
+    return _default
+
+
+# ── Fechas ─────────────────────────────────────────────────────────────────────
+
+def _parse_ts(ts: Any) -> datetime | None:
+    s = str(ts or "").strip()
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=AR_TZ)
+
+
+def ar_day(ts: Any) -> date | None:
+    """Día calendario AR de un timestamp_subida (mismo criterio que el trigger dirty)."""
+    dt = _parse_ts(ts)
+    return dt.astimezone(AR_TZ).date() if dt else None
+
+
+def _aligned_day(iso: str | None) -> date | None:
+    """Día AR si `iso` es medianoche AR exacta; None si el bound corta un día."""
+    dt = _parse_ts(iso)
+    if dt is None:
+        return None
+    local = dt.astimezone(AR_TZ)
+    if (local.hour, local.minute, local.second, local.microsecond) != (0, 0, 0, 0):
+        return None
+    return local.date()
+
+
+def _day_start_iso(d: date) -> str:
+    return datetime(d.year, d.month, d.day, tzinfo=AR_TZ).isoformat()
+
+
+def _today_ar() -> date:
+    return datetime.now(AR_TZ).date()
+
+
+def is_closed_day(d: date, today: date | None = None) -> bool:
+    """Mes terminado hace más de EXHIBICION_ROLLUP_CLOSED_GRACE_DAYS días."""
+    month_end = date(d.year, d.month, monthrange(d.year, d.month)[1])
+    return (today or _today_ar()) > month_end + timedelta(days=EXHIBICION_ROLLUP_CLOSED_GRACE_DAYS)
+
+
+def _order_key(row: dict) -> tuple:
+    """Orden del fetch crudo: timestamp_subida, id_exhibicion."""
+    dt = _parse_ts(row.get("timestamp_subida"))
+    ex_id = row.get("id_exhibicion")
+    try:
+        ex_id = int(ex_id)
+    except (TypeError, ValueError):
+        ex_id = 0
+    return (dt.timestamp() if dt else float("-inf"), ex_id)
+
+
+def _puntos(estado: str) -> int:
+    e = (estado or "").lower()
+    if "aprobad" in e:
+        return 1
+    if "destacad" in e:
+        return 2
+    return 0
+
+
+# ── Construcción ───────────────────────────────────────────────────────────────
+
+def build_day_rollup(dist_id: int, rows: Iterable[dict], build_id: int = 0) -> list[dict]:
+    """
+    Filas de rollup para las exhibiciones crudas dadas (en el orden del fetch:
+    timestamp_subida, id_exhibicion). Se ignoran filas sin id_integrante entero o sin
+    timestamp: ranking, KPIs y stats ya las descartan.
+    """
+    groups: dict[tuple[date, int, str], dict] = {}
+    for row in rows:
+        iid_raw = row.get("id_integrante")
+        if iid_raw is None:
+            continue
+        try:
+            iid = int(iid_raw)
+        except (TypeError, ValueError):
+            continue
+        dia = ar_day(row.get("timestamp_subida"))
+        if dia is None:
+            continue
+        key = build_logic_key(iid, resolve_client_key(row), resolve_day_key(row), row)
+        estado = row.get("estado") or ""
+        score = exhibicion_score(estado)
+        g = groups.get((dia, iid, key))
+        if g is None:
+            groups[(dia, iid, key)] = {"first": row, "winner": row, "score": score, "fotos": 1}
+            continue
+        g["fotos"] += 1
+        if score > g["score"]:
+            g["winner"], g["score"] = row, score
+
+    out: list[dict] = []
+    for (dia, iid, key), g in groups.items():
+        w, first = g["winner"], g["first"]
+        rec = {f: w.get(f) for f in _ROW_FIELDS}
+        rec.update({
+            "id_distribuidor": int(dist_id),
+            "dia": dia.isoformat(),
+            "id_integrante": iid,
+            "logic_key": key,
+            "score": g["score"],
+            "puntos": _puntos(w.get("estado") or ""),
+            "first_id_exhibicion": None,
+            "first_estado": None,
+            "first_timestamp_subida": None,
+            "fotos": g["fotos"],
+            "build_id": build_id,
+        })
+        if first is not w:
+            rec["first_id_exhibicion"] = first.get("id_exhibicion")
+            rec["first_estado"] = first.get("estado")
+            rec["first_timestamp_subida"] = first.get("timestamp_subida")
+        out.append(rec)
+    return out
+
+
+def expand_rollup_rows(rollup_rows: Iterable[dict]) -> list[dict]:
+    """
+    Filas de rollup → filas con columnas EXHIBICION_ROW_COLS (ganadora y, si difiere,
+    la primera del grupo) en el orden del fetch crudo. La primera fila fija el orden de
+    aparición de cada clave; la ganadora, el estado.
+    """
+    out: list[dict] = []
+    for r in rollup_rows:
+        winner = {f: r.get(f) for f in _ROW_FIELDS}
+        winner["id_integrante"] = r.get("id_integrante")
+        out.append(winner)
+        if r.get("first_id_exhibicion") is not None:
+            out.append({
+                **winner,
+                "id_exhibicion": r["first_id_exhibicion"],
+                "estado": r.get("first_estado"),
+                "timestamp_subida": r.get("first_timestamp_subida"),
+            })
+    out.sort(key=_order_key)
+    return out
+
+
+def _fetch_raw(sb, dist_id: int, start: date, end: date) -> list[dict]:
+    from db import fetch_all
+
+    start_iso, end_iso = _day_start_iso(start), _day_start_iso(end)
+    return fetch_all(
+        lambda: (
+            sb.table("exhibiciones")
+            .select(EXHIBICION_ROW_COLS)
+            .eq("id_distribuidor", dist_id)
+            .gte("timestamp_subida", start_iso)
+            .lt("timestamp_subida", end_iso)
+            .order("timestamp_subida")
+            .order("id_exhibicion")
+        )
+    )
+
+
+def _day_runs(dias: Iterable[date]) -> list[list[date]]:
+    """Días consecutivos agrupados (máx _FETCH_WINDOW_DAYS) → un fetch crudo por tramo."""
+    runs: list[list[date]] = []
+    for d in sorted(set(dias)):
+        if runs and d - runs[-1][-1] == timedelta(days=1) and len(runs[-1]) < _FETCH_WINDOW_DAYS:
+            runs[-1].append(d)
+        else:
+            runs.append([d])
+    return runs
+
+
+def _write_days(sb, dist_id: int, dias: list[date], rollup: list[dict], build_id: int, started: float) -> None:
+    """
+    Reemplaza los días con la RPC exhibicion_rollup_replace: una transacción con advisory
+    lock por (tenant, día), así dos rebuilds concurrentes del mismo día no se pisan y un
+    build más viejo no reemplaza a uno más nuevo. Sin la RPC: upsert + delete por build_id.
+    """
+    marked_before = datetime.fromtimestamp(started - EXHIBICION_ROLLUP_CLOCK_SKEW_SEC, timezone.utc).isoformat()
+    try:
+        sb.rpc(
+            "exhibicion_rollup_replace",
+            {
+                "p_dist": dist_id,
+                "p_dias": [d.isoformat() for d in dias],
+                "p_rows": rollup,
+                "p_build_id": build_id,
+                "p_marked_before": marked_before,
+            },
+        ).execute()
+        return
+    except Exception as e:
+        logger.debug("[exhibicion_rollup] RPC exhibicion_rollup_replace no disponible, upsert directo: %s", e)
+    for i in range(0, len(rollup), _WRITE_CHUNK):
+        sb.table(ROLLUP_TABLE).upsert(rollup[i:i + _WRITE_CHUNK], on_conflict=ROLLUP_CONFLICT).execute()
+    per_day: dict[str, int] = {}
+    for r in rollup:
+        per_day[r["dia"]] = per_day.get(r["dia"], 0) + 1
+    # build_id creciente: un rebuild concurrente más nuevo no pierde sus filas.
+    for d in dias:
+        dia = d.isoformat()
+        (
+            sb.table(ROLLUP_TABLE).delete()
+            .eq("id_distribuidor", dist_id).eq("dia", dia).lt("build_id", build_id)
+            .execute()
+        )
+        sb.table(DIAS_TABLE).upsert(
+            {
+                "id_distribuidor": dist_id,
+                "dia": dia,
+                "logicas": per_day.get(dia, 0),
+                "build_id": build_id,
+                "built_at": datetime.now(timezone.utc).isoformat(),
+            },
+            on_conflict="id_distribuidor,dia",
+        ).execute()
+        # Sólo marcas anteriores al fetch: una evaluación durante el rebuild vuelve a quedar sucia.
+        (
+            sb.table(DIRTY_TABLE).delete()
+            .eq("id_distribuidor", dist_id).eq("dia", dia).lte("marked_at", marked_before)
+            .execute()
+        )
+
+
+def refresh_days(dist_id: int, dias: Iterable[date], *, sb=None) -> int:
+    """Recalcula el rollup de los días AR dados (fetch crudo sólo de esos días). Devuelve días."""
+    sb = _sb(sb)
+    dist_id = int(dist_id)
+    n = 0
+    for run in _day_runs(dias):
+        started = time.time()
+        build_id = time.time_ns()
+        raw = _fetch_raw(sb, dist_id, run[0], run[-1] + timedelta(days=1))
+        _STATS["raw_rows_scanned"] += len(raw)
+        _write_days(sb, dist_id, run, build_day_rollup(dist_id, raw, build_id), build_id, started)
+        n += len(run)
+    _STATS["days_rebuilt"] += n
+    return n
+
+
+def _pending_days(sb, dist_id: int, start: date, end: date) -> set[date]:
+    """Días del rango sin construir o marcados sucios."""
+    built = (
+        sb.table(DIAS_TABLE).select("dia")
+        .eq("id_distribuidor", dist_id).gte("dia", start.isoformat()).lt("dia", end.isoformat())
+        .execute().data or []
+    )
+    dirty = (
+        sb.table(DIRTY_TABLE).select("dia")
+        .eq("id_distribuidor", dist_id).gte("dia", start.isoformat()).lt("dia", end.isoformat())
+        .execute().data or []
+    )
+    all_days = {start + timedelta(days=i) for i in range((end - start).days)}
+    built_days = {date.fromisoformat(str(r["dia"])[:10]) for r in built}
+    return (all_days - built_days) | {date.fromisoformat(str(r["dia"])[:10]) for r in dirty}
+
+
+# ── Lectura ────────────────────────────────────────────────────────────────────
+
+def _closed_ready(key: tuple[int, date, date]) -> bool:
+    with _LOCK:
+        if key not in _CLOSED_READY:
+            return False
+        _CLOSED_READY.move_to_end(key)
+        return True
+
+
+def _mark_closed_ready(key: tuple[int, date, date]) -> None:
+    with _LOCK:
+        _CLOSED_READY[key] = None
+        _CLOSED_READY.move_to_end(key)
+        while len(_CLOSED_READY) > _CLOSED_READY_MAX:
+            _CLOSED_READY.popitem(last=False)
+
+
+def logical_rows_periodo(
+    dist_id: int,
+    start_iso: str,
+    end_iso: str | None = None,
+    *,
+    integrante_ids: list[int] | None = None,
+    sb=None,
+) -> list[dict] | None:
+    """
+    Filas lógicas de [start_iso, end_iso) para los agregadores de exhibicion_aggregate.
+    end_iso=None → hasta hoy inclusive. None si el rollup está apagado, los bounds no
+    caen en medianoche AR o falla la lectura: el caller usa el fetch crudo.
+    """
+    if not rollup_enabled():
+        return None
+    start = _aligned_day(start_iso)
+    today = _today_ar()
+    end = _aligned_day(end_iso) if end_iso else today + timedelta(days=1)
+    if start is None or end is None or end <= start:
+        return None
+    sb = _sb(sb)
+    dist_id = int(dist_id)
+    closed = is_closed_day(end - timedelta(days=1), today)
+    key = (dist_id, start, end)
+    try:
+        if not (closed and _closed_ready(key)):
+            pending = _pending_days(sb, dist_id, start, end)
+            if pending:
+                refresh_days(dist_id, pending, sb=sb)
+            if closed:
+                _mark_closed_ready(key)
+        from db import fetch_all
+
+        def _q():
+            q = (
+                sb.table(ROLLUP_TABLE)
+                .select("*")
+                .eq("id_distribuidor", dist_id)
+                .gte("dia", start.isoformat())
+                .lt("dia", end.isoformat())
+                .order("dia")
+                .order("id_integrante")
+                .order("logic_key")
+            )
+            if integrante_ids:
+                q = q.in_("id_integrante", [int(i) for i in integrante_ids])
+            return q
+
+        rollup = fetch_all(_q)
+    except Exception as e:
+        _STATS["fallbacks"] += 1
+        logger.warning("[exhibicion_rollup] dist=%s %s→%s fallback crudo: %s", dist_id, start, end, e)
+        return None
+    _STATS["reads"] += 1
+    if closed:
+        _STATS["closed_reads"] += 1
+    _STATS["rollup_rows_read"] += len(rollup)
+    return expand_rollup_rows(rollup)
+
+
+def refresh_dirty_rollups(*, sb=None, limit: int = 500) -> dict[str, int]:
+    """Job: recalcula días sucios de todos los tenants (incluye meses cerrados)."""
+    if not rollup_enabled():
+        return {"tenants": 0, "dias": 0}
+    sb = _sb(sb)
+    rows = (
+        sb.table(DIRTY_TABLE).select("id_distribuidor,dia")
+        .order("marked_at").limit(limit)
+        .execute().data or []
+    )
+    by_dist: dict[int, set[date]] = {}
+    for r in rows:
+        by_dist.setdefault(int(r["id_distribuidor"]), set()).add(date.fromisoformat(str(r["dia"])[:10]))
+    dias = 0
+    for dist_id, ds in by_dist.items():
+        try:
+            dias += refresh_days(dist_id, ds, sb=sb)
+        except Exception as e:
+            logger.warning("[exhibicion_rollup] refresh dist=%s: %s", dist_id, e)
+    return {"tenants": len(by_dist), "dias": dias}
+
+
+def exhibicion_rollup_stats() -> dict[str, Any]:
+    return {**_STATS, "closed_ranges_ready": len(_CLOSED_READY)}
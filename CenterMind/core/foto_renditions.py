@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Renditions WebP de fotos de exhibición (migrations/20260620_exhibicion_foto_renditions.sql).
+
+El bot y la app suben el original (JPEG/PNG/WebP de varios MB) a Exhibiciones-PDV. Después
+de registrar la exhibición se encola un job `foto_renditions` (core/job_queue) que, fuera
+del request:
+
+  - baja el original de Storage, corrige orientación EXIF y genera
+    thumb (320px) y med (1280px) en WebP, en un pool de hilos (FOTO_RENDITION_WORKERS);
+  - los sube a `_r/{rendition}/{path original}.webp` en el mismo bucket;
+  - guarda las URLs en exhibiciones.foto_renditions = {"thumb": url, "med": url}.
+
+Los payloads (galería, visor, bundle móvil) exponen url_foto_thumb / url_foto_med junto al
+original vía rendition_fields(); None si la foto todavía no tiene renditions.
+Histórico: scripts/backfill_foto_renditions.py.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger("ShelfyAPI")
+
+BUCKET = "Exhibiciones-PDV"
+PREFIX = "_r"
+
+# nombre → (lado mayor en px, calidad WebP)
+RENDITIONS: dict[str, tuple[int, int]] = {
+    "thumb": (320, 70),
+    "med": (1280, 80),
+}
+
+_STATS = {"fotos": 0, "errores": 0, "bytes_original": 0, "bytes_renditions": 0, "sin_fila": 0}
+_stats_lock = threading.Lock()
+
+
+def _inc(**kw: int) -> None:
+    with _stats_lock:
+        for k, n in kw.items():
+            _STATS[k] += n
+
+
+def renditions_enabled() -> bool:
+    return (os.getenv("FOTO_RENDITIONS") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _workers() -> int:
+    try:
+        return max(1, int(os.getenv("FOTO_RENDITION_WORKERS", "4")))
+    except ValueError:
+        return 4
+
+
+def storage_path_de_url(url: str | None) -> str | None:
+    """Path dentro del bucket para una URL pública de Exhibiciones-PDV (None si es de otro origen)."""
+    if not url:
+        return None
+    marker = f"/object/public/{BUCKET}/"
+    path = urlsplit(str(url).strip()).path
+    i = path.find(marker)
+    if i < 0:
+        return None
+    return unquote(path[i + len(marker):]) or None
+
+
+def rendition_path(storage_path: str, nombre: str) -> str:
+    base, _, _ext = storage_path.rpartition(".")
+    return f"{PREFIX}/{nombre}/{base or storage_path}.webp"
+
+
+def render(data: bytes) -> dict[str, bytes]:
+    """Genera las renditions WebP (orientación EXIF aplicada, sin metadata)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        out: dict[str, bytes] = {}
+        # De mayor a menor: cada reducción parte de la anterior (menos píxeles que remuestrear).
+        for nombre, (lado, calidad) in sorted(RENDITIONS.items(), key=lambda kv: -kv[1][0]):
+            img.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="WEBP", quality=calidad, method=4)
+            out[nombre] = buf.getvalue()
+        return out
+
+
+def generar(sb: Any, url: str, data: bytes | None = None) -> dict[str, str] | None:
+    """Baja (si hace falta) el original, sube las renditions y retorna {nombre: url pública}."""
+    path = storage_path_de_url(url)
+    if not path:
+        return None
+    bucket = sb.storage.from_(BUCKET)
+    if data is None:
+        data = bucket.download(path)
+    renditions = render(data)
+    urls: dict[str, str] = {}
+    for nombre, contenido in renditions.items():
+        destino = rendition_path(path, nombre)
+        bucket.upload(
+            path=destino,
+            file=contenido,
+            file_options={"content-type": "image/webp", "upsert": "true", "cache-control": "31536000"},
+        )
+        urls[nombre] = bucket.get_public_url(destino)
+    _inc(fotos=1, bytes_original=len(data), bytes_renditions=sum(len(c) for c in renditions.values()))
+    return urls
+
+
+def procesar(sb: Any, fotos: Iterable[tuple[int | None, str]], *, workers: int | None = None) -> dict[str, int]:
+    """
+    Genera renditions para [(id_exhibicion, url)] en un pool de hilos y las guarda en
+    exhibiciones.foto_renditions (por id; sin id, por url_foto_drive).
+    """
+    pendientes = [(ex_id, url) for ex_id, url in fotos if storage_path_de_url(url)]
+    out = {"fotos": len(pendientes), "ok": 0, "errores": 0}
+    if not pendientes:
+        return out
+
+    def _una(item: tuple[int | None, str]) -> bool:
+        ex_id, url = item
+        try:
+            urls = generar(sb, url)
+            if not urls:
+                return False
+            q = sb.table("exhibiciones").update({"foto_renditions": urls})
+            q = q.eq("id_exhibicion", ex_id) if ex_id is not None else q.eq("url_foto_drive", url)
+            res = q.execute()
+            if not (res.data or []):
+                _inc(sin_fila=1)
+            return True
+        except Exception as e:
+            _inc(errores=1)
+            logger.warning(f"[foto_renditions] ex={ex_id} {url[-80:]}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=min(workers or _workers(), len(pendientes)), thread_name_prefix="foto-rend") as pool:
+        for ok in pool.map(_una, pendientes):
+            out["ok" if ok else "errores"] += 1
+    return out
+
+
+# Con JOB_QUEUE=0 el job correría inline en el request: se manda a este pool.
+_POOL: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _pool_lock:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="foto-rend-bg")
+        return _POOL
+
+
+def encolar(dist_id: int, fotos: Iterable[tuple[int | None, str]]) -> None:
+    """Post-registro de exhibición: renditions fuera del request (job durable o pool local)."""
+    if not renditions_enabled():
+        return
+    items = [(int(ex_id) if ex_id else None, url) for ex_id, url in fotos if storage_path_de_url(url)]
+    if not items:
+        return
+    from core.job_queue import enqueue_foto_renditions, queue_enabled
+
+    if queue_enabled():
+        enqueue_foto_renditions(dist_id, items)
+        return
+    from db import sb
+
+    _pool().submit(procesar, sb, items, workers=1)
+
+
+def rendition_fields(row: dict, prefix: str = "url_foto") -> dict[str, str | None]:
+    """{url_foto_thumb, url_foto_med} desde exhibiciones.foto_renditions (None si no hay)."""
+    r = row.get("foto_renditions")
+    r = r if isinstance(r, dict) else {}
+    return {f"{prefix}_{nombre}": r.get(nombre) or None for nombre in RENDITIONS}
+
+
+def foto_renditions_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_STATS)
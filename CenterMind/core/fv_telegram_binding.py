@@ -1,6 +1,7 @@
 """Helpers de vinculación Telegram ↔ vendedor ERP (Fuerza de Ventas)."""
 from __future__ import annotations
 
+from core.identity_cache import invalidate_identity
 from db import sb
 
 
@@ -59,3 +60,4 @@ def propagate_telegram_users_to_vendedor(
         clear_q.neq("telegram_user_id", uids[0]).execute()
     else:
         clear_q.not_.in_("telegram_user_id", uids).execute()
+    invalidate_identity(dist_id, "propagate_telegram_users")
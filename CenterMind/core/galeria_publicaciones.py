@@ -2,6 +2,7 @@
 """Agrupación de exhibiciones en publicaciones lógicas (1 por PDV+día AR)."""
 from collections import defaultdict
 
+from core.foto_renditions import rendition_fields
 from models.schemas import GaleriaFotoPublicacion, GaleriaPublicacion
 
 _ESTADO_SCORE = {"Destacado": 3, "Aprobado": 2, "Rechazado": 1, "Pendiente": 0}
@@ -34,6 +35,7 @@ def group_exhibiciones_publicaciones(rows: list[dict]) -> list[GaleriaPublicacio
             GaleriaFotoPublicacion(
                 id_exhibicion=int(r["id_exhibicion"]),
                 url_foto=r.get("url_foto_drive") or "",
+                **rendition_fields(r),
                 estado=r.get("estado") or "Pendiente",
                 timestamp_subida=r.get("timestamp_subida") or "",
                 comentario=r.get("comentario_evaluacion"),
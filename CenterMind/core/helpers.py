@@ -11,6 +11,7 @@ import re
 import unicodedata
 from typing import Any
 
+from core.identity_cache import cached_identity
 from core.tenant_tables import tenant_table_name
 from db import sb
 
@@ -269,103 +270,118 @@ def _get_erp_name_map(dist_id: int) -> dict:
 
     EXCEPCIONAL: Para Distribuidora 3 (Tabaco) y id_vendedor_v2=30 (Ivan Soto),
     NO aplicamos el mapeo ERP para que Monchi y Jorge aparezcan con su propio nombre.
+
+    Cacheado por tenant (core.identity_cache); devuelve copia, el caller puede mutarla.
     """
     try:
-        t_vendedores = tenant_table_name("vendedores_v2", dist_id)
-        vend_res = (
-            sb.table(t_vendedores)
-            .select("id_vendedor, nombre_erp")
-            .eq("id_distribuidor", dist_id)
-            .execute()
-        )
-        erp_identity_map: dict[str, str] = {}
-        vend_id_to_name: dict[int, str] = {}
-        for v in vend_res.data or []:
-            nombre_erp = (v.get("nombre_erp") or "").strip()
-            if nombre_erp:
-                erp_identity_map[nombre_erp.lower()] = nombre_erp
-                if v.get("id_vendedor") is not None:
-                    vend_id_to_name[int(v["id_vendedor"])] = nombre_erp
+        return dict(cached_identity(dist_id, "erp_name_map", lambda: _build_erp_name_map(dist_id)))
+    except Exception as e:
+        logger.warning(f"_get_erp_name_map dist={dist_id} falló: {e}")
+        return {}
+
 
-        bindings_rows: list = (
+def get_binding_rows(dist_id: int) -> list:
+    """Overrides vendedores_telegram_binding del tenant (cacheados; no mutar)."""
+    return cached_identity(
+        dist_id,
+        "bindings",
+        lambda: (
             sb.table("vendedores_telegram_binding")
             .select("telegram_user_id, id_vendedor_v2, telegram_group_id")
             .eq("id_distribuidor", dist_id)
             .execute()
             .data
             or []
-        )
+        ),
+    )
 
-        ig_res = (
-            sb.table("integrantes_grupo")
-            .select(
-                "nombre_integrante, id_vendedor_v2, id_vendedor_erp, telegram_user_id, telegram_group_id"
-            )
-            .eq("id_distribuidor", dist_id)
-            .execute()
+
+def _build_erp_name_map(dist_id: int) -> dict:
+    t_vendedores = tenant_table_name("vendedores_v2", dist_id)
+    vend_res = (
+        sb.table(t_vendedores)
+        .select("id_vendedor, nombre_erp")
+        .eq("id_distribuidor", dist_id)
+        .execute()
+    )
+    erp_identity_map: dict[str, str] = {}
+    vend_id_to_name: dict[int, str] = {}
+    for v in vend_res.data or []:
+        nombre_erp = (v.get("nombre_erp") or "").strip()
+        if nombre_erp:
+            erp_identity_map[nombre_erp.lower()] = nombre_erp
+            if v.get("id_vendedor") is not None:
+                vend_id_to_name[int(v["id_vendedor"])] = nombre_erp
+
+    bindings_rows = get_binding_rows(dist_id)
+
+    ig_res = (
+        sb.table("integrantes_grupo")
+        .select(
+            "nombre_integrante, id_vendedor_v2, id_vendedor_erp, telegram_user_id, telegram_group_id"
         )
-        name_map: dict = dict(erp_identity_map)
-        for ig in ig_res.data or []:
-            tg_name = (ig.get("nombre_integrante") or "").strip()
-            if not tg_name:
-                continue
-            tg_uid = ig.get("telegram_user_id")
-            id_v_erp = resolve_vendedor_v2_for_integrante(ig, bindings_rows)
-            has_binding_override = False
-            if tg_uid is not None:
-                has_binding_override = (
-                    resolve_vendedor_v2_for_integrante(
-                        {
-                            "telegram_user_id": tg_uid,
-                            "telegram_group_id": ig.get("telegram_group_id"),
-                            "id_vendedor_v2": None,
-                        },
-                        bindings_rows,
-                    )
-                    is not None
+        .eq("id_distribuidor", dist_id)
+        .execute()
+    )
+    name_map: dict = dict(erp_identity_map)
+    for ig in ig_res.data or []:
+        tg_name = (ig.get("nombre_integrante") or "").strip()
+        if not tg_name:
+            continue
+        tg_uid = ig.get("telegram_user_id")
+        id_v_erp = resolve_vendedor_v2_for_integrante(ig, bindings_rows)
+        has_binding_override = False
+        if tg_uid is not None:
+            has_binding_override = (
+                resolve_vendedor_v2_for_integrante(
+                    {
+                        "telegram_user_id": tg_uid,
+                        "telegram_group_id": ig.get("telegram_group_id"),
+                        "id_vendedor_v2": None,
+                    },
+                    bindings_rows,
+                )
+                is not None
+            )
+        if dist_id == 3 and id_v_erp == 30:
+            continue
+        nombre_erp = vend_id_to_name.get(id_v_erp) if id_v_erp is not None else None
+        if nombre_erp:
+            tg_key = tg_name.lower()
+            existing = erp_identity_map.get(tg_key)
+            # If tg_name is already an ERP vendor name, never remap it to a different one.
+            if existing and existing != nombre_erp:
+                logger.warning(
+                    f"_get_erp_name_map dist={dist_id}: conflicto '{tg_name}' -> '{nombre_erp}' "
+                    f"(se preserva identidad ERP '{existing}')"
                 )
-            if dist_id == 3 and id_v_erp == 30:
                 continue
-            nombre_erp = vend_id_to_name.get(id_v_erp) if id_v_erp is not None else None
-            if nombre_erp:
-                tg_key = tg_name.lower()
-                existing = erp_identity_map.get(tg_key)
-                # If tg_name is already an ERP vendor name, never remap it to a different one.
-                if existing and existing != nombre_erp:
-                    logger.warning(
-                        f"_get_erp_name_map dist={dist_id}: conflicto '{tg_name}' -> '{nombre_erp}' "
-                        f"(se preserva identidad ERP '{existing}')"
-                    )
-                    continue
-                current = name_map.get(tg_key)
-                # Solo nombre+apellido en el mapa global (nunca alias "Nacho" suelto).
-                if not _looks_like_full_name(tg_name):
-                    continue
-                if current and current != nombre_erp:
+            current = name_map.get(tg_key)
+            # Solo nombre+apellido en el mapa global (nunca alias "Nacho" suelto).
+            if not _looks_like_full_name(tg_name):
+                continue
+            if current and current != nombre_erp:
+                continue
+            name_map[tg_key] = nombre_erp
+            legacy_erp_name = (ig.get("id_vendedor_erp") or "").strip()
+            if legacy_erp_name and legacy_erp_name.lower() != nombre_erp.lower():
+                legacy_key = legacy_erp_name.lower()
+                legacy_current = name_map.get(legacy_key)
+                if legacy_current and legacy_current != nombre_erp and not has_binding_override:
                     continue
-                name_map[tg_key] = nombre_erp
-                legacy_erp_name = (ig.get("id_vendedor_erp") or "").strip()
-                if legacy_erp_name and legacy_erp_name.lower() != nombre_erp.lower():
-                    legacy_key = legacy_erp_name.lower()
-                    legacy_current = name_map.get(legacy_key)
-                    if legacy_current and legacy_current != nombre_erp and not has_binding_override:
-                        continue
-                    name_map[legacy_key] = nombre_erp
-        # Unificación operativa: eventos/motores pueden llegar con "Matias Wutrich"
-        # pero tablero/ranking deben consolidar bajo "Ivan Wutrich".
-        # Se aplica solo cuando Ivan exista en el mapa ERP del tenant.
-        ivan_canon = None
-        for k, v in erp_identity_map.items():
-            if "ivan" in k and "wutrich" in k:
-                ivan_canon = v
-                break
-        if ivan_canon:
-            name_map["matias wutrich"] = ivan_canon
-            name_map["matias wutrich."] = ivan_canon
-        return name_map
-    except Exception as e:
-        logger.warning(f"_get_erp_name_map dist={dist_id} falló: {e}")
-        return {}
+                name_map[legacy_key] = nombre_erp
+    # Unificación operativa: eventos/motores pueden llegar con "Matias Wutrich"
+    # pero tablero/ranking deben consolidar bajo "Ivan Wutrich".
+    # Se aplica solo cuando Ivan exista en el mapa ERP del tenant.
+    ivan_canon = None
+    for k, v in erp_identity_map.items():
+        if "ivan" in k and "wutrich" in k:
+            ivan_canon = v
+            break
+    if ivan_canon:
+        name_map["matias wutrich"] = ivan_canon
+        name_map["matias wutrich."] = ivan_canon
+    return name_map
 
 
 def _enrich_and_store_cc(dist_id: int, fecha_snapshot: str, rows: list) -> int:
@@ -778,43 +794,49 @@ def is_exhibicion_qa_display_for_dist(dist_id: int, display_label: str | None) -
 def build_qa_exhibicion_integrante_ids(dist_id: int) -> frozenset[int]:
     """
     id_integrante cuyas exhibiciones no deben verse en visor / no evaluables salvo superadmin.
+    Cacheado por tenant (core.identity_cache).
     """
+    try:
+        return cached_identity(dist_id, "qa_integrantes", lambda: _build_qa_exhibicion_integrante_ids(dist_id))
+    except Exception as e:
+        logger.warning(f"build_qa_exhibicion_integrante_ids dist={dist_id}: {e}")
+        return frozenset()
+
+
+def _build_qa_exhibicion_integrante_ids(dist_id: int) -> frozenset[int]:
     qa_v = _EXH_QA_VENDEDOR_V2_BY_DIST.get(dist_id, frozenset())
     ids: set[int] = set()
-    try:
-        res = (
-            sb.table("integrantes_grupo")
-            .select("id_integrante,nombre_integrante,id_vendedor_v2,telegram_user_id,estado_mapeo")
-            .eq("id_distribuidor", dist_id)
-            .execute()
-        )
-        for row in res.data or []:
-            iid = row.get("id_integrante")
-            if not iid:
-                continue
+    res = (
+        sb.table("integrantes_grupo")
+        .select("id_integrante,nombre_integrante,id_vendedor_v2,telegram_user_id,estado_mapeo")
+        .eq("id_distribuidor", dist_id)
+        .execute()
+    )
+    for row in res.data or []:
+        iid = row.get("id_integrante")
+        if not iid:
+            continue
+        try:
+            iid_i = int(iid)
+        except (TypeError, ValueError):
+            continue
+        v2 = row.get("id_vendedor_v2")
+        tg_uid = row.get("telegram_user_id")
+        is_qa_vendor_v2 = v2 is not None and v2 in qa_v
+        if is_qa_vendor_v2:
+            ids.add(iid_i)
+            continue
+        # Vendedor ERP activo (v2 fuera de QA): no ocultar por alias "Nacho" ni fusionado.
+        if v2 is not None and v2 not in qa_v:
+            continue
+        if is_exhibicion_qa_integrante_name(row.get("nombre_integrante")):
+            ids.add(iid_i)
+        if tg_uid is not None:
             try:
-                iid_i = int(iid)
+                if int(tg_uid) in _EXH_QA_TELEGRAM_USER_IDS:
+                    ids.add(iid_i)
             except (TypeError, ValueError):
-                continue
-            v2 = row.get("id_vendedor_v2")
-            tg_uid = row.get("telegram_user_id")
-            is_qa_vendor_v2 = v2 is not None and v2 in qa_v
-            if is_qa_vendor_v2:
-                ids.add(iid_i)
-                continue
-            # Vendedor ERP activo (v2 fuera de QA): no ocultar por alias "Nacho" ni fusionado.
-            if v2 is not None and v2 not in qa_v:
-                continue
-            if is_exhibicion_qa_integrante_name(row.get("nombre_integrante")):
-                ids.add(iid_i)
-            if tg_uid is not None:
-                try:
-                    if int(tg_uid) in _EXH_QA_TELEGRAM_USER_IDS:
-                        ids.add(iid_i)
-                except (TypeError, ValueError):
-                    pass
-    except Exception as e:
-        logger.warning(f"build_qa_exhibicion_integrante_ids dist={dist_id}: {e}")
+                pass
     return frozenset(ids)
 
 
@@ -835,110 +857,109 @@ def build_integrante_to_erp_name(dist_id: int) -> dict[int, str]:
     cruzado — se usa el vendedor que corresponde al nombre para evitar mezclas.
     Este check NO aplica a usuarios multi-grupo (supervisores) porque su id_vendedor_v2
     intencional puede diferir de su propio nombre.
+
+    Cacheado por tenant (core.identity_cache); devuelve copia.
     """
     try:
-        t_vendedores = tenant_table_name("vendedores_v2", dist_id)
-        vend_res = (
-            sb.table(t_vendedores)
-            .select("id_vendedor, nombre_erp")
-            .eq("id_distribuidor", dist_id)
-            .execute()
-        )
-        vend_id_to_name: dict[int, str] = {
-            int(v["id_vendedor"]): (v.get("nombre_erp") or "").strip()
-            for v in (vend_res.data or [])
-            if v.get("id_vendedor") is not None and (v.get("nombre_erp") or "").strip()
-        }
-        # Reverse map: nombre_erp normalizado → id_vendedor (para el safety net)
-        erp_name_to_vid: dict[str, int] = {
-            name.lower(): vid for vid, name in vend_id_to_name.items()
-        }
+        return dict(cached_identity(dist_id, "integrante_erp", lambda: _build_integrante_to_erp_name(dist_id)))
+    except Exception as e:
+        logger.warning(f"build_integrante_to_erp_name dist={dist_id}: {e}")
+        return {}
 
-        bindings_rows_b: list = (
-            sb.table("vendedores_telegram_binding")
-            .select("telegram_user_id, id_vendedor_v2, telegram_group_id")
-            .eq("id_distribuidor", dist_id)
-            .execute()
-            .data
-            or []
-        )
 
-        ig_res = (
-            sb.table("integrantes_grupo")
-            .select(
-                "id_integrante, telegram_user_id, telegram_group_id, nombre_integrante, id_vendedor_v2"
-            )
-            .eq("id_distribuidor", dist_id)
-            .execute()
-        )
+def _build_integrante_to_erp_name(dist_id: int) -> dict[int, str]:
+    t_vendedores = tenant_table_name("vendedores_v2", dist_id)
+    vend_res = (
+        sb.table(t_vendedores)
+        .select("id_vendedor, nombre_erp")
+        .eq("id_distribuidor", dist_id)
+        .execute()
+    )
+    vend_id_to_name: dict[int, str] = {
+        int(v["id_vendedor"]): (v.get("nombre_erp") or "").strip()
+        for v in (vend_res.data or [])
+        if v.get("id_vendedor") is not None and (v.get("nombre_erp") or "").strip()
+    }
+    # Reverse map: nombre_erp normalizado → id_vendedor (para el safety net)
+    erp_name_to_vid: dict[str, int] = {
+        name.lower(): vid for vid, name in vend_id_to_name.items()
+    }
 
-        # UIDs que aparecen en más de 1 fila = posibles supervisores/multi-grupo.
-        # Para ellos NO aplicamos el safety net: su id_vendedor_v2 cruzado es intencional.
-        from collections import Counter as _Counter
-        tg_uid_row_count: _Counter[int] = _Counter(
-            int(ig["telegram_user_id"])
-            for ig in (ig_res.data or [])
-            if ig.get("telegram_user_id") is not None
+    bindings_rows_b = get_binding_rows(dist_id)
+
+    ig_res = (
+        sb.table("integrantes_grupo")
+        .select(
+            "id_integrante, telegram_user_id, telegram_group_id, nombre_integrante, id_vendedor_v2"
         )
-        multi_group_uids: set[int] = {uid for uid, cnt in tg_uid_row_count.items() if cnt > 1}
+        .eq("id_distribuidor", dist_id)
+        .execute()
+    )
 
-        result: dict[int, str] = {}
-        for ig in (ig_res.data or []):
-            iid = ig.get("id_integrante")
-            if iid is None:
-                continue
-            iid = int(iid)
-            tg_name = (ig.get("nombre_integrante") or "").strip()
-            tg_uid_raw = ig.get("telegram_user_id")
+    # UIDs que aparecen en más de 1 fila = posibles supervisores/multi-grupo.
+    # Para ellos NO aplicamos el safety net: su id_vendedor_v2 cruzado es intencional.
+    from collections import Counter as _Counter
+    tg_uid_row_count: _Counter[int] = _Counter(
+        int(ig["telegram_user_id"])
+        for ig in (ig_res.data or [])
+        if ig.get("telegram_user_id") is not None
+    )
+    multi_group_uids: set[int] = {uid for uid, cnt in tg_uid_row_count.items() if cnt > 1}
 
-            vid = resolve_vendedor_v2_for_integrante(ig, bindings_rows_b)
+    result: dict[int, str] = {}
+    for ig in (ig_res.data or []):
+        iid = ig.get("id_integrante")
+        if iid is None:
+            continue
+        iid = int(iid)
+        tg_name = (ig.get("nombre_integrante") or "").strip()
+        tg_uid_raw = ig.get("telegram_user_id")
 
-            if vid is not None:
-                # Tabaco: helpers de Ivan Soto conservan nombre Telegram propio
-                if dist_id == 3 and vid == 30:
-                    if tg_name:
-                        result[iid] = tg_name
-                    continue
-                nombre_erp = vend_id_to_name.get(vid)
-                if nombre_erp:
-                    # Safety net: usuarios de 1 solo grupo con nombre completo que
-                    # coincide exactamente con otro vendedor ERP → el id_vendedor_v2
-                    # está cruzado en BD. Usamos el vendedor del nombre.
-                    is_single_group = (
-                        tg_uid_raw is None
-                        or int(tg_uid_raw) not in multi_group_uids
-                    )
-                    if is_single_group and tg_name and _looks_like_full_name(tg_name):
-                        matched_vid = erp_name_to_vid.get(tg_name.lower())
-                        if matched_vid is not None and matched_vid != vid:
-                            corrected = vend_id_to_name.get(matched_vid)
-                            if corrected:
-                                logger.warning(
-                                    f"build_integrante_to_erp_name dist={dist_id}: "
-                                    f"id_integrante={iid} nombre='{tg_name}' → id_vendedor_v2={vid} "
-                                    f"({nombre_erp}) CRUZADO, corrigiendo a {matched_vid} ({corrected})"
-                                )
-                                result[iid] = corrected
-                                continue
-                    result[iid] = nombre_erp
-                    continue
+        vid = resolve_vendedor_v2_for_integrante(ig, bindings_rows_b)
 
-            qa_erp = _qa_test_vendor_erp_name(dist_id, vend_id_to_name)
-            if qa_erp and tg_uid_raw is not None:
-                try:
-                    if int(tg_uid_raw) in _EXH_QA_TELEGRAM_USER_IDS:
-                        result[iid] = qa_erp
-                        continue
-                except (TypeError, ValueError):
-                    pass
+        if vid is not None:
+            # Tabaco: helpers de Ivan Soto conservan nombre Telegram propio
+            if dist_id == 3 and vid == 30:
+                if tg_name:
+                    result[iid] = tg_name
+                continue
+            nombre_erp = vend_id_to_name.get(vid)
+            if nombre_erp:
+                # Safety net: usuarios de 1 solo grupo con nombre completo que
+                # coincide exactamente con otro vendedor ERP → el id_vendedor_v2
+                # está cruzado en BD. Usamos el vendedor del nombre.
+                is_single_group = (
+                    tg_uid_raw is None
+                    or int(tg_uid_raw) not in multi_group_uids
+                )
+                if is_single_group and tg_name and _looks_like_full_name(tg_name):
+                    matched_vid = erp_name_to_vid.get(tg_name.lower())
+                    if matched_vid is not None and matched_vid != vid:
+                        corrected = vend_id_to_name.get(matched_vid)
+                        if corrected:
+                            logger.warning(
+                                f"build_integrante_to_erp_name dist={dist_id}: "
+                                f"id_integrante={iid} nombre='{tg_name}' → id_vendedor_v2={vid} "
+                                f"({nombre_erp}) CRUZADO, corrigiendo a {matched_vid} ({corrected})"
+                            )
+                            result[iid] = corrected
+                            continue
+                result[iid] = nombre_erp
+                continue
+
+        qa_erp = _qa_test_vendor_erp_name(dist_id, vend_id_to_name)
+        if qa_erp and tg_uid_raw is not None:
+            try:
+                if int(tg_uid_raw) in _EXH_QA_TELEGRAM_USER_IDS:
+                    result[iid] = qa_erp
+                    continue
+            except (TypeError, ValueError):
+                pass
 
-            if tg_name:
-                result[iid] = tg_name
+        if tg_name:
+            result[iid] = tg_name
 
-        return result
-    except Exception as e:
-        logger.warning(f"build_integrante_to_erp_name dist={dist_id}: {e}")
-        return {}
+    return result
 
 
 def _erp_codigo_variants(cod: str) -> set[str]:
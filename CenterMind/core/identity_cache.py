@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de identidad por tenant (integrante ↔ vendedor ERP) con versión por id_distribuidor.
+
+Guarda lo que core/helpers reconstruía en cada llamada:
+- "erp_name_map"        → _get_erp_name_map
+- "integrante_erp"      → build_integrante_to_erp_name
+- "qa_integrantes"      → build_qa_exhibicion_integrante_ids
+- "bindings"            → filas de vendedores_telegram_binding (overrides de ambos mapas)
+
+Invalidación explícita (`invalidate_identity`): ingesta de padrón, apply de
+telegram_group_matcher, escrituras de binding / id_vendedor_v2 y alta de integrantes.
+Cada invalidación sube la versión del tenant; las entradas de versión vieja se reconstruyen.
+IDENTITY_CACHE_TTL_SEC es la red de seguridad para escrituras de otros procesos / scripts.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger("ShelfyAPI")
+
+T = TypeVar("T")
+
+IDENTITY_CACHE_TTL_SEC = float(os.environ.get("IDENTITY_CACHE_TTL_SEC", "300"))
+
+
+def _enabled() -> bool:
+    return (os.getenv("IDENTITY_CACHE") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+# (dist_id, kind) → (versión, built_at monotonic, valor)
+_ENTRIES: dict[tuple[int, str], tuple[int, float, Any]] = {}
+_VERSIONS: dict[int, int] = {}
+_BUILD_LOCKS: dict[tuple[int, str], threading.Lock] = {}
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "rebuilds": 0, "invalidations": 0}
+
+
+def identity_version(dist_id: int) -> int:
+    return _VERSIONS.get(int(dist_id), 0)
+
+
+def _fresh(entry: tuple[int, float, Any] | None, version: int) -> bool:
+    return (
+        entry is not None
+        and entry[0] == version
+        and time.monotonic() - entry[1] < IDENTITY_CACHE_TTL_SEC
+    )
+
+
+def cached_identity(dist_id: int, kind: str, builder: Callable[[], T]) -> T:
+    """
+    Valor cacheado de `kind` para el tenant; si falta o quedó viejo lo arma con `builder`.
+    Si `builder` lanza, no se cachea nada y la excepción sube (el caller decide el fallback).
+    Los valores se comparten: los callers no deben mutarlos.
+    """
+    if not _enabled():
+        return builder()
+    dist_id = int(dist_id)
+    key = (dist_id, kind)
+    version = identity_version(dist_id)
+    entry = _ENTRIES.get(key)
+    if _fresh(entry, version):
+        _STATS["hits"] += 1
+        return entry[2]
+    with _LOCK:
+        lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        version = identity_version(dist_id)
+        entry = _ENTRIES.get(key)
+        if _fresh(entry, version):
+            _STATS["hits"] += 1
+            return entry[2]
+        _STATS["misses" if entry is None else "rebuilds"] += 1
+        value = builder()
+        # Si hubo invalidación mientras se armaba, se guarda con la versión leída
+        # antes: la próxima lectura lo verá viejo y lo reconstruye.
+        _ENTRIES[key] = (version, time.monotonic(), value)
+        return value
+
+
+def invalidate_identity(dist_id: int | None = None, reason: str = "") -> None:
+    """Sube la versión del tenant (o de todos) y descarta sus entradas."""
+    with _LOCK:
+        if dist_id is None:
+            targets = set(_VERSIONS) | {d for d, _ in _ENTRIES}
+        else:
+            targets = {int(dist_id)}
+        for d in targets:
+            _VERSIONS[d] = _VERSIONS.get(d, 0) + 1
+        for key in [k for k in _ENTRIES if dist_id is None or k[0] == int(dist_id)]:
+            _ENTRIES.pop(key, None)
+    _STATS["invalidations"] += 1
+    if reason:
+        logger.debug("[identity_cache] invalidado dist=%s (%s)", dist_id, reason)
+
+
+def identity_cache_stats() -> dict[str, Any]:
+    lookups = _STATS["hits"] + _STATS["misses"] + _STATS["rebuilds"]
+    return {
+        **_STATS,
+        "hit_ratio": round(_STATS["hits"] / lookups, 4) if lookups else None,
+        "versions": dict(_VERSIONS),
+        "entries": sorted(f"{d}:{k}" for d, k in _ENTRIES),
+    }
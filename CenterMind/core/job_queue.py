@@ -0,0 +1,669 @@
+# -*- coding: utf-8 -*-
+"""
+Cola durable de jobs post-ingesta (migrations/20260618_background_jobs.sql).
+
+Tras padrón / ventas / evaluaciones el trabajo pesado (watcher de objetivos, fechas de
+compra, invalidación y warm de snapshots; renditions de fotos tras registrar exhibiciones)
+se encola en `background_jobs` en vez de correr en el hilo del request o en un
+threading.Thread suelto:
+
+- jobs tipados (JobType: handler, concurrencia, reintentos, backoff, debounce);
+- coalescing por clave (un pending por tenant y tipo): diez ingestas ⇒ un watcher;
+  los payloads se fusionan con merge_payload (igual que background_jobs_merge en SQL);
+- JobWorker: hilo que reclama por tipo hasta su concurrencia (FOR UPDATE SKIP LOCKED +
+  lease), reintenta con backoff exponencial y deja 'error' al agotar intentos; con la cola
+  vacía el poll crece de JOB_QUEUE_POLL_SEC a JOB_QUEUE_IDLE_MAX_SEC;
+- profundidad por tipo en job_queue_stats() (system-health).
+
+Store: PostgresJobStore (Supabase, default) o SQLiteJobStore (JOB_QUEUE_BACKEND=sqlite,
+tests y desarrollo local). Si no se puede encolar, o con JOB_QUEUE=0, el job corre en el
+hilo actual (comportamiento previo). El worker corre en la API (JOB_QUEUE_WORKER=1) o
+aparte con scripts/run_job_worker.py.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+if TYPE_CHECKING:
+    from core.objetivos_deps import Cambio
+
+logger = logging.getLogger("ShelfyAPI")
+
+TABLE = "background_jobs"
+
+JOB_OBJETIVOS_WATCHER = "objetivos_watcher"
+JOB_FECHAS_COMPRA = "fechas_compra"
+JOB_SNAPSHOTS = "snapshots"
+JOB_FOTO_RENDITIONS = "foto_renditions"
+
+_STATS = {"encolados": 0, "fusionados": 0, "inline": 0, "ok": 0, "reintentos": 0, "errores": 0}
+_stats_lock = threading.Lock()
+
+
+def _inc(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _STATS[key] += n
+
+
+def queue_enabled() -> bool:
+    return (os.getenv("JOB_QUEUE") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def merge_payload(old: dict[str, Any] | None, new: dict[str, Any] | None) -> dict[str, Any]:
+    """Arrays: unión sin duplicados; objetos: mezcla; booleanos: OR; resto: gana el nuevo."""
+    out = dict(old or {})
+    for k, v in (new or {}).items():
+        prev = out.get(k)
+        if isinstance(v, list) and isinstance(prev, list):
+            seen: list[Any] = []
+            for x in prev + v:
+                if x not in seen:
+                    seen.append(x)
+            out[k] = seen
+        elif isinstance(v, dict) and isinstance(prev, dict):
+            out[k] = {**prev, **v}
+        elif isinstance(v, bool) and isinstance(prev, bool):
+            out[k] = prev or v
+        else:
+            out[k] = v
+    return out
+
+
+# ─── Tipos de job ──────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class JobType:
+    tipo: str
+    handler: Callable[[int | None, dict[str, Any]], Any]
+    concurrency: int = 1
+    max_attempts: int = 5
+    backoff_sec: float = 30.0
+    debounce_sec: float = 0.0
+    lease_sec: int = 900
+
+    def retry_delay(self, intentos: int) -> float | None:
+        """Segundos hasta el reintento (None = sin más intentos)."""
+        if intentos >= self.max_attempts:
+            return None
+        return min(self.backoff_sec * (2 ** max(intentos - 1, 0)), 3600.0)
+
+
+_REGISTRY: dict[str, JobType] = {}
+
+
+def register(tipo: str, **opts: Any) -> Callable[[Callable], Callable]:
+    def deco(fn: Callable) -> Callable:
+        _REGISTRY[tipo] = JobType(tipo, fn, **opts)
+        return fn
+
+    return deco
+
+
+def job_types() -> dict[str, JobType]:
+    return dict(_REGISTRY)
+
+
+@dataclass
+class Job:
+    id: int
+    tipo: str
+    dist_id: int | None
+    payload: dict[str, Any] = field(default_factory=dict)
+    intentos: int = 0
+
+
+# ─── Stores ────────────────────────────────────────────────────────────────────
+
+
+class PostgresJobStore:
+    """background_jobs vía RPCs de Supabase."""
+
+    def __init__(self, sb=None) -> None:
+        self._sb_override = sb
+
+    @property
+    def sb(self):
+        if self._sb_override is not None:
+            return self._sb_override
+        from db import sb
+
+        return sb
+
+    def enqueue(self, tipo: str, dist_id: int | None, key: str | None, payload: dict, delay_sec: float, max_attempts: int) -> tuple[int, bool]:
+        res = self.sb.rpc(
+            "background_jobs_enqueue",
+            {
+                "p_tipo": tipo,
+                "p_dist": dist_id,
+                "p_key": key,
+                "p_payload": payload,
+                "p_delay_sec": delay_sec,
+                "p_max_intentos": max_attempts,
+            },
+        ).execute()
+        data = res.data or {}
+        return int(data["id"]), bool(data.get("coalesced"))
+
+    def claim(self, worker: str, tipo: str, limit: int, lease_sec: int) -> list[Job]:
+        res = self.sb.rpc(
+            "background_jobs_claim",
+            {"p_worker": worker, "p_tipo": tipo, "p_limit": limit, "p_lease_sec": lease_sec},
+        ).execute()
+        return [
+            Job(int(r["id"]), r["tipo"], r.get("id_distribuidor"), r.get("payload") or {}, int(r.get("intentos") or 0))
+            for r in res.data or []
+        ]
+
+    def complete(self, job_id: int) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        self.sb.table(TABLE).update(
+            {"estado": "done", "locked_until": None, "finished_at": now, "updated_at": now}
+        ).eq("id", job_id).eq("estado", "running").execute()
+
+    def fail(self, job_id: int, error: str, retry_sec: float | None) -> str:
+        res = self.sb.rpc(
+            "background_jobs_fail", {"p_id": job_id, "p_error": error, "p_retry_sec": retry_sec}
+        ).execute()
+        return str(res.data or "")
+
+    def depth(self) -> dict[str, dict[str, int]]:
+        return self.sb.rpc("background_jobs_depth", {}).execute().data or {}
+
+    def purge(self, older_than_days: float) -> None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+        self.sb.table(TABLE).delete().in_("estado", ["done", "error"]).lt("finished_at", cutoff).execute()
+
+
+class SQLiteJobStore:
+    """Misma semántica que PostgresJobStore sobre SQLite (tests / desarrollo local)."""
+
+    def __init__(self, path: str = ":memory:", *, clock: Callable[[], float] = time.time) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.clock = clock
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS background_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                id_distribuidor INTEGER,
+                coalesce_key TEXT,
+                payload TEXT NOT NULL DEFAULT '{}',
+                estado TEXT NOT NULL DEFAULT 'pending',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                max_intentos INTEGER NOT NULL DEFAULT 5,
+                coalesced INTEGER NOT NULL DEFAULT 0,
+                run_after REAL NOT NULL,
+                locked_by TEXT,
+                locked_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_pending_key
+                ON background_jobs (coalesce_key) WHERE estado = 'pending' AND coalesce_key IS NOT NULL;
+            """
+        )
+
+    def _merge_into_pending(self, key: str, payload: dict) -> int | None:
+        row = self._conn.execute(
+            "SELECT id, payload FROM background_jobs WHERE coalesce_key = ? AND estado = 'pending'", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        merged = merge_payload(json.loads(row[1]), payload)
+        self._conn.execute(
+            "UPDATE background_jobs SET payload = ?, coalesced = coalesced + 1 WHERE id = ?",
+            (json.dumps(merged), row[0]),
+        )
+        return int(row[0])
+
+    def enqueue(self, tipo: str, dist_id: int | None, key: str | None, payload: dict, delay_sec: float, max_attempts: int) -> tuple[int, bool]:
+        now = self.clock()
+        with self._lock:
+            if key is not None:
+                job_id = self._merge_into_pending(key, payload)
+                if job_id is not None:
+                    return job_id, True
+            cur = self._conn.execute(
+                "INSERT INTO background_jobs (tipo, id_distribuidor, coalesce_key, payload, run_after, max_intentos, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tipo, dist_id, key, json.dumps(payload), now + max(delay_sec, 0), max_attempts, now),
+            )
+            return int(cur.lastrowid), False
+
+    def claim(self, worker: str, tipo: str, limit: int, lease_sec: int) -> list[Job]:
+        now = self.clock()
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT j.id, j.id_distribuidor, j.payload, j.intentos FROM background_jobs j
+                WHERE j.tipo = ?
+                  AND ((j.estado = 'pending' AND j.run_after <= ?) OR (j.estado = 'running' AND j.locked_until < ?))
+                  AND (j.coalesce_key IS NULL OR NOT EXISTS (
+                        SELECT 1 FROM background_jobs r
+                        WHERE r.coalesce_key = j.coalesce_key AND r.estado = 'running'
+                          AND r.id <> j.id))
+                ORDER BY j.run_after, j.id LIMIT ?
+                """,
+                (tipo, now, now, limit),
+            ).fetchall()
+            jobs = []
+            for job_id, dist_id, payload, intentos in rows:
+                self._conn.execute(
+                    "UPDATE background_jobs SET estado = 'running', intentos = intentos + 1, locked_by = ?, "
+                    "locked_until = ? WHERE id = ?",
+                    (worker, now + lease_sec, job_id),
+                )
+                jobs.append(Job(int(job_id), tipo, dist_id, json.loads(payload), int(intentos) + 1))
+            return jobs
+
+    def complete(self, job_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_jobs SET estado = 'done', locked_until = NULL, finished_at = ? "
+                "WHERE id = ? AND estado = 'running'",
+                (self.clock(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str, retry_sec: float | None) -> str:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT intentos, max_intentos, coalesce_key, payload FROM background_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if not row:
+                return "missing"
+            intentos, max_intentos, key, payload = row
+            if retry_sec is None or intentos >= max_intentos:
+                self._conn.execute(
+                    "UPDATE background_jobs SET estado = 'error', last_error = ?, locked_until = NULL, "
+                    "finished_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+                return "error"
+            if key is not None:
+                pending = self._merge_into_pending(key, json.loads(payload))
+                if pending is not None:
+                    self._conn.execute(
+                        "UPDATE background_jobs SET estado = 'done', last_error = ?, locked_until = NULL, "
+                        "finished_at = ? WHERE id = ?",
+                        (f"{error} (reintento fusionado en #{pending})", now, job_id),
+                    )
+                    return "merged"
+            self._conn.execute(
+                "UPDATE background_jobs SET estado = 'pending', last_error = ?, locked_by = NULL, "
+                "locked_until = NULL, run_after = ? WHERE id = ?",
+                (error, now + retry_sec, job_id),
+            )
+            return "retry"
+
+    def depth(self) -> dict[str, dict[str, int]]:
+        now = self.clock()
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT tipo,
+                       SUM(estado = 'pending'), SUM(estado = 'running'), SUM(estado = 'error'),
+                       MIN(CASE WHEN estado = 'pending' THEN created_at END)
+                FROM background_jobs
+                WHERE estado IN ('pending', 'running') OR (estado = 'error' AND finished_at > ?)
+                GROUP BY tipo
+                """,
+                (now - 86400,),
+            ).fetchall()
+        return {
+            tipo: {
+                "pending": int(p or 0),
+                "running": int(r or 0),
+                "error_24h": int(e or 0),
+                "oldest_pending_sec": int(now - oldest) if oldest is not None else 0,
+            }
+            for tipo, p, r, e, oldest in rows
+        }
+
+    def purge(self, older_than_days: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM background_jobs WHERE estado IN ('done', 'error') AND finished_at < ?",
+                (self.clock() - older_than_days * 86400,),
+            )
+
+    def rows(self) -> list[dict[str, Any]]:
+        """Todas las filas (tests)."""
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM background_jobs ORDER BY id")
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+_store: PostgresJobStore | SQLiteJobStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PostgresJobStore | SQLiteJobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            if (os.getenv("JOB_QUEUE_BACKEND") or "postgres").strip().lower() == "sqlite":
+                _store = SQLiteJobStore(os.getenv("JOB_QUEUE_SQLITE_PATH") or ":memory:")
+            else:
+                _store = PostgresJobStore()
+        return _store
+
+
+def set_store(store: PostgresJobStore | SQLiteJobStore | None) -> None:
+    global _store
+    with _store_lock:
+        _store = store
+
+
+# ─── Encolar ───────────────────────────────────────────────────────────────────
+
+_wake = threading.Event()
+
+
+def enqueue(
+    tipo: str,
+    dist_id: int | None,
+    payload: dict[str, Any] | None = None,
+    *,
+    key: str | None = None,
+    delay_sec: float | None = None,
+) -> int | None:
+    """
+    Encola (o fusiona con el pending de `key`). Retorna el id del job, o None si corrió inline
+    (JOB_QUEUE=0 o falla del store: se ejecuta en el hilo actual, como antes de la cola).
+    """
+    jt = _REGISTRY[tipo]
+    payload = payload or {}
+    if queue_enabled():
+        delay = jt.debounce_sec if delay_sec is None else delay_sec
+        try:
+            job_id, coalesced = get_store().enqueue(tipo, dist_id, key, payload, delay, jt.max_attempts)
+            _inc("fusionados" if coalesced else "encolados")
+            _wake.set()
+            return job_id
+        except Exception as e:
+            logger.warning("[job_queue] enqueue %s dist=%s falló, corre inline: %s", tipo, dist_id, e)
+    _inc("inline")
+    try:
+        jt.handler(dist_id, payload)
+    except Exception as e:
+        logger.warning("[job_queue] %s dist=%s inline: %s", tipo, dist_id, e)
+    return None
+
+
+def enqueue_objetivos_watcher(
+    dist_id: int,
+    obj_ids: Iterable[str] | None = None,
+    *,
+    cambio: "Cambio | None" = None,
+) -> int | None:
+    """
+    Watcher de objetivos del tenant: obj_ids = sólo esos; cambio (core/objetivos_deps) = los
+    objetivos cuyos insumos tocó; sin ninguno = todos.
+    """
+    ids = sorted({str(o) for o in obj_ids or [] if o})
+    if cambio is not None:
+        payload = cambio.to_payload()
+        if ids:
+            payload["obj_ids"] = sorted(set(payload.get("obj_ids") or []) | set(ids))
+    else:
+        payload = {"obj_ids": ids} if ids else {"global": True}
+    return enqueue(JOB_OBJETIVOS_WATCHER, int(dist_id), payload, key=f"{JOB_OBJETIVOS_WATCHER}:{int(dist_id)}")
+
+
+def enqueue_fechas_compra(
+    dist_id: int,
+    nuevas_por_erp: dict[str, str],
+    *,
+    cambio: "Cambio | None" = None,
+) -> int | None:
+    """
+    Fechas última/anterior compra post-ventas; al terminar encola el watcher (lo lee) con
+    `cambio` (default: los erps de nuevas_por_erp).
+    """
+    payload: dict[str, Any] = {"nuevas": dict(nuevas_por_erp), "watcher": True}
+    if cambio is not None:
+        payload.update(cambio.to_payload())
+    return enqueue(JOB_FECHAS_COMPRA, int(dist_id), payload, key=f"{JOB_FECHAS_COMPRA}:{int(dist_id)}")
+
+
+def enqueue_snapshots(
+    dist_id: int,
+    *,
+    eventos: Iterable[str] = (),
+    warm: Iterable[str] = (),
+) -> int | None:
+    """Invalida por evento (handle_ingestion_event) y/o marca stale + recalcula dominios."""
+    payload = {"eventos": sorted(set(eventos)), "warm": sorted(set(warm))}
+    return enqueue(JOB_SNAPSHOTS, int(dist_id), payload, key=f"{JOB_SNAPSHOTS}:{int(dist_id)}")
+
+
+def enqueue_foto_renditions(dist_id: int, fotos: Iterable[tuple[int | None, str]]) -> int | None:
+    """Thumb / med WebP de fotos recién registradas: [(id_exhibicion, url_foto_drive)]."""
+    payload = {"fotos": [[ex_id, url] for ex_id, url in fotos]}
+    return enqueue(JOB_FOTO_RENDITIONS, int(dist_id), payload, key=f"{JOB_FOTO_RENDITIONS}:{int(dist_id)}")
+
+
+# ─── Handlers ──────────────────────────────────────────────────────────────────
+
+
+@register(JOB_OBJETIVOS_WATCHER, concurrency=2, debounce_sec=20.0, backoff_sec=60.0)
+def _job_objetivos_watcher(dist_id: int, payload: dict[str, Any]) -> None:
+    from core.objetivos_deps import Cambio
+    from services.objetivos_watcher_service import objetivos_watcher
+
+    if payload.get("global") or not (payload.get("obj_ids") or payload.get("fuentes")):
+        objetivos_watcher.run_watcher(dist_id)
+        return
+    if payload.get("fuentes"):
+        objetivos_watcher.run_watcher(dist_id, cambio=Cambio.from_payload(payload))
+        return
+    for obj_id in payload["obj_ids"]:
+        objetivos_watcher.run_watcher(dist_id, obj_id=obj_id)
+
+
+@register(JOB_FECHAS_COMPRA, concurrency=2, debounce_sec=5.0)
+def _job_fechas_compra(dist_id: int, payload: dict[str, Any]) -> None:
+    from core.compras_fechas import batch_update_fechas_compra_desde_ventas
+
+    nuevas = payload.get("nuevas") or {}
+    actualizados = batch_update_fechas_compra_desde_ventas(dist_id, nuevas.keys(), nuevas_por_erp=nuevas)
+    logger.info("[job_queue] fechas compra dist=%s: %s/%s clientes", dist_id, actualizados, len(nuevas))
+    if payload.get("watcher"):
+        from core.objetivos_deps import FUENTE_VENTAS, Cambio
+
+        if payload.get("fuentes"):
+            cambio = Cambio.from_payload(payload)
+        else:
+            cambio = Cambio.de(FUENTE_VENTAS, erps=nuevas.keys(), fechas=nuevas.values())
+        enqueue_objetivos_watcher(dist_id, cambio=cambio)
+
+
+@register(JOB_SNAPSHOTS, concurrency=1, debounce_sec=2.0, max_attempts=3)
+def _job_snapshots(dist_id: int, payload: dict[str, Any]) -> None:
+    from services.snapshot_refresh_service import _warm_dist_sequential, handle_ingestion_event, mark_all_stale
+
+    for evento in payload.get("eventos") or []:
+        handle_ingestion_event(evento, dist_id)
+    warm = list(payload.get("warm") or [])
+    if warm:
+        mark_all_stale(dist_id, warm)
+        # strict: un recompute fallido levanta ⇒ reintento con backoff (no queda 'done')
+        _warm_dist_sequential(dist_id, warm, strict=True)
+
+
+@register(JOB_FOTO_RENDITIONS, concurrency=1, debounce_sec=3.0, max_attempts=3)
+def _job_foto_renditions(dist_id: int, payload: dict[str, Any]) -> None:
+    from core.foto_renditions import procesar
+    from db import sb
+
+    fotos = [(ex_id, url) for ex_id, url in payload.get("fotos") or []]
+    out = procesar(sb, fotos)
+    logger.info("[job_queue] foto_renditions dist=%s: %s", dist_id, out)
+    if out["errores"] and not out["ok"]:
+        raise RuntimeError(f"renditions: {out['errores']} errores")
+
+
+# ─── Worker ────────────────────────────────────────────────────────────────────
+
+
+class JobWorker:
+    """Reclama jobs por tipo hasta su concurrencia y los corre en un pool de hilos."""
+
+    def __init__(self, store=None, *, poll_sec: float | None = None, worker_id: str | None = None) -> None:
+        self._store = store
+        self.poll_sec = poll_sec if poll_sec is not None else float(os.getenv("JOB_QUEUE_POLL_SEC", "3"))
+        # Cola vacía: el poll se duplica hasta este tope (un claim por tipo y vuelta).
+        self.idle_max_sec = max(float(os.getenv("JOB_QUEUE_IDLE_MAX_SEC", "60")), self.poll_sec)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._types = job_types()
+        self._inflight = {t: 0 for t in self._types}
+        self._inflight_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, sum(jt.concurrency for jt in self._types.values())),
+            thread_name_prefix="job-queue",
+        )
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_purge = 0.0
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def tick(self) -> int:
+        """Reclama y despacha lo que quepa. Retorna cuántos jobs arrancó."""
+        started = 0
+        for tipo, jt in self._types.items():
+            with self._inflight_lock:
+                free = jt.concurrency - self._inflight[tipo]
+            if free <= 0:
+                continue
+            try:
+                jobs = self.store.claim(self.worker_id, tipo, free, jt.lease_sec)
+            except Exception as e:
+                logger.warning("[job_queue] claim %s: %s", tipo, e)
+                continue
+            for job in jobs:
+                with self._inflight_lock:
+                    self._inflight[tipo] += 1
+                self._pool.submit(self._run, jt, job)
+                started += 1
+        return started
+
+    def _run(self, jt: JobType, job: Job) -> None:
+        t0 = time.perf_counter()
+        try:
+            jt.handler(job.dist_id, job.payload)
+            self.store.complete(job.id)
+            _inc("ok")
+            logger.info("[job_queue] %s #%s dist=%s ok en %.1fs", jt.tipo, job.id, job.dist_id, time.perf_counter() - t0)
+        except Exception as e:
+            retry = jt.retry_delay(job.intentos)
+            try:
+                outcome = self.store.fail(job.id, str(e)[:500], retry)
+            except Exception as e_fail:
+                outcome = f"fail no registrado ({e_fail})"
+            _inc("errores" if retry is None else "reintentos")
+            logger.warning(
+                "[job_queue] %s #%s dist=%s intento %s/%s: %s → %s",
+                jt.tipo, job.id, job.dist_id, job.intentos, jt.max_attempts, e, outcome,
+            )
+        finally:
+            with self._inflight_lock:
+                self._inflight[jt.tipo] -= 1
+            _wake.set()
+
+    def drain(self, max_rounds: int = 50) -> None:
+        """Corre hasta que no haya jobs listos (tests / scripts)."""
+        for _ in range(max_rounds):
+            if not self.tick() and not any(self._inflight.values()):
+                return
+            while any(self._inflight.values()):
+                time.sleep(0.01)
+
+    def next_wait(self, actual: float, started: int) -> float:
+        """Poll base con actividad (o tras un wake); duplica mientras los claims vuelvan vacíos."""
+        with self._inflight_lock:
+            ocupado = any(self._inflight.values())
+        if started or ocupado or actual <= 0:
+            return self.poll_sec
+        return min(actual * 2, self.idle_max_sec)
+
+    def _loop(self) -> None:
+        retention = float(os.getenv("JOB_QUEUE_RETENTION_DAYS", "7"))
+        espera = 0.0
+        while not self._stop.is_set():
+            started = self.tick()
+            if time.monotonic() - self._last_purge > 3600:
+                self._last_purge = time.monotonic()
+                try:
+                    self.store.purge(retention)
+                except Exception as e:
+                    logger.debug("[job_queue] purge: %s", e)
+            espera = self.next_wait(espera, started)
+            # enqueue / fin de job en este proceso despiertan antes y reinician el backoff
+            if _wake.wait(espera):
+                espera = 0.0
+            _wake.clear()
+
+    def start(self) -> "JobWorker":
+        self._thread = threading.Thread(target=self._loop, name="job-queue-poll", daemon=True)
+        self._thread.start()
+        logger.info(
+            "[job_queue] worker %s activo — %s",
+            self.worker_id,
+            ", ".join(f"{t}×{jt.concurrency}" for t, jt in self._types.items()),
+        )
+        return self
+
+    def stop(self, timeout: float = 30) -> None:
+        self._stop.set()
+        _wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_worker: JobWorker | None = None
+
+
+def start_worker() -> JobWorker | None:
+    """Worker en el proceso de la API (lifespan). JOB_QUEUE_WORKER=0 ⇒ worker aparte."""
+    global _worker
+    if not queue_enabled() or (os.getenv("JOB_QUEUE_WORKER") or "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    if _worker is None:
+        _worker = JobWorker().start()
+    return _worker
+
+
+def stop_worker() -> None:
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+def job_queue_stats() -> dict[str, Any]:
+    with _stats_lock:
+        out: dict[str, Any] = dict(_STATS)
+    try:
+        out["depth"] = get_store().depth() if queue_enabled() else {}
+    except Exception as e:
+        out["depth_error"] = str(e)[:200]
+    return out
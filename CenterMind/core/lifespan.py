@@ -189,6 +189,33 @@ async def lifespan(app: FastAPI):
             id="lanzar_objetivos_0800",
         )
 
+        def _watcher_barrido_diario():
+            # El watcher post-ingesta es incremental (core/objetivos_deps): una corrida completa
+            # por tenant con objetivos abiertos al día cubre expiraciones y dependencias no indexadas.
+            try:
+                from core.job_queue import enqueue_objetivos_watcher
+                from db import fetch_all
+                from db import sb as _sb
+                rows = fetch_all(
+                    lambda: _sb.table("objetivos").select("id, id_distribuidor").eq("cumplido", False),
+                    key="id",
+                )
+                dists = sorted({r["id_distribuidor"] for r in rows if r.get("id_distribuidor")})
+                for d in dists:
+                    enqueue_objetivos_watcher(d)
+                logger.info(f"[Objetivos] Barrido diario del watcher encolado: {len(dists)} tenants")
+            except Exception as e:
+                logger.warning(f"[Objetivos] Barrido diario del watcher omitido: {e}")
+
+        scheduler.add_job(
+            _watcher_barrido_diario,
+            "cron",
+            hour=0,
+            minute=30,
+            timezone=_ZoneInfoL("America/Argentina/Buenos_Aires"),
+            id="watcher_barrido_0030",
+        )
+
         def _binding_watcher_scan():
             try:
                 from services.telegram_binding_watcher_service import scan_all_distributors
@@ -227,6 +254,28 @@ async def lifespan(app: FastAPI):
             misfire_grace_time=300,
         )
 
+        def _exhibicion_rollup_refresh():
+            try:
+                from core.exhibicion_rollup import refresh_dirty_rollups
+                result = refresh_dirty_rollups()
+                if result["dias"]:
+                    logger.info(
+                        "[exhibicion_rollup] días recalculados=%s tenants=%s",
+                        result["dias"],
+                        result["tenants"],
+                    )
+            except Exception as e:
+                logger.warning("[exhibicion_rollup] refresh omitido: %s", e)
+
+        scheduler.add_job(
+            _exhibicion_rollup_refresh,
+            "interval",
+            minutes=int(os.getenv("EXHIBICION_ROLLUP_REFRESH_MIN", "5")),
+            id="exhibicion_rollup_refresh",
+            max_instances=1,
+            coalesce=True,
+        )
+
         def _snapshot_prewarm_morning():
             try:
                 from services.snapshot_refresh_service import prewarm_all_active_distributors
@@ -305,6 +354,10 @@ async def lifespan(app: FastAPI):
     )
 
     scheduler.start()
+
+    from core.job_queue import start_worker, stop_worker
+
+    start_worker()
     if skip_bots:
         logger.info("📅 Scheduler iniciado (modo dev mobile, sin bots)")
     else:
@@ -323,3 +376,10 @@ async def lifespan(app: FastAPI):
     bots.clear()
     scheduler.shutdown()
     logger.info("📅 Scheduler detenido")
+    stop_worker()
+
+    from db import aclose_async_client
+    from services.cc_broadcast import shutdown_pdf_pool
+
+    shutdown_pdf_pool()
+    await aclose_async_client()
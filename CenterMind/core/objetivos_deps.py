@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+core/objetivos_deps.py
+======================
+Índice de dependencias objetivo → insumos que mira el watcher, para re-evaluar sólo
+los objetivos afectados por un cambio (ingesta de padrón / ventas / CC, evaluación).
+
+Cada objetivo depende de:
+  - fuentes: qué ingestas pueden mover su valor (según tipo; ver _FUENTES_POR_TIPO)
+  - alcance: PDVs de objetivo_items / id_target_pdv, o el vendedor (rutas) si no hay PDVs
+  - ventana: [desde, hasta] de fechas que cuenta (filtra cambios de ventas fuera de rango)
+
+Un Cambio trae las fuentes y, si se conocen, los ids tocados (id_cliente, id_cliente_erp,
+vendedores, objetivos). Sin ids ⇒ todos los objetivos de esa fuente. Los vencidos entran
+siempre (el watcher los cierra por expiración).
+"""
+from __future__ import annotations
+
+from calendar import monthrange
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Iterable
+
+FUENTE_PADRON = "padron"
+FUENTE_VENTAS = "ventas"
+FUENTE_EXHIBICIONES = "exhibiciones"
+FUENTE_CC = "cc"
+
+_FUENTES_POR_TIPO: dict[str, frozenset[str]] = {
+    "ruteo_alteo": frozenset({FUENTE_PADRON}),
+    "conversion_estado": frozenset({FUENTE_VENTAS, FUENTE_PADRON}),
+    "exhibicion": frozenset({FUENTE_EXHIBICIONES}),
+    # Compradores usa la FUC del padrón como fallback sin motor de ventas.
+    "compradores": frozenset({FUENTE_VENTAS, FUENTE_PADRON}),
+    "cobranza": frozenset({FUENTE_CC}),
+}
+
+# Columnas de objetivos necesarias para armar el índice (sin select("*")).
+DEPS_COLS = (
+    "id, tipo, id_vendedor, id_target_pdv, origen, created_at, mes_referencia, "
+    "fecha_inicio, fecha_objetivo, lanzado_at, alteo_con_venta"
+)
+
+
+def fuentes_de(obj: dict) -> frozenset[str]:
+    fuentes = _FUENTES_POR_TIPO.get(str(obj.get("tipo") or ""), frozenset())
+    if obj.get("tipo") == "ruteo_alteo" and obj.get("alteo_con_venta"):
+        fuentes = fuentes | {FUENTE_VENTAS}
+    return fuentes
+
+
+def _iso(value: Any) -> str | None:
+    s = str(value or "").strip()[:10]
+    try:
+        return date.fromisoformat(s).isoformat()
+    except ValueError:
+        return None
+
+
+def ventana_de(obj: dict) -> tuple[str | None, str | None]:
+    """
+    Ventana conservadora [desde, hasta] de los hechos que puede contar el objetivo:
+    desde = 1° del mes de la fecha más temprana (created_at / fecha_inicio / mes_referencia),
+    hasta = fecha_objetivo o fin del mes_referencia (None = abierto).
+    """
+    bases = [d for d in (_iso(obj.get(k)) for k in ("created_at", "fecha_inicio", "mes_referencia")) if d]
+    desde = date.fromisoformat(min(bases)).replace(day=1).isoformat() if bases else None
+    hastas = [d for d in (_iso(obj.get("fecha_objetivo")),) if d]
+    mes_ref = _iso(obj.get("mes_referencia"))
+    if mes_ref:
+        m = date.fromisoformat(mes_ref)
+        hastas.append(m.replace(day=monthrange(m.year, m.month)[1]).isoformat())
+    return desde, (max(hastas) if hastas else None)
+
+
+@dataclass(frozen=True)
+class DepsObjetivo:
+    obj_id: str
+    tipo: str
+    fuentes: frozenset[str]
+    pdvs: frozenset[int] | None  # None ⇒ alcance por vendedor
+    vendedor: int | None
+    desde: str | None = None
+    hasta: str | None = None
+    vencido: bool = False
+
+
+def deps_de(obj: dict, item_pdvs: Iterable[int] | None = None, *, hoy: date | None = None) -> DepsObjetivo:
+    hoy = hoy or date.today()
+    pdvs: frozenset[int] | None = None
+    if item_pdvs is not None:
+        pdvs = frozenset(int(p) for p in item_pdvs if p is not None)
+    elif obj.get("id_target_pdv") is not None:
+        pdvs = frozenset({int(obj["id_target_pdv"])})
+    desde, hasta = ventana_de(obj)
+    fecha_obj = _iso(obj.get("fecha_objetivo"))
+    vend = obj.get("id_vendedor")
+    return DepsObjetivo(
+        obj_id=str(obj["id"]),
+        tipo=str(obj.get("tipo") or ""),
+        fuentes=fuentes_de(obj),
+        pdvs=pdvs,
+        vendedor=int(vend) if vend is not None else None,
+        desde=desde,
+        hasta=hasta,
+        vencido=bool(fecha_obj and fecha_obj < hoy.isoformat()),
+    )
+
+
+@dataclass
+class Cambio:
+    """
+    Qué cambió en una ingesta/evaluación. `fuentes_sin_ids`: fuentes cuyo cambio no trae
+    ids (o trae demasiados) ⇒ afectan a todos sus objetivos.
+    """
+
+    fuentes: set[str] = field(default_factory=set)
+    fuentes_sin_ids: set[str] = field(default_factory=set)
+    clientes: set[int] = field(default_factory=set)
+    erps: set[str] = field(default_factory=set)
+    vendedores: set[int] = field(default_factory=set)
+    obj_ids: set[str] = field(default_factory=set)
+    fechas: set[str] = field(default_factory=set)  # fechas de hechos de ventas (min/max acotan)
+
+    @classmethod
+    def de(
+        cls,
+        fuente: str,
+        *,
+        clientes: Iterable[Any] = (),
+        erps: Iterable[Any] = (),
+        vendedores: Iterable[Any] = (),
+        obj_ids: Iterable[Any] = (),
+        fechas: Iterable[Any] = (),
+        sin_ids: bool = False,
+    ) -> "Cambio":
+        c = cls(fuentes={fuente})
+        c.clientes = {int(x) for x in clientes if x is not None and str(x).strip()}
+        c.erps = {str(x).strip() for x in erps if x is not None and str(x).strip()}
+        c.vendedores = {int(x) for x in vendedores if x is not None}
+        c.obj_ids = {str(x) for x in obj_ids if x}
+        c.fechas = {d for d in (_iso(f) for f in fechas) if d}
+        if sin_ids or not (c.clientes or c.erps or c.vendedores or c.obj_ids):
+            c.fuentes_sin_ids.add(fuente)
+        return c
+
+    def to_payload(self) -> dict[str, Any]:
+        """Payload plano (arrays) para background_jobs: el merge une arrays al coalescer."""
+        out: dict[str, Any] = {"fuentes": sorted(self.fuentes)}
+        for k in ("fuentes_sin_ids", "clientes", "erps", "vendedores", "obj_ids"):
+            vals = getattr(self, k)
+            if vals:
+                out[k] = sorted(vals, key=str)
+        if self.fechas:
+            out["fechas_ventas"] = [min(self.fechas), max(self.fechas)]
+        return out
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "Cambio":
+        return cls(
+            fuentes=set(payload.get("fuentes") or []),
+            fuentes_sin_ids=set(payload.get("fuentes_sin_ids") or []),
+            clientes={int(x) for x in payload.get("clientes") or []},
+            erps={str(x) for x in payload.get("erps") or []},
+            vendedores={int(x) for x in payload.get("vendedores") or []},
+            obj_ids={str(x) for x in payload.get("obj_ids") or []},
+            fechas=set(payload.get("fechas_ventas") or []),
+        )
+
+    def n_ids(self) -> int:
+        return len(self.clientes) + len(self.erps) + len(self.vendedores)
+
+
+class DepIndex:
+    """Objetivos indexados por fuente, PDV y vendedor."""
+
+    def __init__(self, deps: Iterable[DepsObjetivo]) -> None:
+        self.deps: dict[str, DepsObjetivo] = {}
+        self._por_fuente: dict[str, set[str]] = {}
+        self._por_pdv: dict[int, set[str]] = {}
+        self._por_vendedor: dict[int, set[str]] = {}
+        for d in deps:
+            self.deps[d.obj_id] = d
+            for f in d.fuentes:
+                self._por_fuente.setdefault(f, set()).add(d.obj_id)
+            if d.pdvs is not None:
+                for p in d.pdvs:
+                    self._por_pdv.setdefault(p, set()).add(d.obj_id)
+            elif d.vendedor is not None:
+                self._por_vendedor.setdefault(d.vendedor, set()).add(d.obj_id)
+
+    def __len__(self) -> int:
+        return len(self.deps)
+
+    def _en_ventana(self, oid: str, cambio: Cambio) -> bool:
+        d = self.deps[oid]
+        if not cambio.fechas or FUENTE_VENTAS in cambio.fuentes_sin_ids or d.fuentes & cambio.fuentes != {FUENTE_VENTAS}:
+            return True
+        if d.desde and max(cambio.fechas) < d.desde:
+            return False
+        if d.hasta and min(cambio.fechas) > d.hasta:
+            return False
+        return True
+
+    def afectados(self, cambio: Cambio) -> set[str]:
+        """
+        Objetivos a re-evaluar. `cambio.clientes` y `cambio.vendedores` deben venir ya resueltos
+        (los erps se traducen a id_cliente + vendedor antes de llamar).
+        """
+        out = {oid for oid, d in self.deps.items() if d.vencido}
+        out |= cambio.obj_ids & self.deps.keys()
+        por_ids: set[str] = set()
+        for p in cambio.clientes:
+            por_ids |= self._por_pdv.get(p, set())
+        for v in cambio.vendedores:
+            por_ids |= self._por_vendedor.get(v, set())
+        for f in cambio.fuentes:
+            candidatos = self._por_fuente.get(f, set())
+            if f in cambio.fuentes_sin_ids:
+                out |= {oid for oid in candidatos if self._en_ventana(oid, cambio)}
+            else:
+                out |= {oid for oid in candidatos & por_ids if self._en_ventana(oid, cambio)}
+        return out
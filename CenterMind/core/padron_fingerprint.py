@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Huellas de contenido del padrón (id_cliente_erp → hash del payload normalizado).
+
+La ingesta compara la huella de cada PDV del archivo con la persistida en
+`padron_fingerprints` y sólo envía a clientes_pdv_v2_d{N} los nuevos o cambiados.
+
+- Se excluyen campos que cambian en cada corrida aunque el archivo sea idéntico
+  (`updated_at`, `fecha_inactivacion`). `estado`/`motivo_inactivo` sí entran: dependen
+  de la fecha de corrida (sin_compra_30d) y un cambio ahí debe reenviarse.
+- Huella ausente o vencida (TTL) ⇒ se reenvía: cubre ediciones hechas por fuera del padrón.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+FINGERPRINT_EXCLUDE = frozenset({"updated_at", "fecha_inactivacion"})
+
+
+def payload_fingerprint(payload: dict[str, Any], exclude: frozenset[str] = FINGERPRINT_EXCLUDE) -> str:
+    """Hash estable (orden de claves irrelevante) del payload (PDV por defecto)."""
+    body = {k: v for k, v in payload.items() if k not in exclude}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def diff_by_fingerprint(
+    records: list[dict[str, Any]],
+    previous: dict[str, str] | None,
+) -> tuple[list[dict[str, Any]], dict[str, str], int]:
+    """
+    Separa los payloads a enviar de los que no cambiaron.
+
+    Retorna (pendientes, huellas nuevas {erp: hash} de los pendientes, sin_cambios).
+    `previous=None` (huellas no disponibles) ⇒ todo pendiente.
+    """
+    pending: list[dict[str, Any]] = []
+    fresh: dict[str, str] = {}
+    unchanged = 0
+    for p in records:
+        erp = str(p.get("id_cliente_erp") or "").strip()
+        fp = payload_fingerprint(p)
+        if previous is not None and erp and previous.get(erp) == fp:
+            unchanged += 1
+            continue
+        pending.append(p)
+        if erp:
+            fresh[erp] = fp
+    return pending, fresh, unchanged
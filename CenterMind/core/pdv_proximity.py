@@ -11,6 +11,9 @@ import math
 import logging
 from typing import Any
 
+import numpy as np
+
+from core.pdv_spatial_index import get_pdv_index
 from core.tenant_tables import tenant_table_name
 
 logger = logging.getLogger("ShelfyAPI")
@@ -36,27 +39,11 @@ def haversine_metros(lat1: float, lon1: float, lat2: float, lon2: float) -> floa
 
 def _fetch_rutas_para_vendedor(sb, t_rutas: str, id_vendedor: int) -> list[int]:
     """Retorna lista de id_ruta asignados al vendedor."""
+    from db import paginate
+
     # rutas_v2_dN no tiene id_distribuidor, filtrar solo por id_vendedor
-    PAGE = 1000
-    rutas: list[int] = []
-    offset = 0
-    while True:
-        batch = (
-            sb.table(t_rutas)
-            .select("id_ruta")
-            .eq("id_vendedor", id_vendedor)
-            .range(offset, offset + PAGE - 1)
-            .execute()
-            .data
-            or []
-        )
-        for r in batch:
-            if r.get("id_ruta") is not None:
-                rutas.append(int(r["id_ruta"]))
-        if len(batch) < PAGE:
-            break
-        offset += PAGE
-    return rutas
+    rows = paginate(lambda: sb.table(t_rutas).select("id_ruta").eq("id_vendedor", id_vendedor))
+    return [int(r["id_ruta"]) for r in rows if r.get("id_ruta") is not None]
 
 
 def _pdv_display_name(pdv: dict[str, Any]) -> str:
@@ -70,16 +57,15 @@ def _pdv_display_name(pdv: dict[str, Any]) -> str:
 def _fetch_clientes_pdv(sb, t_clientes: str, id_rutas: list[int]) -> list[dict[str, Any]]:
     """
     Retorna clientes_pdv con coordenadas para las rutas dadas.
-    Paginado en 1000 filas (regla CLAUDE.md §3).
+    Paginado en 1000 filas (regla CLAUDE.md §3) vía db.fetch_all.
     """
     if not id_rutas:
         return []
 
-    PAGE = 1000
-    clientes: list[dict[str, Any]] = []
-    offset = 0
-    while True:
-        batch = (
+    from db import fetch_all
+
+    return fetch_all(
+        lambda: (
             sb.table(t_clientes)
             .select(
                 "id_cliente_erp, nombre_fantasia, nombre_razon_social, latitud, longitud, id_ruta"
@@ -87,16 +73,48 @@ def _fetch_clientes_pdv(sb, t_clientes: str, id_rutas: list[int]) -> list[dict[s
             .in_("id_ruta", id_rutas)
             .not_.is_("latitud", "null")
             .not_.is_("longitud", "null")
-            .range(offset, offset + PAGE - 1)
-            .execute()
-            .data
-            or []
         )
-        clientes.extend(batch)
-        if len(batch) < PAGE:
-            break
-        offset += PAGE
-    return clientes
+    )
+
+
+def _candidatos_en_radio(
+    sb,
+    dist_id: int,
+    t_clientes: str,
+    id_rutas: list[int],
+    lat: float,
+    lng: float,
+    radio_m: float,
+) -> list[tuple[dict[str, Any], float, float, float]]:
+    """(pdv, lat, lng, distancia_m) dentro del radio; índice espacial con fallback a escaneo."""
+    try:
+        idx = get_pdv_index(sb, dist_id)
+    except Exception as e:
+        logger.warning(f"pdvs_cercanos: índice espacial no disponible dist={dist_id}: {e}")
+    else:
+        pos, dist = idx.within_radius(lat, lng, radio_m)
+        de_cartera = np.isin(idx.id_ruta[pos], np.asarray(id_rutas, dtype=np.int64))
+        pos, dist = pos[de_cartera], dist[de_cartera]
+        return [
+            (idx.rows[p], float(idx.lat[p]), float(idx.lng[p]), float(d))
+            for p, d in zip(pos.tolist(), dist.tolist())
+        ]
+
+    out: list[tuple[dict[str, Any], float, float, float]] = []
+    for c in _fetch_clientes_pdv(sb, t_clientes, id_rutas):
+        plat = c.get("latitud")
+        plng = c.get("longitud")
+        if plat is None or plng is None:
+            continue
+        try:
+            plat_f = float(plat)
+            plng_f = float(plng)
+        except (TypeError, ValueError):
+            continue
+        dist = haversine_metros(lat, lng, plat_f, plng_f)
+        if dist <= radio_m:
+            out.append((c, plat_f, plng_f, dist))
+    return out
 
 
 def pdvs_cercanos_cartera(
@@ -124,35 +142,19 @@ def pdvs_cercanos_cartera(
         logger.debug(f"pdvs_cercanos: sin rutas para vendor={id_vendedor} dist={dist_id}")
         return []
 
-    # Paso 2: clientes con coords de esas rutas
-    clientes = _fetch_clientes_pdv(sb, t_clientes, id_rutas)
-    if not clientes:
-        return []
-
-    # Paso 3: filtrar por radio y calcular distancia
+    # Paso 2+3: índice espacial del tenant (bbox + haversine vectorizado) acotado a las rutas
     cercanos: list[dict[str, Any]] = []
-    for c in clientes:
-        plat = c.get("latitud")
-        plng = c.get("longitud")
-        if plat is None or plng is None:
-            continue
-        try:
-            plat_f = float(plat)
-            plng_f = float(plng)
-        except (TypeError, ValueError):
-            continue
-        dist = haversine_metros(lat, lng, plat_f, plng_f)
-        if dist <= radio_m:
-            cercanos.append(
-                {
-                    "id_cliente_erp": c.get("id_cliente_erp"),
-                    "nombre_display": _pdv_display_name(c),
-                    "distancia_m": round(dist, 1),
-                    "latitud": plat_f,
-                    "longitud": plng_f,
-                    "id_ruta": c.get("id_ruta"),
-                }
-            )
+    for c, plat_f, plng_f, dist in _candidatos_en_radio(sb, dist_id, t_clientes, id_rutas, lat, lng, radio_m):
+        cercanos.append(
+            {
+                "id_cliente_erp": c.get("id_cliente_erp"),
+                "nombre_display": _pdv_display_name(c),
+                "distancia_m": round(dist, 1),
+                "latitud": plat_f,
+                "longitud": plng_f,
+                "id_ruta": c.get("id_ruta"),
+            }
+        )
 
     # Ordenar por distancia
     cercanos.sort(key=lambda x: x["distancia_m"])
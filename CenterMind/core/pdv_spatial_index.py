@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Índice espacial en memoria de PDVs por tenant (grilla lat/lng sobre arrays NumPy).
+
+Se arma una vez desde clientes_pdv_v2_d{N} (PDVs con coordenadas) y responde:
+- radio (haversine vectorizado) → `pdv_proximity.pdvs_cercanos_cartera`
+- polígono (ray casting vectorizado) → `mapa_capas_service.resolve_pdv_ids_in_polygon`
+
+Ambas consultas prefiltran por bbox con la grilla (celdas de GRID_CELL_DEG grados,
+claves ordenadas + searchsorted) y sólo evalúan la geometría sobre los candidatos.
+
+Invalidación: la ingesta de padrón llama `invalidate_pdv_index(dist_id)`; además cada
+índice vence a los PDV_INDEX_TTL_SEC (red de seguridad para ediciones fuera del padrón).
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from core.tenant_tables import tenant_table_name
+
+logger = logging.getLogger("ShelfyAPI")
+
+EARTH_RADIUS_M = 6_371_000
+GRID_CELL_DEG = float(os.environ.get("PDV_INDEX_CELL_DEG", "0.01"))  # ~1.1 km
+PDV_INDEX_TTL_SEC = float(os.environ.get("PDV_INDEX_TTL_SEC", "600"))
+
+_KEY_SPAN = 1 << 24  # columnas de grilla por fila (lng/cell cabe holgado)
+_KEY_OFFSET = 1 << 22
+
+INDEX_COLUMNS = (
+    "id_cliente, id_cliente_erp, nombre_fantasia, nombre_razon_social, "
+    "latitud, longitud, id_ruta, id_vendedor"
+)
+
+
+def _to_float(v: Any) -> float:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return math.nan
+    return f
+
+
+def _to_int(v: Any) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return -1
+
+
+def haversine_m_vec(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Haversine (misma fórmula que pdv_proximity.haversine_metros) contra arrays."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = np.radians(lats - lat)
+    dlambda = np.radians(lngs - lng)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def points_in_ring(lngs: np.ndarray, lats: np.ndarray, ring: list[list[float]]) -> np.ndarray:
+    """Ray casting vectorizado (mismo criterio que mapa_capas_service._point_in_polygon)."""
+    inside = np.zeros(len(lngs), dtype=bool)
+    n = len(ring)
+    j = n - 1
+    for i in range(n):
+        xi, yi = float(ring[i][0]), float(ring[i][1])
+        xj, yj = float(ring[j][0]), float(ring[j][1])
+        cross = (yi > lats) != (yj > lats)
+        if cross.any():
+            x_at = (xj - xi) * (lats - yi) / (yj - yi + 1e-15) + xi
+            inside ^= cross & (lngs < x_at)
+        j = i
+    return inside
+
+
+@dataclass(slots=True)
+class PdvGridIndex:
+    """PDVs con coordenadas válidas; posiciones alineadas entre arrays y `rows`."""
+
+    rows: list[dict[str, Any]]
+    lat: np.ndarray
+    lng: np.ndarray
+    id_ruta: np.ndarray
+    id_vendedor: np.ndarray
+    cell_deg: float = GRID_CELL_DEG
+    built_at: float = field(default_factory=time.monotonic)
+    _keys: np.ndarray = field(init=False, repr=False)
+    _order: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        keys = self._cell_key(self._cell(self.lat), self._cell(self.lng))
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]], cell_deg: float = GRID_CELL_DEG) -> "PdvGridIndex":
+        lat = np.array([_to_float(r.get("latitud")) for r in rows], dtype=float)
+        lng = np.array([_to_float(r.get("longitud")) for r in rows], dtype=float)
+        ok = np.isfinite(lat) & np.isfinite(lng)
+        keep = [r for r, k in zip(rows, ok) if k]
+        return cls(
+            rows=keep,
+            lat=lat[ok],
+            lng=lng[ok],
+            id_ruta=np.array([_to_int(r.get("id_ruta")) for r in keep], dtype=np.int64),
+            id_vendedor=np.array([_to_int(r.get("id_vendedor")) for r in keep], dtype=np.int64),
+            cell_deg=cell_deg,
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cell(self, deg: np.ndarray | float) -> np.ndarray:
+        return np.floor(np.asarray(deg, dtype=float) / self.cell_deg).astype(np.int64)
+
+    @staticmethod
+    def _cell_key(ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        return (ix + _KEY_OFFSET) * _KEY_SPAN + (iy + _KEY_OFFSET)
+
+    def bbox_candidates(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> np.ndarray:
+        """Posiciones (ascendentes) de PDVs en celdas que tocan el bbox; luego se filtra exacto."""
+        if not len(self.rows):
+            return np.empty(0, dtype=np.int64)
+        ix0, ix1 = int(self._cell(lat_min)), int(self._cell(lat_max))
+        iy0, iy1 = int(self._cell(lng_min)), int(self._cell(lng_max))
+        rows_ix = np.arange(ix0, ix1 + 1, dtype=np.int64)
+        lo = np.searchsorted(self._keys, self._cell_key(rows_ix, np.int64(iy0)), side="left")
+        hi = np.searchsorted(self._keys, self._cell_key(rows_ix, np.int64(iy1)), side="right")
+        parts = [self._order[a:b] for a, b in zip(lo, hi) if b > a]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        pos = np.sort(np.concatenate(parts))
+        inside = (
+            (self.lat[pos] >= lat_min) & (self.lat[pos] <= lat_max)
+            & (self.lng[pos] >= lng_min) & (self.lng[pos] <= lng_max)
+        )
+        return pos[inside]
+
+    def within_radius(
+        self, lat: float, lng: float, radio_m: float, *, mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(posiciones, distancias_m) a ≤ radio_m, en orden de posición."""
+        dlat = math.degrees(radio_m / EARTH_RADIUS_M) * 1.01
+        coslat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(dlat / coslat, 180.0)
+        pos = self.bbox_candidates(lat - dlat, lat + dlat, lng - dlng, lng + dlng)
+        if mask is not None and len(pos):
+            pos = pos[mask[pos]]
+        if not len(pos):
+            return pos, np.empty(0, dtype=float)
+        dist = haversine_m_vec(lat, lng, self.lat[pos], self.lng[pos])
+        hit = dist <= radio_m
+        return pos[hit], dist[hit]
+
+    def within_polygon(self, ring: list[list[float]], *, mask: np.ndarray | None = None) -> np.ndarray:
+        """Posiciones dentro del ring GeoJSON [lng, lat]."""
+        xs = [float(p[0]) for p in ring]
+        ys = [float(p[1]) for p in ring]
+        pos = self.bbox_candidates(min(ys), max(ys), min(xs), max(xs))
+        if mask is not None and len(pos):
+            pos = pos[mask[pos]]
+        if not len(pos):
+            return pos
+        return pos[points_in_ring(self.lng[pos], self.lat[pos], ring)]
+
+
+# ─── Cache por tenant ─────────────────────────────────────────────────────────
+
+_INDEX: dict[int, PdvGridIndex] = {}
+_BUILD_LOCKS: dict[int, threading.Lock] = {}
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "builds": 0, "invalidations": 0}
+
+
+def _fetch_index_rows(sb, dist_id: int) -> list[dict[str, Any]]:
+    from db import fetch_all
+
+    t_clientes = tenant_table_name("clientes_pdv_v2", dist_id)
+    return fetch_all(
+        lambda: (
+            sb.table(t_clientes)
+            .select(INDEX_COLUMNS)
+            .eq("id_distribuidor", dist_id)
+            .not_.is_("latitud", "null")
+            .not_.is_("longitud", "null")
+        ),
+        key="id_cliente",
+    )
+
+
+def get_pdv_index(sb, dist_id: int) -> PdvGridIndex:
+    """Índice del tenant (lo arma si no existe o venció). Un solo build concurrente por tenant."""
+    dist_id = int(dist_id)
+    idx = _INDEX.get(dist_id)
+    if idx is not None and time.monotonic() - idx.built_at < PDV_INDEX_TTL_SEC:
+        _STATS["hits"] += 1
+        return idx
+    with _LOCK:
+        lock = _BUILD_LOCKS.setdefault(dist_id, threading.Lock())
+    with lock:
+        idx = _INDEX.get(dist_id)
+        if idx is not None and time.monotonic() - idx.built_at < PDV_INDEX_TTL_SEC:
+            _STATS["hits"] += 1
+            return idx
+        t0 = time.perf_counter()
+        idx = PdvGridIndex.from_rows(_fetch_index_rows(sb, dist_id))
+        _INDEX[dist_id] = idx
+        _STATS["builds"] += 1
+        logger.info(
+            "[pdv_index] dist=%s armado: %s PDVs en %.0fms", dist_id, len(idx), (time.perf_counter() - t0) * 1000
+        )
+        return idx
+
+
+def invalidate_pdv_index(dist_id: int | None = None) -> None:
+    """Descarta el índice de un tenant (o todos). Llamar tras ingesta de padrón."""
+    if dist_id is None:
+        _INDEX.clear()
+    else:
+        _INDEX.pop(int(dist_id), None)
+    _STATS["invalidations"] += 1
+
+
+def pdv_index_stats() -> dict[str, Any]:
+    return {**_STATS, "tenants": {d: len(i) for d, i in _INDEX.items()}}
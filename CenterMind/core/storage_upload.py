@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Subida concurrente de fotos a Supabase Storage (app móvil y bot).
+
+Antes cada foto se subía en serie con el cliente sync (`sb.storage`) y reintentos con
+`time.sleep`: una exhibición de N fotos tardaba la suma de las N subidas y el endpoint
+async bloqueaba el event loop. Acá:
+
+  - `aupload` sube una foto con el AsyncStorageClient del loop (db.async_storage, pool
+    keep-alive) y backoff con `asyncio.sleep`;
+  - `aupload_many` sube un lote con paralelismo acotado (STORAGE_UPLOAD_CONCURRENCY) y
+    devuelve URLs / excepciones en el orden de entrada: el lote tarda lo que la foto más lenta;
+  - `storage_upload_stats` expone contadores e histograma de latencia por subida
+    (admin/system-health → caches.storage_upload).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Iterable
+
+logger = logging.getLogger("ShelfyAPI")
+
+# Cotas superiores (ms) del histograma; la última cubeta es "inf".
+_LATENCIA_BUCKETS_MS = (250, 500, 1000, 2000, 5000)
+
+_STATS = {"uploads": 0, "ok": 0, "errores": 0, "reintentos": 0, "bytes": 0}
+_HIST = {f"le_{b}": 0 for b in _LATENCIA_BUCKETS_MS} | {"inf": 0}
+_stats_lock = threading.Lock()
+
+
+def upload_concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4")))
+    except ValueError:
+        return 4
+
+
+def _registrar(ok: bool, ms: float, n_bytes: int, reintentos: int) -> None:
+    cubeta = next((f"le_{b}" for b in _LATENCIA_BUCKETS_MS if ms <= b), "inf")
+    with _stats_lock:
+        _STATS["uploads"] += 1
+        _STATS["ok" if ok else "errores"] += 1
+        _STATS["reintentos"] += reintentos
+        if ok:
+            _STATS["bytes"] += n_bytes
+            _HIST[cubeta] += 1
+
+
+async def aupload(
+    bucket: str,
+    path: str,
+    data: bytes,
+    *,
+    content_type: str = "image/jpeg",
+    intentos: int = 3,
+    backoff: float = 2.0,
+) -> str:
+    """Sube `data` a bucket/path (upsert) y retorna la URL pública; re-lanza el último error."""
+    from db import async_storage, sb
+
+    t0 = time.perf_counter()
+    for intento in range(1, intentos + 1):
+        try:
+            await async_storage().from_(bucket).upload(
+                path=path,
+                file=data,
+                file_options={"content-type": content_type, "upsert": "true"},
+            )
+            _registrar(True, (time.perf_counter() - t0) * 1000, len(data), intento - 1)
+            # get_public_url del cliente sync solo arma el string (sin red).
+            return sb.storage.from_(bucket).get_public_url(path)
+        except Exception as e:
+            logger.warning(f"[storage_upload] intento {intento}/{intentos} {path}: {e}")
+            if intento == intentos:
+                _registrar(False, (time.perf_counter() - t0) * 1000, len(data), intento - 1)
+                raise
+            await asyncio.sleep(intento * backoff)
+    raise RuntimeError("intentos debe ser >= 1")
+
+
+async def aupload_many(
+    bucket: str,
+    items: Iterable[tuple[str, bytes, str]],
+    *,
+    concurrency: int | None = None,
+    intentos: int = 3,
+    backoff: float = 2.0,
+) -> list[str | BaseException]:
+    """
+    Sube [(path, data, content_type)] con a lo sumo `concurrency` subidas en vuelo.
+    Retorna, en el orden de `items`, la URL pública o la excepción de cada una.
+    """
+    sem = asyncio.Semaphore(concurrency or upload_concurrency())
+
+    async def _una(path: str, data: bytes, content_type: str) -> str:
+        async with sem:
+            return await aupload(
+                bucket, path, data, content_type=content_type, intentos=intentos, backoff=backoff
+            )
+
+    return await asyncio.gather(*(_una(*it) for it in items), return_exceptions=True)
+
+
+def storage_upload_stats() -> dict:
+    with _stats_lock:
+        return {**_STATS, "latencia_ms": dict(_HIST), "concurrency": upload_concurrency()}
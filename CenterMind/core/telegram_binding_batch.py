@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Scoring Telegram-grupo ↔ Vendedor ERP para todos los grupos de un tenant.
+
+score_group_vendor_candidates / detect_group_drift consultan grupo, vendedores, historial,
+integrantes y uploader por cada chat. Para el barrido diario (binding watcher) se cargan
+una vez por tenant (cargar_snapshot_tenant, pocas consultas paginadas) y se puntúa en
+memoria con las mismas reglas (_score_candidates / _drift_de_grupo).
+
+IndiceVendedores evita comparar cada grupo contra todo el padrón de vendedores: un nombre
+sólo puntúa si un token (≥3 letras) de un lado es substring del otro, así que alcanza con
+los vendedores que comparten el trigrama inicial de ese token. El resultado es idéntico al
+scoring completo (superconjunto exacto + mismo orden).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+
+from db import sb
+from core.telegram_group_matcher import (
+    _DOMINANT_WINDOW,
+    _drift_de_grupo,
+    _fetch_dominant_uploader,
+    _fetch_vendedores,
+    _group_name_tokens,
+    _normalize,
+    _score_candidates,
+    _uploader_dominante,
+)
+
+logger = logging.getLogger("ShelfyAPI")
+
+_PAGE = 1000
+# Chats por consulta de exhibiciones (.in_ va en la URL)
+_UPLOADER_CHUNK = 100
+# Tope de páginas por chunk; chats sin ventana completa caen a la consulta individual
+_UPLOADER_MAX_PAGES = 5
+
+_GRUPO_COLS = (
+    "telegram_chat_id,nombre_grupo,nombre_grupo_prev,"
+    "id_vendedor_erp,id_vendedor_v2,binding_status,"
+    "bound_at,bound_by,dominant_uploader_uid,id_distribuidor"
+)
+
+
+def _trigramas(texto: str) -> set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceVendedores:
+    """Vendedores activos indexados por id ERP, trigrama inicial de token y trigramas del nombre."""
+
+    def __init__(self, activos: list[dict]) -> None:
+        self.activos = activos
+        self._por_id: dict[int, int] = {}
+        self._por_erp: dict[str, list[int]] = {}
+        self._por_inicio: dict[str, set[int]] = {}
+        self._por_trigrama: dict[str, set[int]] = {}
+        for pos, v in enumerate(activos):
+            self._por_id[int(v["id_vendedor"])] = pos
+            erp = str(v.get("id_vendedor_erp") or "").strip()
+            if erp:
+                self._por_erp.setdefault(erp, []).append(pos)
+            vn = _normalize(str(v.get("nombre_erp") or ""))
+            for t in vn.split():
+                if len(t) > 2:
+                    self._por_inicio.setdefault(t[:3], set()).add(pos)
+            for tri in _trigramas(vn):
+                self._por_trigrama.setdefault(tri, set()).add(pos)
+
+    def __len__(self) -> int:
+        return len(self.activos)
+
+    def candidatos(self, grupo: dict, extra_ids=()) -> list[dict]:
+        """Vendedores que pueden puntuar > 0 contra el grupo, en el orden original."""
+        pos: set[int] = set()
+        nombre = grupo.get("nombre_grupo") or ""
+        gn = _normalize(nombre)
+        if gn:
+            # token del vendedor ⊂ título  ⇒  su trigrama inicial es trigrama del título
+            for tri in _trigramas(gn):
+                pos |= self._por_inicio.get(tri, set())
+            # token del título ⊂ nombre del vendedor
+            for t in _group_name_tokens(nombre):
+                pos |= self._por_trigrama.get(t[:3], set())
+        erp = (grupo.get("id_vendedor_erp") or "").strip()
+        if erp:
+            pos.update(self._por_erp.get(erp, ()))
+        for vid in extra_ids:
+            p = self._por_id.get(int(vid))
+            if p is not None:
+                pos.add(p)
+        return [self.activos[p] for p in sorted(pos)]
+
+
+@dataclass
+class SnapshotTenant:
+    """Todo lo que el scanner necesita de un tenant, cargado una vez."""
+
+    dist_id: int
+    grupos: list[dict]
+    vendedores: list[dict]
+    historial: dict[int, set[int]] = field(default_factory=dict)
+    integrantes: dict[int, dict[int, int]] = field(default_factory=dict)
+    uploaders: dict[int, int | None] = field(default_factory=dict)
+    uploader_fallbacks: int = 0
+    indice: IndiceVendedores = field(init=False)
+    _activo: dict[int, object] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.indice = IndiceVendedores([v for v in self.vendedores if v.get("activo", True)])
+        self._activo = {int(v["id_vendedor"]): v.get("activo") for v in self.vendedores if v.get("id_vendedor") is not None}
+
+    def candidatos(self, grupo: dict) -> list[dict]:
+        """Equivale a score_group_vendor_candidates(dist_id, chat) sin consultas."""
+        chat = int(grupo["telegram_chat_id"])
+        hist = self.historial.get(chat, set())
+        return _score_candidates(
+            grupo,
+            self.indice.candidatos(grupo, hist),
+            hist,
+            self.integrantes.get(chat, {}),
+        )
+
+    def drift(self, grupo: dict) -> dict | None:
+        """Equivale a detect_group_drift(dist_id, chat) sobre la fila ya cargada."""
+        chat = int(grupo["telegram_chat_id"])
+        return _drift_de_grupo(
+            grupo,
+            lambda: self._uploader(chat),
+            lambda vid: self._activo.get(int(vid)),
+        )
+
+    def _uploader(self, chat: int) -> int | None:
+        if chat in self.uploaders:
+            return self.uploaders[chat]
+        self.uploader_fallbacks += 1
+        return _fetch_dominant_uploader(self.dist_id, chat)
+
+
+def _fetch_paginado(tabla: str, cols: str, dist_id: int, orden: str) -> list[dict]:
+    """`orden`: columnas (coma) que fijan un orden total; sin él, range() puede saltear/repetir filas."""
+    rows: list[dict] = []
+    offset = 0
+    try:
+        while True:
+            q = sb.table(tabla).select(cols).eq("id_distribuidor", dist_id)
+            for col in orden.split(","):
+                q = q.order(col)
+            batch = q.range(offset, offset + _PAGE - 1).execute().data or []
+            rows.extend(batch)
+            if len(batch) < _PAGE:
+                break
+            offset += _PAGE
+    except Exception as exc:
+        logger.warning("_fetch_paginado %s dist=%s err=%s", tabla, dist_id, exc)
+    return rows
+
+
+def _fetch_historial(dist_id: int) -> dict[int, set[int]]:
+    out: dict[int, set[int]] = {}
+    # Sin PK conocida: ordenar por todo lo leído (los empates son filas idénticas).
+    cols = "telegram_group_id,id_vendedor_v2"
+    for r in _fetch_paginado("vendedores_telegram_binding", cols, dist_id, cols):
+        if r.get("telegram_group_id") is not None and r.get("id_vendedor_v2"):
+            out.setdefault(int(r["telegram_group_id"]), set()).add(int(r["id_vendedor_v2"]))
+    return out
+
+
+def _fetch_integrantes(dist_id: int) -> dict[int, dict[int, int]]:
+    out: dict[int, dict[int, int]] = {}
+    for r in _fetch_paginado("integrantes_grupo", "telegram_group_id,id_vendedor_v2", dist_id, "id_integrante"):
+        if r.get("telegram_group_id") is None or r.get("id_vendedor_v2") is None:
+            continue
+        counts = out.setdefault(int(r["telegram_group_id"]), {})
+        vid = int(r["id_vendedor_v2"])
+        counts[vid] = counts.get(vid, 0) + 1
+    return out
+
+
+def _fetch_uploaders(dist_id: int, chat_ids: list[int]) -> dict[int, int | None]:
+    """
+    Uploader dominante (últimas _DOMINANT_WINDOW exhibiciones) de varios chats por consulta.
+    Con el orden global desc, las filas de cada chat llegan en su propio orden desc: alcanza
+    con quedarse con las primeras N de cada uno. Los chats sin ventana completa al tope de
+    páginas no entran al dict (el snapshot los consulta de a uno).
+    """
+    out: dict[int, int | None] = {}
+    for i in range(0, len(chat_ids), _UPLOADER_CHUNK):
+        chunk = chat_ids[i:i + _UPLOADER_CHUNK]
+        vistos: dict[int, list[int]] = {c: [] for c in chunk}
+        agotado = False
+        try:
+            for pagina in range(_UPLOADER_MAX_PAGES):
+                batch = (
+                    sb.table("exhibiciones")
+                    .select("telegram_chat_id,telegram_user_id")
+                    .eq("id_distribuidor", dist_id)
+                    .in_("telegram_chat_id", chunk)
+                    .not_.is_("telegram_user_id", "null")
+                    .order("timestamp_subida", desc=True)
+                    .order("id_exhibicion", desc=True)
+                    .range(pagina * _PAGE, (pagina + 1) * _PAGE - 1)
+                    .execute()
+                    .data or []
+                )
+                for r in batch:
+                    uids = vistos.get(int(r["telegram_chat_id"]))
+                    if uids is not None and len(uids) < _DOMINANT_WINDOW:
+                        uids.append(r.get("telegram_user_id"))
+                if len(batch) < _PAGE:
+                    agotado = True
+                    break
+                if all(len(u) >= _DOMINANT_WINDOW for u in vistos.values()):
+                    break
+        except Exception as exc:
+            logger.warning("_fetch_uploaders dist=%s err=%s", dist_id, exc)
+            continue
+        for chat, uids in vistos.items():
+            if agotado or len(uids) >= _DOMINANT_WINDOW:
+                out[chat] = _uploader_dominante(uids)
+    return out
+
+
+def cargar_snapshot_tenant(dist_id: int) -> SnapshotTenant:
+    """
+    Grupos, vendedores, historial de bindings, integrantes y uploaders dominantes del tenant.
+    Consultas: una paginada por tabla + una por cada _UPLOADER_CHUNK grupos vinculados.
+    """
+    grupos = _fetch_paginado("grupos", _GRUPO_COLS, dist_id, "telegram_chat_id")
+    con_uploader = [
+        int(g["telegram_chat_id"]) for g in grupos
+        if g.get("telegram_chat_id") is not None
+        and g.get("binding_status") in ("linked", "review")
+        and g.get("dominant_uploader_uid") is not None
+    ]
+    return SnapshotTenant(
+        dist_id=dist_id,
+        grupos=grupos,
+        vendedores=_fetch_vendedores(dist_id),
+        historial=_fetch_historial(dist_id),
+        integrantes=_fetch_integrantes(dist_id),
+        uploaders=_fetch_uploaders(dist_id, con_uploader),
+    )
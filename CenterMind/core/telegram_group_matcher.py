@@ -14,12 +14,17 @@ import logging
 import re
 import unicodedata
 from datetime import datetime, timezone
+from typing import Callable
 
 from db import sb
+from core.identity_cache import invalidate_identity
 from core.tenant_tables import tenant_table_name
 
 logger = logging.getLogger("ShelfyAPI")
 
+# Exhibiciones recientes del grupo que definen el uploader dominante
+_DOMINANT_WINDOW = 30
+
 # ── helpers de normalización ──────────────────────────────────────────────────
 
 def _normalize(text: str) -> str:
@@ -88,6 +93,53 @@ def _group_name_vendor_score(vendor_name: str, group_name: str) -> tuple[float,
     return round(raw * 0.95, 4), reasons
 
 
+def _levenshtein(a: str, b: str) -> int:
+    """
+    Distancia de edición con el algoritmo bit-paralelo de Myers/Hyyrö: una columna de la
+    matriz por carácter de `a` en operaciones sobre un int de len(b) bits.
+    """
+    if a == b:
+        return 0
+    # Prefijo/sufijo común no cambian la distancia.
+    i = 0
+    n = min(len(a), len(b))
+    while i < n and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    j = 0
+    n = min(len(a), len(b))
+    while j < n and a[-1 - j] == b[-1 - j]:
+        j += 1
+    if j:
+        a, b = a[:-j], b[:-j]
+    if not a or not b:
+        return len(a) + len(b)
+    if len(b) > len(a):
+        a, b = b, a
+    m = len(b)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    peq: dict[str, int] = {}
+    for k, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << k)
+    pv, mv, score = full, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
 def _levenshtein_norm(a: str, b: str) -> float:
     """Distancia de Levenshtein normalizada entre 0 (igual) y 1 (completamente distintos)."""
     if not a and not b:
@@ -97,13 +149,7 @@ def _levenshtein_norm(a: str, b: str) -> float:
         return 1.0
     if lb == 0:
         return 1.0
-    prev = list(range(lb + 1))
-    for i, ca in enumerate(a, 1):
-        curr = [i]
-        for j, cb in enumerate(b, 1):
-            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + (ca != cb)))
-        prev = curr
-    return prev[lb] / max(la, lb)
+    return _levenshtein(a, b) / max(la, lb)
 
 
 # ── consultas DB auxiliares ───────────────────────────────────────────────────
@@ -141,6 +187,7 @@ def _fetch_vendedores(dist_id: int) -> list[dict]:
                 sb.table(t)
                 .select("id_vendedor,id_vendedor_erp,nombre_erp,id_sucursal,activo")
                 .eq("id_distribuidor", dist_id)
+                .order("id_vendedor")
                 .range(offset, offset + PAGE - 1)
                 .execute()
                 .data or []
@@ -185,23 +232,24 @@ def _fetch_dominant_uploader(dist_id: int, telegram_chat_id: int) -> int | None:
             .eq("telegram_chat_id", telegram_chat_id)
             .not_.is_("telegram_user_id", "null")
             .order("timestamp_subida", desc=True)
-            .limit(30)
+            .limit(_DOMINANT_WINDOW)
             .execute()
         )
-        rows = res.data or []
-        if not rows:
-            return None
-        counts: dict[int, int] = {}
-        for r in rows:
-            uid = r.get("telegram_user_id")
-            if uid:
-                counts[int(uid)] = counts.get(int(uid), 0) + 1
-        return max(counts, key=counts.__getitem__)
+        return _uploader_dominante(r.get("telegram_user_id") for r in res.data or [])
     except Exception as exc:
         logger.warning("_dominant_uploader dist=%s chat=%s err=%s", dist_id, telegram_chat_id, exc)
         return None
 
 
+def _uploader_dominante(uids) -> int | None:
+    """UID más frecuente (empate: el más reciente, uids ordenados desc por fecha)."""
+    counts: dict[int, int] = {}
+    for uid in uids:
+        if uid:
+            counts[int(uid)] = counts.get(int(uid), 0) + 1
+    return max(counts, key=counts.__getitem__) if counts else None
+
+
 # ── API pública ───────────────────────────────────────────────────────────────
 
 def score_group_vendor_candidates(
@@ -215,6 +263,10 @@ def score_group_vendor_candidates(
     2. Cobertura de nombre ERP en nombre_grupo          → [0.0, 0.95]
     3. Historial en vendedores_telegram_binding         → +0.05 (bonus)
     4. Multi-candidato con score>0.5: ambos capados a 0.49
+    5. Integrantes del grupo ya mapeados al vendedor    → piso 0.22–0.40 o +0.08
+
+    Para todos los grupos de un tenant, ver core/telegram_binding_batch (mismo scoring,
+    datos cargados una vez).
     """
     try:
         grupo = _fetch_grupo(dist_id, telegram_chat_id)
@@ -226,95 +278,108 @@ def score_group_vendor_candidates(
         if not activos:
             return []
 
-        binding_hist = _fetch_binding_history(dist_id, telegram_chat_id)
-        grupo_nombre = grupo.get("nombre_grupo") or ""
-        grupo_erp_id = (grupo.get("id_vendedor_erp") or "").strip()
+        return _score_candidates(
+            grupo,
+            activos,
+            _fetch_binding_history(dist_id, telegram_chat_id),
+            _integrante_vendor_counts(dist_id, telegram_chat_id),
+        )
+    except Exception as exc:
+        logger.warning(
+            "score_group_vendor_candidates dist=%s chat=%s err=%s",
+            dist_id, telegram_chat_id, exc,
+        )
+        return []
 
-        candidates: list[dict] = []
 
-        for v in activos:
-            score = 0.0
-            reasons: list[str] = []
+def _score_candidates(
+    grupo: dict,
+    activos: list[dict],
+    binding_hist: set[int],
+    integrante_counts: dict[int, int],
+) -> list[dict]:
+    """Scoring puro (sin DB) de `activos` contra `grupo`; ver score_group_vendor_candidates."""
+    grupo_nombre = grupo.get("nombre_grupo") or ""
+    grupo_erp_id = (grupo.get("id_vendedor_erp") or "").strip()
 
-            v_erp_id = str(v.get("id_vendedor_erp") or "").strip()
-            v_nombre = str(v.get("nombre_erp") or "")
-            v_id = int(v["id_vendedor"])
+    candidates: list[dict] = []
 
-            # Señal 1: coincidencia exacta de id_vendedor_erp
-            if grupo_erp_id and v_erp_id and grupo_erp_id == v_erp_id:
-                score = 1.0
-                reasons.append("erp_id_exact_match")
-            else:
-                # Señal 2: nombre ERP ↔ título del grupo (bidireccional)
-                if grupo_nombre and v_nombre:
-                    cov = _name_coverage(v_nombre, grupo_nombre)
-                    legacy_score = round(cov * 0.95, 4) if cov > 0 else 0.0
-                    gn_score, gn_reasons = _group_name_vendor_score(v_nombre, grupo_nombre)
-                    name_score = max(legacy_score, gn_score)
-                    if name_score > score:
-                        score = name_score
-                        if gn_score >= legacy_score:
-                            reasons.extend(gn_reasons)
-                        elif cov > 0:
-                            reasons.append(f"name_coverage:{cov:.2f}")
-
-            # Señal 3: historial de binding (bonus)
-            if v_id in binding_hist:
-                score = min(1.0, score + 0.05)
-                reasons.append("binding_history")
-
-            if score > 0:
-                candidates.append({
-                    "id_vendedor": v_id,
-                    "nombre_erp": v_nombre,
-                    "score": round(score, 4),
-                    "reasons": reasons,
-                })
+    for v in activos:
+        score = 0.0
+        reasons: list[str] = []
 
-        # Señal 4: multi-candidato ambiguo — capear salvo ganador claro por título
-        candidates.sort(key=lambda x: x["score"], reverse=True)
-        above_half = [c for c in candidates if c["score"] > 0.5]
-        clear_title_winner = False
-        if len(candidates) >= 2:
-            top, second = candidates[0], candidates[1]
-            title_reasons = {
-                "erp_id_exact_match",
-                "group_title_token_match",
-            }
-            top_from_title = any(r in title_reasons for r in top.get("reasons", [])) or any(
-                r.startswith("group_name_match:") for r in top.get("reasons", [])
-            )
-            clear_title_winner = top_from_title and (
-                top["score"] >= 0.85 or top["score"] - second["score"] >= 0.12
-            )
-        if len(above_half) >= 2 and not clear_title_winner:
-            for c in candidates:
-                if c["score"] > 0.5:
-                    c["score"] = 0.49
-                    if "multi_candidate_capped" not in c["reasons"]:
-                        c["reasons"].append("multi_candidate_capped")
-
-        # Señal 5: integrantes del grupo ya mapeados a este vendedor
-        integrante_counts = _integrante_vendor_counts(dist_id, telegram_chat_id)
-        for c in candidates:
-            cnt = integrante_counts.get(c["id_vendedor"], 0)
-            if cnt > 0:
-                bonus = min(0.40, 0.22 + 0.06 * (cnt - 1))
-                if c["score"] < bonus:
-                    c["score"] = round(bonus, 4)
-                    c["reasons"].append(f"integrantes_grupo:{cnt}")
-                else:
-                    c["score"] = round(min(1.0, c["score"] + 0.08), 4)
-                    c["reasons"].append(f"integrantes_grupo_bonus:{cnt}")
+        v_erp_id = str(v.get("id_vendedor_erp") or "").strip()
+        v_nombre = str(v.get("nombre_erp") or "")
+        v_id = int(v["id_vendedor"])
 
-        candidates.sort(key=lambda x: x["score"], reverse=True)
-        return candidates
-    except Exception as exc:
-        logger.warning(
-            "score_group_vendor_candidates dist=%s chat=%s err=%s",
-            dist_id, telegram_chat_id, exc,
+        # Señal 1: coincidencia exacta de id_vendedor_erp
+        if grupo_erp_id and v_erp_id and grupo_erp_id == v_erp_id:
+            score = 1.0
+            reasons.append("erp_id_exact_match")
+        else:
+            # Señal 2: nombre ERP ↔ título del grupo (bidireccional)
+            if grupo_nombre and v_nombre:
+                cov = _name_coverage(v_nombre, grupo_nombre)
+                legacy_score = round(cov * 0.95, 4) if cov > 0 else 0.0
+                gn_score, gn_reasons = _group_name_vendor_score(v_nombre, grupo_nombre)
+                name_score = max(legacy_score, gn_score)
+                if name_score > score:
+                    score = name_score
+                    if gn_score >= legacy_score:
+                        reasons.extend(gn_reasons)
+                    elif cov > 0:
+                        reasons.append(f"name_coverage:{cov:.2f}")
+
+        # Señal 3: historial de binding (bonus)
+        if v_id in binding_hist:
+            score = min(1.0, score + 0.05)
+            reasons.append("binding_history")
+
+        if score > 0:
+            candidates.append({
+                "id_vendedor": v_id,
+                "nombre_erp": v_nombre,
+                "score": round(score, 4),
+                "reasons": reasons,
+            })
+
+    # Señal 4: multi-candidato ambiguo — capear salvo ganador claro por título
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    above_half = [c for c in candidates if c["score"] > 0.5]
+    clear_title_winner = False
+    if len(candidates) >= 2:
+        top, second = candidates[0], candidates[1]
+        title_reasons = {
+            "erp_id_exact_match",
+            "group_title_token_match",
+        }
+        top_from_title = any(r in title_reasons for r in top.get("reasons", [])) or any(
+            r.startswith("group_name_match:") for r in top.get("reasons", [])
         )
-        return []
+        clear_title_winner = top_from_title and (
+            top["score"] >= 0.85 or top["score"] - second["score"] >= 0.12
+        )
+    if len(above_half) >= 2 and not clear_title_winner:
+        for c in candidates:
+            if c["score"] > 0.5:
+                c["score"] = 0.49
+                if "multi_candidate_capped" not in c["reasons"]:
+                    c["reasons"].append("multi_candidate_capped")
+
+    # Señal 5: integrantes del grupo ya mapeados a este vendedor
+    for c in candidates:
+        cnt = integrante_counts.get(c["id_vendedor"], 0)
+        if cnt > 0:
+            bonus = min(0.40, 0.22 + 0.06 * (cnt - 1))
+            if c["score"] < bonus:
+                c["score"] = round(bonus, 4)
+                c["reasons"].append(f"integrantes_grupo:{cnt}")
+            else:
+                c["score"] = round(min(1.0, c["score"] + 0.08), 4)
+                c["reasons"].append(f"integrantes_grupo_bonus:{cnt}")
+
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    return candidates
 
 
 def _fetch_integrantes_grupo(dist_id: int, telegram_chat_id: int) -> list[dict]:
@@ -331,6 +396,7 @@ def _fetch_integrantes_grupo(dist_id: int, telegram_chat_id: int) -> list[dict]:
                 )
                 .eq("id_distribuidor", dist_id)
                 .eq("telegram_group_id", telegram_chat_id)
+                .order("id_integrante")
                 .range(offset, offset + PAGE - 1)
                 .execute()
                 .data or []
@@ -752,63 +818,80 @@ def detect_group_drift(dist_id: int, telegram_chat_id: int) -> dict | None:
         grupo = _fetch_grupo(dist_id, telegram_chat_id)
         if grupo is None:
             return None
+        return _drift_de_grupo(
+            grupo,
+            lambda: _fetch_dominant_uploader(dist_id, telegram_chat_id),
+            lambda vid: _fetch_vendor_activo(dist_id, vid),
+        )
+    except Exception as exc:
+        logger.warning(
+            "detect_group_drift dist=%s chat=%s err=%s", dist_id, telegram_chat_id, exc
+        )
+        return None
 
-        current_name = _normalize(grupo.get("nombre_grupo") or "")
-        prev_name = _normalize(grupo.get("nombre_grupo_prev") or "")
-
-        # Drift por título (solo si había nombre previo)
-        if prev_name and current_name:
-            dist = _levenshtein_norm(current_name, prev_name)
-            if dist > 0.40:
-                return {
-                    "drift_type": "title_changed",
-                    "details": f"nombre_grupo cambió {dist:.0%} respecto al previo",
-                }
-
-        # Drift por uploader dominante
-        stored_uid = grupo.get("dominant_uploader_uid")
-        if stored_uid is not None:
-            current_uid = _fetch_dominant_uploader(dist_id, telegram_chat_id)
-            if current_uid is not None and int(current_uid) != int(stored_uid):
-                return {
-                    "drift_type": "uploader_changed",
-                    "details": (
-                        f"uploader dominante cambió de {stored_uid} a {current_uid}"
-                    ),
-                }
 
-        # Drift por vendedor inactivo
-        id_vendedor_v2 = grupo.get("id_vendedor_v2")
-        if id_vendedor_v2 is not None:
-            t = tenant_table_name("vendedores_v2", dist_id)
-            try:
-                res = (
-                    sb.table(t)
-                    .select("activo")
-                    .eq("id_distribuidor", dist_id)
-                    .eq("id_vendedor", id_vendedor_v2)
-                    .limit(1)
-                    .execute()
-                )
-                rows = res.data or []
-                if rows and rows[0].get("activo") is False:
-                    return {
-                        "drift_type": "vendor_inactive",
-                        "details": f"vendedor {id_vendedor_v2} tiene activo=false",
-                    }
-            except Exception as exc:
-                logger.warning(
-                    "detect_group_drift vendor_check dist=%s err=%s", dist_id, exc
-                )
-
-        return None
+def _fetch_vendor_activo(dist_id: int, id_vendedor_v2: int) -> bool | None:
+    """activo del vendedor; None si no existe o falló la consulta."""
+    t = tenant_table_name("vendedores_v2", dist_id)
+    try:
+        res = (
+            sb.table(t)
+            .select("activo")
+            .eq("id_distribuidor", dist_id)
+            .eq("id_vendedor", id_vendedor_v2)
+            .limit(1)
+            .execute()
+        )
+        rows = res.data or []
+        return rows[0].get("activo") if rows else None
     except Exception as exc:
         logger.warning(
-            "detect_group_drift dist=%s chat=%s err=%s", dist_id, telegram_chat_id, exc
+            "detect_group_drift vendor_check dist=%s err=%s", dist_id, exc
         )
         return None
 
 
+def _drift_de_grupo(
+    grupo: dict,
+    dominant_uploader: Callable[[], int | None],
+    vendor_activo: Callable[[int], bool | None],
+) -> dict | None:
+    """Reglas de detect_group_drift sobre una fila de grupos; las consultas las pone el caller."""
+    current_name = _normalize(grupo.get("nombre_grupo") or "")
+    prev_name = _normalize(grupo.get("nombre_grupo_prev") or "")
+
+    # Drift por título (solo si había nombre previo)
+    if prev_name and current_name:
+        dist = _levenshtein_norm(current_name, prev_name)
+        if dist > 0.40:
+            return {
+                "drift_type": "title_changed",
+                "details": f"nombre_grupo cambió {dist:.0%} respecto al previo",
+            }
+
+    # Drift por uploader dominante
+    stored_uid = grupo.get("dominant_uploader_uid")
+    if stored_uid is not None:
+        current_uid = dominant_uploader()
+        if current_uid is not None and int(current_uid) != int(stored_uid):
+            return {
+                "drift_type": "uploader_changed",
+                "details": (
+                    f"uploader dominante cambió de {stored_uid} a {current_uid}"
+                ),
+            }
+
+    # Drift por vendedor inactivo
+    id_vendedor_v2 = grupo.get("id_vendedor_v2")
+    if id_vendedor_v2 is not None and vendor_activo(id_vendedor_v2) is False:
+        return {
+            "drift_type": "vendor_inactive",
+            "details": f"vendedor {id_vendedor_v2} tiene activo=false",
+        }
+
+    return None
+
+
 def apply_group_binding(
     dist_id: int,
     telegram_chat_id: int,
@@ -865,6 +948,7 @@ def apply_group_binding(
                 .select("id_integrante")
                 .eq("id_distribuidor", dist_id)
                 .eq("telegram_group_id", telegram_chat_id)
+                .order("id_integrante")
                 .range(offset, offset + PAGE - 1)
                 .execute()
                 .data or []
@@ -967,6 +1051,9 @@ def apply_group_binding(
             dist_id, telegram_chat_id, id_vendedor_v2, exc,
         )
         raise
+    finally:
+        # integrantes_grupo / binding pudieron cambiar (aun con error a mitad de camino)
+        invalidate_identity(dist_id, "apply_group_binding")
 
 
 def unlink_group(
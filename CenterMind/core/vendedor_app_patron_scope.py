@@ -64,24 +64,23 @@ def _pick_best_integrante_rows(rows: list[dict]) -> list[dict]:
     return sorted(by_key.values(), key=lambda r: order.get(_cuenta_key_from_nombre(r.get("nombre_integrante") or ""), 99))
 
 
-def list_patron_cuentas(sb, dist_id: int, leader_vid: int) -> list[dict[str, Any]]:
-    """
-    Cuentas operativas bajo un patrón (líder ERP).
-    Hoy: Tabaco dist=3, Ivan Soto id_vendedor=30 → Monchi + Jorge Coronel.
-    """
-    if dist_id != TABACO_DIST_ID or int(leader_vid) != IVAN_SOTO_V2_ID:
-        return []
+def _is_patron_leader(dist_id: int, leader_vid: int) -> bool:
+    return dist_id == TABACO_DIST_ID and int(leader_vid) == IVAN_SOTO_V2_ID
 
-    ig_res = (
+
+def _patron_integrantes_query(sb, dist_id: int):
+    return (
         sb.table("integrantes_grupo")
         .select("id_integrante,nombre_integrante,telegram_user_id,id_vendedor_v2")
         .eq("id_distribuidor", dist_id)
         .eq("id_vendedor_v2", IVAN_SOTO_V2_ID)
-        .execute()
     )
+
+
+def _cuentas_from_integrantes(ig_rows: list[dict]) -> list[dict[str, Any]]:
     rows = [
         r
-        for r in (ig_res.data or [])
+        for r in (ig_rows or [])
         if _cuenta_key_from_nombre(r.get("nombre_integrante") or "") in ("monchi", "jorge_coronel", "ivan_soto")
     ]
     picked = _pick_best_integrante_rows(rows)
@@ -103,17 +102,27 @@ def list_patron_cuentas(sb, dist_id: int, leader_vid: int) -> list[dict[str, Any
     return cuentas
 
 
-def resolve_patron_scope(
-    sb,
-    dist_id: int,
-    leader_vid: int,
-    cuenta_id: str | None,
-) -> dict[str, Any]:
+def list_patron_cuentas(sb, dist_id: int, leader_vid: int) -> list[dict[str, Any]]:
     """
-    Resuelve scope efectivo para endpoints móviles.
-    Si no hay cuentas de patrón, integrante_ids=None (comportamiento vendedor único).
+    Cuentas operativas bajo un patrón (líder ERP).
+    Hoy: Tabaco dist=3, Ivan Soto id_vendedor=30 → Monchi + Jorge Coronel.
     """
-    cuentas = list_patron_cuentas(sb, dist_id, leader_vid)
+    if not _is_patron_leader(dist_id, leader_vid):
+        return []
+    return _cuentas_from_integrantes(_patron_integrantes_query(sb, dist_id).execute().data or [])
+
+
+async def alist_patron_cuentas(asb, dist_id: int, leader_vid: int) -> list[dict[str, Any]]:
+    """list_patron_cuentas sobre el cliente async (`db.asb`)."""
+    if not _is_patron_leader(dist_id, leader_vid):
+        return []
+    from db import aexecute
+
+    res = await aexecute(_patron_integrantes_query(asb, dist_id))
+    return _cuentas_from_integrantes(res.data or [])
+
+
+def _scope_from_cuentas(cuentas: list[dict[str, Any]], cuenta_id: str | None) -> dict[str, Any]:
     if not cuentas:
         return {
             "patron_mode": False,
@@ -153,6 +162,29 @@ def resolve_patron_scope(
     }
 
 
+def resolve_patron_scope(
+    sb,
+    dist_id: int,
+    leader_vid: int,
+    cuenta_id: str | None,
+) -> dict[str, Any]:
+    """
+    Resuelve scope efectivo para endpoints móviles.
+    Si no hay cuentas de patrón, integrante_ids=None (comportamiento vendedor único).
+    """
+    return _scope_from_cuentas(list_patron_cuentas(sb, dist_id, leader_vid), cuenta_id)
+
+
+async def aresolve_patron_scope(
+    asb,
+    dist_id: int,
+    leader_vid: int,
+    cuenta_id: str | None,
+) -> dict[str, Any]:
+    """resolve_patron_scope para dependencias async (no bloquea el loop)."""
+    return _scope_from_cuentas(await alist_patron_cuentas(asb, dist_id, leader_vid), cuenta_id)
+
+
 def resolve_patron_cartera_filter(
     sb,
     dist_id: int,
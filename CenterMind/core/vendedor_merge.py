@@ -10,6 +10,7 @@ import logging
 from typing import Any
 
 from db import sb
+from core.identity_cache import invalidate_identity
 from core.tenant_tables import tenant_table_name
 
 logger = logging.getLogger("ShelfyAPI")
@@ -169,5 +170,6 @@ def merge_vendedor_v2(
     sb.table(vend_table).delete().eq("id_vendedor", drop_id).execute()
     sb.table("vendedores_v2").delete().eq("id_vendedor", drop_id).execute()
     plan["deleted"] = drop_id
+    invalidate_identity(dist_id, "merge_vendedor")
     logger.info("[merge_vendedor] dist=%s keep=%s drop=%s erp=%s", dist_id, keep_id, drop_id, erp_target)
     return plan
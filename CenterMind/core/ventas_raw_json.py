@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Formato compacto de ``raw_json`` en ventas_enriched_v2 / ventas_enriched_v2_d{N}.
+
+Antes cada fila guardaba la fila parseada completa (≈ el doble del ancho útil: la mitad
+ya está en columnas). Formato v2:
+
+  {"_v": 2, "_src": <id archivo>, "_row": <nro fila>,
+   <campos NO promovidos a columna y no vacíos>, <campos calientes siempre>}
+
+- Campos calientes (``HOT_FIELDS``) quedan siempre en claro: los leen
+  ventas_empresa_isolation (id_empresa / nombre_empresa, también filtros PostgREST
+  ``raw_json->>id_empresa``) y estadisticas_service._bultos_linea_desglose (bultos_*).
+- VENTAS_RAW_JSON_ZSTD=1 comprime el resto en ``_z`` (base64 de zstd). Requiere
+  ``zstandard``; sin el paquete se guarda en claro.
+- ``expand_raw_json`` reconstruye la fila parseada (columnas + raw_json) para scripts.
+- Filas legacy (sin ``_v``) se devuelven tal cual; el backfill está en
+  migrations/20260617_ventas_raw_json_compact.sql.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+from dataclasses import fields
+from typing import Any
+
+logger = logging.getLogger("ShelfyAPI")
+
+RAW_JSON_VERSION = 2
+
+# Columnas de ventas_enriched_v2 que ya tienen el valor de la fila parseada.
+PROMOTED_FIELDS = frozenset({
+    "fecha_factura", "fecha_pedido", "anulado", "tipo_documento", "serie", "numero_documento",
+    "id_cliente_erp", "nombre_cliente", "codigo_vendedor", "nombre_vendedor", "ruta",
+    "cod_articulo", "descripcion_articulo", "agrupacion_art_1", "agrupacion_art_2",
+    "canal", "subcanal", "subcanal_mkt",
+    "bultos_total", "unidades_total", "importe_final", "importe_neto", "importe_bruto",
+})
+
+# Leídos vía raw_json por la app: nunca se omiten ni se comprimen (0 ≠ ausente en bultos_excel).
+HOT_FIELDS = frozenset({"id_empresa", "nombre_empresa", "bultos_excel", "bultos_con_cargo", "bultos_sin_cargo"})
+
+_META = ("_v", "_src", "_row", "_z")
+
+_zstd_warned = False
+
+
+def _zstd_enabled() -> bool:
+    return (os.getenv("VENTAS_RAW_JSON_ZSTD") or "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _zstd():
+    global _zstd_warned
+    try:
+        import zstandard
+    except ImportError:
+        if not _zstd_warned:
+            logger.warning("[ventas_raw_json] VENTAS_RAW_JSON_ZSTD=1 sin paquete zstandard; raw_json en claro")
+            _zstd_warned = True
+        return None
+    return zstandard
+
+
+def _is_empty(v: Any) -> bool:
+    return v is None or v == "" or (isinstance(v, float) and v == 0.0)
+
+
+def compact_raw_json(row: dict[str, Any], *, compress: bool | None = None) -> dict[str, Any]:
+    """raw_json v2 de una fila parseada (sin procedencia; ver ``stamp_provenance``)."""
+    out: dict[str, Any] = {"_v": RAW_JSON_VERSION}
+    cold: dict[str, Any] = {}
+    for k, v in row.items():
+        if k in PROMOTED_FIELDS:
+            continue
+        if k in HOT_FIELDS:
+            out[k] = v
+        elif not _is_empty(v):
+            cold[k] = v
+    zstd = _zstd() if (compress if compress is not None else _zstd_enabled()) and cold else None
+    if zstd is not None:
+        raw = json.dumps(cold, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        out["_z"] = base64.b64encode(zstd.ZstdCompressor(level=3).compress(raw.encode("utf-8"))).decode("ascii")
+    else:
+        out.update(cold)
+    return out
+
+
+def stamp_provenance(raw_json: dict[str, Any], source_id: str, row_num: int) -> dict[str, Any]:
+    """Agrega archivo de origen + nro de fila (1-based). Va fuera del line_hash."""
+    raw_json["_src"] = source_id
+    raw_json["_row"] = int(row_num)
+    return raw_json
+
+
+def _parsed_defaults() -> dict[str, Any]:
+    from services.ventas_enriched_parser import VentaEnrichedRow
+
+    defaults: dict[str, Any] = {}
+    for f in fields(VentaEnrichedRow):
+        t = str(f.type)
+        defaults[f.name] = 0.0 if t == "float" else False if t == "bool" else None if "None" in t else ""
+    return defaults
+
+
+def expand_raw_json(row: dict[str, Any]) -> dict[str, Any]:
+    """
+    Fila parseada a partir de una fila DB (columnas + raw_json).
+    Legacy: raw_json ya completo ⇒ se devuelve una copia.
+    """
+    raw = row.get("raw_json")
+    if not isinstance(raw, dict):
+        return {}
+    if raw.get("_v") != RAW_JSON_VERSION:
+        return dict(raw)
+    out = _parsed_defaults()
+    out.update({k: row[k] for k in PROMOTED_FIELDS if k in row})
+    out.update({k: v for k, v in raw.items() if k not in _META})
+    blob = raw.get("_z")
+    if blob:
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("raw_json comprimido (_z) requiere el paquete zstandard")
+        out.update(json.loads(zstd.ZstdDecompressor().decompress(base64.b64decode(blob))))
+    return out
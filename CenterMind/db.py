@@ -6,8 +6,16 @@ Usa exclusivamente el cliente REST de Supabase (sin psycopg2).
 Para queries complejas con JOINs, creamos funciones RPC en Supabase.
 """
 
+import asyncio
+import math
 import os
+import threading
+import weakref
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
+
 from dotenv import load_dotenv
 
 _CM_DIR = Path(__file__).resolve().parent
@@ -56,6 +64,8 @@ def _bootstrap_env() -> None:
 
 _bootstrap_env()
 from supabase import create_client, Client, ClientOptions
+from postgrest import AsyncPostgrestClient
+from storage3 import AsyncStorageClient
 import httpx
 
 SUPABASE_URL: str = os.environ.get("SUPABASE_URL", "")
@@ -78,6 +88,12 @@ sb: Client = create_client(
 )
 
 _SUPABASE_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=15.0)
+# Pool keep-alive compartido: las páginas en paralelo (fetch_all workers>1) reusan conexiones.
+_SUPABASE_HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.environ.get("SUPABASE_HTTP_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.environ.get("SUPABASE_HTTP_MAX_KEEPALIVE", "16")),
+    keepalive_expiry=30.0,
+)
 
 
 def _patch_httpx_session(client: httpx.Client) -> httpx.Client:
@@ -87,6 +103,7 @@ def _patch_httpx_session(client: httpx.Client) -> httpx.Client:
         base_url=client.base_url,
         headers=client.headers,
         timeout=_SUPABASE_HTTP_TIMEOUT,
+        limits=_SUPABASE_HTTP_LIMITS,
     )
 
 
@@ -96,3 +113,377 @@ if hasattr(sb, "postgrest"):
 
 if hasattr(sb, "storage") and hasattr(sb.storage, "session"):
     sb.storage.session = _patch_httpx_session(sb.storage.session)
+
+
+# ─── Paginación PostgREST ─────────────────────────────────────────────────────
+#
+# PostgREST corta cada respuesta en 1000 filas (max-rows). Todos los lectores
+# grandes (exhibiciones, clientes_pdv_v2, ventas_enriched_v2) pasan por acá.
+#
+# `build` es una fábrica sin argumentos que devuelve un builder NUEVO ya filtrado
+# (`lambda: sb.table(t).select(cols).eq(...)`): los builders de postgrest-py son
+# mutables y `.range()` acumula params, así que nunca se reusan entre páginas.
+
+PAGE_SIZE = 1000
+PAGE_WORKERS = int(os.environ.get("SUPABASE_PAGE_WORKERS", "4"))
+
+
+def _with_exact_count(q):
+    """Agrega `Prefer: count=exact` a un builder ya creado (equivale a select(count="exact"))."""
+    request = getattr(q, "request", None)
+    headers = getattr(request, "headers", None)
+    if headers is None:
+        return q
+    try:
+        prefer = headers.get("Prefer") or ""
+    except Exception:
+        return q
+    if isinstance(prefer, str) and "count=" not in prefer:
+        headers["Prefer"] = f"{prefer},count=exact" if prefer else "count=exact"
+    return q
+
+
+def _page_rows(q) -> tuple[list[dict], int | None]:
+    res = q.execute()
+    count = getattr(res, "count", None)
+    return list(res.data or []), count if isinstance(count, int) else None
+
+
+def _iter_offset_pages(
+    build: Callable[[], Any],
+    page_size: int,
+    workers: int,
+) -> Iterator[list[dict]]:
+    if workers <= 1:
+        offset = 0
+        while True:
+            batch, _ = _page_rows(build().range(offset, offset + page_size - 1))
+            if batch:
+                yield batch
+            if len(batch) < page_size:
+                return
+            offset += page_size
+
+    # Pre-flight: la primera página viaja con count=exact y define cuántas pedir en paralelo.
+    first, total = _page_rows(_with_exact_count(build()).range(0, page_size - 1))
+    if first:
+        yield first
+    if len(first) < page_size:
+        return
+    n_pages = math.ceil(total / page_size) if total is not None else 1
+
+    def _fetch(page: int) -> list[dict]:
+        start = page * page_size
+        return _page_rows(build().range(start, start + page_size - 1))[0]
+
+    last: list[dict] = first
+    if n_pages > 1:
+        with ThreadPoolExecutor(
+            max_workers=min(workers, n_pages - 1),
+            thread_name_prefix="sb-page",
+        ) as pool:
+            # map() conserva el orden de páginas: el consumidor ve el mismo orden que en serie.
+            for batch in pool.map(_fetch, range(1, n_pages)):
+                if batch:
+                    yield batch
+                last = batch
+    if len(last) < page_size:
+        return
+    # La tabla creció entre el count y las páginas (o no hubo count): seguir en serie.
+    offset = max(n_pages, 1) * page_size
+    while True:
+        batch, _ = _page_rows(build().range(offset, offset + page_size - 1))
+        if batch:
+            yield batch
+        if len(batch) < page_size:
+            return
+        offset += page_size
+
+
+def _iter_keyset_pages(
+    build: Callable[[], Any],
+    key: str,
+    page_size: int,
+) -> Iterator[list[dict]]:
+    last_key: Any = None
+    while True:
+        q = build()
+        if last_key is not None:
+            q = q.gt(key, last_key)
+        batch, _ = _page_rows(q.order(key).limit(page_size))
+        if batch:
+            yield batch
+        if len(batch) < page_size:
+            return
+        last_key = batch[-1].get(key)
+        if last_key is None:
+            raise ValueError(f"paginate(key={key!r}): la columna debe estar en el select")
+
+
+def iter_pages(
+    build: Callable[[], Any],
+    *,
+    key: str | None = None,
+    page_size: int = PAGE_SIZE,
+    workers: int = 1,
+) -> Iterator[list[dict]]:
+    """
+    Itera páginas de una query PostgREST.
+
+    - ``key``: pagina por cursor (``key > último`` + ``order(key)``) en vez de offset.
+      Estable aunque se inserten filas y sin costo de OFFSET en páginas profundas;
+      la columna debe ser única (PK) y estar en el select. Ignora ``workers``.
+    - ``workers > 1``: la primera página pide ``count=exact`` y el resto se piden
+      en paralelo sobre el pool HTTP compartido. La query debe tener orden estable.
+    """
+    if key:
+        return _iter_keyset_pages(build, key, page_size)
+    return _iter_offset_pages(build, page_size, workers)
+
+
+def paginate(
+    build: Callable[[], Any],
+    *,
+    key: str | None = None,
+    page_size: int = PAGE_SIZE,
+    workers: int = 1,
+) -> Iterator[dict]:
+    """Generador de filas sobre :func:`iter_pages` (no arma la lista completa)."""
+    for batch in iter_pages(build, key=key, page_size=page_size, workers=workers):
+        yield from batch
+
+
+def fetch_all(
+    build: Callable[[], Any],
+    *,
+    key: str | None = None,
+    page_size: int = PAGE_SIZE,
+    workers: int = 1,
+) -> list[dict]:
+    """Todas las filas de la query (ver :func:`iter_pages`)."""
+    rows: list[dict] = []
+    for batch in iter_pages(build, key=key, page_size=page_size, workers=workers):
+        rows.extend(batch)
+    return rows
+
+
+# ─── Cliente async ────────────────────────────────────────────────────────────
+#
+# `sb` es sync: en un endpoint async bloquea el loop y vía `asyncio.to_thread`
+# ocupa el pool por defecto mientras espera la red. `asb` expone la misma API de
+# builders (`asb.table(t).select(...).eq(...)`, `asb.rpc(fn, params)`) sobre un
+# httpx.AsyncClient con keep-alive; se ejecuta con `await aexecute(q)`.
+#
+# httpx.AsyncClient queda atado al loop donde abrió sus conexiones: hay un
+# cliente por event loop (uvicorn, loops de bots o scripts con asyncio.run).
+
+SUPABASE_ASYNC_TIMEOUT = float(os.environ.get("SUPABASE_ASYNC_TIMEOUT", "45"))
+
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPostgrestClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_ASYNC_LOCK = threading.Lock()
+_ASYNC_STATS = {"clients": 0, "calls": 0, "timeouts": 0, "errors": 0}
+
+
+def _new_async_client(**http_kwargs: Any) -> AsyncPostgrestClient:
+    """Mismos headers/base_url que `sb.postgrest`, HTTP/1.1 y pool keep-alive."""
+    rest = sb.postgrest
+    http = httpx.AsyncClient(
+        http2=False,
+        base_url=rest.session.base_url,
+        headers=rest.session.headers,
+        timeout=_SUPABASE_HTTP_TIMEOUT,
+        limits=_SUPABASE_HTTP_LIMITS,
+        **http_kwargs,
+    )
+    # x-client-info lo pone el cliente async (si no, el header viaja duplicado).
+    headers = {k: v for k, v in rest.headers.items() if k.lower() != "x-client-info"}
+    return AsyncPostgrestClient(str(rest.base_url), headers=headers, http_client=http)
+
+
+def async_postgrest() -> AsyncPostgrestClient:
+    """Cliente PostgREST async del loop actual (se crea en el primer uso)."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        with _ASYNC_LOCK:
+            client = _ASYNC_CLIENTS.get(loop)
+            if client is None:
+                client = _ASYNC_CLIENTS[loop] = _new_async_client()
+                _ASYNC_STATS["clients"] += 1
+    return client
+
+
+class AsyncSupabase:
+    """Fachada tipo `sb` (table / from_ / rpc) sobre el cliente async del loop actual."""
+
+    def table(self, name: str):
+        return async_postgrest().from_(name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: dict | None = None, **kwargs: Any):
+        return async_postgrest().rpc(fn, params or {}, **kwargs)
+
+
+asb = AsyncSupabase()
+
+
+async def aexecute(q, *, timeout: float | None = None):
+    """`await q.execute()` con tope por llamada (default SUPABASE_ASYNC_TIMEOUT)."""
+    _ASYNC_STATS["calls"] += 1
+    try:
+        return await asyncio.wait_for(
+            q.execute(), SUPABASE_ASYNC_TIMEOUT if timeout is None else timeout
+        )
+    except asyncio.TimeoutError:
+        _ASYNC_STATS["timeouts"] += 1
+        raise
+    except Exception:
+        _ASYNC_STATS["errors"] += 1
+        raise
+
+
+# Storage async (subida de fotos): mismo esquema, un AsyncStorageClient por loop.
+_ASYNC_STORAGE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncStorageClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _new_async_storage(**http_kwargs: Any) -> AsyncStorageClient:
+    """Mismos headers/base_url que `sb.storage`, HTTP/1.1 y pool keep-alive."""
+    storage = sb.storage
+    headers = {k: v for k, v in storage._client.headers.items() if k.lower() != "x-client-info"}
+    http = httpx.AsyncClient(
+        http2=False,
+        headers=headers,
+        timeout=_SUPABASE_HTTP_TIMEOUT,
+        limits=_SUPABASE_HTTP_LIMITS,
+        **http_kwargs,
+    )
+    return AsyncStorageClient(str(storage._base_url), headers=headers, http_client=http)
+
+
+def async_storage() -> AsyncStorageClient:
+    """Cliente Storage async del loop actual (se crea en el primer uso)."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_STORAGE.get(loop)
+    if client is None:
+        with _ASYNC_LOCK:
+            client = _ASYNC_STORAGE.get(loop)
+            if client is None:
+                client = _ASYNC_STORAGE[loop] = _new_async_storage()
+                _ASYNC_STATS["clients"] += 1
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Cierra los pools async (PostgREST y Storage) del loop actual (shutdown de lifespan)."""
+    loop = asyncio.get_running_loop()
+    with _ASYNC_LOCK:
+        client = _ASYNC_CLIENTS.pop(loop, None)
+        storage = _ASYNC_STORAGE.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    if storage is not None:
+        await storage.session.aclose()
+
+
+def async_db_stats() -> dict[str, Any]:
+    return {**_ASYNC_STATS, "loops": len(_ASYNC_CLIENTS), "storage_loops": len(_ASYNC_STORAGE)}
+
+
+async def _apage_rows(q, timeout: float | None) -> tuple[list[dict], int | None]:
+    res = await aexecute(q, timeout=timeout)
+    count = getattr(res, "count", None)
+    return list(res.data or []), count if isinstance(count, int) else None
+
+
+async def _aiter_offset_pages(
+    build: Callable[[], Any],
+    page_size: int,
+    workers: int,
+    timeout: float | None,
+) -> AsyncIterator[list[dict]]:
+    offset = 0
+    if workers > 1:
+        first, total = await _apage_rows(_with_exact_count(build()).range(0, page_size - 1), timeout)
+        if first:
+            yield first
+        if len(first) < page_size:
+            return
+        n_pages = math.ceil(total / page_size) if total is not None else 1
+        if n_pages > 1:
+            sem = asyncio.Semaphore(workers)
+
+            async def _fetch(page: int) -> list[dict]:
+                start = page * page_size
+                async with sem:
+                    return (await _apage_rows(build().range(start, start + page_size - 1), timeout))[0]
+
+            # gather conserva el orden de páginas, igual que pool.map en la versión sync.
+            batches = await asyncio.gather(*(_fetch(p) for p in range(1, n_pages)))
+            for batch in batches:
+                if batch:
+                    yield batch
+            if len(batches[-1]) < page_size:
+                return
+        offset = max(n_pages, 1) * page_size
+    while True:
+        batch, _ = await _apage_rows(build().range(offset, offset + page_size - 1), timeout)
+        if batch:
+            yield batch
+        if len(batch) < page_size:
+            return
+        offset += page_size
+
+
+async def _aiter_keyset_pages(
+    build: Callable[[], Any],
+    key: str,
+    page_size: int,
+    timeout: float | None,
+) -> AsyncIterator[list[dict]]:
+    last_key: Any = None
+    while True:
+        q = build()
+        if last_key is not None:
+            q = q.gt(key, last_key)
+        batch, _ = await _apage_rows(q.order(key).limit(page_size), timeout)
+        if batch:
+            yield batch
+        if len(batch) < page_size:
+            return
+        last_key = batch[-1].get(key)
+        if last_key is None:
+            raise ValueError(f"paginate(key={key!r}): la columna debe estar en el select")
+
+
+def aiter_pages(
+    build: Callable[[], Any],
+    *,
+    key: str | None = None,
+    page_size: int = PAGE_SIZE,
+    workers: int = 1,
+    timeout: float | None = None,
+) -> AsyncIterator[list[dict]]:
+    """:func:`iter_pages` sobre `asb`: ``build`` arma builders async; ``timeout`` es por página."""
+    if key:
+        return _aiter_keyset_pages(build, key, page_size, timeout)
+    return _aiter_offset_pages(build, page_size, workers, timeout)
+
+
+async def afetch_all(
+    build: Callable[[], Any],
+    *,
+    key: str | None = None,
+    page_size: int = PAGE_SIZE,
+    workers: int = 1,
+    timeout: float | None = None,
+) -> list[dict]:
+    """Todas las filas de la query (ver :func:`aiter_pages`)."""
+    rows: list[dict] = []
+    async for batch in aiter_pages(build, key=key, page_size=page_size, workers=workers, timeout=timeout):
+        rows.extend(batch)
+    return rows
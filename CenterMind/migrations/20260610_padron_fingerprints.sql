@@ -0,0 +1,17 @@
+-- Huellas de contenido del padrón por tenant (ingesta incremental de clientes_pdv_v2_d{N}).
+-- id_cliente_erp → hash del payload normalizado (core/padron_fingerprint.py).
+-- updated_at = última vez que la fila se envió; pasado PADRON_FINGERPRINT_TTL_DAYS se reenvía.
+
+CREATE TABLE IF NOT EXISTS padron_fingerprints (
+    id_distribuidor  INTEGER NOT NULL,
+    id_cliente_erp   TEXT    NOT NULL,
+    fp               TEXT    NOT NULL,
+    updated_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id_distribuidor, id_cliente_erp)
+);
+
+CREATE INDEX IF NOT EXISTS idx_padron_fingerprints_dist_updated
+    ON padron_fingerprints (id_distribuidor, updated_at);
+
+COMMENT ON TABLE padron_fingerprints IS
+    'Hash por PDV del último payload de padrón enviado; sólo se reenvían filas nuevas o cambiadas.';
@@ -0,0 +1,19 @@
+-- Cola durable de evaluaciones para el bot Telegram (core/bot_eval_events.py).
+-- El portal inserta aquí sólo si el bot del tenant no corre en el mismo proceso;
+-- el bot drena por (id_distribuidor, processed_at IS NULL) y marca processed_at.
+-- Safe to run multiple times.
+
+CREATE TABLE IF NOT EXISTS public.bot_eval_events (
+    id               BIGSERIAL PRIMARY KEY,
+    id_distribuidor  INTEGER NOT NULL,
+    id_exhibicion    TEXT    NOT NULL,
+    created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at     TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_bot_eval_events_pendientes
+    ON public.bot_eval_events (id_distribuidor, id)
+    WHERE processed_at IS NULL;
+
+COMMENT ON TABLE public.bot_eval_events IS
+    'Evaluaciones del portal pendientes de reflejar en el mensaje Telegram (fallback de la cola en memoria).';
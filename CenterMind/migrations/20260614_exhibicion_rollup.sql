@@ -0,0 +1,139 @@
+-- Rollup diario de exhibiciones lógicas (core/exhibicion_rollup.py).
+-- Una fila por (tenant, día AR, integrante, clave lógica) con la fila ganadora del dedup
+-- y la primera fila del grupo; ranking/KPIs/stats se arman desde acá sin re-leer exhibiciones.
+-- exhibicion_rollup_dias marca qué días están construidos; exhibicion_rollup_dirty lo
+-- llena un trigger sobre exhibiciones (altas, evaluaciones, borrados) con el día AR tocado.
+-- timestamp_subida se guarda como texto tal cual lo devuelve PostgREST: la clave lógica
+-- usa sus primeros 10 caracteres y no debe cambiar por formateo.
+-- Safe to run multiple times.
+
+CREATE TABLE IF NOT EXISTS public.exhibicion_rollup_diaria (
+    id_distribuidor         INTEGER NOT NULL,
+    dia                     DATE    NOT NULL,
+    id_integrante           BIGINT  NOT NULL,
+    logic_key               TEXT    NOT NULL,
+    id_exhibicion           BIGINT,
+    estado                  TEXT,
+    score                   SMALLINT NOT NULL DEFAULT 0,
+    puntos                  SMALLINT NOT NULL DEFAULT 0,
+    timestamp_subida        TEXT,
+    id_cliente_pdv          BIGINT,
+    id_cliente              BIGINT,
+    cliente_sombra_codigo   TEXT,
+    url_foto_drive          TEXT,
+    telegram_msg_id         BIGINT,
+    telegram_chat_id        BIGINT,
+    first_id_exhibicion     BIGINT,
+    first_estado            TEXT,
+    first_timestamp_subida  TEXT,
+    fotos                   INTEGER NOT NULL DEFAULT 1,
+    build_id                BIGINT  NOT NULL,
+    PRIMARY KEY (id_distribuidor, dia, id_integrante, logic_key)
+);
+
+CREATE TABLE IF NOT EXISTS public.exhibicion_rollup_dias (
+    id_distribuidor  INTEGER NOT NULL,
+    dia              DATE    NOT NULL,
+    logicas          INTEGER NOT NULL DEFAULT 0,
+    build_id         BIGINT  NOT NULL,
+    built_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id_distribuidor, dia)
+);
+
+CREATE TABLE IF NOT EXISTS public.exhibicion_rollup_dirty (
+    id_distribuidor  INTEGER NOT NULL,
+    dia              DATE    NOT NULL,
+    marked_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id_distribuidor, dia)
+);
+
+CREATE OR REPLACE FUNCTION public.fn_exhibicion_rollup_mark_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.timestamp_subida IS NOT NULL THEN
+        INSERT INTO public.exhibicion_rollup_dirty (id_distribuidor, dia, marked_at)
+        VALUES (
+            OLD.id_distribuidor,
+            (OLD.timestamp_subida AT TIME ZONE 'America/Argentina/Buenos_Aires')::date,
+            clock_timestamp()
+        )
+        ON CONFLICT (id_distribuidor, dia) DO UPDATE SET marked_at = EXCLUDED.marked_at;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.timestamp_subida IS NOT NULL THEN
+        INSERT INTO public.exhibicion_rollup_dirty (id_distribuidor, dia, marked_at)
+        VALUES (
+            NEW.id_distribuidor,
+            (NEW.timestamp_subida AT TIME ZONE 'America/Argentina/Buenos_Aires')::date,
+            clock_timestamp()
+        )
+        ON CONFLICT (id_distribuidor, dia) DO UPDATE SET marked_at = EXCLUDED.marked_at;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_exhibiciones_rollup_dirty ON public.exhibiciones;
+CREATE TRIGGER trg_exhibiciones_rollup_dirty
+    AFTER INSERT OR DELETE OR UPDATE OF
+        estado, timestamp_subida, id_integrante, id_cliente_pdv, id_cliente,
+        cliente_sombra_codigo, url_foto_drive, telegram_msg_id, telegram_chat_id
+    ON public.exhibiciones
+    FOR EACH ROW EXECUTE FUNCTION public.fn_exhibicion_rollup_mark_dirty();
+
+-- Reemplaza el rollup de p_dias de un tenant en una transacción (core/exhibicion_rollup._write_days).
+-- Advisory lock por (tenant, día) en orden de día: dos rebuilds concurrentes del mismo día se
+-- serializan. Un día cuyo build vigente es más nuevo que p_build_id no se toca (ese build leyó
+-- exhibiciones después). Limpia las marcas dirty anteriores a p_marked_before. Retorna días escritos.
+CREATE OR REPLACE FUNCTION public.exhibicion_rollup_replace(
+    p_dist INTEGER,
+    p_dias DATE[],
+    p_rows JSONB,
+    p_build_id BIGINT,
+    p_marked_before TIMESTAMPTZ
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_dia  DATE;
+    v_dias DATE[] := '{}';
+BEGIN
+    FOR v_dia IN SELECT DISTINCT d FROM unnest(p_dias) d ORDER BY d LOOP
+        PERFORM pg_advisory_xact_lock(hashtextextended(format('exhibicion_rollup:%s:%s', p_dist, v_dia), 0));
+        IF NOT EXISTS (
+            SELECT 1 FROM public.exhibicion_rollup_dias
+            WHERE id_distribuidor = p_dist AND dia = v_dia AND build_id > p_build_id
+        ) THEN
+            v_dias := v_dias || v_dia;
+        END IF;
+    END LOOP;
+    IF cardinality(v_dias) = 0 THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM public.exhibicion_rollup_diaria
+     WHERE id_distribuidor = p_dist AND dia = ANY (v_dias);
+    INSERT INTO public.exhibicion_rollup_diaria
+    SELECT r.*
+      FROM jsonb_populate_recordset(NULL::public.exhibicion_rollup_diaria, COALESCE(p_rows, '[]'::jsonb)) r
+     WHERE r.id_distribuidor = p_dist AND r.dia = ANY (v_dias);
+
+    INSERT INTO public.exhibicion_rollup_dias (id_distribuidor, dia, logicas, build_id, built_at)
+    SELECT p_dist, d,
+           (SELECT count(*) FROM public.exhibicion_rollup_diaria x
+             WHERE x.id_distribuidor = p_dist AND x.dia = d),
+           p_build_id, NOW()
+      FROM unnest(v_dias) d
+    ON CONFLICT (id_distribuidor, dia) DO UPDATE SET
+        logicas  = EXCLUDED.logicas,
+        build_id = EXCLUDED.build_id,
+        built_at = EXCLUDED.built_at;
+
+    DELETE FROM public.exhibicion_rollup_dirty
+     WHERE id_distribuidor = p_dist AND dia = ANY (v_dias) AND marked_at <= p_marked_before;
+    RETURN cardinality(v_dias);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE public.exhibicion_rollup_diaria IS
+    'Exhibiciones lógicas deduplicadas por día AR (ganadora + primera fila del grupo). Ver core/exhibicion_rollup.py.';
+COMMENT ON TABLE public.exhibicion_rollup_dirty IS
+    'Días AR con exhibiciones modificadas desde el último rollup (trigger trg_exhibiciones_rollup_dirty).';
@@ -0,0 +1,98 @@
+-- Ingesta incremental de ventas_enriched (services/ventas_enriched_ingestion_service.py).
+-- line_hash = hash del payload de la línea; la ingesta sólo re-escribe líneas cuyo hash cambió.
+-- Filas previas quedan con line_hash NULL ⇒ se escriben una vez más y quedan hasheadas.
+--
+-- Alimentar la global desde el tenant (VENTAS_ENRICHED_GLOBAL=trigger):
+--   SELECT public.ventas_enriched_global_sync(true);   -- crea triggers en ventas_enriched_v2_d*
+--   SELECT public.ventas_enriched_global_sync(false);  -- los quita (volver a dual / off)
+-- Activar el trigger ANTES de cambiar la env a "trigger", y no dejarlo con "dual"
+-- (la global se escribiría dos veces). Re-ejecutar tras dar de alta un tenant nuevo.
+-- Safe to run multiple times.
+
+ALTER TABLE public.ventas_enriched_v2 ADD COLUMN IF NOT EXISTS line_hash TEXT;
+
+DO $$
+DECLARE
+  t RECORD;
+BEGIN
+  FOR t IN
+    SELECT tablename FROM pg_tables
+    WHERE schemaname = 'public' AND tablename ~ '^ventas_enriched_v2_d[0-9]+$'
+  LOOP
+    EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS line_hash TEXT', t.tablename);
+  END LOOP;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.fn_ventas_enriched_to_global()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.ventas_enriched_v2 (
+        id_distribuidor, tenant_id, fecha_factura, fecha_pedido, anulado, tipo_documento, serie,
+        numero_documento, id_cliente_erp, nombre_cliente, codigo_vendedor, nombre_vendedor, ruta,
+        cod_articulo, descripcion_articulo, agrupacion_art_1, agrupacion_art_2, canal, subcanal,
+        subcanal_mkt, bultos_total, unidades_total, importe_final, importe_neto, importe_bruto,
+        raw_json, line_hash, updated_at
+    ) VALUES (
+        NEW.id_distribuidor, NEW.tenant_id, NEW.fecha_factura, NEW.fecha_pedido, NEW.anulado,
+        NEW.tipo_documento, NEW.serie, NEW.numero_documento, NEW.id_cliente_erp, NEW.nombre_cliente,
+        NEW.codigo_vendedor, NEW.nombre_vendedor, NEW.ruta, NEW.cod_articulo, NEW.descripcion_articulo,
+        NEW.agrupacion_art_1, NEW.agrupacion_art_2, NEW.canal, NEW.subcanal, NEW.subcanal_mkt,
+        NEW.bultos_total, NEW.unidades_total, NEW.importe_final, NEW.importe_neto, NEW.importe_bruto,
+        NEW.raw_json, NEW.line_hash, NOW()
+    )
+    ON CONFLICT (id_distribuidor, fecha_factura, numero_documento, id_cliente_erp, cod_articulo)
+    DO UPDATE SET
+        tenant_id            = EXCLUDED.tenant_id,
+        fecha_pedido         = EXCLUDED.fecha_pedido,
+        anulado              = EXCLUDED.anulado,
+        tipo_documento       = EXCLUDED.tipo_documento,
+        serie                = EXCLUDED.serie,
+        nombre_cliente       = EXCLUDED.nombre_cliente,
+        codigo_vendedor      = EXCLUDED.codigo_vendedor,
+        nombre_vendedor      = EXCLUDED.nombre_vendedor,
+        ruta                 = EXCLUDED.ruta,
+        descripcion_articulo = EXCLUDED.descripcion_articulo,
+        agrupacion_art_1     = EXCLUDED.agrupacion_art_1,
+        agrupacion_art_2     = EXCLUDED.agrupacion_art_2,
+        canal                = EXCLUDED.canal,
+        subcanal             = EXCLUDED.subcanal,
+        subcanal_mkt         = EXCLUDED.subcanal_mkt,
+        bultos_total         = EXCLUDED.bultos_total,
+        unidades_total       = EXCLUDED.unidades_total,
+        importe_final        = EXCLUDED.importe_final,
+        importe_neto         = EXCLUDED.importe_neto,
+        importe_bruto        = EXCLUDED.importe_bruto,
+        raw_json             = EXCLUDED.raw_json,
+        line_hash            = EXCLUDED.line_hash,
+        updated_at           = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.ventas_enriched_global_sync(p_enable BOOLEAN)
+RETURNS INTEGER AS $$
+DECLARE
+  t RECORD;
+  n INTEGER := 0;
+BEGIN
+  FOR t IN
+    SELECT tablename FROM pg_tables
+    WHERE schemaname = 'public' AND tablename ~ '^ventas_enriched_v2_d[0-9]+$'
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_ventas_enriched_to_global ON public.%I', t.tablename);
+    IF p_enable THEN
+      EXECUTE format(
+        'CREATE TRIGGER trg_ventas_enriched_to_global
+           AFTER INSERT OR UPDATE ON public.%I
+           FOR EACH ROW EXECUTE FUNCTION public.fn_ventas_enriched_to_global()',
+        t.tablename
+      );
+    END IF;
+    n := n + 1;
+  END LOOP;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON COLUMN public.ventas_enriched_v2.line_hash IS
+    'Hash del payload de la línea (ingesta incremental: sólo se re-escriben líneas con hash distinto).';
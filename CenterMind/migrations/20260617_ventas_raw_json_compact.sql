@@ -0,0 +1,63 @@
+-- raw_json compacto en ventas_enriched_v2 / ventas_enriched_v2_d* (core/ventas_raw_json.py).
+-- Formato v2: {"_v":2, campos no promovidos a columna y no vacíos, id_empresa/nombre_empresa/bultos_* siempre}.
+-- La ingesta nueva ya escribe v2 (+ _src/_row de procedencia); esto compacta el histórico.
+--
+-- Backfill por lotes (keyset por id, re-ejecutable):
+--   python scripts/backfill_ventas_raw_json_compact.py            # global + todos los tenants
+--   SELECT public.ventas_raw_json_compact('ventas_enriched_v2_d3', 0, 5000);  -- un lote a mano
+-- line_hash se pone en NULL en las filas compactadas: la próxima ingesta las reescribe una vez.
+-- El espacio se recupera con VACUUM (autovacuum o manual) tras el backfill.
+-- Safe to run multiple times.
+
+CREATE OR REPLACE FUNCTION public.ventas_raw_json_compact_obj(p_raw JSONB)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object('_v', 2) || COALESCE(jsonb_object_agg(e.key, e.value), '{}'::jsonb)
+    FROM jsonb_each(p_raw) e
+    WHERE e.key <> ALL (ARRAY[
+            'fecha_factura', 'fecha_pedido', 'anulado', 'tipo_documento', 'serie', 'numero_documento',
+            'id_cliente_erp', 'nombre_cliente', 'codigo_vendedor', 'nombre_vendedor', 'ruta',
+            'cod_articulo', 'descripcion_articulo', 'agrupacion_art_1', 'agrupacion_art_2',
+            'canal', 'subcanal', 'subcanal_mkt',
+            'bultos_total', 'unidades_total', 'importe_final', 'importe_neto', 'importe_bruto'
+          ])
+      AND (
+            e.key = ANY (ARRAY['id_empresa', 'nombre_empresa', 'bultos_excel', 'bultos_con_cargo', 'bultos_sin_cargo'])
+            OR e.value NOT IN ('null'::jsonb, '""'::jsonb, '0'::jsonb)
+          );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Compacta hasta p_batch filas con id > p_after_id. Retorna {"updated": n, "last_id": id | null}.
+-- last_id null ⇒ no quedan filas después de p_after_id.
+CREATE OR REPLACE FUNCTION public.ventas_raw_json_compact(
+    p_table TEXT,
+    p_after_id BIGINT DEFAULT 0,
+    p_batch INTEGER DEFAULT 5000
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_last BIGINT;
+  v_updated INTEGER := 0;
+BEGIN
+  IF p_table !~ '^ventas_enriched_v2(_d[0-9]+)?$' THEN
+    RAISE EXCEPTION 'ventas_raw_json_compact: tabla inválida %', p_table;
+  END IF;
+
+  EXECUTE format(
+    'SELECT max(id) FROM (SELECT id FROM public.%I WHERE id > $1 ORDER BY id LIMIT $2) s',
+    p_table
+  ) INTO v_last USING p_after_id, p_batch;
+
+  IF v_last IS NOT NULL THEN
+    EXECUTE format(
+      'UPDATE public.%I
+          SET raw_json = public.ventas_raw_json_compact_obj(raw_json), line_hash = NULL
+        WHERE id > $1 AND id <= $2
+          AND raw_json IS NOT NULL AND NOT (raw_json ? ''_v'')',
+      p_table
+    ) USING p_after_id, v_last;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+  END IF;
+
+  RETURN jsonb_build_object('updated', v_updated, 'last_id', v_last);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,208 @@
+-- Cola durable de jobs post-ingesta (core/job_queue.py): watcher de objetivos, fechas de compra,
+-- invalidación/warm de snapshots. Reemplaza hilos ad-hoc dentro de requests/ingestas.
+--
+-- Coalescing: a lo sumo un job 'pending' por coalesce_key (p. ej. objetivos_watcher:4); un
+-- enqueue sobre un pending existente fusiona el payload (background_jobs_merge) en vez de
+-- insertar. Diez ingestas seguidas del mismo tenant ⇒ una corrida del watcher.
+-- Claim con FOR UPDATE SKIP LOCKED + lease (locked_until): un worker caído libera sus jobs al
+-- vencer el lease. No se reclama un job si otro de la misma clave está corriendo (aunque su
+-- lease haya vencido: en ese caso se reclama el vencido, nunca los dos a la vez).
+-- Safe to run multiple times.
+
+CREATE TABLE IF NOT EXISTS public.background_jobs (
+    id               BIGSERIAL PRIMARY KEY,
+    tipo             TEXT        NOT NULL,
+    id_distribuidor  INTEGER,
+    coalesce_key     TEXT,
+    payload          JSONB       NOT NULL DEFAULT '{}'::jsonb,
+    estado           TEXT        NOT NULL DEFAULT 'pending'
+                     CHECK (estado IN ('pending', 'running', 'done', 'error')),
+    intentos         INTEGER     NOT NULL DEFAULT 0,
+    max_intentos     INTEGER     NOT NULL DEFAULT 5,
+    coalesced        INTEGER     NOT NULL DEFAULT 0,
+    run_after        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by        TEXT,
+    locked_until     TIMESTAMPTZ,
+    last_error       TEXT,
+    created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at      TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_pending_key
+    ON public.background_jobs (coalesce_key)
+    WHERE estado = 'pending' AND coalesce_key IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_claim
+    ON public.background_jobs (tipo, run_after, id)
+    WHERE estado IN ('pending', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_finished
+    ON public.background_jobs (finished_at)
+    WHERE estado IN ('done', 'error');
+
+-- Fusión de payloads: arrays se unen sin duplicados, objetos se mezclan (gana el nuevo),
+-- booleanos se combinan con OR, el resto gana el nuevo. Igual que core/job_queue.merge_payload.
+CREATE OR REPLACE FUNCTION public.background_jobs_merge(p_old JSONB, p_new JSONB)
+RETURNS JSONB AS $$
+    SELECT COALESCE(p_old, '{}'::jsonb) || COALESCE(jsonb_object_agg(
+        n.key,
+        CASE
+            WHEN jsonb_typeof(n.value) = 'array' AND jsonb_typeof(p_old -> n.key) = 'array' THEN (
+                SELECT COALESCE(jsonb_agg(x.v ORDER BY x.ord), '[]'::jsonb)
+                FROM (
+                    SELECT DISTINCT ON (e.v) e.v, e.ord
+                    FROM jsonb_array_elements((p_old -> n.key) || n.value) WITH ORDINALITY AS e(v, ord)
+                    ORDER BY e.v, e.ord
+                ) x
+            )
+            WHEN jsonb_typeof(n.value) = 'object' AND jsonb_typeof(p_old -> n.key) = 'object' THEN
+                (p_old -> n.key) || n.value
+            WHEN jsonb_typeof(n.value) = 'boolean' AND jsonb_typeof(p_old -> n.key) = 'boolean' THEN
+                to_jsonb((p_old ->> n.key)::boolean OR (n.value #>> '{}')::boolean)
+            ELSE n.value
+        END
+    ), '{}'::jsonb)
+    FROM jsonb_each(COALESCE(p_new, '{}'::jsonb)) n;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Encola (o fusiona con el pending de la misma clave). Retorna {"id": n, "coalesced": bool}.
+CREATE OR REPLACE FUNCTION public.background_jobs_enqueue(
+    p_tipo TEXT,
+    p_dist INTEGER,
+    p_key TEXT,
+    p_payload JSONB,
+    p_delay_sec DOUBLE PRECISION DEFAULT 0,
+    p_max_intentos INTEGER DEFAULT 5
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_id BIGINT;
+    v_coalesced BOOLEAN;
+BEGIN
+    INSERT INTO public.background_jobs (tipo, id_distribuidor, coalesce_key, payload, run_after, max_intentos)
+    VALUES (
+        p_tipo, p_dist, p_key, COALESCE(p_payload, '{}'::jsonb),
+        NOW() + make_interval(secs => GREATEST(p_delay_sec, 0)), p_max_intentos
+    )
+    ON CONFLICT (coalesce_key) WHERE estado = 'pending' AND coalesce_key IS NOT NULL
+    DO UPDATE SET
+        payload    = public.background_jobs_merge(background_jobs.payload, EXCLUDED.payload),
+        coalesced  = background_jobs.coalesced + 1,
+        updated_at = NOW()
+    RETURNING id, (xmax <> 0) INTO v_id, v_coalesced;
+    RETURN jsonb_build_object('id', v_id, 'coalesced', v_coalesced);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reclama hasta p_limit jobs listos de un tipo (pending vencidos o running con lease vencido).
+CREATE OR REPLACE FUNCTION public.background_jobs_claim(
+    p_worker TEXT,
+    p_tipo TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_sec INTEGER DEFAULT 900
+)
+RETURNS SETOF public.background_jobs AS $$
+BEGIN
+    RETURN QUERY
+    WITH cand AS (
+        SELECT j.id
+        FROM public.background_jobs j
+        WHERE j.tipo = p_tipo
+          AND (
+                (j.estado = 'pending' AND j.run_after <= NOW())
+             OR (j.estado = 'running' AND j.locked_until < NOW())
+          )
+          AND (
+                j.coalesce_key IS NULL
+             OR NOT EXISTS (
+                    -- con o sin lease vigente: un running vencido se reclama él mismo,
+                    -- el pending de su clave espera a que termine
+                    SELECT 1 FROM public.background_jobs r
+                    WHERE r.coalesce_key = j.coalesce_key
+                      AND r.estado = 'running'
+                      AND r.id <> j.id
+                )
+          )
+        ORDER BY j.run_after, j.id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.background_jobs b
+       SET estado       = 'running',
+           intentos     = b.intentos + 1,
+           locked_by    = p_worker,
+           locked_until = NOW() + make_interval(secs => p_lease_sec),
+           updated_at   = NOW()
+      FROM cand
+     WHERE b.id = cand.id
+    RETURNING b.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Falla de un job: reintento con backoff (p_retry_sec), error final (p_retry_sec NULL o sin
+-- intentos), o fusión en el pending de la misma clave si ya hay uno (no duplica trabajo).
+CREATE OR REPLACE FUNCTION public.background_jobs_fail(
+    p_id BIGINT,
+    p_error TEXT,
+    p_retry_sec DOUBLE PRECISION DEFAULT NULL
+)
+RETURNS TEXT AS $$
+DECLARE
+    v public.background_jobs%ROWTYPE;
+    v_pending BIGINT;
+BEGIN
+    SELECT * INTO v FROM public.background_jobs WHERE id = p_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN 'missing';
+    END IF;
+    IF p_retry_sec IS NULL OR v.intentos >= v.max_intentos THEN
+        UPDATE public.background_jobs
+           SET estado = 'error', last_error = p_error, locked_until = NULL,
+               finished_at = NOW(), updated_at = NOW()
+         WHERE id = p_id;
+        RETURN 'error';
+    END IF;
+    IF v.coalesce_key IS NOT NULL THEN
+        UPDATE public.background_jobs
+           SET payload = public.background_jobs_merge(payload, v.payload),
+               coalesced = coalesced + 1, updated_at = NOW()
+         WHERE coalesce_key = v.coalesce_key AND estado = 'pending'
+        RETURNING id INTO v_pending;
+        IF v_pending IS NOT NULL THEN
+            UPDATE public.background_jobs
+               SET estado = 'done', last_error = format('%s (reintento fusionado en #%s)', p_error, v_pending),
+                   locked_until = NULL, finished_at = NOW(), updated_at = NOW()
+             WHERE id = p_id;
+            RETURN 'merged';
+        END IF;
+    END IF;
+    UPDATE public.background_jobs
+       SET estado = 'pending', last_error = p_error, locked_by = NULL, locked_until = NULL,
+           run_after = NOW() + make_interval(secs => p_retry_sec), updated_at = NOW()
+     WHERE id = p_id;
+    RETURN 'retry';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Profundidad por tipo: {"tipo": {"pending", "running", "error_24h", "oldest_pending_sec"}}.
+CREATE OR REPLACE FUNCTION public.background_jobs_depth()
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(s.tipo, s.d), '{}'::jsonb)
+    FROM (
+        SELECT tipo, jsonb_build_object(
+            'pending',   count(*) FILTER (WHERE estado = 'pending'),
+            'running',   count(*) FILTER (WHERE estado = 'running'),
+            'error_24h', count(*) FILTER (WHERE estado = 'error'),
+            'oldest_pending_sec', COALESCE(
+                EXTRACT(EPOCH FROM NOW() - min(created_at) FILTER (WHERE estado = 'pending'))::int, 0)
+        ) AS d
+        FROM public.background_jobs
+        WHERE estado IN ('pending', 'running')
+           OR (estado = 'error' AND finished_at > NOW() - INTERVAL '24 hours')
+        GROUP BY tipo
+    ) s;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON TABLE public.background_jobs IS
+    'Jobs post-ingesta con coalescing por clave, reintentos y lease (core/job_queue.py).';
@@ -0,0 +1,47 @@
+-- Flush por lote del watcher de objetivos (services/objetivos_watcher_service.py, _LoteWatcher).
+-- Una corrida acumula transiciones de objetivo_items y eventos de objetivos_tracking y los
+-- manda al final con una RPC por tabla (en vez de un UPDATE por ítem y un upsert por objetivo).
+-- Sin estas funciones el watcher cae a upsert directo / UPDATE agrupado por (objetivo, estado).
+-- Safe to run multiple times.
+
+-- p_items: [{"id_objetivo", "id_cliente_pdv", "estado_item"}, ...]
+-- Mismo guard que _update_item_estado: 'cumplido' / 'falla' no retroceden. Retorna filas tocadas.
+CREATE OR REPLACE FUNCTION public.watcher_flush_items(p_items JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  v_n INTEGER;
+BEGIN
+  UPDATE public.objetivo_items oi
+     SET estado_item = p.estado_item,
+         updated_at  = now()
+    FROM jsonb_populate_recordset(NULL::public.objetivo_items, p_items) p
+   WHERE oi.id_objetivo = p.id_objetivo
+     AND oi.id_cliente_pdv = p.id_cliente_pdv
+     AND oi.estado_item IS DISTINCT FROM p.estado_item
+     AND (
+           p.estado_item IN ('cumplido', 'falla')
+           OR oi.estado_item IS NULL
+           OR oi.estado_item NOT IN ('cumplido', 'falla')
+         );
+  GET DIAGNOSTICS v_n = ROW_COUNT;
+  RETURN v_n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- p_rows: [{"id_objetivo", "id_referencia", "tipo_evento", "metadata"}, ...]
+-- Mismo ON CONFLICT que el upsert del watcher. Retorna filas insertadas/actualizadas.
+CREATE OR REPLACE FUNCTION public.watcher_flush_tracking(p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  v_n INTEGER;
+BEGIN
+  INSERT INTO public.objetivos_tracking (id_objetivo, id_referencia, tipo_evento, metadata)
+  SELECT DISTINCT ON (r.id_objetivo, r.id_referencia, r.tipo_evento)
+         r.id_objetivo, r.id_referencia, r.tipo_evento, r.metadata
+    FROM jsonb_populate_recordset(NULL::public.objetivos_tracking, p_rows) r
+  ON CONFLICT (id_objetivo, id_referencia, tipo_evento)
+  DO UPDATE SET metadata = EXCLUDED.metadata;
+  GET DIAGNOSTICS v_n = ROW_COUNT;
+  RETURN v_n;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,18 @@
+-- Renditions WebP de fotos de exhibición (core/foto_renditions.py).
+-- foto_renditions = {"thumb": url, "med": url}: la llena el job foto_renditions (core/job_queue)
+-- tras registrar la exhibición, o scripts/backfill_foto_renditions.py para el histórico.
+-- Los archivos viven en el mismo bucket Exhibiciones-PDV bajo _r/{thumb|med}/{path original}.webp.
+-- NULL = sin renditions todavía (los payloads exponen url_foto_thumb / url_foto_med en null).
+-- Aplicar antes de desplegar la API: galería, visor y bundle seleccionan la columna.
+-- Safe to run multiple times.
+
+ALTER TABLE public.exhibiciones
+    ADD COLUMN IF NOT EXISTS foto_renditions JSONB;
+
+COMMENT ON COLUMN public.exhibiciones.foto_renditions IS
+    'URLs públicas de renditions WebP {"thumb","med"} (core/foto_renditions.py). NULL = pendiente.';
+
+-- Backfill por keyset sobre las filas que faltan.
+CREATE INDEX IF NOT EXISTS idx_exhibiciones_sin_renditions
+    ON public.exhibiciones (id_distribuidor, id_exhibicion)
+    WHERE foto_renditions IS NULL AND url_foto_drive IS NOT NULL;
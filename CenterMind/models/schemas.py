@@ -326,6 +326,7 @@ class GaleriaClienteCard(BaseModel):
     nombre_cliente: str
     nombre_fantasia: Optional[str] = None
     ultima_exhibicion_url: Optional[str] = None
+    ultima_exhibicion_thumb: Optional[str] = None
     ultima_exhibicion_fecha: Optional[str] = None
     ultimo_estado: Optional[str] = None
     fecha_ultima_compra: Optional[str] = None
@@ -340,6 +341,8 @@ class GaleriaClienteCard(BaseModel):
 class GaleriaTimelineItem(BaseModel):
     id_exhibicion: int
     url_foto: str
+    url_foto_thumb: Optional[str] = None
+    url_foto_med: Optional[str] = None
     estado: str
     timestamp_subida: str
     fecha_evaluacion: Optional[str] = None
@@ -509,6 +512,8 @@ class GaleriaMapaResponse(BaseModel):
 class GaleriaFotoPublicacion(BaseModel):
     id_exhibicion: int
     url_foto: str
+    url_foto_thumb: Optional[str] = None
+    url_foto_med: Optional[str] = None
     estado: str
     timestamp_subida: str
     comentario: Optional[str] = None
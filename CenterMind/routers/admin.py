@@ -16,6 +16,11 @@ from typing import Optional
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 
 from core.config import WEBHOOK_URL
+from core.exhibicion_rollup import exhibicion_rollup_stats
+from core.foto_renditions import foto_renditions_stats
+from core.storage_upload import storage_upload_stats
+from core.identity_cache import identity_cache_stats, invalidate_identity
+from core.job_queue import job_queue_stats
 from core.bot_registry import configure_bot_webhook
 from core.lifespan import bots, manager
 from core.security import verify_auth, check_dist_permission
@@ -31,7 +36,7 @@ from core.tenant_tables import (
     ensure_tenant_partition_tables,
     build_tenant_tables_sql,
 )
-from db import sb
+from db import async_db_stats, sb
 from models.schemas import (
     AsignarVendedorRequest,
     BulkMappingRequest,
@@ -46,6 +51,8 @@ from models.schemas import (
     UsuarioRequest,
 )
 from bot_worker import BotWorker
+from services.cc_broadcast import cc_broadcast_stats
+from services.rpa_delta_service import rpa_delta_stats
 from services.system_monitoring_service import monitor_service
 
 logger = logging.getLogger("ShelfyAPI")
@@ -884,6 +891,8 @@ def admin_update_integrante(id_integrante: int, req: IntegranteUpdateRequest, us
     if not update_data:
         return {"ok": True}
     sb.table("integrantes_grupo").update(update_data).eq("id_integrante", id_integrante).execute()
+    # Sin dist a mano (edición superadmin, rara): descarta los mapas de identidad de todos.
+    invalidate_identity(None, "admin_update_integrante")
     return {"ok": True}
 
 
@@ -897,6 +906,7 @@ def admin_create_integrante(dist_id: int, req: IntegranteRequest, user_payload=D
         "telegram_group_id": req.telegram_group_id or 0,
     }).execute()
     new_id = result.data[0]["id_integrante"] if result.data else None
+    invalidate_identity(dist_id, "admin_create_integrante")
     return {"ok": True, "id_integrante": new_id}
 
 
@@ -965,6 +975,8 @@ def set_mapeo_vendedor(id_integrante: int, req: MapeoVendedorRequest, user_paylo
                 },
                 on_conflict="id_distribuidor,id_vendedor_v2",
             ).execute()
+        if dist_id:
+            invalidate_identity(dist_id, "mapeo_vendedor")
 
         return {"ok": True}
     except HTTPException:
@@ -1059,6 +1071,7 @@ def match_center_apply(data: dict, user_payload=Depends(verify_auth)):
                 },
                 on_conflict="id_distribuidor,id_vendedor_v2",
             ).execute()
+        invalidate_identity(dist_id, "match_center_apply")
 
         return {"ok": True}
     except HTTPException:
@@ -1094,6 +1107,8 @@ def match_center_apply_safe(dist_id: int, user_payload=Depends(verify_auth)):
                     on_conflict="id_distribuidor,id_vendedor_v2",
                 ).execute()
             applied += 1
+        if applied:
+            invalidate_identity(dist_id, "match_center_apply_safe")
         return {"ok": True, "applied": applied}
     except Exception as e:
         logger.error(f"[match-center] apply-safe dist={dist_id}: {e}")
@@ -1140,7 +1155,22 @@ def get_system_health(user_payload=Depends(verify_auth)):
         metrics  = monitor_service.get_system_metrics()
         db_stats = monitor_service.get_db_stats()
         sessions = monitor_service.get_active_sessions(bots)
-        return {"hardware": metrics, "database": db_stats, "sessions": sessions, "timestamp": datetime.now().isoformat()}
+        return {
+            "hardware": metrics,
+            "database": db_stats,
+            "sessions": sessions,
+            "caches": {
+                "identity": identity_cache_stats(),
+                "exhibicion_rollup": exhibicion_rollup_stats(),
+                "supabase_async": async_db_stats(),
+                "cc_broadcast": cc_broadcast_stats(),
+                "rpa_delta": rpa_delta_stats(),
+                "job_queue": job_queue_stats(),
+                "foto_renditions": foto_renditions_stats(),
+                "storage_upload": storage_upload_stats(),
+            },
+            "timestamp": datetime.now().isoformat(),
+        }
     except Exception as e:
         logger.error(f"Error en health monitor: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1518,6 +1548,7 @@ def save_hierarchy_config(dist_id: int, req: BulkMappingRequest, _=Depends(verif
                 "id_sucursal_erp": str(item.location_id) if item.location_id else None,
                 "id_vendedor_erp": item.id_vendedor_erp,
             }).eq("id_integrante", item.id_integrante).eq("id_distribuidor", dist_id).execute()
+        invalidate_identity(dist_id, "hierarchy_config")
         return {"ok": True, "message": f"Se procesaron {len(req.mappings)} mapeos."}
     except Exception as e:
         logger.error(f"Error saving hierarchy config: {e}")
@@ -1566,6 +1597,8 @@ def map_seller_erp(data: dict, user_payload=Depends(verify_auth)):
     check_dist_permission(user_payload, dist_id)
     try:
         res = sb.table("integrantes_grupo").update({"id_vendedor_erp": data.get("id_vendedor_erp")}).eq("id_integrante", data.get("id_integrante")).execute()
+        if dist_id:
+            invalidate_identity(dist_id, "map_seller")
         return res.data[0] if res.data else {"status": "ok"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1630,6 +1663,8 @@ def sync_hierarchy_from_erp(dist_id: int, user_payload=Depends(verify_auth)):
                         "id_sucursal_erp": str(s_erp_id) if s_erp_id else None,
                     }).eq("id_integrante", ig["id_integrante"]).execute()
                     updated_count += 1
+        if updated_count:
+            invalidate_identity(dist_id, "hierarchy_sync_erp")
         return {"ok": True, "updated_count": updated_count}
     except Exception as e:
         logger.error(f"Error en sync hierarchy: {e}")
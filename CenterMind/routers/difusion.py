@@ -4,23 +4,26 @@ Router de Difusión — comunicaciones masivas o por vendedor.
 
 Endpoints:
   POST /api/difusion/cc-telegram                         — envía PDF de CC al grupo Telegram.
+  POST /api/difusion/cc-telegram/stream                  — ídem, progreso por vendedor (NDJSON).
   GET  /api/difusion/vendedores/{dist_id}                — lista vendedores con binding Telegram.
   GET  /api/difusion/vendedor/{dist_id}/{id_vendedor}/resumen — CC + objetivos + exhibiciones del mes.
 """
+import json
 import logging
 from datetime import datetime, timezone
 from typing import Optional
 import unicodedata
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from core.helpers import load_active_vendedor_ids
 from core.security import verify_auth, check_dist_permission
 from core.tenant_tables import tenant_table_name
 from db import sb
+from services.cc_broadcast import difundir_cc_telegram_async, iter_difusion_cc
 from services.cc_difusion_service import (
-    difundir_cc_telegram,
     difundir_sigo_resumen_telegram,
     planificar_envios_cc_telegram,
 )
@@ -65,21 +68,24 @@ class DifusionCCTelegramRequest(BaseModel):
     fecha: Optional[str] = None
 
 
-@router.post("/api/difusion/cc-telegram", tags=["Difusión"])
-def difusion_cc_telegram(
-    body: DifusionCCTelegramRequest,
-    user_payload=Depends(verify_auth),
-):
-    """Envía CC como PDF al grupo Telegram del vendedor (o de todos en la sucursal)."""
+def _check_cc_body(body: DifusionCCTelegramRequest, user_payload: dict) -> None:
     check_dist_permission(user_payload, body.dist_id)
-
     if body.modo not in ("uno", "todos"):
         raise HTTPException(status_code=400, detail="modo debe ser 'uno' o 'todos'")
     if body.modo == "uno" and body.id_vendedor is None:
         raise HTTPException(status_code=400, detail="id_vendedor requerido para modo='uno'")
 
+
+@router.post("/api/difusion/cc-telegram", tags=["Difusión"])
+async def difusion_cc_telegram(
+    body: DifusionCCTelegramRequest,
+    user_payload=Depends(verify_auth),
+):
+    """Envía CC como PDF al grupo Telegram del vendedor (o de todos en la sucursal)."""
+    _check_cc_body(body, user_payload)
+
     try:
-        result = difundir_cc_telegram(
+        result = await difundir_cc_telegram_async(
             dist_id=body.dist_id,
             modo=body.modo,
             id_vendedor=body.id_vendedor,
@@ -95,6 +101,46 @@ def difusion_cc_telegram(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/api/difusion/cc-telegram/stream", tags=["Difusión"])
+async def difusion_cc_telegram_stream(
+    body: DifusionCCTelegramRequest,
+    user_payload=Depends(verify_auth),
+):
+    """
+    Igual que /cc-telegram pero devuelve NDJSON: una línea por evento
+    (inicio → resultado por vendedor a medida que sale → fin con el resumen).
+    """
+    _check_cc_body(body, user_payload)
+
+    events = iter_difusion_cc(
+        dist_id=body.dist_id,
+        modo=body.modo,
+        id_vendedor=body.id_vendedor,
+        sucursal=body.sucursal,
+        mensaje_template=body.mensaje_template,
+        fecha=body.fecha,
+    )
+    # El primer evento resuelve token/snapshot: los errores de config salen como HTTP, no en el stream.
+    try:
+        first = await anext(events)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"[difusion] cc-telegram/stream dist={body.dist_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def _ndjson():
+        yield json.dumps(first, ensure_ascii=False, default=str) + "\n"
+        try:
+            async for ev in events:
+                yield json.dumps(ev, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"[difusion] cc-telegram/stream dist={body.dist_id}: {e}")
+            yield json.dumps({"evento": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
 @router.post("/api/difusion/cc-telegram/preview", tags=["Difusión"])
 def difusion_cc_telegram_preview(
     body: DifusionCCTelegramRequest,
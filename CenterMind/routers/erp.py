@@ -15,6 +15,7 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
 from core.helpers import _enrich_and_store_cc
@@ -149,10 +150,26 @@ async def erp_sync_ventas(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _resolve_rpa_delta(motor: str, dist_id: int, raw):
+    """
+    Delta de filas del RPA → TablaDelta; 400 si es inválido, 409 si falta la base.
+    Descarga la base, gunzip y re-hash de filas: llamar con run_in_threadpool.
+    """
+    from services.rpa_delta_service import DeltaBaseMismatch, DeltaInvalido, resolve_delta
+
+    try:
+        return resolve_delta(motor, dist_id, raw)
+    except DeltaBaseMismatch:
+        raise HTTPException(status_code=409, detail="delta_base_mismatch")
+    except DeltaInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/api/v1/sync/erp-padrón", tags=["ERP Push"], summary="Ingesta automática de Padrón via Push (RPA)")
 async def erp_sync_padron(
     id_distribuidor: int = Query(...),
     file: UploadFile = File(...),
+    modo: str = Query("archivo", description="archivo | delta (filas cambiadas, ver services/rpa_delta_service.py)"),
     background_tasks: BackgroundTasks = BackgroundTasks(),
     _=Depends(verify_key),
 ):
@@ -161,16 +178,25 @@ async def erp_sync_padron(
 
     Llamado por ShelfMind-RPA motores/padron.py después de descargar el Excel.
     Procesa la jerarquía: sucursales_v2 → vendedores_v2 → rutas_v2 → clientes_pdv_v2.
+    Con modo=delta el archivo es el delta de filas del Hash Guard (gzip JSON).
     """
-    if not (file.filename.endswith(".xlsx") or file.filename.endswith(".xls")):
+    es_delta = modo == "delta"
+    if not es_delta and not (file.filename.endswith(".xlsx") or file.filename.endswith(".xls")):
         raise HTTPException(status_code=400, detail="Se requiere un archivo .xlsx o .xls")
     try:
         content = await file.read()
         if not content:
             raise HTTPException(status_code=400, detail="Archivo vacío")
+        tabla = await run_in_threadpool(_resolve_rpa_delta, "padron", id_distribuidor, content) if es_delta else None
 
         def _padron_sync_rpa_background(dist_id: int, file_bytes: bytes) -> None:
             try:
+                if tabla is not None:
+                    from services.rpa_delta_service import save_base, tabla_a_xlsx
+
+                    padron_service.ingest_for_dist(tabla_a_xlsx(tabla), dist_id)
+                    save_base(tabla)
+                    return
                 padron_service.ingest_for_dist(file_bytes, dist_id)
             except Exception as exc:
                 logger.exception(
@@ -190,8 +216,11 @@ async def erp_sync_padron(
         return {
             "status": "accepted",
             "message": f"Padrón recibido para dist {id_distribuidor} ({len(content):,} bytes). Procesando en segundo plano.",
+            "delta": tabla.stats if tabla is not None else None,
             "timestamp": datetime.now().isoformat(),
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en endpoint sync padrón: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -614,6 +643,7 @@ async def motor_ventas(
 async def motor_ventas_enriched(
     tenant_id: str = Form(...),
     file: UploadFile = File(...),
+    modo: str = Query("archivo", description="archivo | delta (filas cambiadas, ver services/rpa_delta_service.py)"),
     _=Depends(verify_key),
 ):
     """
@@ -621,13 +651,33 @@ async def motor_ventas_enriched(
 
     Patrón async como erp-padrón: acepta el Excel, responde al RPA de inmediato (202)
     y procesa upsert pesado en thread (evita 524/502 de Cloudflare en corridas largas).
+    Con modo=delta el archivo es el delta de filas del Hash Guard (gzip JSON).
     """
-    if not (file.filename.endswith(".xlsx") or file.filename.endswith(".xls")):
+    es_delta = modo == "delta"
+    if not es_delta and not (file.filename.endswith(".xlsx") or file.filename.endswith(".xls")):
         raise HTTPException(status_code=400, detail="Se requiere un archivo .xlsx o .xls")
     try:
         file_bytes = await file.read()
-        payload = accept_enriched_upload(tenant_id, file_bytes)
+        on_ok = None
+        tabla = None
+        if es_delta:
+            from functools import partial
+
+            from services.rpa_delta_service import save_base, tabla_a_xlsx
+
+            dist_id = TENANT_DIST_MAP.get((tenant_id or "").strip().lower())
+            if not dist_id:
+                raise ValueError(f"tenant_id desconocido para enriquecido: {tenant_id}")
+            tabla = await run_in_threadpool(_resolve_rpa_delta, "ventas_enriched", int(dist_id), file_bytes)
+            file_bytes = await run_in_threadpool(tabla_a_xlsx, tabla)
+            on_ok = partial(save_base, tabla)
+
+        payload = accept_enriched_upload(tenant_id, file_bytes, on_ok=on_ok)
+        if tabla is not None:
+            payload["delta"] = tabla.stats
         return JSONResponse(status_code=202, content=payload)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -890,9 +940,26 @@ async def sync_cuentas_corrientes(
     id_distribuidor: int = Query(...),
     user_key: str = Depends(verify_key),
 ):
-    run_id = start_cc_motor_run(id_distribuidor)
+    run_id = None
     try:
         payload = await request.json()
+        # Delta de detalle_cuentas (Hash Guard RPA): se resuelve antes del run (409 ⇒ reenvío completo).
+        tabla = None
+        if payload.get("delta") is not None:
+            tabla = await run_in_threadpool(_resolve_rpa_delta, "cuentas", id_distribuidor, payload["delta"])
+            payload["datos"] = {**(payload.get("datos") or {}), "detalle_cuentas": tabla.filas}
+        elif payload.get("delta_clave") and (payload.get("datos") or {}).get("detalle_cuentas"):
+            from services.rpa_delta_service import tabla_from_rows
+
+            tabla = await run_in_threadpool(
+                tabla_from_rows,
+                "cuentas",
+                id_distribuidor,
+                str(payload["delta_clave"]),
+                payload["datos"]["detalle_cuentas"],
+            )
+
+        run_id = start_cc_motor_run(id_distribuidor)
         tenant_id = payload.get("tenant_id")
         datos     = payload.get("datos")
         if not tenant_id or not datos:
@@ -917,16 +984,25 @@ async def sync_cuentas_corrientes(
         finish_cc_motor_run(
             run_id, id_distribuidor, "ok", regs, source="sync_cuentas_corrientes",
         )
+        delta_base = None
+        if tabla is not None:
+            from services.rpa_delta_service import save_base
+
+            delta_base = tabla.huella if save_base(tabla) else None
         return {
             "ok": True,
             "message": "Datos sincronizados",
             "registros_cc_detalle": saved,
             "run_id": run_id,
+            "delta": tabla.stats if tabla is not None else None,
+            "delta_base": delta_base,
         }
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error sync cuentas corrientes dist={id_distribuidor}: {e}")
+        if run_id is None:  # body ilegible / delta: el run de error queda igual registrado
+            run_id = start_cc_motor_run(id_distribuidor)
         finish_cc_motor_run(run_id, id_distribuidor, "error", error_msg=str(e)[:500])
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -993,6 +1069,38 @@ async def ops_motor_error(request: Request, _=Depends(verify_key)):
     return {"ok": True, "motor": motor, "dist_id": dist_id}
 
 
+@router.post(
+    "/api/v1/ops/motor-telemetria",
+    tags=["Ops"],
+    summary="Tiempos por paso y esperas del navegador de un motor RPA",
+)
+async def ops_motor_telemetria(request: Request, _=Depends(verify_key)):
+    """ShelfMind-RPA manda NavMetricas.resumen() al cerrar cada tenant → motor_runs (rpa_<motor>)."""
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    motor = str(body.get("motor") or "").strip().lower()
+    try:
+        dist_id = int(body.get("dist_id") or 0) or None
+    except (TypeError, ValueError):
+        dist_id = None
+    from services.rpa_telemetry_service import registrar_telemetria
+
+    try:
+        run_id = registrar_telemetria(
+            motor,
+            dist_id,
+            body.get("telemetria"),
+            estado=str(body.get("estado") or "ok"),
+            error_msg=body.get("error_msg"),
+            tenant=body.get("tenant"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": run_id is not None, "run_id": run_id}
+
+
 @router.get("/api/cuentas-corrientes/{id_distribuidor}", summary="Obtener Cuentas Corrientes")
 async def get_cuentas_corrientes(id_distribuidor: int, user_payload: dict = Depends(verify_auth)):
     check_dist_permission(user_payload, id_distribuidor)
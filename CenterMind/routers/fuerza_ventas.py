@@ -25,6 +25,8 @@ from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 
+from core.foto_renditions import rendition_fields
+from core.identity_cache import invalidate_identity
 from core.security import verify_auth, check_dist_permission, require_compania_role
 from core.tenant_tables import tenant_table_name, load_dist_ids, find_dist_by_vendedor
 from core.helpers import (
@@ -306,6 +308,7 @@ def _ex_row_to_galeria_timeline_item(ex: dict) -> GaleriaTimelineItem:
     return GaleriaTimelineItem(
         id_exhibicion=int(ex["id_exhibicion"]),
         url_foto=ex.get("url_foto_drive") or "",
+        **rendition_fields(ex),
         estado=ex.get("estado") or "Pendiente",
         timestamp_subida=ex.get("timestamp_subida") or "",
         fecha_evaluacion=ex.get("evaluated_at"),
@@ -341,6 +344,7 @@ def _fetch_galeria_exhibiciones_for_scope(
 ) -> list[dict]:
     """Pagina exhibiciones del scope (dist + integrantes opcional)."""
     select_attempts = [
+        _GALERIA_EX_TIMELINE_SELECT + ", foto_renditions",
         _GALERIA_EX_TIMELINE_SELECT,
         "id_exhibicion, url_foto_drive, estado, timestamp_subida, "
         "evaluated_at, supervisor_nombre, comentario_evaluacion, tipo_pdv, "
@@ -779,6 +783,8 @@ def fuerza_ventas_update_vendedor(
                         telegram_user_id_secondary=tg_uid_sec,
                     )
 
+        # nombre_erp / binding cambian los mapas integrante → ERP
+        invalidate_identity(dist_id, "fuerza_ventas_vendedor")
         return {"ok": True, "id_vendedor": id_vendedor}
     except HTTPException:
         raise
@@ -824,6 +830,7 @@ def fuerza_ventas_adoptar_legacy(id_vendedor: int, payload=Depends(verify_auth))
             },
             on_conflict="id_distribuidor,id_vendedor_v2",
         ).execute()
+        invalidate_identity(dist_id, "adoptar_legacy")
 
         return {
             "ok": True,
@@ -1519,6 +1526,7 @@ def galeria_list_clientes_por_vendedor(
 
         exhibiciones: list[dict] = []
         ex_select_attempts = [
+            "id_exhibicion, id_cliente_pdv, id_cliente, nro_cliente, cliente_sombra_codigo, url_foto_drive, foto_renditions, estado, timestamp_subida",
             "id_exhibicion, id_cliente_pdv, id_cliente, nro_cliente, cliente_sombra_codigo, url_foto_drive, estado, timestamp_subida",
             "id_exhibicion, id_cliente_pdv, id_cliente, cliente_sombra_codigo, url_foto_drive, estado, timestamp_subida",
             "id_exhibicion, id_cliente_pdv, id_cliente, url_foto_drive, estado, timestamp_subida",
@@ -1703,6 +1711,7 @@ def galeria_list_clientes_por_vendedor(
                 nombre_cliente=nombre_final,
                 nombre_fantasia=nombre_fantasia or None,
                 ultima_exhibicion_url=ultima.get("url_foto_drive"),
+                ultima_exhibicion_thumb=rendition_fields(ultima)["url_foto_thumb"],
                 ultima_exhibicion_fecha=ultima.get("timestamp_subida"),
                 ultimo_estado=ultima.get("estado"),
                 fecha_ultima_compra=meta.get("fecha_ultima_compra") if meta else None,
@@ -2032,6 +2041,7 @@ def galeria_timeline_cliente(
                 GaleriaTimelineItem(
                     id_exhibicion=ex["id_exhibicion"],
                     url_foto=ex.get("url_foto_drive", ""),
+                    **rendition_fields(ex),
                     estado=ex.get("estado", "Pendiente"),
                     timestamp_subida=ex.get("timestamp_subida", ""),
                     fecha_evaluacion=ex.get("evaluated_at"),
@@ -24,8 +24,9 @@ from core.exhibicion_aggregate import (
     aggregate_ranking_by_vendor_compania,
     count_active_vendors,
 )
+from core.foto_renditions import rendition_fields
 from core.security import verify_auth, check_dist_permission, require_compania_role
-from db import sb
+from db import aexecute, asb, sb
 from models.schemas import BonusConfigPayload, ReporteQuery
 
 logger = logging.getLogger("ShelfyAPI")
@@ -161,55 +162,60 @@ def _resolve_ciudad_dominante_for_nombre(
     return None
 
 
-def _resolve_sucursal_pk(distribuidor_id: int, sucursal_param: str | int | None) -> int | None:
-    """Resuelve filtro de sucursal: acepta id_sucursal (PK) o id_sucursal_erp (location_id del dashboard)."""
+def _sucursal_pk_queries(client: Any, distribuidor_id: int, raw: str) -> list[tuple[Any, bool]]:
+    """Lookups de _resolve_sucursal_pk en orden de prioridad (client = sb o asb); bool = tolera error."""
+    t_sucursales = tenant_table_name("sucursales_v2", distribuidor_id)
+
+    def _base(table: str):
+        return client.table(table).select("id_sucursal").eq("id_distribuidor", distribuidor_id)
+
+    queries: list[tuple[Any, bool]] = []
+    if raw.isdigit():
+        queries.append((_base(t_sucursales).eq("id_sucursal", int(raw)).limit(1), False))
+    for erp_key in (raw, raw.lstrip("0") or "0"):
+        queries.append((_base(t_sucursales).eq("id_sucursal_erp", erp_key).limit(1), False))
+    queries.append((_base("sucursales").eq("id_sucursal_erp", raw).limit(1), True))
+    return queries
+
+
+def _sucursal_param_raw(sucursal_param: str | int | None) -> str | None:
     if sucursal_param is None:
         return None
     raw = str(sucursal_param).strip()
-    if not raw:
-        return None
-
-    t_sucursales = tenant_table_name("sucursales_v2", distribuidor_id)
+    return raw or None
 
-    if raw.isdigit():
-        sid = int(raw)
-        chk = (
-            sb.table(t_sucursales)
-            .select("id_sucursal")
-            .eq("id_distribuidor", distribuidor_id)
-            .eq("id_sucursal", sid)
-            .limit(1)
-            .execute()
-        )
-        if chk.data:
-            return sid
 
-    for erp_key in (raw, raw.lstrip("0") or "0"):
-        res = (
-            sb.table(t_sucursales)
-            .select("id_sucursal")
-            .eq("id_distribuidor", distribuidor_id)
-            .eq("id_sucursal_erp", erp_key)
-            .limit(1)
-            .execute()
-        )
+def _resolve_sucursal_pk(distribuidor_id: int, sucursal_param: str | int | None) -> int | None:
+    """Resuelve filtro de sucursal: acepta id_sucursal (PK) o id_sucursal_erp (location_id del dashboard)."""
+    raw = _sucursal_param_raw(sucursal_param)
+    if raw is None:
+        return None
+    for q, optional in _sucursal_pk_queries(sb, distribuidor_id, raw):
+        try:
+            res = q.execute()
+        except Exception:
+            if optional:
+                continue
+            raise
         if res.data:
             return int(res.data[0]["id_sucursal"])
+    return None
 
-    try:
-        res_legacy = (
-            sb.table("sucursales")
-            .select("id_sucursal")
-            .eq("id_distribuidor", distribuidor_id)
-            .eq("id_sucursal_erp", raw)
-            .limit(1)
-            .execute()
-        )
-        if res_legacy.data:
-            return int(res_legacy.data[0]["id_sucursal"])
-    except Exception:
-        pass
 
+async def _aresolve_sucursal_pk(distribuidor_id: int, sucursal_param: str | int | None) -> int | None:
+    """_resolve_sucursal_pk sobre el cliente async."""
+    raw = _sucursal_param_raw(sucursal_param)
+    if raw is None:
+        return None
+    for q, optional in _sucursal_pk_queries(asb, distribuidor_id, raw):
+        try:
+            res = await aexecute(q)
+        except Exception:
+            if optional:
+                continue
+            raise
+        if res.data:
+            return int(res.data[0]["id_sucursal"])
     return None
 
 
@@ -568,7 +574,7 @@ _ULTIMAS_ESTADOS = ("Aprobado", "Destacado", "Destacada")
 _MIN_ULTIMAS_HOY = 3
 _MAX_ULTIMAS_LOOKBACK_DAYS = 14
 _ULTIMAS_EX_SELECT = (
-    "id_exhibicion,id_integrante,estado,url_foto_drive,timestamp_subida,evaluated_at,"
+    "id_exhibicion,id_integrante,estado,url_foto_drive,foto_renditions,timestamp_subida,evaluated_at,"
     "tipo_pdv,id_cliente_pdv,id_cliente,cliente_sombra_codigo"
 )
 
@@ -588,6 +594,7 @@ def _ultimas_row_from_ex(ex: dict, seen_ex: set[int]) -> Optional[dict]:
     return {
         "id_exhibicion": eid,
         "drive_link": _ultimas_safe_text(ex.get("url_foto_drive")),
+        **rendition_fields(ex),
         "estado": _ultimas_safe_text(ex.get("estado")),
         "tipo_pdv": _ultimas_safe_text(ex.get("tipo_pdv")),
         "nro_cliente": _ultimas_safe_text(ex.get("cliente_sombra_codigo")).strip(),
@@ -710,19 +717,16 @@ def _filter_ultimas_by_sucursal(rows: list[dict], allowed_integrantes: set[int]
     return out
 
 
-def _enrich_por_sucursal_rows(rows: list[dict], distribuidor_id: int) -> list[dict]:
-    """Agrega id_sucursal (PK) para que el filtro del dashboard use la misma clave que el backend."""
-    if not rows:
-        return rows
+def _sucursales_pk_query(client: Any, distribuidor_id: int):
     t_sucursales = tenant_table_name("sucursales_v2", distribuidor_id)
-    suc_rows = (
-        sb.table(t_sucursales)
+    return (
+        client.table(t_sucursales)
         .select("id_sucursal,id_sucursal_erp,nombre_erp")
         .eq("id_distribuidor", distribuidor_id)
-        .execute()
-        .data
-        or []
     )
+
+
+def _apply_sucursal_pk(rows: list[dict], suc_rows: list[dict]) -> list[dict]:
     erp_to_pk: dict[str, int] = {}
     nombre_to_pk: dict[str, int] = {}
     for s in suc_rows:
@@ -747,6 +751,21 @@ def _enrich_por_sucursal_rows(rows: list[dict], distribuidor_id: int) -> list[di
     return enriched
 
 
+def _enrich_por_sucursal_rows(rows: list[dict], distribuidor_id: int) -> list[dict]:
+    """Agrega id_sucursal (PK) para que el filtro del dashboard use la misma clave que el backend."""
+    if not rows:
+        return rows
+    suc_rows = _sucursales_pk_query(sb, distribuidor_id).execute().data or []
+    return _apply_sucursal_pk(rows, suc_rows)
+
+
+async def _aenrich_por_sucursal_rows(rows: list[dict], distribuidor_id: int) -> list[dict]:
+    if not rows:
+        return rows
+    suc_rows = (await aexecute(_sucursales_pk_query(asb, distribuidor_id))).data or []
+    return _apply_sucursal_pk(rows, suc_rows)
+
+
 def _resolve_period_bounds(periodo: str) -> tuple[str, str]:
     try:
         ar_offset_hours = float(AR_OFFSET)
@@ -953,9 +972,9 @@ def _fetch_exhibiciones_periodo(distribuidor_id: int, start_iso: str, end_iso: s
 # ─── Landing pública ─────────────────────────────────────────────────────────
 
 @router.get("/api/public/landing-stats", summary="Estadísticas públicas para la Landing Page")
-def public_landing_stats():
+async def public_landing_stats():
     try:
-        result = sb.rpc("fn_landing_stats", {}).execute()
+        result = await aexecute(asb.rpc("fn_landing_stats", {}))
         if result.data:
             return result.data[0]
         return {"auditorias_pdv": 0, "miembros_activos": 0, "sucursales_vinculadas": 0}
@@ -966,10 +985,10 @@ def public_landing_stats():
 # ─── Reports ─────────────────────────────────────────────────────────────────
 
 @router.get("/api/reports/performance/{id_distribuidor}", tags=["Reports"])
-def get_reporte_performance(id_distribuidor: int, mes: int = Query(...), anio: int = Query(...), user_payload=Depends(verify_auth)):
+async def get_reporte_performance(id_distribuidor: int, mes: int = Query(...), anio: int = Query(...), user_payload=Depends(verify_auth)):
     check_dist_permission(user_payload, id_distribuidor)
     try:
-        res = sb.rpc("fn_reporte_vendedor_objetivos", {"p_dist_id": id_distribuidor, "p_mes": mes, "p_anio": anio}).execute()
+        res = await aexecute(asb.rpc("fn_reporte_vendedor_objetivos", {"p_dist_id": id_distribuidor, "p_mes": mes, "p_anio": anio}))
         return res.data or []
     except Exception as e:
         logger.error(f"Error en reporte performance: {e}")
@@ -977,10 +996,10 @@ def get_reporte_performance(id_distribuidor: int, mes: int = Query(...), anio: i
 
 
 @router.get("/api/reports/ventas-resumen/{id_distribuidor}", tags=["Reports"])
-def get_ventas_resumen(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), user_payload=Depends(verify_auth)):
+async def get_ventas_resumen(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), user_payload=Depends(verify_auth)):
     check_dist_permission(user_payload, id_distribuidor)
     try:
-        res = sb.rpc("fn_reporte_comprobantes_resumen", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta}).execute()
+        res = await aexecute(asb.rpc("fn_reporte_comprobantes_resumen", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta}))
         return res.data or []
     except Exception as e:
         logger.error(f"Error en reporte ventas resumen: {e}")
@@ -988,10 +1007,10 @@ def get_ventas_resumen(id_distribuidor: int, desde: str = Query(...), hasta: str
 
 
 @router.get("/api/reports/ventas-bultos/{id_distribuidor}", tags=["Reports"])
-def get_ventas_bultos(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), proveedor: str | None = Query(None), user_payload=Depends(verify_auth)):
+async def get_ventas_bultos(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), proveedor: str | None = Query(None), user_payload=Depends(verify_auth)):
     check_dist_permission(user_payload, id_distribuidor)
     try:
-        res = sb.rpc("fn_reporte_comprobantes_detallado", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta, "p_proveedor_busqueda": proveedor}).execute()
+        res = await aexecute(asb.rpc("fn_reporte_comprobantes_detallado", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta, "p_proveedor_busqueda": proveedor}))
         return res.data or []
     except Exception as e:
         logger.error(f"Error en reporte ventas bultos: {e}")
@@ -1082,10 +1101,10 @@ def get_sigo_detail(
 
 
 @router.get("/api/reports/auditoria-sigo/{id_distribuidor}", tags=["Reports"])
-def get_auditoria_sigo(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), user_payload=Depends(verify_auth)):
+async def get_auditoria_sigo(id_distribuidor: int, desde: str = Query(...), hasta: str = Query(...), user_payload=Depends(verify_auth)):
     check_dist_permission(user_payload, id_distribuidor)
     try:
-        res = sb.rpc("fn_reporte_sigo_audit", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta}).execute()
+        res = await aexecute(asb.rpc("fn_reporte_sigo_audit", {"p_dist_id": id_distribuidor, "p_desde": desde, "p_hasta": hasta}))
         return res.data or []
     except Exception as e:
         logger.error(f"Error en reporte sigo audit: {e}")
@@ -1395,60 +1414,60 @@ def dashboard_ranking_historico(distribuidor_id: int, sucursal_id: int = Query(N
 
 
 @router.get("/api/dashboard/evolucion-tiempo/{distribuidor_id}", summary="Evolución temporal de exhibiciones")
-def dashboard_evolucion(
+async def dashboard_evolucion(
     distribuidor_id: int,
     periodo: str = "mes",
     sucursal_id: Optional[str] = Query(None),
     payload=Depends(verify_auth),
 ):
     check_dist_permission(payload, distribuidor_id)
-    suc_pk = _resolve_sucursal_pk(distribuidor_id, sucursal_id)
-    res = sb.rpc(
+    suc_pk = await _aresolve_sucursal_pk(distribuidor_id, sucursal_id)
+    res = await aexecute(asb.rpc(
         "fn_dashboard_evolucion_tiempo",
         {"p_dist_id": distribuidor_id, "p_periodo": periodo, "p_sucursal_id": suc_pk},
-    ).execute()
+    ))
     return res.data or []
 
 
 @router.get("/api/dashboard/por-ciudad/{distribuidor_id}", summary="Rendimiento agrupado por ciudad")
-def dashboard_por_ciudad(
+async def dashboard_por_ciudad(
     distribuidor_id: int,
     periodo: str = "mes",
     sucursal_id: Optional[str] = Query(None),
     payload=Depends(verify_auth),
 ):
     check_dist_permission(payload, distribuidor_id)
-    suc_pk = _resolve_sucursal_pk(distribuidor_id, sucursal_id)
-    res = sb.rpc(
+    suc_pk = await _aresolve_sucursal_pk(distribuidor_id, sucursal_id)
+    res = await aexecute(asb.rpc(
         "fn_dashboard_por_ciudad",
         {"p_dist_id": distribuidor_id, "p_periodo": periodo, "p_sucursal_id": suc_pk},
-    ).execute()
+    ))
     return res.data or []
 
 
 @router.get("/api/dashboard/por-empresa", summary="Rendimiento por empresa (Superadmin)")
-def dashboard_por_empresa(
+async def dashboard_por_empresa(
     periodo: str = "mes",
     sucursal_id: Optional[str] = Query(None),
     payload=Depends(verify_auth),
 ):
     if not payload.get("is_superadmin"):
         raise HTTPException(status_code=403, detail="Acceso solo para Superadmins")
-    suc_pk = _resolve_sucursal_pk(0, sucursal_id) if sucursal_id else None
-    res = sb.rpc("fn_dashboard_por_empresa", {"p_periodo": periodo, "p_sucursal_id": suc_pk}).execute()
+    suc_pk = await _aresolve_sucursal_pk(0, sucursal_id) if sucursal_id else None
+    res = await aexecute(asb.rpc("fn_dashboard_por_empresa", {"p_periodo": periodo, "p_sucursal_id": suc_pk}))
     return res.data or []
 
 
 @router.get("/api/dashboard/por-sucursal/{distribuidor_id}", summary="Exhibiciones agrupadas por sucursal")
-def dashboard_por_sucursal(
+async def dashboard_por_sucursal(
     distribuidor_id: int,
     periodo: str = "mes",
     sucursal_id: Optional[str] = Query(None),
     payload=Depends(verify_auth),
 ):
     check_dist_permission(payload, distribuidor_id)
-    res = sb.rpc("fn_dashboard_por_sucursal", {"p_dist_id": distribuidor_id, "p_periodo": periodo}).execute()
-    return _enrich_por_sucursal_rows(res.data or [], distribuidor_id)
+    res = await aexecute(asb.rpc("fn_dashboard_por_sucursal", {"p_dist_id": distribuidor_id, "p_periodo": periodo}))
+    return await _aenrich_por_sucursal_rows(res.data or [], distribuidor_id)
 
 
 @router.get("/api/dashboard/ultimas-evaluadas/{distribuidor_id}", summary="Últimas fotos evaluadas")
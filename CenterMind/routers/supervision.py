@@ -41,7 +41,7 @@ from core.tenant_tables import (
     find_dist_by_vendedor,
     find_dist_by_ruta,
 )
-from db import sb
+from db import aexecute, asb, fetch_all, sb
 from models.schemas import (
     EvaluarRequest,
     MapaCapaAnclar,
@@ -525,11 +525,11 @@ def get_pendientes(id_distribuidor: int, payload=Depends(verify_auth)):
 
 
 @router.get("/api/stats/{id_distribuidor}", summary="Estadisticas del dia actual")
-def get_stats(id_distribuidor: int, payload=Depends(verify_auth)):
+async def get_stats(id_distribuidor: int, payload=Depends(verify_auth)):
     check_dist_permission(payload, id_distribuidor)
     try:
         hoy = datetime.now().strftime("%Y-%m-%d")
-        result = sb.rpc("fn_stats_hoy", {"p_dist_id": id_distribuidor, "p_fecha": hoy}).execute()
+        result = await aexecute(asb.rpc("fn_stats_hoy", {"p_dist_id": id_distribuidor, "p_fecha": hoy}))
         r = result.data[0] if result.data else {}
         return {k: (v or 0) for k, v in r.items()}
     except Exception as e:
@@ -671,18 +671,13 @@ def evaluar(req: EvaluarRequest, user_payload=Depends(verify_auth)):
             except Exception as e_vin:
                 logger.warning(f"[evaluar] enrich vínculo exhibición-objetivo: {e_vin}")
 
-            # Invalidar snapshots de dashboard y visor tras evaluación
+            # Invalidar snapshots de dashboard y visor tras evaluación (inline: el portal
+            # refetchea el visor enseguida); el recálculo del visor va a la cola.
             try:
+                from core.job_queue import enqueue_snapshots
                 from services.snapshot_refresh_service import handle_ingestion_event
                 handle_ingestion_event("evaluacion", dist_id)
-                import threading
-                from services.snapshot_visor_service import force_persist_visor
-
-                threading.Thread(
-                    target=force_persist_visor,
-                    args=(dist_id,),
-                    daemon=True,
-                ).start()
+                enqueue_snapshots(dist_id, warm=["visor"])
             except Exception as _e:
                 logger.debug(f"[evaluar] snapshot invalidate: {_e}")
 
@@ -743,33 +738,29 @@ def evaluar(req: EvaluarRequest, user_payload=Depends(verify_auth)):
                                 "updated_at": datetime.now(timezone.utc).isoformat(),
                             }).eq("id", item["id"]).execute()
                             obj_ids_watch.add(oid_item)
-                if obj_ids_watch:
-                    import threading
-                    from services.objetivos_watcher_service import objetivos_watcher
-
-                    def _run_evaluar_watchers():
-                        try:
-                            for oid_w in obj_ids_watch:
-                                objetivos_watcher.run_watcher(dist_id, obj_id=oid_w)
-                        except Exception as _we:
-                            logger.warning(f"[evaluar] Watcher batch: {_we}")
-
-                    threading.Thread(target=_run_evaluar_watchers, daemon=True).start()
-                else:
-                    try:
-                        import threading
-                        from services.objetivos_watcher_service import objetivos_watcher
-                        threading.Thread(
-                            target=objetivos_watcher.run_watcher,
-                            args=(dist_id,),
-                            daemon=True,
-                        ).start()
-                    except Exception as e_watch:
-                        logger.warning(f"[evaluar] Watcher global omitido: {e_watch}")
+                # Watcher en background_jobs: evaluaciones seguidas del tenant se fusionan en una corrida.
+                # Sólo objetivos vinculados + los de exhibición de esos PDVs / sus vendedores.
+                try:
+                    from core.job_queue import enqueue_objetivos_watcher
+                    from core.objetivos_deps import FUENTE_EXHIBICIONES, Cambio
+                    enqueue_objetivos_watcher(dist_id, cambio=Cambio.de(
+                        FUENTE_EXHIBICIONES,
+                        clientes=(e.get("id_cliente_pdv") for e in (exhib_data.data or [])),
+                        obj_ids=obj_ids_watch,
+                    ))
+                except Exception as e_watch:
+                    logger.warning(f"[evaluar] Watcher omitido: {e_watch}")
             except Exception as e_items:
                 logger.warning(f"[evaluar] No se pudo actualizar objetivo_items: {e_items}")
 
         if affected > 0:
+            # Mensaje del grupo Telegram: evento al bot del tenant (cola en memoria o bot_eval_events)
+            try:
+                from core.bot_eval_events import publish_evaluaciones
+
+                publish_evaluaciones(dist_id, [row.get("id_exhibicion") for row in r.data], sb=sb)
+            except Exception as e_ev:
+                logger.debug(f"[evaluar] evento bot omitido: {e_ev}")
             try:
                 broadcast_sync(dist_id, {
                     "type": "evaluation_updated",
@@ -830,9 +821,11 @@ def revertir(req: RevertirRequest, user_payload=Depends(verify_auth)):
             affected += len(r.data) if r.data else 0
         if affected > 0:
             try:
+                from core.job_queue import enqueue_snapshots
                 from services.snapshot_refresh_service import handle_ingestion_event
 
                 handle_ingestion_event("evaluacion", dist_id)
+                enqueue_snapshots(dist_id, warm=["visor"])
             except Exception as _e:
                 logger.debug(f"[revertir] snapshot invalidate: {_e}")
             try:
@@ -1658,18 +1651,6 @@ _CC_DETALLE_COLS = (
 )
 
 
-def _paginate_supabase(query_fn, page_size: int = 1000) -> list[dict]:
-    rows: list[dict] = []
-    offset = 0
-    while True:
-        batch = query_fn(offset, page_size).execute().data or []
-        rows.extend(batch)
-        if len(batch) < page_size:
-            break
-        offset += page_size
-    return rows
-
-
 def _resolve_sucursal_vendedor_ids(d_id: int, sucursal: str) -> tuple[set[int], str]:
     """id_vendedor válidos para una sucursal (nombre_erp en sucursales_v2)."""
     t_sucursales = tenant_table_name("sucursales_v2", d_id)
@@ -1716,29 +1697,21 @@ def _fetch_cc_detalle_rows(
 
     rows: list[dict] = []
     if id_vendedor is not None:
-        rows = _paginate_supabase(
-            lambda o, p: _base().eq("id_vendedor", int(id_vendedor)).range(o, o + p - 1)
-        )
+        rows = fetch_all(lambda: _base().eq("id_vendedor", int(id_vendedor)))
     elif valid_vend_ids:
         vend_list = list(valid_vend_ids)
         for i in range(0, len(vend_list), 200):
             chunk = vend_list[i : i + 200]
-            rows.extend(
-                _paginate_supabase(
-                    lambda o, p, ch=chunk: _base().in_("id_vendedor", ch).range(o, o + p - 1)
-                )
-            )
+            rows.extend(fetch_all(lambda ch=chunk: _base().in_("id_vendedor", ch)))
         if sucursal_norm_upper:
-            orphans = _paginate_supabase(
-                lambda o, p: _base().is_("id_vendedor", "null").range(o, o + p - 1)
-            )
+            orphans = fetch_all(lambda: _base().is_("id_vendedor", "null"))
             rows.extend(
                 r
                 for r in orphans
                 if (r.get("sucursal_nombre") or "").strip().upper() == sucursal_norm_upper
             )
     else:
-        rows = _paginate_supabase(lambda o, p: _base().range(o, o + p - 1))
+        rows = fetch_all(_base)
     return rows
 
 
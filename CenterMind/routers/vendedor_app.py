@@ -18,7 +18,12 @@ from pydantic import BaseModel
 
 from core.security import verify_auth, check_dist_permission, normalize_rol
 from core.vendedor_app_auth import decode_session_jwt
-from core.vendedor_app_patron_scope import resolve_patron_scope, resolve_patron_cartera_filter, list_patron_cuentas
+from core.vendedor_app_patron_scope import (
+    aresolve_patron_scope,
+    list_patron_cuentas,
+    resolve_patron_cartera_filter,
+    resolve_patron_scope,
+)
 from core.pdv_proximity import pdvs_cercanos_cartera, pdv_buscar_texto
 from services.vendedor_pendientes_service import registrar_pdv_pendiente, listar_pdv_pendientes
 from services.vendedor_app_auth_service import (
@@ -31,13 +36,13 @@ from services.vendedor_app_auth_service import (
 from services.vendedor_cartera_service import build_cartera_json
 from services.vendedor_upload_service import (
     process_exhibicion_upload,
-    upload_mobile_photos_to_storage,
+    aupload_mobile_photos_to_storage,
     validate_nro_cliente_en_cartera,
     resolve_upload_telegram_user_id,
 )
 from services.vendedor_stats_service import get_stats_vendedor_app
 from services.vendedor_objetivos_service import list_objetivos_vendedor
-from db import sb
+from db import aexecute, asb, sb
 
 logger = logging.getLogger("ShelfyAPI")
 router = APIRouter(prefix="/api/vendedor-app", tags=["Vendedor App"])
@@ -90,8 +95,8 @@ async def patron_scope_dep(
     ),
 ) -> dict:
     """Scope efectivo: integrantes filtrados si el vendedor es patrón multi-cuenta."""
-    scope = resolve_patron_scope(
-        sb,
+    scope = await aresolve_patron_scope(
+        asb,
         int(session["dist"]),
         int(session["vendor"]),
         cuenta,
@@ -204,19 +209,18 @@ def get_session_cuentas(session: dict = Depends(vendedor_session_dep)):
     "/branding",
     summary="Obtener branding del distribuidor para la app",
 )
-def get_branding(session: dict = Depends(vendedor_session_dep)):
+async def get_branding(session: dict = Depends(vendedor_session_dep)):
     """Retorna mobile_branding del distribuidor con defaults si no configurado."""
     id_distribuidor = session.get("dist")
     if not id_distribuidor:
         raise HTTPException(status_code=400, detail="dist no encontrado en sesión")
 
     try:
-        res = (
-            sb.table("distribuidores")
+        res = await aexecute(
+            asb.table("distribuidores")
             .select("mobile_branding, nombre")
             .eq("id_distribuidor", id_distribuidor)
             .limit(1)
-            .execute()
         )
     except Exception as e:
         logger.error(f"get_branding dist={id_distribuidor}: {e}")
@@ -502,7 +506,7 @@ async def post_exhibicion_batch_multipart(
         raise HTTPException(status_code=400, detail="Las fotos enviadas están vacías")
 
     try:
-        photo_urls = upload_mobile_photos_to_storage(sb, dist_id, file_payloads)
+        photo_urls = await aupload_mobile_photos_to_storage(sb, dist_id, file_payloads)
         upload_tg = resolve_upload_telegram_user_id(
             sb, dist_id, id_vendedor_v2, device_id, scope, nro_cliente=nro_cliente
         )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Genera renditions WebP (thumb / med) para fotos de exhibición históricas (core/foto_renditions.py).
+
+Recorre exhibiciones con foto_renditions NULL por keyset (id_exhibicion), por tenant, y
+procesa cada lote en el pool de hilos de foto_renditions.procesar. Re-ejecutable: lo ya
+hecho deja de matchear el filtro. Fotos fuera del bucket Exhibiciones-PDV (links de Drive
+viejos) se saltean.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/backfill_foto_renditions.py
+  ... --dist 3 --dist 4 --workers 8 --batch 200
+  ... --desde 2026-01-01 --limit 5000
+  ... --dry-run   # sólo cuenta pendientes por tenant
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(_ROOT / "CenterMind"))
+
+from core.foto_renditions import procesar, storage_path_de_url  # noqa: E402
+from core.tenant_tables import load_dist_ids  # noqa: E402
+from db import sb  # noqa: E402
+
+
+def _pendientes(dist_id: int, desde: str | None):
+    q = (
+        sb.table("exhibiciones")
+        .select("id_exhibicion, url_foto_drive")
+        .eq("id_distribuidor", dist_id)
+        .is_("foto_renditions", "null")
+        .not_.is_("url_foto_drive", "null")
+    )
+    if desde:
+        q = q.gte("timestamp_subida", desde)
+    return q
+
+
+def _count(dist_id: int, desde: str | None) -> int:
+    q = (
+        sb.table("exhibiciones")
+        .select("id_exhibicion", count="exact")
+        .eq("id_distribuidor", dist_id)
+        .is_("foto_renditions", "null")
+        .not_.is_("url_foto_drive", "null")
+    )
+    if desde:
+        q = q.gte("timestamp_subida", desde)
+    return int(q.limit(0).execute().count or 0)
+
+
+def backfill_dist(dist_id: int, *, batch: int, workers: int, desde: str | None, limit: int | None) -> dict:
+    after, tot = 0, {"fotos": 0, "ok": 0, "errores": 0, "salteadas": 0}
+    while limit is None or tot["fotos"] < limit:
+        rows = (
+            _pendientes(dist_id, desde)
+            .gt("id_exhibicion", after)
+            .order("id_exhibicion")
+            .limit(batch)
+            .execute()
+            .data
+            or []
+        )
+        if not rows:
+            break
+        after = int(rows[-1]["id_exhibicion"])
+        fotos = [(int(r["id_exhibicion"]), r["url_foto_drive"]) for r in rows]
+        tot["salteadas"] += sum(1 for _, url in fotos if not storage_path_de_url(url))
+        t0 = time.perf_counter()
+        out = procesar(sb, fotos, workers=workers)
+        for k in ("fotos", "ok", "errores"):
+            tot[k] += out[k]
+        print(f"  dist={dist_id} id<={after}: {out} en {time.perf_counter() - t0:.1f}s")
+        if len(rows) < batch:
+            break
+    return tot
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dist", type=int, action="append", help="Sólo estos dist (repetible)")
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--desde", help="Sólo fotos con timestamp_subida >= YYYY-MM-DD")
+    ap.add_argument("--limit", type=int, help="Máximo de fotos por tenant")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+
+    for dist_id in args.dist or load_dist_ids(sb):
+        if args.dry_run:
+            print(f"dist={dist_id}: {_count(dist_id, args.desde)} pendientes")
+            continue
+        out = backfill_dist(dist_id, batch=args.batch, workers=args.workers, desde=args.desde, limit=args.limit)
+        print(f"dist={dist_id}: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compacta raw_json histórico de ventas_enriched (formato v2, ver core/ventas_raw_json.py).
+
+Llama por lotes a ventas_raw_json_compact() (migrations/20260617_ventas_raw_json_compact.sql),
+keyset por id: re-ejecutable, cada lote es una transacción corta.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/backfill_ventas_raw_json_compact.py
+  ... --dist 3 --dist 4 --sin-global --batch 2000
+  ... --dry-run   # sólo cuenta filas legacy por tabla
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(_ROOT / "CenterMind"))
+
+from core.tenant_tables import load_dist_ids, tenant_table_name  # noqa: E402
+from db import sb  # noqa: E402
+
+MAX_RETRIES = 5
+
+
+def _count_legacy(table: str) -> int:
+    res = (
+        sb.table(table)
+        .select("id", count="exact")
+        .not_.is_("raw_json", "null")
+        .is_("raw_json->_v", "null")
+        .limit(0)
+        .execute()
+    )
+    return int(res.count or 0)
+
+
+def _compact_batch(table: str, after_id: int, batch: int) -> dict:
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            res = sb.rpc(
+                "ventas_raw_json_compact",
+                {"p_table": table, "p_after_id": after_id, "p_batch": batch},
+            ).execute()
+            return res.data or {}
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                raise
+            print(f"  {table} id>{after_id}: reintento {attempt} ({e})")
+            time.sleep(min(2 * attempt, 12))
+    return {}
+
+
+def compact_table(table: str, batch: int) -> int:
+    after_id, total = 0, 0
+    while True:
+        out = _compact_batch(table, after_id, batch)
+        last = out.get("last_id")
+        if last is None:
+            return total
+        total += int(out.get("updated") or 0)
+        after_id = int(last)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dist", type=int, action="append", help="Sólo estos dist (repetible)")
+    ap.add_argument("--sin-global", action="store_true", help="No tocar ventas_enriched_v2 global")
+    ap.add_argument("--batch", type=int, default=5000)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+
+    tables = [] if args.sin_global else ["ventas_enriched_v2"]
+    tables += [tenant_table_name("ventas_enriched_v2", d) for d in (args.dist or load_dist_ids(sb))]
+
+    total = 0
+    for table in tables:
+        if args.dry_run:
+            print(f"{table}: {_count_legacy(table)} filas con raw_json legacy")
+            continue
+        t0 = time.perf_counter()
+        n = compact_table(table, args.batch)
+        total += n
+        print(f"{table}: {n} filas compactadas ({time.perf_counter() - t0:.1f}s)")
+    if not args.dry_run:
+        print(f"Total: {total}. Correr VACUUM (ANALYZE) en las tablas para recuperar espacio.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bench lectura del Padrón: pd.read_excel + replace/dropna/fillna (referencia) vs
+core.excel_stream por chunks. Mide tiempo (mediana) y pico de memoria (tracemalloc).
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/bench_excel_stream.py --rows 50000
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import statistics
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+from core.excel_stream import read_str_frame
+
+
+def _synthetic_xlsx(n: int, seed: int) -> bytes:
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["idempresa", "idcliente", "nomcli", "fantacli", "vendedor", "dssucur", "ruta", "ycoord", "xcoord"])
+    for i in range(n):
+        ws.append([
+            rnd.choice([1, 2, 7]), i, f"Cliente {i}", rnd.choice(["", f"Fantasía {i}"]),
+            f"{rnd.randint(1, 40)}-VENDEDOR", rnd.choice(["CASA CENTRAL", "NORTE"]), rnd.randint(1, 90),
+            -34.5 - rnd.random(), -58.4 - rnd.random(),
+        ])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def _legacy(data: bytes) -> pd.DataFrame:
+    df = pd.read_excel(io.BytesIO(data), dtype=str, engine="openpyxl", keep_default_na=False)
+    df = df.replace("", float("nan"))
+    df = df.dropna(how="all")
+    return df.fillna("")
+
+
+def _measure(fn, data: bytes, runs: int) -> tuple[float, float, pd.DataFrame]:
+    samples: list[float] = []
+    peak = 0
+    df = None
+    for _ in range(runs):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        df = fn(data)
+        samples.append((time.perf_counter() - t0) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(samples), peak / 1e6, df
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=50000)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--chunk", type=int, default=5000)
+    args = p.parse_args()
+
+    data = _synthetic_xlsx(args.rows, seed=1)
+    print(f"xlsx={len(data) / 1e6:.1f}MB rows={args.rows}")
+    ms_ref, mb_ref, ref = _measure(_legacy, data, args.runs)
+    ms_new, mb_new, got = _measure(lambda b: read_str_frame(b, chunk_rows=args.chunk), data, args.runs)
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), ref.reset_index(drop=True), check_dtype=False)
+    print(f"{'read_excel':12} p50={ms_ref:.0f}ms peak={mb_ref:.1f}MB")
+    print(f"{'stream':12} p50={ms_new:.0f}ms peak={mb_new:.1f}MB  (frames idénticos)")
+
+
+if __name__ == "__main__":
+    main()
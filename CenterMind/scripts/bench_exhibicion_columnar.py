@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-bench agregación de exhibiciones lógicas: motor Python vs columnar (core/exhibicion_columnar).
+
+Sólo CPU, filas sintéticas en memoria. Sirve para calibrar EXHIBICION_COLUMNAR_MIN_ROWS.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/bench_exhibicion_columnar.py --rows 200000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from core import exhibicion_aggregate as agg
+from core import exhibicion_columnar as col
+
+_ESTADOS = ["Aprobado", "Destacado", "Rechazado", "Pendiente"]
+
+
+def _synthetic(n: int, seed: int) -> list[dict]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        r = {
+            "id_exhibicion": i + 1,
+            "id_integrante": rnd.randint(1, 120),
+            "estado": rnd.choice(_ESTADOS),
+            "timestamp_subida": f"2026-05-{rnd.randint(1, 28):02d}T{rnd.randint(8, 20):02d}:00:00-03:00",
+        }
+        if rnd.random() < 0.9:
+            r["id_cliente_pdv"] = rnd.randint(1, n // 6 + 1)
+        else:
+            r["url_foto_drive"] = f"u{rnd.randint(1, n)}"
+        rows.append(r)
+    return rows
+
+
+def _ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=200_000)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    os.environ["EXHIBICION_AGG_ENGINE"] = "python"
+    iid_to_erp = {i: f"VEND {i % 40}" for i in range(1, 121)}
+    for n in sorted({1_000, 5_000, 20_000, args.rows}):
+        rows = _synthetic(n, args.seed)
+        cases = [
+            ("integrante", lambda: agg.aggregate_exhibicion_counts(rows), lambda: col.aggregate_exhibicion_counts(rows)),
+            ("ranking", lambda: agg.aggregate_ranking_by_vendor(rows, iid_to_erp),
+             lambda: col.aggregate_ranking_by_vendor(rows, iid_to_erp)),
+            ("por_cliente", lambda: agg.count_logical_per_client(rows), lambda: col.count_logical_per_client(rows)),
+        ]
+        for name, py_fn, col_fn in cases:
+            py, c = _ms(py_fn, args.runs), _ms(col_fn, args.runs)
+            print(f"{n:8} filas  {name:12} python={py:8.1f}ms  columnar={c:8.1f}ms  x{py / c:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
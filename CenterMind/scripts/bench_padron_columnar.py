@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Bench extracción del Padrón: iterrows (referencia) vs columnar (services.padron_columnar).
+
+Genera un padrón sintético (dtype=str, como _parse_excel), corre ambas rutas sin tocar
+Supabase y verifica que los payloads serialicen byte a byte igual.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/bench_padron_columnar.py --rows 50000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from services import padron_columnar as col
+from services.padron_ingestion_service import (
+    PadronIngestionService,
+    _rows_cliente_records,
+    _rows_unique_rutas,
+    _rows_unique_sucursales,
+    _rows_unique_vendedores,
+)
+
+_COLUMNS = [
+    "idcliente", "nomcli", "fantacli", "vendedor", "d_vendedor", "idsucur", "dssucur", "ruta",
+    "ycoord", "xcoord", "domicli", "descloca", "telefos", "movil", "desprovincia", "descanal",
+    "fecultcom", "fecalta", "anulado", "lunes", "martes", "miercoles", "jueves", "viernes",
+]
+
+
+def _synthetic_padron(n: int, seed: int) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    vendedores = [(str(1000 + i), f"{i}-VENDEDOR {i}") for i in range(40)]
+    fechas = [f"{d:02d}/{m:02d}/2026" for m in range(1, 4) for d in range(1, 29)] + ["", "45900"]
+    rows = []
+    for i in range(n):
+        cod, nombre = rnd.choice(vendedores)
+        suc = rnd.randint(1, 3)
+        dia = rnd.randint(0, 4)
+        rows.append([
+            str(i if rnd.random() > 0.02 else rnd.randint(0, n)),  # ~2% duplicados
+            f"Cliente {i}",
+            rnd.choice(["", f"Fantasía {i}"]),
+            cod + rnd.choice(["", ".0"]),
+            nombre,
+            str(suc),
+            f"Sucursal {suc}",
+            str(rnd.randint(1, 12)),
+            f"-31,{rnd.randint(100000, 999999)}" if rnd.random() > 0.1 else "",
+            f"-64.{rnd.randint(100000, 999999)}",
+            f"Calle {i}",
+            rnd.choice(["Córdoba", "Villa Allende", "Río Ceballos"]),
+            rnd.choice(["", f"351{rnd.randint(1000000, 9999999)}.0"]),
+            "",
+            "Córdoba",
+            rnd.choice(["KIOSCO", "ALMACEN", "AUTOSERVICIO"]),
+            rnd.choice(fechas),
+            rnd.choice(fechas),
+            "SI" if rnd.random() < 0.03 else "",
+            *["1" if d == dia else "" for d in range(5)],
+        ])
+    return pd.DataFrame(rows, columns=_COLUMNS)
+
+
+def _timed(fn, runs: int) -> tuple[float, object]:
+    samples: list[float] = []
+    out = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=50_000)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    df = _synthetic_padron(args.rows, args.seed)
+    cols = PadronIngestionService()._detect_columns(df)
+    now = datetime.now(timezone.utc)
+    ruta_map = {k: i + 1 for i, k in enumerate(_rows_unique_rutas(df, cols))}
+
+    steps = [
+        ("sucursales", lambda: _rows_unique_sucursales(df, cols), lambda: col.unique_sucursales(df, cols)),
+        ("vendedores", lambda: _rows_unique_vendedores(df, cols), lambda: col.unique_vendedores(df, cols)),
+        ("rutas", lambda: _rows_unique_rutas(df, cols), lambda: col.unique_rutas(df, cols)),
+        (
+            "clientes",
+            lambda: _rows_cliente_records(df, cols, 1, ruta_map, now),
+            lambda: col.cliente_records(df, cols, 1, ruta_map, now),
+        ),
+    ]
+    total_rows = total_col = 0.0
+    print(f"padrón sintético: {len(df)} filas, {len(ruta_map)} rutas")
+    for label, rows_fn, col_fn in steps:
+        ms_rows, ref = _timed(rows_fn, args.runs)
+        ms_col, got = _timed(col_fn, args.runs)
+        same = json.dumps(got, default=sorted, ensure_ascii=False) == json.dumps(
+            ref, default=sorted, ensure_ascii=False
+        ) if label == "clientes" else list(got.items()) == list(ref.items())
+        total_rows += ms_rows
+        total_col += ms_col
+        print(
+            f"{label:12} iterrows={ms_rows:8.0f}ms columnar={ms_col:7.0f}ms "
+            f"x{ms_rows / max(ms_col, 1e-6):5.1f} identical={same}"
+        )
+    print(f"{'total':12} iterrows={total_rows:8.0f}ms columnar={total_col:7.0f}ms x{total_rows / total_col:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-bench índice espacial de PDVs (core/pdv_spatial_index) vs escaneo actual.
+
+Sólo mide CPU (sin red): filas sintéticas en memoria. El escaneo legacy además descargaba
+la cartera / el tenant completo en cada llamada; el índice lo arma una vez por tenant.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/bench_pdv_spatial_index.py --pdvs 100000
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from core.pdv_proximity import haversine_metros
+from core.pdv_spatial_index import PdvGridIndex
+from services.mapa_capas_service import _point_in_polygon
+
+LAT0, LNG0 = -31.42, -64.19
+
+
+def _synthetic(n: int, seed: int) -> list[dict]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "id_cliente": i + 1,
+            "id_cliente_erp": str(i + 1),
+            "latitud": LAT0 + rnd.gauss(0, 0.25),
+            "longitud": LNG0 + rnd.gauss(0, 0.25),
+            "id_ruta": rnd.randint(1, 400),
+            "id_vendedor": rnd.randint(1, 60),
+        }
+        for i in range(n)
+    ]
+
+
+def _ring(rnd: random.Random, lat: float, lng: float, r_deg: float, k: int = 24) -> list[list[float]]:
+    pts = []
+    for i in range(k):
+        a = 2 * math.pi * i / k
+        rr = r_deg * rnd.uniform(0.6, 1.0)
+        pts.append([lng + rr * math.cos(a), lat + rr * math.sin(a)])
+    return pts + [pts[0]]
+
+
+def _ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--pdvs", type=int, default=100_000)
+    p.add_argument("--queries", type=int, default=50)
+    p.add_argument("--radio", type=float, default=100.0)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    rnd = random.Random(args.seed)
+    rows = _synthetic(args.pdvs, args.seed)
+    t0 = time.perf_counter()
+    idx = PdvGridIndex.from_rows(rows)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"{args.pdvs} PDVs — build índice {build_ms:.0f}ms")
+
+    # Radio: cartera de un vendedor (~7 rutas de 400) como hoy en pdvs_cercanos_cartera
+    rutas = sorted(rnd.sample(range(1, 401), 7))
+    cartera = [r for r in rows if r["id_ruta"] in set(rutas)]
+    rutas_arr = np.asarray(rutas, dtype=np.int64)
+    pts = [(LAT0 + rnd.gauss(0, 0.2), LNG0 + rnd.gauss(0, 0.2)) for _ in range(args.queries)]
+
+    def _legacy_radius():
+        for lat, lng in pts:
+            [c for c in cartera if haversine_metros(lat, lng, c["latitud"], c["longitud"]) <= args.radio]
+
+    def _index_radius():
+        for lat, lng in pts:
+            pos, _ = idx.within_radius(lat, lng, args.radio)
+            pos[np.isin(idx.id_ruta[pos], rutas_arr)]
+
+    leg, new = _ms(_legacy_radius, 3) / len(pts), _ms(_index_radius, 3) / len(pts)
+    print(f"radio {args.radio:.0f}m  cartera={len(cartera):6}  legacy={leg:8.3f}ms/q  índice={new:7.3f}ms/q  x{leg / new:6.1f}")
+
+    # Polígono: tenant completo como hoy en resolve_pdv_ids_in_polygon
+    for r_deg in (0.02, 0.1):
+        rings = [_ring(rnd, LAT0 + rnd.gauss(0, 0.1), LNG0 + rnd.gauss(0, 0.1), r_deg) for _ in range(5)]
+
+        def _legacy_poly():
+            for ring in rings:
+                [r["id_cliente"] for r in rows if _point_in_polygon(r["longitud"], r["latitud"], ring)]
+
+        def _index_poly():
+            for ring in rings:
+                idx.within_polygon(ring)
+
+        leg, new = _ms(_legacy_poly, 1) / len(rings), _ms(_index_poly, 3) / len(rings)
+        print(f"polígono r={r_deg:.2f}°            legacy={leg:8.1f}ms/q  índice={new:7.3f}ms/q  x{leg / new:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
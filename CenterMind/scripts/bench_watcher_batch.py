@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Bench watcher de objetivos: escrituras fila a fila (WATCHER_BATCH=0) vs por lote (_LoteWatcher).
+
+Corre run_watcher sobre un tenant sintético (objetivos ruteo_alteo con objetivo_items) contra
+un `sb` en memoria que cuenta round trips; verifica que ítems, tracking y cabeceras queden
+iguales. El tiempo estimado suma --rtt-ms por round trip al tiempo medido en CPU.
+
+Uso:
+  cd CenterMind && PYTHONPATH=. python scripts/bench_watcher_batch.py --objetivos 300 --items 200
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import logging
+import os
+import statistics
+import time
+
+from services import objetivos_watcher_service as ws
+
+_INDEXADAS = ("id_objetivo", "id_cliente")
+
+
+class _Q:
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+        self.filters, self.pre, self.orden = [], None, []
+        self.upd = self.ups = self.lim = self.rng = None
+
+    def select(self, *_a, **_k):
+        return self
+
+    def _indice(self, col, vals):
+        if col in _INDEXADAS and self.pre is None:
+            idx = self.db.indice(self.name, col)
+            self.pre = [r for v in vals for r in idx.get(v, ())]
+
+    def eq(self, col, val):
+        self._indice(col, [val])
+        self.filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def neq(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) != val)
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self._indice(col, vals)
+        self.filters.append(lambda r: r.get(col) in vals)
+        return self
+
+    def gte(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and str(r.get(col)) >= str(val))
+        return self
+
+    def gt(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) > val)
+        return self
+
+    def or_(self, *_):
+        return self
+
+    def order(self, col, **_k):
+        self.orden.append(col)
+        return self
+
+    def limit(self, n):
+        self.lim = n
+        return self
+
+    def range(self, a, b):
+        self.rng = (a, b)
+        return self
+
+    def update(self, data):
+        self.upd = data
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self.ups = rows
+        return self
+
+    def execute(self):
+        self.db.calls += 1
+        if self.ups is not None:
+            self.db.upsert_tracking(self.ups)
+            return type("R", (), {"data": self.ups})()
+        base = self.pre if self.pre is not None else self.db.tables.get(self.name, [])
+        rows = [r for r in base if all(f(r) for f in self.filters)]
+        if self.upd is not None:
+            for r in rows:
+                r.update(self.upd)
+        for col in reversed(self.orden):
+            rows.sort(key=lambda r: r.get(col))
+        if self.rng:
+            rows = rows[self.rng[0]:self.rng[1] + 1]
+        if self.lim is not None:
+            rows = rows[:self.lim]
+        return type("R", (), {"data": [dict(r) for r in rows]})()
+
+
+class _RPC:
+    def __init__(self, db, fn, params):
+        self.db, self.fn, self.params = db, fn, params
+
+    def execute(self):
+        self.db.calls += 1
+        if self.fn == "watcher_flush_tracking":
+            self.db.upsert_tracking(self.params["p_rows"])
+        else:
+            idx = self.db.indice("objetivo_items", "id_objetivo")
+            for it in self.params["p_items"]:
+                for r in idx.get(it["id_objetivo"], ()):
+                    if r["id_cliente_pdv"] != it["id_cliente_pdv"]:
+                        continue
+                    if r.get("estado_item") in ws._TERMINALES and it["estado_item"] not in ws._TERMINALES:
+                        continue
+                    r["estado_item"] = it["estado_item"]
+        return type("R", (), {"data": None})()
+
+
+class _SB:
+    """PostgREST en memoria: índices por id_objetivo / id_cliente y contador de round trips."""
+
+    def __init__(self, tables):
+        self.tables, self.calls, self._idx = tables, 0, {}
+        self._tracking_keys = {
+            (r["id_objetivo"], r["id_referencia"], r["tipo_evento"]) for r in tables["objetivos_tracking"]
+        }
+
+    def indice(self, name, col):
+        key = (name, col)
+        if key not in self._idx:
+            idx: dict = {}
+            for r in self.tables.get(name, []):
+                idx.setdefault(r.get(col), []).append(r)
+            self._idx[key] = idx
+        return self._idx[key]
+
+    def upsert_tracking(self, rows):
+        for row in rows:
+            k = (row["id_objetivo"], row["id_referencia"], row["tipo_evento"])
+            if k in self._tracking_keys:
+                continue
+            self._tracking_keys.add(k)
+            self.tables["objetivos_tracking"].append(dict(row))
+            self._idx.pop(("objetivos_tracking", "id_objetivo"), None)
+
+    def table(self, name):
+        return _Q(self, name)
+
+    def rpc(self, fn, params):
+        return _RPC(self, fn, params)
+
+
+def _tenant(n_obj: int, n_items: int) -> dict[str, list[dict]]:
+    objetivos, items, clientes, tracking = [], [], [], []
+    for o in range(n_obj):
+        oid = f"obj-{o}"
+        objetivos.append({
+            "id": oid, "tipo": "ruteo_alteo", "id_vendedor": 10 + o % 25, "id_distribuidor": 4,
+            "cumplido": False, "created_at": "2026-06-01T09:00:00+00:00",
+            "lanzado_at": "2026-06-01T09:00:00+00:00", "valor_objetivo": n_items, "valor_actual": 0,
+        })
+        for i in range(n_items):
+            pdv = o * n_items + i + 1
+            items.append({"id": len(items) + 1, "id_objetivo": oid, "id_cliente_pdv": pdv,
+                          "nombre_pdv": f"PDV {pdv}", "estado_item": "pendiente"})
+            # Mitad con alta posterior al objetivo; un tercio de esas ya trackeadas de corridas previas.
+            alta = "2026-06-10" if i % 2 == 0 else "2026-04-01"
+            clientes.append({"id_cliente": pdv, "id_cliente_erp": str(pdv), "nombre_fantasia": f"PDV {pdv}",
+                             "fecha_alta": alta, "id_distribuidor": 4})
+            if i % 6 == 0:
+                tracking.append({"id_objetivo": oid, "id_referencia": str(pdv), "tipo_evento": "alteo",
+                                 "metadata": {}})
+                items[-1]["estado_item"] = "cumplido"
+    return {"objetivos": objetivos, "objetivo_items": items, "clientes_pdv_v2_4": clientes,
+            "objetivos_tracking": tracking}
+
+
+def _estado(db: _SB):
+    items = sorted((r["id_objetivo"], r["id_cliente_pdv"], r["estado_item"]) for r in db.tables["objetivo_items"])
+    tracking = sorted((r["id_objetivo"], r["id_referencia"]) for r in db.tables["objetivos_tracking"])
+    cab = sorted((o["id"], o["valor_actual"], o.get("cumplido")) for o in db.tables["objetivos"])
+    return items, tracking, cab
+
+
+def _run(tenant: dict, batch: bool, runs: int) -> tuple[float, int, tuple]:
+    os.environ["WATCHER_BATCH"] = "1" if batch else "0"
+    times, calls, estado = [], 0, ()
+    for _ in range(runs):
+        db = _SB(copy.deepcopy(tenant))
+        ws.sb = db
+        t0 = time.perf_counter()
+        ws.ObjetivosWatcherService().run_watcher(4)
+        times.append((time.perf_counter() - t0) * 1000)
+        calls, estado = db.calls, _estado(db)
+    return statistics.median(times), calls, estado
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--objetivos", type=int, default=300)
+    ap.add_argument("--items", type=int, default=200)
+    ap.add_argument("--rtt-ms", type=float, default=15.0, help="latencia por round trip para el estimado")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    logging.getLogger("ObjetivosWatcher").setLevel(logging.ERROR)
+    ws.tenant_table_name = lambda base, d: f"{base}_{d}"
+    tenant = _tenant(args.objetivos, args.items)
+    print(f"tenant sintético: {args.objetivos} objetivos × {args.items} ítems, rtt={args.rtt_ms:.0f}ms")
+
+    res = {label: _run(tenant, batch, args.runs) for label, batch in (("fila a fila", False), ("lote", True))}
+    ref = res["fila a fila"][2]
+    for label, (ms, calls, estado) in res.items():
+        est = ms + calls * args.rtt_ms
+        print(
+            f"{label:12} round_trips={calls:7d} cpu={ms:8.0f}ms estimado={est / 1000:8.1f}s "
+            f"identical={estado == ref}"
+        )
+    (_, c_leg, _), (_, c_lote, _) = res.values()
+    print(f"round trips x{c_leg / max(c_lote, 1):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+run_job_worker.py
+=================
+Worker standalone de la cola background_jobs (core/job_queue.py), para correr fuera del
+proceso de la API (JOB_QUEUE_WORKER=0 en la API + este script como servicio aparte).
+
+Uso:
+  python scripts/run_job_worker.py             # loop hasta Ctrl+C / SIGTERM
+  python scripts/run_job_worker.py --drain     # procesa lo pendiente y sale
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(name)-20s | %(levelname)-8s | %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("run_job_worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola background_jobs")
+    parser.add_argument("--drain", action="store_true", help="Procesar lo pendiente y salir")
+    parser.add_argument("--poll", type=float, default=None, help="Segundos entre polls (default JOB_QUEUE_POLL_SEC)")
+    args = parser.parse_args()
+
+    from core.job_queue import JobWorker, job_queue_stats
+
+    worker = JobWorker(poll_sec=args.poll)
+    if args.drain:
+        worker.drain()
+        logger.info("Drain terminado: %s", job_queue_stats())
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    worker.start()
+    try:
+        while not stop.wait(60):
+            logger.info("Stats: %s", job_queue_stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
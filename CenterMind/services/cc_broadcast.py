@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline de difusión CC por Telegram (modo "todos" y "uno").
+
+Antes: un vendedor por vez → PDF ReportLab → requests.post sendDocument (conexión
+nueva, timeout 20 s) → pin. 60 vendedores = minutos con un thread del portal tomado.
+
+Ahora:
+- PDFs en un pool de procesos (``CC_PDF_WORKERS``; 0 = threads). Los datos que el
+  PDF necesita de Supabase (mapa ERP → día de ruta) se resuelven antes, en el padre.
+- Envío por un httpx.AsyncClient compartido con token bucket por bot y por chat
+  (límites de Telegram: ~30 msg/s por bot, ~20 msg/min por grupo).
+- 429: se respeta ``parameters.retry_after`` (pausa el chat y el bot) y se reintenta.
+- ``iter_difusion_cc`` va devolviendo cada resultado apenas termina, para el
+  endpoint NDJSON del portal.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger("ShelfyAPI")
+
+CC_PDF_WORKERS = int(os.environ.get("CC_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+CC_BROADCAST_CONCURRENCY = int(os.environ.get("CC_BROADCAST_CONCURRENCY", "8"))
+CC_TG_BOT_RPS = float(os.environ.get("CC_TG_BOT_RPS", "25"))
+CC_TG_CHAT_PER_MIN = float(os.environ.get("CC_TG_CHAT_PER_MIN", "20"))
+CC_TG_CHAT_BURST = int(os.environ.get("CC_TG_CHAT_BURST", "5"))
+CC_TG_MAX_RETRIES = int(os.environ.get("CC_TG_MAX_RETRIES", "3"))
+
+TELEGRAM_API = "https://api.telegram.org/bot{token}/{method}"
+
+_STATS: dict[str, Any] = {
+    "broadcasts": 0,
+    "vendedores": 0,
+    "enviados": 0,
+    "errores": 0,
+    "telegram_calls": 0,
+    "retries_429": 0,
+    "pdf_rendered": 0,
+    "pdf_ms_total": 0.0,
+}
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def cc_broadcast_stats() -> dict[str, Any]:
+    out = dict(_STATS)
+    n = out["pdf_rendered"]
+    out["pdf_ms_avg"] = round(out.pop("pdf_ms_total") / n, 1) if n else None
+    out["pdf_workers"] = CC_PDF_WORKERS
+    return out
+
+
+# ─── Rate limiting ────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Token bucket async (un solo event loop: no hace falta lock)."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._last = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def block_for(self, seconds: float) -> None:
+        """Pausa el bucket (429 retry_after); no acumula tokens durante la pausa."""
+        now = self._clock()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = max(self._tokens, 1.0)
+        self._last = max(self._last, self._blocked_until)
+
+    def delay(self) -> float:
+        """Segundos a esperar para el próximo token; 0 = se consumió."""
+        now = self._clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class TelegramRateLimiter:
+    """Bucket por bot + bucket por chat."""
+
+    def __init__(
+        self,
+        bot_rps: float = CC_TG_BOT_RPS,
+        chat_per_min: float = CC_TG_CHAT_PER_MIN,
+        chat_burst: int = CC_TG_CHAT_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self.bot = TokenBucket(bot_rps, max(1.0, bot_rps), clock)
+        self._chat_rate = chat_per_min / 60.0
+        self._chat_burst = chat_burst
+        self._chats: dict[int, TokenBucket] = {}
+
+    def chat(self, chat_id: int) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            b = self._chats[chat_id] = TokenBucket(self._chat_rate, self._chat_burst, self._clock)
+        return b
+
+    async def acquire(self, chat_id: int) -> None:
+        await self.chat(chat_id).acquire()
+        await self.bot.acquire()
+
+    def retry_after(self, chat_id: int, seconds: float) -> None:
+        self.chat(chat_id).block_for(seconds)
+        self.bot.block_for(seconds)
+
+
+def _retry_after_seconds(resp: httpx.Response) -> float:
+    try:
+        ra = (resp.json().get("parameters") or {}).get("retry_after")
+        if ra is not None:
+            return float(ra)
+    except Exception:
+        pass
+    try:
+        return float(resp.headers.get("Retry-After") or 1)
+    except ValueError:
+        return 1.0
+
+
+class TelegramSender:
+    """Bot API sobre un AsyncClient compartido, con rate limit y reintento en 429."""
+
+    def __init__(
+        self,
+        token: str,
+        client: httpx.AsyncClient,
+        limiter: TelegramRateLimiter | None = None,
+        max_retries: int = CC_TG_MAX_RETRIES,
+    ):
+        self.token = token
+        self.client = client
+        self.limiter = limiter or TelegramRateLimiter()
+        self.max_retries = max_retries
+
+    async def call(self, method: str, chat_id: int, *, timeout: float = 20, **kwargs: Any) -> httpx.Response | None:
+        url = TELEGRAM_API.format(token=self.token, method=method)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(chat_id)
+            _STATS["telegram_calls"] += 1
+            try:
+                resp = await self.client.post(url, timeout=timeout, **kwargs)
+            except Exception as e:
+                logger.error(f"[CCDifusion] {method} exc chat={chat_id}: {type(e).__name__}: {e}")
+                return None
+            if resp.status_code != 429 or attempt == self.max_retries:
+                return resp
+            ra = _retry_after_seconds(resp)
+            _STATS["retries_429"] += 1
+            logger.warning(f"[CCDifusion] {method} 429 chat={chat_id}: retry_after={ra}s (intento {attempt + 1})")
+            self.limiter.retry_after(chat_id, ra)
+        return None
+
+    async def send_document(
+        self, chat_id: int, pdf_bytes: bytes, filename: str, caption: str
+    ) -> tuple[bool, int | None]:
+        """Returns (ok, message_id). message_id is None on failure."""
+        from services.cc_difusion_service import _trim_telegram_caption
+
+        resp = await self.call(
+            "sendDocument",
+            chat_id,
+            files={"document": (filename, pdf_bytes, "application/pdf")},
+            data={"chat_id": str(chat_id), "caption": _trim_telegram_caption(caption), "parse_mode": "HTML"},
+        )
+        if resp is None:
+            return False, None
+        if resp.is_success:
+            msg_id = (resp.json().get("result") or {}).get("message_id")
+            if msg_id is None:
+                logger.warning(f"[CCDifusion] sendDocument ok pero message_id ausente en response: {resp.text[:200]}")
+            logger.info(f"[CCDifusion] PDF enviado chat={chat_id} msg_id={msg_id}")
+            return True, msg_id
+        logger.warning(f"[CCDifusion] sendDocument error chat={chat_id}: {resp.status_code} {resp.text[:120]}")
+        return False, None
+
+    async def send_text(self, chat_id: int, text: str) -> bool:
+        resp = await self.call(
+            "sendMessage", chat_id, timeout=10, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+        )
+        return resp is not None and resp.is_success
+
+    async def pin(self, dist_id: int, chat_id: int, message_id: int) -> None:
+        """Pin del mensaje CC; desancla el anterior. Sin permisos (403) degrada sin lanzar."""
+        from services.cc_difusion_service import _pinned_msgs
+
+        prev_id = _pinned_msgs.get((dist_id, chat_id))
+        if prev_id:
+            await self.call("unpinChatMessage", chat_id, timeout=5, json={"chat_id": chat_id, "message_id": prev_id})
+        resp = await self.call(
+            "pinChatMessage",
+            chat_id,
+            timeout=5,
+            json={"chat_id": chat_id, "message_id": message_id, "disable_notification": True},
+        )
+        if resp is None:
+            return
+        if resp.is_success:
+            _pinned_msgs[(dist_id, chat_id)] = message_id
+            logger.info(f"[CCDifusion] Mensaje pineado chat={chat_id} msg_id={message_id}")
+        elif resp.status_code == 403:
+            logger.warning(f"[CCDifusion] Sin permisos de pin en chat={chat_id} (403) — {resp.text[:200]}")
+        else:
+            logger.warning(f"[CCDifusion] pinChatMessage error chat={chat_id}: HTTP {resp.status_code} resp={resp.text[:400]}")
+
+
+# ─── Pool de render PDF ───────────────────────────────────────────────────────
+
+def _render_cc_pdf(kwargs: dict[str, Any]) -> tuple[bytes, float]:
+    """Corre en el worker: sólo ReportLab, sin Supabase (erp_to_dia ya resuelto)."""
+    from services.cc_difusion_service import _build_cc_pdf
+
+    t0 = time.perf_counter()
+    pdf = _build_cc_pdf(**kwargs)
+    return pdf, (time.perf_counter() - t0) * 1000
+
+
+def _pdf_executor() -> Executor | None:
+    """Pool de procesos compartido (spawn: el API tiene threads vivos). None = threads."""
+    global _POOL
+    if CC_PDF_WORKERS <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=CC_PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def shutdown_pdf_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+async def render_cc_pdf(executor: Executor | None = None, **kwargs: Any) -> bytes:
+    loop = asyncio.get_running_loop()
+    ex = executor if executor is not None else _pdf_executor()
+    if ex is None:
+        pdf, ms = await asyncio.to_thread(_render_cc_pdf, kwargs)
+    else:
+        pdf, ms = await loop.run_in_executor(ex, _render_cc_pdf, kwargs)
+    _STATS["pdf_rendered"] += 1
+    _STATS["pdf_ms_total"] += ms
+    return pdf
+
+
+# ─── Envío por vendedor ───────────────────────────────────────────────────────
+
+async def enviar_cc_vendedor_async(
+    sender: TelegramSender,
+    dist_id: int,
+    id_vendedor: int,
+    dist_nombre: str,
+    fecha_snapshot: str,
+    vend_data: dict,
+    mensaje_extra: str = "",
+    executor: Executor | None = None,
+) -> dict:
+    """
+    Genera y envía el PDF de CC de un vendedor a su grupo Telegram (+ pin y mensaje extra).
+    Retorna {'ok': bool, 'vendedor': str, 'error': str | None}.
+    """
+    from services import cc_difusion_service as cc
+
+    vendedor = vend_data["vendedor_nombre"]
+    chat_id = await asyncio.to_thread(cc._get_telegram_chat_id, dist_id, id_vendedor)
+    if not chat_id:
+        return {"ok": False, "vendedor": vendedor, "error": "Sin grupo Telegram"}
+
+    clientes = vend_data.get("clientes", [])
+    if not clientes:
+        return {"ok": False, "vendedor": vendedor, "error": "Sin deuda registrada"}
+
+    nombre_display = cc._extract_display_name(vendedor)
+    deuda_total = vend_data.get("deuda_total", 0.0)
+    fecha_fmt = "/".join(reversed(fecha_snapshot[:10].split("-")))
+    caption = cc._cc_caption(nombre_display, fecha_fmt, deuda_total, len(clientes))
+    extra_plain = mensaje_extra.strip()
+    extra_html = f"💬 {cc._escape_telegram_html_text(extra_plain)}" if extra_plain else ""
+
+    try:
+        if not cc._REPORTLAB:
+            raise RuntimeError("reportlab no instalado")
+        erp_to_dia = await asyncio.to_thread(cc._fetch_erp_dia_semana_map, dist_id, id_vendedor)
+        pdf_bytes = await render_cc_pdf(
+            executor,
+            vendedor_nombre=nombre_display,
+            dist_nombre=dist_nombre,
+            fecha=fecha_fmt,
+            clientes=clientes,
+            deuda_total=deuda_total,
+            erp_to_dia=erp_to_dia,
+        )
+        ftag = fecha_snapshot[:10].replace("-", "")
+        ok, doc_msg_id = await sender.send_document(chat_id, pdf_bytes, f"CC_{ftag}_{id_vendedor}.pdf", caption)
+        if ok and doc_msg_id:
+            await sender.pin(dist_id, chat_id, doc_msg_id)
+        elif ok:
+            logger.warning("[CCDifusion] PDF enviado OK pero doc_msg_id=None, no se puede pinear")
+        if ok and extra_html:
+            ok = await sender.send_text(chat_id, extra_html)
+        return {"ok": ok, "vendedor": vendedor, "error": None if ok else "Error al enviar"}
+    except RuntimeError as e:
+        logger.warning(f"[CCDifusion] PDF no disponible, enviando texto: {e}")
+        ok = await sender.send_text(chat_id, caption)
+        if ok and extra_html:
+            ok = await sender.send_text(chat_id, extra_html)
+        return {"ok": ok, "vendedor": vendedor, "error": None if ok else "Error al enviar texto"}
+    except Exception as e:
+        logger.error(f"[CCDifusion] exc vend={id_vendedor}: {e}")
+        return {"ok": False, "vendedor": vendedor, "error": str(e)}
+
+
+# ─── Orquestación ─────────────────────────────────────────────────────────────
+
+async def iter_difusion_cc(
+    dist_id: int,
+    modo: str,
+    id_vendedor: int | None,
+    sucursal: str | None,
+    mensaje_template: str,
+    fecha: str | None,
+    *,
+    client: httpx.AsyncClient | None = None,
+    limiter: TelegramRateLimiter | None = None,
+    executor: Executor | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Eventos de la difusión, en orden de llegada:
+      {"evento": "inicio", "total", "fecha_snapshot"}
+      {"evento": "resultado", "ok", "vendedor", "error", "hechos", "total"}
+      {"evento": "fin", "enviados", "errores", "fecha_snapshot"}   ← mismo payload que antes
+    """
+    from services.cc_difusion_service import _plan_difusion_cc
+
+    plan = await asyncio.to_thread(_plan_difusion_cc, dist_id, modo, id_vendedor, sucursal, fecha)
+    if "resultado" in plan:
+        yield {"evento": "fin", **plan["resultado"]}
+        return
+
+    token, dist_nombre, fecha_snapshot = plan["token"], plan["dist_nombre"], plan["fecha_snapshot"]
+    targets: list[tuple[int, dict]] = plan["targets"]
+    total = len(targets)
+    _STATS["broadcasts"] += 1
+    _STATS["vendedores"] += total
+    yield {"evento": "inicio", "total": total, "fecha_snapshot": fecha_snapshot}
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            timeout=20, limits=httpx.Limits(max_connections=CC_BROADCAST_CONCURRENCY * 2)
+        )
+    sender = TelegramSender(token, client, limiter)
+    sem = asyncio.Semaphore(max(1, CC_BROADCAST_CONCURRENCY))
+
+    async def _one(real_id: int, vd: dict) -> dict:
+        async with sem:
+            return await enviar_cc_vendedor_async(
+                sender, dist_id, real_id, dist_nombre, fecha_snapshot, vd, mensaje_template, executor
+            )
+
+    enviados: list[dict] = []
+    errores: list[dict] = []
+    tasks = [asyncio.create_task(_one(real_id, vd)) for real_id, vd in targets]
+    try:
+        for hechos, fut in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await fut
+            (enviados if result["ok"] else errores).append(result)
+            yield {"evento": "resultado", **result, "hechos": hechos, "total": total}
+    finally:
+        for t in tasks:
+            t.cancel()
+        if own_client:
+            await client.aclose()
+
+    _STATS["enviados"] += len(enviados)
+    _STATS["errores"] += len(errores)
+    logger.info(
+        f"[CCDifusion] dist={dist_id} modo={modo}: {len(enviados)} enviados, {len(errores)} errores ({total} vendedores)"
+    )
+    yield {"evento": "fin", "enviados": enviados, "errores": errores, "fecha_snapshot": fecha_snapshot}
+
+
+async def difundir_cc_telegram_async(
+    dist_id: int,
+    modo: str,
+    id_vendedor: int | None,
+    sucursal: str | None,
+    mensaje_template: str,
+    fecha: str | None,
+    **kwargs: Any,
+) -> dict:
+    """Corre la difusión completa y devuelve {"enviados", "errores", "fecha_snapshot"}."""
+    final: dict = {}
+    async for ev in iter_difusion_cc(dist_id, modo, id_vendedor, sucursal, mensaje_template, fecha, **kwargs):
+        if ev["evento"] == "fin":
+            final = {k: v for k, v in ev.items() if k != "evento"}
+    return final
@@ -6,6 +6,9 @@ Flujo:
   1. Obtener CC snapshot de cc_detalle para un vendedor (o todos).
   2. Generar PDF con tabla de clientes deudores.
   3. Enviar PDF al grupo Telegram del vendedor usando sendDocument.
+
+El envío CC por vendedor (PDF + pin) vive en services/cc_broadcast.py; acá quedan los
+datos, el PDF y los envíos sync de CadenaOne y SIGO (_send_document / _send_text).
 """
 from __future__ import annotations
 
@@ -25,12 +28,10 @@ logger = logging.getLogger("ShelfyAPI")
 
 TELEGRAM_SEND_DOC = "https://api.telegram.org/bot{token}/sendDocument"
 TELEGRAM_SEND_MSG = "https://api.telegram.org/bot{token}/sendMessage"
-TELEGRAM_PIN_MSG  = "https://api.telegram.org/bot{token}/pinChatMessage"
-TELEGRAM_UNPIN_MSG = "https://api.telegram.org/bot{token}/unpinChatMessage"
 # Límite caption Telegram ~1024; dejamos margen HTML
 TELEGRAM_CAPTION_SAFE_MAX = 900
 
-# In-memory store del último message_id pineado por (dist_id, chat_id)
+# In-memory store del último message_id pineado por (dist_id, chat_id) (lo usa cc_broadcast)
 _pinned_msgs: dict[tuple[int, int], int] = {}
 
 # ─── PDF ──────────────────────────────────────────────────────────────────────
@@ -376,8 +377,12 @@ def _build_cc_pdf(
     *,
     dist_id: int | None = None,
     id_vendedor: int | None = None,
+    erp_to_dia: dict[str, str] | None = None,
 ) -> bytes:
-    """Genera PDF con la tabla de clientes deudores para un vendedor."""
+    """
+    Genera PDF con la tabla de clientes deudores para un vendedor.
+    ``erp_to_dia`` ya resuelto evita tocar Supabase (render en pool de procesos).
+    """
     if not _REPORTLAB:
         raise RuntimeError("reportlab no instalado")
 
@@ -435,9 +440,10 @@ def _build_cc_pdf(
         Spacer(1, 10),
     ])
 
-    erp_to_dia: dict[str, str] = {}
-    if dist_id is not None and id_vendedor is not None:
-        erp_to_dia = _fetch_erp_dia_semana_map(dist_id, id_vendedor)
+    if erp_to_dia is None:
+        erp_to_dia = {}
+        if dist_id is not None and id_vendedor is not None:
+            erp_to_dia = _fetch_erp_dia_semana_map(dist_id, id_vendedor)
 
     if erp_to_dia:
         story.append(Paragraph("Detalle por día de ruta", sect_style))
@@ -563,35 +569,6 @@ def _send_document(token: str, chat_id: int, pdf_bytes: bytes, filename: str, ca
         return False, None
 
 
-def _pin_cc_message(token: str, dist_id: int, chat_id: int, message_id: int) -> None:
-    """Pin el mensaje CC en el grupo. Desancla el anterior si existe. Degrada sin lanzar si sin permisos."""
-    prev_id = _pinned_msgs.get((dist_id, chat_id))
-    if prev_id:
-        try:
-            requests.post(
-                TELEGRAM_UNPIN_MSG.format(token=token),
-                json={"chat_id": chat_id, "message_id": prev_id},
-                timeout=5,
-            )
-        except Exception:
-            pass
-    try:
-        resp = requests.post(
-            TELEGRAM_PIN_MSG.format(token=token),
-            json={"chat_id": chat_id, "message_id": message_id, "disable_notification": True},
-            timeout=5,
-        )
-        if resp.ok:
-            _pinned_msgs[(dist_id, chat_id)] = message_id
-            logger.info(f"[CCDifusion] Mensaje pineado chat={chat_id} msg_id={message_id}")
-        elif resp.status_code == 403:
-            logger.warning(f"[CCDifusion] Sin permisos de pin en chat={chat_id} (403) — {resp.text[:200]}")
-        else:
-            logger.warning(f"[CCDifusion] pinChatMessage error chat={chat_id}: HTTP {resp.status_code} resp={resp.text[:400]}")
-    except Exception as e:
-        logger.warning(f"[CCDifusion] pin exc chat={chat_id}: {e}")
-
-
 def _send_text(token: str, chat_id: int, text: str) -> bool:
     try:
         resp = requests.post(
@@ -718,73 +695,14 @@ def _extract_display_name(raw: str) -> str:
 
 # ─── Función principal: enviar CC de un vendedor ──────────────────────────────
 
-def enviar_cc_vendedor(
-    dist_id: int,
-    id_vendedor: int,
-    token: str,
-    dist_nombre: str,
-    fecha_snapshot: str,
-    vend_data: dict,
-    mensaje_extra: str = "",
-) -> dict:
-    """
-    Genera y envía el PDF de CC de un vendedor a su grupo Telegram.
-    Retorna {'ok': bool, 'vendedor': str, 'error': str | None}.
-    """
-    chat_id = _get_telegram_chat_id(dist_id, id_vendedor)
-    if not chat_id:
-        return {"ok": False, "vendedor": vend_data["vendedor_nombre"], "error": "Sin grupo Telegram"}
-
-    nombre_display = _extract_display_name(vend_data["vendedor_nombre"])
-    clientes = vend_data.get("clientes", [])
-    deuda_total = vend_data.get("deuda_total", 0.0)
-
-    if not clientes:
-        return {"ok": False, "vendedor": vend_data["vendedor_nombre"], "error": "Sin deuda registrada"}
-
-    # Construir caption
-    fecha_fmt = "/".join(reversed(fecha_snapshot[:10].split("-")))
+def _cc_caption(nombre_display: str, fecha_fmt: str, deuda_total: float, n_clientes: int) -> str:
     caption_lines = [
         f"💳 <b>Cuentas Corrientes — {nombre_display}</b>",
         f"📅 Al {fecha_fmt}",
         f"💰 Total deuda: <b>${deuda_total:,.0f}</b>".replace(",", "."),
-        f"👥 {len(clientes)} clientes deudores",
+        f"👥 {n_clientes} clientes deudores",
     ]
-    caption = "\n".join(caption_lines)
-    extra_plain = mensaje_extra.strip()
-
-    try:
-        pdf_bytes = _build_cc_pdf(
-            vendedor_nombre=nombre_display,
-            dist_nombre=dist_nombre,
-            fecha=fecha_fmt,
-            clientes=clientes,
-            deuda_total=deuda_total,
-            dist_id=dist_id,
-            id_vendedor=id_vendedor,
-        )
-        # Nombre corto: Telegram trunca nombres largos en la UI del chat
-        ftag = fecha_snapshot[:10].replace("-", "")
-        filename = f"CC_{ftag}_{id_vendedor}.pdf"
-        ok, doc_msg_id = _send_document(token, chat_id, pdf_bytes, filename, caption)
-        if ok and doc_msg_id:
-            logger.info(f"[CCDifusion] Intentando pin chat={chat_id} msg_id={doc_msg_id}")
-            _pin_cc_message(token, dist_id, chat_id, doc_msg_id)
-        elif ok and not doc_msg_id:
-            logger.warning(f"[CCDifusion] PDF enviado OK pero doc_msg_id=None, no se puede pinear")
-        if ok and extra_plain:
-            ok = ok and _send_text(token, chat_id, f"💬 {_escape_telegram_html_text(extra_plain)}")
-        return {"ok": ok, "vendedor": vend_data["vendedor_nombre"], "error": None if ok else "Error al enviar"}
-    except RuntimeError as e:
-        # PDF no disponible — enviar solo texto
-        logger.warning(f"[CCDifusion] PDF no disponible, enviando texto: {e}")
-        ok = _send_text(token, chat_id, caption)
-        if ok and extra_plain:
-            ok = ok and _send_text(token, chat_id, f"💬 {_escape_telegram_html_text(extra_plain)}")
-        return {"ok": ok, "vendedor": vend_data["vendedor_nombre"], "error": None if ok else "Error al enviar texto"}
-    except Exception as e:
-        logger.error(f"[CCDifusion] exc vend={id_vendedor}: {e}")
-        return {"ok": False, "vendedor": vend_data["vendedor_nombre"], "error": str(e)}
+    return "\n".join(caption_lines)
 
 
 def enviar_cc_cadenaone(
@@ -1175,17 +1093,17 @@ def planificar_envios_cc_telegram(
 
 # ─── Entry point para el router ───────────────────────────────────────────────
 
-def difundir_cc_telegram(
+def _plan_difusion_cc(
     dist_id: int,
-    modo: str,          # "uno" | "todos"
+    modo: str,
     id_vendedor: int | None,
     sucursal: str | None,
-    mensaje_template: str,
     fecha: str | None,
 ) -> dict:
     """
-    Orquesta el envío de CC vía Telegram.
-    Retorna {"enviados": [...], "errores": [...], "fecha_snapshot": str | None}.
+    Resuelve token, snapshot y vendedores destino de la difusión (sin enviar nada).
+    Retorna {"resultado": {...}} si no hay nada que enviar, o
+    {"token", "dist_nombre", "fecha_snapshot", "targets": [(id_vendedor, vend_data)]}.
     """
     token = _get_bot_token(dist_id)
     if not token:
@@ -1194,7 +1112,7 @@ def difundir_cc_telegram(
     dist_nombre = _get_dist_nombre(dist_id)
     fecha_snapshot, all_rows = _fetch_cc_snapshot(dist_id, fecha)
     if not fecha_snapshot:
-        return {"enviados": [], "errores": [{"vendedor": "—", "error": "Sin datos de CC para este distribuidor"}], "fecha_snapshot": None}
+        return {"resultado": {"enviados": [], "errores": [{"vendedor": "—", "error": "Sin datos de CC para este distribuidor"}], "fecha_snapshot": None}}
 
     # Filtrar por sucursal si se especificó
     sucursal = _resolve_sucursal_filter(sucursal)
@@ -1210,21 +1128,19 @@ def difundir_cc_telegram(
         all_rows = [r for r in all_rows if r.get("id_vendedor") in valid_vend_ids] if valid_vend_ids else []
 
     vendors = _group_by_vendor(all_rows)
-
-    enviados, errores = [], []
+    plan = {"token": token, "dist_nombre": dist_nombre, "fecha_snapshot": fecha_snapshot, "targets": []}
 
     if modo == "uno":
         if id_vendedor is None:
-            return {"enviados": [], "errores": [{"vendedor": "—", "error": "modo=uno requiere id_vendedor"}], "fecha_snapshot": fecha_snapshot}
+            return {"resultado": {"enviados": [], "errores": [{"vendedor": "—", "error": "modo=uno requiere id_vendedor"}], "fecha_snapshot": fecha_snapshot}}
         active_ids = load_active_vendedor_ids(dist_id)
         if active_ids and id_vendedor not in active_ids:
             logger.warning(f"[CCDifusion] modo=uno dist={dist_id}: vendedor {id_vendedor} inactivo — envío bloqueado")
-            return {"enviados": [], "errores": [{"vendedor": str(id_vendedor), "error": "Vendedor inactivo — envío bloqueado"}], "fecha_snapshot": fecha_snapshot}
+            return {"resultado": {"enviados": [], "errores": [{"vendedor": str(id_vendedor), "error": "Vendedor inactivo — envío bloqueado"}], "fecha_snapshot": fecha_snapshot}}
         vd = vendors.get(id_vendedor)
         if not vd:
-            return {"enviados": [], "errores": [{"vendedor": str(id_vendedor), "error": "Sin datos CC para este vendedor"}], "fecha_snapshot": fecha_snapshot}
-        result = enviar_cc_vendedor(dist_id, id_vendedor, token, dist_nombre, fecha_snapshot, vd, mensaje_template)
-        (enviados if result["ok"] else errores).append(result)
+            return {"resultado": {"enviados": [], "errores": [{"vendedor": str(id_vendedor), "error": "Sin datos CC para este vendedor"}], "fecha_snapshot": fecha_snapshot}}
+        plan["targets"] = [(id_vendedor, vd)]
 
     else:  # "todos"
         active_ids = load_active_vendedor_ids(dist_id)
@@ -1232,14 +1148,9 @@ def difundir_cc_telegram(
         vendors = {vid: vd for vid, vd in vendors.items() if vid in active_ids}
         if n_before != len(vendors):
             logger.info(f"[CCDifusion] difundir dist={dist_id}: excludió {n_before - len(vendors)} vendedores inactivos")
-        for vid, vd in vendors.items():
-            real_id = vd.get("id_vendedor")
-            if not real_id:
-                continue
-            result = enviar_cc_vendedor(dist_id, real_id, token, dist_nombre, fecha_snapshot, vd, mensaje_template)
-            (enviados if result["ok"] else errores).append(result)
+        plan["targets"] = [(vd["id_vendedor"], vd) for vd in vendors.values() if vd.get("id_vendedor")]
 
-    return {"enviados": enviados, "errores": errores, "fecha_snapshot": fecha_snapshot}
+    return plan
 
 
 # ─── Export PDF (supervisión / impresión portal) ─────────────────────────────
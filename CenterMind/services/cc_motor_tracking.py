@@ -168,10 +168,18 @@ def finish_cc_motor_run(
 
     if estado == "ok":
         try:
-            from services.snapshot_refresh_service import refresh_eager
-            refresh_eager(dist_id, ["supervision"])
+            from core.job_queue import enqueue_snapshots
+            enqueue_snapshots(dist_id, warm=["supervision"])
         except Exception as e_snap:
             logger.debug("[CCMotor] snapshot invalidate omitido: %s", e_snap)
+    if estado == "ok" and not sin_cambios:
+        # Objetivos de cobranza leen cc_detalle: sólo esos se re-evalúan (core/objetivos_deps).
+        try:
+            from core.job_queue import enqueue_objetivos_watcher
+            from core.objetivos_deps import FUENTE_CC, Cambio
+            enqueue_objetivos_watcher(dist_id, cambio=Cambio.de(FUENTE_CC, sin_ids=True))
+        except Exception as e_watch:
+            logger.debug("[CCMotor] watcher cobranza omitido: %s", e_watch)
 
 
 def record_cc_sin_cambios(dist_id: int, source: str = "rpa_hash_guard") -> int | None:
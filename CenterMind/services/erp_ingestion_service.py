@@ -1,7 +1,8 @@
 import pandas as pd
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from db import sb
+from core.excel_stream import iter_table_chunks
 from datetime import datetime
 import re
 import io
@@ -82,26 +83,16 @@ class ERPIngestionService:
             
         return out
 
-    def _leer_excel_robusto(self, file_source) -> pd.DataFrame:
-        """Lector robusto que intenta diferentes motores y encodings."""
+    def _iter_excel_robusto(self, file_source) -> Iterator[pd.DataFrame]:
+        """
+        Lector robusto por chunks: XLSX en streaming (openpyxl read-only), .xls entero
+        y TSV/CSV disfrazado de Excel como fallback (ver core/excel_stream.py).
+        Celdas vacías / "NA" quedan NaN, igual que el read_excel(dtype=str) de antes.
+        """
         if isinstance(file_source, (bytes, io.BytesIO)):
-            # Intentar lectura normal
-            try:
-                return pd.read_excel(file_source, dtype=str)
-            except Exception:
-                # Si falla, podría ser un TSV disfrazado. 
-                # Tendríamos que resetear el buffer si es BytesIO
-                if isinstance(file_source, io.BytesIO):
-                    file_source.seek(0)
-                try:
-                    # Intento como CSV/TSV
-                    return pd.read_csv(file_source, sep=None, engine="python", dtype=str, encoding="latin1")
-                except Exception:
-                    # Último recurso
-                    if isinstance(file_source, io.BytesIO):
-                        file_source.seek(0)
-                    return pd.read_excel(file_source)
-        return pd.read_excel(file_source, dtype=str)
+            yield from iter_table_chunks(file_source, na_empty=True)
+            return
+        yield pd.read_excel(file_source, dtype=str)
 
     def ingest_clientes(self, file_source):
         """Procesa el Excel de Padrón de Clientes (Manual) con mapeo flexible."""
@@ -461,74 +452,90 @@ class ERPIngestionService:
         """Ingesta de ventas via Excel con mapeo flexible."""
         logger.info(f"Iniciando ingesta Excel de ventas para dist {dist_id}...")
         try:
-            df = self._leer_excel_robusto(file_source)
-            df.columns = [str(c).strip() for c in df.columns]
-            
-            c_nro = self._get_flexible_col(df, ["nro_documento", "nro_comprobante", "documento", "numero"])
-            c_tip = self._get_flexible_col(df, ["tipo_documento", "descripcion comprobante", "tipo comprobante", "descripcion_documento"])
-            c_art = self._get_flexible_col(df, ["articulo", "descrip", "descripcion_producto", "codigo_articulo"])
-            c_des = self._get_flexible_col(df, ["desc_articulo", "descripcion_articulo"])
-            c_fec = self._get_flexible_col(df, ["fecha", "fecha_factura", "fec_doc", "fecha comprobante"])
-            c_cli = self._get_flexible_col(df, ["id_cliente", "codi_cliente", "cliente_id", "cliente"])
-            c_nom = self._get_flexible_col(df, ["cliente_nombre", "nomcli", "razon_social", "nombre"])
-            c_neto = self._get_flexible_col(df, ["neto", "importe_neto", "subtotal"])
-            c_fin = self._get_flexible_col(df, ["final", "importe_final", "total"])
-            c_unid = self._get_flexible_col(df, ["unidades", "cantidad_total_unidades", "cantidad", "bultos_cargo"])
-            c_vend = self._get_flexible_col(df, ["vendedor", "dsvendedor", "vendedor_nombre", "descripcion vendedor"])
-            c_suc = self._get_flexible_col(df, ["sucursal", "dssucur", "sucursal_nombre", "descripcion sucursal"])
-            c_prov = self._get_flexible_col(df, ["proveedor", "desc_proveedor", "prov"])
-
-            # Pre-parsear fechas de forma robusta
-            if c_fec:
-                df["_fecha_dt"] = self._parse_fecha_robusta(df[c_fec])
-            else:
-                df["_fecha_dt"] = pd.NaT
-
-            records = []
-            for _, row in df.iterrows():
-                nro_doc = str(row.get(c_nro, "")).strip() if c_nro else ""
-                if not nro_doc or nro_doc.lower() in ("nan", "none", "null"): continue
-                
-                # Nombre de artículo: preferimos [COD] DESC si existe
-                art_cod = str(row.get(c_art, "")).strip().upper() if c_art else ""
-                art_des = str(row.get(c_des, "")).strip().upper() if c_des else ""
-                articulo_final = art_des if art_des else art_cod
-                if art_cod and art_des and art_cod != art_des:
-                    articulo_final = f"[{art_cod}] {art_des}"
-                if not articulo_final: articulo_final = "SIN NOMBRE"
-
-                # Fecha formateada ISO YYYY-MM-DD para Supabase
-                fecha_iso = None
-                if pd.notna(row.get("_fecha_dt")):
-                    fecha_iso = row["_fecha_dt"].strftime("%Y-%m-%d")
-
-                records.append({
-                    "id_distribuidor": dist_id,
-                    "nro_documento": nro_doc,
-                    "tipo_documento": str(row.get(c_tip, "VENTA")).strip().upper() if c_tip else "VENTA",
-                    "articulo": articulo_final,
-                    "fecha_factura": fecha_iso,
-                    "codi_cliente": str(row.get(c_cli, "")).strip(),
-                    "nomcli": str(row.get(c_nom, "")).strip().upper() if c_nom else "CLIENTE",
-                    "importe_neto": self._safe_float(row.get(c_neto, 0)),
-                    "importe_final": self._safe_float(row.get(c_fin, 0)),
-                    "unidades": abs(self._safe_float(row.get(c_unid, 0))), # abs() como en la inspo
-                    "vendedor_erp": str(row.get(c_vend, "")).strip().upper() if c_vend else "SIN VENDEDOR",
-                    "sucursal_erp": str(row.get(c_suc, "")).strip().upper() if c_suc else "CASA CENTRAL",
-                    "proveedor": str(row.get(c_prov, "SIN PROVEEDOR")).strip().upper() if c_prov else "SIN PROVEEDOR",
-                })
-            
-            if records:
+            total = 0
+            cols: dict[str, str | None] | None = None
+            for df in self._iter_excel_robusto(file_source):
+                df.columns = [str(c).strip() for c in df.columns]
+                if cols is None:
+                    cols = self._ventas_xlsx_cols(df)
+                records = self._ventas_xlsx_records(df, cols, dist_id)
+                # Upsert por chunk: el archivo completo nunca está entero en memoria.
                 for i in range(0, len(records), 500):
                     batch = records[i:i+500]
                     sb.table("erp_ventas_raw").upsert(batch, on_conflict="id_distribuidor, nro_documento, articulo").execute()
-                logger.info(f"✅ Sync Ventas Excel: {len(records)} upserted.")
-                return len(records)
-            return 0
+                total += len(records)
+            if total:
+                logger.info(f"✅ Sync Ventas Excel: {total} upserted.")
+            return total
         except Exception as e:
             logger.error(f"Error en ingest_ventas_xlsx: {e}")
             raise e
 
+    def _ventas_xlsx_cols(self, df: pd.DataFrame) -> dict[str, str | None]:
+        """Mapeo flexible de columnas del Excel de ventas (se resuelve con el primer chunk)."""
+        return {
+            "nro": self._get_flexible_col(df, ["nro_documento", "nro_comprobante", "documento", "numero"]),
+            "tip": self._get_flexible_col(df, ["tipo_documento", "descripcion comprobante", "tipo comprobante", "descripcion_documento"]),
+            "art": self._get_flexible_col(df, ["articulo", "descrip", "descripcion_producto", "codigo_articulo"]),
+            "des": self._get_flexible_col(df, ["desc_articulo", "descripcion_articulo"]),
+            "fec": self._get_flexible_col(df, ["fecha", "fecha_factura", "fec_doc", "fecha comprobante"]),
+            "cli": self._get_flexible_col(df, ["id_cliente", "codi_cliente", "cliente_id", "cliente"]),
+            "nom": self._get_flexible_col(df, ["cliente_nombre", "nomcli", "razon_social", "nombre"]),
+            "neto": self._get_flexible_col(df, ["neto", "importe_neto", "subtotal"]),
+            "fin": self._get_flexible_col(df, ["final", "importe_final", "total"]),
+            "unid": self._get_flexible_col(df, ["unidades", "cantidad_total_unidades", "cantidad", "bultos_cargo"]),
+            "vend": self._get_flexible_col(df, ["vendedor", "dsvendedor", "vendedor_nombre", "descripcion vendedor"]),
+            "suc": self._get_flexible_col(df, ["sucursal", "dssucur", "sucursal_nombre", "descripcion sucursal"]),
+            "prov": self._get_flexible_col(df, ["proveedor", "desc_proveedor", "prov"]),
+        }
+
+    def _ventas_xlsx_records(self, df: pd.DataFrame, cols: dict[str, str | None], dist_id: int) -> list[dict]:
+        """Filas de un chunk del Excel de ventas → registros de erp_ventas_raw."""
+        c_nro, c_tip, c_art, c_des = cols["nro"], cols["tip"], cols["art"], cols["des"]
+        c_fec, c_cli, c_nom, c_neto = cols["fec"], cols["cli"], cols["nom"], cols["neto"]
+        c_fin, c_unid, c_vend, c_suc, c_prov = cols["fin"], cols["unid"], cols["vend"], cols["suc"], cols["prov"]
+
+        # Pre-parsear fechas de forma robusta
+        if c_fec:
+            df["_fecha_dt"] = self._parse_fecha_robusta(df[c_fec])
+        else:
+            df["_fecha_dt"] = pd.NaT
+
+        records = []
+        for _, row in df.iterrows():
+            nro_doc = str(row.get(c_nro, "")).strip() if c_nro else ""
+            if not nro_doc or nro_doc.lower() in ("nan", "none", "null"): continue
+            
+            # Nombre de artículo: preferimos [COD] DESC si existe
+            art_cod = str(row.get(c_art, "")).strip().upper() if c_art else ""
+            art_des = str(row.get(c_des, "")).strip().upper() if c_des else ""
+            articulo_final = art_des if art_des else art_cod
+            if art_cod and art_des and art_cod != art_des:
+                articulo_final = f"[{art_cod}] {art_des}"
+            if not articulo_final: articulo_final = "SIN NOMBRE"
+
+            # Fecha formateada ISO YYYY-MM-DD para Supabase
+            fecha_iso = None
+            if pd.notna(row.get("_fecha_dt")):
+                fecha_iso = row["_fecha_dt"].strftime("%Y-%m-%d")
+
+            records.append({
+                "id_distribuidor": dist_id,
+                "nro_documento": nro_doc,
+                "tipo_documento": str(row.get(c_tip, "VENTA")).strip().upper() if c_tip else "VENTA",
+                "articulo": articulo_final,
+                "fecha_factura": fecha_iso,
+                "codi_cliente": str(row.get(c_cli, "")).strip(),
+                "nomcli": str(row.get(c_nom, "")).strip().upper() if c_nom else "CLIENTE",
+                "importe_neto": self._safe_float(row.get(c_neto, 0)),
+                "importe_final": self._safe_float(row.get(c_fin, 0)),
+                "unidades": abs(self._safe_float(row.get(c_unid, 0))), # abs() como en la inspo
+                "vendedor_erp": str(row.get(c_vend, "")).strip().upper() if c_vend else "SIN VENDEDOR",
+                "sucursal_erp": str(row.get(c_suc, "")).strip().upper() if c_suc else "CASA CENTRAL",
+                "proveedor": str(row.get(c_prov, "SIN PROVEEDOR")).strip().upper() if c_prov else "SIN PROVEEDOR",
+            })
+        return records
+
     def _safe_float(self, val) -> float:
         if pd.isna(val): return 0.0
         try:
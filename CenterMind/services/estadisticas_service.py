@@ -7,7 +7,7 @@ from datetime import date, datetime, timedelta
 from collections import defaultdict
 from threading import Lock
 
-from db import sb
+from db import fetch_all, sb
 from core.tenant_tables import tenant_table_name, tenant_table_supports_distribuidor_filter
 from core.exhibicion_aggregate import (
     EXHIBICION_ROW_COLS,
@@ -288,17 +288,9 @@ def _reconcile_exhibiciones_en_all_raw(
     return fixed
 
 
-def _paginate(query_fn):
-    """Helper: run paginated query. query_fn(offset) returns a Supabase query."""
-    rows = []
-    offset = 0
-    while True:
-        batch = query_fn(offset).range(offset, offset + PAGE - 1).execute().data or []
-        rows.extend(batch)
-        if len(batch) < PAGE:
-            break
-        offset += PAGE
-    return rows
+def _paginate(query_fn, *, key: str | None = None):
+    """Helper: run paginated query. query_fn(offset) returns a Supabase query (offset se ignora)."""
+    return fetch_all(lambda: query_fn(0), key=key, page_size=PAGE)
 
 
 def _es_recaudacion(tipo: str | None) -> bool:
@@ -1210,7 +1202,7 @@ def aggregate_kpis_vendedor(dist_id: int, id_vendedor: str, meses: list[str]) ->
                         .in_("id_integrante", b)
                         .gte("timestamp_subida", fecha_desde)
                         .lte("timestamp_subida", fecha_hasta + "T23:59:59"))
-            rows = _paginate(q_fn)
+            rows = _paginate(q_fn, key="id_exhibicion")
             ex_rows.extend([r for r in rows if _in_meses(r.get("timestamp_subida", ""), meses_set)])
 
     ex_counts = aggregate_exhibicion_counts_vendor_scope(ex_rows)
@@ -1389,7 +1381,7 @@ def aggregate_kpis_vendedor_bounds(
                     .lte("timestamp_subida", fh + "T23:59:59")
                 )
 
-            ex_rows.extend(_paginate(q_fn))
+            ex_rows.extend(_paginate(q_fn, key="id_exhibicion"))
 
     ex_counts = aggregate_exhibicion_counts_vendor_scope(ex_rows)
     exhibiciones_logicas = ex_counts.get("total_logicas", 0)
@@ -1914,7 +1906,7 @@ def _fetch_carta_source_rows(dist_id: int, meses: list[str]) -> dict[str, object
             "rutas": lambda: _paginate(rutas_q),
             "pdv": lambda: _paginate(pdv_q),
             "pdv_cartera": lambda: _paginate(pdv_cartera_q),
-            "ex": lambda: _paginate(ex_q),
+            "ex": lambda: _paginate(ex_q, key="id_exhibicion"),
             "vendedores": lambda: (
                 sb.table(t_vend)
                 .select("id_vendedor,id_vendedor_erp,nombre_erp,id_sucursal")
@@ -2576,7 +2568,7 @@ def build_detalle_vendedor(
                         .in_("id_integrante", b)
                         .gte("timestamp_subida", fecha_desde)
                         .lte("timestamp_subida", fecha_hasta + "T23:59:59"))
-            ex_rows.extend(_paginate(q_fn))
+            ex_rows.extend(_paginate(q_fn, key="id_exhibicion"))
 
     ex_rows = [r for r in ex_rows if _in_meses(r.get("timestamp_subida", ""), meses_set)]
     ex_counts = aggregate_exhibicion_counts_vendor_scope(ex_rows)
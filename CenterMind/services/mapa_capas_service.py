@@ -7,8 +7,9 @@ from typing import Any
 
 from fastapi import HTTPException
 
+from core.pdv_spatial_index import get_pdv_index
 from core.tenant_tables import tenant_table_name
-from db import sb
+from db import fetch_all, sb
 
 logger = logging.getLogger("mapa_capas_service")
 
@@ -57,19 +58,6 @@ def _polygon_ring_from_geojson(geojson: dict) -> list[list[float]]:
     return coords[0]
 
 
-def _paginate(query_builder) -> list[dict]:
-    rows: list[dict] = []
-    offset = 0
-    while True:
-        res = query_builder.range(offset, offset + _PAGE - 1).execute()
-        batch = res.data or []
-        rows.extend(batch)
-        if len(batch) < _PAGE:
-            break
-        offset += _PAGE
-    return rows
-
-
 def _validate_ruta_belongs_to_vendedor(dist_id: int, id_vendedor: int, id_ruta: int) -> None:
     t_rutas = tenant_table_name("rutas_v2", dist_id)
     res = (
@@ -98,18 +86,38 @@ def resolve_pdv_ids_in_polygon(
     if len(ring) < 4:
         return []
 
+    try:
+        idx = get_pdv_index(sb, dist_id)
+    except Exception as e:
+        logger.warning("resolve_pdv_ids_in_polygon: índice espacial no disponible dist=%s: %s", dist_id, e)
+        return _resolve_pdv_ids_scan(dist_id, ring, id_vendedor)
+    mask = (idx.id_vendedor == int(id_vendedor)) if id_vendedor is not None else None
+    pos = idx.within_polygon(ring, mask=mask)
+    out = {int(idx.rows[p]["id_cliente"]) for p in pos.tolist() if idx.rows[p].get("id_cliente") is not None}
+    return sorted(out)
+
+
+def _resolve_pdv_ids_scan(
+    dist_id: int,
+    ring: list[list[float]],
+    id_vendedor: int | None,
+) -> list[int]:
+    """Escaneo completo del tenant (fallback si el índice espacial no se puede armar)."""
     t_clientes = tenant_table_name("clientes_pdv_v2", dist_id)
-    q = (
-        sb.table(t_clientes)
-        .select("id_cliente, latitud, longitud, id_vendedor")
-        .eq("id_distribuidor", dist_id)
-        .not_.is_("latitud", "null")
-        .not_.is_("longitud", "null")
-    )
-    if id_vendedor is not None:
-        q = q.eq("id_vendedor", id_vendedor)
 
-    rows = _paginate(q)
+    def _q():
+        q = (
+            sb.table(t_clientes)
+            .select("id_cliente, latitud, longitud, id_vendedor")
+            .eq("id_distribuidor", dist_id)
+            .not_.is_("latitud", "null")
+            .not_.is_("longitud", "null")
+        )
+        if id_vendedor is not None:
+            q = q.eq("id_vendedor", id_vendedor)
+        return q
+
+    rows = fetch_all(_q, key="id_cliente")
     out: list[int] = []
     for row in rows:
         try:
@@ -49,6 +49,7 @@ _VENTAS_DELTA_KEYS = (
     ("upserted", "filas"),
     ("rows", "líneas"),
     ("actualizados", "FUC"),
+    ("fechas_encoladas", "FUC"),
 )
 
 
@@ -15,14 +15,20 @@ Tipos soportados:
 """
 from __future__ import annotations
 
+import contextvars
 import logging
+import os
+import time
 import unicodedata
 from datetime import date, datetime, timedelta, timezone
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from db import sb
 from core.tenant_tables import tenant_table_name
 
+if TYPE_CHECKING:
+    from core.objetivos_deps import Cambio
+
 logger = logging.getLogger("ObjetivosWatcher")
 
 
@@ -93,6 +99,160 @@ def _objetivo_listo_para_watcher(obj: dict) -> bool:
         return True
 
 
+_TIPOS_CON_ITEMS = ("ruteo_alteo", "conversion_estado", "exhibicion")
+_TERMINALES = frozenset({"cumplido", "falla"})
+_FLUSH_CHUNK = 5000
+
+
+def _batch_enabled() -> bool:
+    raw = (os.getenv("WATCHER_BATCH") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+class _LoteWatcher:
+    """
+    Estado de una corrida de run_watcher: objetivo_items y objetivos_tracking precargados
+    en pocas queries paginadas, y escrituras acumuladas (transiciones de ítems, eventos de
+    tracking, updates de cabecera) que flush() manda al final — una RPC por tabla en vez
+    de un UPDATE por (objetivo, PDV) y un upsert por objetivo.
+    """
+
+    def __init__(self, dist_id: int) -> None:
+        self.dist_id = dist_id
+        self.items: dict[str, list[dict]] = {}
+        self.tracked: dict[tuple[str, str], set[str]] = {}
+        self.tracked_global: dict[str, set[str]] = {}
+        self.objetivos: list[tuple[Any, dict]] = []
+        self._con_items: set[str] = set()
+        self._con_tracking: set[str] = set()
+        self._transiciones: dict[tuple[str, int], str] = {}
+        self._tracking: dict[tuple[str, str, str], dict] = {}
+
+    def precargar(self, obj_ids: list[str]) -> None:
+        from db import fetch_all
+
+        for i in range(0, len(obj_ids), _IN_CHUNK):
+            chunk = obj_ids[i:i + _IN_CHUNK]
+            items = fetch_all(
+                lambda: sb.table("objetivo_items")
+                .select("id, id_objetivo, id_cliente_pdv, nombre_pdv, estado_item")
+                .in_("id_objetivo", chunk),
+                key="id",
+            )
+            for r in items:
+                self.items.setdefault(str(r["id_objetivo"]), []).append(r)
+            self._con_items.update(chunk)
+
+            tracking = fetch_all(
+                lambda: sb.table("objetivos_tracking")
+                .select("id_objetivo, id_referencia, tipo_evento")
+                .in_("id_objetivo", chunk)
+                .order("id_objetivo")
+                .order("tipo_evento")
+                .order("id_referencia")
+            )
+            for r in tracking:
+                self.tracked.setdefault((str(r["id_objetivo"]), r["tipo_evento"]), set()).add(r["id_referencia"])
+            self._con_tracking.update(chunk)
+
+    def tiene_items(self, obj_id: Any) -> bool:
+        return str(obj_id) in self._con_items
+
+    def tiene_tracking(self, obj_id: Any) -> bool:
+        return str(obj_id) in self._con_tracking
+
+    def transicion_item(self, obj_id: Any, id_cliente_pdv: int, estado_item: str) -> None:
+        """Mismo guard que _update_item_estado: un ítem terminal no retrocede."""
+        filas = [r for r in self.items.get(str(obj_id), []) if r.get("id_cliente_pdv") == id_cliente_pdv]
+        if not filas:
+            return
+        actual = filas[0].get("estado_item") or ""
+        if actual in _TERMINALES and estado_item not in _TERMINALES:
+            return
+        for r in filas:
+            r["estado_item"] = estado_item
+        self._transiciones[(str(obj_id), id_cliente_pdv)] = estado_item
+
+    def agregar_tracking(self, rows: list[dict]) -> None:
+        for r in rows:
+            oid = str(r["id_objetivo"])
+            self._tracking[(oid, r["id_referencia"], r["tipo_evento"])] = r
+            self.tracked.setdefault((oid, r["tipo_evento"]), set()).add(r["id_referencia"])
+            if r["tipo_evento"] in self.tracked_global:
+                self.tracked_global[r["tipo_evento"]].add(r["id_referencia"])
+
+    def flush(self) -> dict[str, int]:
+        """
+        Tracking → ítems → cabeceras. Si una tabla falla se corta ahí (y se loguea): la próxima
+        corrida recalcula desde la DB sin dejar valor_actual adelantado a sus eventos.
+        """
+        out = {"tracking": len(self._tracking), "items": len(self._transiciones), "objetivos": 0, "rpc": 0}
+        try:
+            rows = list(self._tracking.values())
+            for i in range(0, len(rows), _FLUSH_CHUNK):
+                out["rpc"] += self._flush_tracking(rows[i:i + _FLUSH_CHUNK])
+            items = [
+                {"id_objetivo": oid, "id_cliente_pdv": pdv, "estado_item": est}
+                for (oid, pdv), est in self._transiciones.items()
+            ]
+            for i in range(0, len(items), _FLUSH_CHUNK):
+                out["rpc"] += self._flush_items(items[i:i + _FLUSH_CHUNK])
+        except Exception as e:
+            logger.warning(f"[Watcher] flush lote dist={self.dist_id}: {e} — cabeceras sin actualizar")
+            return out
+        for obj_id, updates in self.objetivos:
+            try:
+                sb.table("objetivos").update(updates).eq("id", obj_id).execute()
+                out["objetivos"] += 1
+            except Exception as e:
+                logger.warning(f"[Watcher] update objetivo {obj_id}: {e}")
+        return out
+
+    def _flush_tracking(self, rows: list[dict]) -> int:
+        try:
+            sb.rpc("watcher_flush_tracking", {"p_rows": rows}).execute()
+            return 1
+        except Exception as e:
+            logger.debug(f"[Watcher] RPC watcher_flush_tracking no disponible, upsert directo: {e}")
+        sb.table("objetivos_tracking").upsert(rows, on_conflict="id_objetivo,id_referencia,tipo_evento").execute()
+        return 0
+
+    def _flush_items(self, items: list[dict]) -> int:
+        try:
+            sb.rpc("watcher_flush_items", {"p_items": items}).execute()
+            return 1
+        except Exception as e:
+            logger.debug(f"[Watcher] RPC watcher_flush_items no disponible, UPDATE por grupo: {e}")
+        ahora = datetime.now(timezone.utc).isoformat()
+        grupos: dict[tuple[str, str], list[int]] = {}
+        for it in items:
+            grupos.setdefault((it["id_objetivo"], it["estado_item"]), []).append(it["id_cliente_pdv"])
+        # El guard de terminales ya se aplicó contra los ítems precargados.
+        for (oid, estado), pdvs in grupos.items():
+            for i in range(0, len(pdvs), _IN_CHUNK):
+                (
+                    sb.table("objetivo_items")
+                    .update({"estado_item": estado, "updated_at": ahora})
+                    .eq("id_objetivo", oid)
+                    .in_("id_cliente_pdv", pdvs[i:i + _IN_CHUNK])
+                    .execute()
+                )
+        return 0
+
+
+_LOTE: contextvars.ContextVar[_LoteWatcher | None] = contextvars.ContextVar("watcher_lote", default=None)
+_IN_CHUNK = 200
+
+
+def _watcher_cutoff() -> str:
+    # Omitir objetivos vencidos hace más de 1 día — los maneja la expiración
+    return (date.today() - timedelta(days=1)).isoformat()
+
+
+def _max_ids_incremental() -> int:
+    return int(os.getenv("WATCHER_INCREMENTAL_MAX_IDS", "5000"))
+
+
 class ObjetivosWatcherService:
     """
     Actualiza valor_actual mediante detección de diferencias.
@@ -100,190 +260,215 @@ class ObjetivosWatcherService:
     el mismo evento dos veces.
     """
 
-    def run_watcher(self, dist_id: int, obj_id: str | None = None) -> dict:
+    def run_watcher(
+        self,
+        dist_id: int,
+        obj_id: str | None = None,
+        *,
+        cambio: "Cambio | None" = None,
+    ) -> dict:
         """Entry point. Retorna dict con estadísticas de la ejecución.
 
         Si se pasa obj_id, sólo procesa ese objetivo (evita tocar objetivos
         ya en progreso cuando se crea uno nuevo).
+        Si se pasa cambio (core/objetivos_deps), sólo los objetivos cuyos insumos
+        tocó ese cambio (índice de dependencias); el resto se cuenta en `omitidos`.
         """
+        t_run = time.perf_counter()
         try:
-            q = (
-                sb.table("objetivos")
-                .select("*")
-                .eq("id_distribuidor", dist_id)
-                .eq("cumplido", False)
-            )
-            if obj_id is not None:
-                q = q.eq("id", obj_id)
+            omitidos = 0
+            if cambio is not None and obj_id is None:
+                objetivos, omitidos = self._objetivos_afectados(dist_id, cambio)
             else:
-                # Omitir objetivos vencidos hace más de 1 día — los maneja la expiración
-                cutoff = (date.today() - timedelta(days=1)).isoformat()
-                q = q.or_(f"fecha_objetivo.is.null,fecha_objetivo.gte.{cutoff}")
-            res = q.execute()
-            objetivos = res.data or []
+                q = (
+                    sb.table("objetivos")
+                    .select("*")
+                    .eq("id_distribuidor", dist_id)
+                    .eq("cumplido", False)
+                )
+                if obj_id is not None:
+                    q = q.eq("id", obj_id)
+                else:
+                    q = q.or_(f"fecha_objetivo.is.null,fecha_objetivo.gte.{_watcher_cutoff()}")
+                res = q.execute()
+                objetivos = res.data or []
 
             if not objetivos:
-                return {"dist_id": dist_id, "procesados": 0, "actualizados": 0}
+                return {"dist_id": dist_id, "procesados": 0, "actualizados": 0, "omitidos": omitidos}
 
             actualizados = 0
             cumplidos = 0
             eventos_nuevos = 0
+            por_objetivo: list[dict[str, Any]] = []
 
-            for obj in objetivos:
-                try:
-                    if not _objetivo_listo_para_watcher(obj):
-                        continue
-
-                    result = self._process_objetivo(obj, dist_id)
-                    if result is None:
-                        continue  # tipo general o sin datos base
-
-                    progreso_diario = {}
-                    if len(result) == 4:
-                        nuevo_valor, nuevos_eventos, valor_aprobados, progreso_diario = result
-                    elif len(result) == 3:
-                        nuevo_valor, nuevos_eventos, valor_aprobados = result
-                    else:
-                        nuevo_valor, nuevos_eventos = result
-                        valor_aprobados = nuevo_valor
-                    eventos_nuevos += nuevos_eventos
-
-                    updates: dict[str, Any] = {
-                        "valor_actual": nuevo_valor,
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                    }
-
-                    if progreso_diario:
-                        dc = obj.get("desglose_cache") or {}
-                        dc["progreso_diario"] = progreso_diario
-                        dc["progreso_diario_updated_at"] = date.today().isoformat()
-                        updates["desglose_cache"] = dc
-
-                    valor_obj = obj.get("valor_objetivo")
-                    ahora = datetime.now(timezone.utc)
-                    tasa_p = obj.get("tasa_pendientes")
-                    umbral_meta = float(valor_obj) if valor_obj else 0.0
-                    tasa_p_efectiva = tasa_p
-                    if valor_obj and tasa_p is not None:
-                        tasa_val = float(tasa_p)
-                        meta_val = float(valor_obj)
-                        if tasa_val >= meta_val:
-                            logger.warning(
-                                f"[Watcher] tasa_pendientes={tasa_p} >= meta={valor_obj} en "
-                                f"obj={obj.get('id')} — se trata como P=0 (sin margen)"
-                            )
-                            tasa_p_efectiva = 0
-                        elif tasa_val > 0:
-                            umbral_meta = max(0.0, meta_val - tasa_val)
-
-                    # Calcular pendientes para desglose_cache (tipos con ítems).
-                    # Se escribe SIEMPRE para mantener estado de pendientes actualizado,
-                    # incluso cuando la barra llega al 100% (cumplido=True se setea aparte).
-                    if obj.get("tipo") in ("conversion_estado", "ruteo_alteo") and obj.get("id"):
-                        try:
-                            items_pend_res = (
-                                sb.table("objetivo_items")
-                                .select("id_cliente_pdv, nombre_pdv, estado_item")
-                                .eq("id_objetivo", obj["id"])
-                                .neq("estado_item", "cumplido")
-                                .limit(21)
-                                .execute()
-                            )
-                            pend_items = items_pend_res.data or []
-                            pendientes_count = len(pend_items)
-                            pendientes_ids = [
-                                str(it.get("id_cliente_pdv") or it.get("nombre_pdv") or "")
-                                for it in pend_items[:20]
-                            ]
-                            updates["desglose_cache"] = {
-                                **updates.get("desglose_cache", {}),
-                                "tasa_pendientes": tasa_p_efectiva,
-                                "pendientes_count": pendientes_count,
-                                "pendientes_items": pendientes_ids,
-                            }
-                        except Exception as e_pend:
-                            logger.warning(f"[Watcher] desglose_cache pendientes obj={obj.get('id')}: {e_pend}")
-
-                    # ── Cumplido por progreso (meta alcanzada con umbral tasa) ──
-                    if (
-                        valor_obj
-                        and float(valor_obj) > 0
-                        and valor_aprobados >= umbral_meta
-                    ):
-                        updates["cumplido"] = True
-                        updates["resultado_final"] = "exito"
-                        updates["completed_at"] = ahora.isoformat()
-                        cumplidos += 1
-
-                    # ── Expiración automática (fecha_objetivo vencida) ─────────
-                    elif not updates.get("cumplido"):
-                        fecha_obj_str = obj.get("fecha_objetivo")
-                        if fecha_obj_str:
+            lote = _LoteWatcher(dist_id) if _batch_enabled() else None
+            token = _LOTE.set(lote)
+            try:
+                if lote is not None:
+                    lote.precargar([str(o["id"]) for o in objetivos if o.get("id")])
+                for obj in objetivos:
+                    t_obj = time.perf_counter()
+                    eventos_antes = eventos_nuevos
+                    try:
+                        if not _objetivo_listo_para_watcher(obj):
+                            continue
+
+                        result = self._process_objetivo(obj, dist_id)
+                        if result is None:
+                            continue  # tipo general o sin datos base
+
+                        progreso_diario = {}
+                        if len(result) == 4:
+                            nuevo_valor, nuevos_eventos, valor_aprobados, progreso_diario = result
+                        elif len(result) == 3:
+                            nuevo_valor, nuevos_eventos, valor_aprobados = result
+                        else:
+                            nuevo_valor, nuevos_eventos = result
+                            valor_aprobados = nuevo_valor
+                        eventos_nuevos += nuevos_eventos
+
+                        updates: dict[str, Any] = {
+                            "valor_actual": nuevo_valor,
+                            "updated_at": datetime.now(timezone.utc).isoformat(),
+                        }
+
+                        if progreso_diario:
+                            dc = obj.get("desglose_cache") or {}
+                            dc["progreso_diario"] = progreso_diario
+                            dc["progreso_diario_updated_at"] = date.today().isoformat()
+                            updates["desglose_cache"] = dc
+
+                        valor_obj = obj.get("valor_objetivo")
+                        ahora = datetime.now(timezone.utc)
+                        tasa_p = obj.get("tasa_pendientes")
+                        umbral_meta = float(valor_obj) if valor_obj else 0.0
+                        tasa_p_efectiva = tasa_p
+                        if valor_obj and tasa_p is not None:
+                            tasa_val = float(tasa_p)
+                            meta_val = float(valor_obj)
+                            if tasa_val >= meta_val:
+                                logger.warning(
+                                    f"[Watcher] tasa_pendientes={tasa_p} >= meta={valor_obj} en "
+                                    f"obj={obj.get('id')} — se trata como P=0 (sin margen)"
+                                )
+                                tasa_p_efectiva = 0
+                            elif tasa_val > 0:
+                                umbral_meta = max(0.0, meta_val - tasa_val)
+
+                        # Calcular pendientes para desglose_cache (tipos con ítems).
+                        # Se escribe SIEMPRE para mantener estado de pendientes actualizado,
+                        # incluso cuando la barra llega al 100% (cumplido=True se setea aparte).
+                        if obj.get("tipo") in ("conversion_estado", "ruteo_alteo") and obj.get("id"):
+                            try:
+                                pend_items = [
+                                    it for it in self._item_rows(obj["id"])
+                                    if it.get("estado_item") is not None and it.get("estado_item") != "cumplido"
+                                ][:21]
+                                pendientes_count = len(pend_items)
+                                pendientes_ids = [
+                                    str(it.get("id_cliente_pdv") or it.get("nombre_pdv") or "")
+                                    for it in pend_items[:20]
+                                ]
+                                updates["desglose_cache"] = {
+                                    **updates.get("desglose_cache", {}),
+                                    "tasa_pendientes": tasa_p_efectiva,
+                                    "pendientes_count": pendientes_count,
+                                    "pendientes_items": pendientes_ids,
+                                }
+                            except Exception as e_pend:
+                                logger.warning(f"[Watcher] desglose_cache pendientes obj={obj.get('id')}: {e_pend}")
+
+                        # ── Cumplido por progreso (meta alcanzada con umbral tasa) ──
+                        if (
+                            valor_obj
+                            and float(valor_obj) > 0
+                            and valor_aprobados >= umbral_meta
+                        ):
+                            updates["cumplido"] = True
+                            updates["resultado_final"] = "exito"
+                            updates["completed_at"] = ahora.isoformat()
+                            cumplidos += 1
+
+                        # ── Expiración automática (fecha_objetivo vencida) ─────────
+                        elif not updates.get("cumplido"):
+                            fecha_obj_str = obj.get("fecha_objetivo")
+                            if fecha_obj_str:
+                                try:
+                                    fecha_limite = date.fromisoformat(str(fecha_obj_str)[:10])
+                                    if date.today() > fecha_limite:
+                                        resultado = (
+                                            "exito"
+                                            if (valor_obj and float(valor_obj) > 0 and valor_aprobados >= umbral_meta)
+                                            else "falla"
+                                        )
+                                        updates["cumplido"] = True
+                                        updates["resultado_final"] = resultado
+                                        updates["completed_at"] = ahora.isoformat()
+                                        cumplidos += 1
+                                        logger.info(
+                                            f"[Watcher] Objetivo {obj.get('id')} expirado → resultado={resultado}"
+                                        )
+                                except (ValueError, TypeError) as e_fecha:
+                                    logger.warning(f"[Watcher] fecha_objetivo inválida obj={obj.get('id')}: {e_fecha}")
+
+                        # ── Exhibición con ítems: cerrar cabecera cuando cada PDV tiene desenlace ──
+                        if obj.get("tipo") == "exhibicion" and not updates.get("cumplido"):
                             try:
-                                fecha_limite = date.fromisoformat(str(fecha_obj_str)[:10])
-                                if date.today() > fecha_limite:
-                                    resultado = (
-                                        "exito"
-                                        if (valor_obj and float(valor_obj) > 0 and valor_aprobados >= umbral_meta)
-                                        else "falla"
+                                its = self._item_rows(obj["id"])
+                                if its:
+                                    n_pend = sum(
+                                        1
+                                        for it in its
+                                        if it.get("estado_item") in ("pendiente", "foto_subida")
                                     )
-                                    updates["cumplido"] = True
-                                    updates["resultado_final"] = resultado
-                                    updates["completed_at"] = ahora.isoformat()
-                                    cumplidos += 1
-                                    logger.info(
-                                        f"[Watcher] Objetivo {obj.get('id')} expirado → resultado={resultado}"
+                                    n_falla = sum(
+                                        1 for it in its if it.get("estado_item") == "falla"
                                     )
-                            except (ValueError, TypeError) as e_fecha:
-                                logger.warning(f"[Watcher] fecha_objetivo inválida obj={obj.get('id')}: {e_fecha}")
-
-                    # ── Exhibición con ítems: cerrar cabecera cuando cada PDV tiene desenlace ──
-                    if obj.get("tipo") == "exhibicion" and not updates.get("cumplido"):
-                        try:
-                            items_rx = (
-                                sb.table("objetivo_items")
-                                .select("estado_item")
-                                .eq("id_objetivo", obj["id"])
-                                .execute()
-                            )
-                            its = items_rx.data or []
-                            if its:
-                                n_pend = sum(
-                                    1
-                                    for it in its
-                                    if it.get("estado_item") in ("pendiente", "foto_subida")
-                                )
-                                n_falla = sum(
-                                    1 for it in its if it.get("estado_item") == "falla"
-                                )
-                                n_ok = sum(
-                                    1 for it in its if it.get("estado_item") == "cumplido"
-                                )
-                                if n_pend == 0 and (n_ok + n_falla) == len(its):
-                                    updates["cumplido"] = True
-                                    updates["resultado_final"] = (
-                                        "falla" if n_falla else "exito"
+                                    n_ok = sum(
+                                        1 for it in its if it.get("estado_item") == "cumplido"
                                     )
-                                    updates["completed_at"] = ahora.isoformat()
-                                    cumplidos += 1
-                        except Exception as e_te:
-                            logger.warning(
-                                f"[Watcher] Cierre terminal exhibición obj={obj.get('id')}: {e_te}"
-                            )
-
-                    sb.table("objetivos").update(updates).eq("id", obj["id"]).execute()
-                    actualizados += 1
+                                    if n_pend == 0 and (n_ok + n_falla) == len(its):
+                                        updates["cumplido"] = True
+                                        updates["resultado_final"] = (
+                                            "falla" if n_falla else "exito"
+                                        )
+                                        updates["completed_at"] = ahora.isoformat()
+                                        cumplidos += 1
+                            except Exception as e_te:
+                                logger.warning(
+                                    f"[Watcher] Cierre terminal exhibición obj={obj.get('id')}: {e_te}"
+                                )
 
-                except Exception as e:
-                    logger.warning(
-                        f"[Watcher] Error procesando objetivo {obj.get('id')} "
-                        f"tipo={obj.get('tipo')}: {e}"
-                    )
+                        if lote is not None:
+                            lote.objetivos.append((obj["id"], updates))
+                        else:
+                            sb.table("objetivos").update(updates).eq("id", obj["id"]).execute()
+                        actualizados += 1
 
+                    except Exception as e:
+                        logger.warning(
+                            f"[Watcher] Error procesando objetivo {obj.get('id')} "
+                            f"tipo={obj.get('tipo')}: {e}"
+                        )
+                    finally:
+                        por_objetivo.append({
+                            "id": obj.get("id"),
+                            "tipo": obj.get("tipo"),
+                            "ms": round((time.perf_counter() - t_obj) * 1000, 1),
+                            "eventos": eventos_nuevos - eventos_antes,
+                        })
+            finally:
+                _LOTE.reset(token)
+            # Tracking → ítems → cabeceras: valor_actual no queda adelantado a sus eventos.
+            escrituras = lote.flush() if lote is not None else None
+
+            duracion_ms = round((time.perf_counter() - t_run) * 1000, 1)
+            lentos = sorted(por_objetivo, key=lambda r: r["ms"], reverse=True)[:3]
             logger.info(
-                f"[Watcher] dist={dist_id}: {len(objetivos)} objetivos, "
-                f"{actualizados} actualizados, {cumplidos} cumplidos, "
-                f"{eventos_nuevos} eventos nuevos"
+                f"[Watcher] dist={dist_id}: {len(objetivos)} objetivos "
+                f"({omitidos} omitidos por índice), {actualizados} actualizados, "
+                f"{cumplidos} cumplidos, {eventos_nuevos} eventos nuevos en {duracion_ms:.0f}ms; "
+                f"más lentos: {[(r['id'], r['ms']) for r in lentos]}"
             )
             return {
                 "dist_id": dist_id,
@@ -291,12 +476,137 @@ class ObjetivosWatcherService:
                 "actualizados": actualizados,
                 "cumplidos": cumplidos,
                 "eventos_nuevos": eventos_nuevos,
+                "omitidos": omitidos,
+                "duracion_ms": duracion_ms,
+                "por_objetivo": por_objetivo,
+                "escrituras": escrituras,
             }
 
         except Exception as e:
             logger.error(f"[Watcher] Error general dist={dist_id}: {e}")
             return {"dist_id": dist_id, "procesados": 0, "actualizados": 0, "error": str(e)}
 
+    # ── Índice de dependencias (corrida incremental) ──────────────────────────
+
+    def _objetivos_afectados(self, dist_id: int, cambio: "Cambio") -> tuple[list[dict], int]:
+        """
+        Objetivos activos cuyos insumos tocó `cambio`, con select("*") sólo para esos.
+        Retorna (objetivos, omitidos).
+        """
+        from core.objetivos_deps import DEPS_COLS, DepIndex, deps_de, fuentes_de
+
+        res = (
+            sb.table("objetivos")
+            .select(DEPS_COLS)
+            .eq("id_distribuidor", dist_id)
+            .eq("cumplido", False)
+            .or_(f"fecha_objetivo.is.null,fecha_objetivo.gte.{_watcher_cutoff()}")
+            .execute()
+        )
+        activos = [o for o in (res.data or []) if _objetivo_listo_para_watcher(o)]
+        if not activos:
+            return [], 0
+        con_fuente = [o for o in activos if fuentes_de(o)]  # "general" no se actualiza solo
+        items = self._item_pdvs_por_objetivo(
+            [str(o["id"]) for o in con_fuente if o.get("tipo") in _TIPOS_CON_ITEMS]
+        )
+        index = DepIndex(deps_de(o, items.get(str(o["id"]))) for o in con_fuente)
+
+        resuelto = self._resolver_cambio(dist_id, cambio)
+        ids = index.afectados(resuelto)
+        omitidos = len(activos) - len(ids)
+        if not ids:
+            return [], omitidos
+
+        objetivos: list[dict] = []
+        id_list = sorted(ids)
+        for i in range(0, len(id_list), _IN_CHUNK):
+            chunk = id_list[i:i + _IN_CHUNK]
+            r = sb.table("objetivos").select("*").in_("id", chunk).eq("cumplido", False).execute()
+            objetivos.extend(r.data or [])
+        return objetivos, omitidos
+
+    def _item_pdvs_por_objetivo(self, obj_ids: list[str]) -> dict[str, list[int]]:
+        """{id_objetivo: [id_cliente_pdv]} en lotes (paginado por id: un lote supera las 1000 filas)."""
+        from db import fetch_all
+
+        out: dict[str, list[int]] = {}
+        for i in range(0, len(obj_ids), _IN_CHUNK):
+            chunk = obj_ids[i:i + _IN_CHUNK]
+            rows = fetch_all(
+                lambda: sb.table("objetivo_items")
+                .select("id, id_objetivo, id_cliente_pdv")
+                .in_("id_objetivo", chunk),
+                key="id",
+            )
+            for r in rows:
+                if r.get("id_cliente_pdv"):
+                    out.setdefault(str(r["id_objetivo"]), []).append(int(r["id_cliente_pdv"]))
+        return out
+
+    def _resolver_cambio(self, dist_id: int, cambio: "Cambio") -> "Cambio":
+        """
+        Traduce erps / id_cliente del cambio a id_cliente + vendedor (ruta actual) para cruzar
+        con el índice. Demasiados ids (WATCHER_INCREMENTAL_MAX_IDS) ⇒ la fuente cuenta sin ids.
+        """
+        from core.objetivos_compradores import _norm_erp
+        from core.objetivos_deps import Cambio
+
+        out = Cambio(
+            fuentes=set(cambio.fuentes),
+            fuentes_sin_ids=set(cambio.fuentes_sin_ids),
+            clientes=set(cambio.clientes),
+            vendedores=set(cambio.vendedores),
+            obj_ids=set(cambio.obj_ids),
+            fechas=set(cambio.fechas),
+        )
+        if cambio.n_ids() > _max_ids_incremental():
+            out.fuentes_sin_ids |= out.fuentes
+            return out
+        if not (cambio.erps or cambio.clientes):
+            return out
+
+        cli_table = tenant_table_name("clientes_pdv_v2", dist_id)
+        filas: list[dict] = []
+        erps = sorted(cambio.erps)
+        # Variantes crudas + normalizadas (ceros a la izquierda / ".0" del Excel).
+        erps_q = sorted(set(erps) | {n for n in (_norm_erp(e) for e in erps) if n})
+        for i in range(0, len(erps_q), _IN_CHUNK):
+            r = (
+                sb.table(cli_table)
+                .select("id_cliente, id_cliente_erp, id_ruta")
+                .eq("id_distribuidor", dist_id)
+                .in_("id_cliente_erp", erps_q[i:i + _IN_CHUNK])
+                .execute()
+            )
+            filas.extend(r.data or [])
+        clientes = sorted(cambio.clientes)
+        for i in range(0, len(clientes), _IN_CHUNK):
+            r = (
+                sb.table(cli_table)
+                .select("id_cliente, id_cliente_erp, id_ruta")
+                .in_("id_cliente", clientes[i:i + _IN_CHUNK])
+                .execute()
+            )
+            filas.extend(r.data or [])
+
+        rutas: set[int] = set()
+        for f in filas:
+            if f.get("id_cliente") is not None:
+                out.clientes.add(int(f["id_cliente"]))
+            if f.get("id_ruta") is not None:
+                rutas.add(int(f["id_ruta"]))
+        ruta_list = sorted(rutas)
+        for i in range(0, len(ruta_list), _IN_CHUNK):
+            r = (
+                sb.table(tenant_table_name("rutas_v2", dist_id))
+                .select("id_ruta, id_vendedor")
+                .in_("id_ruta", ruta_list[i:i + _IN_CHUNK])
+                .execute()
+            )
+            out.vendedores |= {int(x["id_vendedor"]) for x in (r.data or []) if x.get("id_vendedor") is not None}
+        return out
+
     # ── Dispatcher ────────────────────────────────────────────────────────────
 
     def _process_objetivo(
@@ -427,8 +737,7 @@ class ObjetivosWatcherService:
 
                 if item_pdv_ids:
                     try:
-                        items_res = sb.table("objetivo_items").select("estado_item").eq("id_objetivo", obj_id).execute()
-                        items = items_res.data or []
+                        items = self._item_rows(obj_id)
                         cumplidos_count = sum(1 for it in items if it.get("estado_item") == "cumplido")
                         _valor_aprobados = float(len(effective_clients)) if alteo_con_venta else float(cumplidos_count)
                         # Enriquecer desglose_cache si alteo_con_venta
@@ -666,8 +975,7 @@ class ObjetivosWatcherService:
 
                 if item_pdv_ids:
                     try:
-                        items_res = sb.table("objetivo_items").select("estado_item").eq("id_objetivo", obj_id).execute()
-                        items = items_res.data or []
+                        items = self._item_rows(obj_id)
                         cumplidos_count = sum(1 for it in items if it.get("estado_item") == "cumplido")
                         return (float(cumplidos_count), len(nuevos), float(cumplidos_count), progreso_diario)
                     except Exception as e_items:
@@ -724,8 +1032,25 @@ class ObjetivosWatcherService:
 
     # ── Exhibición ────────────────────────────────────────────────────────────
 
+    def _item_rows(self, obj_id: str) -> list[dict]:
+        """Ítems del objetivo (id_cliente_pdv, nombre_pdv, estado_item); del lote si hay corrida en curso."""
+        lote = _LOTE.get()
+        if lote is not None and lote.tiene_items(obj_id):
+            return lote.items.get(str(obj_id), [])
+        res = (
+            sb.table("objetivo_items")
+            .select("id_cliente_pdv, nombre_pdv, estado_item")
+            .eq("id_objetivo", obj_id)
+            .execute()
+        )
+        return res.data or []
+
     def _get_item_pdv_ids(self, obj_id: str) -> list[int] | None:
         """Devuelve los id_cliente_pdv de objetivo_items para un objetivo, o None si no hay ítems."""
+        lote = _LOTE.get()
+        if lote is not None and lote.tiene_items(obj_id):
+            rows = lote.items.get(str(obj_id))
+            return [r["id_cliente_pdv"] for r in rows if r.get("id_cliente_pdv")] if rows else None
         try:
             res = (
                 sb.table("objetivo_items")
@@ -750,6 +1075,10 @@ class ObjetivosWatcherService:
         estados anteriores. Esto evita que el watcher revierta evaluaciones ya cerradas.
         """
         TERMINAL = {"cumplido", "falla"}
+        lote = _LOTE.get()
+        if lote is not None and lote.tiene_items(obj_id):
+            lote.transicion_item(obj_id, id_cliente_pdv, estado_item)
+            return
         try:
             from datetime import datetime, timezone
             # Verificar estado actual antes de sobreescribir
@@ -896,11 +1225,7 @@ class ObjetivosWatcherService:
             # Si hay ítems: valor_actual = ítems con foto o cumplidos
             if item_pdv_ids:
                 try:
-                    items_res = sb.table("objetivo_items") \
-                        .select("estado_item") \
-                        .eq("id_objetivo", obj_id) \
-                        .execute()
-                    items = items_res.data or []
+                    items = self._item_rows(obj_id)
                     con_foto = sum(1 for it in items if it.get("estado_item") in ("foto_subida", "cumplido"))
                     aprobados = sum(1 for it in items if it.get("estado_item") == "cumplido")
                     return (float(con_foto), len(nuevas) + len(nuevas_pend), float(aprobados))
@@ -1094,6 +1419,9 @@ class ObjetivosWatcherService:
 
     def _get_globally_tracked_refs(self, dist_id: int, tipo_evento: str) -> set[str]:
         """Devuelve el conjunto de id_referencia ya registrados en tracking para cualquier objetivo del tenant."""
+        lote = _LOTE.get()
+        if lote is not None and tipo_evento in lote.tracked_global:
+            return lote.tracked_global[tipo_evento]
         try:
             # Primero obtenemos todos los IDs de objetivos del tenant
             objs_res = sb.table("objetivos").select("id").eq("id_distribuidor", dist_id).execute()
@@ -1118,13 +1446,19 @@ class ObjetivosWatcherService:
             )
             
             obj_ids_set = set(obj_ids)
-            return {r["id_referencia"] for r in (res.data or []) if r["id_objetivo"] in obj_ids_set}
+            refs = {r["id_referencia"] for r in (res.data or []) if r["id_objetivo"] in obj_ids_set}
+            if lote is not None:
+                lote.tracked_global[tipo_evento] = refs
+            return refs
         except Exception as e:
             logger.warning(f"[Watcher] _get_globally_tracked_refs dist={dist_id}: {e}")
             return set()
 
     def _get_tracked_refs(self, obj_id: str, tipo_evento: str) -> set[str]:
         """Devuelve el conjunto de id_referencia ya registrados en tracking."""
+        lote = _LOTE.get()
+        if lote is not None and lote.tiene_tracking(obj_id):
+            return set(lote.tracked.get((str(obj_id), tipo_evento), set()))
         try:
             res = (
                 sb.table("objetivos_tracking")
@@ -1165,6 +1499,10 @@ class ObjetivosWatcherService:
             for item in items
         ]
 
+        lote = _LOTE.get()
+        if lote is not None:
+            lote.agregar_tracking(rows)
+            return
         try:
             sb.table("objetivos_tracking").upsert(
                 rows, on_conflict="id_objetivo,id_referencia,tipo_evento"
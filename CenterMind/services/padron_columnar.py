@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Padrón columnar
+===============
+Extracción vectorizada (pandas/NumPy) del Padrón de Clientes: reemplaza los
+``df.iterrows()`` de ``PadronIngestionService._sync_*``.
+
+Contrato: misma salida que las funciones fila a fila de
+``padron_ingestion_service`` (``_rows_unique_sucursales``, ``_rows_unique_vendedores``,
+``_rows_unique_rutas``, ``_rows_cliente_records``) — mismas claves, mismo orden,
+mismos tipos; los payloads PDV serializan byte a byte igual. Ver
+``test_padron_columnar.py`` y ``scripts/bench_padron_columnar.py``.
+
+Estrategia:
+- Texto: ``_safe_str`` se aplica por columna (``str`` + ``.str`` accessors).
+- Fechas: ``_safe_date`` se evalúa una vez por valor distinto (factorize) — el
+  padrón repite pocas fechas y así el parseo con ``dayfirst`` es idéntico al escalar.
+- Coordenadas: números con formato estándar van por ``astype(float)`` (mismo
+  ``float()`` de Python); el resto cae al parser escalar.
+- id_ruta: merge contra el mapa de rutas; duplicados por id_cliente_erp con groupby.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from services.padron_ingestion_service import (
+    _DIA_KEYS,
+    _estado_cliente_desde_padron,
+    _norm,
+    _parse_coordinate_robustly,
+    _safe_date,
+)
+
+_NULL_TOKENS = ("nan", "none", "null", "")
+_DIA_FALSY = ("0", "NO", "N", "NAN", "FALSE", "")
+_ANULADO_SI = ("SI", "SÍ", "S", "TRUE", "1", "Y", "YES", "ANULADO")
+# Formato que float() acepta y que cubre ~todo el padrón; lo demás va al parser escalar.
+_FLOAT_RE = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+_RUTA_KEYS = ["vend_key", "erp_suc", "ruta_code"]
+
+
+# ─── Primitivas por columna ──────────────────────────────────────────────────
+
+
+def _const(n: int, value: Any) -> pd.Series:
+    return pd.Series([value] * n, dtype=object)
+
+
+def _raw(df: pd.DataFrame, col: str | None) -> np.ndarray:
+    """Valores crudos por posición (None si la columna no fue detectada)."""
+    if not col:
+        return np.full(len(df), None, dtype=object)
+    return df[col].to_numpy(dtype=object)
+
+
+def _safe_text(df: pd.DataFrame, col: str | None, default: str = "") -> pd.Series:
+    """``_safe_str`` vectorizado: str(), strip y tokens nulos → default."""
+    if not col:
+        return _const(len(df), default)
+    st = pd.Series(list(map(str, df[col].to_numpy(dtype=object))), dtype=object).str.strip()
+    return st.mask(st.str.lower().isin(_NULL_TOKENS), default)
+
+
+def _strip_dot0(s: pd.Series) -> pd.Series:
+    """"4366.0" → "4366" (float convertido a str por el Excel)."""
+    return s.str.removesuffix(".0")
+
+
+def _map_unique(values: np.ndarray, fn) -> np.ndarray:
+    """Aplica ``fn`` una vez por valor distinto y reexpande por posición."""
+    if len(values) == 0:
+        return np.empty(0, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [fn(u) for u in uniques]
+    return mapped[codes]
+
+
+def _safe_dates(df: pd.DataFrame, col: str | None) -> np.ndarray:
+    if not col:
+        return np.full(len(df), None, dtype=object)
+    return _map_unique(_raw(df, col), _safe_date)
+
+
+def _phones(df: pd.DataFrame, col: str | None) -> np.ndarray:
+    """``_phone_str`` vectorizado (3512345678.0 / 3512345678.00 → 3512345678)."""
+    if not col:
+        return np.full(len(df), None, dtype=object)
+    s = _safe_text(df, col)
+    empty = s == ""
+    s = _strip_dot0(s)
+    zeros = s.str.extract(r"^([^.]*)\.0+\Z", expand=False)
+    s = s.where(zeros.isna(), zeros)
+    out = np.array(s, dtype=object)
+    out[empty.to_numpy()] = None
+    return out
+
+
+def _coords(src: pd.Series) -> np.ndarray:
+    """``_parse_coordinate_robustly`` sobre una columna de strings ya limpios."""
+    out = np.full(len(src), None, dtype=object)
+    s = src.str.strip()
+    bad = s.str.lower().isin(_NULL_TOKENS).to_numpy()
+    s = s.str.replace(",", ".", regex=False)
+    ok = s.str.fullmatch(_FLOAT_RE).fillna(False).to_numpy(dtype=bool) & ~bad
+    if ok.any():
+        out[ok] = s.to_numpy(dtype=object)[ok].astype(float).tolist()
+    rest = ~ok & ~bad
+    if rest.any():
+        raw = src.to_numpy(dtype=object)
+        out[rest] = [_parse_coordinate_robustly(v) for v in raw[rest]]
+    return out
+
+
+def _latlng(df: pd.DataFrame, cols: dict) -> tuple[np.ndarray, np.ndarray]:
+    """``_parse_latlng``: celdas 'lat | lon' combinadas en la columna de latitud."""
+    lat_raw = _safe_text(df, cols.get("latitud"))
+    lng_raw = _safe_text(df, cols.get("longitud"))
+    pipe = lat_raw.str.contains("|", regex=False)
+    if pipe.any():
+        parts = lat_raw[pipe].str.split("|", n=1)
+        lat_raw = lat_raw.where(~pipe, parts.str[0].str.strip())
+        lng_raw = lng_raw.where(~pipe, parts.str[1].str.strip())
+    return _coords(lat_raw), _coords(lng_raw)
+
+
+# ─── Claves jerárquicas ──────────────────────────────────────────────────────
+
+
+def _keys_frame(df: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    """cod / nombre_vend / vend_key / erp_suc / ruta_code por fila (posicional)."""
+    cod = _strip_dot0(_safe_text(df, cols.get("vendedor_erp_cod")))
+    nombre_vend = _safe_text(df, cols.get("vendedor_nombre")).str.upper()
+    vend_key = cod.where(cod != "", nombre_vend.where(nombre_vend != "", "SIN VENDEDOR"))
+
+    suc_nombre = _safe_text(df, cols.get("sucursal"), "CASA CENTRAL")
+    erp_suc = _strip_dot0(_safe_text(df, cols.get("id_sucursal")))
+    sin_id = erp_suc == ""
+    if sin_id.any():
+        fallback = _map_unique(
+            suc_nombre[sin_id].to_numpy(dtype=object),
+            lambda n: _norm(n).replace(" ", "_") or "suc_0",
+        )
+        erp_suc = erp_suc.copy()
+        erp_suc[sin_id] = fallback
+
+    ruta_code = _strip_dot0(_safe_text(df, cols.get("ruta"), "R00").str.upper())
+    return pd.DataFrame(
+        {
+            "cod": cod,
+            "nombre_vend": nombre_vend,
+            "vend_key": vend_key,
+            "suc_nombre": suc_nombre,
+            "erp_suc": erp_suc,
+            "ruta_code": ruta_code,
+        },
+        dtype=object,
+    )
+
+
+def _detect_dias(df: pd.DataFrame, cols: dict) -> pd.Series:
+    """``_detect_dia``: primera columna de día (en orden _DIA_KEYS) con valor verdadero."""
+    dia = _const(len(df), "Variable")
+    for key, nombre in reversed(_DIA_KEYS):
+        col = cols.get(key)
+        if not col:
+            continue
+        val = _safe_text(df, col).str.strip().str.upper()
+        dia = dia.mask(~val.isin(_DIA_FALSY), nombre)
+    return dia
+
+
+def unique_sucursales(df: pd.DataFrame, cols: dict) -> dict[str, str]:
+    """{erp_id: NOMBRE} en orden de primera aparición (= ``_rows_unique_sucursales``)."""
+    k = _keys_frame(df, cols)
+    first = k.drop_duplicates("erp_suc", keep="first")
+    return dict(zip(first["erp_suc"], first["suc_nombre"].str.upper()))
+
+
+def unique_vendedores(df: pd.DataFrame, cols: dict) -> dict[tuple[str, str], str]:
+    """{(vend_key, erp_suc): nombre_display} (= ``_rows_unique_vendedores``)."""
+    k = _keys_frame(df, cols)
+    k["nombre"] = k["nombre_vend"].where(k["nombre_vend"] != "", k["vend_key"])
+    first = k.drop_duplicates(["vend_key", "erp_suc"], keep="first")
+    return dict(zip(zip(first["vend_key"], first["erp_suc"]), first["nombre"]))
+
+
+def unique_rutas(df: pd.DataFrame, cols: dict) -> dict[tuple[str, str, str], str]:
+    """{(vend_key, erp_suc, ruta_code): dia_semana} (= ``_rows_unique_rutas``)."""
+    k = _keys_frame(df, cols)
+    k["dia"] = _detect_dias(df, cols)
+    first = k.drop_duplicates(_RUTA_KEYS, keep="first")
+    return dict(zip(zip(first["vend_key"], first["erp_suc"], first["ruta_code"]), first["dia"]))
+
+
+def _resolve_id_ruta(k: pd.DataFrame, ruta_map: dict[tuple, int]) -> np.ndarray:
+    """id_ruta por fila vía merge; fallback por nombre de vendedor si el código no mapea."""
+    rm = pd.DataFrame(
+        [(a, b, c, v) for (a, b, c), v in ruta_map.items() if v],
+        columns=[*_RUTA_KEYS, "id_ruta"],
+        dtype=object,
+    )
+    left = k[_RUTA_KEYS]
+    id_ruta = np.array(left.merge(rm, how="left", on=_RUTA_KEYS)["id_ruta"], dtype=object)
+    missing = pd.isna(id_ruta)
+    need = (
+        missing
+        & (k["cod"] != "").to_numpy()
+        & (k["nombre_vend"] != "").to_numpy()
+        & (k["cod"] != k["nombre_vend"]).to_numpy()
+    )
+    if need.any():
+        by_name = (
+            k.loc[need, ["nombre_vend", "erp_suc", "ruta_code"]]
+            .rename(columns={"nombre_vend": "vend_key"})
+            .merge(rm, how="left", on=_RUTA_KEYS)["id_ruta"]
+            .to_numpy(dtype=object)
+        )
+        id_ruta[need] = by_name
+    id_ruta[pd.isna(id_ruta)] = None
+    return id_ruta
+
+
+def cliente_records(
+    df: pd.DataFrame,
+    cols: dict,
+    dist_id: int,
+    ruta_map: dict[tuple, int],
+    now: datetime,
+) -> tuple[list[dict], set[str], int, int, int]:
+    """
+    Payloads PDV únicos por id_cliente_erp (= ``_rows_cliente_records``).
+    Retorna (records, erp_seen_in_sheet, skip_no_id, skip_no_ruta, dup_erp_merged).
+    """
+    n = len(df)
+    if n == 0:
+        return [], set(), 0, 0, 0
+
+    id_erp = _strip_dot0(_safe_text(df, cols.get("id_cliente")))
+    has_id = (id_erp != "").to_numpy()
+    skip_no_id = int((~has_id).sum())
+    erp_seen_in_sheet = set(id_erp[has_id].str.strip())
+
+    k = _keys_frame(df, cols)
+    id_ruta = _resolve_id_ruta(k, ruta_map)
+    has_ruta = np.array([v is not None for v in id_ruta], dtype=bool)
+    keep = has_id & has_ruta
+    skip_no_ruta = int((has_id & ~has_ruta).sum())
+    if not keep.any():
+        return [], erp_seen_in_sheet, skip_no_id, skip_no_ruta, 0
+
+    nombre_cliente = _safe_text(df, cols.get("nombre_cliente"))
+    fantasia = _safe_text(df, cols.get("fantasia"))
+    fantasia = fantasia.where(
+        fantasia != "", nombre_cliente.where(nombre_cliente != "", "SIN NOMBRE")
+    )
+    latitud, longitud = _latlng(df, cols)
+    anulado_col = cols.get("anulado")
+    if anulado_col:
+        anulado = _safe_text(df, anulado_col).str.strip().str.upper().isin(_ANULADO_SI).to_numpy()
+    else:
+        anulado = np.zeros(n, dtype=bool)
+
+    rows = pd.DataFrame(
+        {
+            "id_ruta": id_ruta,
+            "id_cliente_erp": id_erp.to_numpy(dtype=object),
+            "nombre_fantasia": fantasia.str.upper().to_numpy(dtype=object),
+            "nombre_razon_social": nombre_cliente.str.upper().to_numpy(dtype=object),
+            "domicilio": _safe_text(df, cols.get("domicilio")).str.upper().to_numpy(dtype=object),
+            "localidad": _safe_text(df, cols.get("localidad")).str.upper().to_numpy(dtype=object),
+            "telefono": _phones(df, cols.get("telefono")),
+            "celular": _phones(df, cols.get("celular")),
+            "provincia": _safe_text(df, cols.get("provincia")).str.upper().to_numpy(dtype=object),
+            "canal": _safe_text(df, cols.get("canal")).str.upper().to_numpy(dtype=object),
+            "fecha_alta": _safe_dates(df, cols.get("fecha_alta")),
+            "latitud": latitud,
+            "longitud": longitud,
+            "fuc": _safe_dates(df, cols.get("fecha_ultima_compra")),
+            "anulado": anulado,
+        },
+        dtype=object,
+    )[keep].reset_index(drop=True)
+    rows["erp_key"] = rows["id_cliente_erp"].str.strip()
+
+    # ── Dedup por id_cliente_erp ──────────────────────────────────────────────
+    # Orden: primera aparición. Campos: última fila. FUC: la más reciente.
+    # Teléfonos: último no vacío; si ninguno, el de la primera fila.
+    keys = rows["erp_key"]
+    first_pos = np.flatnonzero(~keys.duplicated(keep="first").to_numpy())
+    order = keys.iloc[first_pos].to_numpy()
+    last_pos = (
+        pd.Series(np.arange(len(rows))).groupby(keys.to_numpy(), sort=False).last()
+        .reindex(order).to_numpy()
+    )
+    dup_erp_merged = int(len(rows) - len(first_pos))
+
+    # ISO YYYY-MM-DD: max lexicográfico == max de fecha ("" = sin FUC).
+    fuc_codes, fuc_uniques = pd.factorize(rows["fuc"].fillna("").to_numpy(dtype=object), sort=True)
+    fuc_max = np.asarray(fuc_uniques, dtype=object)[
+        pd.Series(fuc_codes).groupby(keys.to_numpy(), sort=False).max().reindex(order).to_numpy()
+    ]
+    phones: dict[str, np.ndarray] = {}
+    for pk in ("telefono", "celular"):
+        col = rows[pk]
+        truthy = col.notna() & (col != "")
+        last_truthy = (
+            col.where(truthy).groupby(keys, sort=False).last().reindex(order)
+        ).to_numpy(dtype=object)
+        first_val = col.to_numpy(dtype=object)[first_pos]
+        phones[pk] = np.where(pd.isna(last_truthy), first_val, last_truthy)
+
+    now_ts = now.isoformat()
+    estado_por_fuc: dict[Any, tuple[str, str | None, str | None]] = {}
+    empty_row = pd.Series({}, dtype=object)
+
+    last = rows.iloc[last_pos]
+    records: list[dict] = []
+    for (
+        r_ruta, r_erp, r_fant, r_rs, r_dom, r_loc, r_prov, r_canal, r_alta, r_lat, r_lng, r_anul,
+        fuc, tel, cel,
+    ) in zip(
+        last["id_ruta"], last["id_cliente_erp"], last["nombre_fantasia"],
+        last["nombre_razon_social"], last["domicilio"], last["localidad"],
+        last["provincia"], last["canal"], last["fecha_alta"], last["latitud"],
+        last["longitud"], last["anulado"],
+        fuc_max, phones["telefono"], phones["celular"],
+    ):
+        if pd.isna(fuc) or fuc == "":
+            fuc = None
+        payload = {
+            "id_ruta":             r_ruta,
+            "id_distribuidor":     dist_id,
+            "id_cliente_erp":      r_erp,
+            "nombre_fantasia":     r_fant,
+            "nombre_razon_social": r_rs,
+            "domicilio":           r_dom,
+            "localidad":           r_loc,
+            "telefono":            tel,
+            "celular":             cel,
+            "provincia":           r_prov,
+            "canal":               r_canal,
+            "fecha_alta":          r_alta,
+            "latitud":             r_lat,
+            "longitud":            r_lng,
+            "es_limbo":            False,
+            "updated_at":          now_ts,
+        }
+        if fuc is not None:
+            payload["fecha_ultima_compra"] = fuc
+        if r_anul:
+            estado = ("inactivo", "padron_anulado", now_ts)
+        else:
+            estado = estado_por_fuc.get(fuc)
+            if estado is None:
+                estado = _estado_cliente_desde_padron(empty_row, {}, fuc, now)
+                estado_por_fuc[fuc] = estado
+        payload["estado"], payload["motivo_inactivo"], payload["fecha_inactivacion"] = estado
+        records.append(payload)
+
+    return records, erp_seen_in_sheet, skip_no_id, skip_no_ruta, dup_erp_merged
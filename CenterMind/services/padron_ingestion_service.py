@@ -24,17 +24,20 @@ Características:
 
 from __future__ import annotations
 
-import io
 import logging
+import os
 import unicodedata
 import re
 from datetime import date, datetime, timedelta, timezone
+from collections.abc import Callable
 from typing import Any
 
 import pandas as pd
 
 from db import sb
+from core.excel_stream import iter_table_chunks
 from core.tenant_tables import tenant_table_name
+from core.padron_fingerprint import diff_by_fingerprint
 
 logger = logging.getLogger("PadronIngestion")
 
@@ -244,17 +247,21 @@ def _fuc_iso_max(a: str | None, b: str | None) -> str | None:
 
 
 def _estado_cliente_desde_padron(
-    row: pd.Series, cols: dict[str, str | None], fuc_raw: str | None
+    row: pd.Series,
+    cols: dict[str, str | None],
+    fuc_raw: str | None,
+    now: datetime | None = None,
 ) -> tuple[str, str | None, str | None]:
     """(estado, motivo_inactivo, fecha_inactivacion iso) según anulado + última compra."""
-    _now_ts = datetime.now(timezone.utc).isoformat()
+    now = now or datetime.now(timezone.utc)
+    _now_ts = now.isoformat()
     if _row_padron_anulado_si(row, cols):
         return "inactivo", "padron_anulado", _now_ts
     if fuc_raw is None:
         return "inactivo", "sin_compra_null", _now_ts
     try:
         fuc_date = date.fromisoformat(fuc_raw)
-        _thirty_ago = datetime.now(timezone.utc).date() - timedelta(days=30)
+        _thirty_ago = now.date() - timedelta(days=30)
         if fuc_date < _thirty_ago:
             return "inactivo", "sin_compra_30d", _now_ts
         return "activo", None, None
@@ -339,6 +346,201 @@ def _detect_dia(row: Any, cols: dict) -> str:
     return "Variable"
 
 
+def _columnar_enabled() -> bool:
+    """Ruta columnar (services.padron_columnar) por defecto; PADRON_COLUMNAR_INGEST=0 vuelve a iterrows."""
+    raw = (os.getenv("PADRON_COLUMNAR_INGEST") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def _incremental_enabled() -> bool:
+    """Upsert incremental por huella (padron_fingerprints); PADRON_INCREMENTAL_UPSERT=0 reenvía todo."""
+    raw = (os.getenv("PADRON_INCREMENTAL_UPSERT") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+# Huellas más viejas se ignoran ⇒ cada PDV se reenvía al menos cada N días
+# (recupera ediciones hechas en DB por fuera del padrón).
+_FINGERPRINT_TTL_DAYS = int(os.getenv("PADRON_FINGERPRINT_TTL_DAYS", "7"))
+
+
+# ─── Extracción fila a fila (referencia) ─────────────────────────────────────
+# Implementación original con iterrows. services.padron_columnar produce exactamente
+# la misma salida; éstas quedan como referencia para test de paridad y benchmark.
+
+
+def _row_vendedor_keys(row: Any, cols: dict) -> tuple[str, str, str]:
+    """(cod, nombre_vend, vend_key) — mismo criterio en vendedores, rutas y clientes."""
+    cod = _safe_str(row.get(cols["vendedor_erp_cod"]) if cols.get("vendedor_erp_cod") else None, "")
+    # Limpiar ".0" de los floats convertidos a str (ej. "1010.0" → "1010")
+    if cod.endswith(".0"):
+        cod = cod[:-2]
+    nombre_vend = _safe_str(row.get(cols["vendedor_nombre"]) if cols.get("vendedor_nombre") else None, "").upper()
+    vend_key = cod if cod else (nombre_vend or "SIN VENDEDOR")
+    return cod, nombre_vend, vend_key
+
+
+def _row_erp_sucursal(row: Any, cols: dict) -> str:
+    erp_suc = _safe_str(row.get(cols["id_sucursal"]) if cols.get("id_sucursal") else None, "")
+    if erp_suc.endswith(".0"):
+        erp_suc = erp_suc[:-2]
+    if not erp_suc:
+        suc_nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
+        erp_suc = _norm(suc_nombre).replace(" ", "_") or "suc_0"
+    return erp_suc
+
+
+def _row_ruta_code(row: Any, cols: dict) -> str:
+    ruta_code = _safe_str(row.get(cols["ruta"]) if cols.get("ruta") else None, "R00").upper()
+    if ruta_code.endswith(".0"):
+        ruta_code = ruta_code[:-2]
+    return ruta_code
+
+
+def _rows_unique_sucursales(df: pd.DataFrame, cols: dict) -> dict[str, str]:
+    """{erp_id: NOMBRE} en orden de primera aparición."""
+    unique: dict[str, str] = {}  # erp_id → nombre
+    for _, row in df.iterrows():
+        nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
+        erp_id = _row_erp_sucursal(row, cols)
+        if erp_id not in unique:
+            unique[erp_id] = nombre.upper()
+    return unique
+
+
+def _rows_unique_vendedores(df: pd.DataFrame, cols: dict) -> dict[tuple[str, str], str]:
+    """{(vend_key, erp_suc): nombre_display}; vend_key = código ERP si existe, sino nombre."""
+    unique: dict[tuple[str, str], str] = {}
+    for _, row in df.iterrows():
+        _, nombre, vend_key = _row_vendedor_keys(row, cols)
+        if not nombre:
+            nombre = vend_key
+        erp_suc = _row_erp_sucursal(row, cols)
+        if (vend_key, erp_suc) not in unique:
+            unique[(vend_key, erp_suc)] = nombre
+    return unique
+
+
+def _rows_unique_rutas(df: pd.DataFrame, cols: dict) -> dict[tuple[str, str, str], str]:
+    """{(vend_key, erp_suc, ruta_code): dia_semana de la primera fila encontrada}."""
+    ruta_dia: dict[tuple[str, str, str], str] = {}
+    for _, row in df.iterrows():
+        _, _, vend_key = _row_vendedor_keys(row, cols)
+        key = (vend_key, _row_erp_sucursal(row, cols), _row_ruta_code(row, cols))
+        if key not in ruta_dia:
+            ruta_dia[key] = _detect_dia(row, cols)
+    return ruta_dia
+
+
+def _rows_cliente_records(
+    df: pd.DataFrame,
+    cols: dict,
+    dist_id: int,
+    ruta_map: dict[tuple, int],
+    now: datetime,
+) -> tuple[list[dict], set[str], int, int, int]:
+    """
+    Payloads PDV únicos por id_cliente_erp (fusiona duplicados: FUC más reciente,
+    teléfonos no vacíos). Retorna (records, erp_seen_in_sheet, skip_no_id,
+    skip_no_ruta, dup_erp_merged).
+    """
+    by_erp: dict[str, dict] = {}
+    skip_no_id = 0
+    skip_no_ruta = 0
+    dup_erp_merged = 0
+    erp_seen_in_sheet: set[str] = set()
+    _now_ts = now.isoformat()
+
+    for _, row in df.iterrows():
+        id_erp = _safe_str(row.get(cols["id_cliente"]) if cols.get("id_cliente") else None, "")
+        # Limpiar ".0" de floats (ej. "4366.0" → "4366")
+        if id_erp.endswith(".0"):
+            id_erp = id_erp[:-2]
+        if not id_erp:
+            skip_no_id += 1
+            continue
+
+        erp_seen_in_sheet.add(str(id_erp).strip())
+
+        # Resolver ruta usando los mismos keys que en _sync_rutas
+        cod, nombre_vend, vend_key = _row_vendedor_keys(row, cols)
+        erp_suc = _row_erp_sucursal(row, cols)
+        ruta_code = _row_ruta_code(row, cols)
+
+        id_ruta = ruta_map.get((vend_key, erp_suc, ruta_code))
+        # Fallback: mismas combinaciones aparecen como código ERP en algunas filas y sólo nombre en otras.
+        if not id_ruta and cod and nombre_vend and cod != nombre_vend:
+            if vend_key == cod:
+                id_ruta = ruta_map.get((nombre_vend, erp_suc, ruta_code))
+            else:
+                id_ruta = ruta_map.get((cod, erp_suc, ruta_code))
+
+        if not id_ruta:
+            skip_no_ruta += 1
+            logger.debug(
+                "[Padrón] Cliente %s omitido esta corrida sin id_ruta (vend_key=%r suc=%s ruta=%s)",
+                id_erp,
+                vend_key,
+                erp_suc,
+                ruta_code,
+            )
+            continue
+
+        lat_raw = _safe_str(row.get(cols["latitud"]))  if cols.get("latitud")  else ""
+        lng_raw = _safe_str(row.get(cols["longitud"])) if cols.get("longitud") else ""
+        latitud, longitud = _parse_latlng(lat_raw, lng_raw)
+
+        fuc_raw = _safe_date(row.get(cols["fecha_ultima_compra"]) if cols.get("fecha_ultima_compra") else None)
+
+        payload = {
+            "id_ruta":             id_ruta,
+            "id_distribuidor":     dist_id,
+            "id_cliente_erp":      id_erp,
+            "nombre_fantasia":     _safe_str(row.get(cols["fantasia"]) if cols.get("fantasia") else None,
+                                             _safe_str(row.get(cols["nombre_cliente"]) if cols.get("nombre_cliente") else None, "SIN NOMBRE")).upper(),
+            "nombre_razon_social": _safe_str(row.get(cols["nombre_cliente"]) if cols.get("nombre_cliente") else None, "").upper(),
+            "domicilio":           _safe_str(row.get(cols["domicilio"]) if cols.get("domicilio") else None, "").upper(),
+            "localidad":           _safe_str(row.get(cols["localidad"]) if cols.get("localidad") else None, "").upper(),
+            "telefono":            _phone_str(row, cols, "telefono"),
+            "celular":             _phone_str(row, cols, "celular"),
+            "provincia":           _safe_str(row.get(cols["provincia"]) if cols.get("provincia") else None, "").upper(),
+            "canal":               _safe_str(row.get(cols["canal"]) if cols.get("canal") else None, "").upper(),
+            "fecha_alta":          _safe_date(row.get(cols["fecha_alta"]) if cols.get("fecha_alta") else None),
+            "latitud":             latitud,
+            "longitud":            longitud,
+            "es_limbo":            False,
+            "updated_at":          _now_ts,
+        }
+        if fuc_raw is not None:
+            payload["fecha_ultima_compra"] = fuc_raw
+
+        erp_key = str(id_erp).strip()
+        prev = by_erp.get(erp_key)
+        if prev:
+            dup_erp_merged += 1
+            merged_fuc = _fuc_iso_max(prev.get("fecha_ultima_compra"), payload.get("fecha_ultima_compra"))
+            merged = {**payload}
+            if merged_fuc:
+                merged["fecha_ultima_compra"] = merged_fuc
+            elif "fecha_ultima_compra" in prev and "fecha_ultima_compra" not in merged:
+                merged["fecha_ultima_compra"] = prev["fecha_ultima_compra"]
+            for pk in ("telefono", "celular"):
+                merged[pk] = payload.get(pk) or prev.get(pk)
+            _estado, _motivo, _fecha_inact = _estado_cliente_desde_padron(row, cols, merged_fuc, now)
+            merged["estado"] = _estado
+            merged["motivo_inactivo"] = _motivo
+            merged["fecha_inactivacion"] = _fecha_inact
+            payload = merged
+        else:
+            _estado, _motivo, _fecha_inact = _estado_cliente_desde_padron(row, cols, fuc_raw, now)
+            payload["estado"] = _estado
+            payload["motivo_inactivo"] = _motivo
+            payload["fecha_inactivacion"] = _fecha_inact
+
+        by_erp[erp_key] = payload
+
+    return list(by_erp.values()), erp_seen_in_sheet, skip_no_id, skip_no_ruta, dup_erp_merged
+
+
 # ─── Servicio ─────────────────────────────────────────────────────────────────
 
 class PadronIngestionService:
@@ -386,10 +588,10 @@ class PadronIngestionService:
                 logger.debug("[Padrón] notify ops omitido: %s", e_ops)
         if estado == "ok" and dist_id is not None:
             try:
-                from services.snapshot_refresh_service import refresh_eager
-                refresh_eager(dist_id, ["estadisticas", "dashboard"])
+                from core.job_queue import enqueue_snapshots
+                enqueue_snapshots(dist_id, warm=["estadisticas", "dashboard"])
             except Exception as e_snap:
-                logger.debug("[Padrón] snapshot refresh_eager omitido: %s", e_snap)
+                logger.debug("[Padrón] snapshot refresh omitido: %s", e_snap)
 
     def record_sin_cambios_run(self, dist_id: int, source: str = "rpa_hash_guard") -> int:
         """
@@ -423,7 +625,11 @@ class PadronIngestionService:
         resultados: list[dict],
         error_msg: str | None = None,
     ) -> None:
-        keys = ("sucursales", "vendedores", "rutas", "clientes", "clientes_inactivos_padron", "exhib_vinculadas")
+        keys = (
+            "sucursales", "vendedores", "rutas", "clientes",
+            "clientes_insertados", "clientes_actualizados", "clientes_sin_cambios",
+            "clientes_inactivos_padron", "exhib_vinculadas",
+        )
         agg: dict[str, int] = {k: 0 for k in keys}
         dist_ids: list[int] = []
         for r in resultados:
@@ -459,24 +665,76 @@ class PadronIngestionService:
             except Exception as e_ops:
                 logger.debug("[Padrón] notify global ok omitido: %s", e_ops)
 
-    # ── Parseo del Excel ──────────────────────────────────────────────────────
+    # ── Huellas padrón (upsert incremental) ──────────────────────────────────
 
-    def _parse_excel(self, file_bytes: bytes) -> pd.DataFrame:
-        """Lee el Excel del Padrón con tolerancia a distintos formatos."""
-        buf = io.BytesIO(file_bytes)
+    def _load_fingerprints(self, dist_id: int) -> dict[str, str] | None:
+        """{id_cliente_erp: hash} vigentes (< TTL). None si la tabla no está disponible."""
+        from db import fetch_all
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=_FINGERPRINT_TTL_DAYS)).isoformat()
         try:
-            # engine='openpyxl' explícito; keep_default_na=False evita que celdas
-            # vacías detengan la lectura en algunas versiones de openpyxl.
-            df = pd.read_excel(buf, dtype=str, engine="openpyxl", keep_default_na=False)
-        except Exception as exc:
-            logger.warning(f"[Padrón] Fallo lectura XLSX ({exc}), intentando CSV...")
-            buf.seek(0)
-            df = pd.read_csv(buf, sep=None, engine="python", dtype=str, encoding="latin1")
-        df.columns = [str(c).strip() for c in df.columns]
-        # Eliminar filas completamente vacías (son frecuentes en exports de ERP)
-        df = df.replace("", float("nan"))
-        df = df.dropna(how="all")
-        df = df.fillna("")
+            rows = fetch_all(
+                lambda: sb.table("padron_fingerprints")
+                .select("id_cliente_erp,fp")
+                .eq("id_distribuidor", dist_id)
+                .gte("updated_at", cutoff),
+                key="id_cliente_erp",
+            )
+        except Exception as e:
+            logger.warning(f"[Padrón] Huellas no disponibles dist={dist_id} ({e}); upsert completo")
+            return None
+        return {str(r["id_cliente_erp"]): r["fp"] for r in rows if r.get("id_cliente_erp")}
+
+    def _save_fingerprints(self, dist_id: int, fps: dict[str, str]) -> None:
+        ts = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {"id_distribuidor": dist_id, "id_cliente_erp": erp, "fp": fp, "updated_at": ts}
+            for erp, fp in fps.items()
+        ]
+        for i in range(0, len(rows), 1000):
+            try:
+                sb.table("padron_fingerprints").upsert(
+                    rows[i:i + 1000], on_conflict="id_distribuidor,id_cliente_erp"
+                ).execute()
+            except Exception as e:
+                # Sin huella la fila se reenvía la próxima corrida: no es fatal.
+                logger.warning(f"[Padrón] Guardar huellas dist={dist_id} falló: {e}")
+                return
+
+    def _prune_fingerprints(self, dist_id: int, erps: list[str]) -> None:
+        """Borra huellas de PDV que ya no vienen en el archivo (si reaparecen, se reenvían)."""
+        for i in range(0, len(erps), 200):
+            try:
+                sb.table("padron_fingerprints").delete() \
+                    .eq("id_distribuidor", dist_id) \
+                    .in_("id_cliente_erp", erps[i:i + 200]) \
+                    .execute()
+            except Exception as e:
+                logger.warning(f"[Padrón] Poda de huellas dist={dist_id} falló: {e}")
+                return
+
+    # ── Parseo del Excel ──────────────────────────────────────────────────────
+
+    def _parse_excel(
+        self,
+        file_bytes: bytes,
+        chunk_filter: Callable[[pd.DataFrame], pd.DataFrame] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Lee el Excel del Padrón por chunks (openpyxl read-only; CSV si no es XLSX).
+        ``chunk_filter`` descarta filas mientras se lee: no llegan al DataFrame final.
+        """
+        chunks = []
+        for chunk in iter_table_chunks(file_bytes):
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            chunks.append(chunk_filter(chunk) if chunk_filter else chunk)
+        if not chunks:
+            df = pd.DataFrame()
+        elif len(chunks) == 1:
+            df = chunks[0]
+        else:
+            df = pd.concat(chunks, ignore_index=True).fillna("")
+        del chunks
         logger.info(f"[Padrón] Excel parseado: {len(df)} filas útiles, {len(df.columns)} columnas")
         logger.info(f"[Padrón] Columnas: {list(df.columns)}")
         return df
@@ -540,17 +798,12 @@ class PadronIngestionService:
         Devuelve (count, {id_sucursal_erp: id_sucursal}).
         """
         # Extraer únicas del Excel
-        unique: dict[str, str] = {}  # erp_id → nombre
-        for _, row in df.iterrows():
-            erp_id = _safe_str(row.get(cols["id_sucursal"]) if cols.get("id_sucursal") else None, "")
-            # Limpiar ".0" de floats convertidos a str (ej. "1.0" → "1")
-            if erp_id.endswith(".0"):
-                erp_id = erp_id[:-2]
-            nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
-            if not erp_id:
-                erp_id = _norm(nombre).replace(" ", "_") or "suc_0"
-            if erp_id not in unique:
-                unique[erp_id] = nombre.upper()
+        if _columnar_enabled():
+            from services.padron_columnar import unique_sucursales
+
+            unique = unique_sucursales(df, cols)
+        else:
+            unique = _rows_unique_sucursales(df, cols)
 
         logger.info(f"[Padrón] Sucursales únicas en Excel: {len(unique)} → {list(unique.keys())}")
 
@@ -619,28 +872,12 @@ class PadronIngestionService:
         """
         # unique: { (vend_key, erp_suc): nombre_display }
         # vend_key = código ERP si existe, sino nombre uppercased
-        unique: dict[tuple[str, str], str] = {}
-        for _, row in df.iterrows():
-            # Nombre para mostrar
-            nombre = _safe_str(row.get(cols["vendedor_nombre"]) if cols.get("vendedor_nombre") else None, "").upper()
-            # Código ERP para deduplicación
-            cod = _safe_str(row.get(cols["vendedor_erp_cod"]) if cols.get("vendedor_erp_cod") else None, "")
-            # Limpiar ".0" de los floats convertidos a str (ej. "1010.0" → "1010")
-            if cod.endswith(".0"):
-                cod = cod[:-2]
-            vend_key = cod if cod else (nombre or "SIN VENDEDOR")
-            if not nombre:
-                nombre = vend_key
-
-            erp_suc = _safe_str(row.get(cols["id_sucursal"]) if cols.get("id_sucursal") else None, "")
-            if erp_suc.endswith(".0"):
-                erp_suc = erp_suc[:-2]
-            if not erp_suc:
-                suc_nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
-                erp_suc = _norm(suc_nombre).replace(" ", "_") or "suc_0"
-
-            if (vend_key, erp_suc) not in unique:
-                unique[(vend_key, erp_suc)] = nombre
+        if _columnar_enabled():
+            from services.padron_columnar import unique_vendedores
+
+            unique = unique_vendedores(df, cols)
+        else:
+            unique = _rows_unique_vendedores(df, cols)
 
         logger.info(f"[Padrón] Vendedores únicos en Excel: {len(unique)}")
         if not unique:
@@ -750,31 +987,14 @@ class PadronIngestionService:
         Devuelve (count, {(id_vendedor, ruta_erp): id_ruta}).
         """
         # Extraer únicos: (vend_key, erp_suc, ruta_code) → dia_semana
-        # Primer paso: construir el mapa de día por ruta desde la primera fila encontrada
-        unique: dict[tuple[str, str, str], None] = {}
-        ruta_dia: dict[tuple[str, str, str], str] = {}
-        for _, row in df.iterrows():
-            cod = _safe_str(row.get(cols["vendedor_erp_cod"]) if cols.get("vendedor_erp_cod") else None, "")
-            if cod.endswith(".0"):
-                cod = cod[:-2]
-            nombre_vend = _safe_str(row.get(cols["vendedor_nombre"]) if cols.get("vendedor_nombre") else None, "").upper()
-            vend_key = cod if cod else (nombre_vend or "SIN VENDEDOR")
-
-            erp_suc = _safe_str(row.get(cols["id_sucursal"]) if cols.get("id_sucursal") else None, "")
-            if erp_suc.endswith(".0"):
-                erp_suc = erp_suc[:-2]
-            if not erp_suc:
-                suc_nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
-                erp_suc = _norm(suc_nombre).replace(" ", "_") or "suc_0"
-
-            ruta_code = _safe_str(row.get(cols["ruta"]) if cols.get("ruta") else None, "R00").upper()
-            if ruta_code.endswith(".0"):
-                ruta_code = ruta_code[:-2]
-
-            key = (vend_key, erp_suc, ruta_code)
-            unique[key] = None
-            if key not in ruta_dia:
-                ruta_dia[key] = _detect_dia(row, cols)
+        # (día tomado de la primera fila encontrada para cada ruta)
+        if _columnar_enabled():
+            from services.padron_columnar import unique_rutas
+
+            ruta_dia = unique_rutas(df, cols)
+        else:
+            ruta_dia = _rows_unique_rutas(df, cols)
+        unique = ruta_dia
 
         logger.info(f"[Padrón] Rutas únicas en Excel: {len(unique)}")
         if not unique:
@@ -837,9 +1057,10 @@ class PadronIngestionService:
     def _sync_clientes(
         self, df: pd.DataFrame, cols: dict, dist_id: int,
         ruta_map: dict[tuple, int], vend_map: dict[tuple, int], suc_map: dict[str, int]
-    ) -> tuple[int, dict[str, int], set[int], frozenset[str]]:
+    ) -> tuple[int, dict[str, int], set[int], frozenset[str], dict[str, int], list[str] | None]:
         """
-        Upsert masivo de clientes PDV.
+        Upsert masivo de clientes PDV (incremental: sólo filas nuevas o cambiadas
+        según `padron_fingerprints`; ver core/padron_fingerprint.py).
 
         Además, adopta clientes 'limbo' existentes: si hay un cliente en
         clientes_pdv con es_limbo=True cuyo id_cliente_erp aparece en este
@@ -848,130 +1069,37 @@ class PadronIngestionService:
         Retorna (total_upserted, mapa id_cliente_erp → id_ruta esperado en este archivo,
         conjunto de id_ruta presentes en el archivo, ids ERP presentes en **cualquier**
         fila del Excel) para el tombstone: no dar de baja filas válidas sólo porque
-        faltó mapear (vendedor/código inconsistente temporal).
+        faltó mapear (vendedor/código inconsistente temporal), y conteos
+        {clientes_insertados, clientes_actualizados, clientes_sin_cambios} para motor_runs,
+        y los ERP nuevos/cambiados para el watcher incremental (None ⇒ sin huellas previas).
         """
         BATCH = 300
-        by_erp: dict[str, dict] = {}
-        skip_no_id = 0
-        skip_no_ruta = 0
-        dup_erp_merged = 0
+        # Un único timestamp por corrida (updated_at / fecha_inactivacion).
+        now = datetime.now(timezone.utc)
+        if _columnar_enabled():
+            from services.padron_columnar import cliente_records
 
+            records, erp_seen_in_sheet, skip_no_id, skip_no_ruta, dup_erp_merged = cliente_records(
+                df, cols, dist_id, ruta_map, now
+            )
+        else:
+            records, erp_seen_in_sheet, skip_no_id, skip_no_ruta, dup_erp_merged = _rows_cliente_records(
+                df, cols, dist_id, ruta_map, now
+            )
         # Recolectar todos los id_erp del padrón para el paso de adopción
-        erp_ids_en_padron: dict[str, dict] = {}
-        erp_seen_in_sheet: set[str] = set()
-
-        for _, row in df.iterrows():
-            id_erp = _safe_str(row.get(cols["id_cliente"]) if cols.get("id_cliente") else None, "")
-            # Limpiar ".0" de floats (ej. "4366.0" → "4366")
-            if id_erp.endswith(".0"):
-                id_erp = id_erp[:-2]
-            if not id_erp:
-                skip_no_id += 1
-                continue
-
-            erp_seen_in_sheet.add(str(id_erp).strip())
-
-            # Resolver ruta usando los mismos keys que en _sync_rutas
-            cod = _safe_str(row.get(cols["vendedor_erp_cod"]) if cols.get("vendedor_erp_cod") else None, "")
-            if cod.endswith(".0"):
-                cod = cod[:-2]
-            nombre_vend = _safe_str(row.get(cols["vendedor_nombre"]) if cols.get("vendedor_nombre") else None, "").upper()
-            vend_key = cod if cod else (nombre_vend or "SIN VENDEDOR")
-
-            erp_suc = _safe_str(row.get(cols["id_sucursal"]) if cols.get("id_sucursal") else None, "")
-            if erp_suc.endswith(".0"):
-                erp_suc = erp_suc[:-2]
-            if not erp_suc:
-                suc_nombre = _safe_str(row.get(cols["sucursal"]) if cols.get("sucursal") else None, "CASA CENTRAL")
-                erp_suc = _norm(suc_nombre).replace(" ", "_") or "suc_0"
-
-            ruta_code = _safe_str(row.get(cols["ruta"]) if cols.get("ruta") else None, "R00").upper()
-            if ruta_code.endswith(".0"):
-                ruta_code = ruta_code[:-2]
-
-            id_ruta = ruta_map.get((vend_key, erp_suc, ruta_code))
-            # Fallback: mismas combinaciones aparecen como código ERP en algunas filas y sólo nombre en otras.
-            if not id_ruta and cod and nombre_vend and cod != nombre_vend:
-                if vend_key == cod:
-                    id_ruta = ruta_map.get((nombre_vend, erp_suc, ruta_code))
-                else:
-                    id_ruta = ruta_map.get((cod, erp_suc, ruta_code))
-
-            if not id_ruta:
-                skip_no_ruta += 1
-                logger.debug(
-                    "[Padrón] Cliente %s omitido esta corrida sin id_ruta (vend_key=%r suc=%s ruta=%s)",
-                    id_erp,
-                    vend_key,
-                    erp_suc,
-                    ruta_code,
-                )
-                continue
-
-            lat_raw = _safe_str(row.get(cols["latitud"]))  if cols.get("latitud")  else ""
-            lng_raw = _safe_str(row.get(cols["longitud"])) if cols.get("longitud") else ""
-            latitud, longitud = _parse_latlng(lat_raw, lng_raw)
-
-            fuc_raw = _safe_date(row.get(cols["fecha_ultima_compra"]) if cols.get("fecha_ultima_compra") else None)
-            _now_ts = datetime.now(timezone.utc).isoformat()
-
-            payload = {
-                "id_ruta":             id_ruta,
-                "id_distribuidor":     dist_id,
-                "id_cliente_erp":      id_erp,
-                "nombre_fantasia":     _safe_str(row.get(cols["fantasia"]) if cols.get("fantasia") else None,
-                                                 _safe_str(row.get(cols["nombre_cliente"]) if cols.get("nombre_cliente") else None, "SIN NOMBRE")).upper(),
-                "nombre_razon_social": _safe_str(row.get(cols["nombre_cliente"]) if cols.get("nombre_cliente") else None, "").upper(),
-                "domicilio":           _safe_str(row.get(cols["domicilio"]) if cols.get("domicilio") else None, "").upper(),
-                "localidad":           _safe_str(row.get(cols["localidad"]) if cols.get("localidad") else None, "").upper(),
-                "telefono":            _phone_str(row, cols, "telefono"),
-                "celular":             _phone_str(row, cols, "celular"),
-                "provincia":           _safe_str(row.get(cols["provincia"]) if cols.get("provincia") else None, "").upper(),
-                "canal":               _safe_str(row.get(cols["canal"]) if cols.get("canal") else None, "").upper(),
-                "fecha_alta":          _safe_date(row.get(cols["fecha_alta"]) if cols.get("fecha_alta") else None),
-                "latitud":             latitud,
-                "longitud":            longitud,
-                "es_limbo":            False,
-                "updated_at":          _now_ts,
-            }
-            if fuc_raw is not None:
-                payload["fecha_ultima_compra"] = fuc_raw
-
-            erp_key = str(id_erp).strip()
-            prev = by_erp.get(erp_key)
-            if prev:
-                dup_erp_merged += 1
-                merged_fuc = _fuc_iso_max(prev.get("fecha_ultima_compra"), payload.get("fecha_ultima_compra"))
-                merged = {**payload}
-                if merged_fuc:
-                    merged["fecha_ultima_compra"] = merged_fuc
-                elif "fecha_ultima_compra" in prev and "fecha_ultima_compra" not in merged:
-                    merged["fecha_ultima_compra"] = prev["fecha_ultima_compra"]
-                for pk in ("telefono", "celular"):
-                    merged[pk] = payload.get(pk) or prev.get(pk)
-                _estado, _motivo, _fecha_inact = _estado_cliente_desde_padron(row, cols, merged_fuc)
-                merged["estado"] = _estado
-                merged["motivo_inactivo"] = _motivo
-                merged["fecha_inactivacion"] = _fecha_inact
-                payload = merged
-            else:
-                _estado, _motivo, _fecha_inact = _estado_cliente_desde_padron(row, cols, fuc_raw)
-                payload["estado"] = _estado
-                payload["motivo_inactivo"] = _motivo
-                payload["fecha_inactivacion"] = _fecha_inact
-
-            by_erp[erp_key] = payload
-            erp_ids_en_padron[erp_key] = payload
+        erp_ids_en_padron: dict[str, dict] = {
+            str(p["id_cliente_erp"]).strip(): p for p in records
+        }
 
-        records = list(by_erp.values())
         if dup_erp_merged:
             logger.info(
                 f"[Padrón] Clientes: {dup_erp_merged} filas duplicadas por id_cliente_erp fusionadas (FUC = más reciente)"
             )
         logger.info(f"[Padrón] Clientes: {len(records)} únicos a procesar, {skip_no_id} sin id_erp, {skip_no_ruta} sin ruta mapeada")
 
+        stats = {"clientes_insertados": 0, "clientes_actualizados": 0, "clientes_sin_cambios": 0}
         if not records:
-            return 0, {}, set(), frozenset(erp_seen_in_sheet)
+            return 0, {}, set(), frozenset(erp_seen_in_sheet), stats, None
 
         erp_to_ruta: dict[str, int] = {}
         rutas_en_archivo: set[int] = set()
@@ -987,6 +1115,7 @@ class PadronIngestionService:
         # Busca registros es_limbo=True cuyo id_cliente_erp aparece en este padrón
         # y los actualiza con los datos reales + los reasigna a la ruta correcta.
         adopted = 0
+        erps_adoptados: set[str] = set()
         if erp_ids_en_padron:
             # Filtramos por dist + limbo en DB, luego cruzamos en Python
             # (evita URL too long con miles de ids en .in_())
@@ -1009,9 +1138,24 @@ class PadronIngestionService:
                     .eq("id_cliente", limbo["id_cliente"]) \
                     .execute()
                 adopted += 1
+                erps_adoptados.add(str(erp_id))
             if adopted:
                 logger.info(f"[Padrón] Clientes limbo adoptados: {adopted}")
 
+        # ── Diff por huella: sólo nuevos / cambiados ──────────────────────────
+        prev_fps = self._load_fingerprints(dist_id) if _incremental_enabled() else None
+        pending, fresh_fps, unchanged = diff_by_fingerprint(records, prev_fps)
+        stats["clientes_sin_cambios"] = unchanged
+        erps_cambiados: list[str] | None = None
+        if prev_fps is not None:
+            erps_cambiados = sorted(
+                {str(p.get("id_cliente_erp") or "").strip() for p in pending} | erps_adoptados
+            )
+            logger.info(
+                f"[Padrón] Clientes: {len(pending)} nuevos/cambiados, {unchanged} sin cambios (huella)"
+            )
+        sent_fps: dict[str, str] = {}
+
         # ── Upsert normal en batches ──────────────────────────────────────────
         # Compat operativa:
         # - En algunos entornos todavía no existe UNIQUE(dist,id_cliente_erp),
@@ -1019,10 +1163,10 @@ class PadronIngestionService:
         # - Para no cortar ingestas, primero actualizamos por PK (id_cliente) los
         #   ERP ya existentes en el dist; luego hacemos upsert de los nuevos por
         #   (id_ruta,id_cliente_erp).
-        total = 0
+        total = unchanged
         fuc_downgrade_skipped = 0
-        for i in range(0, len(records), BATCH):
-            batch = records[i:i + BATCH]
+        for i in range(0, len(pending), BATCH):
+            batch = pending[i:i + BATCH]
             erp_ids = [str((it.get("id_cliente_erp") or "")).strip() for it in batch if it.get("id_cliente_erp")]
             existing_by_erp: dict[str, int] = {}
             existing_fuc_by_erp: dict[str, str] = {}
@@ -1082,7 +1226,7 @@ class PadronIngestionService:
                     if upd.get("motivo_inactivo") != "padron_anulado":
                         merged = upd.get("fecha_ultima_compra")
                         est, mot, finact = _estado_cliente_desde_padron(
-                            pd.Series({}), cols, str(merged)[:10] if merged else None
+                            pd.Series({}), cols, str(merged)[:10] if merged else None, now
                         )
                         upd["estado"] = est
                         upd["motivo_inactivo"] = mot
@@ -1120,15 +1264,28 @@ class PadronIngestionService:
                     logger.error(f"[Padrón] Insert batch {i//BATCH} también falló: {e_insert}")
                     continue
             total += len(batch)
+            stats["clientes_insertados"] += len(to_upsert)
+            stats["clientes_actualizados"] += len(to_update)
+            for item in batch:
+                erp = str(item.get("id_cliente_erp") or "").strip()
+                if erp in fresh_fps:
+                    sent_fps[erp] = fresh_fps[erp]
             if (i // BATCH) % 10 == 0:
                 logger.info(f"[Padrón] Clientes procesados: {total}/{len(records)}...")
 
+        if prev_fps is not None:
+            if sent_fps:
+                self._save_fingerprints(dist_id, sent_fps)
+            ausentes = [erp for erp in prev_fps if erp not in erp_ids_en_padron]
+            if ausentes:
+                self._prune_fingerprints(dist_id, ausentes)
+
         if fuc_downgrade_skipped:
             logger.warning(
                 f"[Padrón] {fuc_downgrade_skipped} clientes: Excel traía FUC más vieja que DB; se conservó la más reciente"
             )
-        logger.info(f"[Padrón] Clientes upserted: {total} (adoptados del limbo: {adopted})")
-        return total, erp_to_ruta, rutas_en_archivo, frozenset(erp_seen_in_sheet)
+        logger.info(f"[Padrón] Clientes upserted: {total} (adoptados del limbo: {adopted}) → {stats}")
+        return total, erp_to_ruta, rutas_en_archivo, frozenset(erp_seen_in_sheet), stats, erps_cambiados
 
     def _tombstone_padron_absents(
         self,
@@ -1507,25 +1664,11 @@ class PadronIngestionService:
         Returns:
             Lista de métricas por distribuidor procesado.
         """
-        df = self._parse_excel(file_bytes)
-        cols = self._detect_columns(df)
-
-        if not cols["id_cliente"]:
-            raise ValueError("No se encontró columna de ID de cliente en el archivo.")
-
-        # Detectar columna de empresa
-        empresa_col = _flexible_col(df, ["idempresa", "id_empresa", "empresa_id"])
-        if not empresa_col:
-            raise ValueError("No se encontró columna idempresa en el archivo.")
-
         # Limpiar y normalizar el código de empresa por fila
         def _clean_erp(v: Any) -> str:
             s = _safe_str(v, "")
             return s[:-2] if s.endswith(".0") else s
 
-        df = df.copy()
-        df["_empresa_key"] = df[empresa_col].apply(_clean_erp)
-
         # Cargar distribuidores y mapping empresa_erp → dist_id
         dist_rows = self._load_distribuidores()
         dist_map = self._load_dist_map(dist_rows)
@@ -1534,6 +1677,39 @@ class PadronIngestionService:
                 "No hay distribuidores con id_empresa_erp configurado. "
                 "Ejecute: UPDATE distribuidores SET id_empresa_erp = id_erp WHERE id_erp IS NOT NULL;"
             )
+
+        # Filas de empresas sin tenant se descartan chunk a chunk (el archivo multi-tenant
+        # trae empresas que no usan Shelfy y no tienen por qué quedar en memoria).
+        skipped: dict[str, int] = {}
+
+        def _keep_mapped(chunk: pd.DataFrame) -> pd.DataFrame:
+            col = _flexible_col(chunk, ["idempresa", "id_empresa", "empresa_id"])
+            if not col:
+                return chunk
+            keys = chunk[col].map(_clean_erp)
+            mask = keys.isin(dist_map.keys())
+            for key, n in keys[~mask].value_counts().items():
+                skipped[str(key)] = skipped.get(str(key), 0) + int(n)
+            return chunk[mask]
+
+        df = self._parse_excel(file_bytes, chunk_filter=_keep_mapped)
+        cols = self._detect_columns(df)
+
+        if not cols["id_cliente"]:
+            raise ValueError("No se encontró columna de ID de cliente en el archivo.")
+
+        # Detectar columna de empresa
+        empresa_col = _flexible_col(df, ["idempresa", "id_empresa", "empresa_id"])
+        if not empresa_col:
+            raise ValueError("No se encontró columna idempresa en el archivo.")
+
+        for empresa_erp, n_rows in skipped.items():
+            logger.warning(
+                f"[Padrón] Empresa ERP '{empresa_erp}' sin distribuidor mapeado "
+                f"— saltando {n_rows} filas"
+            )
+
+        df["_empresa_key"] = df[empresa_col].apply(_clean_erp)
         real_dist_id, magica_dist_id, bolivar_dist_id, caramele_dist_id, lag_dist_id = self._resolve_real_franchise_dists(
             dist_rows
         )
@@ -1702,7 +1878,6 @@ class PadronIngestionService:
             s = _safe_str(v, "")
             return s[:-2] if s.endswith(".0") else s
 
-        df = df.copy()
         df["_empresa_key"] = df[empresa_col].apply(_clean_erp)
 
         dist_rows = self._load_distribuidores()
@@ -2110,7 +2285,7 @@ class PadronIngestionService:
             suc_count,  suc_map  = self._sync_sucursales(df, cols, dist_id)
             vend_count, vend_map = self._sync_vendedores(df, cols, dist_id, suc_map)
             ruta_count, ruta_map = self._sync_rutas(df, cols, dist_id, vend_map, suc_map)
-            cli_count, erp_map, rutas_archivo, erp_vistos_sheet = self._sync_clientes(
+            cli_count, erp_map, rutas_archivo, erp_vistos_sheet, cli_stats, erps_cambiados = self._sync_clientes(
                 df, cols, dist_id, ruta_map, vend_map, suc_map
             )
             partial_scope = bool(SUCURSAL_FILTER.get(dist_id)) or (
@@ -2131,6 +2306,13 @@ class PadronIngestionService:
                     logger.warning(f"[Padrón] Poda rutas obsoletas omitida dist={dist_id}: {e_prune}")
             exhib_linked         = self._reconcile_exhibiciones(dist_id)
 
+            # Índice espacial de PDVs (proximidad / polígonos) y mapas de identidad
+            # (vendedores_v2 → nombre ERP) quedan viejos tras la ingesta
+            from core.identity_cache import invalidate_identity
+            from core.pdv_spatial_index import invalidate_pdv_index
+            invalidate_pdv_index(dist_id)
+            invalidate_identity(dist_id, "padron")
+
             # Avisos PDV nuevo (vendedores que declararon cliente fuera de cartera)
             try:
                 from services.bot_pdv_aviso_service import procesar_pendientes
@@ -2139,10 +2321,15 @@ class PadronIngestionService:
             except Exception as e_aviso:
                 logger.warning(f"[Padrón] Avisos PDV nuevo omitidos dist={dist_id}: {e_aviso}")
 
-            # Actualizar progreso de objetivos activos
+            # Progreso de objetivos activos: job en background_jobs (coalescido por tenant), sólo
+            # para objetivos de los clientes nuevos/cambiados (sin huellas previas: todos los de padrón)
             try:
-                from services.objetivos_watcher_service import objetivos_watcher
-                objetivos_watcher.run_watcher(dist_id)
+                from core.job_queue import enqueue_objetivos_watcher
+                from core.objetivos_deps import FUENTE_PADRON, Cambio
+                if erps_cambiados is None:
+                    enqueue_objetivos_watcher(dist_id, cambio=Cambio.de(FUENTE_PADRON, sin_ids=True))
+                elif erps_cambiados:
+                    enqueue_objetivos_watcher(dist_id, cambio=Cambio.de(FUENTE_PADRON, erps=erps_cambiados))
             except Exception as e_watch:
                 logger.warning(f"[Padrón] Watcher de objetivos omitido: {e_watch}")
 
@@ -2152,6 +2339,7 @@ class PadronIngestionService:
                 "vendedores":       vend_count,
                 "rutas":            ruta_count,
                 "clientes":         cli_count,
+                **cli_stats,
                 "clientes_inactivos_padron": cli_inactivos,
                 "rutas_obsoletas_borradas": rutas_obsoletas_borradas,
                 "exhib_vinculadas": exhib_linked,
@@ -13,6 +13,7 @@ from core.exhibicion_aggregate import (
     erp_lookup_keys,
     resolve_exhibition_cliente_erp,
 )
+from core.foto_renditions import rendition_fields
 from core.helpers import (
     _get_erp_name_map,
     build_integrante_to_erp_name,
@@ -40,7 +41,7 @@ PENDIENTES_ESTADOS_DB = (
 )
 
 _EXH_PENDIENTES_SELECT = (
-    "id_exhibicion,id_integrante,estado,timestamp_subida,url_foto_drive,"
+    "id_exhibicion,id_integrante,estado,timestamp_subida,url_foto_drive,foto_renditions,"
     "telegram_msg_id,id_cliente_pdv,id_cliente,cliente_sombra_codigo,id_objetivo,tipo_pdv"
 )
 
@@ -234,6 +235,7 @@ def _fetch_pendientes_exhibiciones(dist_id: int) -> list[dict]:
                 "tipo_pdv": (r.get("tipo_pdv") or "").strip() or "S/D",
                 "fecha_hora": r.get("timestamp_subida") or "",
                 "drive_link": r.get("url_foto_drive") or "",
+                **rendition_fields(r),
                 "telegram_msg_id": r.get("telegram_msg_id"),
                 "estado": r.get("estado"),
                 "cliente_sombra_codigo": r.get("cliente_sombra_codigo"),
@@ -516,6 +518,8 @@ def build_pendientes_grupos(dist_id: int, hide_qa: bool = False) -> list[dict]:
         grupos[key]["fotos"].append({
             "id_exhibicion": ex_id,
             "drive_link": d.get("drive_link") or "",
+            "url_foto_thumb": d.get("url_foto_thumb"),
+            "url_foto_med": d.get("url_foto_med"),
             "estado": d.get("estado"),
             "id_objetivo": id_obj,
             "es_objetivo": id_obj is not None,
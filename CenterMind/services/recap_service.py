@@ -12,7 +12,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from collections import defaultdict
 
-from db import sb
+from db import fetch_all, sb
 from core.tenant_tables import tenant_table_name
 from core.exhibicion_aggregate import (
     EXHIBICION_ROW_COLS,
@@ -49,17 +49,9 @@ _PADRON_VISIBLE_OR = "motivo_inactivo.is.null,motivo_inactivo.not.in.(padron_abs
 
 # ── Helpers internos ──────────────────────────────────────────────────────────
 
-def _paginate_q(query_fn):
-    """Pagina una query Supabase con rango de 1000 filas."""
-    rows = []
-    offset = 0
-    while True:
-        batch = query_fn(offset).range(offset, offset + PAGE - 1).execute().data or []
-        rows.extend(batch)
-        if len(batch) < PAGE:
-            break
-        offset += PAGE
-    return rows
+def _paginate_q(query_fn, *, key: str | None = None):
+    """Pagina una query Supabase con rango de 1000 filas (db.fetch_all)."""
+    return fetch_all(lambda: query_fn(0), key=key, page_size=PAGE)
 
 
 def _payload_bounds_match(payload: dict, periodo_key: str) -> bool:
@@ -148,7 +140,7 @@ def _fetch_exhibiciones(
                 .lte("timestamp_subida", fecha_hasta + "T23:59:59")
             )
 
-        rows.extend(_paginate_q(q_fn))
+        rows.extend(_paginate_q(q_fn, key="id_exhibicion"))
     return rows
 
 
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Deltas de filas del RPA (ShelfMind-RPA/lib/hash_guard.py) para padrón, ventas enriched y cuentas.
+
+El RPA sube {base, huella, header, agregadas, quitadas} en lugar del archivo entero:
+1. se carga la tabla base guardada para (motor, dist, clave) en Storage;
+2. base guardada ≠ delta.base ⇒ DeltaBaseMismatch (409: el RPA reenvía la tabla completa);
+3. base − quitadas + agregadas, y la huella resultante tiene que coincidir con la del RPA;
+4. la ingesta corre igual que con el archivo completo (XLSX reconstruido / filas JSON);
+5. la nueva base se guarda recién tras ingesta OK (si falla, el próximo delta da 409).
+
+Orden de filas reconstruido: base sin las quitadas + agregadas al final (la huella no
+depende del orden). hash_fila / huella_tabla tienen que ser idénticas a las del RPA.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger("ShelfyAPI")
+
+DELTA_VERSION = 1
+_BUCKET = os.environ.get("RPA_DELTA_BUCKET", "Exhibiciones-PDV")
+_PREFIX = "rpa-delta"
+_FORMATOS = ("xlsx", "json")
+
+_STATS = {"deltas": 0, "completos": 0, "base_mismatch": 0, "filas_recibidas": 0, "filas_reconstruidas": 0}
+_stats_lock = threading.Lock()
+
+
+class DeltaInvalido(ValueError):
+    """Payload de delta mal formado o huella final distinta a la declarada."""
+
+
+class DeltaBaseMismatch(Exception):
+    """La base del delta no es la guardada: el RPA tiene que mandar la tabla completa."""
+
+
+def hash_fila(fila: Any) -> str:
+    raw = json.dumps(fila, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def huella_tabla(header: list[str], hashes: list[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+    for rh in sorted(hashes):
+        h.update(b"\n" + rh.encode("ascii"))
+    return "t:" + h.hexdigest()
+
+
+@dataclass
+class TablaDelta:
+    motor: str
+    dist_id: int
+    clave: str
+    formato: str
+    header: list[str]
+    filas: list[Any]
+    huella: str
+    stats: dict[str, int]
+
+
+def parse_delta(raw: bytes | dict) -> dict[str, Any]:
+    """Body del delta (gzip JSON del multipart, o dict ya parseado en cuentas)."""
+    if isinstance(raw, dict):
+        body = raw
+    else:
+        try:
+            data = gzip.decompress(raw) if raw[:2] == b"\x1f\x8b" else raw
+            body = json.loads(data)
+        except Exception as e:
+            raise DeltaInvalido(f"delta ilegible: {e}") from e
+    if not isinstance(body, dict) or body.get("v") != DELTA_VERSION:
+        raise DeltaInvalido("versión de delta no soportada")
+    if body.get("formato") not in _FORMATOS or not body.get("clave") or not body.get("huella"):
+        raise DeltaInvalido("delta sin formato/clave/huella")
+    if not isinstance(body.get("agregadas"), list) or not isinstance(body.get("quitadas"), list):
+        raise DeltaInvalido("delta sin agregadas/quitadas")
+    return body
+
+
+def apply_delta(base: dict[str, Any] | None, delta: dict[str, Any]) -> tuple[list[Any], dict[str, int]]:
+    """Filas resultantes de aplicar el delta sobre la base (None = delta completo)."""
+    header = list(delta.get("header") or [])
+    if delta.get("base"):
+        if base is None or base.get("huella") != delta["base"]:
+            raise DeltaBaseMismatch(delta["base"])
+        pendientes = Counter(delta["quitadas"])
+        filas: list[Any] = []
+        for fila in base.get("filas") or []:
+            h = hash_fila(fila)
+            if pendientes[h] > 0:
+                pendientes[h] -= 1
+                continue
+            filas.append(fila)
+        if +pendientes:
+            raise DeltaInvalido(f"{sum(pendientes.values())} filas quitadas no están en la base")
+    else:
+        filas = []
+    filas.extend(delta["agregadas"])
+    huella = huella_tabla(header, [hash_fila(f) for f in filas])
+    if huella != delta["huella"]:
+        raise DeltaInvalido("la tabla reconstruida no coincide con la huella del RPA")
+    stats = {
+        "agregadas": len(delta["agregadas"]),
+        "quitadas": len(delta["quitadas"]),
+        "filas": len(filas),
+        "completo": int(not delta.get("base")),
+    }
+    return filas, stats
+
+
+def _base_path(motor: str, dist_id: int, clave: str) -> str:
+    slug = re.sub(r"[^\w\-]+", "_", clave)[:120]
+    return f"{_PREFIX}/{motor}/{int(dist_id)}/{slug}.json.gz"
+
+
+def _storage_get(path: str) -> bytes | None:
+    from db import sb
+
+    try:
+        return sb.storage.from_(_BUCKET).download(path)
+    except Exception:
+        return None
+
+
+def _storage_put(path: str, data: bytes) -> None:
+    from db import sb
+
+    sb.storage.from_(_BUCKET).upload(
+        path,
+        data,
+        file_options={"content-type": "application/gzip", "upsert": "true"},
+    )
+
+
+def load_base(motor: str, dist_id: int, clave: str) -> dict[str, Any] | None:
+    raw = _storage_get(_base_path(motor, dist_id, clave))
+    if not raw:
+        return None
+    try:
+        return json.loads(gzip.decompress(raw))
+    except Exception as e:
+        logger.warning("[rpa_delta] base ilegible %s/%s/%s: %s", motor, dist_id, clave, e)
+        return None
+
+
+def save_base(tabla: TablaDelta) -> bool:
+    """Guarda la tabla como base del próximo delta. False si no se pudo (próximo delta ⇒ 409)."""
+    body = {"huella": tabla.huella, "formato": tabla.formato, "header": tabla.header, "filas": tabla.filas}
+    data = gzip.compress(json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+    try:
+        _storage_put(_base_path(tabla.motor, tabla.dist_id, tabla.clave), data)
+        return True
+    except Exception as e:
+        logger.warning("[rpa_delta] no se guardó base %s/%s/%s: %s", tabla.motor, tabla.dist_id, tabla.clave, e)
+        return False
+
+
+def resolve_delta(motor: str, dist_id: int, raw: bytes | dict) -> TablaDelta:
+    """Parsea + aplica el delta contra la base guardada. Lanza DeltaInvalido / DeltaBaseMismatch."""
+    delta = parse_delta(raw)
+    base = load_base(motor, dist_id, delta["clave"]) if delta.get("base") else None
+    try:
+        filas, stats = apply_delta(base, delta)
+    except DeltaBaseMismatch:
+        with _stats_lock:
+            _STATS["base_mismatch"] += 1
+        logger.info("[rpa_delta] %s dist=%s clave=%s base distinta ⇒ 409", motor, dist_id, delta["clave"])
+        raise
+    with _stats_lock:
+        _STATS["completos" if stats["completo"] else "deltas"] += 1
+        _STATS["filas_recibidas"] += stats["agregadas"]
+        _STATS["filas_reconstruidas"] += stats["filas"]
+    logger.info(
+        "[rpa_delta] %s dist=%s clave=%s +%s -%s ⇒ %s filas",
+        motor, dist_id, delta["clave"], stats["agregadas"], stats["quitadas"], stats["filas"],
+    )
+    return TablaDelta(
+        motor=motor,
+        dist_id=int(dist_id),
+        clave=str(delta["clave"]),
+        formato=delta["formato"],
+        header=list(delta.get("header") or []),
+        filas=filas,
+        huella=delta["huella"],
+        stats=stats,
+    )
+
+
+def tabla_from_rows(motor: str, dist_id: int, clave: str, filas: list[dict[str, Any]]) -> TablaDelta:
+    """Base JSON desde una subida completa (cuentas: detalle_cuentas tal cual llegó)."""
+    huella = huella_tabla([], [hash_fila(f) for f in filas])
+    return TablaDelta(motor, int(dist_id), clave, "json", [], list(filas), huella, {"filas": len(filas)})
+
+
+def tabla_a_xlsx(tabla: TablaDelta) -> bytes:
+    """XLSX texto (como el Excel compacto del RPA) para los parsers existentes."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(tabla.header)
+    for fila in tabla.filas:
+        ws.append(fila)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def rpa_delta_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_STATS)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetría de navegación de los motores RPA → motor_runs (motor = "rpa_<motor>").
+
+registros = {pasos: {nombre: {s, bytes, requests}}, esperas: [{paso, espera, via, s}],
+             perfil, requests, bloqueadas, fallidas, mb, total_s, tenant}
+
+Filas aparte de las de ingesta (padron, cuentas_corrientes, …): el sync-status y el digest
+filtran por motor, así que no se mezclan.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from db import sb
+
+logger = logging.getLogger("RpaTelemetry")
+
+_MOTORES = {"padron", "informe_ventas", "cuentas_corrientes", "sigo", "rendimiento_calle"}
+_MAX_ESPERAS = 200
+_NAV_KEYS = ("perfil", "requests", "bloqueadas", "fallidas", "mb")
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def normalizar_telemetria(telemetria: dict[str, Any] | None) -> dict[str, Any]:
+    """Recorta el payload del RPA a las claves conocidas (nada de HTML ni URLs largas)."""
+    t = telemetria if isinstance(telemetria, dict) else {}
+    pasos: dict[str, dict[str, float]] = {}
+    for nombre, p in (t.get("pasos") or {}).items():
+        if not isinstance(p, dict):
+            continue
+        pasos[str(nombre)[:60]] = {
+            "s": round(_num(p.get("s")), 2),
+            "bytes": int(_num(p.get("bytes"))),
+            "requests": int(_num(p.get("requests"))),
+        }
+    esperas = []
+    for e in (t.get("esperas") or [])[:_MAX_ESPERAS]:
+        if not isinstance(e, dict):
+            continue
+        esperas.append({
+            "paso": str(e["paso"])[:60] if e.get("paso") else None,
+            "espera": str(e.get("espera") or "")[:60],
+            "via": str(e["via"])[:40] if e.get("via") else None,
+            "s": round(_num(e.get("s")), 2),
+        })
+    out: dict[str, Any] = {k: t.get(k) for k in _NAV_KEYS if k in t}
+    out["pasos"] = pasos
+    out["esperas"] = esperas
+    out["total_s"] = round(sum(p["s"] for p in pasos.values()), 2)
+    return out
+
+
+def registrar_telemetria(
+    motor: str,
+    dist_id: int | None,
+    telemetria: dict[str, Any] | None,
+    *,
+    estado: str = "ok",
+    error_msg: str | None = None,
+    tenant: str | None = None,
+) -> int | None:
+    """Inserta la corrida cerrada. iniciado_en = ahora − suma de pasos. Devuelve el id o None."""
+    motor = (motor or "").strip().lower()
+    if motor not in _MOTORES:
+        raise ValueError(f"motor desconocido: {motor!r}")
+    registros = normalizar_telemetria(telemetria)
+    if tenant:
+        registros["tenant"] = str(tenant)[:60]
+    fin = datetime.now(timezone.utc)
+    try:
+        res = sb.table("motor_runs").insert({
+            "motor": f"rpa_{motor}",
+            "dist_id": int(dist_id) if dist_id else None,
+            "estado": "error" if estado == "error" else "ok",
+            "iniciado_en": (fin - timedelta(seconds=registros["total_s"])).isoformat(),
+            "finalizado_en": fin.isoformat(),
+            "registros": registros,
+            "error_msg": (error_msg or "")[:500] or None,
+        }).execute()
+        return res.data[0]["id"] if res.data else None
+    except Exception as e:
+        logger.warning("[RpaTelemetry] insert motor=%s dist=%s: %s", motor, dist_id, e)
+        return None
@@ -225,16 +225,20 @@ def _compute_dashboard(
         aggregate_ranking_by_vendor,
         count_active_vendors,
     )
+    from core.exhibicion_rollup import logical_rows_periodo
     from core.helpers import build_integrante_to_erp_name, is_exhibicion_qa_display_for_dist
 
     start_iso, end_iso = _resolve_period_bounds(periodo)
     suc_pk = _resolve_sucursal_pk(dist_id, sucursal_id)
     allowed_integrantes = _allowed_integrantes_for_sucursal(dist_id, suc_pk)
 
-    # SINGLE fetch — clave del bundle: kpis y ranking usan los mismos datos
+    # SINGLE fetch — clave del bundle: kpis y ranking usan los mismos datos.
+    # Rollup diario (filas lógicas ya deduplicadas); si no aplica, exhibiciones crudas.
     compute_error: str | None = None
     try:
-        ex_rows = _fetch_exhibiciones_periodo(dist_id, start_iso, end_iso)
+        ex_rows = logical_rows_periodo(dist_id, start_iso, end_iso)
+        if ex_rows is None:
+            ex_rows = _fetch_exhibiciones_periodo(dist_id, start_iso, end_iso)
     except Exception as e:
         logger.warning(
             "[snap_dashboard] exhibiciones fetch failed dist=%s periodo=%s: %s",
@@ -77,8 +77,8 @@ def _meses_warm() -> tuple[str, str]:
     return mes_actual, prev_month
 
 
-def _recompute_domain(dist_id: int, domain: str, periodo: str | None = None) -> None:
-    """Recompute directo (sin path SWR) para warm/cron."""
+def _recompute_domain(dist_id: int, domain: str, periodo: str | None = None, *, strict: bool = False) -> None:
+    """Recompute directo (sin path SWR) para warm/cron. strict=True propaga el error (cola de jobs)."""
     try:
         mes_actual, prev_month = _meses_warm()
         if domain == "dashboard":
@@ -103,12 +103,25 @@ def _recompute_domain(dist_id: int, domain: str, periodo: str | None = None) ->
             logger.warning(f"[snap_refresh] recompute dominio desconocido: {domain}")
     except Exception as e:
         logger.warning(f"[snap_refresh] recompute domain={domain} dist={dist_id}: {e}")
+        if strict:
+            raise
 
 
-def _warm_dist_sequential(dist_id: int, domains: list[str], periodo: str | None = None) -> None:
-    """Un solo hilo por dist — evita saturar Railway con 4 computes paralelos."""
+def _warm_dist_sequential(
+    dist_id: int, domains: list[str], periodo: str | None = None, *, strict: bool = False
+) -> None:
+    """
+    Un solo hilo por dist — evita saturar Railway con 4 computes paralelos.
+    strict=True: sigue con los demás dominios y al final levanta si alguno falló.
+    """
+    fallidos: list[str] = []
     for domain in domains:
-        _recompute_domain(dist_id, domain, periodo=periodo)
+        try:
+            _recompute_domain(dist_id, domain, periodo=periodo, strict=strict)
+        except Exception:
+            fallidos.append(domain)
+    if fallidos:
+        raise RuntimeError(f"recompute fallido dist={dist_id}: {', '.join(fallidos)}")
 
 
 def warm_portal_bundles(
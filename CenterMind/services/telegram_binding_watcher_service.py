@@ -3,8 +3,13 @@
 Servicio de vigilancia de bindings Telegram ↔ Vendedor ERP.
 
 scan_distribuidor:
-  1. Grupos linked/review → detect_group_drift → si hay drift: unlink + create_suggestion.
-  2. Grupos unlinked → create_suggestion para matches ≥50% (prefetch ≥75% contabilizado).
+  1. Grupos linked/review → drift → si hay drift: unlink + sugerencia.
+  2. Grupos unlinked → sugerencia para matches ≥50% (prefetch ≥75% contabilizado).
+
+Batch por tenant: grupos, vendedores, historial, integrantes, uploaders y sugerencias
+pending se cargan una vez (core/telegram_binding_batch) y los grupos se puntúan en
+memoria. Las sugerencias nuevas se insertan juntas; las existentes sólo se actualizan
+si cambió el score o las razones.
 
 scan_all_distributors: aplica scan_distribuidor a todos los tenants activos.
 """
@@ -14,13 +19,8 @@ import logging
 from datetime import datetime, timezone
 
 from db import sb
-from core.telegram_group_matcher import (
-    apply_group_binding,
-    create_suggestion,
-    detect_group_drift,
-    score_group_vendor_candidates,
-    unlink_group,
-)
+from core.telegram_binding_batch import cargar_snapshot_tenant
+from core.telegram_group_matcher import apply_group_binding, unlink_group
 
 logger = logging.getLogger("ShelfyAPI")
 
@@ -33,59 +33,103 @@ _AUTO_APPLY_ENABLED = False
 _AUTO_APPLY_THRESHOLD = 0.95
 
 
-def _fetch_all_grupos(dist_id: int) -> list[dict]:
-    """
-    Devuelve todos los grupos del distribuidor con los campos relevantes para el scanner.
-    """
-    rows: list[dict] = []
+def _fetch_pending_suggestions(dist_id: int) -> dict[tuple[int, int], dict]:
+    """Sugerencias pending del tenant por (chat, vendedor)."""
+    out: dict[tuple[int, int], dict] = {}
     offset = 0
     PAGE = 1000
     try:
         while True:
             batch = (
-                sb.table("grupos")
-                .select(
-                    "telegram_chat_id,nombre_grupo,binding_status,"
-                    "id_vendedor_v2,id_distribuidor"
-                )
+                sb.table("telegram_binding_suggestions")
+                .select("id,telegram_chat_id,id_vendedor_v2,score,reasons,source")
                 .eq("id_distribuidor", dist_id)
+                .eq("status", "pending")
+                .order("id")
                 .range(offset, offset + PAGE - 1)
                 .execute()
                 .data or []
             )
-            rows.extend(batch)
+            for r in batch:
+                out.setdefault((int(r["telegram_chat_id"]), int(r["id_vendedor_v2"])), r)
             if len(batch) < PAGE:
                 break
             offset += PAGE
     except Exception as exc:
-        logger.warning("_fetch_all_grupos dist=%s err=%s", dist_id, exc)
-    return rows
+        logger.warning("_fetch_pending_suggestions dist=%s err=%s", dist_id, exc)
+    return out
 
 
 def _record_suggestion(
     stats: dict,
+    pendientes: dict[tuple[int, int], dict],
+    nuevas: list[dict],
     dist_id: int,
     chat_id: int,
     candidate: dict,
     source: str,
 ) -> None:
+    """Misma regla que create_suggestion, contra las pending ya cargadas; las nuevas se acumulan."""
     score = float(candidate.get("score") or 0)
     if score < _SUGGESTION_THRESHOLD:
         return
     if score >= _SCAN_PREFETCH_THRESHOLD:
         stats["prefetch_ready"] += 1
-    outcome = create_suggestion(
-        dist_id,
-        chat_id,
-        candidate["id_vendedor"],
-        score,
-        candidate.get("reasons") or [],
-        source=source,
-    )
-    if outcome == "created":
-        stats["suggestions_created"] += 1
-    elif outcome == "updated":
-        stats["suggestions_updated"] += 1
+    vid = int(candidate["id_vendedor"])
+    reasons = candidate.get("reasons") or []
+    existing = pendientes.get((int(chat_id), vid))
+    if existing is None:
+        fila = {
+            "id_distribuidor": dist_id,
+            "telegram_chat_id": chat_id,
+            "id_vendedor_v2": vid,
+            "score": score,
+            "reasons": reasons,
+            "status": "pending",
+            "source": source,
+        }
+        nuevas.append(fila)
+        pendientes[(int(chat_id), vid)] = fila
+        return
+    cambios = {"score": score, "reasons": reasons, "source": source}
+    if (
+        existing.get("id") is not None
+        and any(existing.get(k) != v for k, v in cambios.items())
+    ):
+        try:
+            sb.table("telegram_binding_suggestions").update(cambios).eq("id", existing["id"]).execute()
+        except Exception as exc:
+            logger.warning(
+                "scan_distribuidor update_suggestion dist=%s chat=%s vendedor=%s err=%s",
+                dist_id, chat_id, vid, exc,
+            )
+            return
+        existing.update(cambios)
+    stats["suggestions_updated"] += 1
+
+
+def _insert_suggestions(stats: dict, dist_id: int, nuevas: list[dict]) -> None:
+    """Insert en bloque; si un bloque falla, de a una (una fila mala no tira el resto)."""
+    for i in range(0, len(nuevas), 500):
+        chunk = nuevas[i:i + 500]
+        try:
+            sb.table("telegram_binding_suggestions").insert(chunk).execute()
+            stats["suggestions_created"] += len(chunk)
+            continue
+        except Exception as exc:
+            logger.warning(
+                "scan_distribuidor insert_suggestions dist=%s n=%s err=%s",
+                dist_id, len(chunk), exc,
+            )
+        for fila in chunk:
+            try:
+                sb.table("telegram_binding_suggestions").insert(fila).execute()
+                stats["suggestions_created"] += 1
+            except Exception as exc:
+                logger.warning(
+                    "create_suggestion dist=%s chat=%s vendedor=%s err=%s",
+                    dist_id, fila["telegram_chat_id"], fila["id_vendedor_v2"], exc,
+                )
 
 
 def scan_distribuidor(dist_id: int) -> dict:
@@ -94,7 +138,10 @@ def scan_distribuidor(dist_id: int) -> dict:
 
     Retorna un resumen con contadores de operaciones realizadas.
     """
-    grupos = _fetch_all_grupos(dist_id)
+    snap = cargar_snapshot_tenant(dist_id)
+    grupos = snap.grupos
+    pendientes = _fetch_pending_suggestions(dist_id)
+    nuevas: list[dict] = []
     stats = {
         "dist_id": dist_id,
         "grupos_scanned": len(grupos),
@@ -114,7 +161,7 @@ def scan_distribuidor(dist_id: int) -> dict:
 
         try:
             if status in ("linked", "review"):
-                drift = detect_group_drift(dist_id, chat_id)
+                drift = snap.drift(grupo)
                 if drift:
                     logger.info(
                         "drift detectado dist=%s chat=%s tipo=%s",
@@ -127,13 +174,18 @@ def scan_distribuidor(dist_id: int) -> dict:
                         performed_by="watcher",
                     )
                     stats["drifts"] += 1
+                    # El snapshot es previo al unlink: puntuar con el grupo ya desvinculado,
+                    # como lo vería score_group_vendor_candidates.
+                    grupo.update(id_vendedor_v2=None, binding_status="unlinked", bound_at=None, bound_by=None)
 
-                    candidates = score_group_vendor_candidates(dist_id, chat_id)
+                    candidates = snap.candidatos(grupo)
                     if candidates:
-                        _record_suggestion(stats, dist_id, chat_id, candidates[0], "drift")
+                        _record_suggestion(
+                            stats, pendientes, nuevas, dist_id, chat_id, candidates[0], "drift"
+                        )
 
             else:
-                candidates = score_group_vendor_candidates(dist_id, chat_id)
+                candidates = snap.candidatos(grupo)
                 if not candidates:
                     continue
 
@@ -170,7 +222,9 @@ def scan_distribuidor(dist_id: int) -> dict:
                     stats["auto_applied"] += 1
                 else:
                     # Solo el mejor candidato por grupo (evita spam en alertas)
-                    _record_suggestion(stats, dist_id, chat_id, top, "manual_scan")
+                    _record_suggestion(
+                        stats, pendientes, nuevas, dist_id, chat_id, top, "manual_scan"
+                    )
 
         except Exception as exc:
             logger.warning(
@@ -178,6 +232,12 @@ def scan_distribuidor(dist_id: int) -> dict:
             )
             continue
 
+    _insert_suggestions(stats, dist_id, nuevas)
+    if snap.uploader_fallbacks:
+        logger.info(
+            "scan_distribuidor dist=%s uploaders consultados de a uno=%s",
+            dist_id, snap.uploader_fallbacks,
+        )
     return stats
 
 
@@ -8,6 +8,7 @@ from supabase import Client
 
 from core.helpers import tenant_table_name
 from core.exhibicion_aggregate import EXHIBICION_ROW_COLS
+from core.foto_renditions import rendition_fields
 
 logger = logging.getLogger("ShelfyAPI")
 AR_TZ = timezone(timedelta(hours=-3))
@@ -79,7 +80,7 @@ def get_offline_bundle(
             exh_table = tenant_table_name("exhibiciones", dist_id)
             rows = (
                 sb.table(exh_table)
-                .select(EXHIBICION_ROW_COLS + ",timestamp_subida")
+                .select(EXHIBICION_ROW_COLS + ",timestamp_subida,foto_renditions")
                 .eq("id_distribuidor", dist_id)
                 .in_("id_integrante", scope_ids)
                 .order("timestamp_subida", desc=True)
@@ -93,6 +94,7 @@ def get_offline_bundle(
                     "estado": r.get("estado"),
                     "timestamp_subida": r.get("timestamp_subida"),
                     "url_foto": r.get("url_foto_drive"),
+                    **rendition_fields(r),
                 }
                 for r in rows
             ]
@@ -14,7 +14,7 @@ logger = logging.getLogger("ShelfyAPI")
 _GALERIA_COLS = (
     "id_exhibicion,id_integrante,estado,timestamp_subida,"
     "id_cliente_pdv,id_cliente,cliente_sombra_codigo,"
-    "url_foto_drive,comentario_evaluacion,supervisor_nombre"
+    "url_foto_drive,foto_renditions,comentario_evaluacion,supervisor_nombre"
 )
 
 
@@ -9,9 +9,9 @@ Maneja:
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-import time
 import uuid
 from datetime import datetime, timezone, timedelta
 
@@ -23,6 +23,8 @@ from core.exhibicion_aggregate import (
     aggregate_exhibicion_counts_vendor_scope,
     EXHIBICION_ROW_COLS,
 )
+from core.foto_renditions import encolar as encolar_renditions
+from core.storage_upload import aupload_many
 from core.vendedor_app_auth import ensure_mobile_integrante, _mobile_telegram_user_id
 from services.vendedor_patron_cartera_service import (
     build_erp_canonical_lookup,
@@ -67,57 +69,61 @@ def _distribuidor_storage_folder(sb: Client, dist_id: int) -> str:
     return "".join(c if c.isalnum() or c in "-_ " else "" for c in str(nombre)).strip().replace(" ", "_") or f"dist_{dist_id}"
 
 
-def upload_mobile_photos_to_storage(
+def _mobile_storage_item(dist_folder: str, date_folder: str, original_name: str, file_bytes: bytes) -> tuple[str, bytes, str]:
+    """(path, bytes, content-type) de una foto de la app en Exhibiciones-PDV."""
+    ext = ".jpg"
+    lower = original_name.lower()
+    if lower.endswith(".png"):
+        ext = ".png"
+    elif lower.endswith(".webp"):
+        ext = ".webp"
+    storage_path = f"{dist_folder}/{date_folder}/mobile_{uuid.uuid4().hex}{ext}"
+    content_type = "image/jpeg" if ext == ".jpg" else f"image/{ext.lstrip('.')}"
+    return storage_path, file_bytes, content_type
+
+
+async def aupload_mobile_photos_to_storage(
     sb: Client,
     dist_id: int,
     files: list[tuple[str, bytes]],
 ) -> list[str]:
     """
-    Sube fotos JPEG/PNG al bucket Exhibiciones-PDV.
+    Sube fotos JPEG/PNG/WebP al bucket Exhibiciones-PDV en paralelo (core/storage_upload).
     files: lista de (filename, bytes).
-    Retorna URLs públicas en el mismo orden.
+    Retorna URLs públicas en el mismo orden; HTTPException 500 si alguna falla tras reintentos.
     """
+    files = [(name, data) for name, data in files if data]
     if not files:
         return []
 
-    dist_folder = _distribuidor_storage_folder(sb, dist_id)
+    dist_folder = await asyncio.to_thread(_distribuidor_storage_folder, sb, dist_id)
     date_folder = datetime.now(AR_TZ).strftime("%Y-%m-%d")
-    urls: list[str] = []
-
-    for original_name, file_bytes in files:
-        if not file_bytes:
-            continue
-        ext = ".jpg"
-        lower = original_name.lower()
-        if lower.endswith(".png"):
-            ext = ".png"
-        elif lower.endswith(".webp"):
-            ext = ".webp"
-        storage_path = f"{dist_folder}/{date_folder}/mobile_{uuid.uuid4().hex}{ext}"
-        content_type = "image/jpeg" if ext == ".jpg" else f"image/{ext.lstrip('.')}"
-
-        uploaded = False
-        for attempt in range(1, 4):
-            try:
-                sb.storage.from_(_STORAGE_BUCKET).upload(
-                    path=storage_path,
-                    file=file_bytes,
-                    file_options={"content-type": content_type, "upsert": "true"},
-                )
-                url = sb.storage.from_(_STORAGE_BUCKET).get_public_url(storage_path)
-                urls.append(url)
-                uploaded = True
-                break
-            except Exception as e:
-                logger.warning(
-                    f"upload_mobile_photos attempt {attempt}/3 dist={dist_id} path={storage_path}: {e}"
-                )
-                time.sleep(attempt * 2)
+    items = [_mobile_storage_item(dist_folder, date_folder, name, data) for name, data in files]
 
-        if not uploaded:
+    resultados = await aupload_many(_STORAGE_BUCKET, items)
+    for (path, _data, _ct), res in zip(items, resultados):
+        if isinstance(res, BaseException):
+            logger.warning(f"upload_mobile_photos dist={dist_id} path={path}: {res}")
             raise HTTPException(status_code=500, detail="Error subiendo foto a storage")
+    return list(resultados)
+
+
+def upload_mobile_photos_to_storage(
+    sb: Client,
+    dist_id: int,
+    files: list[tuple[str, bytes]],
+) -> list[str]:
+    """Versión sync (scripts / hilos sin loop) de aupload_mobile_photos_to_storage."""
+
+    from db import aclose_async_client
 
-    return urls
+    async def _run() -> list[str]:
+        try:
+            return await aupload_mobile_photos_to_storage(sb, dist_id, files)
+        finally:
+            await aclose_async_client()
+
+    return asyncio.run(_run())
 
 
 # ─── Validación de cartera ────────────────────────────────────────────────────
@@ -409,6 +415,7 @@ def process_exhibicion_upload(
 
     # ── 4. Llamar RPC por cada foto ───────────────────────────────────────────
     exhibicion_ids: list[int] = []
+    fotos_registradas: list[tuple[int, str]] = []
     for photo_url in photo_urls:
         if not photo_url:
             continue
@@ -425,6 +432,7 @@ def process_exhibicion_upload(
         ex_id = rpc_result.get("id_exhibicion")
         if ex_id:
             exhibicion_ids.append(int(ex_id))
+            fotos_registradas.append((int(ex_id), photo_url))
         else:
             logger.warning(
                 f"process_exhibicion_upload RPC error for photo={photo_url[:60]}: "
@@ -455,6 +463,12 @@ def process_exhibicion_upload(
         except Exception as e:
             logger.warning(f"process_exhibicion_upload update exhibicion {ex_id}: {e}")
 
+    # Thumb / med WebP fuera del request (core/foto_renditions).
+    try:
+        encolar_renditions(dist_id, fotos_registradas)
+    except Exception as e:
+        logger.warning(f"process_exhibicion_upload encolar renditions: {e}")
+
     # ── 6. Actualizar upload_queue a estado='done' ────────────────────────────
     if queue_row_id is not None:
         try:
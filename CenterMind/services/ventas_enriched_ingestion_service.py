@@ -1,18 +1,38 @@
 # -*- coding: utf-8 -*-
 """
 Ingesta de ventas enriquecidas (Reporteador Genérico: Informe de Ventas).
+
+El RPA re-sube los últimos 7 días 4 veces por día. Cada línea lleva ``line_hash``
+(core/padron_fingerprint.payload_fingerprint del payload); antes del upsert se leen
+los hashes guardados en ventas_enriched_v2_d{N} para el rango de fechas del archivo
+y sólo se escriben líneas nuevas o cambiadas (anulaciones incluidas).
+VENTAS_ENRICHED_INCREMENTAL=0 vuelve a escribir todo.
+
+``raw_json`` usa el formato compacto de core/ventas_raw_json (sólo campos no promovidos
+a columna + archivo/fila de origen). La procedencia se agrega después del diff: no
+entra en ``line_hash`` (el RPA re-sube las mismas líneas en archivos distintos).
+
+Tabla global ``ventas_enriched_v2`` (VENTAS_ENRICHED_GLOBAL):
+  dual    — la app escribe global + tenant (default, comportamiento histórico);
+  trigger — la app escribe sólo el tenant y el trigger de la migración
+            20260616_ventas_enriched_line_hash.sql copia a la global;
+  off     — la global deja de alimentarse.
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
 import threading
 import time
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
 
-from db import sb
+from db import fetch_all, sb
+from core.padron_fingerprint import payload_fingerprint
 from core.tenant_tables import tenant_table_name
+from core.ventas_raw_json import compact_raw_json, stamp_provenance
 from services.ventas_enriched_parser import parse_informe_ventas_enriched
 from services.ventas_ingestion_service import TENANT_DIST_MAP
 
@@ -21,6 +41,79 @@ logger = logging.getLogger("VentasEnrichedIngestion")
 _UPSERT_BATCH = 100
 _UPSERT_MAX_RETRIES = 5
 
+_GLOBAL_MODES = ("dual", "trigger", "off")
+_LINE_KEY = ("fecha_factura", "numero_documento", "id_cliente_erp", "cod_articulo")
+# El hash cubre todo lo que se persiste salvo el propio hash.
+_HASH_EXCLUDE = frozenset({"line_hash"})
+
+
+def _incremental_enabled() -> bool:
+    """Upsert sólo de líneas nuevas/cambiadas; VENTAS_ENRICHED_INCREMENTAL=0 reenvía todo."""
+    raw = (os.getenv("VENTAS_ENRICHED_INCREMENTAL") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def _global_mode() -> str:
+    mode = (os.getenv("VENTAS_ENRICHED_GLOBAL") or "dual").strip().lower()
+    if mode not in _GLOBAL_MODES:
+        logger.warning("[ventas_enriched] VENTAS_ENRICHED_GLOBAL=%s inválido; uso dual", mode)
+        return "dual"
+    return mode
+
+
+def _line_key(rec: dict[str, Any]) -> tuple:
+    return tuple(None if rec.get(c) is None else str(rec.get(c)) for c in _LINE_KEY)
+
+
+def _load_line_hashes(tenant_table: str, dist_id: int, records: list[dict[str, Any]]) -> dict[tuple, str] | None:
+    """
+    {clave de línea: line_hash} guardados para el rango de fechas del archivo.
+    None si no se pueden leer (columna sin migrar, timeout) ⇒ upsert completo.
+    """
+    fechas = [str(r["fecha_factura"]) for r in records if r.get("fecha_factura")]
+    if not fechas:
+        return None
+    try:
+        rows = fetch_all(
+            lambda: sb.table(tenant_table)
+            .select("id,line_hash," + ",".join(_LINE_KEY))
+            .eq("id_distribuidor", dist_id)
+            .gte("fecha_factura", min(fechas))
+            .lte("fecha_factura", max(fechas)),
+            key="id",
+        )
+    except Exception as e:
+        logger.warning("[ventas_enriched] dist=%s hashes no disponibles (%s); upsert completo", dist_id, e)
+        return None
+    return {_line_key(r): r["line_hash"] for r in rows if r.get("line_hash")}
+
+
+def diff_ventas_lines(
+    records: list[dict[str, Any]],
+    stored: dict[tuple, str] | None,
+) -> tuple[list[dict[str, Any]], dict[str, int]]:
+    """
+    Asigna ``line_hash`` a cada registro y separa los que hay que escribir.
+    Retorna (pendientes, {"nuevas", "cambiadas", "anuladas", "sin_cambios"}).
+    ``stored=None`` ⇒ todo pendiente (se cuentan como nuevas).
+    """
+    pending: list[dict[str, Any]] = []
+    stats = {"nuevas": 0, "cambiadas": 0, "anuladas": 0, "sin_cambios": 0}
+    for rec in records:
+        rec["line_hash"] = payload_fingerprint(rec, exclude=_HASH_EXCLUDE)
+        prev = stored.get(_line_key(rec)) if stored is not None else None
+        if prev == rec["line_hash"]:
+            stats["sin_cambios"] += 1
+            continue
+        pending.append(rec)
+        if prev is None:
+            stats["nuevas"] += 1
+        else:
+            stats["cambiadas"] += 1
+            if rec.get("anulado"):
+                stats["anuladas"] += 1
+    return pending, stats
+
 
 def _upsert_ventas_chunk(table: str, chunk: list[dict[str, Any]]) -> None:
     """Upsert con reintentos y subdivisión ante statement timeout (MTD grande)."""
@@ -87,8 +180,13 @@ def _resolve_dist_id(tenant_id: str) -> int:
     return int(dist_id)
 
 
-def ingest_enriched_rpa_background(tenant_id: str, file_bytes: bytes, run_id: int) -> None:
-    """Worker en thread: parseo + upsert pesado fuera del request HTTP."""
+def ingest_enriched_rpa_background(
+    tenant_id: str,
+    file_bytes: bytes,
+    run_id: int,
+    on_ok: Callable[[], None] | None = None,
+) -> None:
+    """Worker en thread: parseo + upsert pesado fuera del request HTTP. ``on_ok`` tras ingesta OK."""
     tid = (tenant_id or "").strip().lower()
     try:
         dist_id = _resolve_dist_id(tid)
@@ -97,6 +195,8 @@ def ingest_enriched_rpa_background(tenant_id: str, file_bytes: bytes, run_id: in
         return
     try:
         ingest_enriched(tid, file_bytes, run_id=run_id)
+        if on_ok is not None:
+            on_ok()
     except Exception as exc:
         logger.exception(
             "[ventas_enriched RPA] ingest falló tras POST async (dist=%s run=%s): %s",
@@ -127,7 +227,12 @@ def record_sin_cambios_run(dist_id: int, source: str = "rpa_hash_guard") -> int:
     return run_id
 
 
-def accept_enriched_upload(tenant_id: str, file_bytes: bytes) -> dict[str, Any]:
+def accept_enriched_upload(
+    tenant_id: str,
+    file_bytes: bytes,
+    *,
+    on_ok: Callable[[], None] | None = None,
+) -> dict[str, Any]:
     """
     Valida tenant + IdEmpresa, crea motor_run en_curso y devuelve payload para 202 Accepted.
     La ingesta corre en thread (ver ingest_enriched_rpa_background).
@@ -157,7 +262,7 @@ def accept_enriched_upload(tenant_id: str, file_bytes: bytes) -> dict[str, Any]:
 
     threading.Thread(
         target=ingest_enriched_rpa_background,
-        args=(tid, file_bytes, run_id),
+        args=(tid, file_bytes, run_id, on_ok),
         daemon=True,
     ).start()
     return {
@@ -198,7 +303,10 @@ def ingest_enriched(
             registros={
                 "rows": result["rows"],
                 "upserted": result["upserted"],
-                "actualizados": result["actualizados"],
+                "sin_cambios": result.get("sin_cambios", 0),
+                "lineas": result.get("lineas"),
+                "global_mode": result.get("global_mode"),
+                "fechas_encoladas": result["fechas_encoladas"],
                 "dropped_id_empresa": result.get("dropped_id_empresa", 0),
             },
         )
@@ -234,7 +342,7 @@ def _ingest_enriched_core(
             "ok": True,
             "rows": 0,
             "upserted": 0,
-            "actualizados": 0,
+            "fechas_encoladas": 0,
             "dist_id": dist_id,
             "dropped_id_empresa": dropped_empresa,
         }
@@ -269,13 +377,14 @@ def _ingest_enriched_core(
                 "importe_final": float(r.get("importe_final") or 0.0),
                 "importe_neto": float(r.get("importe_neto") or 0.0),
                 "importe_bruto": float(r.get("importe_bruto") or 0.0),
-                "raw_json": r,
+                "raw_json": compact_raw_json(r),
             }
         )
 
     # Deduplicación in-memory para evitar conflictos repetidos del mismo archivo.
     merged: dict[tuple, dict[str, Any]] = {}
-    for p in payload:
+    row_num: dict[tuple, int] = {}
+    for n, p in enumerate(payload, start=1):
         key = (
             p.get("id_distribuidor"),
             p.get("fecha_factura"),
@@ -286,6 +395,7 @@ def _ingest_enriched_core(
         prev = merged.get(key)
         if prev is None:
             merged[key] = dict(p)
+            row_num[key] = n
             continue
         prev["bultos_total"] = float(prev.get("bultos_total") or 0.0) + float(p.get("bultos_total") or 0.0)
         prev["unidades_total"] = float(prev.get("unidades_total") or 0.0) + float(p.get("unidades_total") or 0.0)
@@ -327,58 +437,76 @@ def _ingest_enriched_core(
         if not prev or fecha > prev:
             ids_cliente_erp_actualizados[id_cliente_erp_str] = fecha
 
+    stored = _load_line_hashes(tenant_table, dist_id, records) if _incremental_enabled() else None
+    pending, lineas = diff_ventas_lines(records, stored)
+    source_id = hashlib.blake2b(file_bytes, digest_size=8).hexdigest()
+    for rec in pending:
+        key = (dist_id,) + tuple(rec.get(c) for c in _LINE_KEY)
+        stamp_provenance(rec["raw_json"], source_id, row_num[key])
+    global_mode = _global_mode()
+
     upserted = 0
-    for i in range(0, len(records), _UPSERT_BATCH):
-        chunk = records[i : i + _UPSERT_BATCH]
-        _upsert_ventas_chunk("ventas_enriched_v2", chunk)
+    for i in range(0, len(pending), _UPSERT_BATCH):
+        chunk = pending[i : i + _UPSERT_BATCH]
+        if global_mode == "dual":
+            _upsert_ventas_chunk("ventas_enriched_v2", chunk)
         _upsert_ventas_chunk(tenant_table, chunk)
         upserted += len(chunk)
         if i and i % 2000 == 0:
             logger.info(
                 "[ventas_enriched] dist=%s progreso upsert %s/%s",
                 dist_id,
-                min(i + _UPSERT_BATCH, len(records)),
-                len(records),
+                min(i + _UPSERT_BATCH, len(pending)),
+                len(pending),
             )
 
-    logger.info("[ventas_enriched] dist=%s rows=%s upserted=%s", dist_id, len(rows), upserted)
-
-    # Actualizar fecha_ultima_compra + fecha_compra_anterior (días distintos)
-    actualizados = 0
-    try:
-        from core.compras_fechas import batch_update_fechas_compra_desde_ventas
-
-        actualizados = batch_update_fechas_compra_desde_ventas(
-            dist_id,
-            ids_cliente_erp_actualizados.keys(),
-            nuevas_por_erp=ids_cliente_erp_actualizados,
-        )
-    except Exception as e:
-        logger.warning(f"[ventas_enriched] batch fechas compra falló: {e}")
-
     logger.info(
-        "[ventas_enriched] fechas compra (ultima+anterior) actualizadas: %s clientes",
-        actualizados,
+        "[ventas_enriched] dist=%s rows=%s lineas=%s upserted=%s sin_cambios=%s (%s) global=%s",
+        dist_id,
+        len(rows),
+        len(records),
+        upserted,
+        lineas["sin_cambios"],
+        ", ".join(f"{k}={v}" for k, v in lineas.items() if k != "sin_cambios"),
+        global_mode,
     )
 
-    # Actualizar progreso de objetivos activos
+    # Post-ingesta en background_jobs (coalescido por tenant: ráfagas de subidas ⇒ una corrida).
+    # fecha_ultima_compra + fecha_compra_anterior primero; ese job encola el watcher (lee las fechas).
+    # Sin líneas escritas el resultado es el de la corrida anterior: fechas, watcher y snapshots se omiten.
+    # El watcher re-evalúa sólo objetivos de los clientes/fechas de las líneas escritas.
+    from core.job_queue import enqueue_fechas_compra, enqueue_objetivos_watcher, enqueue_snapshots
+    from core.objetivos_deps import FUENTE_VENTAS, Cambio
+
+    fechas_encoladas = len(ids_cliente_erp_actualizados) if upserted else 0
+    cambio = Cambio.de(
+        FUENTE_VENTAS,
+        erps=(r.get("id_cliente_erp") for r in pending),
+        fechas=(r.get("fecha_factura") for r in pending),
+    )
     try:
-        from services.objetivos_watcher_service import objetivos_watcher
-        objetivos_watcher.run_watcher(dist_id)
-    except Exception as e_watch:
-        logger.warning(f"[ventas_enriched] Watcher de objetivos omitido: {e_watch}")
+        if fechas_encoladas:
+            enqueue_fechas_compra(dist_id, ids_cliente_erp_actualizados, cambio=cambio)
+        elif upserted:
+            enqueue_objetivos_watcher(dist_id, cambio=cambio)
+    except Exception as e:
+        logger.warning(f"[ventas_enriched] fechas compra / watcher omitidos: {e}")
+    logger.info("[ventas_enriched] fechas compra (ultima+anterior) encoladas: %s clientes", fechas_encoladas)
 
     try:
-        from services.snapshot_refresh_service import refresh_eager
-        refresh_eager(dist_id, ["estadisticas", "dashboard"])
+        if upserted:
+            enqueue_snapshots(dist_id, warm=["estadisticas", "dashboard"])
     except Exception as e_snap:
-        logger.warning(f"[ventas_enriched] snapshot refresh_eager omitido: {e_snap}")
+        logger.warning(f"[ventas_enriched] snapshot refresh omitido: {e_snap}")
 
     return {
         "ok": True,
         "rows": len(rows),
         "upserted": upserted,
-        "actualizados": actualizados,
+        "sin_cambios": lineas["sin_cambios"],
+        "lineas": lineas,
+        "global_mode": global_mode,
+        "fechas_encoladas": fechas_encoladas,
         "dist_id": dist_id,
         "dropped_id_empresa": dropped_empresa,
     }
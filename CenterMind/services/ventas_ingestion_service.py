@@ -296,10 +296,16 @@ def ingest(tenant_id: str, tipo: str, file_bytes: bytes) -> dict:
 
     logger.info(f"[Ventas] fecha_ultima_compra actualizada: {actualizados} clientes")
 
-    # Actualizar progreso de objetivos activos
+    # Progreso de objetivos activos (background_jobs, coalescido por tenant): sólo los que
+    # dependen de los clientes / fechas de este archivo
     try:
-        from services.objetivos_watcher_service import objetivos_watcher
-        objetivos_watcher.run_watcher(dist_id)
+        from core.job_queue import enqueue_objetivos_watcher
+        from core.objetivos_deps import FUENTE_VENTAS, Cambio
+        enqueue_objetivos_watcher(dist_id, cambio=Cambio.de(
+            FUENTE_VENTAS,
+            clientes=ids_cliente_actualizados.keys(),
+            fechas=ids_cliente_actualizados.values(),
+        ))
     except Exception as e_watch:
         logger.warning(f"[Ventas] Watcher de objetivos omitido: {e_watch}")
 
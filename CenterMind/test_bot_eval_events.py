@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Eventos de evaluación portal → bot: cola en memoria del tenant y fallback durable."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from core import bot_eval_events as ev
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    ev._CONSUMERS.clear()
+    yield
+    ev._CONSUMERS.clear()
+
+
+def _sb_capture():
+    inserts: list = []
+    sb = MagicMock()
+    sb.table.return_value.insert.side_effect = lambda rows: inserts.extend(rows) or MagicMock()
+    return sb, inserts
+
+
+def test_publish_goes_to_running_consumer_from_other_thread():
+    got: list = []
+    ready = threading.Event()
+    done = threading.Event()
+
+    async def _consumer():
+        queue = ev.register_consumer(7)
+        ready.set()
+        for _ in range(2):
+            got.append(await asyncio.wait_for(queue.get(), timeout=2))
+        done.set()
+
+    t = threading.Thread(target=lambda: asyncio.run(_consumer()))
+    t.start()
+    assert ready.wait(2)
+    sb, inserts = _sb_capture()
+    # Endpoint sync (threadpool) → loop del bot; ids repetidos se colapsan.
+    assert ev.publish_evaluaciones(7, ["a", "b", "a", None], sb=sb) == "queue"
+    assert done.wait(2)
+    t.join(2)
+    assert got == [("a", 7), ("b", 7)]
+    assert inserts == []
+
+
+def test_publish_without_consumer_persists_to_table():
+    sb, inserts = _sb_capture()
+    assert ev.publish_evaluaciones(3, ["x", "y"], sb=sb) == "table"
+    sb.table.assert_called_with(ev.TABLE)
+    assert [(r["id_distribuidor"], r["id_exhibicion"]) for r in inserts] == [(3, "x"), (3, "y")]
+
+
+def test_closed_loop_falls_back_to_table_and_unregisters():
+    loop = asyncio.new_event_loop()
+    ev._CONSUMERS[5] = (loop, asyncio.Queue())
+    loop.close()
+    sb, inserts = _sb_capture()
+    assert ev.publish_evaluaciones(5, ["z"], sb=sb) == "table"
+    assert 5 not in ev._CONSUMERS and len(inserts) == 1
+
+
+def test_publish_dropped_when_table_fails():
+    sb = MagicMock()
+    sb.table.return_value.insert.return_value.execute.side_effect = RuntimeError("down")
+    assert ev.publish_evaluaciones(9, ["q"], sb=sb) == "dropped"
+
+
+def test_unregister_keeps_newer_queue():
+    loop = asyncio.new_event_loop()
+    old, new = asyncio.Queue(), asyncio.Queue()
+    ev._CONSUMERS[4] = (loop, new)
+    ev.unregister_consumer(4, old)
+    assert ev._CONSUMERS[4][1] is new
+    ev.unregister_consumer(4, new)
+    assert 4 not in ev._CONSUMERS
+    loop.close()
+
+
+class _TablaFake:
+    def __init__(self, rows):
+        self.rows, self.filtros = rows, []
+
+    def select(self, *_a, **_k):
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filtros.append(lambda r: r.get(col) in vals)
+        return self
+
+    def execute(self):
+        return MagicMock(data=[r for r in self.rows if all(f(r) for f in self.filtros)])
+
+
+def test_enrich_pendientes_sync_completa_vendedor_cliente_y_comentario():
+    from bot_worker import Database
+
+    tablas = {
+        "integrantes_grupo": [{"id_integrante": 11, "id_vendedor_v2": 5}],
+        "vendedores_v2_d3": [{"id_vendedor": 5, "nombre_erp": "MARCELA GOMEZ"}],
+        "clientes_pdv_v2_d3": [
+            {"id_cliente": 900, "id_cliente_erp": "C-1", "nombre_razon_social": "KIOSCO SA", "nombre_fantasia": "EL SOL"},
+            {"id_cliente": 901, "id_cliente_erp": None, "nombre_razon_social": "ALMACEN", "nombre_fantasia": ""},
+        ],
+    }
+    db = Database.__new__(Database)
+    db.sb = MagicMock()
+    db.sb.table.side_effect = lambda name: _TablaFake(tablas.get(name, []))
+    ex_rows = [
+        {"id_exhibicion": "e1", "id_integrante": 11, "cliente_sombra_codigo": "C-1", "comentario_evaluacion": "falta precio"},
+        {"id_exhibicion": "e2", "id_integrante": 99, "id_cliente_pdv": 901},
+    ]
+    data = [{"id": "e1", "vendedor_nombre": "Telegram", "comentarios": None}, {"id": "e2", "comentarios": "ok"}]
+
+    db._enrich_pendientes_sync(3, data, ex_rows)
+
+    assert data[0]["vendedor_nombre"] == "MARCELA GOMEZ"
+    assert data[0]["cliente"] == "C-1 - KIOSCO SA (EL SOL)"
+    assert data[0]["comentarios"] == "falta precio"
+    assert data[1]["cliente"] == "901 - ALMACEN" and data[1]["comentarios"] == "ok"
+
+
+def test_drain_marca_solo_editados_y_hace_backoff(monkeypatch):
+    from types import SimpleNamespace
+
+    import bot_worker as bw
+
+    events = [
+        {"id": 1, "id_exhibicion": "e1", "created_at": "2999-01-01T00:00:00+00:00"},
+        {"id": 2, "id_exhibicion": "e2", "created_at": "2999-01-01T00:00:00+00:00"},
+        {"id": 3, "id_exhibicion": "e3", "created_at": "2000-01-01T00:00:00+00:00"},
+    ]
+    marcados, pendientes = [], [list(events), []]
+
+    async def _fetch(*_a):
+        return pendientes.pop(0)
+
+    async def _mark(_asb, ids):
+        marcados.extend(ids)
+
+    monkeypatch.setattr(ev, "afetch_pending_events", _fetch)
+    monkeypatch.setattr(ev, "amark_events_processed", _mark)
+
+    async def _sync_ids(_bot, ids):
+        return {"e1"}  # e2 y e3 fallan; e3 está vencido
+
+    worker = SimpleNamespace(
+        db=SimpleNamespace(asb=None), distribuidor_id=3, logger=MagicMock(),
+        _eval_drain_wait=bw.BOT_EVAL_EVENTS_DRAIN_SEC, _sync_evaluaciones_ids=_sync_ids,
+    )
+    worker.eval_events_drain_job = lambda ctx: bw.BotWorker.eval_events_drain_job(worker, ctx)
+    ctx = SimpleNamespace(bot=None, job_queue=MagicMock())
+
+    asyncio.run(bw.BotWorker.eval_events_drain_job(worker, ctx))
+    assert marcados == [1, 3]
+    assert ctx.job_queue.run_once.call_args.kwargs["when"] == bw.BOT_EVAL_EVENTS_DRAIN_SEC
+
+    asyncio.run(bw.BotWorker.eval_events_drain_job(worker, ctx))
+    assert ctx.job_queue.run_once.call_args.kwargs["when"] == 2 * bw.BOT_EVAL_EVENTS_DRAIN_SEC
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Difusión CC concurrente: token bucket, 429 retry_after y stream de resultados por vendedor."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+
+import httpx
+import pytest
+
+from services import cc_broadcast as cb
+from services import cc_difusion_service as cc
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_token_bucket_rate_and_block():
+    clock = _Clock()
+    b = cb.TokenBucket(rate=2, capacity=2, clock=clock)
+    assert b.delay() == 0 and b.delay() == 0
+    assert b.delay() == pytest.approx(0.5)
+    clock.t += 0.5
+    assert b.delay() == 0
+    b.block_for(3)
+    assert b.delay() == pytest.approx(3)
+    clock.t += 3
+    # Al reabrir: hay token para el reintento, sin ráfaga acumulada durante el bloqueo.
+    assert b.delay() == 0
+    assert b.delay() == pytest.approx(0.5)
+
+
+def test_limiter_chat_buckets_are_independent():
+    clock = _Clock()
+    lim = cb.TelegramRateLimiter(bot_rps=100, chat_per_min=60, chat_burst=1, clock=clock)
+    assert lim.chat(1).delay() == 0
+    assert lim.chat(1).delay() == pytest.approx(1)
+    assert lim.chat(2).delay() == 0
+
+
+def _telegram(log: list[tuple[str, int]], fail_429: dict[str, int] | None = None):
+    fail_429 = dict(fail_429 or {})
+    msg_ids = iter(range(1000, 2000))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        if method == "sendDocument":
+            chat = int(request.content.split(b'name="chat_id"\r\n\r\n', 1)[1].split(b"\r\n", 1)[0])
+        else:
+            chat = json.loads(request.content)["chat_id"]
+        log.append((method, chat))
+        if fail_429.get(method):
+            fail_429[method] -= 1
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.05}})
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": next(msg_ids)}})
+
+    return handler
+
+
+def test_sender_honors_retry_after():
+    log: list[tuple[str, int]] = []
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_telegram(log, {"sendMessage": 2}))) as client:
+            sender = cb.TelegramSender("T", client, cb.TelegramRateLimiter())
+            t0 = time.perf_counter()
+            ok = await sender.send_text(-5, "hola")
+            return ok, time.perf_counter() - t0
+
+    ok, elapsed = asyncio.run(main())
+    assert ok and 0.1 <= elapsed < 1
+    assert log == [("sendMessage", -5)] * 3
+
+
+def _vend(vid: int, n: int) -> dict:
+    clientes = [
+        {"cliente": f"Cliente {i}", "id_cliente_erp": str(i), "deuda_total": 100.0 * (i + 1), "antiguedad": i * 10}
+        for i in range(n)
+    ]
+    return {"id_vendedor": vid, "vendedor_nombre": f"{vid} - VEND {vid}", "clientes": clientes,
+            "deuda_total": sum(c["deuda_total"] for c in clientes)}
+
+
+def test_broadcast_streams_results(monkeypatch):
+    targets = [(vid, _vend(vid, 0 if vid == 4 else 3)) for vid in range(1, 7)]
+    monkeypatch.setattr(cc, "_plan_difusion_cc", lambda *a: {
+        "token": "T", "dist_nombre": "Dist", "fecha_snapshot": "2026-06-01", "targets": targets,
+    })
+    monkeypatch.setattr(cc, "_get_telegram_chat_id", lambda d, v: None if v == 5 else -100 - v)
+    monkeypatch.setattr(cc, "_fetch_erp_dia_semana_map", lambda d, v: {"1": "Lunes"})
+    cc._pinned_msgs.clear()
+    log: list[tuple[str, int]] = []
+
+    async def main():
+        events = []
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_telegram(log, {"sendDocument": 1}))) as client:
+            with ThreadPoolExecutor(2) as ex:
+                async for ev in cb.iter_difusion_cc(3, "todos", None, None, "Saludos", None, client=client, executor=ex):
+                    events.append(ev)
+        return events
+
+    events = asyncio.run(main())
+    assert events[0] == {"evento": "inicio", "total": 6, "fecha_snapshot": "2026-06-01"}
+    progress = [e for e in events if e["evento"] == "resultado"]
+    assert [e["hechos"] for e in progress] == list(range(1, 7))
+    fin = events[-1]
+    assert fin["evento"] == "fin" and len(fin["enviados"]) == 4
+    assert sorted(e["error"] for e in fin["errores"]) == ["Sin deuda registrada", "Sin grupo Telegram"]
+
+    for vid in (1, 2, 3, 6):
+        chat = -100 - vid
+        calls = [m for m, c in log if c == chat]
+        assert calls[-3:] == ["sendDocument", "pinChatMessage", "sendMessage"]
+        assert (3, chat) in cc._pinned_msgs
+    assert sum(1 for m, _ in log if m == "sendDocument") == 5  # 4 + un reintento por 429
+
+
+def test_plan_errors_come_as_fin(monkeypatch):
+    res = {"enviados": [], "errores": [{"vendedor": "—", "error": "x"}], "fecha_snapshot": None}
+    monkeypatch.setattr(cc, "_plan_difusion_cc", lambda *a: {"resultado": res})
+    assert asyncio.run(cb.difundir_cc_telegram_async(3, "todos", None, None, "", None)) == res
+
+
+def test_pdf_renders_in_process_pool():
+    _, vd = 7, _vend(7, 4)
+    kwargs = dict(vendedor_nombre="VEND 7", dist_nombre="Dist", fecha="01/06/2026",
+                  clientes=vd["clientes"], deuda_total=vd["deuda_total"], erp_to_dia={"1": "Lunes"})
+
+    async def main():
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as ex:
+            return await cb.render_cc_pdf(ex, **kwargs)
+
+    pdf = asyncio.run(main())
+    assert pdf.startswith(b"%PDF")
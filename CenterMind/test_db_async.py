@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Capa async de Supabase (db.asb): paridad con el cliente sync sobre un PostgREST simulado."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+
+import db
+
+
+def _match(value, expr: str) -> bool:
+    if expr == "is.null":
+        return value is None
+    if expr == "not.is.null":
+        return value is not None
+    op, _, arg = expr.partition(".")
+    if op == "eq":
+        return str(value) == arg
+    if op == "in":
+        return str(value) in set(arg.strip("()").split(","))
+    if op == "gt":
+        return value is not None and float(value) > float(arg)
+    raise AssertionError(f"filtro no soportado en el fake: {expr}")
+
+
+def _rest_handler(tables: dict[str, list[dict]], log: list[httpx.Request], rpc: dict | None = None):
+    """PostgREST mínimo: select con filtros eq/in/gt/is, order, offset/limit, count y PATCH."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        log.append(request)
+        path = request.url.path
+        if "/rpc/" in path:
+            return httpx.Response(200, json=(rpc or {})[path.rsplit("/", 1)[-1]])
+        rows = tables.setdefault(path.rsplit("/", 1)[-1], [])
+        params = request.url.params
+        for col, expr in params.multi_items():
+            if col not in ("select", "order", "limit", "offset"):
+                rows = [r for r in rows if _match(r.get(col), expr)]
+        if request.method == "PATCH":
+            for r in rows:
+                r.update(json.loads(request.content))
+            return httpx.Response(200, json=[])
+        if "order" in params:
+            rows = sorted(rows, key=lambda r: r[params["order"].split(".")[0]])
+        total = len(rows)
+        off = int(params.get("offset", 0))
+        lim = params.get("limit")
+        rows = rows[off: off + int(lim)] if lim else rows[off:]
+        return httpx.Response(200, json=rows, headers={"content-range": f"{off}-{off + len(rows) - 1}/{total}"})
+
+    return handler
+
+
+def _sync_client(handler) -> SyncPostgrestClient:
+    rest = db.sb.postgrest
+    return SyncPostgrestClient(
+        str(rest.base_url),
+        headers=dict(rest.headers),
+        http_client=httpx.Client(base_url=rest.session.base_url, transport=httpx.MockTransport(handler)),
+    )
+
+
+def _install_async(handler) -> None:
+    """Cliente async del loop actual contra el handler (mismo armado que async_postgrest)."""
+    db._ASYNC_CLIENTS[asyncio.get_running_loop()] = db._new_async_client(transport=httpx.MockTransport(handler))
+
+
+def test_async_builder_sends_same_request_as_sync():
+    log: list[httpx.Request] = []
+    handler = _rest_handler({"exhibiciones": [{"id_exhibicion": 1, "estado": "Aprobado"}]}, log)
+
+    def _chain(client):
+        return client.table("exhibiciones").select("id_exhibicion").eq("estado", "Aprobado").in_("id_exhibicion", [1, 2])
+
+    sync_rows = _chain(_sync_client(handler)).execute().data
+
+    async def main():
+        _install_async(handler)
+        res = await db.aexecute(_chain(db.asb))
+        await db.aclose_async_client()
+        return res.data
+
+    assert asyncio.run(main()) == sync_rows == [{"id_exhibicion": 1, "estado": "Aprobado"}]
+    sync_req, async_req = log
+    assert async_req.url == sync_req.url
+    assert async_req.headers["apikey"] == sync_req.headers["apikey"]
+    assert len(async_req.headers.get_list("x-client-info")) == 1
+
+
+def test_one_client_per_loop():
+    async def get():
+        client = db.async_postgrest()
+        assert db.async_postgrest() is client
+        await db.aclose_async_client()
+        return client
+
+    assert asyncio.run(get()) is not asyncio.run(get())
+
+
+def test_aexecute_timeout_is_per_call():
+    async def slow(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json=[])
+
+    async def main():
+        _install_async(slow)
+        before = db._ASYNC_STATS["timeouts"]
+        with pytest.raises(asyncio.TimeoutError):
+            await db.aexecute(db.asb.table("t").select("*"), timeout=0.05)
+        await db.aclose_async_client()
+        return db._ASYNC_STATS["timeouts"] - before
+
+    assert asyncio.run(main()) == 1
+
+
+@pytest.mark.parametrize("workers,key", [(1, None), (3, None), (1, "id")])
+def test_afetch_all_matches_sync_pagination(workers, key):
+    tables = {"t": [{"id": i, "v": i % 7} for i in range(2500, 0, -1)]}
+    handler = _rest_handler(tables, [])
+    client = _sync_client(handler)
+    expected = db.fetch_all(lambda: client.table("t").select("*").order("id"), page_size=1000, key=key)
+
+    async def main():
+        _install_async(handler)
+        rows = await db.afetch_all(
+            lambda: db.asb.table("t").select("*").order("id"), page_size=1000, workers=workers, key=key
+        )
+        await db.aclose_async_client()
+        return rows
+
+    got = asyncio.run(main())
+    assert got == expected
+    assert [r["id"] for r in got] == list(range(1, 2501))
+
+
+def test_aresolve_sucursal_pk_matches_sync(monkeypatch):
+    from routers import reportes
+
+    tables = {
+        "sucursales_v2_d3": [{"id_distribuidor": 3, "id_sucursal": 11, "id_sucursal_erp": "7", "nombre_erp": "NORTE"}],
+        "sucursales": [{"id_distribuidor": 3, "id_sucursal": 99, "id_sucursal_erp": "X1"}],
+    }
+    handler = _rest_handler(tables, [])
+    monkeypatch.setattr(reportes, "sb", _sync_client(handler))
+    params = ["11", "007", "7", "X1", "nada", None, " "]
+    expected = [reportes._resolve_sucursal_pk(3, p) for p in params]
+    assert expected == [11, 11, 11, 99, None, None, None]
+
+    async def main():
+        _install_async(handler)
+        got = [await reportes._aresolve_sucursal_pk(3, p) for p in params]
+        enriched = await reportes._aenrich_por_sucursal_rows([{"location_id": "007"}, {"sucursal": "norte"}], 3)
+        await db.aclose_async_client()
+        return got, enriched
+
+    got, enriched = asyncio.run(main())
+    assert got == expected
+    assert enriched == reportes._enrich_por_sucursal_rows([{"location_id": "007"}, {"sucursal": "norte"}], 3)
+    assert [r["id_sucursal"] for r in enriched] == [11, 11]
+
+
+def test_aresolve_patron_scope_matches_sync():
+    from core.vendedor_app_patron_scope import aresolve_patron_scope, resolve_patron_scope
+
+    tables = {"integrantes_grupo": [
+        {"id_integrante": 300, "nombre_integrante": "Monchi", "telegram_user_id": 5466310928,
+         "id_vendedor_v2": 30, "id_distribuidor": 3},
+        {"id_integrante": 301, "nombre_integrante": "Jorge Coronel", "telegram_user_id": 1,
+         "id_vendedor_v2": 30, "id_distribuidor": 3},
+    ]}
+    handler = _rest_handler(tables, [])
+    expected = [resolve_patron_scope(_sync_client(handler), 3, v, c) for v, c in ((30, None), (30, "equipo"), (31, None))]
+
+    async def main():
+        _install_async(handler)
+        got = [await aresolve_patron_scope(db.asb, 3, v, c) for v, c in ((30, None), (30, "equipo"), (31, None))]
+        await db.aclose_async_client()
+        return got
+
+    assert asyncio.run(main()) == expected
+    assert expected[0]["cuenta_id"] == "monchi" and expected[2]["patron_mode"] is False
+
+
+def test_bot_pendientes_sync_async_matches_sync():
+    from bot_worker import Database
+
+    tables = {
+        "exhibiciones": [
+            {"id_exhibicion": "e1", "id_distribuidor": 3, "estado": "Aprobado", "synced_telegram": 0,
+             "telegram_chat_id": -5, "telegram_msg_id": 10, "id_integrante": 1, "id_cliente_pdv": 40,
+             "comentario_evaluacion": "ok"},
+            {"id_exhibicion": "e2", "id_distribuidor": 3, "estado": "Rechazado", "synced_telegram": 0,
+             "telegram_chat_id": -5, "telegram_msg_id": 11, "id_integrante": 2, "cliente_sombra_codigo": "0012"},
+            {"id_exhibicion": "e3", "id_distribuidor": 3, "estado": "Pendiente", "synced_telegram": 0,
+             "telegram_chat_id": -5, "telegram_msg_id": 12, "id_integrante": 1},
+        ],
+        "integrantes_grupo": [{"id_integrante": 1, "id_vendedor_v2": 7}, {"id_integrante": 2, "id_vendedor_v2": None}],
+        "vendedores_v2_d3": [{"id_vendedor": 7, "nombre_erp": "VEND A"}],
+        "clientes_pdv_v2_d3": [
+            {"id_cliente": 40, "id_cliente_erp": "55", "nombre_razon_social": "KIOSCO", "nombre_fantasia": "K1"},
+            {"id_cliente": 41, "id_cliente_erp": "0012", "nombre_razon_social": "ALMACEN", "nombre_fantasia": ""},
+        ],
+    }
+    handler = _rest_handler(tables, [])
+    dbi = Database()
+    dbi.sb = _sync_client(handler)
+    expected = dbi.get_pendientes_sync_ids(3, ["e1", "e2", "e3"])
+    assert [d["cliente"] for d in expected] == ["55 - KIOSCO (K1)", "0012 - ALMACEN"]
+    assert expected[0]["vendedor_nombre"] == "VEND A"
+
+    async def main():
+        _install_async(handler)
+        got = await dbi.aget_pendientes_sync_ids(3, ["e1", "e2", "e3"])
+        await dbi.amarcar_synced_many([d["id"] for d in got])
+        await db.aclose_async_client()
+        return got
+
+    assert asyncio.run(main()) == expected
+    assert [r["synced_telegram"] for r in tables["exhibiciones"]] == [1, 1, 0]
@@ -0,0 +1,79 @@
+"""Tests paginador PostgREST central (db.iter_pages / paginate / fetch_all)."""
+from __future__ import annotations
+
+import pytest
+
+import db
+
+
+def _tabla(fake_supabase, n):
+    """FakeSupabase con `n` filas en "t" (ver conftest)."""
+    return fake_supabase({"t": [{"id": i, "v": f"r{i}"} for i in range(1, n + 1)]})
+
+
+def _pages(sb):
+    """(offset, cursor gt, hilo) de cada página pedida."""
+    return [(q.offset, q.gts[0] if q.gts else None, q.thread) for q in sb.queries]
+
+
+def test_fetch_all_offset_serial_collects_every_page(fake_supabase):
+    sb = _tabla(fake_supabase, 25)
+    out = db.fetch_all(lambda: sb.table("t"), page_size=10)
+    assert [r["id"] for r in out] == list(range(1, 26))
+    assert [c[0] for c in _pages(sb)] == [0, 10, 20]
+
+
+def test_fetch_all_exact_multiple_needs_empty_tail_page(fake_supabase):
+    sb = _tabla(fake_supabase, 20)
+    out = db.fetch_all(lambda: sb.table("t"), page_size=10)
+    assert len(out) == 20
+    assert len(sb.queries) == 3
+
+
+def test_keyset_pagination_uses_cursor_not_offset(fake_supabase):
+    sb = _tabla(fake_supabase, 23)
+    out = db.fetch_all(lambda: sb.table("t"), key="id", page_size=10)
+    assert [r["id"] for r in out] == list(range(1, 24))
+    assert [c[1] for c in _pages(sb)] == [None, ("id", 10), ("id", 20)]
+    assert all(c[0] == 0 for c in _pages(sb))
+
+
+def test_keyset_requires_key_in_select(fake_supabase):
+    sb = fake_supabase({"t": [{"v": i} for i in range(10)]})
+    with pytest.raises(ValueError):
+        db.fetch_all(lambda: sb.table("t"), key="id", page_size=5)
+
+
+def test_parallel_pages_preserve_order_and_use_count_preflight(fake_supabase):
+    sb = _tabla(fake_supabase, 95)
+    out = db.fetch_all(lambda: sb.table("t"), page_size=10, workers=4)
+    assert [r["id"] for r in out] == list(range(1, 96))
+    assert sorted(c[0] for c in _pages(sb)) == list(range(0, 100, 10))
+    assert any(c[2].startswith("sb-page") for c in _pages(sb))
+
+
+def test_parallel_without_count_falls_back_to_serial(fake_supabase):
+    sb = _tabla(fake_supabase, 25)
+
+    def _sin_count():
+        q = sb.table("t")
+        execute = q.execute
+
+        def _exec():
+            res = execute()
+            res.count = None
+            return res
+
+        q.execute = _exec
+        return q
+
+    out = db.fetch_all(_sin_count, page_size=10, workers=4)
+    assert [r["id"] for r in out] == list(range(1, 26))
+
+
+def test_paginate_is_lazy_generator(fake_supabase):
+    sb = _tabla(fake_supabase, 30)
+    gen = db.paginate(lambda: sb.table("t"), page_size=10)
+    first = next(gen)
+    assert first["id"] == 1
+    assert len(sb.queries) == 1
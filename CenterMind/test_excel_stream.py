@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Lectura XLSX/CSV por chunks (core.excel_stream): paridad con pd.read_excel y fallbacks."""
+from __future__ import annotations
+
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from core import excel_stream as xs
+
+
+def _xlsx(rows: list[list]) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+_ROWS = [
+    ["idcliente", "nomcli", None, "ruta", "ruta"],
+    [1010.0, "Kiosco", None, "R1", "x"],
+    [],
+    [20.5, "NA", "z", None, None],
+    ["0012", "#N/A", None, 7, None, "extra"],
+    [datetime(2026, 5, 1), "", None, None, None],
+] + [[i, f"Cliente {i}", None, "R2", None] for i in range(40)]
+
+
+def _padron_legacy(data: bytes) -> pd.DataFrame:
+    """_parse_excel previo: read_excel + replace/dropna/fillna."""
+    df = pd.read_excel(io.BytesIO(data), dtype=str, engine="openpyxl", keep_default_na=False)
+    return df.replace("", float("nan")).dropna(how="all").fillna("").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 5000])
+def test_stream_matches_read_excel(chunk_rows):
+    data = _xlsx(_ROWS)
+    got = xs.read_str_frame(data, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(got, _padron_legacy(data), check_dtype=False)
+    assert got.loc[0, "idcliente"] == "1010" and got.loc[2, "idcliente"] == "0012"
+    assert list(got.columns[:5]) == ["idcliente", "nomcli", "Unnamed: 2", "ruta", "ruta.1"]
+
+
+def test_na_empty_matches_default_na():
+    data = _xlsx(_ROWS)
+    ref = pd.read_excel(io.BytesIO(data), dtype=str).dropna(how="all").reset_index(drop=True)
+    got = xs.read_str_frame(data, chunk_rows=3, na_empty=True)
+    pd.testing.assert_frame_equal(got, ref, check_dtype=False)
+    assert pd.isna(got.loc[1, "nomcli"])
+
+
+def test_chunks_are_bounded_and_keep_header():
+    data = _xlsx([["a", "b"]] + [[i, i] for i in range(10)])
+    assert [len(c) for c in xs.iter_table_chunks(data, chunk_rows=4)] == [4, 4, 2]
+    data = _xlsx([["a", "b"]] + [[i, i] for i in range(8)])
+    assert [len(c) for c in xs.iter_table_chunks(data, chunk_rows=4)] == [4, 4, 0]
+    only_header = list(xs.iter_table_chunks(_xlsx([["a", "b"]])))
+    assert len(only_header) == 1 and list(only_header[0].columns) == ["a", "b"]
+
+
+def test_csv_fallback_in_chunks():
+    data = "idcliente;nomcli\n1;Á\n\n2;B\n3;\n".encode("latin1")
+    chunks = list(xs.iter_table_chunks(io.BytesIO(data), chunk_rows=2))
+    df = pd.concat(chunks, ignore_index=True)
+    assert df.to_dict("records") == [
+        {"idcliente": "1", "nomcli": "Á"},
+        {"idcliente": "2", "nomcli": "B"},
+        {"idcliente": "3", "nomcli": ""},
+    ]
+
+
+def test_padron_parse_excel_filters_chunks():
+    from services.padron_ingestion_service import PadronIngestionService
+
+    data = _xlsx([["idempresa", "idcliente"]] + [[e, i] for i, e in enumerate([1, 2, 1, 9, 1])])
+    svc = PadronIngestionService.__new__(PadronIngestionService)
+    df = svc._parse_excel(data, chunk_filter=lambda c: c[c["idempresa"] != "9"])
+    assert df["idcliente"].tolist() == ["0", "1", "2", "4"]
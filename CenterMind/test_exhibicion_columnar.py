@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Paridad motor columnar vs motor Python de exhibiciones lógicas.
+
+1) Re-corre los tests existentes de agregación forzando EXHIBICION_AGG_ENGINE=columnar.
+2) Compara ambos motores sobre lotes sintéticos con casos borde (fallbacks, empates,
+   iid inválidos, vendedor sin mapa) incluyendo el orden de inserción de los dicts.
+"""
+from __future__ import annotations
+
+import inspect
+import random
+
+import pytest
+
+import test_estadisticas_exhibicion as t_stats
+import test_exhibicion_aggregate_compania_overlay as t_overlay
+import test_exhibicion_aggregate_vendor_scope as t_vendor
+from core import exhibicion_aggregate as agg
+from core import exhibicion_columnar as col
+
+
+def _existing_tests():
+    out = []
+    for mod in (t_vendor, t_overlay, t_stats):
+        for name, fn in inspect.getmembers(mod, inspect.isfunction):
+            if name.startswith("test_") and fn.__module__ == mod.__name__ and not inspect.signature(fn).parameters:
+                out.append(pytest.param(fn, id=f"{mod.__name__}.{name}"))
+    return out
+
+
+@pytest.mark.parametrize("test_fn", _existing_tests())
+def test_existing_suite_passes_with_columnar_engine(monkeypatch, test_fn):
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "columnar")
+    test_fn()
+
+
+_ESTADOS = ["Aprobado", "Destacado", "Rechazado", "Pendiente", "VALIDACION", "", None, "aprobada"]
+_TS = [
+    "2026-05-10T10:00:00-03:00", "2026-05-10T18:30:00-03:00", "2026-05-11T09:00:00",
+    "2026-05-12", "", None, "2026-05", "  2026-05-13T08:00:00  ",
+]
+
+
+def _rows(n: int, seed: int) -> list[dict]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        r = {
+            "id_exhibicion": i + 1,
+            "id_integrante": rnd.choice([1, 2, 3, 4, 5, "6", None, 7, 8]),
+            "estado": rnd.choice(_ESTADOS),
+            "timestamp_subida": rnd.choice(_TS),
+        }
+        pick = rnd.random()
+        if pick < 0.6:
+            r["id_cliente_pdv"] = rnd.randint(1, 40)
+        elif pick < 0.75:
+            r["id_cliente"] = rnd.choice([rnd.randint(1, 40), 0])
+        elif pick < 0.85:
+            r["cliente_sombra_codigo"] = rnd.choice(["0012", " 12 ", "", 0])
+        if rnd.random() < 0.3:
+            r["url_foto_drive"] = rnd.choice(["u1", "u2", " ", f"u{i}"])
+        if rnd.random() < 0.3:
+            r["telegram_msg_id"], r["telegram_chat_id"] = rnd.choice([(1, -5), (2, -5), (i, -9)])
+        rows.append(r)
+    return rows
+
+
+_IID_TO_ERP = {1: "VEND A", 2: "VEND A", 3: "VEND B", 4: "VEND C", 6: "VEND B", 7: None}
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_ranking_and_vendor_scope_parity(monkeypatch, seed):
+    rows = _rows(400, seed)
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "python")
+    ref_rank = agg.aggregate_ranking_by_vendor(rows, _IID_TO_ERP)
+    ref_vendor = agg.aggregate_exhibicion_counts_vendor_scope(rows)
+    ref_active = agg.count_active_vendors(rows, _IID_TO_ERP)
+
+    got_rank = col.aggregate_ranking_by_vendor(rows, _IID_TO_ERP)
+    assert list(got_rank.items()) == list(ref_rank.items())
+    assert col.aggregate_exhibicion_counts_vendor_scope(rows) == ref_vendor
+    assert col.count_active_vendors(rows, _IID_TO_ERP) == ref_active
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_integrante_scope_and_per_client_parity(monkeypatch, seed):
+    rows = [r for r in _rows(400, seed) if r["id_integrante"] != "x"]
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "python")
+    assert col.aggregate_exhibicion_counts(rows) == agg.aggregate_exhibicion_counts(rows)
+
+    # `seen` compartido entre dos lotes (uso en loops por distribuidor)
+    half = len(rows) // 2
+    seen_ref: set[str] = set()
+    ref = [agg.count_logical_per_client(rows[:half], seen=seen_ref),
+           agg.count_logical_per_client(rows[half:], seen=seen_ref)]
+    seen_got: set[str] = set()
+    got = [col.count_logical_per_client(rows[:half], seen=seen_got),
+           col.count_logical_per_client(rows[half:], seen=seen_got)]
+    assert [list(d.items()) for d in got] == [list(d.items()) for d in ref]
+    assert seen_got == seen_ref
+
+
+def test_invalid_iid_raises_like_python_engine():
+    rows = [{"id_integrante": "abc", "estado": "Aprobado", "id_cliente_pdv": 1,
+             "timestamp_subida": "2026-05-10T10:00:00"}]
+    with pytest.raises(ValueError):
+        agg.aggregate_exhibicion_counts(rows)
+    with pytest.raises(ValueError):
+        col.aggregate_exhibicion_counts(rows)
+    # En ranking las filas con iid inválido se ignoran en ambos motores.
+    assert col.aggregate_ranking_by_vendor(rows, {}) == agg.aggregate_ranking_by_vendor(rows, {}) == {}
+
+
+def test_auto_engine_switches_by_size(monkeypatch):
+    monkeypatch.delenv("EXHIBICION_AGG_ENGINE", raising=False)
+    monkeypatch.setattr(agg, "_COLUMNAR_MIN_ROWS", 10)
+    assert not agg._use_columnar([{}] * 9)
+    assert agg._use_columnar([{}] * 10)
+    assert not agg._use_columnar(iter([{}] * 10))
+
+
+def test_per_client_without_seen_parity_and_auto_stays_python(monkeypatch):
+    rows = _rows(400, 99)
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "python")
+    ref = agg.count_logical_per_client(rows)
+    assert list(col.count_logical_per_client(rows).items()) == list(ref.items())
+    monkeypatch.delenv("EXHIBICION_AGG_ENGINE")
+    monkeypatch.setattr(agg, "_COLUMNAR_MIN_ROWS", 10)
+    assert agg._use_columnar(rows, auto=True)
+    assert not agg._use_columnar(rows, auto=False)
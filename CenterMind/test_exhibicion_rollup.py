@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Rollup diario de exhibiciones lógicas: paridad con filas crudas, días sucios y meses cerrados."""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from core import exhibicion_aggregate as agg
+from core import exhibicion_rollup as ro
+
+_ESTADOS = ["Aprobado", "Destacado", "Rechazado", "Pendiente", None]
+_IID_TO_ERP = {1: "VEND A", 2: "VEND A", 3: "VEND B", 4: "VEND C", 6: "VEND B", 7: None}
+
+
+def _raw(n: int, seed: int, month: int = 5) -> list[dict]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        ts = datetime(2026, month, rnd.randint(1, 4), rnd.randint(0, 23), rnd.choice([0, 30]))
+        r = {
+            "id_exhibicion": i + 1,
+            "id_integrante": rnd.choice([1, 2, 3, 4, 6, 7, "x", None]),
+            "estado": rnd.choice(_ESTADOS),
+            "timestamp_subida": ts.isoformat() + "-03:00",
+        }
+        pick = rnd.random()
+        if pick < 0.7:
+            r["id_cliente_pdv"] = rnd.randint(1, 12)
+        elif pick < 0.8:
+            r["cliente_sombra_codigo"] = rnd.choice(["0012", "77"])
+        if rnd.random() < 0.3:
+            r["url_foto_drive"] = rnd.choice(["u1", "u2", f"u{i}"])
+        rows.append(r)
+    rows.sort(key=ro._order_key)
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_expanded_rollup_matches_raw_aggregations(monkeypatch, seed):
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "python")
+    raw = _raw(300, seed)
+    rollup = ro.build_day_rollup(3, raw)
+    assert any(r["first_id_exhibicion"] is not None for r in rollup)
+    logical = ro.expand_rollup_rows(rollup)
+    valid = [r for r in raw if isinstance(r["id_integrante"], int)]
+    assert len(logical) < len(valid)
+
+    assert list(agg.aggregate_ranking_by_vendor(logical, _IID_TO_ERP).items()) == list(
+        agg.aggregate_ranking_by_vendor(valid, _IID_TO_ERP).items()
+    )
+    assert agg.aggregate_exhibicion_counts_vendor_scope(logical) == agg.aggregate_exhibicion_counts_vendor_scope(valid)
+    assert agg.aggregate_exhibicion_counts(logical) == agg.aggregate_exhibicion_counts(valid)
+    assert agg.count_active_vendors(logical, _IID_TO_ERP) == agg.count_active_vendors(valid, _IID_TO_ERP)
+
+    # Filtro por integrante (QA / sucursal / vendedor) antes de agregar: mismo resultado.
+    keep = {1, 3, 6}
+    assert agg.aggregate_exhibicion_counts_vendor_scope(
+        [r for r in logical if r["id_integrante"] in keep]
+    ) == agg.aggregate_exhibicion_counts_vendor_scope([r for r in valid if r["id_integrante"] in keep])
+
+
+def test_day_bucket_is_ar_calendar_day():
+    assert ro.ar_day("2026-06-01T02:30:00+00:00") == date(2026, 5, 31)
+    assert ro.ar_day("2026-05-31T10:00:00") == date(2026, 5, 31)
+    assert ro._aligned_day("2026-05-01T00:00:00-03:00") == date(2026, 5, 1)
+    assert ro._aligned_day("2026-05-01T03:00:00+00:00") == date(2026, 5, 1)
+    assert ro._aligned_day("2026-05-31T23:59:59-03:00") is None
+
+
+def test_closed_month_rule():
+    assert not ro.is_closed_day(date(2026, 5, 10), today=date(2026, 6, 2))
+    assert ro.is_closed_day(date(2026, 5, 10), today=date(2026, 6, 10))
+
+
+# ── Fake Supabase (conftest): timestamps con distinto offset se comparan como instantes ──
+
+def _cmp_val(col, v):
+    if col in ("timestamp_subida", "marked_at"):
+        return ro._parse_ts(v)
+    return v
+
+
+@pytest.fixture
+def fake_sb(monkeypatch, fake_supabase):
+    ro._CLOSED_READY.clear()
+    monkeypatch.setattr(ro, "_today_ar", lambda: date(2026, 6, 20))
+    monkeypatch.setenv("EXHIBICION_AGG_ENGINE", "python")
+    sb = fake_supabase(coerce=_cmp_val)
+    sb.tables["exhibiciones"] = [{**r, "id_distribuidor": 3} for r in _raw(200, 1)]
+    return sb
+
+
+def test_closed_month_builds_once_then_single_query(fake_sb):
+    raw = [r for r in fake_sb.tables["exhibiciones"]]
+    start, end = "2026-05-01T00:00:00-03:00", "2026-06-01T00:00:00-03:00"
+    rows = ro.logical_rows_periodo(3, start, end, sb=fake_sb)
+    assert agg.aggregate_ranking_by_vendor(rows, _IID_TO_ERP) == agg.aggregate_ranking_by_vendor(raw, _IID_TO_ERP)
+    assert len(fake_sb.tables[ro.DIAS_TABLE]) == 31
+
+    fake_sb.calls.clear()
+    again = ro.logical_rows_periodo(3, start, end, sb=fake_sb)
+    assert again == rows
+    assert fake_sb.calls == [(ro.ROLLUP_TABLE, "select")]
+
+
+def test_dirty_day_is_the_only_one_recomputed(fake_sb, monkeypatch):
+    start = "2026-06-01T00:00:00-03:00"
+    fake_sb.tables["exhibiciones"] += [
+        {"id_exhibicion": 900, "id_distribuidor": 3, "id_integrante": 1, "estado": "Pendiente",
+         "id_cliente_pdv": 5, "timestamp_subida": "2026-06-02T10:00:00-03:00"},
+    ]
+    first = ro.logical_rows_periodo(3, start, sb=fake_sb)
+    assert agg.aggregate_exhibicion_counts_vendor_scope(first)["pendientes"] == 1
+
+    # Evaluación en el portal: el trigger marca el día AR como sucio.
+    fake_sb.tables["exhibiciones"][-1]["estado"] = "Destacado"
+    marked = (datetime.now(ro.AR_TZ) - timedelta(seconds=30)).isoformat()
+    fake_sb.tables[ro.DIRTY_TABLE] = [{"id_distribuidor": 3, "dia": "2026-06-02", "marked_at": marked}]
+    before = ro._STATS["days_rebuilt"]
+    rows = ro.logical_rows_periodo(3, start, sb=fake_sb)
+    assert ro._STATS["days_rebuilt"] - before == 1
+    assert agg.aggregate_exhibicion_counts_vendor_scope(rows)["destacadas"] == 1
+    assert fake_sb.tables[ro.DIRTY_TABLE] == []
+
+
+def test_integrante_filter_and_fallbacks(fake_sb, monkeypatch):
+    start, end = "2026-05-01T00:00:00-03:00", "2026-06-01T00:00:00-03:00"
+    rows = ro.logical_rows_periodo(3, start, end, integrante_ids=[3, 6], sb=fake_sb)
+    assert rows and {r["id_integrante"] for r in rows} <= {3, 6}
+    # Bounds que cortan un día o rollup apagado → el caller usa el fetch crudo.
+    assert ro.logical_rows_periodo(3, "2026-05-01T10:00:00-03:00", end, sb=fake_sb) is None
+    monkeypatch.setenv("EXHIBICION_ROLLUP", "0")
+    assert ro.logical_rows_periodo(3, start, end, sb=fake_sb) is None
+
+
+def test_rpc_replaces_days_in_one_call(fake_sb):
+    llamadas = []
+
+    class _Rpc:
+        def __init__(self, params):
+            self.params = params
+
+        def execute(self):
+            llamadas.append(self.params)
+            return type("R", (), {"data": len(self.params["p_dias"])})()
+
+    fake_sb.rpc = lambda fn, params: _Rpc({"fn": fn, **params})
+    assert ro.refresh_days(3, [date(2026, 5, 2), date(2026, 5, 1)], sb=fake_sb) == 2
+    (p,) = llamadas
+    assert p["fn"] == "exhibicion_rollup_replace" and p["p_dias"] == ["2026-05-01", "2026-05-02"]
+    assert p["p_rows"] and {r["dia"] for r in p["p_rows"]} <= {"2026-05-01", "2026-05-02"}
+    assert {r["build_id"] for r in p["p_rows"]} == {p["p_build_id"]}
+    assert {op for _t, op in fake_sb.calls} == {"select"}  # sin upsert/delete sueltos
+
+
+def test_closed_ready_is_bounded(fake_sb, monkeypatch):
+    monkeypatch.setattr(ro, "_CLOSED_READY_MAX", 3)
+    for i in range(5):
+        ro._mark_closed_ready((i, date(2026, 5, 1), date(2026, 6, 1)))
+    assert ro._closed_ready((2, date(2026, 5, 1), date(2026, 6, 1)))
+    ro._mark_closed_ready((9, date(2026, 5, 1), date(2026, 6, 1)))
+    assert list(k[0] for k in ro._CLOSED_READY) == [4, 2, 9]
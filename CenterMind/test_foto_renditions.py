@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Renditions WebP de fotos de exhibición (core/foto_renditions) y su job en background_jobs."""
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+import core.foto_renditions as fr
+import core.job_queue as jq
+
+_BASE = "https://x.supabase.co/storage/v1/object/public/Exhibiciones-PDV/"
+
+
+def _jpeg(w=3000, h=2000, orientacion=None) -> bytes:
+    img = Image.new("RGB", (w, h), (200, 30, 30))
+    buf = io.BytesIO()
+    if orientacion:
+        exif = Image.Exif()
+        exif[0x0112] = orientacion
+        img.save(buf, format="JPEG", quality=95, exif=exif)
+    else:
+        img.save(buf, format="JPEG", quality=95)
+    return buf.getvalue()
+
+
+class _Bucket:
+    def __init__(self, files):
+        self.files = files
+
+    def download(self, path):
+        return self.files[path]
+
+    def upload(self, path, file, file_options=None):
+        self.files[path] = file
+
+    def get_public_url(self, path):
+        return _BASE + path
+
+
+def _sb(fake_supabase, files, rows):
+    sb = fake_supabase({"exhibiciones": rows})
+    sb.storage = type("S", (), {"from_": lambda _s, _b: _Bucket(files)})()
+    return sb
+
+
+def test_paths_and_fields():
+    assert fr.storage_path_de_url(_BASE + "Dist_X/2026-06-01/mobile_a%20b.jpg?") == "Dist_X/2026-06-01/mobile_a b.jpg"
+    assert fr.storage_path_de_url("https://drive.google.com/file/d/abc") is None
+    assert fr.rendition_path("Dist_X/2026-06-01/f.jpg", "thumb") == "_r/thumb/Dist_X/2026-06-01/f.webp"
+    assert fr.rendition_fields({"foto_renditions": {"thumb": "t"}}) == {"url_foto_thumb": "t", "url_foto_med": None}
+    assert fr.rendition_fields({}) == {"url_foto_thumb": None, "url_foto_med": None}
+
+
+def test_render_sizes_and_exif_orientation():
+    original = _jpeg(3000, 2000, orientacion=6)  # 90° horario: se muestra vertical
+    out = fr.render(original)
+    sizes = {k: Image.open(io.BytesIO(v)).size for k, v in out.items()}
+    assert sizes == {"med": (853, 1280), "thumb": (213, 320)}
+    assert all(Image.open(io.BytesIO(v)).format == "WEBP" for v in out.values())
+    assert sum(map(len, out.values())) < len(original) / 5
+
+
+def test_procesar_uploads_and_links_rows(fake_supabase):
+    files = {"D/2026-06-01/a.jpg": _jpeg(), "D/2026-06-01/b.png": _jpeg(800, 600)}
+    rows = [
+        {"id_exhibicion": 1, "url_foto_drive": _BASE + "D/2026-06-01/a.jpg"},
+        {"id_exhibicion": 2, "url_foto_drive": _BASE + "D/2026-06-01/b.png"},
+        {"id_exhibicion": 3, "url_foto_drive": "https://drive.google.com/x"},
+    ]
+    sb = _sb(fake_supabase, files, rows)
+    out = fr.procesar(sb, [(r["id_exhibicion"], r["url_foto_drive"]) for r in rows] + [(9, _BASE + "D/falta.jpg")])
+    assert out == {"fotos": 3, "ok": 2, "errores": 1}
+    assert rows[0]["foto_renditions"] == {
+        "med": _BASE + "_r/med/D/2026-06-01/a.webp",
+        "thumb": _BASE + "_r/thumb/D/2026-06-01/a.webp",
+    }
+    assert "_r/thumb/D/2026-06-01/b.webp" in files and "foto_renditions" not in rows[2]
+
+
+def test_encolar_coalesces_per_tenant(monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE", "1")
+    reloj = type("C", (), {"t": 1_000.0, "__call__": lambda self: self.t})()
+    store = jq.SQLiteJobStore(clock=reloj)
+    jq.set_store(store)
+    vistos = []
+    monkeypatch.setattr(fr, "procesar", lambda sb, fotos, **kw: vistos.append(fotos) or {"ok": len(fotos), "errores": 0})
+    try:
+        fr.encolar(4, [(1, _BASE + "D/a.jpg")])
+        fr.encolar(4, [(2, _BASE + "D/b.jpg"), (3, "https://drive.google.com/x")])
+        assert len(store.rows()) == 1 and vistos == []  # fuera del request
+        reloj.t += 10
+        w = jq.JobWorker(store, worker_id="t")
+        try:
+            w.drain()
+        finally:
+            w.stop()
+        assert vistos == [[(1, _BASE + "D/a.jpg"), (2, _BASE + "D/b.jpg")]]
+    finally:
+        jq.set_store(None)
+
+
+@pytest.mark.parametrize("flag", ["0", "off"])
+def test_disabled_is_noop(monkeypatch, flag):
+    monkeypatch.setenv("FOTO_RENDITIONS", flag)
+    monkeypatch.setattr(jq, "enqueue_foto_renditions", lambda *a: pytest.fail("no debería encolar"))
+    fr.encolar(4, [(1, _BASE + "D/a.jpg")])
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Cache de identidad por tenant: versión, invalidación explícita, métricas y helpers cacheados."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core import identity_cache as ic
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    ic.invalidate_identity()
+    for k in ic._STATS:
+        ic._STATS[k] = 0
+    yield
+    ic.invalidate_identity()
+
+
+def test_hit_miss_rebuild_and_version():
+    calls = []
+
+    def _build():
+        calls.append(1)
+        return {"a": len(calls)}
+
+    assert ic.cached_identity(3, "m", _build) == {"a": 1}
+    assert ic.cached_identity(3, "m", _build) == {"a": 1}
+    v0 = ic.identity_version(3)
+    ic.invalidate_identity(3, "test")
+    assert ic.identity_version(3) == v0 + 1
+    assert ic.cached_identity(3, "m", _build) == {"a": 2}
+    st = ic.identity_cache_stats()
+    assert (st["hits"], st["misses"]) == (1, 2)
+    assert "3:m" in st["entries"]
+
+
+def test_invalidation_is_per_tenant():
+    ic.cached_identity(3, "m", lambda: 1)
+    ic.cached_identity(4, "m", lambda: 1)
+    ic.invalidate_identity(4)
+    assert ic.identity_cache_stats()["entries"] == ["3:m"]
+
+
+def test_stale_entry_counts_as_rebuild(monkeypatch):
+    ic.cached_identity(3, "m", lambda: 1)
+    monkeypatch.setattr(ic, "IDENTITY_CACHE_TTL_SEC", -1)
+    assert ic.cached_identity(3, "m", lambda: 2) == 2
+    assert ic._STATS["rebuilds"] == 1
+
+
+def test_builder_error_is_not_cached():
+    def _boom():
+        raise RuntimeError("db")
+
+    with pytest.raises(RuntimeError):
+        ic.cached_identity(3, "m", _boom)
+    assert ic.cached_identity(3, "m", lambda: "ok") == "ok"
+
+
+def test_disabled_always_builds(monkeypatch):
+    monkeypatch.setenv("IDENTITY_CACHE", "0")
+    assert ic.cached_identity(3, "m", lambda: 1) == 1
+    assert ic.cached_identity(3, "m", lambda: 2) == 2
+
+
+def _sb_tables(data: dict[str, list]):
+    sb = MagicMock()
+    counts: dict[str, int] = {}
+
+    def _table(name):
+        counts[name] = counts.get(name, 0) + 1
+        q = MagicMock()
+        for m in ("select", "eq", "in_"):
+            getattr(q, m).return_value = q
+        q.execute.return_value = MagicMock(data=data.get(name, []))
+        return q
+
+    sb.table.side_effect = _table
+    return sb, counts
+
+
+def test_helpers_share_cached_bindings_and_return_copies():
+    from core import helpers
+
+    data = {
+        "vendedores_v2_d3": [{"id_vendedor": 7, "nombre_erp": "JUAN PEREZ"}],
+        "vendedores_telegram_binding": [
+            {"telegram_user_id": 99, "id_vendedor_v2": 7, "telegram_group_id": -1}
+        ],
+        "integrantes_grupo": [
+            {"id_integrante": 1, "nombre_integrante": "Juan Perez", "telegram_user_id": 99,
+             "telegram_group_id": -1, "id_vendedor_v2": None},
+        ],
+    }
+    sb, counts = _sb_tables(data)
+    with patch.object(helpers, "sb", sb), patch.object(helpers, "tenant_table_name", lambda t, d: f"{t}_d{d}"):
+        first = helpers.build_integrante_to_erp_name(3)
+        assert first == {1: "JUAN PEREZ"}
+        first[1] = "mutado"
+        assert helpers.build_integrante_to_erp_name(3) == {1: "JUAN PEREZ"}
+        helpers._get_erp_name_map(3)
+        helpers._get_erp_name_map(3)
+        assert counts["vendedores_telegram_binding"] == 1
+        assert counts["integrantes_grupo"] == 2
+
+        helpers.build_qa_exhibicion_integrante_ids(3)
+        helpers.build_qa_exhibicion_integrante_ids(3)
+        assert counts["integrantes_grupo"] == 3
+
+        ic.invalidate_identity(3, "binding")
+        helpers.build_integrante_to_erp_name(3)
+        assert counts["vendedores_telegram_binding"] == 2
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Cola background_jobs (core/job_queue): coalescing, reintentos, claim por clave y fallback inline."""
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+import core.job_queue as jq
+
+
+class _Reloj:
+    def __init__(self):
+        self.t = 1_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE", "1")
+    reloj = _Reloj()
+    s = jq.SQLiteJobStore(clock=reloj)
+    s.reloj = reloj
+    jq.set_store(s)
+    yield s
+    jq.set_store(None)
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Reemplaza los handlers registrados por uno que anota las llamadas."""
+    calls: list[tuple[str, int, dict]] = []
+    fallas: dict[str, int] = {}
+
+    for tipo, jt in jq.job_types().items():
+        def _h(dist_id, payload, _tipo=tipo):
+            calls.append((_tipo, dist_id, payload))
+            if fallas.get(_tipo, 0) > 0:
+                fallas[_tipo] -= 1
+                raise RuntimeError(f"{_tipo} caído")
+
+        monkeypatch.setitem(jq._REGISTRY, tipo, dataclasses.replace(jt, handler=_h))
+    return calls, fallas
+
+
+def _drain(store):
+    w = jq.JobWorker(store, worker_id="t")
+    try:
+        w.drain()
+    finally:
+        w.stop()
+
+
+def test_enqueue_coalesces_per_tenant(store, handlers):
+    calls, _ = handlers
+    ids = {jq.enqueue_objetivos_watcher(4, [f"o{i % 3}"]) for i in range(10)}
+    jq.enqueue_objetivos_watcher(5, ["x"])
+    assert len(ids) == 1
+    _drain(store)
+    assert calls == []  # debounce: todavía no vence run_after
+
+    store.reloj.t += 60
+    _drain(store)
+    assert sorted(calls, key=lambda c: c[1]) == [
+        (jq.JOB_OBJETIVOS_WATCHER, 4, {"obj_ids": ["o0", "o1", "o2"]}),
+        (jq.JOB_OBJETIVOS_WATCHER, 5, {"obj_ids": ["x"]}),
+    ]
+    row = next(r for r in store.rows() if r["id_distribuidor"] == 4)
+    assert row["estado"] == "done" and row["coalesced"] == 9
+
+
+def test_global_watcher_absorbs_partial():
+    assert jq.merge_payload({"obj_ids": ["a"]}, {"global": True}) == {"obj_ids": ["a"], "global": True}
+    assert jq.merge_payload({"obj_ids": ["a", "b"]}, {"obj_ids": ["b", "c"]}) == {"obj_ids": ["a", "b", "c"]}
+    assert jq.merge_payload({"global": False, "w": {"x": 1}}, {"global": True, "w": {"y": 2}}) == {
+        "global": True,
+        "w": {"x": 1, "y": 2},
+    }
+
+
+def test_retry_with_backoff_then_error(store, handlers):
+    calls, fallas = handlers
+    fallas[jq.JOB_SNAPSHOTS] = 99
+    jq.enqueue(jq.JOB_SNAPSHOTS, 4, {"eventos": ["evaluacion"]}, key="snapshots:4", delay_sec=0)
+    max_attempts = jq.job_types()[jq.JOB_SNAPSHOTS].max_attempts
+    for _ in range(max_attempts):
+        _drain(store)
+        store.reloj.t += 3600
+    assert len(calls) == max_attempts
+    (row,) = store.rows()
+    assert row["estado"] == "error" and row["intentos"] == max_attempts
+    assert "caído" in row["last_error"]
+    assert store.depth()[jq.JOB_SNAPSHOTS]["error_24h"] == 1
+
+
+def test_retry_merges_into_newer_pending(store, handlers):
+    calls, _ = handlers
+    jq.enqueue(jq.JOB_OBJETIVOS_WATCHER, 4, {"obj_ids": ["a"]}, key="objetivos_watcher:4", delay_sec=0)
+    (job,) = store.claim("t", jq.JOB_OBJETIVOS_WATCHER, 5, 60)
+    # Mientras corre llega otra ingesta: nuevo pending, no se reclama (misma clave corriendo).
+    jq.enqueue(jq.JOB_OBJETIVOS_WATCHER, 4, {"obj_ids": ["b"]}, key="objetivos_watcher:4", delay_sec=0)
+    assert store.claim("t", jq.JOB_OBJETIVOS_WATCHER, 5, 60) == []
+
+    assert store.fail(job.id, "boom", 30) == "merged"
+    pend = [r for r in store.rows() if r["estado"] == "pending"]
+    assert len(pend) == 1 and '"a"' in pend[0]["payload"] and '"b"' in pend[0]["payload"]
+    _drain(store)
+    assert calls == [(jq.JOB_OBJETIVOS_WATCHER, 4, {"obj_ids": ["b", "a"]})]
+
+
+def test_expired_lease_is_reclaimed(store):
+    jq.enqueue(jq.JOB_SNAPSHOTS, 4, {}, key="snapshots:4", delay_sec=0)
+    assert len(store.claim("w1", jq.JOB_SNAPSHOTS, 1, 60)) == 1
+    assert store.claim("w2", jq.JOB_SNAPSHOTS, 1, 60) == []
+    store.reloj.t += 61
+    (job,) = store.claim("w2", jq.JOB_SNAPSHOTS, 1, 60)
+    assert job.intentos == 2
+
+
+def test_expired_lease_and_pending_same_key_not_claimed_together(store):
+    jq.enqueue(jq.JOB_SNAPSHOTS, 4, {"warm": ["visor"]}, key="snapshots:4", delay_sec=0)
+    (viejo,) = store.claim("w1", jq.JOB_SNAPSHOTS, 1, 60)
+    jq.enqueue(jq.JOB_SNAPSHOTS, 4, {"warm": ["dashboard"]}, key="snapshots:4", delay_sec=0)
+    store.reloj.t += 61
+    jobs = store.claim("w2", jq.JOB_SNAPSHOTS, 5, 60)
+    assert [j.id for j in jobs] == [viejo.id]
+    store.complete(viejo.id)
+    assert len(store.claim("w2", jq.JOB_SNAPSHOTS, 5, 60)) == 1
+
+
+def test_snapshot_recompute_error_goes_to_retry(store, monkeypatch):
+    import services.snapshot_refresh_service as snap
+    import services.snapshot_visor_service as visor
+
+    monkeypatch.setattr(snap, "mark_all_stale", lambda *a, **k: None)
+
+    def _boom(dist_id):
+        raise RuntimeError("visor caído")
+
+    monkeypatch.setattr(visor, "force_persist_visor", _boom)
+    jq.enqueue_snapshots(4, warm=["visor"])
+    store.reloj.t += 10
+    _drain(store)
+    (row,) = store.rows()
+    assert row["estado"] == "pending" and row["intentos"] == 1
+    assert "visor" in row["last_error"]
+
+
+def test_idle_poll_backs_off_and_resets(store):
+    w = jq.JobWorker(store, worker_id="t", poll_sec=3)
+    w.idle_max_sec = 60
+    try:
+        esperas, e = [], 0.0
+        for _ in range(7):
+            e = w.next_wait(e, w.tick())
+            esperas.append(e)
+        assert esperas == [3, 6, 12, 24, 48, 60, 60]
+        assert w.next_wait(0.0, 0) == 3  # wake (enqueue en este proceso)
+        assert w.next_wait(60, 1) == 3  # arrancó un job
+    finally:
+        w.stop()
+
+
+def test_fechas_job_chains_watcher(store, monkeypatch):
+    import core.compras_fechas as cf
+    from services.objetivos_watcher_service import objetivos_watcher
+
+    vistos = []
+    monkeypatch.setattr(cf, "batch_update_fechas_compra_desde_ventas", lambda d, erps, nuevas_por_erp: len(nuevas_por_erp))
+    monkeypatch.setattr(
+        objetivos_watcher, "run_watcher", lambda d, obj_id=None, cambio=None: vistos.append((d, obj_id, cambio))
+    )
+
+    jq.enqueue_fechas_compra(4, {"c1": "2026-06-01"})
+    jq.enqueue_objetivos_watcher(4, ["o1"])
+    store.reloj.t += 10
+    _drain(store)
+    assert vistos == []  # el watcher espera su debounce
+    store.reloj.t += 60
+    _drain(store)
+    # Una sola corrida: el cambio de ventas de fechas absorbió el objetivo pedido aparte.
+    ((d, obj_id, cambio),) = vistos
+    assert (d, obj_id) == (4, None)
+    assert cambio.erps == {"c1"} and cambio.obj_ids == {"o1"} and cambio.fechas == {"2026-06-01"}
+
+
+def test_disabled_runs_inline(monkeypatch, handlers):
+    calls, fallas = handlers
+    monkeypatch.setenv("JOB_QUEUE", "0")
+    assert jq.enqueue_objetivos_watcher(7) is None
+    fallas[jq.JOB_SNAPSHOTS] = 1
+    assert jq.enqueue_snapshots(7, warm=["visor"]) is None  # el error se loguea, no se propaga
+    assert [c[0] for c in calls] == [jq.JOB_OBJETIVOS_WATCHER, jq.JOB_SNAPSHOTS]
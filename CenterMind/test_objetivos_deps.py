@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Watcher incremental: índice de dependencias objetivo → PDVs / vendedor / fuente / ventana."""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+import core.job_queue as jq
+from core.objetivos_deps import (
+    FUENTE_CC,
+    FUENTE_EXHIBICIONES,
+    FUENTE_PADRON,
+    FUENTE_VENTAS,
+    DEPS_COLS,
+    Cambio,
+    DepIndex,
+    deps_de,
+)
+from services import objetivos_watcher_service as ws
+
+_HOY = date.today()
+_MES = _HOY.replace(day=1).isoformat()
+
+
+def _obj(oid, tipo, vend=10, **kw):
+    o = {"id": oid, "tipo": tipo, "id_vendedor": vend, "created_at": f"{_MES}T09:00:00+00:00",
+         "lanzado_at": f"{_MES}T09:00:00+00:00", "cumplido": False, "id_distribuidor": 4}
+    o.update(kw)
+    return o
+
+
+def test_index_matches_pdv_vendor_and_source():
+    idx = DepIndex([
+        deps_de(_obj("a", "conversion_estado"), [1, 2]),
+        deps_de(_obj("b", "conversion_estado", vend=11)),
+        deps_de(_obj("c", "ruteo_alteo", vend=10)),
+        deps_de(_obj("d", "cobranza", vend=10)),
+        deps_de(_obj("e", "exhibicion", id_target_pdv=7)),
+    ])
+    ventas = Cambio.de(FUENTE_VENTAS, clientes=[2], vendedores=[11])
+    assert idx.afectados(ventas) == {"a", "b"}  # ruteo_alteo no lee ventas
+    assert idx.afectados(Cambio.de(FUENTE_PADRON, clientes=[99], vendedores=[10])) == {"c"}
+    assert idx.afectados(Cambio.de(FUENTE_CC, sin_ids=True)) == {"d"}
+    assert idx.afectados(Cambio.de(FUENTE_EXHIBICIONES, clientes=[7])) == {"e"}
+    assert idx.afectados(Cambio.de(FUENTE_EXHIBICIONES, obj_ids=["a"])) == {"a"}
+
+
+def test_alteo_con_venta_and_date_window():
+    viejo = (_HOY.replace(day=1) - timedelta(days=40)).isoformat()
+    idx = DepIndex([
+        deps_de(_obj("a", "ruteo_alteo", alteo_con_venta=True)),
+        deps_de(_obj("b", "compradores")),
+        deps_de(_obj("v", "compradores", fecha_objetivo=(_HOY - timedelta(days=1)).isoformat())),
+    ])
+    assert idx.afectados(Cambio.de(FUENTE_VENTAS, vendedores=[10], fechas=[_HOY.isoformat()])) == {"a", "b", "v"}
+    # Ventas anteriores al mes del objetivo no lo mueven; los vencidos entran siempre (expiración).
+    assert idx.afectados(Cambio.de(FUENTE_VENTAS, vendedores=[10], fechas=[viejo])) == {"v"}
+
+
+def test_payload_survives_coalescing():
+    p = jq.merge_payload(
+        Cambio.de(FUENTE_VENTAS, erps=["001", "2"], fechas=["2026-06-03", "2026-06-05"]).to_payload(),
+        Cambio.de(FUENTE_PADRON, erps=["3"]).to_payload(),
+    )
+    p = jq.merge_payload(p, Cambio.de(FUENTE_CC, sin_ids=True).to_payload())
+    c = Cambio.from_payload(p)
+    assert c.fuentes == {FUENTE_VENTAS, FUENTE_PADRON, FUENTE_CC}
+    assert c.fuentes_sin_ids == {FUENTE_CC}
+    assert c.erps == {"001", "2", "3"}
+    assert (min(c.fechas), max(c.fechas)) == ("2026-06-03", "2026-06-05")
+    assert jq.merge_payload(p, {"global": True})["global"] is True
+
+
+@pytest.fixture
+def fake(monkeypatch, fake_supabase):
+    db = fake_supabase({
+        "objetivos": [
+            _obj("a", "compradores", vend=10),
+            _obj("b", "compradores", vend=11),
+            _obj("c", "conversion_estado", vend=12),
+            _obj("d", "general", vend=10),
+        ],
+        "objetivo_items": [{"id_objetivo": "c", "id_cliente_pdv": 501, "estado_item": "pendiente"}],
+        "clientes_pdv_v2_4": [
+            {"id_cliente": 500, "id_cliente_erp": "77", "id_ruta": 1, "id_distribuidor": 4},
+            {"id_cliente": 501, "id_cliente_erp": "78", "id_ruta": 2, "id_distribuidor": 4},
+        ],
+        "rutas_v2_4": [{"id_ruta": 1, "id_vendedor": 10}, {"id_ruta": 2, "id_vendedor": 12}],
+    })
+    monkeypatch.setattr(ws, "sb", db)
+    monkeypatch.setattr(ws, "tenant_table_name", lambda base, d: f"{base}_{d}")
+    vistos = []
+
+    def _proc(self, obj, dist_id):
+        vistos.append(obj["id"])
+        return (1.0, 1)
+
+    monkeypatch.setattr(ws.ObjetivosWatcherService, "_process_objetivo", _proc)
+    db.vistos = vistos
+    return db
+
+
+def test_run_watcher_incremental_only_touches_affected(fake):
+    out = ws.ObjetivosWatcherService().run_watcher(4, cambio=Cambio.de(FUENTE_VENTAS, erps=["0077"]))
+    assert fake.vistos == ["a"]
+    assert out["procesados"] == 1 and out["omitidos"] == 3 and out["actualizados"] == 1
+    assert [r["id"] for r in out["por_objetivo"]] == ["a"] and out["por_objetivo"][0]["eventos"] == 1
+    assert fake.selects[0] == ("objetivos", DEPS_COLS)  # índice sin select("*")
+
+    fake.vistos.clear()
+    out = ws.ObjetivosWatcherService().run_watcher(4, cambio=Cambio.de(FUENTE_PADRON, erps=["78"]))
+    assert fake.vistos == ["c"]  # PDV del ítem (vendedor 12 sin otros objetivos de padrón)
+
+    fake.vistos.clear()
+    ws.ObjetivosWatcherService().run_watcher(4)
+    assert sorted(fake.vistos) == ["a", "b", "c", "d"]
+
+
+def test_item_pdvs_pagina_mas_de_1000_items_por_lote(monkeypatch, fake_supabase):
+    items = [
+        {"id": i, "id_objetivo": f"o{i % 3}", "id_cliente_pdv": 10_000 + i}
+        for i in range(2_500)
+    ]
+    db = fake_supabase({"objetivo_items": items}, max_rows=1000)  # corte max-rows de PostgREST
+    monkeypatch.setattr(ws, "sb", db)
+
+    out = ws.ObjetivosWatcherService()._item_pdvs_por_objetivo(["o0", "o1", "o2"])
+
+    assert sum(len(v) for v in out.values()) == 2_500
+    assert sorted(out["o1"]) == [10_000 + i for i in range(1, 2_500, 3)]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Paridad ruta columnar (services.padron_columnar) vs iterrows de referencia."""
+from __future__ import annotations
+
+import json
+import random
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from services import padron_columnar as col
+from services.padron_ingestion_service import (
+    PadronIngestionService,
+    _rows_cliente_records,
+    _rows_unique_rutas,
+    _rows_unique_sucursales,
+    _rows_unique_vendedores,
+)
+
+NOW = datetime(2026, 3, 15, 12, 0, tzinfo=timezone.utc)
+
+_EDGE_ROWS = [
+    # idcliente, nomcli, fantacli, vendedor, d_vendedor, idsucur, dssucur, ruta, ycoord, xcoord,
+    # telefos, movil, fecultcom, fecalta, anulado, lunes, martes
+    ["4366.0", "Kiosco Uno", "", "1010.0", "10-marche fernando", "1", "Casa Central", "3.0",
+     "-31,4201", "-64,1888", "3512345678.0", "", "2026-03-21", "45000", "", "1", ""],
+    ["4366", "Kiosco Uno bis", "K1", "1010", "10-MARCHE FERNANDO", "1.0", "Casa Central", "3",
+     "", "", "", "351555.00", "10/02/2026", "", "", "", "X"],
+    ["77", "Almacén", "", "", "Pérez Juan", "", "Sucursal Norte", "r5",
+     "-31.1 | -64.2", "", "nan", "None", "45500", "01/05/2020", "no", "NO", "si"],
+    ["", "Sin id", "", "1010", "", "1", "", "3", "", "", "", "", "", "", "", "", ""],
+    ["88", "Sin ruta", "", "999", "", "1", "", "9", "", "", "", "", "", "", "", "", ""],
+    ["90", "Anulado", "", "1010", "", "1", "", "3", "abc", "1e-3", ".0", "", "", "", "SI", "", ""],
+    ["91", "Fallback nombre", "", "2020", "PEREZ JUAN", "", "Sucursal Norte", "R5",
+     "-31.2", "-64.3", "", "", "2025-01-01", "", "", "", ""],
+    ["77", "Almacén v2", "ALM", "", "PÉREZ JUAN", "", "Sucursal Norte", "R5",
+     "", "", "4441", "", "2026-03-10", "", "", "", ""],
+    ["92", "Coma", "", "1010", "", "1", "", "3", " -31,5 ", "inf", "12.5", "", "x", "", "", "", ""],
+]
+_EDGE_COLUMNS = [
+    "idcliente", "nomcli", "fantacli", "vendedor", "d_vendedor", "idsucur", "dssucur", "ruta",
+    "ycoord", "xcoord", "telefos", "movil", "fecultcom", "fecalta", "anulado", "lunes", "martes",
+]
+
+
+def _cols(df: pd.DataFrame) -> dict:
+    return PadronIngestionService._detect_columns(PadronIngestionService(), df)
+
+
+def _ruta_map(df: pd.DataFrame, cols: dict, drop_every: int = 0) -> dict:
+    rutas = _rows_unique_rutas(df, cols)
+    return {k: i + 1 for i, k in enumerate(rutas) if not drop_every or i % drop_every}
+
+
+def _random_padron(n: int, seed: int = 7) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        rows.append([
+            str(rnd.randint(1, n // 2)) + rnd.choice(["", ".0"]),
+            rnd.choice(["Cliente A", "cliente b", "", "nan"]),
+            rnd.choice(["", "Fant", "null"]),
+            rnd.choice(["10", "20.0", "", "30"]),
+            rnd.choice(["Vend Diez", "VEND VEINTE", ""]),
+            rnd.choice(["1", "2", ""]),
+            rnd.choice(["Centro", "Norte", ""]),
+            rnd.choice(["1", "2.0", "r3", ""]),
+            rnd.choice(["-31,41", "-31.5", "", "-31.4 | -64.1", "x"]),
+            rnd.choice(["-64,2", "-64.25", ""]),
+            rnd.choice(["", "351000.0", "0351-44"]),
+            rnd.choice(["", "11.00"]),
+            rnd.choice(["", "2026-03-01", "15/01/2026", "46000", "2025-12-31"]),
+            rnd.choice(["", "44000", "01/02/2019"]),
+            rnd.choice(["", "", "", "SI", "N"]),
+            rnd.choice(["", "1"]),
+            rnd.choice(["", "X"]),
+        ])
+    return pd.DataFrame(rows, columns=_EDGE_COLUMNS)
+
+
+@pytest.fixture(params=["edge", "random"])
+def padron(request):
+    df = pd.DataFrame(_EDGE_ROWS, columns=_EDGE_COLUMNS) if request.param == "edge" else _random_padron(600)
+    return df, _cols(df)
+
+
+def test_unique_hierarchy_parity(padron):
+    df, cols = padron
+    assert list(col.unique_sucursales(df, cols).items()) == list(_rows_unique_sucursales(df, cols).items())
+    assert list(col.unique_vendedores(df, cols).items()) == list(_rows_unique_vendedores(df, cols).items())
+    assert list(col.unique_rutas(df, cols).items()) == list(_rows_unique_rutas(df, cols).items())
+
+
+@pytest.mark.parametrize("drop_every", [0, 3])
+def test_cliente_records_byte_identical(padron, drop_every):
+    df, cols = padron
+    ruta_map = _ruta_map(df, cols, drop_every)
+    ref = _rows_cliente_records(df, cols, 5, ruta_map, NOW)
+    got = col.cliente_records(df, cols, 5, ruta_map, NOW)
+    assert json.dumps(got[0], ensure_ascii=False) == json.dumps(ref[0], ensure_ascii=False)
+    assert got[1:] == ref[1:]
+
+
+def test_cliente_records_edge_semantics():
+    df = pd.DataFrame(_EDGE_ROWS, columns=_EDGE_COLUMNS)
+    cols = _cols(df)
+    ruta_map = _ruta_map(df, cols)
+    ruta_map.pop(("999", "1", "9"))
+    records, seen, skip_no_id, skip_no_ruta, dup = col.cliente_records(df, cols, 5, ruta_map, NOW)
+    by_erp = {r["id_cliente_erp"]: r for r in records}
+    assert (skip_no_id, skip_no_ruta, dup) == (1, 1, 2)
+    assert "88" in seen and "88" not in by_erp
+    # Duplicado: campos de la última fila, FUC más reciente, teléfono no vacío previo.
+    assert by_erp["4366"]["nombre_razon_social"] == "KIOSCO UNO BIS"
+    assert by_erp["4366"]["fecha_ultima_compra"] == "2026-03-21"
+    assert by_erp["4366"]["telefono"] == "3512345678"
+    assert by_erp["4366"]["celular"] == "351555"
+    assert by_erp["77"]["latitud"] is None and by_erp["77"]["estado"] == "activo"
+    assert by_erp["90"]["motivo_inactivo"] == "padron_anulado"
+    assert by_erp["92"]["latitud"] == -31.5
+
+
+def test_empty_padron():
+    df = pd.DataFrame(columns=_EDGE_COLUMNS)
+    cols = _cols(df)
+    assert col.cliente_records(df, cols, 5, {}, NOW) == ([], set(), 0, 0, 0)
+    assert col.unique_rutas(df, cols) == {}
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Upsert incremental del padrón: huellas por PDV y envío sólo de filas nuevas/cambiadas."""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pandas as pd
+
+from core.padron_fingerprint import diff_by_fingerprint, payload_fingerprint
+from services.padron_ingestion_service import PadronIngestionService
+
+
+def _payload(**kw):
+    base = {
+        "id_ruta": 1,
+        "id_cliente_erp": "10",
+        "nombre_fantasia": "KIOSCO",
+        "estado": "activo",
+        "updated_at": "2026-03-01T00:00:00+00:00",
+        "fecha_inactivacion": None,
+    }
+    base.update(kw)
+    return base
+
+
+def test_fingerprint_ignores_run_timestamps_and_key_order():
+    a = _payload()
+    b = dict(reversed(list(_payload(updated_at="2026-03-02T00:00:00+00:00").items())))
+    assert payload_fingerprint(a) == payload_fingerprint(b)
+    assert payload_fingerprint(a) != payload_fingerprint(_payload(id_ruta=2))
+    assert payload_fingerprint(a) != payload_fingerprint(_payload(estado="inactivo"))
+
+
+def test_diff_by_fingerprint_splits_pending_and_unchanged():
+    same, changed, new = _payload(), _payload(id_cliente_erp="11"), _payload(id_cliente_erp="12")
+    prev = {"10": payload_fingerprint(same), "11": "otro"}
+    pending, fresh, unchanged = diff_by_fingerprint([same, changed, new], prev)
+    assert unchanged == 1
+    assert [p["id_cliente_erp"] for p in pending] == ["11", "12"]
+    assert set(fresh) == {"11", "12"}
+
+
+def test_diff_without_previous_sends_everything():
+    pending, fresh, unchanged = diff_by_fingerprint([_payload()], None)
+    assert len(pending) == 1 and unchanged == 0 and "10" in fresh
+
+
+def _padron(fantasias):
+    return pd.DataFrame({
+        "idcliente": [str(i) for i in range(1, len(fantasias) + 1)],
+        "fantacli": fantasias,
+        "vendedor": ["10"] * len(fantasias),
+        "idsucur": ["1"] * len(fantasias),
+        "ruta": ["1"] * len(fantasias),
+    })
+
+
+def _run(svc, sb, df):
+    cols = svc._detect_columns(df)
+    sb.upserts.clear()
+    with patch("services.padron_ingestion_service.sb", sb):
+        out = svc._sync_clientes(df, cols, 3, {("10", "1", "1"): 7}, {}, {})
+    return out, sb.upserts.get("clientes_pdv_v2", 0)
+
+
+def test_sync_clientes_only_sends_new_or_changed_rows(fake_supabase):
+    svc = PadronIngestionService()
+    db = fake_supabase()
+
+    (total, _, _, _, stats, erps), sent = _run(svc, db, _padron(["A", "B", "C"]))
+    assert total == 3 and sent == 3
+    assert stats == {"clientes_insertados": 3, "clientes_actualizados": 0, "clientes_sin_cambios": 0}
+    assert erps == ["1", "2", "3"]
+    assert len(db.tables["padron_fingerprints"]) == 3
+
+    (total, _, _, _, stats, erps), sent = _run(svc, db, _padron(["A", "B", "C"]))
+    assert total == 3 and sent == 0
+    assert stats["clientes_sin_cambios"] == 3 and erps == []
+
+    (total, erp_map, _, _, stats, erps), sent = _run(svc, db, _padron(["A", "B2"]))
+    assert sent == 1 and stats["clientes_sin_cambios"] == 1
+    assert erps == ["2"]
+    assert erp_map == {"1": 7, "2": 7}
+    # Cliente 3 salió del archivo: su huella se poda para reenviarlo si vuelve.
+    assert {r["id_cliente_erp"] for r in db.tables["padron_fingerprints"]} == {"1", "2"}
+
+
+def test_sync_clientes_full_upsert_when_disabled(monkeypatch, fake_supabase):
+    monkeypatch.setenv("PADRON_INCREMENTAL_UPSERT", "0")
+    svc = PadronIngestionService()
+    db = fake_supabase()
+    _run(svc, db, _padron(["A", "B"]))
+    (_, _, _, _, stats, _), sent = _run(svc, db, _padron(["A", "B"]))
+    assert sent == 2 and stats["clientes_sin_cambios"] == 0
+    assert "padron_fingerprints" not in db.tables
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Índice espacial de PDVs: paridad con haversine / ray casting escalares y cache por tenant."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from core import pdv_spatial_index as psi
+from core.pdv_proximity import haversine_metros
+from services.mapa_capas_service import _point_in_polygon
+
+LAT0, LNG0 = -31.42, -64.19
+
+
+def _rows(n: int, seed: int = 3) -> list[dict]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id_cliente": i + 1,
+            "id_cliente_erp": str(1000 + i),
+            "latitud": LAT0 + rnd.uniform(-0.2, 0.2),
+            "longitud": LNG0 + rnd.uniform(-0.2, 0.2),
+            "id_ruta": rnd.randint(1, 20),
+            "id_vendedor": rnd.randint(1, 5),
+        })
+    rows += [
+        {"id_cliente": -1, "latitud": None, "longitud": LNG0},
+        {"id_cliente": -2, "latitud": "abc", "longitud": "1"},
+        {"id_cliente": -3, "latitud": str(LAT0), "longitud": str(LNG0), "id_ruta": None},
+    ]
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    psi.invalidate_pdv_index()
+    yield
+    psi.invalidate_pdv_index()
+
+
+def test_from_rows_skips_invalid_coordinates():
+    idx = psi.PdvGridIndex.from_rows(_rows(10))
+    assert len(idx) == 11
+    assert idx.id_ruta[-1] == -1
+
+
+@pytest.mark.parametrize("radio_m", [50.0, 400.0, 3000.0])
+def test_within_radius_matches_scalar_haversine(radio_m):
+    rows = _rows(3000)
+    idx = psi.PdvGridIndex.from_rows(rows)
+    rnd = random.Random(11)
+    for _ in range(20):
+        lat, lng = LAT0 + rnd.uniform(-0.15, 0.15), LNG0 + rnd.uniform(-0.15, 0.15)
+        pos, dist = idx.within_radius(lat, lng, radio_m)
+        got = {idx.rows[p]["id_cliente"]: round(float(d), 1) for p, d in zip(pos, dist)}
+        ref = {}
+        for r in idx.rows:
+            d = haversine_metros(lat, lng, float(r["latitud"]), float(r["longitud"]))
+            if d <= radio_m:
+                ref[r["id_cliente"]] = round(d, 1)
+        assert got == ref
+
+
+def test_within_polygon_matches_scalar_ray_casting():
+    idx = psi.PdvGridIndex.from_rows(_rows(3000))
+    ring = [
+        [LNG0 - 0.1, LAT0 - 0.05], [LNG0 + 0.05, LAT0 - 0.12], [LNG0 + 0.12, LAT0 + 0.02],
+        [LNG0, LAT0 + 0.01], [LNG0 - 0.02, LAT0 + 0.15], [LNG0 - 0.1, LAT0 - 0.05],
+    ]
+    got = {idx.rows[p]["id_cliente"] for p in idx.within_polygon(ring)}
+    ref = {
+        r["id_cliente"] for r in idx.rows
+        if _point_in_polygon(float(r["longitud"]), float(r["latitud"]), ring)
+    }
+    assert got == ref and got
+
+
+def test_mask_restricts_candidates():
+    idx = psi.PdvGridIndex.from_rows(_rows(2000))
+    pos, _ = idx.within_radius(LAT0, LNG0, 20_000, mask=idx.id_ruta == 3)
+    assert len(pos) and all(idx.rows[p]["id_ruta"] == 3 for p in pos)
+
+
+def test_cache_reuses_until_invalidated(monkeypatch):
+    calls = []
+
+    def _fake_fetch(sb, dist_id):
+        calls.append(dist_id)
+        return _rows(5)
+
+    monkeypatch.setattr(psi, "_fetch_index_rows", _fake_fetch)
+    a = psi.get_pdv_index(None, 3)
+    assert psi.get_pdv_index(None, 3) is a
+    psi.get_pdv_index(None, 4)
+    psi.invalidate_pdv_index(3)
+    assert psi.get_pdv_index(None, 3) is not a
+    assert calls == [3, 4, 3]
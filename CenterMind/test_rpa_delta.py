@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Hash Guard por filas (RPA) + reconstrucción del delta en el backend (rpa_delta_service)."""
+from __future__ import annotations
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+RPA_ROOT = Path(__file__).resolve().parents[1] / "ShelfMind-RPA"
+sys.path.insert(0, str(RPA_ROOT))
+
+from lib import hash_guard as hg  # noqa: E402
+from services import rpa_delta_service as rd  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(hg, "STORE_FILE", tmp_path / "hg.sqlite3")
+    hg._tabla_cache.clear()
+    bases: dict[str, bytes] = {}
+    monkeypatch.setattr(rd, "_storage_get", bases.get)
+    monkeypatch.setattr(rd, "_storage_put", bases.__setitem__)
+    return bases
+
+
+def _xlsx(rows: list[list], *, creator: str = "Consolido") -> bytes:
+    wb = Workbook()
+    wb.properties.creator = creator  # metadatos del export: no deben cambiar la huella
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+_HEADER = ["idempresa", "idcliente", "nomcli", "saldo"]
+
+
+def _rows(n: int) -> list[list]:
+    return [[3154, 1000 + i, f"Cliente {i}", float(i)] for i in range(n)]
+
+
+def test_fingerprint_ignores_metadata_and_order():
+    rows = _rows(20)
+    a = _xlsx([_HEADER] + rows)
+    hg.guardar_hash("padron_x", a)
+    assert hg.es_duplicado("padron_x", _xlsx([_HEADER] + rows[::-1], creator="otro"))
+    rows[3][3] = 99.5
+    assert not hg.es_duplicado("padron_x", _xlsx([_HEADER] + rows))
+    # Contenido no tabular: huella de bytes.
+    hg.guardar_hash("pdf", b"%PDF-1.4 x")
+    assert hg.es_duplicado("pdf", b"%PDF-1.4 x") and hg.calcular_delta("pdf", b"%PDF-1.4 x") is None
+
+
+def test_delta_round_trip_through_backend():
+    rows = _rows(50)
+    first = _xlsx([_HEADER] + rows)
+    d0 = hg.calcular_delta("padron_aloma", first)
+    assert d0.completo and len(d0.agregadas) == 50
+    t0 = rd.resolve_delta("padron", 4, d0.payload())
+    assert rd.save_base(t0)
+    hg.guardar_hash("padron_aloma", first)
+
+    rows[7][2] = "Cliente 7 bis"
+    del rows[10]
+    rows.append([3154, 2000, "Nuevo", 1.0])
+    second = _xlsx([_HEADER] + rows)
+    d1 = hg.calcular_delta("padron_aloma", second)
+    assert not d1.completo and len(d1.agregadas) == 2 and len(d1.quitadas) == 2
+    assert len(d1.payload()) < len(second) / 4
+
+    t1 = rd.resolve_delta("padron", 4, d1.payload())
+    assert t1.stats == {"agregadas": 2, "quitadas": 2, "filas": 50, "completo": 0}
+    rebuilt = load_workbook(io.BytesIO(rd.tabla_a_xlsx(t1)), read_only=True)
+    got = [list(r) for r in rebuilt.worksheets[0].iter_rows(values_only=True)]
+    assert got[0] == _HEADER
+    assert sorted(map(tuple, got[1:])) == sorted(tuple(hg._tabla(second)[0].filas[i]) for i in range(50))
+
+
+def test_base_mismatch_and_tampered_delta():
+    rows = _rows(10)
+    hg.guardar_hash("k", _xlsx([_HEADER] + rows))
+    rows[0][2] = "x"
+    d = hg.calcular_delta("k", _xlsx([_HEADER] + rows))
+    with pytest.raises(rd.DeltaBaseMismatch):
+        rd.resolve_delta("padron", 4, d.payload())  # backend sin base ⇒ 409
+    full = rd.resolve_delta("padron", 4, d.como_completo().payload())
+    assert full.stats["completo"] == 1 and len(full.filas) == 10
+
+    body = d.como_completo().body()
+    body["agregadas"] = body["agregadas"][:-1]
+    with pytest.raises(rd.DeltaInvalido):
+        rd.resolve_delta("padron", 4, body)
+
+
+def test_json_rows_for_cuentas():
+    filas = [{"vendedor": "V1", "cliente": f"C{i}", "deuda": i * 10.5} for i in range(8)]
+    base = rd.tabla_from_rows("cuentas", 3, "cc_detalle_tabaco_3", filas)
+    assert base.huella == hg.tabla_desde_filas(filas).huella
+    rd.save_base(base)
+    hg.guardar_hash("cc_detalle_tabaco_3", hg.tabla_desde_filas(filas))
+
+    nuevas = filas[1:] + [{"vendedor": "V2", "cliente": "C9", "deuda": 1.0}]
+    d = hg.calcular_delta("cc_detalle_tabaco_3", hg.tabla_desde_filas(nuevas))
+    assert len(d.agregadas) == 1 and len(d.quitadas) == 1
+    t = rd.resolve_delta("cuentas", 3, d.body())
+    assert sorted(t.filas, key=lambda f: f["cliente"]) == sorted(nuevas, key=lambda f: f["cliente"])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Telemetría de navegación RPA → motor_runs (rpa_<motor>)."""
+from __future__ import annotations
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import rpa_telemetry_service as rts
+
+_NAV = {
+    "perfil": "sigo",
+    "requests": 40,
+    "bloqueadas": 12,
+    "fallidas": 0,
+    "mb": 1.5,
+    "html": "<basura>",
+    "pasos": {"login": {"s": 2.5, "bytes": 1000, "requests": 8}, "sucursales": {"s": 30.25, "bytes": 5, "requests": 32}},
+    "esperas": [{"paso": "sucursales", "espera": "entorno_aplicar", "via": "response", "s": 1.234}],
+}
+
+
+def test_registrar_inserta_fila_rpa_con_pasos_y_esperas(monkeypatch):
+    sb = MagicMock()
+    sb.table.return_value.insert.return_value.execute.return_value.data = [{"id": 77}]
+    monkeypatch.setattr(rts, "sb", sb)
+
+    assert rts.registrar_telemetria("SIGO", 3, _NAV, tenant="tabaco") == 77
+    sb.table.assert_called_with("motor_runs")
+    fila = sb.table.return_value.insert.call_args.args[0]
+    assert (fila["motor"], fila["dist_id"], fila["estado"], fila["error_msg"]) == ("rpa_sigo", 3, "ok", None)
+    regs = fila["registros"]
+    assert "html" not in regs and regs["tenant"] == "tabaco"
+    assert regs["total_s"] == 32.75
+    assert regs["esperas"] == [{"paso": "sucursales", "espera": "entorno_aplicar", "via": "response", "s": 1.23}]
+    dur = datetime.fromisoformat(fila["finalizado_en"]) - datetime.fromisoformat(fila["iniciado_en"])
+    assert round(dur.total_seconds(), 2) == 32.75
+
+
+def test_motor_desconocido_y_fallo_de_insert(monkeypatch):
+    sb = MagicMock()
+    sb.table.return_value.insert.return_value.execute.side_effect = RuntimeError("supabase caído")
+    monkeypatch.setattr(rts, "sb", sb)
+
+    with pytest.raises(ValueError):
+        rts.registrar_telemetria("padron_rpa", 3, _NAV)
+    assert rts.registrar_telemetria("padron", None, None, estado="error", error_msg="x" * 900) is None
+    fila = sb.table.return_value.insert.call_args.args[0]
+    assert fila["dist_id"] is None and fila["estado"] == "error" and len(fila["error_msg"]) == 500
+    assert fila["registros"]["pasos"] == {} and fila["registros"]["total_s"] == 0
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Subida concurrente a Storage (core/storage_upload) sobre un Storage simulado."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import core.storage_upload as su
+import db
+from services import vendedor_upload_service as vus
+
+_BUCKET = "Exhibiciones-PDV"
+
+
+def _storage_handler(subidos: dict, demoras: dict, fallas: dict, estado: dict):
+    """POST /object/{bucket}/{path}: demora por path, N fallas 503 iniciales, cuenta vuelos."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split(f"/object/{_BUCKET}/", 1)[1]
+        estado["en_vuelo"] += 1
+        estado["max"] = max(estado["max"], estado["en_vuelo"])
+        try:
+            await asyncio.sleep(demoras.get(path, 0.01))
+            if fallas.get(path, 0) > 0:
+                fallas[path] -= 1
+                return httpx.Response(503, json={"statusCode": "503", "error": "x", "message": "busy"})
+            ct = request.content.split(b"Content-Type: ", 1)[1].split(b"\r\n", 1)[0].decode()
+            subidos[path] = (request.headers["x-upsert"], ct)
+            return httpx.Response(200, json={"Key": f"{_BUCKET}/{path}"})
+        finally:
+            estado["en_vuelo"] -= 1
+
+    return handler
+
+
+def _run(handler, coro_fn):
+    async def main():
+        db._ASYNC_STORAGE[asyncio.get_running_loop()] = db._new_async_storage(transport=httpx.MockTransport(handler))
+        try:
+            return await coro_fn()
+        finally:
+            await db.aclose_async_client()
+
+    return asyncio.run(main())
+
+
+def test_bounded_parallel_in_order_and_histogram():
+    subidos, estado = {}, {"en_vuelo": 0, "max": 0}
+    demoras = {f"D/f{i}.jpg": 0.2 if i == 0 else 0.05 for i in range(8)}
+    handler = _storage_handler(subidos, demoras, {}, estado)
+    antes = su.storage_upload_stats()
+    items = [(f"D/f{i}.jpg", b"x" * 10, "image/jpeg") for i in range(8)]
+
+    t0 = time.perf_counter()
+    urls = _run(handler, lambda: su.aupload_many(_BUCKET, items, concurrency=4))
+    elapsed = time.perf_counter() - t0
+
+    assert urls == [db.sb.storage.from_(_BUCKET).get_public_url(p) for p, _, _ in items]
+    assert estado["max"] == 4 and len(subidos) == 8
+    assert elapsed < 0.2 + 0.05 * 8  # no la suma: la más lenta + el resto en paralelo
+    despues = su.storage_upload_stats()
+    assert despues["ok"] - antes["ok"] == 8 and despues["bytes"] - antes["bytes"] == 80
+    assert sum(despues["latencia_ms"].values()) - sum(antes["latencia_ms"].values()) == 8
+
+
+def test_retry_with_async_backoff_and_errors_per_item():
+    subidos, estado = {}, {"en_vuelo": 0, "max": 0}
+    fallas = {"D/a.jpg": 2, "D/b.jpg": 9}
+    handler = _storage_handler(subidos, {}, fallas, estado)
+    antes = su.storage_upload_stats()
+    items = [("D/a.jpg", b"a", "image/jpeg"), ("D/b.jpg", b"b", "image/png"), ("D/c.jpg", b"c", "image/jpeg")]
+
+    out = _run(handler, lambda: su.aupload_many(_BUCKET, items, intentos=3, backoff=0.01))
+
+    assert out[0].endswith("/D/a.jpg") and out[2].endswith("/D/c.jpg")
+    assert isinstance(out[1], Exception)
+    assert subidos["D/a.jpg"] == ("true", "image/jpeg") and "D/b.jpg" not in subidos
+    despues = su.storage_upload_stats()
+    assert despues["errores"] - antes["errores"] == 1
+    assert despues["reintentos"] - antes["reintentos"] == 2 + 2
+
+
+def test_mobile_upload_keeps_order_and_fails_whole_batch(monkeypatch):
+    monkeypatch.setattr(vus, "_distribuidor_storage_folder", lambda sb, d: "Dist_4")
+    subidos, estado = {}, {"en_vuelo": 0, "max": 0}
+    handler = _storage_handler(subidos, {}, {}, estado)
+    files = [("a.JPG", b"1"), ("vacia.jpg", b""), ("b.png", b"2"), ("c.webp", b"3")]
+
+    urls = _run(handler, lambda: vus.aupload_mobile_photos_to_storage(db.sb, 4, files))
+
+    assert [u.rsplit(".", 1)[1] for u in urls] == ["jpg", "png", "webp"]
+    assert sorted(ct for _, ct in subidos.values()) == ["image/jpeg", "image/png", "image/webp"]
+    assert all(p.startswith("Dist_4/") and "/mobile_" in p for p in subidos)
+
+    async def caido(_request):
+        return httpx.Response(503, json={"statusCode": "503", "error": "x", "message": "busy"})
+
+    sin_backoff = su.aupload_many
+
+    async def _many(bucket, items, **kw):
+        return await sin_backoff(bucket, items, backoff=0.0, **kw)
+
+    monkeypatch.setattr(vus, "aupload_many", _many)
+    with pytest.raises(vus.HTTPException):
+        _run(caido, lambda: vus.aupload_mobile_photos_to_storage(db.sb, 4, [("a.jpg", b"1"), ("b.png", b"2")]))
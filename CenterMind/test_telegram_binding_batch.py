@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Binding watcher por tenant: mismo scoring/drift que el camino grupo a grupo, con pocas consultas."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from core import telegram_binding_batch as tbb
+from core import telegram_group_matcher as tgm
+from services import telegram_binding_watcher_service as ws
+
+_DIST = 4
+
+
+_NOMBRES = ["marcela", "gomez", "juan", "perez", "ruta", "norte", "sosa", "mar", "ana", "anabel", "oscar", "lopez", "jose", "luis"]
+
+
+def _vendedores(r: random.Random, n: int) -> list[dict]:
+    return [
+        {
+            "id_vendedor": i + 1,
+            "id_vendedor_erp": str(100 + i) if i % 3 else "",
+            "nombre_erp": " ".join(r.sample(_NOMBRES, r.randint(1, 3))).upper(),
+            "id_sucursal": 1,
+            "activo": i % 7 != 0,
+            "id_distribuidor": _DIST,
+        }
+        for i in range(n)
+    ]
+
+
+def _grupo(chat: int, nombre: str, **kw) -> dict:
+    return {
+        "telegram_chat_id": chat,
+        "nombre_grupo": nombre,
+        "nombre_grupo_prev": None,
+        "id_vendedor_erp": None,
+        "id_vendedor_v2": None,
+        "binding_status": "unlinked",
+        "dominant_uploader_uid": None,
+        "id_distribuidor": _DIST,
+        **kw,
+    }
+
+
+def test_indice_da_el_mismo_scoring_que_todo_el_padron():
+    r = random.Random(7)
+    vendedores = _vendedores(r, 80)
+    activos = [v for v in vendedores if v.get("activo", True)]
+    indice = tbb.IndiceVendedores(activos)
+    for chat in range(300):
+        nombre = " ".join(r.sample(_NOMBRES + ["exhibidores", "grupo", "ANÁ", "x"], r.randint(0, 3)))
+        grupo = _grupo(chat, nombre, id_vendedor_erp=str(r.randint(95, 130)) if chat % 5 == 0 else None)
+        hist = set(r.sample(range(1, 90), r.randint(0, 2)))
+        ints = {r.randint(1, 80): r.randint(1, 3)}
+        esperado = tgm._score_candidates(grupo, activos, hist, ints)
+        sub = indice.candidatos(grupo, hist)
+        assert len(sub) <= len(activos)
+        assert tgm._score_candidates(grupo, sub, hist, ints) == esperado
+
+
+def test_levenshtein_bitparalelo_igual_a_programacion_dinamica():
+    def _dp(a, b):
+        prev = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            curr = [i]
+            for j, cb in enumerate(b, 1):
+                curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + (ca != cb)))
+            prev = curr
+        return prev[-1]
+
+    r = random.Random(3)
+    for _ in range(3000):
+        a = "".join(r.choice("abcñ ") for _ in range(r.randint(0, 90)))
+        b = "".join(r.choice("abcñ ") for _ in range(r.randint(0, 90)))
+        assert tgm._levenshtein(a, b) == _dp(a, b)
+    assert tgm._levenshtein_norm("", "") == 0.0 and tgm._levenshtein_norm("abc", "") == 1.0
+
+
+@pytest.fixture
+def db(monkeypatch, fake_supabase):
+    r = random.Random(11)
+    vendedores = _vendedores(r, 40)
+    vendedores[0].update(nombre_erp="MARCELA GOMEZ", activo=True)
+    vendedores[1].update(nombre_erp="OSCAR SOSA", activo=False)
+    grupos = [
+        _grupo(1, "Exhibidores Marcela"),
+        _grupo(2, "Ruta Norte Juan"),
+        _grupo(3, "Chat sin match"),
+        _grupo(4, "Oscar Sosa", binding_status="linked", id_vendedor_v2=2),
+        _grupo(5, "Equipo Luis nuevo", nombre_grupo_prev="Ventas Ana Perez", binding_status="linked", id_vendedor_v2=3),
+        _grupo(6, "Marcela Gomez", binding_status="review", id_vendedor_v2=1, dominant_uploader_uid=55),
+        _grupo(7, "Jose Lopez", binding_status="linked", id_vendedor_v2=4, dominant_uploader_uid=77),
+        _grupo(None, "sin chat"),
+    ]
+    exhibiciones = [
+        {"id_exhibicion": i, "id_distribuidor": _DIST, "telegram_chat_id": chat, "telegram_user_id": uid,
+         "timestamp_subida": f"2026-06-{1 + i % 28:02d}T{i % 24:02d}:00:00"}
+        for i, (chat, uid) in enumerate([(6, 66)] * 40 + [(6, 55)] * 5 + [(7, 77)] * 12 + [(7, 78)] * 3)
+    ]
+    tables = {
+        "grupos": grupos,
+        tgm.tenant_table_name("vendedores_v2", _DIST): vendedores,
+        "vendedores_telegram_binding": [{"id_distribuidor": _DIST, "telegram_group_id": 2, "id_vendedor_v2": 9}],
+        "integrantes_grupo": [
+            {"id_distribuidor": _DIST, "telegram_group_id": 1, "id_vendedor_v2": 1},
+            {"id_distribuidor": _DIST, "telegram_group_id": 1, "id_vendedor_v2": 1},
+        ],
+        "exhibiciones": exhibiciones,
+        "telegram_binding_suggestions": [],
+        "telegram_binding_audit": [],
+    }
+    sb = fake_supabase(tables)
+    for mod in (tgm, tbb, ws):
+        monkeypatch.setattr(mod, "sb", sb)
+    return sb
+
+
+def test_snapshot_equivale_al_camino_grupo_a_grupo(db):
+    esperado = {
+        g["telegram_chat_id"]: (tgm.score_group_vendor_candidates(_DIST, g["telegram_chat_id"]),
+                                tgm.detect_group_drift(_DIST, g["telegram_chat_id"]))
+        for g in db.tables["grupos"] if g["telegram_chat_id"] is not None
+    }
+    db.calls.clear()
+    snap = tbb.cargar_snapshot_tenant(_DIST)
+    for g in snap.grupos:
+        if g["telegram_chat_id"] is not None:
+            assert (snap.candidatos(g), snap.drift(g)) == esperado[g["telegram_chat_id"]]
+    # grupos, vendedores, historial, integrantes + una de exhibiciones; sin fallbacks
+    assert len(db.calls) == 5 and snap.uploader_fallbacks == 0
+    assert [d and d["drift_type"] for d in (esperado[4][1], esperado[5][1], esperado[6][1], esperado[7][1])] == [
+        "vendor_inactive", "title_changed", "uploader_changed", None,
+    ]
+
+
+def test_scan_distribuidor_batch(db, monkeypatch):
+    top1 = tgm.score_group_vendor_candidates(_DIST, 1)[0]
+    assert top1["id_vendedor"] == 1 and "integrantes_grupo_bonus:2" in top1["reasons"]
+    db.tables["telegram_binding_suggestions"].append({
+        "id": 1, "id_distribuidor": _DIST, "telegram_chat_id": 1, "id_vendedor_v2": 1,
+        "score": top1["score"], "reasons": top1["reasons"], "status": "pending", "source": "manual_scan",
+    })
+    db.calls.clear()
+
+    stats = ws.scan_distribuidor(_DIST)
+
+    assert stats["grupos_scanned"] == 8 and stats["drifts"] == 3
+    assert stats["suggestions_updated"] == 1  # pending idéntica: sin escritura
+    sug = db.tables["telegram_binding_suggestions"]
+    assert stats["suggestions_created"] == len(sug) - 1 > 0
+    assert [t for t, _ in db.calls].count("telegram_binding_suggestions") == 2  # lectura pending + un insert en bloque
+    unlinked = {g["telegram_chat_id"] for g in db.tables["grupos"] if g["binding_status"] == "unlinked"}
+    assert {4, 5, 6} <= unlinked and 7 not in unlinked
+    # Por drift: 3 × (fetch + update + audit); el resto no depende de la cantidad de grupos.
+    assert len(db.calls) == 5 + 1 + 1 + 9
+
+
+def test_scan_pagina_con_orden_y_puntua_drift_desvinculado(db):
+    ws.scan_distribuidor(_DIST)
+
+    paginadas = [q for q in db.queries if q.op == "select" and q.lim == tbb._PAGE]
+    assert paginadas and [q.name for q in paginadas if not q.orden] == []
+    # Sugerencia de drift = scoring del camino grupo a grupo sobre el grupo ya desvinculado.
+    for s in db.tables["telegram_binding_suggestions"]:
+        if s.get("source") == "drift":
+            top = tgm.score_group_vendor_candidates(_DIST, s["telegram_chat_id"])[0]
+            assert (s["id_vendedor_v2"], s["score"]) == (top["id_vendedor"], top["score"])
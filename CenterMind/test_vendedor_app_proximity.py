@@ -57,6 +57,9 @@ def _make_sb_mock(rutas, pdvs):
         mock_table.eq.return_value = mock_table
         mock_table.in_.return_value = mock_table
         mock_table.range.return_value = mock_table
+        mock_table.order.return_value = mock_table  # paginación keyset (índice espacial)
+        mock_table.gt.return_value = mock_table
+        mock_table.limit.return_value = mock_table
         mock_table.is_.return_value = mock_table  # para .not_.is_(...)
         mock_table.execute.return_value = mock_result
 
@@ -69,6 +72,16 @@ def _make_sb_mock(rutas, pdvs):
     return sb
 
 
+@pytest.fixture(autouse=True)
+def _reset_pdv_index():
+    """El índice espacial se cachea por dist_id: cada test arma el suyo desde su mock."""
+    from core.pdv_spatial_index import invalidate_pdv_index
+
+    invalidate_pdv_index()
+    yield
+    invalidate_pdv_index()
+
+
 # ─── Tests ────────────────────────────────────────────────────────────────────
 
 
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Ingesta incremental ventas_enriched: line_hash, líneas sin cambios y modo de la tabla global."""
+from __future__ import annotations
+
+import copy
+import dataclasses
+
+import pytest
+
+from services import ventas_enriched_ingestion_service as svc
+
+def _line(i: int, **kw) -> dict:
+    row = {
+        "fecha_factura": f"2026-06-0{1 + i % 5}",
+        "numero_documento": f"A-{1000 + i}",
+        "id_cliente_erp": str(40 + i % 7),
+        "nombre_cliente": f"CLIENTE {i % 7}",
+        "cod_articulo": str(500 + i % 3),
+        "bultos_total": 1.0 + i,
+        "importe_final": 100.0 * (i + 1),
+        "anulado": False,
+    }
+    row.update(kw)
+    return row
+
+
+@pytest.fixture
+def fake(monkeypatch, fake_supabase):
+    import core.compras_fechas as cf
+    import core.job_queue as jq
+    import db
+    import services.snapshot_refresh_service as snap
+    from services.objetivos_watcher_service import objetivos_watcher
+
+    sb = fake_supabase()
+    monkeypatch.setattr(svc, "sb", sb)
+    monkeypatch.setattr(db, "sb", sb)
+    monkeypatch.setattr(cf, "_padron_nombres_por_erp", lambda d, erps: {})
+    calls = {"fechas": 0}
+
+    def _fechas(*a, **k):
+        calls["fechas"] += 1
+        return 0
+
+    monkeypatch.setattr(cf, "batch_update_fechas_compra_desde_ventas", _fechas)
+    monkeypatch.setattr(objetivos_watcher, "run_watcher", lambda d: None)
+    monkeypatch.setattr(snap, "mark_all_stale", lambda *a, **k: None)
+    monkeypatch.setattr(snap, "_warm_dist_sequential", lambda *a, **k: None)
+    monkeypatch.setenv("JOB_QUEUE", "1")
+    for tipo, jt in jq.job_types().items():
+        monkeypatch.setitem(jq._REGISTRY, tipo, dataclasses.replace(jt, debounce_sec=0.0))  # listos para drain()
+    jq.set_store(jq.SQLiteJobStore())
+    sb.fechas_calls = calls
+    yield sb
+    jq.set_store(None)
+
+
+def _run(monkeypatch, rows):
+    monkeypatch.setattr(svc, "parse_informe_ventas_enriched", lambda _b: copy.deepcopy(rows))
+    from core.job_queue import JobWorker
+
+    out = svc._ingest_enriched_core("aloma", 4, b"x")
+    worker = JobWorker()
+    worker.drain()
+    worker.stop()
+    return out
+
+
+def test_second_run_skips_unchanged_lines(fake, monkeypatch):
+    import core.job_queue as jq
+
+    snapshots = []
+    monkeypatch.setattr(jq, "enqueue_snapshots", lambda d, **k: snapshots.append(d))
+    rows = [_line(i) for i in range(30)]
+    first = _run(monkeypatch, rows)
+    assert first["upserted"] == 30 and first["lineas"]["nuevas"] == 30
+    assert fake.upserts == {"ventas_enriched_v2": 30, "ventas_enriched_v2_d4": 30}
+    assert all(r["line_hash"] for r in fake.tables["ventas_enriched_v2_d4"])
+
+    again = _run(monkeypatch, rows)
+    assert again["upserted"] == 0 and again["sin_cambios"] == 30
+    assert fake.upserts["ventas_enriched_v2_d4"] == 30
+    assert fake.fechas_calls["fechas"] == 1  # sin líneas escritas no se recalculan fechas de compra
+    assert snapshots == [4]  # ni se invalidan snapshots
+
+    rows[3] = _line(3, importe_final=999.0)
+    rows[7] = _line(7, anulado=True)
+    rows.append(_line(30))
+    third = _run(monkeypatch, rows)
+    assert third["upserted"] == 3
+    assert third["lineas"] == {"nuevas": 1, "cambiadas": 2, "anuladas": 1, "sin_cambios": 28}
+    stored = {r["numero_documento"]: r for r in fake.tables["ventas_enriched_v2_d4"]}
+    assert stored["A-1003"]["importe_final"] == 999.0 and stored["A-1007"]["anulado"] is True
+
+
+def test_legacy_rows_without_hash_are_rewritten_once(fake, monkeypatch):
+    rows = [_line(i) for i in range(5)]
+    _run(monkeypatch, rows)
+    for r in fake.tables["ventas_enriched_v2_d4"]:
+        r["line_hash"] = None
+    assert _run(monkeypatch, rows)["upserted"] == 5
+    assert _run(monkeypatch, rows)["upserted"] == 0
+
+
+@pytest.mark.parametrize("mode,global_writes", [("trigger", 0), ("off", 0), ("dual", 5)])
+def test_global_mode(fake, monkeypatch, mode, global_writes):
+    monkeypatch.setenv("VENTAS_ENRICHED_GLOBAL", mode)
+    out = _run(monkeypatch, [_line(i) for i in range(5)])
+    assert out["global_mode"] == mode
+    assert fake.upserts.get("ventas_enriched_v2", 0) == global_writes
+    assert fake.upserts["ventas_enriched_v2_d4"] == 5
+
+
+def test_incremental_off_rewrites_everything(fake, monkeypatch):
+    rows = [_line(i) for i in range(5)]
+    _run(monkeypatch, rows)
+    monkeypatch.setenv("VENTAS_ENRICHED_INCREMENTAL", "0")
+    assert _run(monkeypatch, rows)["upserted"] == 5
+
+
+def test_raw_json_provenance_outside_hash(fake, monkeypatch):
+    rows = [_line(i, id_empresa="3154", localidad="CTES") for i in range(4)]
+    _run(monkeypatch, rows)
+    stored = sorted(fake.tables["ventas_enriched_v2_d4"], key=lambda r: r["numero_documento"])
+    raw = stored[2]["raw_json"]
+    assert raw["_v"] == 2 and raw["_row"] == 3 and raw["id_empresa"] == "3154"
+    assert "importe_final" not in raw
+    # Mismas líneas en otro archivo (RPA re-sube la ventana): procedencia distinta, hash igual.
+    monkeypatch.setattr(svc, "parse_informe_ventas_enriched", lambda _b: copy.deepcopy(rows))
+    assert svc._ingest_enriched_core("aloma", 4, b"otro archivo")["upserted"] == 0
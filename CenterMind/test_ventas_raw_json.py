@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""raw_json compacto de ventas_enriched: columnas fuera, campos calientes siempre, ida y vuelta."""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, fields
+
+import pytest
+
+from core import ventas_raw_json as vr
+from services.ventas_enriched_parser import VentaEnrichedRow
+
+
+def _parsed(**kw) -> dict:
+    base = {}
+    for f in fields(VentaEnrichedRow):
+        t = str(f.type)
+        base[f.name] = 0.0 if t == "float" else False if t == "bool" else ""
+    base.update(
+        id_empresa="3154", nombre_empresa="Tabaco SA", codigo_vendedor="12", nombre_vendedor="PEREZ",
+        fecha_factura="2026-06-01", fecha_pedido="2026-05-31", numero_documento="A-1", id_cliente_erp="40",
+        nombre_cliente="KIOSCO", cod_articulo="500", descripcion_articulo="MARLBORO BOX 20",
+        localidad="CORRIENTES", bultos_excel=0.0, bultos_total=0.5, unidades_total=100.0,
+        um_total=10.0, importe_final=1234.5, importe_neto=1000.0, iva=210.0,
+    )
+    base.update(kw)
+    return asdict(VentaEnrichedRow(**base))
+
+
+def _db_row(parsed: dict, raw: dict) -> dict:
+    row = {k: parsed[k] for k in vr.PROMOTED_FIELDS}
+    row["raw_json"] = json.loads(json.dumps(raw))
+    return row
+
+
+def test_compact_drops_promoted_and_empty_keeps_hot():
+    p = _parsed()
+    raw = vr.compact_raw_json(p, compress=False)
+    assert raw["_v"] == 2
+    assert not set(raw) & vr.PROMOTED_FIELDS
+    assert raw["bultos_excel"] == 0.0 and raw["id_empresa"] == "3154"
+    assert raw["localidad"] == "CORRIENTES" and "domicilio" not in raw and "bonificacion" not in raw
+    assert len(json.dumps(raw)) < len(json.dumps(p)) / 2
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_expand_round_trip(compress):
+    if compress:
+        pytest.importorskip("zstandard")
+    p = _parsed()
+    raw = vr.stamp_provenance(vr.compact_raw_json(p, compress=compress), "abc123", 7)
+    assert raw["_src"] == "abc123" and raw["_row"] == 7
+    assert ("_z" in raw) is compress and raw["nombre_empresa"] == "Tabaco SA"
+    assert vr.expand_raw_json(_db_row(p, raw)) == p
+
+
+def test_legacy_raw_json_passthrough():
+    p = _parsed()
+    assert vr.expand_raw_json({"raw_json": p}) == p
+
+
+def test_readers_unchanged_on_compact_rows():
+    from core.ventas_empresa_isolation import extract_id_empresa, extract_nombre_empresa
+    from services.estadisticas_service import _bultos_linea_desglose
+
+    for kw in ({}, {"bultos_excel": 2.0}, {"bultos_con_cargo": 1.0, "bultos_sin_cargo": 0.5}):
+        p = _parsed(**kw)
+        legacy = {**{k: p[k] for k in vr.PROMOTED_FIELDS}, "raw_json": p}
+        compact = _db_row(p, vr.compact_raw_json(p, compress=True))
+        assert _bultos_linea_desglose(compact) == _bultos_linea_desglose(legacy)
+        assert extract_id_empresa(compact) == extract_id_empresa(legacy) == "3154"
+        assert extract_nombre_empresa(compact) == extract_nombre_empresa(legacy)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Watcher por lote: mismas escrituras que el camino fila a fila, con muchos menos round trips."""
+from __future__ import annotations
+
+import copy
+
+import pytest
+
+from services import objetivos_watcher_service as ws
+
+
+def _flush_tracking(db, params):
+    db.table("objetivos_tracking").upsert(
+        params["p_rows"], on_conflict="id_objetivo,id_referencia,tipo_evento"
+    ).execute()
+
+
+def _flush_items(db, params):
+    for it in params["p_items"]:
+        for r in db.tables["objetivo_items"]:
+            if (r["id_objetivo"], r["id_cliente_pdv"]) != (it["id_objetivo"], it["id_cliente_pdv"]):
+                continue
+            if r.get("estado_item") in ws._TERMINALES and it["estado_item"] not in ws._TERMINALES:
+                continue
+            r["estado_item"] = it["estado_item"]
+
+
+_RPCS = {"watcher_flush_tracking": _flush_tracking, "watcher_flush_items": _flush_items}
+
+
+def _tablas(n_obj=4, n_items=6):
+    objetivos, items, clientes, tracking = [], [], [], []
+    for o in range(n_obj):
+        oid = f"o{o}"
+        objetivos.append({
+            "id": oid, "tipo": "ruteo_alteo", "id_vendedor": 10, "id_distribuidor": 4, "cumplido": False,
+            "created_at": "2026-06-01T09:00:00+00:00", "lanzado_at": "2026-06-01T09:00:00+00:00",
+            "valor_objetivo": n_items, "valor_actual": 0,
+        })
+        for i in range(n_items):
+            pdv = o * 100 + i + 1
+            estado = "falla" if i == 0 else "pendiente"
+            items.append({"id": len(items) + 1, "id_objetivo": oid, "id_cliente_pdv": pdv,
+                          "nombre_pdv": f"PDV {pdv}", "estado_item": estado})
+            # Altas posteriores al objetivo en los ítems pares; el 2 ya estaba trackeado.
+            alta = "2026-06-05" if i % 2 == 0 else "2026-05-01"
+            clientes.append({"id_cliente": pdv, "id_cliente_erp": str(pdv), "nombre_fantasia": f"PDV {pdv}",
+                             "fecha_alta": alta, "id_distribuidor": 4})
+        tracking.append({"id_objetivo": oid, "id_referencia": str(o * 100 + 3), "tipo_evento": "alteo",
+                         "metadata": {}})
+    return {"objetivos": objetivos, "objetivo_items": items, "clientes_pdv_v2_4": clientes,
+            "objetivos_tracking": tracking}
+
+
+def _correr(monkeypatch, fake_supabase, batch, tablas, con_rpc=True):
+    db = fake_supabase(copy.deepcopy(tablas), rpcs=_RPCS if con_rpc else None)
+    monkeypatch.setattr(ws, "sb", db)
+    monkeypatch.setattr(ws, "tenant_table_name", lambda base, d: f"{base}_{d}")
+    monkeypatch.setenv("WATCHER_BATCH", "1" if batch else "0")
+    out = ws.ObjetivosWatcherService().run_watcher(4)
+    return db, out
+
+
+def _estado(db):
+    items = sorted((r["id_objetivo"], r["id_cliente_pdv"], r["estado_item"]) for r in db.tables["objetivo_items"])
+    tracking = sorted((r["id_objetivo"], r["id_referencia"], r["tipo_evento"]) for r in db.tables["objetivos_tracking"])
+    cabeceras = sorted(
+        (o["id"], o["valor_actual"], o.get("cumplido"), (o.get("desglose_cache") or {}).get("pendientes_count"))
+        for o in db.tables["objetivos"]
+    )
+    return items, tracking, cabeceras
+
+
+@pytest.mark.parametrize("con_rpc", [True, False])
+def test_batch_matches_row_by_row(monkeypatch, fake_supabase, con_rpc):
+    tablas = _tablas()
+    legacy, out_l = _correr(monkeypatch, fake_supabase, False, tablas)
+    lote, out_b = _correr(monkeypatch, fake_supabase, True, tablas, con_rpc=con_rpc)
+
+    assert _estado(lote) == _estado(legacy)
+    assert out_b["eventos_nuevos"] == out_l["eventos_nuevos"] == 4 * 2  # ítems 0 y 4 (el 2 ya trackeado)
+    items, _, cabeceras = _estado(lote)
+    assert ("o0", 1, "cumplido") in items and ("o0", 3, "pendiente") in items
+    assert all(c[1] == 2 for c in cabeceras)
+    assert out_b["escrituras"]["tracking"] == 8 and out_b["escrituras"]["items"] == 8
+    if con_rpc:
+        assert [fn for fn, _ in lote.rpc_calls] == ["watcher_flush_tracking", "watcher_flush_items"]
+    assert len(lote.calls) < len(legacy.calls) / 2
+
+
+def test_terminal_guard_in_lote():
+    lote = ws._LoteWatcher(4)
+    lote.items = {"o1": [{"id_cliente_pdv": 1, "estado_item": "cumplido"}, {"id_cliente_pdv": 2, "estado_item": None}]}
+    lote._con_items.add("o1")
+    lote.transicion_item("o1", 1, "pendiente")
+    lote.transicion_item("o1", 2, "cumplido")
+    lote.transicion_item("o1", 9, "cumplido")  # PDV sin ítem: no-op
+    assert [r["estado_item"] for r in lote.items["o1"]] == ["cumplido", "cumplido"]
+    assert lote._transiciones == {("o1", 2): "cumplido"}
@@ -9,6 +9,10 @@ Funciones:
     subir_cuentas(tenant_id, filename, file_bytes)       -> bool
     subir_sigo(empresa_id, sucursal, tipo, filename, file_bytes) -> bool
     subir_rendimiento_calle_analytics(tenant_id, payload) -> bool
+    subir_padron / subir_ventas_enriched aceptan `delta` (lib/hash_guard.Delta): se sube
+    sólo el delta de filas y, si el backend no lo toma, el archivo completo como antes.
+    subir_padron_tabla(tabla, id_distribuidor, clave) -> bool  (padrón v2 desde JSON de red)
+    registrar_telemetria_motor(motor, dist_id, nav) -> bool  (pasos/esperas → motor_runs; RPA_TELEMETRIA=0 apaga)
 
 Configuración: ver lib/shelfy_config.py
   (SHELFY_API_URL, API_URL, claves de Supabase+Vault, default prod https://api.shelfycenter.com)
@@ -16,10 +20,10 @@ Configuración: ver lib/shelfy_config.py
 
 import asyncio
 import io
+import os
 from pathlib import Path
 
 import httpx
-import pandas as pd
 from lib.logger import get_logger
 from lib.shelfy_config import get_shelfy_api_key, get_shelfy_base_url
 
@@ -206,18 +210,63 @@ def subir_cuentas(tenant_id: str, filename: str, file_bytes: bytes) -> bool:
         return False
 
 
-async def subir_padron(archivo_path, id_distribuidor: int) -> bool:
+async def _subir_delta(url: str, delta, *, label: str, params: dict | None = None, data: dict | None = None) -> bool:
+    """
+    POST del delta de filas (gzip JSON, ?modo=delta) al mismo endpoint de ingesta.
+    409 = el backend no tiene la base del delta ⇒ reintenta una vez como tabla completa.
+    False ⇒ el caller sube el archivo completo (backend sin soporte de delta, error, etc.).
+    """
+    timeout = httpx.Timeout(connect=20.0, read=120.0, write=120.0, pool=20.0)
+    envio = delta
+    for _ in range(2):
+        body = envio.payload()
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(
+                    url,
+                    headers=_headers(),
+                    params={**(params or {}), "modo": "delta"},
+                    data=data,
+                    files={"file": (f"{delta.clave}.delta.json.gz", body, "application/gzip")},
+                )
+        except Exception as e:
+            logger.warning(f"  ⚠️ {label}: delta no enviado ({type(e).__name__}: {e}); subo archivo completo")
+            return False
+        if resp.status_code in (200, 201, 202):
+            logger.info(
+                f"  ✅ {label}: delta aceptado — {envio.resumen()}, {len(body) / 1024:.0f} KB "
+                f"(HTTP {resp.status_code})"
+            )
+            return True
+        if resp.status_code == 409 and not envio.completo:
+            logger.info(f"  ℹ️ {label}: backend sin la base del delta; reenvío tabla completa")
+            envio = delta.como_completo()
+            continue
+        logger.warning(
+            f"  ⚠️ {label}: delta rechazado HTTP {resp.status_code}: {(resp.text or '')[:200]}; "
+            "subo archivo completo"
+        )
+        return False
+    return False
+
+
+async def subir_padron(archivo_path, id_distribuidor: int, delta=None) -> bool:
     """
     Sube un Excel de Padrón de Clientes a POST /api/v1/sync/erp-padrón.
 
     Args:
         archivo_path   : ruta Path del archivo Excel descargado desde Consolido
         id_distribuidor: id_distribuidor en Shelfy (mapeo desde tenant_id)
+        delta          : hash_guard.Delta opcional; si el backend lo acepta no se sube el Excel
 
     Returns:
         True si la API respondió 200/201, False en cualquier otro caso.
     """
     url = f"{_url()}/api/v1/sync/erp-padrón"
+    if delta is not None and await _subir_delta(
+        url, delta, label="Padrón", params={"id_distribuidor": str(id_distribuidor)}
+    ):
+        return True
     try:
         archivo_path = Path(archivo_path)
 
@@ -309,6 +358,34 @@ async def subir_padron(archivo_path, id_distribuidor: int) -> bool:
         return False
 
 
+async def subir_padron_tabla(tabla, id_distribuidor: int, clave: str, delta=None) -> bool:
+    """
+    Padrón capturado por red (motores/consolido_padron_v2): sube la hash_guard.Tabla sin
+    pasar por Excel — el delta o, sin delta, la tabla completa (gzip JSON, modo=delta sin base).
+    Si el backend no lo toma, arma un XLSX compacto (write-only) y sigue por subir_padron.
+    """
+    from lib.hash_guard import Delta
+
+    url = f"{_url()}/api/v1/sync/erp-padrón"
+    envio = delta if delta is not None else Delta(clave, tabla, "", list(tabla.filas), [])
+    if await _subir_delta(url, envio, label="Padrón", params={"id_distribuidor": str(id_distribuidor)}):
+        return True
+
+    import tempfile
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(tabla.header)
+    for fila in tabla.filas:
+        ws.append(fila)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"{clave}_red.xlsx"
+        await asyncio.to_thread(wb.save, str(path))
+        return await subir_padron(path, id_distribuidor)
+
+
 async def registrar_ventas_sin_cambios(
     id_distribuidor: int,
     source: str = "rpa_hash_guard",
@@ -398,6 +475,47 @@ async def notificar_error_motor(motor: str, dist_id: int, error_msg: str) -> boo
         return False
 
 
+def telemetria_habilitada() -> bool:
+    raw = (os.environ.get("RPA_TELEMETRIA") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+async def registrar_telemetria_motor(
+    motor: str,
+    dist_id: int | None,
+    nav: dict | None,
+    *,
+    tenant: str | None = None,
+    error_msg: str | None = None,
+) -> bool:
+    """
+    Tiempos por paso, esperas (vía que resolvió) y red del navegador (NavMetricas.resumen())
+    → motor_runs con motor=rpa_<motor>. No pisa las corridas de ingesta ni el sync-status.
+    """
+    if not nav or not telemetria_habilitada():
+        return False
+    url = f"{_url()}/api/v1/ops/motor-telemetria"
+    payload = {
+        "motor": motor,
+        "dist_id": dist_id,
+        "tenant": tenant,
+        "estado": "error" if error_msg else "ok",
+        "error_msg": (error_msg or "")[:500] or None,
+        "telemetria": nav,
+    }
+    try:
+        timeout = httpx.Timeout(connect=10.0, read=15.0, write=10.0, pool=10.0)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.post(url, headers=_headers(), json=payload)
+        if resp.status_code in (200, 201):
+            return True
+        logger.warning(f"  ⚠️ motor-telemetria HTTP {resp.status_code}: {(resp.text or '')[:200]}")
+        return False
+    except Exception as e:
+        logger.warning(f"  ⚠️ No se pudo registrar telemetría motor={motor} dist={dist_id}: {e}")
+        return False
+
+
 async def enviar_digest_motor(
     motor: str,
     resumen: dict | None = None,
@@ -434,12 +552,16 @@ async def enviar_digest_motor(
         return False
 
 
-async def subir_ventas_enriched(archivo_path, tenant_id: str) -> bool:
+async def subir_ventas_enriched(archivo_path, tenant_id: str, delta=None) -> bool:
     """
     Sube un Excel de Informe de Ventas (Reporteador Genérico) a
-    POST /api/motor/ventas-enriched.
+    POST /api/motor/ventas-enriched. Con `delta` (hash_guard.Delta) intenta primero sólo las filas.
     """
     url = f"{_url()}/api/motor/ventas-enriched"
+    if delta is not None and await _subir_delta(
+        url, delta, label="Ventas enriched", data={"tenant_id": tenant_id}
+    ):
+        return True
     try:
         archivo_path = Path(archivo_path)
         with open(archivo_path, "rb") as f:
@@ -528,22 +650,67 @@ async def subir_ventas_enriched(archivo_path, tenant_id: str) -> bool:
         return False
 
 
+_EXCEL_ERROR_CODES = frozenset(("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"))
+
+
+def _celda_str(value) -> str | None:
+    """Celda openpyxl → texto como read_excel(dtype=str); vacía → None (no se escribe)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value == "" or value in _EXCEL_ERROR_CODES else value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _header_names(raw: list) -> list[str]:
+    """Header estilo pandas: "Unnamed: i" para celdas vacías y duplicados "col.1"."""
+    names: list[str] = []
+    seen: dict[str, int] = {}
+    for i, v in enumerate(raw):
+        name = _celda_str(v) or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
 def _compactar_excel_para_upload(file_bytes: bytes) -> bytes | None:
     """
     Reescribe el Excel sin estilos para bajar peso, preservando contenido.
-    Se fuerza dtype=str para evitar pérdidas de precisión en IDs numéricos largos.
+    Todo como texto para evitar pérdidas de precisión en IDs numéricos largos.
+    Streaming fila a fila (openpyxl read-only → write-only): el padrón completo
+    nunca se arma como DataFrame.
     """
+    from openpyxl import Workbook, load_workbook
+
+    src = None
     try:
-        df = pd.read_excel(
-            io.BytesIO(file_bytes),
-            dtype=str,
-            engine="openpyxl",
-            keep_default_na=False,
-        )
+        src = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+        ws_in = src.worksheets[0]
+        dst = Workbook(write_only=True)
+        ws_out = dst.create_sheet()
+        header = True
+        for values in ws_in.iter_rows(values_only=True):
+            row = [_celda_str(v) for v in values]
+            while row and row[-1] is None:
+                row.pop()
+            if header:
+                ws_out.append(_header_names(row))
+                header = False
+            elif row:
+                ws_out.append(row)
 
         out = io.BytesIO()
-        df.to_excel(out, index=False, engine="openpyxl")
+        dst.save(out)
         return out.getvalue()
     except Exception as e:
         logger.warning(f"  ⚠️ Falló compactación de Excel: {type(e).__name__}: {e}")
         return None
+    finally:
+        if src is not None:
+            src.close()
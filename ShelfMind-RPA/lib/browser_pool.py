@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+lib/browser_pool.py
+===================
+Ejecución multi-tenant en paralelo: un Chromium compartido, contextos acotados por pool
+y por portal, y una cola de prioridad de jobs sobre un único event loop de larga vida.
+
+- navegador(portal): toma un slot del límite del portal y uno del pool global.
+  En el loop del scheduler entrega el Chromium compartido (cada motor abre su propio
+  new_context ⇒ cookies/storage aislados por tenant); fuera del scheduler (runner.py)
+  lanza un Chromium propio como antes.
+- Límites: RPA_CONTEXT_POOL (default 3) contextos en total; por portal
+  RPA_PORTAL_LIMIT_<PORTAL> — Consolido 1 (credencial compartida), CHESS 3, SIGO 1.
+- LoopRpa: hilo con un event loop para todo el día. El scheduler encola fábricas de
+  corrutinas con prioridad (menor = antes) y RPA_WORKERS workers las consumen, en lugar
+  de un asyncio.run() (y un Chromium nuevo) por disparo.
+
+RPA_PARALLEL=0 vuelve a un worker y un contexto a la vez.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import itertools
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
+
+from lib.logger import get_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser
+
+logger = get_logger("BROWSER_POOL")
+
+CHROME_MAC_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+_PORTAL_LIMITS = {"consolido": 1, "chess": 3, "sigo": 1}
+
+_STATS = {"jobs": 0, "jobs_error": 0, "slots": 0, "esperas": 0, "lanzamientos": 0}
+_stats_lock = threading.Lock()
+
+
+def _inc(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _STATS[key] += n
+
+
+def pool_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_STATS)
+
+
+def paralelo_habilitado() -> bool:
+    raw = (os.environ.get("RPA_PARALLEL") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def pool_size() -> int:
+    if not paralelo_habilitado():
+        return 1
+    return max(1, int(os.environ.get("RPA_CONTEXT_POOL", "3")))
+
+
+def limite_portal(portal: str) -> int:
+    """Contextos simultáneos contra un portal (nunca más que el pool)."""
+    if not paralelo_habilitado():
+        return 1
+    raw = (os.environ.get(f"RPA_PORTAL_LIMIT_{portal.upper()}") or "").strip()
+    n = int(raw) if raw else _PORTAL_LIMITS.get(portal, 1)
+    return max(1, min(n, pool_size()))
+
+
+def launch_kwargs(headless: bool | None = None) -> dict[str, Any]:
+    if headless is None:
+        headless = os.environ.get("RPA_HEADLESS", "true").lower() != "false"
+    kwargs: dict[str, Any] = {
+        "headless": headless,
+        "args": ["--no-sandbox", "--disable-dev-shm-usage"],
+    }
+    # arm64 con binario bundled x86_64: usar Chrome local si existe.
+    if os.path.exists(CHROME_MAC_PATH):
+        kwargs["executable_path"] = CHROME_MAC_PATH
+    return kwargs
+
+
+# ─────────────────────────────────────────────────────────────────
+# Browser compartido + slots
+# ─────────────────────────────────────────────────────────────────
+
+
+class BrowserCompartido:
+    """Un Chromium por loop; se relanza si se cayó (crash / OOM)."""
+
+    def __init__(self) -> None:
+        self._pw = None
+        self._browser: Browser | None = None
+        self._lock = asyncio.Lock()
+
+    async def obtener(self) -> "Browser":
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._pw is None:
+                from playwright.async_api import async_playwright
+
+                self._pw = await async_playwright().start()
+            if self._browser is not None:
+                logger.warning("Chromium compartido desconectado — relanzando")
+            self._browser = await self._pw.chromium.launch(**launch_kwargs())
+            _inc("lanzamientos")
+            return self._browser
+
+    async def cerrar(self) -> None:
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    logger.warning("Cerrando Chromium compartido: %s", e)
+                self._browser = None
+            if self._pw is not None:
+                await self._pw.stop()
+                self._pw = None
+
+
+class _EstadoLoop:
+    """Semáforos atados al loop (asyncio.run de runner.py crea uno por corrida)."""
+
+    def __init__(self) -> None:
+        self.pool = asyncio.Semaphore(pool_size())
+        self.portales: dict[str, asyncio.Semaphore] = {}
+        self.compartido: BrowserCompartido | None = None
+
+    def portal(self, portal: str) -> asyncio.Semaphore:
+        if portal not in self.portales:
+            self.portales[portal] = asyncio.Semaphore(limite_portal(portal))
+        return self.portales[portal]
+
+
+_estados: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _EstadoLoop]" = weakref.WeakKeyDictionary()
+
+
+def _estado() -> _EstadoLoop:
+    loop = asyncio.get_running_loop()
+    estado = _estados.get(loop)
+    if estado is None:
+        estado = _estados[loop] = _EstadoLoop()
+    return estado
+
+
+@asynccontextmanager
+async def navegador(portal: str, *, headless: bool | None = None) -> AsyncIterator["Browser"]:
+    """
+    Browser para un tenant del portal dado. El motor abre (y cierra) su new_context.
+    Primero el límite del portal y después el pool: quien espera Consolido no ocupa slot.
+    headless solo aplica al Chromium propio (debug por CLI); el compartido usa RPA_HEADLESS.
+    """
+    estado = _estado()
+    t0 = time.monotonic()
+    async with estado.portal(portal), estado.pool:
+        espera = time.monotonic() - t0
+        _inc("slots")
+        if espera >= 1:
+            _inc("esperas")
+            logger.info("Slot %s obtenido tras %.0fs de espera", portal, espera)
+        if estado.compartido is not None:
+            yield await estado.compartido.obtener()
+            return
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as pw:
+            browser = await pw.chromium.launch(**launch_kwargs(headless))
+            _inc("lanzamientos")
+            try:
+                yield browser
+            finally:
+                await browser.close()
+
+
+# ─────────────────────────────────────────────────────────────────
+# Loop de larga vida + cola de prioridad
+# ─────────────────────────────────────────────────────────────────
+
+
+@dataclass(order=True)
+class _Job:
+    prioridad: int
+    seq: int
+    nombre: str = field(compare=False)
+    fabrica: Callable[[], Awaitable[Any]] = field(compare=False)
+    futuro: concurrent.futures.Future = field(compare=False)
+
+
+class LoopRpa:
+    """
+    Event loop en un hilo propio para todos los motores del día.
+    submit() es thread-safe (jobs de APScheduler) y devuelve un Future de concurrent.
+    """
+
+    def __init__(self, workers: int | None = None, *, compartir_browser: bool = True) -> None:
+        if workers is None:
+            workers = int(os.environ.get("RPA_WORKERS", "8")) if paralelo_habilitado() else 1
+        self.workers = max(1, workers)
+        self.compartir_browser = compartir_browser
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._cola: asyncio.PriorityQueue[_Job] | None = None
+        self._tareas: list[asyncio.Task] = []
+        self._thread: threading.Thread | None = None
+        self._listo = threading.Event()
+
+    def start(self) -> "LoopRpa":
+        self._thread = threading.Thread(target=self._main, name="rpa-loop", daemon=True)
+        self._thread.start()
+        self._listo.wait()
+        logger.info(
+            "Loop RPA activo — workers=%s pool=%s límites=%s",
+            self.workers,
+            pool_size(),
+            {p: limite_portal(p) for p in _PORTAL_LIMITS},
+        )
+        return self
+
+    def _main(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        loop.run_until_complete(self._arrancar())
+        self._listo.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(self._apagar())
+            loop.close()
+
+    async def _arrancar(self) -> None:
+        self._cola = asyncio.PriorityQueue()
+        if self.compartir_browser:
+            _estado().compartido = BrowserCompartido()
+        self._tareas = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def _apagar(self) -> None:
+        for t in self._tareas:
+            t.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        compartido = _estado().compartido
+        if compartido is not None:
+            await compartido.cerrar()
+
+    async def _worker(self, idx: int) -> None:
+        assert self._cola is not None
+        while True:
+            job = await self._cola.get()
+            try:
+                if not job.futuro.set_running_or_notify_cancel():
+                    continue
+                t0 = time.monotonic()
+                _inc("jobs")
+                try:
+                    job.futuro.set_result(await job.fabrica())
+                except asyncio.CancelledError:
+                    job.futuro.set_exception(RuntimeError("loop RPA detenido"))
+                    raise
+                except Exception as e:
+                    _inc("jobs_error")
+                    job.futuro.set_exception(e)
+                logger.info("Job %s terminado en %.0fs (worker %s)", job.nombre, time.monotonic() - t0, idx)
+            finally:
+                self._cola.task_done()
+
+    def submit(
+        self,
+        fabrica: Callable[[], Awaitable[Any]],
+        *,
+        prioridad: int = 50,
+        nombre: str = "job",
+    ) -> concurrent.futures.Future:
+        if self._loop is None or self._cola is None:
+            raise RuntimeError("LoopRpa no iniciado")
+        futuro: concurrent.futures.Future = concurrent.futures.Future()
+        job = _Job(prioridad, next(self._seq), nombre, fabrica, futuro)
+        self._loop.call_soon_threadsafe(self._cola.put_nowait, job)
+        return futuro
+
+    def ejecutar(self, fabrica: Callable[[], Awaitable[Any]], *, prioridad: int = 50, nombre: str = "job") -> Any:
+        """submit() + esperar el resultado (bloquea el hilo llamador, no el loop)."""
+        return self.submit(fabrica, prioridad=prioridad, nombre=nombre).result()
+
+    def stop(self, timeout: float = 60) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
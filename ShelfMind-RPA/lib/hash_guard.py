@@ -1,26 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+lib/hash_guard.py
+=================
+Hash Guard: detección de cambios por fila en los archivos que bajan los motores.
+
+- El Excel se lee como tabla canónica (mismos textos que api_client._compactar_excel_para_upload)
+  y se hashea fila por fila. Huella del archivo = header + multiconjunto de hashes de fila:
+  no cambia con el timestamp de exportación ni otros metadatos del XLSX, ni con el orden.
+- Store SQLite local (RPA_DATA_DIR/.hash_guard.sqlite3, WAL): huella + hashes de fila por
+  clave. Cada guardado es una transacción (dos motores en paralelo no se pisan).
+- calcular_delta(): filas agregadas + hashes de filas quitadas contra lo último subido.
+  api_client sube eso (gzip JSON) en lugar del archivo; el backend reconstruye la tabla
+  con su copia base (CenterMind/services/rpa_delta_service.py, mismo algoritmo de hash).
+- Contenido no tabular (.xls OLE, PDF, JSON) ⇒ huella de los bytes, sin delta.
+
+RPA_UPLOAD_DELTA=0 vuelve a subir siempre el archivo completo.
+"""
+from __future__ import annotations
+
+import gzip
 import hashlib
+import io
 import json
 import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
 
 # Directorio de datos del RPA: raíz del paquete ShelfMind-RPA/ o RPA_DATA_DIR en Docker
 _RPA_ROOT = Path(__file__).resolve().parent.parent
 _DATA = Path(os.environ.get("RPA_DATA_DIR", str(_RPA_ROOT / "downloads")))
-HASHES_FILE = _DATA / ".hashes.json"
+STORE_FILE = _DATA / ".hash_guard.sqlite3"
+
+DELTA_VERSION = 1
+# Delta con más cambios que esta fracción de filas ⇒ se manda la tabla completa.
+DELTA_MAX_RATIO = float(os.environ.get("RPA_DELTA_MAX_RATIO", "0.5"))
+
+_lock = threading.Lock()
+_tabla_cache: "OrderedDict[str, Tabla | None]" = OrderedDict()
+_TABLA_CACHE_MAX = 4
+
+
+def delta_habilitado() -> bool:
+    raw = (os.environ.get("RPA_UPLOAD_DELTA") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+# ─────────────────────────────────────────────────────────────────
+# Tabla canónica
+# ─────────────────────────────────────────────────────────────────
+
+
+def hash_fila(fila: Any) -> str:
+    """Hash de una fila (lista de textos/None o dict). Igual en CenterMind (rpa_delta_service)."""
+    raw = json.dumps(fila, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
 
 
-def _cargar_hashes() -> dict:
-    if not HASHES_FILE.exists():
-        return {}
+def huella_tabla(header: list[str], hashes: list[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+    for rh in sorted(hashes):
+        h.update(b"\n" + rh.encode("ascii"))
+    return "t:" + h.hexdigest()
+
+
+@dataclass
+class Tabla:
+    """formato "xlsx": filas = listas de textos (None = vacía); "json": filas = dicts."""
+
+    header: list[str]
+    filas: list[Any]
+    formato: str = "xlsx"
+    hashes: list[str] = field(init=False)
+    huella: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.hashes = [hash_fila(f) for f in self.filas]
+        self.huella = huella_tabla(self.header, self.hashes)
+
+
+def tabla_desde_xlsx(file_bytes: bytes) -> Tabla | None:
+    """Primera hoja como Tabla (openpyxl read-only). None si no es XLSX."""
+    from openpyxl import load_workbook
+
+    from lib.api_client import _celda_str, _header_names
+
     try:
-        return json.loads(HASHES_FILE.read_text())
+        wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
     except Exception:
-        return {}
+        return None
+    try:
+        header: list[str] | None = None
+        filas: list[list[str | None]] = []
+        for values in wb.worksheets[0].iter_rows(values_only=True):
+            row = [_celda_str(v) for v in values]
+            while row and row[-1] is None:
+                row.pop()
+            if header is None:
+                header = _header_names(row)
+            elif row:
+                filas.append(row)
+        return Tabla(header or [], filas)
+    except Exception:
+        return None
+    finally:
+        wb.close()
 
 
-def _guardar_hashes(data: dict) -> None:
-    HASHES_FILE.parent.mkdir(parents=True, exist_ok=True)
-    HASHES_FILE.write_text(json.dumps(data, indent=2))
+def tabla_desde_filas(filas: list[dict[str, Any]]) -> Tabla:
+    """Filas JSON (p. ej. detalle_cuentas ya parseado)."""
+    return Tabla([], list(filas), formato="json")
 
 
 def _coerce_to_bytes(content: bytes | str) -> bytes:
@@ -32,14 +126,167 @@ def _coerce_to_bytes(content: bytes | str) -> bytes:
     return content.encode("utf-8")
 
 
-def es_duplicado(clave: str, content: bytes | str) -> bool:
-    nuevo_hash = hashlib.md5(_coerce_to_bytes(content)).hexdigest()
-    hm = _cargar_hashes()
-    return hm.get(clave) == nuevo_hash
+def _tabla(content: bytes | str | Tabla) -> tuple[Tabla | None, str]:
+    """(tabla o None, huella). Cachea por hash de bytes: es_duplicado/delta/guardar leen una vez."""
+    if isinstance(content, Tabla):
+        return content, content.huella
+    data = _coerce_to_bytes(content)
+    key = hashlib.blake2b(data, digest_size=16).hexdigest()
+    with _lock:
+        if key in _tabla_cache:
+            _tabla_cache.move_to_end(key)
+            tabla = _tabla_cache[key]
+            return tabla, tabla.huella if tabla else "b:" + key
+    tabla = tabla_desde_xlsx(data) if data[:2] == b"PK" else None
+    with _lock:
+        _tabla_cache[key] = tabla
+        while len(_tabla_cache) > _TABLA_CACHE_MAX:
+            _tabla_cache.popitem(last=False)
+    return tabla, tabla.huella if tabla else "b:" + key
+
 
+# ─────────────────────────────────────────────────────────────────
+# Store SQLite
+# ─────────────────────────────────────────────────────────────────
+
+
+def _connect() -> sqlite3.Connection:
+    STORE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(STORE_FILE, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS archivos (
+            clave       TEXT PRIMARY KEY,
+            huella      TEXT NOT NULL,
+            header      TEXT,
+            filas       INTEGER NOT NULL DEFAULT 0,
+            actualizado TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS filas (
+            clave    TEXT NOT NULL,
+            hash     TEXT NOT NULL,
+            n        INTEGER NOT NULL,
+            PRIMARY KEY (clave, hash)
+        ) WITHOUT ROWID;
+        """
+    )
+    return conn
+
+
+def _huella_guardada(clave: str) -> str | None:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT huella FROM archivos WHERE clave = ?", (clave,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def es_duplicado(clave: str, content: bytes | str | Tabla) -> bool:
+    _, huella = _tabla(content)
+    return _huella_guardada(clave) == huella
+
+
+def guardar_hash(clave: str, content: bytes | str | Tabla) -> None:
+    """Registra lo subido (huella + hashes de fila) en una transacción."""
+    tabla, huella = _tabla(content)
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM filas WHERE clave = ?", (clave,))
+            if tabla is not None:
+                conn.executemany(
+                    "INSERT INTO filas (clave, hash, n) VALUES (?, ?, ?)",
+                    [(clave, h, n) for h, n in Counter(tabla.hashes).items()],
+                )
+            conn.execute(
+                "INSERT INTO archivos (clave, huella, header, filas, actualizado) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET huella = excluded.huella, header = excluded.header, "
+                "filas = excluded.filas, actualizado = excluded.actualizado",
+                (
+                    clave,
+                    huella,
+                    json.dumps(tabla.header) if tabla is not None else None,
+                    len(tabla.filas) if tabla is not None else 0,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+    finally:
+        conn.close()
+
+
+# ─────────────────────────────────────────────────────────────────
+# Delta
+# ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Delta:
+    clave: str
+    tabla: Tabla
+    base: str  # huella sobre la que aplica ("" = tabla completa)
+    agregadas: list[Any]
+    quitadas: list[str]
+
+    @property
+    def completo(self) -> bool:
+        return not self.base
+
+    def como_completo(self) -> "Delta":
+        """Misma tabla sin base (el backend no tiene la base o no coincide)."""
+        return Delta(self.clave, self.tabla, "", list(self.tabla.filas), [])
+
+    def resumen(self) -> str:
+        if self.completo:
+            return f"tabla completa ({len(self.tabla.filas)} filas)"
+        return f"+{len(self.agregadas)} / -{len(self.quitadas)} de {len(self.tabla.filas)} filas"
+
+    def body(self) -> dict[str, Any]:
+        return {
+            "v": DELTA_VERSION,
+            "clave": self.clave,
+            "formato": self.tabla.formato,
+            "base": self.base,
+            "huella": self.tabla.huella,
+            "header": self.tabla.header,
+            "agregadas": self.agregadas,
+            "quitadas": self.quitadas,
+            "total": len(self.tabla.filas),
+        }
+
+    def payload(self) -> bytes:
+        """Body gzip JSON para multipart (padrón / ventas)."""
+        raw = json.dumps(self.body(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return gzip.compress(raw, compresslevel=6)
+
+
+def calcular_delta(clave: str, content: bytes | str | Tabla) -> Delta | None:
+    """
+    Delta contra lo último guardado para `clave`. None si el contenido no es tabular.
+    Sin base (primera vez, header distinto) o con demasiados cambios ⇒ Delta completo.
+    """
+    tabla, _ = _tabla(content)
+    if tabla is None:
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT huella, header FROM archivos WHERE clave = ?", (clave,)).fetchone()
+        if not row or row[1] is None or json.loads(row[1]) != tabla.header:
+            return Delta(clave, tabla, "", list(tabla.filas), [])
+        previas = Counter(dict(conn.execute("SELECT hash, n FROM filas WHERE clave = ?", (clave,)).fetchall()))
+    finally:
+        conn.close()
 
-def guardar_hash(clave: str, content: bytes | str) -> None:
-    nuevo_hash = hashlib.md5(_coerce_to_bytes(content)).hexdigest()
-    hm = _cargar_hashes()
-    hm[clave] = nuevo_hash
-    _guardar_hashes(hm)
+    restantes = Counter(previas)
+    agregadas: list[Any] = []
+    for fila, h in zip(tabla.filas, tabla.hashes):
+        if restantes[h] > 0:
+            restantes[h] -= 1
+        else:
+            agregadas.append(fila)
+    quitadas = list(restantes.elements())
+    if len(agregadas) + len(quitadas) > DELTA_MAX_RATIO * max(len(tabla.filas), 1):
+        return Delta(clave, tabla, "", list(tabla.filas), [])
+    return Delta(clave, tabla, row[0], agregadas, quitadas)
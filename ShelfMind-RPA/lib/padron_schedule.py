@@ -4,12 +4,13 @@ Orden de corrida, lock exclusivo Consolido y auditoría de motor_runs por tenant
 """
 from __future__ import annotations
 
+import asyncio
 import fcntl
 import os
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from lib.logger import get_logger
 
@@ -43,6 +44,21 @@ def _padron_lock_timeout_sec() -> float:
     return max(30.0, float(os.environ.get("PADRON_LOCK_WAIT_SEC", "900")))
 
 
+def _flock_nb(lock_file) -> bool:
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _lock_timeout_error(wait_cap: float) -> RuntimeError:
+    return RuntimeError(
+        f"Timeout esperando lock padrón Consolido ({wait_cap:.0f}s). "
+        "Otro motor (padrón o informe ventas) sigue en Consolido."
+    )
+
+
 @contextmanager
 def padron_consolido_lock(*, timeout_sec: float | None = None) -> Iterator[None]:
     """
@@ -57,18 +73,36 @@ def padron_consolido_lock(*, timeout_sec: float | None = None) -> Iterator[None]
     try:
         logger.info("Esperando lock padrón Consolido (máx %.0fs)…", wait_cap)
         deadline = time.monotonic() + wait_cap
-        while True:
-            try:
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                logger.info("Lock padrón Consolido adquirido")
-                break
-            except BlockingIOError:
-                if time.monotonic() >= deadline:
-                    raise RuntimeError(
-                        f"Timeout esperando lock padrón Consolido ({wait_cap:.0f}s). "
-                        "Otro motor (padrón o informe ventas) sigue en Consolido."
-                    )
-                time.sleep(2)
+        while not _flock_nb(lock_file):
+            if time.monotonic() >= deadline:
+                raise _lock_timeout_error(wait_cap)
+            time.sleep(2)
+        logger.info("Lock padrón Consolido adquirido")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            logger.info("Lock padrón Consolido liberado")
+    finally:
+        lock_file.close()
+
+
+@asynccontextmanager
+async def padron_consolido_lock_async(*, timeout_sec: float | None = None) -> AsyncIterator[None]:
+    """padron_consolido_lock sin bloquear el event loop compartido del scheduler (lib/browser_pool)."""
+    import time
+
+    wait_cap = _padron_lock_timeout_sec() if timeout_sec is None else timeout_sec
+    PADRON_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(PADRON_LOCK_PATH, "w", encoding="utf-8")
+    try:
+        logger.info("Esperando lock padrón Consolido (máx %.0fs)…", wait_cap)
+        deadline = time.monotonic() + wait_cap
+        while not _flock_nb(lock_file):
+            if time.monotonic() >= deadline:
+                raise _lock_timeout_error(wait_cap)
+            await asyncio.sleep(2)
+        logger.info("Lock padrón Consolido adquirido")
         try:
             yield
         finally:
@@ -4,10 +4,31 @@ Navegación Playwright tolerante a SPAs (Consolido, CHESS).
 
 `networkidle` suele no alcanzarse nunca (websockets, polling Angular) y dispara
 timeouts de 120s en Railway. Preferir domcontentloaded + wait de selectores UI.
+
+Perfil liviano (instalar_perfil): route handler por contexto que aborta imágenes, media,
+fuentes, trackers y estáticos de terceros, y NavMetricas con requests/bytes/tiempo por paso
+para el resumen del motor. Por motor: PERFILES; RPA_NAV_LIVIANO_<MOTOR>=0 lo apaga para
+ese motor, RPA_NAV_TIPOS_<MOTOR>=image,font,… cambia los tipos; RPA_NAV_LIVIANO=0 global.
+Con routing activo Chromium no usa caché HTTP; cada contexto nace vacío igual.
+
+Esperas por evento (esperar_primero / esperar_respuesta / senal_dom): resuelven con la
+respuesta del backend o un predicado DOM (polling por mutación) en lugar de sleeps fijos;
+cada espera queda en NavMetricas (vía que resolvió + segundos) bajo el paso en curso y de
+ahí a motor_runs (api_client.registrar_telemetria_motor).
 """
 from __future__ import annotations
 
-from playwright.async_api import Page
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterator
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Locator, Page, Request, Response, Route
 
 DEFAULT_GOTO_TIMEOUT_MS = 60_000
 
@@ -38,3 +59,253 @@ async def wait_dom_ready(page: Page, *, timeout_ms: int = 15_000) -> None:
         await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
     except Exception:
         pass
+
+
+# ─────────────────────────────────────────────────────────────────
+# Perfil liviano: bloqueo de recursos + métricas por paso
+# ─────────────────────────────────────────────────────────────────
+
+# Lo que la UI necesita para funcionar (DevExpress/Kendo miden visibilidad con el CSS;
+# los botones de Font Awesome se ubican por su glifo, p.ej. "\uf1c3" en padrón).
+_TIPOS_ESENCIALES = frozenset({"document", "script", "stylesheet", "xhr", "fetch", "font"})
+_TIPOS_BLOQUEADOS = frozenset({"image", "media"})
+_HOSTS_TRACKERS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "hotjar.com",
+    "clarity.ms",
+    "facebook.net",
+    "facebook.com",
+    "segment.io",
+    "mixpanel.com",
+    "nr-data.net",
+    "newrelic.com",
+    "intercom.io",
+    "tawk.to",
+)
+
+
+@dataclass(frozen=True)
+class PerfilNav:
+    """hosts_propios: terceros fuera de esta lista solo pasan si son tipos esenciales."""
+
+    nombre: str
+    tipos_bloqueados: frozenset[str] = _TIPOS_BLOQUEADOS
+    hosts_propios: tuple[str, ...] = ()
+    hosts_bloqueados: tuple[str, ...] = _HOSTS_TRACKERS
+
+    def bloquea(self, url: str, tipo: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if any(host == h or host.endswith("." + h) for h in self.hosts_bloqueados):
+            return True
+        if tipo in self.tipos_bloqueados:
+            return True
+        if self.hosts_propios and not any(host == h or host.endswith("." + h) for h in self.hosts_propios):
+            return tipo not in _TIPOS_ESENCIALES
+        return False
+
+
+PERFILES: dict[str, PerfilNav] = {
+    "consolido": PerfilNav("consolido", hosts_propios=("nextbyn.com",)),
+    "chess": PerfilNav("chess", hosts_propios=("chesserp.com",)),
+    "sigo": PerfilNav("sigo", hosts_propios=("nextbyn.com",)),
+}
+
+
+def _env_on(name: str) -> bool:
+    raw = (os.environ.get(name) or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def perfil_nav(motor: str) -> PerfilNav | None:
+    """Perfil del motor con overrides de env, o None si el bloqueo está apagado."""
+    key = motor.upper()
+    if not _env_on("RPA_NAV_LIVIANO") or not _env_on(f"RPA_NAV_LIVIANO_{key}"):
+        return None
+    perfil = PERFILES.get(motor.lower(), PerfilNav(motor.lower()))
+    raw = os.environ.get(f"RPA_NAV_TIPOS_{key}")
+    if raw is not None:
+        tipos = frozenset(t.strip().lower() for t in raw.split(",") if t.strip())
+        perfil = PerfilNav(perfil.nombre, tipos, perfil.hosts_propios, perfil.hosts_bloqueados)
+    return perfil
+
+
+# Métricas del motor en curso (una por tarea asyncio; instalar_perfil la fija).
+_NAV_ACTUAL: contextvars.ContextVar["NavMetricas | None"] = contextvars.ContextVar("rpa_nav", default=None)
+_MAX_ESPERAS = 200
+
+
+@dataclass
+class NavMetricas:
+    """Contadores de red de un contexto; paso() acumula tiempo y bytes por etapa del motor."""
+
+    perfil: str | None = None
+    requests: int = 0
+    bloqueadas: int = 0
+    fallidas: int = 0
+    bytes: int = 0
+    pasos: dict[str, dict[str, Any]] = field(default_factory=dict)
+    esperas: list[dict[str, Any]] = field(default_factory=list)
+    paso_actual: str | None = None
+
+    async def _on_finished(self, request: "Request") -> None:
+        self.requests += 1
+        try:
+            sizes = await request.sizes()
+            self.bytes += int(sizes.get("responseBodySize") or 0) + int(sizes.get("responseHeadersSize") or 0)
+        except Exception:
+            pass
+
+    def _on_failed(self, request: "Request") -> None:
+        if "blockedbyclient" not in (request.failure or "").lower():
+            self.fallidas += 1
+
+    def registrar_espera(self, nombre: str, espera: "Espera") -> None:
+        if len(self.esperas) < _MAX_ESPERAS:
+            self.esperas.append({"paso": self.paso_actual, "espera": nombre, "via": espera.via, "s": round(espera.s, 2)})
+
+    @contextmanager
+    def paso(self, nombre: str) -> Iterator[None]:
+        t0, b0, r0 = time.monotonic(), self.bytes, self.requests
+        anterior, self.paso_actual = self.paso_actual, nombre
+        try:
+            yield
+        finally:
+            self.paso_actual = anterior
+            prev = self.pasos.get(nombre) or {"s": 0.0, "bytes": 0, "requests": 0}
+            self.pasos[nombre] = {
+                "s": round(prev["s"] + time.monotonic() - t0, 2),
+                "bytes": prev["bytes"] + self.bytes - b0,
+                "requests": prev["requests"] + self.requests - r0,
+            }
+
+    def resumen(self) -> dict[str, Any]:
+        return {
+            "perfil": self.perfil,
+            "requests": self.requests,
+            "bloqueadas": self.bloqueadas,
+            "fallidas": self.fallidas,
+            "mb": round(self.bytes / 2**20, 2),
+            "pasos": dict(self.pasos),
+            "esperas": list(self.esperas),
+        }
+
+
+async def instalar_perfil(context: "BrowserContext", motor: str) -> NavMetricas:
+    """
+    Mide el tráfico del contexto y, si el perfil del motor está activo, aborta lo no esencial.
+    Llamar antes de abrir páginas.
+    """
+    perfil = perfil_nav(motor)
+    nav = NavMetricas(perfil=perfil.nombre if perfil else None)
+    _NAV_ACTUAL.set(nav)
+    context.on("requestfinished", nav._on_finished)
+    context.on("requestfailed", nav._on_failed)
+    if perfil is None:
+        return nav
+
+    async def _route(route: "Route") -> None:
+        req = route.request
+        if perfil.bloquea(req.url, req.resource_type):
+            nav.bloqueadas += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    await context.route("**/*", _route)
+    return nav
+
+
+# ─────────────────────────────────────────────────────────────────
+# Esperas por evento (respuesta del backend / predicado DOM)
+# ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Espera:
+    """via = nombre de la señal que resolvió primero; None ⇒ venció el timeout."""
+
+    via: str | None
+    s: float
+    valor: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return self.via is not None
+
+
+def _registrar(nombre: str, espera: Espera) -> Espera:
+    nav = _NAV_ACTUAL.get()
+    if nav is not None:
+        nav.registrar_espera(nombre, espera)
+    return espera
+
+
+async def esperar_primero(nombre: str, senales: dict[str, Awaitable[Any]], *, timeout_s: float) -> Espera:
+    """
+    Corre las señales en paralelo y devuelve la primera que termina sin error; cancela el
+    resto. Una señal que falla (timeout propio de Playwright) no gana: se sigue esperando
+    a las demás hasta `timeout_s`.
+    """
+    t0 = time.monotonic()
+    tareas = {asyncio.ensure_future(aw): via for via, aw in senales.items()}
+    pendientes = set(tareas)
+    try:
+        while pendientes:
+            restante = timeout_s - (time.monotonic() - t0)
+            if restante <= 0:
+                break
+            hechas, pendientes = await asyncio.wait(pendientes, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            for t in hechas:
+                if not t.cancelled() and t.exception() is None:
+                    return _registrar(nombre, Espera(tareas[t], time.monotonic() - t0, t.result()))
+        return _registrar(nombre, Espera(None, time.monotonic() - t0))
+    finally:
+        for t in tareas:
+            if not t.done():
+                t.cancel()
+            elif not t.cancelled():
+                t.exception()  # consumida: el perdedor puede haber fallado por timeout
+
+
+async def esperar_respuesta(
+    nombre: str,
+    page: "Page",
+    predicado: Callable[["Response"], bool],
+    accion: Callable[[], Awaitable[Any]],
+    *,
+    timeout_ms: int,
+) -> Espera:
+    """
+    Ejecuta `accion` (p. ej. el click de Aplicar) esperando la respuesta del backend que la
+    completa. Sin respuesta en `timeout_ms` devuelve Espera(None): el motor decide el fallback.
+    La acción se ejecuta siempre; sus errores se propagan.
+    """
+    t0 = time.monotonic()
+    accion_ok = False
+    try:
+        async with page.expect_response(predicado, timeout=timeout_ms) as info:
+            await accion()
+            accion_ok = True
+        resp = await info.value
+        return _registrar(nombre, Espera("response", time.monotonic() - t0, resp))
+    except Exception as e:
+        if not accion_ok or type(e).__name__ != "TimeoutError":
+            raise
+        return _registrar(nombre, Espera(None, time.monotonic() - t0))
+
+
+def senal_locator(locator: "Locator", *, state: str = "visible", timeout_ms: int) -> Awaitable[None]:
+    return locator.wait_for(state=state, timeout=timeout_ms)
+
+
+def senal_dom(page: "Page", js: str, *, arg: Any = None, timeout_ms: int) -> Awaitable[Any]:
+    """Predicado JS reevaluado en cada mutación del DOM (no cada N ms)."""
+    return page.wait_for_function(js, arg=arg, polling="mutation", timeout=timeout_ms)
+
+
+def es_post_a(fragmento: str) -> Callable[["Response"], bool]:
+    """Predicado de respuesta: POST (callback DevExpress / API) a una URL que contiene `fragmento`."""
+    frag = fragmento.lower()
+    return lambda r: r.request.method == "POST" and frag in r.url.lower()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+lib/session_cache.py
+====================
+Sesiones autenticadas persistentes entre corridas: el storage state de Playwright (cookies +
+localStorage) por (portal, credencial), cifrado en disco con una clave del Vault. La credencial
+es el usuario ya resuelto (no el nombre del secret): misma cuenta ⇒ misma sesión.
+
+- SesionPortal(portal, *credencial).storage_state() → estado para browser.new_context(), o None.
+- asegurar(context, page, login=, probe=): con estado cacheado corre un probe barato (request
+  con cookies o carga corta de la SPA); si pasa, se saltea el login y los popups post-login.
+  Si no, limpia, hace el login de siempre y guarda el estado nuevo.
+- Archivos RPA_DATA_DIR/.sessions/<sha256>.bin (Fernet, 0600). Sin RPA_SESSION_KEY (env o
+  Vault) o sin `cryptography` no se persiste nada: cada corrida loguea como antes.
+- Vencimiento: RPA_SESSION_TTL_H (default 12 h, TTL de Fernet). Refresco a demanda:
+  RPA_SESSION_REFRESH=1, invalidar() o purgar().
+
+RPA_SESSION_CACHE=0 desactiva el cache.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from lib.logger import get_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Page
+
+logger = get_logger("SESSION_CACHE")
+
+_RPA_ROOT = Path(__file__).resolve().parent.parent
+_DATA = Path(os.environ.get("RPA_DATA_DIR", str(_RPA_ROOT / "downloads")))
+SESSIONS_DIR = _DATA / ".sessions"
+
+_STATS = {"reutilizadas": 0, "logins": 0, "probe_fallidos": 0, "guardadas": 0, "errores": 0}
+_stats_lock = threading.Lock()
+_fernet_cache: dict[str, Any] = {}
+
+Probe = Callable[["Page"], Awaitable[bool]]
+
+
+def _inc(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _STATS[key] += n
+
+
+def session_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_STATS)
+
+
+def _env_on(name: str, default: str) -> bool:
+    raw = (os.environ.get(name) or default).strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def cache_habilitado() -> bool:
+    return _env_on("RPA_SESSION_CACHE", "1")
+
+
+def _ttl_s() -> int:
+    raw = (os.environ.get("RPA_SESSION_TTL_H") or "").strip()
+    try:
+        return int(float(raw) * 3600) if raw else 12 * 3600
+    except ValueError:
+        return 12 * 3600
+
+
+def _fernet():
+    """Fernet con la clave del Vault (sha256 del secreto), o None si no hay clave/librería."""
+    if "f" in _fernet_cache:
+        return _fernet_cache["f"]
+    f = None
+    from lib.vault_client import get_secret
+
+    secreto = get_secret("RPA_SESSION_KEY")
+    if not secreto:
+        logger.info("RPA_SESSION_KEY no configurada — sesiones sin cache en disco")
+    else:
+        try:
+            from cryptography.fernet import Fernet
+
+            f = Fernet(base64.urlsafe_b64encode(hashlib.sha256(secreto.encode("utf-8")).digest()))
+        except ImportError:
+            logger.warning("cryptography no instalado — sesiones sin cache en disco")
+    _fernet_cache["f"] = f
+    return f
+
+
+def clave_sesion(portal: str, *credencial: str) -> str:
+    raw = "\x1f".join([portal.lower(), *(str(c) for c in credencial)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def purgar(portal: str | None = None) -> int:
+    """Borra sesiones guardadas (todas, o las del portal). Devuelve cuántas."""
+    n = 0
+    if not SESSIONS_DIR.exists():
+        return 0
+    for p in SESSIONS_DIR.glob("*.bin"):
+        if portal is not None and not p.name.startswith(f"{portal.lower()}_"):
+            continue
+        p.unlink(missing_ok=True)
+        n += 1
+    return n
+
+
+class SesionPortal:
+    """Storage state cacheado de una credencial en un portal (un login sirve a todas sus corridas)."""
+
+    def __init__(self, portal: str, *credencial: str) -> None:
+        self.portal = portal.lower()
+        self.path = SESSIONS_DIR / f"{self.portal}_{clave_sesion(portal, *credencial)[:32]}.bin"
+        self.reutilizada = False
+        self._estado: dict[str, Any] | None = None
+        self._cargado = False
+
+    def _leer(self) -> dict[str, Any] | None:
+        f = _fernet() if cache_habilitado() else None
+        if f is None or not self.path.exists():
+            return None
+        try:
+            from cryptography.fernet import InvalidToken
+
+            try:
+                raw = f.decrypt(self.path.read_bytes(), ttl=_ttl_s())
+            except InvalidToken:
+                # Vencida o cifrada con otra clave.
+                self.path.unlink(missing_ok=True)
+                return None
+            estado = json.loads(raw)
+            return estado if isinstance(estado, dict) else None
+        except Exception as e:
+            _inc("errores")
+            logger.warning("Sesión %s ilegible: %s", self.portal, e)
+            return None
+
+    def storage_state(self) -> dict[str, Any] | None:
+        """Estado para new_context(storage_state=...); None ⇒ contexto limpio y login."""
+        if not self._cargado:
+            self._cargado = True
+            if not _env_on("RPA_SESSION_REFRESH", "0"):
+                self._estado = self._leer()
+        return self._estado
+
+    def _escribir(self, data: bytes) -> None:
+        SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        # Temporal único: dos motores/tenants con la misma credencial pueden guardar a la vez.
+        fd, tmp = tempfile.mkstemp(prefix=f"{self.path.stem}.", suffix=".tmp", dir=SESSIONS_DIR)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    async def guardar(self, context: "BrowserContext") -> None:
+        f = _fernet() if cache_habilitado() else None
+        if f is None:
+            return
+        try:
+            estado = await context.storage_state()
+            token = f.encrypt(json.dumps(estado, separators=(",", ":")).encode("utf-8"))
+            await asyncio.to_thread(self._escribir, token)
+            self._estado, self._cargado = estado, True
+            _inc("guardadas")
+        except Exception as e:
+            _inc("errores")
+            logger.warning("No se pudo guardar la sesión %s: %s", self.portal, e)
+
+    def invalidar(self) -> None:
+        self._estado, self._cargado = None, True
+        self.path.unlink(missing_ok=True)
+
+    async def asegurar(
+        self,
+        context: "BrowserContext",
+        page: "Page",
+        *,
+        login: Callable[[], Awaitable[Any]],
+        probe: Probe,
+    ) -> bool:
+        """
+        Deja `page` autenticada. True si reutilizó la sesión cacheada (login salteado).
+        El contexto tiene que haberse creado con storage_state=self.storage_state().
+        """
+        if self.storage_state() is not None:
+            try:
+                ok = await probe(page)
+            except Exception as e:
+                logger.info("Probe de sesión %s falló: %s", self.portal, e)
+                ok = False
+            if ok:
+                _inc("reutilizadas")
+                self.reutilizada = True
+                logger.info("  ♻️  Sesión %s reutilizada — login salteado", self.portal)
+                return True
+            _inc("probe_fallidos")
+            logger.info("  Sesión %s vencida — login completo", self.portal)
+            self.invalidar()
+            await _limpiar(context, page)
+        _inc("logins")
+        await login()
+        await self.guardar(context)
+        return False
+
+
+async def _limpiar(context: "BrowserContext", page: "Page") -> None:
+    await context.clear_cookies()
+    try:
+        await page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }")
+    except Exception:
+        pass
+
+
+# ─────────────────────────────────────────────────────────────────
+# Probes
+# ─────────────────────────────────────────────────────────────────
+
+
+def probe_request(url: str, *, ok_status: tuple[int, ...] = (200,)) -> Probe:
+    """
+    Portales con sesión por cookie (ASP.NET de Nextbyn): GET sin seguir redirects con las
+    cookies del contexto. 200 ⇒ sesión viva; 302 a Default.aspx ⇒ vencida. No carga la página.
+    """
+
+    async def _probe(page: "Page") -> bool:
+        resp = await page.context.request.get(url, max_redirects=0, timeout=10_000)
+        try:
+            return resp.status in ok_status
+        finally:
+            await resp.dispose()
+
+    return _probe
+
+
+def probe_spa(url: str, *, login_selector: str, ok_fragment: str, settle_ms: int = 3_000) -> Probe:
+    """
+    SPAs con token en localStorage (Consolido, CHESS): abre `url` y da `settle_ms` al router
+    para mandar a /login. Sesión viva si no apareció el login y la URL sigue en `ok_fragment`.
+    """
+
+    async def _probe(page: "Page") -> bool:
+        from lib.playwright_nav import goto_dom
+
+        await goto_dom(page, url, timeout_ms=30_000)
+        try:
+            await page.wait_for_function(
+                """([sel]) => location.href.includes('/login')
+                    || Array.from(document.querySelectorAll(sel)).some(e => e.offsetParent !== null)""",
+                arg=[login_selector],
+                timeout=settle_ms,
+            )
+            return False
+        except Exception:
+            return ok_fragment in page.url
+
+    return _probe
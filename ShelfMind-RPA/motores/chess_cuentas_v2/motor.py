@@ -16,14 +16,13 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+from playwright.async_api import BrowserContext, Page
 
 from .json_heuristic import try_build_datos_from_capture
 from .network_capture import ChessNetworkCapture
 from .paths import CAPTURE_DIR, ensure_rpa_on_syspath
 
 logger = logging.getLogger("motores.chess_cuentas_v2.motor")
-CHROME_MAC_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 
 
 def _configure_logging() -> None:
@@ -137,13 +136,13 @@ async def _run_hybrid_single_tenant(
     from motores.cuentas_corrientes import (
         TENANTS,
         _abrir_modal_exportacion,
+        _asegurar_login,
         _cerrar_accesos_concurrentes,
-        _cerrar_popup_nexty,
         _descargar_excel,
-        _hacer_login,
         _navegar_y_procesar,
         _parsear_excel,
         _screenshot_error,
+        _sesion_chess,
         _subir_a_api,
         TIMEOUT_MS,
     )
@@ -163,32 +162,31 @@ async def _run_hybrid_single_tenant(
     hl = headless if headless is not None else os.environ.get("RPA_HEADLESS", "true").lower() != "false"
     capture = ChessNetworkCapture()
 
-    launch_kwargs: dict[str, Any] = {
-        "headless": hl,
-        "args": ["--no-sandbox", "--disable-dev-shm-usage"],
-    }
-    if os.path.exists(CHROME_MAC_PATH):
-        launch_kwargs["executable_path"] = CHROME_MAC_PATH
+    from lib.browser_pool import navegador
+    from lib.playwright_nav import instalar_perfil
 
-    async with async_playwright() as pw:
-        browser: Browser = await pw.chromium.launch(**launch_kwargs)
+    sesion = _sesion_chess(tenant)
+    async with navegador("chess", headless=hl) as browser:
         context: BrowserContext = await browser.new_context(
             locale="es-AR",
             timezone_id="America/Argentina/Buenos_Aires",
             viewport={"width": 1280, "height": 800},
             accept_downloads=True,
+            storage_state=sesion.storage_state(),
         )
+        nav = await instalar_perfil(context, "chess")
         page: Page = await context.new_page()
         page.set_default_timeout(TIMEOUT_MS)
         capture.attach(page)
 
         try:
-            await _hacer_login(page, tenant)
-            await _cerrar_popup_nexty(page)
-            await _navegar_y_procesar(page, tenant)
-            await _cerrar_accesos_concurrentes(page)
-            await _wait_for_cc_snapshot(page, capture, force_excel=force_excel)
-            await _cerrar_accesos_concurrentes(page)
+            with nav.paso("login"):
+                await _asegurar_login(sesion, context, page, tenant)
+            with nav.paso("procesar"):
+                await _navegar_y_procesar(page, tenant)
+                await _cerrar_accesos_concurrentes(page)
+                await _wait_for_cc_snapshot(page, capture, force_excel=force_excel)
+                await _cerrar_accesos_concurrentes(page)
 
             datos: dict | None = None
             fuente = "excel"
@@ -207,8 +205,9 @@ async def _run_hybrid_single_tenant(
                     datos = None
 
             if not datos:
-                await _abrir_modal_exportacion(page)
-                file_bytes = await _descargar_excel(page, tenant_id)
+                with nav.paso("descargar"):
+                    await _abrir_modal_exportacion(page)
+                    file_bytes = await _descargar_excel(page, tenant_id)
                 try:
                     await page.locator(
                         "kendo-dialog:not(#error-dialog) button.btn.btn-md.btn-default"
@@ -221,7 +220,7 @@ async def _run_hybrid_single_tenant(
                     return resultado
 
                 clave_hash = f"cuentas_{tenant_id}"
-                if es_duplicado(clave_hash, file_bytes):
+                if await asyncio.to_thread(es_duplicado, clave_hash, file_bytes):
                     resultado["estado"] = "sin_cambios"
                     resultado["fuente_datos"] = fuente
                     return resultado
@@ -255,7 +254,7 @@ async def _run_hybrid_single_tenant(
 
             clave_hash = f"cuentas_{tenant_id}"
             firma = json.dumps(datos, sort_keys=True, default=str).encode("utf-8")
-            if es_duplicado(clave_hash, firma):
+            if await asyncio.to_thread(es_duplicado, clave_hash, firma):
                 resultado["estado"] = "sin_cambios"
                 resultado["fuente_datos"] = fuente
                 resultado["metadatos"] = datos.get("metadatos")
@@ -296,7 +295,7 @@ async def _run_hybrid_single_tenant(
             if sniff_dump_path:
                 await capture.dump_jsonl(sniff_dump_path)
             await context.close()
-            await browser.close()
+            resultado["nav"] = nav.resumen()
 
     return resultado
 
@@ -0,0 +1 @@
+# Motor Padrón de Clientes Consolido v2 (JSON de red + fallback Excel). Ver motor.py.
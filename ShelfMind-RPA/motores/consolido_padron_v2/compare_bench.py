@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Benchmark Excel vs red del padrón (mismo tenant, dry-run). Ejecutar desde ShelfMind-RPA:
+
+  cd ShelfMind-RPA && python -m motores.consolido_padron_v2.compare_bench --tenant tabaco
+
+Paridad: misma huella de Hash Guard (header + multiconjunto de filas canónicas) ⇒ el backend
+recibe exactamente la misma tabla. Si difiere, muestra columnas y filas distintas por IDCLIENTE.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+_RPA = Path(__file__).resolve().parents[2]
+if str(_RPA) not in sys.path:
+    sys.path.insert(0, str(_RPA))
+
+
+def _por_cliente(tabla) -> dict[str, list]:
+    try:
+        i = tabla.header.index("IDCLIENTE")
+    except ValueError:
+        return {}
+    return {str(f[i]) if i < len(f) else "": f for f in tabla.filas}
+
+
+def comparar_tablas(excel, red, *, muestras: int = 5) -> dict[str, Any]:
+    """Diferencias entre la tabla del Excel y la de red (ambas hash_guard.Tabla)."""
+    out: dict[str, Any] = {
+        "huella_igual": excel.huella == red.huella,
+        "filas": (len(excel.filas), len(red.filas)),
+        "header_igual": excel.header == red.header,
+    }
+    if not out["header_igual"]:
+        out["solo_excel_cols"] = [c for c in excel.header if c not in red.header]
+        out["solo_red_cols"] = [c for c in red.header if c not in excel.header]
+    faltan = Counter(excel.hashes) - Counter(red.hashes)
+    sobran = Counter(red.hashes) - Counter(excel.hashes)
+    out["filas_distintas"] = (sum(faltan.values()), sum(sobran.values()))
+    if faltan or sobran:
+        ex, rd = _por_cliente(excel), _por_cliente(red)
+        difs = []
+        for cli in sorted(set(ex) | set(rd)):
+            if ex.get(cli) != rd.get(cli):
+                difs.append({"IDCLIENTE": cli, "excel": ex.get(cli), "red": rd.get(cli)})
+            if len(difs) >= muestras:
+                break
+        out["muestras"] = difs
+    return out
+
+
+async def _run_once(tenant: str, *, headless: bool, force_excel: bool) -> tuple[dict[str, Any], float, int]:
+    from motores.consolido_padron_v2.motor import run_tenant
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    r = await run_tenant(tenant, headless=headless, force_excel=force_excel, dry_run=True, return_tabla=True)
+    dt = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return r, dt, pico
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    headless = not args.headed
+
+    print("=== A) Excel (forzar) — dry-run ===", flush=True)
+    r_excel, t_excel, m_excel = await _run_once(args.tenant, headless=headless, force_excel=True)
+    tabla_excel = r_excel.pop("__tabla", None)
+    print(json.dumps(r_excel, indent=2, ensure_ascii=False, default=str), flush=True)
+    print(f"⏱️  A: {t_excel:.1f}s | pico Python {m_excel / 2**20:.0f} MB\n", flush=True)
+
+    print("=== B) Red — dry-run ===", flush=True)
+    r_net, t_net, m_net = await _run_once(args.tenant, headless=headless, force_excel=False)
+    tabla_net = r_net.pop("__tabla", None)
+    print(json.dumps(r_net, indent=2, ensure_ascii=False, default=str), flush=True)
+    print(f"⏱️  B: {t_net:.1f}s | pico Python {m_net / 2**20:.0f} MB | fuente={r_net.get('fuente_datos')}\n", flush=True)
+
+    print("=== Comparación ===", flush=True)
+    if tabla_excel is None or tabla_net is None:
+        print("Falta la tabla de alguno de los dos.", flush=True)
+        return
+    print(json.dumps(comparar_tablas(tabla_excel, tabla_net), indent=2, ensure_ascii=False, default=str), flush=True)
+    print(f"Δ tiempo A−B: {t_excel - t_net:+.1f}s", flush=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tenant", default="tabaco")
+    ap.add_argument("--headed", action="store_true")
+    args = ap.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+JSON del Reporteador Consolido → tabla canónica del padrón (lib.hash_guard.Tabla).
+
+La grilla de resultados (ag-grid) se alimenta de un XHR con todas las filas del reporte.
+Acá se reconoce ese payload y se lo lleva al mismo formato que `tabla_desde_xlsx` produce
+con el Excel exportado: header canónico (nom_cli / nomCli → NOMCLI, IDCLIENTE, …) y celdas
+como texto vía api_client._celda_str. Así la huella del Hash Guard es la misma venga el
+padrón de red o de Excel, y el delta/base del backend no se invalida al cambiar de motor.
+
+Formas aceptadas:
+  - lista de dicts por fila;
+  - {columns|cols|headers|campos: [...], rows|data|values|filas: [[...], ...]}.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from .paths import ensure_rpa_on_syspath
+
+ensure_rpa_on_syspath()
+from lib.api_client import _celda_str, _header_names  # noqa: E402
+from lib.hash_guard import Tabla  # noqa: E402
+
+# Header del Excel "Padrón de clientes", indexado por nombre normalizado (ver _norm).
+PADRON_HEADER = {
+    _c.lower(): _c
+    for _c in (
+        "IDEMPRESA", "DSEMPRESA", "IDSUCUR", "DSSUCUR", "IDFUERZAVENTAS", "DESFUERZAVENTAS",
+        "IDCLIENTEINTERNO", "IDCLIENTE", "NOMCLI", "FANTACLI", "DOMICLI", "DESCLOCA",
+        "DESPROVINCIA", "DESCANAL", "TELEFOS", "MOVIL", "YCOORD", "XCOORD", "FECALTA", "ANULADO",
+    )
+}
+PADRON_COLUMNAS = frozenset(PADRON_HEADER)
+MIN_SCORE = 4
+
+_COL_LABEL_KEYS = ("headerName", "caption", "titulo", "title", "label", "field", "name", "nombre")
+_ROWS_KEYS = ("rows", "data", "values", "filas", "registros")
+_COLS_KEYS = ("columns", "cols", "headers", "campos", "columnas")
+_ISO_DT = re.compile(r"^(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})(?:\.0+)?(?:Z|[+-]00:?00)?$")
+
+
+def _norm(s: Any) -> str:
+    s = "".join(c for c in unicodedata.normalize("NFKD", str(s)) if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "", s.lower())
+
+
+def _col_label(col: Any) -> str:
+    if isinstance(col, dict):
+        for k in _COL_LABEL_KEYS:
+            if col.get(k):
+                return str(col[k])
+        return ""
+    return str(col)
+
+
+@dataclass
+class Grid:
+    """Grilla candidata: nombres de columna tal cual vienen y filas como listas alineadas."""
+
+    columnas: list[str]
+    filas: list[list[Any]]
+    score: int
+
+    @property
+    def peso(self) -> int:
+        return self.score * len(self.filas)
+
+
+def _score(columnas: list[str]) -> int:
+    norm = {_norm(c) for c in columnas}
+    if "idcliente" not in norm:
+        return 0
+    return len(norm & PADRON_COLUMNAS)
+
+
+def _grid_de_dicts(rows: list[dict]) -> Grid | None:
+    columnas: dict[str, None] = {}
+    for r in rows:
+        for k in r:
+            columnas.setdefault(k, None)
+    cols = list(columnas)
+    score = _score(cols)
+    if score < MIN_SCORE:
+        return None
+    return Grid(cols, [[r.get(c) for c in cols] for r in rows], score)
+
+
+def _grid_de_columnar(obj: dict) -> Grid | None:
+    cols_raw = next((obj[k] for k in _COLS_KEYS if isinstance(obj.get(k), list)), None)
+    rows = next((obj[k] for k in _ROWS_KEYS if isinstance(obj.get(k), list)), None)
+    if not cols_raw or rows is None or not all(isinstance(r, list) for r in rows):
+        return None
+    cols = [_col_label(c) for c in cols_raw]
+    score = _score(cols)
+    if score < MIN_SCORE:
+        return None
+    n = len(cols)
+    return Grid(cols, [list(r[:n]) + [None] * (n - len(r)) for r in rows], score)
+
+
+def _candidatas(obj: Any, depth: int = 0) -> Iterator[Grid]:
+    if depth > 8:
+        return
+    if isinstance(obj, list):
+        if obj and all(isinstance(x, dict) for x in obj):
+            g = _grid_de_dicts(obj)
+            if g is not None:
+                yield g
+                return
+        for x in obj:
+            if isinstance(x, (list, dict)):
+                yield from _candidatas(x, depth + 1)
+    elif isinstance(obj, dict):
+        g = _grid_de_columnar(obj)
+        if g is not None:
+            yield g
+            return
+        for v in obj.values():
+            if isinstance(v, (list, dict)):
+                yield from _candidatas(v, depth + 1)
+
+
+def grid_de_json(obj: Any) -> Grid | None:
+    """Mejor grilla de padrón dentro del JSON (más columnas de padrón × filas), o None."""
+    best: Grid | None = None
+    for g in _candidatas(obj):
+        if best is None or g.peso > best.peso:
+            best = g
+    return best
+
+
+def celda(value: Any) -> str | None:
+    """Valor JSON → texto como lo deja tabla_desde_xlsx (fechas ISO como str(datetime))."""
+    if isinstance(value, str):
+        m = _ISO_DT.match(value)
+        if m:
+            return f"{m.group(1)} {m.group(2)}"
+    elif isinstance(value, (dict, list)):
+        return None
+    return _celda_str(value)
+
+
+def grid_a_tabla(grid: Grid) -> Tabla:
+    """Grid → hash_guard.Tabla con el header/celdas del Excel exportado."""
+    header = _header_names([PADRON_HEADER.get(_norm(c)) or c.strip().upper() or None for c in grid.columnas])
+    filas: list[list[str | None]] = []
+    for raw in grid.filas:
+        row = [celda(v) for v in raw]
+        while row and row[-1] is None:
+            row.pop()
+        if row:
+            filas.append(row)
+    return Tabla(header, filas)
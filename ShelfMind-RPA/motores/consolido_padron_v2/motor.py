@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Motor Padrón de Clientes v2 (Consolido Reporteador): mismo login / proceso / parámetros que
+motores/padron.py, pero el resultado sale del JSON que alimenta la grilla (network_capture)
+en lugar de esperar el render de ag-grid y exportar el Excel:
+
+  Ejecutar → primer JSON con grilla de padrón (o heading "Resultados (N)" + gracia corta)
+  → hash_guard.Tabla (json_grid) → Hash Guard → delta / tabla completa gzip JSON a la API.
+
+Sin JSON reconocible, sin heading "Resultados (N)" visible o si las filas no coinciden con
+N, sigue por el export Excel de v1. El scheduler lo usa solo con RPA_PADRON_ENGINE=v2.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .json_grid import grid_a_tabla
+from .network_capture import PadronNetworkCapture
+from .paths import CAPTURE_DIR, ensure_rpa_on_syspath
+
+logger = logging.getLogger("motores.consolido_padron_v2.motor")
+
+_RESULTADOS_RE = re.compile(r"Resultados\s*\((\d+)\)", re.IGNORECASE)
+
+
+def _grace_ms() -> int:
+    """Margen tras ver "Resultados (N)" para que termine de llegar/parsearse el JSON."""
+    raw = (os.environ.get("PADRON_V2_GRACE_MS") or "").strip()
+    return int(raw) if raw.isdigit() else 8_000
+
+
+async def _resultados_n(page) -> int | None:
+    try:
+        txt = await page.locator("text=/Resultados\\s*\\(\\d+\\)/i").first.text_content(timeout=1_500)
+    except Exception:
+        return None
+    m = _RESULTADOS_RE.search(txt or "")
+    return int(m.group(1)) if m else None
+
+
+async def _ejecutar_y_capturar(page, capture: PadronNetworkCapture, *, tenant_id: str) -> int | None:
+    """
+    Clic en Ejecutar y espera por eventos (sin polling de 5 s): lo primero entre el JSON de
+    la grilla y el heading "Resultados (N)". Retorna N si el heading está visible.
+    """
+    from lib.playwright_nav import esperar_primero, senal_locator
+    from motores.padron import _report_poll_max_sec
+
+    logger.info("  Ejecutando reporte (captura de red)...")
+    await page.locator("button#button-procesar").click(timeout=10_000)
+    max_s = _report_poll_max_sec(tenant_id)
+    t0 = time.monotonic()
+
+    await esperar_primero(
+        "reporte",
+        {
+            "json": capture.listo.wait(),
+            "heading": senal_locator(
+                page.locator("text=/Resultados\\s*\\(\\d+\\)/i").first, timeout_ms=max_s * 1000
+            ),
+        },
+        timeout_s=max_s,
+    )
+    if not capture.listo.is_set():
+        await capture.esperar(_grace_ms() / 1000)
+    n = await _resultados_n(page)
+    logger.info(
+        "  ✅ Reporte listo en %.1fs — JSON=%s filas, heading=%s",
+        time.monotonic() - t0,
+        len(capture.grid.filas) if capture.grid else None,
+        n,
+    )
+    return n
+
+
+def _fingerprint(tabla) -> dict[str, Any]:
+    return {"huella": tabla.huella, "n_filas": len(tabla.filas), "header": tabla.header}
+
+
+async def _procesar_tenant_v2(
+    browser,
+    tenant: dict,
+    usuario: str,
+    password: str,
+    *,
+    force_excel: bool = False,
+    dry_run: bool = False,
+    return_tabla: bool = False,
+    sniff_dump_path: Path | None = None,
+) -> dict:
+    """Mismo contrato que padron._procesar_tenant ({ok, errores, sin_cambios, error_msg}) + fuente_datos."""
+    resumen: dict[str, Any] = {"ok": 0, "errores": 0, "sin_cambios": 0, "error_msg": None, "motor_padron": "v2"}
+    try:
+        return await _procesar_v2(
+            resumen,
+            browser,
+            tenant,
+            usuario,
+            password,
+            force_excel=force_excel,
+            dry_run=dry_run,
+            return_tabla=return_tabla,
+            sniff_dump_path=sniff_dump_path,
+        )
+    except Exception as e:
+        # Como v1: nunca propagar, así siguen reintentos, telemetría y notificación de error.
+        logger.error(f"  ❌ Error inesperado en tenant {tenant.get('id')} (v2): {e}")
+        resumen["errores"] += 1
+        resumen["error_msg"] = str(e)[:500]
+        return resumen
+
+
+async def _procesar_v2(
+    resumen: dict[str, Any],
+    browser,
+    tenant: dict,
+    usuario: str,
+    password: str,
+    *,
+    force_excel: bool,
+    dry_run: bool,
+    return_tabla: bool,
+    sniff_dump_path: Path | None,
+) -> dict:
+    ensure_rpa_on_syspath()
+    from lib.api_client import registrar_padron_sin_cambios, subir_padron, subir_padron_tabla
+    from lib.hash_guard import calcular_delta, delta_habilitado, es_duplicado, guardar_hash, tabla_desde_xlsx
+    from lib.playwright_nav import instalar_perfil
+    from motores.padron import (
+        _asegurar_login,
+        _configurar_parametros,
+        _descargar_excel,
+        _ejecutar_reporte,
+        _screenshot_error,
+        _seleccionar_reporte_padron,
+        _sesion_consolido,
+    )
+
+    tenant_id = str(tenant["id"])
+    capture = PadronNetworkCapture()
+    sesion = _sesion_consolido(usuario)
+    context = await browser.new_context(accept_downloads=True, storage_state=sesion.storage_state())
+    nav = None
+
+    async def _paso(nombre: str, coro) -> bool:
+        try:
+            with nav.paso(nombre):
+                await coro
+            return True
+        except Exception as e:
+            logger.error(f"  Error en {nombre}: {e}")
+            await _screenshot_error(page, tenant_id, nombre)
+            resumen["errores"] += 1
+            resumen["error_msg"] = f"{nombre}: {e}"[:500]
+            return False
+
+    try:
+        nav = await instalar_perfil(context, "consolido")
+        page = await context.new_page()
+        capture.attach(page)
+        logger.info(f"\n  ┌─ Procesando tenant (v2): {tenant['nombre']}")
+        if not (
+            await _paso("login", _asegurar_login(sesion, context, page, tenant, usuario, password))
+            and await _paso("seleccionar_padron", _seleccionar_reporte_padron(page))
+            and await _paso("parametros", _configurar_parametros(page, tenant))
+        ):
+            return resumen
+
+        n_heading: int | None = None
+
+        async def _ejecutar() -> None:
+            nonlocal n_heading
+            if force_excel:
+                await _ejecutar_reporte(page, tenant_id=tenant_id)
+            else:
+                n_heading = await _ejecutar_y_capturar(page, capture, tenant_id=tenant_id)
+
+        if not await _paso("ejecutar", _ejecutar()):
+            return resumen
+
+        contenido: Any = None
+        tabla = None
+        if not force_excel and capture.grid is not None:
+            tabla = await asyncio.to_thread(grid_a_tabla, capture.grid)
+            # Sin heading no hay cómo validar que el JSON trae el reporte completo.
+            if not tabla.filas or n_heading is None or n_heading != len(tabla.filas):
+                logger.warning(
+                    "  JSON descartado: %s filas vs Resultados (%s) — sigo por Excel",
+                    len(tabla.filas),
+                    n_heading,
+                )
+                tabla = None
+            else:
+                contenido = tabla
+                resumen["fuente_datos"] = "network"
+                resumen["json_source_url"] = capture.url
+                logger.info(f"  ✅ Padrón desde red: {len(tabla.filas)} filas — {capture.url}")
+        capture.grid = None  # liberar filas crudas: la Tabla ya tiene su copia canónica
+
+        archivo: Path | None = None
+        if contenido is None:
+            resumen["fuente_datos"] = "excel"
+            with nav.paso("descargar"):
+                archivo = await _descargar_excel(page, {**tenant, "id": f"padron_{tenant_id}"})
+            if not archivo:
+                resumen["errores"] += 1
+                resumen["error_msg"] = "descargar: Excel no obtenido"
+                return resumen
+            contenido = str(archivo)
+    finally:
+        if sniff_dump_path:
+            await capture.dump_jsonl(sniff_dump_path)
+        await context.close()
+        if nav is not None:
+            resumen["nav"] = nav.resumen()
+
+    if dry_run:
+        if tabla is None:
+            tabla = await asyncio.to_thread(tabla_desde_xlsx, Path(contenido).read_bytes())
+        resumen["fingerprint"] = _fingerprint(tabla) if tabla is not None else None
+        resumen["dry_run"] = True
+        if return_tabla:
+            resumen["__tabla"] = tabla
+        return resumen
+
+    hash_key = f"padron_{tenant_id}"
+    if await asyncio.to_thread(es_duplicado, hash_key, contenido):
+        logger.info("  ⏭️  Padrón idéntico al anterior — sin cambios")
+        await registrar_padron_sin_cambios(tenant["id_dist"])
+        resumen["sin_cambios"] += 1
+        return resumen
+
+    try:
+        delta = await asyncio.to_thread(calcular_delta, hash_key, contenido) if delta_habilitado() else None
+        if tabla is not None:
+            subido_ok = await subir_padron_tabla(tabla, tenant["id_dist"], hash_key, delta=delta)
+        else:
+            subido_ok = await subir_padron(archivo, tenant["id_dist"], delta=delta)
+        if not subido_ok:
+            raise RuntimeError("Upload padrón rechazado por API")
+        guardar_hash(hash_key, contenido)
+        logger.info(f"  ✅ Padrón procesado exitosamente ({resumen['fuente_datos']})")
+        resumen["ok"] += 1
+    except Exception as e:
+        logger.error(f"  Error subiendo a API: {e}")
+        resumen["errores"] += 1
+        resumen["error_msg"] = f"upload: {e}"[:500]
+    return resumen
+
+
+async def run_tenant(
+    tenant_id: str,
+    *,
+    headless: bool | None = None,
+    force_excel: bool = False,
+    dry_run: bool = False,
+    return_tabla: bool = False,
+    sniff_dump: bool = False,
+) -> dict[str, Any]:
+    """Un tenant con v2 (CLI / compare_bench). El scheduler entra por motores.padron.run_tenant."""
+    ensure_rpa_on_syspath()
+    from lib.browser_pool import navegador
+    from motores.padron import _resolver_credenciales_consolido, cargar_tenants_activos
+
+    tenants = await asyncio.to_thread(cargar_tenants_activos)
+    tenant = next((t for t in tenants if str(t.get("id", "")).lower() == tenant_id.lower()), None)
+    if not tenant:
+        return {"tenant": tenant_id, "ok": 0, "errores": 1, "error_msg": "tenant desconocido o inactivo"}
+    dump_path = None
+    if sniff_dump:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        dump_path = CAPTURE_DIR / f"sniff_padron_{tenant_id}_{stamp}.jsonl"
+    usuario, password = _resolver_credenciales_consolido()
+    async with navegador("consolido", headless=headless) as browser:
+        r = await _procesar_tenant_v2(
+            browser,
+            tenant,
+            usuario,
+            password,
+            force_excel=force_excel,
+            dry_run=dry_run,
+            return_tabla=return_tabla,
+            sniff_dump_path=dump_path,
+        )
+    return {"tenant": tenant_id, **r}
+
+
+def main() -> None:
+    logging.basicConfig(level=os.environ.get("RPA_LOG_LEVEL", "INFO"))
+    p = argparse.ArgumentParser(description="Padrón Consolido v2 (red + fallback Excel)")
+    p.add_argument("--tenant", required=True, help="id tenant (tabaco, aloma, …)")
+    p.add_argument("--headed", action="store_true", help="Chromium visible")
+    p.add_argument("--force-excel", action="store_true", help="Ignorar JSON de red")
+    p.add_argument("--dry-run", action="store_true", help="No subir a API ni guardar hash")
+    p.add_argument("--sniff-dump", action="store_true", help="Volcar respuestas vistas a logs/padron_v2_capture/")
+    args = p.parse_args()
+    res = asyncio.run(
+        run_tenant(
+            args.tenant,
+            headless=not args.headed,
+            force_excel=args.force_excel,
+            dry_run=args.dry_run,
+            sniff_dump=args.sniff_dump,
+        )
+    )
+    res.pop("__tabla", None)
+    print(json.dumps(res, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
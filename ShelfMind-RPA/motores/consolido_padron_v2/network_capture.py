@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .json_grid import Grid, grid_de_json
+
+logger = logging.getLogger("motores.consolido_padron_v2.network")
+
+
+def _max_body_bytes() -> int:
+    raw = (os.environ.get("PADRON_V2_MAX_JSON_MB") or "").strip()
+    return (int(raw) if raw.isdigit() else 200) * 1024 * 1024
+
+
+@dataclass
+class RespuestaVista:
+    ts: str
+    url: str
+    status: int
+    content_type: str
+    bytes: int
+    filas_padron: int = 0
+
+
+class PadronNetworkCapture:
+    """
+    Escucha respuestas JSON del host Consolido y se queda solo con la mejor grilla de
+    padrón (no retiene los bodies). `listo` se setea en cuanto aparece una.
+    """
+
+    def __init__(self, host_substring: str = "nextbyn") -> None:
+        self._host = host_substring.lower()
+        self.vistas: list[RespuestaVista] = []
+        self.grid: Grid | None = None
+        self.url: str | None = None
+        self.listo = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def attach(self, page) -> None:
+        async def _on_response(response) -> None:
+            try:
+                url = response.url or ""
+                if self._host not in url.lower() or response.status >= 400:
+                    return
+                ct = (response.headers or {}).get("content-type", "").lower()
+                if "json" not in ct:
+                    return
+                body = await response.body()
+                if not body or len(body) > _max_body_bytes():
+                    return
+                # Parseo + heurística fuera del loop: el JSON del padrón grande pesa decenas de MB.
+                grid = await asyncio.to_thread(_grid_de_body, body)
+                vista = RespuestaVista(
+                    ts=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                    url=url,
+                    status=response.status,
+                    content_type=ct,
+                    bytes=len(body),
+                    filas_padron=len(grid.filas) if grid else 0,
+                )
+                async with self._lock:
+                    self.vistas.append(vista)
+                    if grid is not None and (self.grid is None or grid.peso > self.grid.peso):
+                        self.grid, self.url = grid, url
+                        self.listo.set()
+            except Exception as e:
+                logger.debug("capture skip: %s", e)
+
+        page.on("response", _on_response)
+
+    async def esperar(self, timeout_s: float) -> Grid | None:
+        try:
+            await asyncio.wait_for(self.listo.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            return None
+        return self.grid
+
+    async def dump_jsonl(self, path: Path) -> None:
+        """Metadatos de las respuestas vistas (sin bodies) para depurar la heurística."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with self._lock:
+            copy = list(self.vistas)
+        with path.open("w", encoding="utf-8") as f:
+            for v in copy:
+                f.write(json.dumps(v.__dict__, ensure_ascii=False) + "\n")
+        logger.info("Volcado %s respuestas en %s", len(copy), path)
+
+
+def _grid_de_body(body: bytes) -> Grid | None:
+    try:
+        obj: Any = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return grid_de_json(obj)
@@ -43,11 +43,20 @@ from typing import Optional, Any
 from zoneinfo import ZoneInfo
 
 from playwright.async_api import (
-    async_playwright, Browser, BrowserContext, Page, Download
+    BrowserContext, Page, Download
 )
 
 from lib.logger import get_logger
-from lib.hash_guard import es_duplicado, guardar_hash
+from lib.browser_pool import navegador
+from lib.playwright_nav import instalar_perfil
+from lib.hash_guard import (
+    calcular_delta,
+    delta_habilitado,
+    es_duplicado,
+    guardar_hash,
+    tabla_desde_filas,
+)
+from lib.session_cache import SesionPortal, probe_spa
 from lib.shelfy_config import get_shelfy_api_key, get_shelfy_base_url
 from lib.vault_client import get_secret
 
@@ -59,7 +68,6 @@ DOWNLOADS_DIR = BASE_DIR / "downloads"
 ERRORS_DIR    = BASE_DIR / "logs" / "errors"
 HEADLESS      = os.environ.get("RPA_HEADLESS", "true").lower() != "false"
 TIMEOUT_MS    = 30_000
-CHROME_MAC_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 
 
 def _norm_txt(value: Any) -> str:
@@ -311,6 +319,29 @@ async def _cerrar_popup_nexty(page: Page) -> None:
         pass
 
 
+def _sesion_chess(tenant: dict) -> SesionPortal:
+    """Sesión cacheada por instancia CHESS + usuario del tenant."""
+    return SesionPortal("chess", tenant["url_base"], get_secret(tenant["vault_user"]))
+
+
+async def _asegurar_login(sesion: SesionPortal, context: BrowserContext, page: Page, tenant: dict) -> bool:
+    """
+    Con sesión viva (el dashboard no rebota a /login) se saltean login, popup de actualización
+    y popup Nexty. Si no, login + popups como siempre y se guarda el estado.
+    """
+
+    async def _login() -> None:
+        await _hacer_login(page, tenant)
+        await _cerrar_popup_nexty(page)
+
+    return await sesion.asegurar(
+        context,
+        page,
+        login=_login,
+        probe=probe_spa(f"{tenant['url_base']}/#/dashboard", login_selector="#username1", ok_fragment="/dashboard"),
+    )
+
+
 # ─────────────────────────────────────────────────────────────────
 # PASO 5: NAVEGAR Y PROCESAR
 # ─────────────────────────────────────────────────────────────────
@@ -641,7 +672,9 @@ async def _subir_a_api(tenant: dict, datos: dict, filename: str) -> bool:
     Sube el JSON parseado a la API de Shelfy.
 
     Endpoint: POST /api/v1/sync/cuentas-corrientes?id_distribuidor=X
-    Body: JSON con metadatos + detalle_cuentas
+    Body: JSON con metadatos + detalle_cuentas. Con Hash Guard por filas (RPA_UPLOAD_DELTA)
+    detalle_cuentas viaja como delta contra la última base que el backend confirmó
+    (`delta_base` en la respuesta); 409 del backend (sin esa base) ⇒ se reenvía completo.
     """
     try:
         import httpx
@@ -659,6 +692,20 @@ async def _subir_a_api(tenant: dict, datos: dict, filename: str) -> bool:
             "filename":  filename,
             "datos":     datos,
         }
+        tabla = delta = None
+        if delta_habilitado() and datos.get("detalle_cuentas"):
+            payload["delta_clave"] = f"cc_detalle_{tenant['id']}_{tenant['id_dist']}"
+            # Huella + delta por filas (CPU): fuera del loop, los otros tenants siguen navegando.
+            tabla = await asyncio.to_thread(tabla_desde_filas, datos["detalle_cuentas"])
+            delta = await asyncio.to_thread(calcular_delta, payload["delta_clave"], tabla)
+        payload_completo = payload
+        if delta is not None and not delta.completo:
+            payload = {
+                **payload,
+                "datos": {k: v for k, v in datos.items() if k != "detalle_cuentas"},
+                "delta": delta.body(),
+            }
+            logger.info(f"  📤 detalle_cuentas como delta: {delta.resumen()}")
         
         # DEBUG LOG
         vendedor_1 = datos.get("detalle_cuentas", [{}])[0].get("vendedor", "N/A")
@@ -666,11 +713,23 @@ async def _subir_a_api(tenant: dict, datos: dict, filename: str) -> bool:
 
         for intento in range(1, 4):
             try:
-                with httpx.Client(timeout=120) as client:
-                    resp = client.post(url, params=params, headers=headers, json=payload)
+                async with httpx.AsyncClient(timeout=120) as client:
+                    resp = await client.post(url, params=params, headers=headers, json=payload)
                 if resp.status_code in (200, 202):
                     logger.info(f"  ✅ Subida OK (HTTP {resp.status_code})")
+                    # Base de filas sólo si el backend confirma que guardó la misma
+                    # (backend sin soporte de delta ⇒ próxima subida completa otra vez).
+                    try:
+                        ack = resp.json().get("delta_base")
+                    except Exception:
+                        ack = None
+                    if tabla is not None and ack == tabla.huella:
+                        guardar_hash(payload["delta_clave"], tabla)
                     return True
+                elif resp.status_code == 409 and payload is not payload_completo:
+                    logger.info("  ℹ️ Backend sin la base del delta — reenvío detalle completo")
+                    payload = payload_completo
+                    continue
                 elif 400 <= resp.status_code < 500:
                     logger.error(f"  ❌ Error cliente HTTP {resp.status_code}: {resp.text[:200]}")
                     return False
@@ -691,7 +750,7 @@ async def _subir_a_api(tenant: dict, datos: dict, filename: str) -> bool:
         return False
 
 
-def _resolver_id_dist_por_nombre(nombre_dist: str) -> Optional[int]:
+async def _resolver_id_dist_por_nombre(nombre_dist: str) -> Optional[int]:
     """
     Resuelve id_distribuidor por nombre usando API Shelfy.
     Evita hardcodear IDs para escenarios operativos especiales.
@@ -705,8 +764,8 @@ def _resolver_id_dist_por_nombre(nombre_dist: str) -> Optional[int]:
             return None
         target = _norm_txt(nombre_dist)
 
-        with httpx.Client(timeout=30) as client:
-            resp = client.get(
+        async with httpx.AsyncClient(timeout=30) as client:
+            resp = await client.get(
                 f"{api_url}/admin/distribuidoras",
                 headers={"x-api-key": api_key},
             )
@@ -744,23 +803,17 @@ async def _procesar_tenant(tenant: dict) -> dict:
     logger.info(f"🏢 Cuentas Corrientes: {tenant['nombre']}")
     logger.info(f"{'─'*50}")
 
-    async with async_playwright() as pw:
-        launch_kwargs = {
-            "headless": HEADLESS,
-            "args": ["--no-sandbox", "--disable-dev-shm-usage"],
-        }
-        # En algunos entornos arm64 el binario bundled de Playwright llega x86_64.
-        # Si Chrome local existe, usarlo evita el crash "Unknown system error -86".
-        if os.path.exists(CHROME_MAC_PATH):
-            launch_kwargs["executable_path"] = CHROME_MAC_PATH
-
-        browser: Browser = await pw.chromium.launch(**launch_kwargs)
+    sesion = _sesion_chess(tenant)
+    async with navegador("chess", headless=HEADLESS) as browser:
         context: BrowserContext = await browser.new_context(
             locale="es-AR",
             timezone_id="America/Argentina/Buenos_Aires",
             viewport={"width": 1280, "height": 800},
             accept_downloads=True,
+            # El split por sucursal reloguea en cada una: ahí no se reutiliza sesión.
+            storage_state=None if tenant.get("split_por_sucursal") else sesion.storage_state(),
         )
+        nav = await instalar_perfil(context, "chess")
         page: Page = await context.new_page()
         page.set_default_timeout(TIMEOUT_MS)
 
@@ -806,7 +859,7 @@ async def _procesar_tenant(tenant: dict) -> dict:
                             pass
 
                         clave_hash = f"cuentas_{tenant_id}_{sufijo}"
-                        if es_duplicado(clave_hash, file_bytes):
+                        if await asyncio.to_thread(es_duplicado, clave_hash, file_bytes):
                             uploads.append(
                                 {
                                     "sucursal": sucursal_objetivo,
@@ -830,7 +883,7 @@ async def _procesar_tenant(tenant: dict) -> dict:
                             )
                             continue
 
-                        id_dist_destino = _resolver_id_dist_por_nombre(nombre_dist_destino)
+                        id_dist_destino = await _resolver_id_dist_por_nombre(nombre_dist_destino)
                         if not id_dist_destino:
                             logger.error(f"  ❌ No se pudo resolver id_dist de '{nombre_dist_destino}'.")
                             ok_global = False
@@ -905,15 +958,16 @@ async def _procesar_tenant(tenant: dict) -> dict:
                     resultado["error"] = "fallo en split/subida a API"
                     resultado["uploads"] = uploads
             else:
-                # Login
-                await _hacer_login(page, tenant)
-                await _cerrar_popup_nexty(page)
+                # Login (o sesión cacheada)
+                with nav.paso("login"):
+                    await _asegurar_login(sesion, context, page, tenant)
 
                 # Flujo estándar (tenants sin split por sucursal)
-                await _navegar_y_procesar(page, tenant)
-                await _abrir_modal_exportacion(page)
-
-                file_bytes = await _descargar_excel(page, tenant_id)
+                with nav.paso("procesar"):
+                    await _navegar_y_procesar(page, tenant)
+                with nav.paso("descargar"):
+                    await _abrir_modal_exportacion(page)
+                    file_bytes = await _descargar_excel(page, tenant_id)
                 if not file_bytes:
                     resultado["error"] = "descarga fallida"
                     await _screenshot_error(page, tenant_id, "descarga")
@@ -925,7 +979,7 @@ async def _procesar_tenant(tenant: dict) -> dict:
                     pass
 
                 clave_hash = f"cuentas_{tenant_id}"
-                if es_duplicado(clave_hash, file_bytes):
+                if await asyncio.to_thread(es_duplicado, clave_hash, file_bytes):
                     resultado["estado"] = "sin_cambios"
                     return resultado
 
@@ -951,7 +1005,7 @@ async def _procesar_tenant(tenant: dict) -> dict:
 
         finally:
             await context.close()
-            await browser.close()
+            resultado["nav"] = nav.resumen()
 
     return resultado
 
@@ -982,31 +1036,40 @@ async def run() -> dict:
     logger.info(f"   Motor: {'v2 (red + fallback Excel)' if use_v2 else 'v1 (solo Excel legado)'}")
     logger.info("=" * 60)
 
-    resultados = []
-    for tenant in tenants_activos:
-        if use_v2:
-            from motores.chess_cuentas_v2.motor import run_tenant
-
-            sniff = (os.environ.get("RPA_CUENTAS_SNIFF_DUMP") or "").lower() in ("1", "true", "yes")
-            force_xl = (os.environ.get("RPA_CUENTAS_FORCE_EXCEL") or "").lower() in ("1", "true", "yes")
-            r = await run_tenant(
-                tenant["id"],
-                dry_run=False,
-                sniff_dump=sniff,
-                force_excel=force_xl,
-            )
-        else:
-            r = await _procesar_tenant(tenant)
-        resultados.append(r)
+    async def _uno(tenant: dict) -> dict:
+        try:
+            if use_v2:
+                from motores.chess_cuentas_v2.motor import run_tenant
+
+                sniff = (os.environ.get("RPA_CUENTAS_SNIFF_DUMP") or "").lower() in ("1", "true", "yes")
+                force_xl = (os.environ.get("RPA_CUENTAS_FORCE_EXCEL") or "").lower() in ("1", "true", "yes")
+                r = await run_tenant(
+                    tenant["id"],
+                    dry_run=False,
+                    sniff_dump=sniff,
+                    force_excel=force_xl,
+                )
+            else:
+                r = await _procesar_tenant(tenant)
+        except Exception as e:
+            # Un tenant caído no corta al resto (corren en paralelo).
+            r = {"tenant": tenant["id"], "nombre": tenant["nombre"], "estado": "error", "error": str(e)[:300]}
 
         iconos = {"subida_ok": "✅", "sin_cambios": "ℹ️ ", "error": "❌"}
         logger.info(f"  {tenant['nombre']}: {iconos.get(r['estado'], '?')} {r['estado']}")
         if r.get("error"):
             logger.error(f"    → {r['error']}")
+        from lib.api_client import notificar_error_motor, registrar_telemetria_motor
+
+        dist = int(tenant.get("id_dist") or tenant.get("id_distribuidor") or 0)
+        await registrar_telemetria_motor(
+            "cuentas_corrientes",
+            dist or None,
+            r.get("nav"),
+            tenant=tenant["id"],
+            error_msg=r.get("error") if r.get("estado") == "error" else None,
+        )
         if r.get("estado") == "error":
-            from lib.api_client import notificar_error_motor
-
-            dist = int(tenant.get("id_dist") or tenant.get("id_distribuidor") or 0)
             try:
                 await notificar_error_motor(
                     "cuentas_corrientes",
@@ -1015,6 +1078,10 @@ async def run() -> dict:
                 )
             except Exception as notify_exc:
                 logger.warning("No se pudo notificar error CC dist=%s: %s", dist, notify_exc)
+        return r
+
+    # Tenants CHESS en paralelo; lib/browser_pool acota contextos (RPA_PORTAL_LIMIT_CHESS).
+    resultados = list(await asyncio.gather(*(_uno(t) for t in tenants_activos)))
 
     fin = datetime.now(AR_TZ)
     duracion = (fin - inicio).total_seconds() / 60
@@ -23,17 +23,20 @@ from datetime import date, datetime, timedelta
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import Page
 
 from lib.logger import get_logger
-from lib.hash_guard import es_duplicado, guardar_hash
-from lib.api_client import subir_ventas_enriched, notificar_error_motor
-from lib.padron_schedule import padron_consolido_lock
+from lib.hash_guard import calcular_delta, delta_habilitado, es_duplicado, guardar_hash
+from lib.api_client import notificar_error_motor, registrar_telemetria_motor, subir_ventas_enriched
+from lib.browser_pool import navegador
+from lib.playwright_nav import instalar_perfil
+from lib.padron_schedule import padron_consolido_lock_async
 from motores.padron import (
     _cargar_tenants_desde_supabase,
     _filtrar_tenants_para_debug,
     _resolver_credenciales_consolido,
-    _navegar_y_login,
+    _asegurar_login,
+    _sesion_consolido,
     _ejecutar_reporte,
     _descargar_excel,
     _cerrar_overlays,
@@ -41,7 +44,6 @@ from motores.padron import (
     _set_empresa_padron,
     seleccionar_proceso_reporteador,
     ADMIN_PROCESOS_URL,
-    HEADLESS,
     COMBO_TIMEOUT_MS,
 )
 
@@ -422,7 +424,7 @@ async def run(
     Rango custom: `runner.py informe_ventas 01/05/2026 06/05/2026`.
     """
     resumen = {"ok": 0, "errores": 0, "sin_cambios": 0, "detalle": [], "rango": {}}
-    tenants = _filtrar_tenants_para_debug(_cargar_tenants_desde_supabase())
+    tenants = _filtrar_tenants_para_debug(await asyncio.to_thread(_cargar_tenants_desde_supabase))
     if not tenants:
         return resumen
 
@@ -446,14 +448,17 @@ async def run(
 
     usuario, password = _resolver_credenciales_consolido()
 
-    with padron_consolido_lock():
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=HEADLESS)
-            context = await browser.new_context(accept_downloads=True)
+    async with padron_consolido_lock_async():
+        async with navegador("consolido") as browser:
+            sesion = _sesion_consolido(usuario)
+            context = await browser.new_context(accept_downloads=True, storage_state=sesion.storage_state())
+            nav = await instalar_perfil(context, "consolido")
             page = await context.new_page()
             try:
-                await _navegar_y_login(page, tenants[0], usuario, password)
-                await _abrir_reporteador_y_seleccionar_informe(page)
+                with nav.paso("login"):
+                    await _asegurar_login(sesion, context, page, tenants[0], usuario, password)
+                with nav.paso("reporteador"):
+                    await _abrir_reporteador_y_seleccionar_informe(page)
 
                 for tenant in tenants:
                     tid = str(tenant.get("id", ""))
@@ -470,7 +475,8 @@ async def run(
                         )
                         await _esperar_comboboxes_parametros(page, min_count=1)
                         await _set_empresa_padron(page, tenant)
-                        await _ejecutar_reporte(page)
+                        with nav.paso("ejecutar"):
+                            await _ejecutar_reporte(page)
                         if await _reporte_sin_movimientos(page):
                             logger.info(
                                 "  ℹ️ Sin movimientos en el rango — omitiendo export/ingesta"
@@ -495,15 +501,18 @@ async def run(
                             resumen["detalle"].append(item)
                             await asyncio.sleep(2)
                             continue
-                        archivo = await _descargar_excel(
-                            page, {"id": f"ventas_enriched_{tid}"}
-                        )
+                        with nav.paso("descargar"):
+                            archivo = await _descargar_excel(
+                                page, {"id": f"ventas_enriched_{tid}"}
+                            )
                         if not archivo:
                             raise RuntimeError("No se pudo descargar excel de informe de ventas")
 
                         hk = f"ventas_enriched_{tid}"
                         skip_hash = _force_ingest() or modo in ("full_mtd", "custom")
-                        if not skip_hash and es_duplicado(hk, str(archivo)):
+                        if not skip_hash and await asyncio.to_thread(
+                            es_duplicado, hk, str(archivo)
+                        ):
                             logger.info("  ⏭️  Sin cambios (hash igual al anterior)")
                             resumen["sin_cambios"] += 1
                             item["sin_cambios"] = 1
@@ -532,7 +541,12 @@ async def run(
                                         f"Ingesta local falló: {ingest_out}"
                                     )
                             else:
-                                ok = await subir_ventas_enriched(archivo, tid)
+                                delta = (
+                                    await asyncio.to_thread(calcular_delta, hk, str(archivo))
+                                    if delta_habilitado()
+                                    else None
+                                )
+                                ok = await subir_ventas_enriched(archivo, tid, delta=delta)
                                 if not ok:
                                     raise RuntimeError(
                                         "Upload ventas-enriched rechazado por API"
@@ -569,8 +583,15 @@ async def run(
                     await asyncio.sleep(2)
             finally:
                 await context.close()
-                await browser.close()
-
+                resumen["nav"] = nav.resumen()
+
+    # Una sola corrida de navegador para todos los tenants: telemetría sin dist.
+    await registrar_telemetria_motor(
+        "informe_ventas",
+        None,
+        resumen.get("nav"),
+        error_msg=f"{resumen['errores']} tenant(s) con error" if resumen["errores"] else None,
+    )
     logger.info(
         "INFORME_VENTAS resumen — ok=%s errores=%s sin_cambios=%s",
         resumen["ok"],
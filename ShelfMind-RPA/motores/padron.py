@@ -13,6 +13,7 @@ Chicos primero (beltrocco, …), tabaco/aloma al final; lock exclusivo Consolido
      a. Abre un navegador invisible
      b. Navega a consolido.nextbyn.com
      c. Login con UN usuario/password Consolido (Vault: consolido_usuario/password)
+        (o reutiliza la sesión cifrada de lib/session_cache si sigue viva)
      d. Accede al módulo REPORTEADOR GENÉRICO
      e. Selecciona el reporte "Padrón de Clientes"
      f. Configura parámetros: "Incluyí Anulados" = SI (env PADRON_INCLUIR_ANULADOS=false para NO), "Empresas" = tenant actual
@@ -24,6 +25,11 @@ Chicos primero (beltrocco, …), tabaco/aloma al final; lock exclusivo Consolido
   2. Si un tenant falla, guarda screenshot y continúa con el siguiente
   3. Al final escribe el resumen completo en el log
 
+Con `RPA_PADRON_ENGINE=v2` los pasos h–k los hace `motores/consolido_padron_v2`: el resultado
+se toma del JSON que alimenta la grilla (sin esperar el render de ag-grid ni exportar el Excel)
+y se sube como tabla/delta del Hash Guard; si no hay JSON reconocible sigue por el Excel de
+abajo. Por defecto v1 (solo Excel) hasta registrar paridad por tenant con compare_bench.py.
+
 TENANTS (verificados contra Consolido — valores reales de IDEMPRESA):
   - tabaco    : TABACO & HNOS S.R.L.              → IDEMPRESA=3154
   - aloma     : ALOMA DISTRIBUIDORES OFICIALES    → (a confirmar ID)
@@ -69,18 +75,26 @@ from typing import Optional
 from zoneinfo import ZoneInfo
 
 from playwright.async_api import (
-    async_playwright, Browser, BrowserContext, Page, Download
+    Browser, BrowserContext, Page, Download
 )
 
 from lib.logger import get_logger
-from lib.hash_guard import es_duplicado, guardar_hash
-from lib.api_client import subir_padron, registrar_padron_sin_cambios, notificar_error_motor
+from lib.browser_pool import navegador
+from lib.hash_guard import calcular_delta, delta_habilitado, es_duplicado, guardar_hash
+from lib.api_client import (
+    notificar_error_motor,
+    registrar_padron_sin_cambios,
+    registrar_telemetria_motor,
+    subir_padron,
+)
+from lib.playwright_nav import instalar_perfil
 from lib.padron_schedule import (
     DEFAULT_MAX_AGE_HOURS,
     list_stale_tenant_ids,
     ordenar_tenants_para_corrida,
-    padron_consolido_lock,
+    padron_consolido_lock_async,
 )
+from lib.session_cache import SesionPortal, probe_spa
 from lib.vault_client import get_secret
 
 # ─────────────────────────────────────────────────────────────────
@@ -358,6 +372,23 @@ async def _navegar_y_login(page: Page, tenant: dict, usuario: str, password: str
     logger.info(f"  ✅ Login exitoso — {tenant['nombre']}")
 
 
+def _sesion_consolido(usuario: str) -> SesionPortal:
+    """Sesión cacheada de la credencial Consolido (compartida por todos los tenants)."""
+    return SesionPortal("consolido", usuario)
+
+
+async def _asegurar_login(
+    sesion: SesionPortal, context: BrowserContext, page: Page, tenant: dict, usuario: str, password: str
+) -> bool:
+    """Reutiliza la sesión cacheada (probe: abre el administrador de procesos) o hace login."""
+    return await sesion.asegurar(
+        context,
+        page,
+        login=lambda: _navegar_y_login(page, tenant, usuario, password),
+        probe=probe_spa(ADMIN_PROCESOS_URL, login_selector='input[type="password"]', ok_fragment="administrador-de-procesos"),
+    )
+
+
 # ─────────────────────────────────────────────────────────────────
 # UI Angular Material (Consolido Reporteador)
 # ─────────────────────────────────────────────────────────────────
@@ -734,67 +765,62 @@ async def _ejecutar_reporte(page: Page, *, tenant_id: str = "") -> None:
     Hace clic en el botón "Ejecutar" para correr el reporte.
 
     Selector exacto capturado: button#button-procesar.botonProcesar
-    Espera que la tabla de resultados se cargue (puede tardar >1 min en reportes grandes).
+    Espera por evento (sin polling) lo primero entre el heading "Resultados (N)" y el
+    mensaje de éxito; después, que la grilla tenga filas renderizadas (puede tardar >1 min
+    en reportes grandes).
     """
+    from lib.playwright_nav import esperar_primero, senal_locator
+
     logger.info("  Ejecutando reporte...")
 
     # Botón Ejecutar — selector exacto capturado en vivo
     ejecutar_btn = page.locator('button#button-procesar')
 
-    # ESTRATEGIA: Clickear Ejecutar y esperar a que aparezcan los resultados
     try:
         logger.info("  🔲 Clickeando botón Ejecutar...")
         await ejecutar_btn.click(timeout=10_000)
-        logger.info("  ✅ Botón clickeado. Esperando procesamiento del servidor (max 120s)...")
     except Exception as e:
         logger.error(f"  ❌ Error clickeando Ejecutar: {type(e).__name__}: {e}")
         raise
 
-    # ESTRATEGIA: Esperar con polling — cada 5s verificar estado
     max_tiempo = _report_poll_max_sec(tenant_id)
-    logger.info("  ⏳ Iniciando polling cada 5 segundos (máx %ss)...", max_tiempo)
-    tiempo_inicial = datetime.now(AR_TZ)
-    tiempo_transcurrido = 0
-
-    while tiempo_transcurrido < max_tiempo:
-        await page.wait_for_timeout(5000)
-        tiempo_transcurrido = int((datetime.now(AR_TZ) - tiempo_inicial).total_seconds())
-
-        try:
-            # Verificar si la tabla existe (sea visible o no)
-            ag_root_count = await page.locator('.ag-root').count()
-            logger.info(f"    [{tiempo_transcurrido}s] .ag-root encontrado: {ag_root_count > 0}")
-
-            # Verificar si hay heading "Resultados (XXXX):"
-            try:
-                # Buscar texto que contenga "Resultados" seguido de paréntesis con número
-                resultados_heading = await page.locator("text=/Resultados\\s*\\(\\d+\\)/i").first.text_content(timeout=2000)
-                if resultados_heading:
-                    logger.info(f"    [{tiempo_transcurrido}s] ✅ {resultados_heading.strip()}")
-                    await page.wait_for_timeout(3000)  # Esperar extra a que se renderice completamente
-                    logger.info(f"  ✅ Reporte completado exitosamente")
-                    return
-            except Exception:
-                pass  # Heading no encontrado aún
-
-            # Verificar si hay mensaje de éxito visible
-            try:
-                success_msg = await page.locator("text=/ejecutado con éxito|success|completado/i").first.text_content(timeout=2000)
-                if success_msg:
-                    logger.info(f"    [{tiempo_transcurrido}s] ✅ Mensaje de éxito: {success_msg.strip()[:80]}")
-                    await page.wait_for_timeout(3000)  # Esperar a que se renderize la tabla
-                    logger.info(f"  ✅ Reporte completado (por mensaje de éxito)")
-                    return
-            except Exception:
-                pass  # Sin mensaje de éxito aún
-
-        except Exception as e:
-            logger.warning(f"    [{tiempo_transcurrido}s] Error en polling: {type(e).__name__}")
-            pass
+    logger.info("  ✅ Botón clickeado. Esperando resultados del servidor (máx %ss)...", max_tiempo)
+    heading = page.locator("text=/Resultados\\s*\\(\\d+\\)/i").first
+    espera = await esperar_primero(
+        "reporte",
+        {
+            "heading": senal_locator(heading, timeout_ms=max_tiempo * 1000),
+            "mensaje_exito": senal_locator(
+                page.locator("text=/ejecutado con éxito|success|completado/i").first,
+                timeout_ms=max_tiempo * 1000,
+            ),
+        },
+        timeout_s=max_tiempo,
+    )
+    if not espera.ok:
+        logger.warning("  ⚠️ Timeout de %ss alcanzado sin detectar resultados.", max_tiempo)
+        logger.info(f"  Continuando de todas formas para intentar exportar...")
+        # El reporte puede haberse ejecutado igual, intentaremos descargar
+        return
 
-    logger.warning("  ⚠️ Timeout de %ss alcanzado sin detectar resultados.", max_tiempo)
-    logger.info(f"  Continuando de todas formas para intentar exportar...")
-    # El reporte puede haberse ejecutado igual, intentaremos descargar
+    try:
+        texto = (await heading.text_content(timeout=1_000) or "").strip()
+    except Exception:
+        texto = ""
+    logger.info("    [%.0fs] ✅ %s", espera.s, texto or espera.via)
+    # La exportación usa la grilla: esperar filas renderizadas (o el overlay "sin filas"),
+    # no sólo .ag-root montado, que existe desde antes de que lleguen los datos.
+    grilla = await esperar_primero(
+        "grilla",
+        {
+            "filas": senal_locator(page.locator(".ag-center-cols-container .ag-row").first, timeout_ms=30_000),
+            "sin_filas": senal_locator(page.locator(".ag-overlay-no-rows-center").first, timeout_ms=30_000),
+        },
+        timeout_s=30,
+    )
+    if not grilla.ok:
+        logger.warning("  ⚠️ La grilla no mostró filas en 30s; se intenta exportar igual.")
+    logger.info(f"  ✅ Reporte completado exitosamente")
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -882,13 +908,16 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
     try:
         logger.info(f"\n  ┌─ Procesando tenant: {tenant['nombre']}")
 
-        # Crear contexto de navegador
-        context = await browser.new_context(accept_downloads=True)
+        # Crear contexto de navegador (con la sesión cacheada si hay)
+        sesion = _sesion_consolido(usuario)
+        context = await browser.new_context(accept_downloads=True, storage_state=sesion.storage_state())
+        nav = await instalar_perfil(context, "consolido")
         page = await context.new_page()
 
         # PASO 1: Login
         try:
-            await _navegar_y_login(page, tenant, usuario, password)
+            with nav.paso("login"):
+                await _asegurar_login(sesion, context, page, tenant, usuario, password)
         except Exception as e:
             logger.error(f"  Error en login: {e}")
             await _screenshot_error(page, tenant["id"], "login")
@@ -899,7 +928,8 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
 
         # PASO 2: Seleccionar reporte Padrón
         try:
-            await _seleccionar_reporte_padron(page)
+            with nav.paso("seleccionar_padron"):
+                await _seleccionar_reporte_padron(page)
         except Exception as e:
             logger.error(f"  Error seleccionando Padrón: {e}")
             await _screenshot_error(page, tenant["id"], "seleccionar_padron")
@@ -910,7 +940,8 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
 
         # PASO 3: Configurar parámetros
         try:
-            await _configurar_parametros(page, tenant)
+            with nav.paso("parametros"):
+                await _configurar_parametros(page, tenant)
         except Exception as e:
             logger.error(f"  Error configurando parámetros: {e}")
             await _screenshot_error(page, tenant["id"], "parametros")
@@ -921,7 +952,8 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
 
         # PASO 4: Ejecutar
         try:
-            await _ejecutar_reporte(page, tenant_id=str(tenant.get("id", "")))
+            with nav.paso("ejecutar"):
+                await _ejecutar_reporte(page, tenant_id=str(tenant.get("id", "")))
         except Exception as e:
             logger.error(f"  Error ejecutando reporte: {e}")
             await _screenshot_error(page, tenant["id"], "ejecutar")
@@ -932,7 +964,8 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
 
         # PASO 5: Descargar
         try:
-            archivo = await _descargar_excel(page, {**tenant, "id": f"padron_{tenant['id']}"})
+            with nav.paso("descargar"):
+                archivo = await _descargar_excel(page, {**tenant, "id": f"padron_{tenant['id']}"})
             if not archivo:
                 resumen["errores"] += 1
                 resumen["error_msg"] = "descargar: Excel no obtenido"
@@ -947,12 +980,14 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
             return resumen
 
         await context.close()
+        resumen["nav"] = nav.resumen()
 
         # PASO 6: Hash Guard (deduplicación)
         logger.info(f"  Verificando con Hash Guard...")
         hash_key = f"padron_{tenant['id']}"
 
-        if es_duplicado(hash_key, str(archivo)):
+        # Lectura por filas del Excel (CPU): fuera del loop para no frenar otros tenants.
+        if await asyncio.to_thread(es_duplicado, hash_key, str(archivo)):
             logger.info(f"  ⏭️  Archivo idéntico al anterior — sin cambios")
             await registrar_padron_sin_cambios(tenant["id_dist"])
             resumen["sin_cambios"] += 1
@@ -961,7 +996,12 @@ async def _procesar_tenant(browser: Browser, tenant: dict, usuario: str, passwor
         # PASO 7: Subir a API
         logger.info(f"  Subiendo a API...")
         try:
-            subido_ok = await subir_padron(archivo, tenant["id_dist"])
+            delta = (
+                await asyncio.to_thread(calcular_delta, hash_key, str(archivo))
+                if delta_habilitado()
+                else None
+            )
+            subido_ok = await subir_padron(archivo, tenant["id_dist"], delta=delta)
             if not subido_ok:
                 raise RuntimeError("Upload padrón rechazado por API")
             guardar_hash(hash_key, str(archivo))
@@ -993,9 +1033,19 @@ def cargar_tenants_activos() -> list[dict]:
     return _filtrar_tenants_para_debug(tenants)
 
 
+def _padron_engine_v2() -> bool:
+    """v1 por defecto; RPA_PADRON_ENGINE=v2 activa JSON de red + fallback Excel (tras compare_bench)."""
+    raw = (os.environ.get("RPA_PADRON_ENGINE") or "v1").strip().lower()
+    return raw in ("v2", "2", "network", "red")
+
+
 async def _procesar_tenant_con_reintentos(
     browser: Browser, tenant: dict, usuario: str, password: str
 ) -> dict:
+    if _padron_engine_v2():
+        from motores.consolido_padron_v2.motor import _procesar_tenant_v2 as procesar
+    else:
+        procesar = _procesar_tenant
     resumen_tenant = {"ok": 0, "errores": 1, "sin_cambios": 0}
     for intento in range(1, TENANT_RETRY_MAX + 2):
         if intento > 1:
@@ -1003,7 +1053,7 @@ async def _procesar_tenant_con_reintentos(
                 f"🔁 Reintentando tenant {tenant['id']} "
                 f"({intento - 1}/{TENANT_RETRY_MAX})..."
             )
-        resumen_tenant = await _procesar_tenant(browser, tenant, usuario, password)
+        resumen_tenant = await procesar(browser, tenant, usuario, password)
         if resumen_tenant.get("ok", 0) > 0 or resumen_tenant.get("sin_cambios", 0) > 0:
             break
         if intento < (TENANT_RETRY_MAX + 1):
@@ -1017,7 +1067,7 @@ async def run_tenant(tenant_id: str, *, lock_timeout_sec: float | None = None) -
     Usa lock de archivo: si otro tenant está en Consolido, espera a que termine.
     """
     tenant_id = (tenant_id or "").strip().lower()
-    tenants = cargar_tenants_activos()
+    tenants = await asyncio.to_thread(cargar_tenants_activos)
     tenant = next((t for t in tenants if str(t.get("id", "")).lower() == tenant_id), None)
     if not tenant:
         logger.error("Tenant padrón desconocido o inactivo: %s", tenant_id)
@@ -1030,18 +1080,17 @@ async def run_tenant(tenant_id: str, *, lock_timeout_sec: float | None = None) -
     resumen = {"ok": 0, "errores": 0, "sin_cambios": 0, "tenant_id": tenant_id}
     lock_kwargs = {} if lock_timeout_sec is None else {"timeout_sec": lock_timeout_sec}
     try:
-        with padron_consolido_lock(**lock_kwargs):
+        async with padron_consolido_lock_async(**lock_kwargs):
             usuario, password = _resolver_credenciales_consolido()
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=HEADLESS)
-                try:
-                    r = await _procesar_tenant_con_reintentos(browser, tenant, usuario, password)
-                    resumen["ok"] = r.get("ok", 0)
-                    resumen["errores"] = r.get("errores", 0)
-                    resumen["sin_cambios"] = r.get("sin_cambios", 0)
-                    resumen["error_msg"] = r.get("error_msg")
-                finally:
-                    await browser.close()
+            async with navegador("consolido") as browser:
+                r = await _procesar_tenant_con_reintentos(browser, tenant, usuario, password)
+                resumen["ok"] = r.get("ok", 0)
+                resumen["errores"] = r.get("errores", 0)
+                resumen["sin_cambios"] = r.get("sin_cambios", 0)
+                resumen["error_msg"] = r.get("error_msg")
+                if r.get("nav"):
+                    resumen["nav"] = r["nav"]
+                    logger.info("  Red %s: %s", tenant_id, r["nav"])
     except RuntimeError as e:
         if "lock padrón Consolido" in str(e):
             logger.warning("Tenant %s diferido — Consolido ocupado: %s", tenant_id, e)
@@ -1049,6 +1098,13 @@ async def run_tenant(tenant_id: str, *, lock_timeout_sec: float | None = None) -
             resumen["error_msg"] = str(e)[:500]
             return resumen
         raise
+    await registrar_telemetria_motor(
+        "padron",
+        int(tenant.get("id_dist") or 0) or None,
+        resumen.get("nav"),
+        tenant=tenant_id,
+        error_msg=resumen.get("error_msg") if resumen.get("errores", 0) > 0 else None,
+    )
     if resumen.get("errores", 0) > 0:
         msg = resumen.get("error_msg") or f"RPA padrón falló tenant={tenant_id}"
         try:
@@ -1064,8 +1120,8 @@ async def run_catchup_stale(max_age_hours: float | None = None) -> dict:
     Scheduler de ola usa ~2.5h; arranque del servicio usa PADRON_MAX_AGE_HOURS (11h).
     """
     hours = DEFAULT_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
-    tenants = cargar_tenants_activos()
-    stale_ids = list_stale_tenant_ids(tenants, max_age_hours=hours)
+    tenants = await asyncio.to_thread(cargar_tenants_activos)
+    stale_ids = await asyncio.to_thread(list_stale_tenant_ids, tenants, max_age_hours=hours)
     resumen_total = {
         "ok": 0,
         "errores": 0,
@@ -1088,7 +1144,7 @@ async def run_catchup_stale(max_age_hours: float | None = None) -> dict:
         resumen_total["ok"] += r.get("ok", 0)
         resumen_total["errores"] += r.get("errores", 0)
         resumen_total["sin_cambios"] += r.get("sin_cambios", 0)
-    still = list_stale_tenant_ids(tenants, max_age_hours=hours)
+    still = await asyncio.to_thread(list_stale_tenant_ids, tenants, max_age_hours=hours)
     if still:
         logger.warning("Catch-up padrón incompleto — siguen stale: %s", still)
         resumen_total["errores"] += len(still)
@@ -12,6 +12,8 @@ from zoneinfo import ZoneInfo
 from playwright.async_api import Browser, BrowserContext, Download, Page, async_playwright
 
 from lib.logger import get_logger
+from lib.playwright_nav import es_post_a, esperar_primero, esperar_respuesta, instalar_perfil, senal_dom
+from lib.session_cache import SesionPortal, probe_request
 from lib.vault_client import get_secret
 
 logger = get_logger("REND_CALLE")
@@ -348,6 +350,16 @@ async def _login(page: Page, tenant: dict) -> None:
     await _esperar_ui_lista(page)
 
 
+def _sesion_nextbyn(tenant: dict) -> SesionPortal:
+    """Sesión cacheada por usuario NextByn resuelto (misma que SIGO si es el mismo usuario)."""
+    return SesionPortal("nextbyn", _secret_user(tenant))
+
+
+async def _asegurar_login(sesion: SesionPortal, context: BrowserContext, page: Page, tenant: dict) -> bool:
+    """Sesión cacheada del portal si sigo.aspx responde 200 sin redirigir al login; si no, _login."""
+    return await sesion.asegurar(context, page, login=lambda: _login(page, tenant), probe=probe_request(URL_SIGO))
+
+
 async def _abrir_modulo(page: Page) -> None:
     try:
         await page.goto(URL_SIGO, wait_until="domcontentloaded")
@@ -395,6 +407,24 @@ async def _wait_cmbx_sucursal_loading_done(page: Page) -> None:
         pass
 
 
+_JS_HAY_SUCURSALES = """(baseId) => {
+  for (const td of document.querySelectorAll('td[id^="' + baseId + '_DDD_L_LBI"]')) {
+    if (/LBI\\d+T0$/i.test(td.id || '') && (td.textContent || '').replace(/\\u00a0/g, ' ').trim()) return true;
+  }
+  return false;
+}"""
+
+
+async def _esperar_items_sucursal(page: Page, timeout_ms: int) -> bool:
+    """Listbox del combo sucursal con al menos un ítem con texto (predicado por mutación del DOM)."""
+    espera = await esperar_primero(
+        "combo_sucursal",
+        {"items": senal_dom(page, _JS_HAY_SUCURSALES, arg=_suc_combo_base_id(), timeout_ms=timeout_ms)},
+        timeout_s=timeout_ms / 1000,
+    )
+    return espera.ok
+
+
 async def _collect_sucursal_items_text(page: Page) -> list[str]:
     """
     Textos de sucursal del combo Entorno.
@@ -497,12 +527,8 @@ async def _dx_abrir_combo_sucursal(page: Page, for_selection: bool = False) -> N
                 continue
             await _wait_cmbx_sucursal_loading_done(page)
             await _esperar_ui_lista(page)
-            poll = 70 if for_selection else 45
-            for _ in range(poll):
-                if await _collect_sucursal_items_text(page):
-                    await page.wait_for_timeout(150)
-                    return
-                await page.wait_for_timeout(200)
+            if await _esperar_items_sucursal(page, 14_000 if for_selection else 9_000):
+                return
             last_exc = RuntimeError("combo sucursal abierto pero sin textos de sucursal")
     raise RuntimeError(f"No se abrió dropdown sucursal Entorno: {last_exc!r}") from last_exc
 
@@ -515,11 +541,8 @@ async def _leer_sucursales(page: Page) -> list[str]:
     suc: list[str] = []
     for reopen in range(3):
         await _abrir_popup_entorno(page)
-        for _ in range(70):
+        if await _esperar_items_sucursal(page, 14_000):
             suc = await _collect_sucursal_items_text(page)
-            if suc:
-                break
-            await page.wait_for_timeout(200)
         if suc:
             if len(suc) >= 2 or reopen == 2:
                 try:
@@ -809,11 +832,15 @@ async def _aplicar_entorno(page: Page) -> None:
     """
     Click explicito en el boton Aplicar del popup Entorno.
     """
-    # Priorizar el ID exacto que pasaste.
-    try:
-        await page.locator("#ContentPlaceHolder2_Popup_btnAplicarImg").first.click(timeout=8_000)
-    except Exception:
-        await page.locator("#ContentPlaceHolder2_Popup_btnAplicar").first.click(timeout=8_000)
+    async def _click() -> None:
+        # Priorizar el ID exacto que pasaste.
+        try:
+            await page.locator("#ContentPlaceHolder2_Popup_btnAplicarImg").first.click(timeout=8_000)
+        except Exception:
+            await page.locator("#ContentPlaceHolder2_Popup_btnAplicar").first.click(timeout=8_000)
+
+    # Termina con el callback DevExpress (POST a sigo.aspx); el overlay a veces no llega a mostrarse.
+    await esperar_respuesta("entorno_aplicar", page, es_post_a("sigo.aspx"), _click, timeout_ms=20_000)
 
     await _esperar_ui_lista(page)
     # Si cierra popup, mejor; si no, seguimos igual.
@@ -991,25 +1018,31 @@ async def _procesar_tenant(tenant: dict) -> dict:
     async with async_playwright() as pw:
         browser_args = ["--no-sandbox", "--disable-dev-shm-usage", "--window-size=980,720"]
         browser: Browser = await pw.chromium.launch(headless=HEADLESS, args=browser_args)
+        sesion = _sesion_nextbyn(tenant)
         context: BrowserContext = await browser.new_context(
             locale="es-AR",
             timezone_id="America/Argentina/Buenos_Aires",
             viewport={"width": 980, "height": 720},
             accept_downloads=True,
+            storage_state=sesion.storage_state(),
         )
+        nav = await instalar_perfil(context, "sigo")
         page = await context.new_page()
         page.set_default_timeout(TIMEOUT_MS)
         try:
-            await _login(page, tenant)
-            await _abrir_modulo(page)
-            await _esperar_input_entorno_sucursal(page)
+            with nav.paso("login"):
+                await _asegurar_login(sesion, context, page, tenant)
+            with nav.paso("abrir_modulo"):
+                await _abrir_modulo(page)
+                await _esperar_input_entorno_sucursal(page)
             await page.wait_for_timeout(1_500)
             todas = await _leer_sucursales(page)
             sucursales = _filtrar_sucursales_objetivo(tenant, todas)
             logger.info(f"  Sucursales ({tenant['id']}) detectadas: {todas}")
             logger.info(f"  Sucursales ({tenant['id']}) objetivo: {sucursales}")
             for s in sucursales:
-                r_suc = await _procesar_sucursal(page, tenant, s)
+                with nav.paso("sucursales"):
+                    r_suc = await _procesar_sucursal(page, tenant, s)
                 res["sucursales"].append(r_suc)
                 if FAIL_FAST and r_suc.get("error"):
                     raise RuntimeError(f"Fail-fast activado: error en sucursal '{s}'")
@@ -1020,6 +1053,7 @@ async def _procesar_tenant(tenant: dict) -> dict:
         finally:
             await context.close()
             await browser.close()
+            res["nav"] = nav.resumen()
     return res
 
 
@@ -1040,6 +1074,11 @@ async def run(tenant_only: str | None = None) -> dict:
         logger.info(f"\n{'='*40}\n🏢 {t['nombre']}\n{'='*40}")
         r = await _procesar_tenant(t)
         out.append(r)
+        from lib.api_client import registrar_telemetria_motor
+
+        await registrar_telemetria_motor(
+            "rendimiento_calle", t.get("id_dist"), r.get("nav"), tenant=t["id"], error_msg=r.get("error")
+        )
         errs = sum(1 for s in r["sucursales"] if s.get("error"))
         logger.info(f"  Resultado {t['id']}: sucursales={len(r['sucursales'])} errores_suc={errs} fatal={bool(r.get('error'))}")
 
@@ -71,12 +71,15 @@ from typing import Optional
 from zoneinfo import ZoneInfo
 
 from playwright.async_api import (
-    async_playwright, Browser, BrowserContext, Page, Download
+    BrowserContext, Page, Download
 )
 
 from lib.logger import get_logger
+from lib.browser_pool import navegador
+from lib.playwright_nav import es_post_a, esperar_respuesta, instalar_perfil
 from lib.hash_guard import es_duplicado, guardar_hash
-from lib.api_client import subir_sigo
+from lib.api_client import registrar_telemetria_motor, subir_sigo
+from lib.session_cache import SesionPortal, probe_request
 from lib.vault_client import get_secret
 
 # ─────────────────────────────────────────────────────────────────
@@ -315,6 +318,24 @@ async def _cerrar_popup_aviso(page: Page) -> None:
         pass
 
 
+def _sesion_nextbyn(empresa: dict) -> SesionPortal:
+    """Sesión cacheada por usuario NextByn resuelto (no por nombre del secret)."""
+    return SesionPortal("nextbyn", get_secret(empresa["vault_user"]))
+
+
+async def _asegurar_login(sesion: SesionPortal, context: BrowserContext, page: Page, empresa: dict) -> bool:
+    """
+    Reutiliza la sesión cacheada del portal (probe: GET de sigo.aspx sin seguir el redirect
+    a Default.aspx). Si venció: login + popup de aviso y se guarda el estado nuevo.
+    """
+
+    async def _login() -> None:
+        await _hacer_login(page, empresa)
+        await _cerrar_popup_aviso(page)
+
+    return await sesion.asegurar(context, page, login=_login, probe=probe_request(URL_SIGO))
+
+
 # ─────────────────────────────────────────────────────────────────
 # PASO 3: NAVEGAR A SIGO Y ESPERAR "ENTORNO DE TRABAJO"
 # ─────────────────────────────────────────────────────────────────
@@ -394,14 +415,15 @@ async def _configurar_entorno(page: Page, sucursal: str, fecha: str) -> None:
     # Establecer fecha (DevExpress date editor)
     await _dx_set_date(page, ID_ENTORNO_FECHA_I, fecha)
 
-    # Aplicar
-    await page.locator(f"#{ID_ENTORNO_APLICAR}").click()
-
-    # Esperar que el mapa actualice (networkidle o que el popup desaparezca)
-    try:
-        await page.wait_for_load_state("networkidle", timeout=20_000)
-    except Exception:
-        pass  # El mapa puede no disparar networkidle exacto
+    # Aplicar: resuelve con el callback DevExpress (POST a sigo.aspx), no con networkidle
+    # (el mapa sigue pidiendo tiles y networkidle casi nunca llega).
+    await esperar_respuesta(
+        "entorno_aplicar",
+        page,
+        es_post_a("sigo.aspx"),
+        lambda: page.locator(f"#{ID_ENTORNO_APLICAR}").click(),
+        timeout_ms=20_000,
+    )
 
     # Esperar que los botones de INICIO estén activos (indica que cargó)
     await page.locator("#ContentPlaceHolder2_btnClientes").wait_for(
@@ -444,8 +466,14 @@ async def _descargar_puntos_de_venta(
         logger.info(f"  [PDV] Corrigiendo fechas: {desde_actual}→{fecha}")
         await _dx_set_date(page, ID_PDV_DESDE_I, fecha)
         await _dx_set_date(page, ID_PDV_HASTA_I, fecha)
-        await page.locator(f"#{ID_PDV_APLICAR}").click()
-        # Esperar que la grilla refresque
+        # El botón XLS ya está visible antes de refrescar: esperar el callback de la grilla.
+        await esperar_respuesta(
+            "pdv_aplicar",
+            page,
+            es_post_a("sigo.aspx"),
+            lambda: page.locator(f"#{ID_PDV_APLICAR}").click(),
+            timeout_ms=TIMEOUT_MS,
+        )
         await page.locator(f"#{ID_PDV_XLS}").wait_for(state="visible", timeout=TIMEOUT_MS)
 
     logger.info(f"  [PDV] Descargando XLS...")
@@ -500,10 +528,14 @@ async def _descargar_ventas_fuera_de_ruta(
     await _dx_set_date(page, ID_VFR_DESDE_I, fecha)
     await _dx_set_date(page, ID_VFR_HASTA_I, fecha)
 
-    # Aplicar cambios (refresca la grilla con la nueva fecha)
-    await page.locator(f"#{ID_VFR_APLICAR}").click()
-
-    # Esperar que la grilla refresque — el botón de exportar vuelve a quedar disponible
+    # Aplicar cambios (refresca la grilla con la nueva fecha): esperar su callback
+    await esperar_respuesta(
+        "vfr_aplicar",
+        page,
+        es_post_a("sigo.aspx"),
+        lambda: page.locator(f"#{ID_VFR_APLICAR}").click(),
+        timeout_ms=TIMEOUT_MS,
+    )
     await page.locator(f"#{ID_VFR_XLSX}").wait_for(state="visible", timeout=TIMEOUT_MS)
 
     logger.info(f"  [VFR] Descargando XLSX...")
@@ -572,7 +604,7 @@ async def _procesar_sucursal(
 
         if bytes_pdv:
             clave = f"sigo_{empresa_id}_{suc_slug}_pdv"
-            if es_duplicado(clave, bytes_pdv):
+            if await asyncio.to_thread(es_duplicado, clave, bytes_pdv):
                 resultado["pdv"] = "sin_cambios"
                 logger.info(f"  [PDV] Sin cambios respecto al último upload")
             else:
@@ -589,7 +621,7 @@ async def _procesar_sucursal(
 
         if bytes_vfr:
             clave = f"sigo_{empresa_id}_{suc_slug}_vfr"
-            if es_duplicado(clave, bytes_vfr):
+            if await asyncio.to_thread(es_duplicado, clave, bytes_vfr):
                 resultado["vfr"] = "sin_cambios"
                 logger.info(f"  [VFR] Sin cambios respecto al último upload")
             else:
@@ -640,27 +672,27 @@ async def _procesar_empresa(empresa: dict, fecha: str) -> dict:
     logger.info(f"   Fecha: {fecha}")
     logger.info(f"{'─'*50}")
 
-    async with async_playwright() as pw:
-        browser: Browser = await pw.chromium.launch(
-            headless=HEADLESS,
-            args=["--no-sandbox", "--disable-dev-shm-usage"]
-        )
+    sesion = _sesion_nextbyn(empresa)
+    async with navegador("sigo", headless=HEADLESS) as browser:
         context: BrowserContext = await browser.new_context(
             locale="es-AR",
             timezone_id="America/Argentina/Buenos_Aires",
             viewport={"width": 1366, "height": 768},
             accept_downloads=True,
+            storage_state=sesion.storage_state(),
         )
+        nav = await instalar_perfil(context, "sigo")
         page: Page = await context.new_page()
         page.set_default_timeout(TIMEOUT_MS)
 
         try:
-            # ── Login ──────────────────────────────────────────────
-            await _hacer_login(page, empresa)
-            await _cerrar_popup_aviso(page)
+            # ── Login (o sesión cacheada) ──────────────────────────
+            with nav.paso("login"):
+                await _asegurar_login(sesion, context, page, empresa)
 
             # ── Navegar a SIGO ─────────────────────────────────────
-            await _navegar_a_sigo(page)
+            with nav.paso("navegar_sigo"):
+                await _navegar_a_sigo(page)
 
             # ── Leer sucursales (el popup Entorno ya está abierto) ─
             sucursales = await _leer_sucursales(page)
@@ -672,7 +704,8 @@ async def _procesar_empresa(empresa: dict, fecha: str) -> dict:
 
             # ── Iterar sucursales ──────────────────────────────────
             for sucursal in sucursales:
-                res_suc = await _procesar_sucursal(page, empresa, sucursal, fecha)
+                with nav.paso("sucursales"):
+                    res_suc = await _procesar_sucursal(page, empresa, sucursal, fecha)
                 resultado["sucursales"].append(res_suc)
 
         except Exception as e:
@@ -683,8 +716,8 @@ async def _procesar_empresa(empresa: dict, fecha: str) -> dict:
 
         finally:
             await context.close()
-            await browser.close()
-            logger.info(f"  Browser cerrado — empresa {empresa_id}")
+            resultado["nav"] = nav.resumen()
+            logger.info(f"  Contexto cerrado — empresa {empresa_id} — red {resultado['nav']}")
 
     return resultado
 
@@ -720,12 +753,25 @@ async def run(fecha_override: str = None) -> dict:
     logger.info(f"   Headless: {HEADLESS}")
     logger.info("=" * 60)
 
-    resultados = []
-
-    for empresa in EMPRESAS:
-        resultado = await _procesar_empresa(empresa, fecha)
-        resultados.append(resultado)
-
+    async def _uno(empresa: dict) -> dict:
+        try:
+            return await _procesar_empresa(empresa, fecha)
+        except Exception as e:
+            # Una empresa caída no corta al resto (corren en paralelo).
+            logger.error(f"  ❌ {empresa['nombre']}: error no controlado: {e}")
+            return {"empresa": empresa["id"], "nombre": empresa["nombre"], "sucursales": [], "error": str(e)[:300]}
+
+    # Empresas en paralelo hasta RPA_PORTAL_LIMIT_SIGO (lib/browser_pool, default 1).
+    resultados = list(await asyncio.gather(*(_uno(e) for e in EMPRESAS)))
+
+    for empresa, resultado in zip(EMPRESAS, resultados):
+        await registrar_telemetria_motor(
+            "sigo",
+            empresa.get("id_dist"),
+            resultado.get("nav"),
+            tenant=empresa["id"],
+            error_msg=resultado["error"],
+        )
         # Log resumido por empresa
         suc_ok  = sum(1 for s in resultado["sucursales"]
                       if s["pdv"] == "subida_ok" and s["vfr"] == "subida_ok")
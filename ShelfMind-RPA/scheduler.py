@@ -13,6 +13,10 @@ Horarios productivos (AR):
 
 Padrón: lock de archivo serializa Consolido; tenants chicos primero; catch-up si falta motor_run.
 
+Todos los jobs corren en un único event loop de larga vida (lib/browser_pool.LoopRpa):
+Chromium compartido, contextos acotados por pool/portal y cola de prioridad
+(cuentas > padrón > informe ventas > catch-up cuando los workers están ocupados).
+
 Inicio: python scheduler.py
 """
 
@@ -47,29 +51,53 @@ _SLOTS_PADRON = [(8, 30), (11, 30), (15, 30), (18, 30)]
 # 13/17/21 → últimos 7 días → hoy (ver informe_ventas.py)
 _SLOTS_INFORME_VENTAS = [(9, 45), (13, 0), (17, 0), (21, 0)]
 
+# Prioridad en la cola del loop RPA (menor = antes).
+PRIORIDAD_CUENTAS = 10
+PRIORIDAD_PADRON = 20
+PRIORIDAD_VENTAS = 30
+PRIORIDAD_CATCHUP = 40
+
+_LOOP = None  # lib.browser_pool.LoopRpa (main); sin loop cada job usa asyncio.run
+
+
+def _ejecutar(fabrica, *, prioridad: int, nombre: str):
+    """Corre la corrutina en el loop RPA compartido y espera (bloquea el hilo de APScheduler)."""
+    if _LOOP is None:
+        return asyncio.run(fabrica())
+    return _LOOP.ejecutar(fabrica, prioridad=prioridad, nombre=nombre)
+
 
 def job_cuentas():
     logger.info("⏰ Trigger CUENTAS")
     try:
-        asyncio.run(_run_cuentas())
+        _ejecutar(_run_cuentas, prioridad=PRIORIDAD_CUENTAS, nombre="cuentas")
     except Exception as e:
         logger.error(f"Error en job_cuentas: {e}")
-        asyncio.run(_notify_motor_crash("cuentas_corrientes", f"job_cuentas crash: {e}"))
+        msg = f"job_cuentas crash: {e}"  # `e` se borra al salir del except: no capturarla en la lambda
+        _ejecutar(
+            lambda: _notify_motor_crash("cuentas_corrientes", msg),
+            prioridad=0,
+            nombre="crash_cuentas",
+        )
 
 
 def job_padron_tenant(tenant_id: str):
     """Un distribuidor por disparo (espera lock si otro tenant está en Consolido)."""
     logger.info("⏰ Trigger PADRÓN tenant=%s", tenant_id)
     try:
-        asyncio.run(_run_padron_tenant(tenant_id))
+        _ejecutar(
+            lambda: _run_padron_tenant(tenant_id),
+            prioridad=PRIORIDAD_PADRON,
+            nombre=f"padron_{tenant_id}",
+        )
     except Exception as e:
         logger.error("Error en job_padron_tenant %s: %s", tenant_id, e)
-        asyncio.run(
-            _notify_motor_crash(
-                "padron",
-                f"job_padron_tenant {tenant_id} crash: {e}",
-                _dist_for_padron_tenant(tenant_id),
-            )
+        dist = _dist_for_padron_tenant(tenant_id)
+        msg = f"job_padron_tenant {tenant_id} crash: {e}"
+        _ejecutar(
+            lambda: _notify_motor_crash("padron", msg, dist),
+            prioridad=0,
+            nombre="crash_padron",
         )
 
 
@@ -77,30 +105,53 @@ def job_padron_catchup():
     """Cierra la ola: tenants que no corrieron en las últimas ~2.5 h."""
     logger.info("⏰ Trigger PADRÓN catch-up de ola")
     try:
-        asyncio.run(_run_padron_catchup(wave=True))
+        _ejecutar(
+            lambda: _run_padron_catchup(wave=True),
+            prioridad=PRIORIDAD_CATCHUP,
+            nombre="padron_catchup",
+        )
     except Exception as e:
         logger.error(f"Error en job_padron_catchup: {e}")
-        asyncio.run(_notify_motor_crash("padron", f"job_padron_catchup crash: {e}"))
+        msg = f"job_padron_catchup crash: {e}"
+        _ejecutar(
+            lambda: _notify_motor_crash("padron", msg),
+            prioridad=0,
+            nombre="crash_padron",
+        )
 
 
 def job_padron_startup_catchup():
     """Arranque del servicio: cualquier tenant con padrón viejo (>11 h)."""
     logger.info("⏰ Trigger PADRÓN catch-up de arranque")
     try:
-        asyncio.run(_run_padron_catchup(wave=False))
+        _ejecutar(
+            lambda: _run_padron_catchup(wave=False),
+            prioridad=PRIORIDAD_CATCHUP,
+            nombre="padron_startup_catchup",
+        )
     except Exception as e:
         logger.error(f"Error en job_padron_startup_catchup: {e}")
-        asyncio.run(_notify_motor_crash("padron", f"job_padron_startup_catchup crash: {e}"))
+        msg = f"job_padron_startup_catchup crash: {e}"
+        _ejecutar(
+            lambda: _notify_motor_crash("padron", msg),
+            prioridad=0,
+            nombre="crash_padron",
+        )
 
 
 def job_padron():
     """Legacy / arranque: todos los tenants + catch-up."""
     logger.info("⏰ Trigger PADRÓN (ciclo completo)")
     try:
-        asyncio.run(_run_padron())
+        _ejecutar(_run_padron, prioridad=PRIORIDAD_PADRON, nombre="padron")
     except Exception as e:
         logger.error(f"Error en job_padron: {e}")
-        asyncio.run(_notify_motor_crash("padron", f"job_padron crash: {e}"))
+        msg = f"job_padron crash: {e}"
+        _ejecutar(
+            lambda: _notify_motor_crash("padron", msg),
+            prioridad=0,
+            nombre="crash_padron",
+        )
 
 
 # ── Runners async ─────────────────────────────────────────────────────────────
@@ -276,11 +327,18 @@ def job_informe_ventas(usar_fecha_hoy: bool = False):
         "hoy" if usar_fecha_hoy else "ayer",
     )
     try:
-        asyncio.run(_run_ventas(usar_fecha_hoy=usar_fecha_hoy))
+        _ejecutar(
+            lambda: _run_ventas(usar_fecha_hoy=usar_fecha_hoy),
+            prioridad=PRIORIDAD_VENTAS,
+            nombre="informe_ventas",
+        )
     except Exception as e:
         logger.error(f"Error en job_informe_ventas: {e}")
-        asyncio.run(
-            _notify_motor_crash("ventas_enriched", f"job_informe_ventas crash: {e}")
+        msg = f"job_informe_ventas crash: {e}"
+        _ejecutar(
+            lambda: _notify_motor_crash("ventas_enriched", msg),
+            prioridad=0,
+            nombre="crash_ventas",
         )
 
 
@@ -432,6 +490,8 @@ def _maybe_schedule_stale_catchup(scheduler: BackgroundScheduler) -> None:
 
 
 def main():
+    global _LOOP
+
     logger.info("=" * 60)
     logger.info("  ShelfMind RPA Scheduler — PADRÓN + CUENTAS + INFORME_VENTAS")
     from lib.shelfy_config import get_shelfy_base_url, get_shelfy_api_key
@@ -463,6 +523,9 @@ def main():
     logger.info(f"  Zona jobs AR   : {AR_TZ.key} (independiente de la región del host)")
     logger.info("=" * 60)
 
+    from lib.browser_pool import LoopRpa
+
+    _LOOP = LoopRpa().start()
     scheduler = BackgroundScheduler(timezone=AR_TZ)
 
     job_defaults = {
@@ -509,6 +572,7 @@ def main():
     except (KeyboardInterrupt, SystemExit):
         logger.info("Deteniendo scheduler...")
         scheduler.shutdown()
+        _LOOP.stop()
         logger.info("Scheduler detenido.")
 
 
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Tests unitarios de lib.browser_pool (sin browser real)."""
+
+import asyncio
+import threading
+
+import pytest
+
+from lib import browser_pool as bp
+
+
+def test_limites_por_portal(monkeypatch):
+    monkeypatch.setenv("RPA_CONTEXT_POOL", "4")
+    monkeypatch.setenv("RPA_PORTAL_LIMIT_CHESS", "9")
+    assert bp.limite_portal("consolido") == 1
+    assert bp.limite_portal("chess") == 4  # nunca más que el pool
+    monkeypatch.setenv("RPA_PARALLEL", "0")
+    assert bp.pool_size() == 1 and bp.limite_portal("chess") == 1
+
+
+class _FakeCompartido:
+    def __init__(self):
+        self.browser = object()
+
+    async def obtener(self):
+        return self.browser
+
+
+def test_navegador_acota_pool_y_portal(monkeypatch):
+    monkeypatch.setenv("RPA_CONTEXT_POOL", "3")
+    monkeypatch.delenv("RPA_PORTAL_LIMIT_CHESS", raising=False)
+    compartido = _FakeCompartido()
+    activos = {"chess": 0, "consolido": 0, "total": 0}
+    picos = {"chess": 0, "consolido": 0, "total": 0}
+
+    async def tenant(portal):
+        async with bp.navegador(portal) as browser:
+            assert browser is compartido.browser
+            for k in (portal, "total"):
+                activos[k] += 1
+                picos[k] = max(picos[k], activos[k])
+            await asyncio.sleep(0.01)
+            for k in (portal, "total"):
+                activos[k] -= 1
+
+    async def _run():
+        bp._estado().compartido = compartido
+        await asyncio.gather(*[tenant("chess") for _ in range(6)], *[tenant("consolido") for _ in range(3)])
+
+    asyncio.run(_run())
+    assert picos == {"chess": 3, "consolido": 1, "total": 3}
+
+
+def test_loop_rpa_prioridad_y_errores():
+    loop = bp.LoopRpa(workers=1, compartir_browser=False).start()
+    liberar = threading.Event()
+    orden = []
+
+    async def bloqueante():
+        await asyncio.to_thread(liberar.wait, 5)
+
+    def job(nombre):
+        async def _f():
+            orden.append(nombre)
+            return nombre
+
+        return _f
+
+    async def falla():
+        raise ValueError("boom")
+
+    try:
+        primero = loop.submit(bloqueante, prioridad=0)
+        futs = [loop.submit(job(n), prioridad=p) for n, p in (("ventas", 30), ("cuentas", 10), ("padron", 20))]
+        err = loop.submit(falla, prioridad=50)
+        liberar.set()
+        primero.result(5)
+        assert [f.result(5) for f in futs] == ["ventas", "cuentas", "padron"]
+        assert orden == ["cuentas", "padron", "ventas"]
+        with pytest.raises(ValueError):
+            err.result(5)
+        assert loop.ejecutar(job("sync"), prioridad=1) == "sync"
+    finally:
+        loop.stop(5)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Tests unitarios del padrón v2 (JSON de red → tabla canónica), sin browser real."""
+
+import asyncio
+import io
+import json
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from lib.hash_guard import tabla_desde_xlsx
+from motores.consolido_padron_v2.compare_bench import comparar_tablas
+from motores.consolido_padron_v2.json_grid import grid_a_tabla, grid_de_json
+from motores.consolido_padron_v2.network_capture import PadronNetworkCapture
+
+_COLS = ["IDEMPRESA", "DSEMPRESA", "IDSUCUR", "DSSUCUR", "IDCLIENTE", "NOMCLI", "FANTACLI", "FECALTA", "YCOORD"]
+
+
+def _filas_json():
+    return [
+        {"idempresa": 3154, "dsempresa": "TABACO", "idsucur": 2, "dssucur": "RESISTENCIA", "idcliente": 10,
+         "nomcli": "KIOSCO UNO", "fantacli": "", "fecalta": "2024-03-01T00:00:00", "ycoord": -27.45},
+        {"idempresa": 3154, "dsempresa": "TABACO", "idsucur": 3, "dssucur": "SAENZ PEÑA", "idcliente": 11,
+         "nomcli": "ALMACEN", "fantacli": "EL SOL", "fecalta": None, "ycoord": None},
+    ]
+
+
+def _xlsx(filas):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(_COLS)
+    for f in filas:
+        fecha = datetime.fromisoformat(f["fecalta"]) if f["fecalta"] else None
+        ws.append([f["idempresa"], f["dsempresa"], f["idsucur"], f["dssucur"], f["idcliente"], f["nomcli"],
+                   f["fantacli"] or None, fecha, f["ycoord"]])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_json_rows_match_excel_fingerprint():
+    filas = _filas_json()
+    payload = {"ok": True, "meta": [{"id": 1}], "resultado": {"datos": filas}}
+    tabla_red = grid_a_tabla(grid_de_json(payload))
+    tabla_xl = tabla_desde_xlsx(_xlsx(filas))
+
+    assert tabla_red.header == tabla_xl.header == _COLS
+    assert tabla_red.filas == tabla_xl.filas
+    assert tabla_red.huella == tabla_xl.huella
+    assert comparar_tablas(tabla_xl, tabla_red)["huella_igual"]
+
+
+def test_columnar_shape_and_rejects_non_padron_grids():
+    cols = [{"field": "idcliente", "headerName": "IDCLIENTE"}, "NOMCLI", "IDSUCUR", "DSSUCUR", "IDEMPRESA"]
+    grid = grid_de_json({"empresas": [{"id": 1, "nombre": "x"}] * 50, "columns": cols, "rows": [[1, "A"], [2, "B", 5, "S", 9]]})
+    assert grid is not None and len(grid.filas) == 2
+    tabla = grid_a_tabla(grid)
+    assert tabla.header == ["IDCLIENTE", "NOMCLI", "IDSUCUR", "DSSUCUR", "IDEMPRESA"]
+    assert tabla.filas == [["1", "A"], ["2", "B", "5", "S", "9"]]
+    assert grid_de_json([{"idcliente": 1, "nombre": "sin columnas de padrón"}] * 10) is None
+
+
+def test_capture_keeps_only_best_grid_and_signals():
+    class _Resp:
+        def __init__(self, url, body, ct="application/json"):
+            self.url, self.status, self.headers, self._body = url, 200, {"content-type": ct}, body
+
+        async def body(self):
+            return self._body
+
+    class _Page:
+        def on(self, _evt, handler):
+            self.handler = handler
+
+    async def main():
+        page = _Page()
+        cap = PadronNetworkCapture()
+        cap.attach(page)
+        await page.handler(_Resp("https://consolido.nextbyn.com/api/menu", b'{"items": [1, 2]}'))
+        await page.handler(_Resp("https://otro.com/x", json.dumps(_filas_json()).encode()))
+        assert await cap.esperar(0.01) is None
+        await page.handler(_Resp("https://consolido.nextbyn.com/api/reporte/ejecutar", json.dumps(_filas_json()).encode()))
+        grid = await cap.esperar(1)
+        return cap, grid
+
+    cap, grid = asyncio.run(main())
+    assert grid is not None and len(grid.filas) == 2
+    assert cap.url.endswith("/ejecutar")
+    assert [v.filas_padron for v in cap.vistas] == [0, 2]
+
+
+def test_json_normalized_keys_map_to_excel_header():
+    claves = {"idempresa": "IdEmpresa", "dsempresa": "ds_empresa", "idsucur": "id_sucur", "dssucur": "dsSucur",
+              "idcliente": "idCliente", "nomcli": "nom_cli", "fantacli": "Fanta Cli", "fecalta": "fecAlta",
+              "ycoord": "y_coord"}
+    filas = _filas_json()
+    payload = [{claves[k]: v for k, v in f.items()} for f in filas]
+    tabla_red = grid_a_tabla(grid_de_json(payload))
+    tabla_xl = tabla_desde_xlsx(_xlsx(filas))
+
+    assert tabla_red.header == _COLS
+    assert tabla_red.huella == tabla_xl.huella
+
+
+
+def test_procesar_tenant_v2_no_propaga_errores(monkeypatch):
+    import sys
+    import types
+
+    from motores.consolido_padron_v2.motor import _procesar_tenant_v2
+
+    padron = types.ModuleType("motores.padron")
+    for nombre in ("_asegurar_login", "_configurar_parametros", "_descargar_excel", "_ejecutar_reporte",
+                   "_screenshot_error", "_seleccionar_reporte_padron"):
+        setattr(padron, nombre, None)
+    padron._sesion_consolido = lambda _u: types.SimpleNamespace(storage_state=lambda: None)
+    monkeypatch.setitem(sys.modules, "motores.padron", padron)
+
+    class _Browser:
+        async def new_context(self, **_k):
+            raise RuntimeError("browser cerrado")
+
+    r = asyncio.run(_procesar_tenant_v2(_Browser(), {"id": "tabaco", "nombre": "Tabaco"}, "u", "p"))
+    assert r["errores"] == 1 and r["ok"] == 0
+    assert r["error_msg"] == "browser cerrado"
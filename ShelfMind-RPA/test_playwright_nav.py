@@ -4,7 +4,15 @@
 import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
-from lib.playwright_nav import goto_dom, wait_dom_ready
+from lib.playwright_nav import (
+    es_post_a,
+    esperar_primero,
+    esperar_respuesta,
+    goto_dom,
+    instalar_perfil,
+    perfil_nav,
+    wait_dom_ready,
+)
 
 
 def test_goto_dom_uses_domcontentloaded_first():
@@ -52,3 +60,143 @@ def test_wait_dom_ready_swallows_timeout():
     page.wait_for_load_state.assert_awaited_once_with(
         "domcontentloaded", timeout=1000
     )
+
+
+def test_perfil_bloquea_no_esenciales_y_terceros():
+    p = perfil_nav("chess")
+    base = "https://tabacohermanos.chesserp.com/AR1149"
+    assert not p.bloquea(f"{base}/main.js", "script")
+    assert not p.bloquea(f"{base}/api/saldos", "xhr")
+    assert not p.bloquea(f"{base}/styles.css", "stylesheet")
+    assert p.bloquea(f"{base}/assets/logo.png", "image")
+    # Fuentes de íconos: los selectores de Font Awesome dependen del glifo.
+    assert not p.bloquea("https://cdnjs.cloudflare.com/fa/fontawesome-webfont.woff2", "font")
+    assert not perfil_nav("consolido").bloquea("https://consolido.nextbyn.com/fa-solid.woff2", "font")
+    assert p.bloquea("https://www.googletagmanager.com/gtag/js", "script")
+    assert p.bloquea("https://cdn.otro.com/pixel", "other")
+    assert not p.bloquea("https://cdn.otro.com/kendo.js", "script")
+
+
+def test_perfil_por_motor_desde_env(monkeypatch):
+    monkeypatch.setenv("RPA_NAV_TIPOS_CONSOLIDO", "image, stylesheet")
+    p = perfil_nav("consolido")
+    assert p.tipos_bloqueados == frozenset({"image", "stylesheet"})
+    assert not p.bloquea("https://consolido.nextbyn.com/f.woff2", "font")
+    monkeypatch.setenv("RPA_NAV_LIVIANO_SIGO", "0")
+    assert perfil_nav("sigo") is None and perfil_nav("chess") is not None
+    monkeypatch.setenv("RPA_NAV_LIVIANO", "0")
+    assert perfil_nav("chess") is None
+
+
+def test_instalar_perfil_aborta_y_mide_pasos(monkeypatch):
+    monkeypatch.delenv("RPA_NAV_LIVIANO", raising=False)
+    handlers = {}
+    context = MagicMock()
+    context.on = lambda evt, h: handlers.__setitem__(evt, h)
+    context.route = AsyncMock()
+
+    def _route(url, tipo):
+        r = MagicMock()
+        r.request.url, r.request.resource_type = url, tipo
+        r.abort, r.fallback = AsyncMock(), AsyncMock()
+        return r
+
+    def _request(body):
+        req = MagicMock()
+        req.sizes = AsyncMock(return_value={"responseBodySize": body, "responseHeadersSize": 100})
+        return req
+
+    async def _run():
+        nav = await instalar_perfil(context, "consolido")
+        handler = context.route.await_args.args[1]
+        img, js = _route("https://consolido.nextbyn.com/a.png", "image"), _route("https://consolido.nextbyn.com/a.js", "script")
+        with nav.paso("login"):
+            await handler(img)
+            await handler(js)
+            await handlers["requestfinished"](_request(900))
+        with nav.paso("descargar"):
+            await handlers["requestfinished"](_request(2**20 - 100))
+        return nav, img, js
+
+    nav, img, js = asyncio.run(_run())
+    img.abort.assert_awaited_once_with("blockedbyclient")
+    js.fallback.assert_awaited_once()
+    r = nav.resumen()
+    assert (r["perfil"], r["requests"], r["bloqueadas"]) == ("consolido", 2, 1)
+    assert r["pasos"]["login"]["bytes"] == 1000 and r["pasos"]["descargar"]["requests"] == 1
+
+
+
+def test_esperar_primero_gana_la_senal_ok_y_registra_en_el_paso(monkeypatch):
+    monkeypatch.delenv("RPA_NAV_LIVIANO", raising=False)
+    context = MagicMock()
+    context.on = lambda evt, h: None
+    context.route = AsyncMock()
+
+    async def _falla():
+        raise TimeoutError("locator")
+
+    async def _tarda(s):
+        await asyncio.sleep(s)
+        return s
+
+    async def _run():
+        nav = await instalar_perfil(context, "sigo")
+        with nav.paso("reporte"):
+            e = await esperar_primero("resultado", {"heading": _falla(), "json": _tarda(0.01), "lento": _tarda(5)}, timeout_s=2)
+            nada = await esperar_primero("vacio", {"heading": _falla()}, timeout_s=0.05)
+        return nav, e, nada
+
+    nav, e, nada = asyncio.run(_run())
+    assert (e.via, e.valor, e.ok) == ("json", 0.01, True)
+    assert not nada.ok and nada.via is None
+    assert [(x["paso"], x["espera"], x["via"]) for x in nav.resumen()["esperas"]] == [
+        ("reporte", "resultado", "json"),
+        ("reporte", "vacio", None),
+    ]
+
+
+def test_esperar_respuesta_timeout_vs_error_de_accion():
+    class TimeoutError(Exception):  # mismo nombre que playwright.async_api.TimeoutError
+        pass
+
+    class _Info:
+        def __init__(self, falla):
+            self.falla = falla
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            if exc[0] is None and self.falla:
+                raise TimeoutError("sin respuesta")
+            return False
+
+        @property
+        def value(self):
+            async def _v():
+                return "resp"
+
+            return _v()
+
+    page = MagicMock()
+
+    async def _run():
+        page.expect_response = lambda pred, timeout: _Info(falla=False)
+        ok = await esperar_respuesta("aplicar", page, es_post_a("sigo.aspx"), AsyncMock(), timeout_ms=10)
+        page.expect_response = lambda pred, timeout: _Info(falla=True)
+        sin = await esperar_respuesta("aplicar", page, es_post_a("sigo.aspx"), AsyncMock(), timeout_ms=10)
+        try:
+            await esperar_respuesta("aplicar", page, es_post_a("x"), AsyncMock(side_effect=TimeoutError("click")), timeout_ms=10)
+        except TimeoutError:
+            return ok, sin, True
+        return ok, sin, False
+
+    ok, sin, propagado = asyncio.run(_run())
+    assert (ok.via, ok.valor) == ("response", "resp") and not sin.ok and propagado
+
+    resp = MagicMock(url="https://portal.nextbyn.com/SIGO/Sigo.aspx?x=1")
+    resp.request.method = "POST"
+    assert es_post_a("sigo.aspx")(resp)
+    resp.request.method = "GET"
+    assert not es_post_a("sigo.aspx")(resp)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Tests unitarios de lib.session_cache (sin browser real)."""
+
+import asyncio
+
+import pytest
+
+from lib import session_cache as sc
+
+_ESTADO = {"cookies": [{"name": "ASP.NET_SessionId", "value": "secreto-123", "domain": "portal.nextbyn.com"}], "origins": []}
+
+
+class _Context:
+    def __init__(self):
+        self.limpiado = False
+
+    async def storage_state(self):
+        return _ESTADO
+
+    async def clear_cookies(self):
+        self.limpiado = True
+
+
+class _Page:
+    async def evaluate(self, _js):
+        return None
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(sc, "SESSIONS_DIR", tmp_path)
+    monkeypatch.setenv("RPA_SESSION_KEY", "clave-de-prueba")
+    monkeypatch.delenv("RPA_SESSION_REFRESH", raising=False)
+    sc._fernet_cache.clear()
+    yield tmp_path
+    sc._fernet_cache.clear()
+
+
+def _asegurar(sesion, ctx, probe_ok):
+    logins = []
+
+    async def login():
+        logins.append(1)
+
+    async def probe(_page):
+        return probe_ok
+
+    reutilizada = asyncio.run(sesion.asegurar(ctx, _Page(), login=login, probe=probe))
+    return reutilizada, len(logins)
+
+
+def test_login_guarda_cifrado_y_reutiliza(cache):
+    s1 = sc.SesionPortal("nextbyn", "sigo_tabaco_user")
+    assert s1.storage_state() is None
+    assert _asegurar(s1, _Context(), True) == (False, 1)
+
+    (archivo,) = cache.glob("nextbyn_*.bin")
+    assert b"secreto-123" not in archivo.read_bytes()
+
+    s2 = sc.SesionPortal("nextbyn", "sigo_tabaco_user")
+    assert s2.storage_state() == _ESTADO
+    assert _asegurar(s2, _Context(), True) == (True, 0)
+    assert s2.reutilizada
+    # Otra credencial no ve la sesión.
+    assert sc.SesionPortal("nextbyn", "sigo_aloma_user").storage_state() is None
+
+
+def test_probe_fallido_relogin_y_refresh(cache, monkeypatch):
+    _asegurar(sc.SesionPortal("chess", "https://x.chesserp.com", "u"), _Context(), True)
+
+    s = sc.SesionPortal("chess", "https://x.chesserp.com", "u")
+    ctx = _Context()
+    assert s.storage_state() is not None
+    assert _asegurar(s, ctx, False) == (False, 1)
+    assert ctx.limpiado and s.path.exists()
+
+    monkeypatch.setenv("RPA_SESSION_REFRESH", "1")
+    assert sc.SesionPortal("chess", "https://x.chesserp.com", "u").storage_state() is None
+    assert sc.purgar("chess") == 1 and not s.path.exists()
+
+
+def test_sin_clave_no_persiste(cache, monkeypatch):
+    monkeypatch.setattr("lib.vault_client.get_secret", lambda _name: "")
+    monkeypatch.delenv("RPA_SESSION_KEY")
+    s = sc.SesionPortal("consolido", "usuario")
+    assert _asegurar(s, _Context(), True) == (False, 1)
+    assert list(cache.iterdir()) == []
+
+    # Clave rotada: la sesión vieja no se puede descifrar y se descarta.
+    monkeypatch.setenv("RPA_SESSION_KEY", "otra")
+    sc._fernet_cache.clear()
+    _asegurar(s, _Context(), True)
+    monkeypatch.setenv("RPA_SESSION_KEY", "rotada")
+    sc._fernet_cache.clear()
+    assert sc.SesionPortal("consolido", "usuario").storage_state() is None
+    assert list(cache.iterdir()) == []
+
+
+def test_escrituras_concurrentes_misma_credencial(cache):
+    import threading
+
+    sesiones = [sc.SesionPortal("nextbyn", "usuario.compartido") for _ in range(8)]
+    hilos = [threading.Thread(target=s._escribir, args=(f"token-{i}".encode() * 500,)) for i, s in enumerate(sesiones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    (archivo,) = cache.iterdir()  # sin .tmp huérfanos
+    assert archivo == sesiones[0].path
+    assert archivo.read_bytes() in {f"token-{i}".encode() * 500 for i in range(8)}
+    assert archivo.stat().st_mode & 0o777 == 0o600
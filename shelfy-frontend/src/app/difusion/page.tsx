@@ -24,12 +24,12 @@ import {
   Select, SelectContent, SelectItem, SelectTrigger, SelectValue,
 } from "@/components/ui/select";
 import {
-  fetchDifusionVendedores, postDifusionCCTelegram,
+  fetchDifusionVendedores, streamDifusionCCTelegram,
   fetchVendedoresSupervision, fetchDifusionVendedorResumen,
   fetchSigoDetail, postDifusionSIGOTelegram,
   postDifusionCCTelegramPreview,
   fetchDifusionPlantillas, createDifusionPlantilla, deleteDifusionPlantilla,
-  type DifusionVendedor, type DifusionCCResult, type DifusionVendedorResumen,
+  type DifusionVendedor, type DifusionCCResult, type DifusionCCProgress, type DifusionVendedorResumen,
   type SigoDetailResponse, type DifusionSIGOResult, type DifusionPreviewResult,
   type DifusionPreviewItem, type DifusionPlantilla,
 } from "@/lib/api";
@@ -73,6 +73,7 @@ export default function DifusionPage() {
   const [idVendedor, setIdVendedor]   = useState<number | null>(null);
   const [mensaje, setMensaje]         = useState(PLANTILLAS[0].text);
   const [result, setResult]           = useState<DifusionCCResult | null>(null);
+  const [ccProgress, setCcProgress]   = useState<DifusionCCProgress | null>(null);
   const [confirmando, setConfirmando] = useState(false);
 
   // ── Preview modal state ──
@@ -204,13 +205,17 @@ export default function DifusionPage() {
   // ── CC mutation ──
   const ccMutation = useMutation({
     mutationFn: () =>
-      postDifusionCCTelegram({
-        dist_id: distId,
-        modo,
-        id_vendedor: modo === "uno" ? idVendedor : null,
-        sucursal: sucursal || null,
-        mensaje_template: mensaje,
-      }),
+      streamDifusionCCTelegram(
+        {
+          dist_id: distId,
+          modo,
+          id_vendedor: modo === "uno" ? idVendedor : null,
+          sucursal: sucursal || null,
+          mensaje_template: mensaje,
+        },
+        setCcProgress,
+      ),
+    onSettled: () => setCcProgress(null),
     onSuccess: (data) => {
       setResult(data);
       setConfirmando(false);
@@ -679,7 +684,10 @@ export default function DifusionPage() {
                       onClick={() => { setResult(null); ccMutation.mutate(); }}
                     >
                       {ccMutation.isPending ? (
-                        <><Loader2 className="w-4 h-4 animate-spin" /> Enviando...</>
+                        <>
+                          <Loader2 className="w-4 h-4 animate-spin" /> Enviando
+                          {ccProgress && ccProgress.total > 1 ? ` ${ccProgress.hechos}/${ccProgress.total}` : "..."}
+                        </>
                       ) : (
                         <><Send className="w-4 h-4" /> Enviar</>
                       )}
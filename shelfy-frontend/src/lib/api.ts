@@ -2710,6 +2710,75 @@ export async function postDifusionCCTelegram(body: {
   });
 }
 
+export interface DifusionCCProgress {
+  hechos: number;
+  total: number;
+  ultimo: DifusionResultItem | null;
+}
+
+/**
+ * Igual que postDifusionCCTelegram pero consume el NDJSON de /cc-telegram/stream:
+ * llama onProgress por cada vendedor terminado y resuelve con el resumen final.
+ */
+export async function streamDifusionCCTelegram(
+  body: {
+    dist_id: number;
+    modo: "uno" | "todos";
+    id_vendedor?: number | null;
+    sucursal?: string | null;
+    mensaje_template: string;
+    fecha?: string | null;
+  },
+  onProgress?: (p: DifusionCCProgress) => void,
+): Promise<DifusionCCResult> {
+  const path = "/api/difusion/cc-telegram/stream";
+  guardReadOnlyMutation(path, "POST");
+  const res = await fetch(`${API_URL}${path}`, {
+    method: "POST",
+    headers: getHeaders(),
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) {
+    handleSessionExpired401(path, res.status);
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    const detailMsg = typeof err.detail === "string" ? err.detail : `HTTP ${res.status}`;
+    throw new ApiError(detailMsg, res.status, err.detail);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let final = null as DifusionCCResult | null;
+  const handleLine = (line: string) => {
+    if (!line.trim()) return;
+    const ev = JSON.parse(line);
+    if (ev.evento === "inicio") {
+      onProgress?.({ hechos: 0, total: ev.total, ultimo: null });
+    } else if (ev.evento === "resultado") {
+      onProgress?.({
+        hechos: ev.hechos,
+        total: ev.total,
+        ultimo: { ok: ev.ok, vendedor: ev.vendedor, error: ev.error },
+      });
+    } else if (ev.evento === "fin") {
+      final = { enviados: ev.enviados, errores: ev.errores, fecha_snapshot: ev.fecha_snapshot };
+    } else if (ev.evento === "error") {
+      throw new ApiError(ev.error || "Error en la difusión", 500);
+    }
+  };
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer);
+  if (!final) throw new ApiError("La difusión terminó sin resumen", 500);
+  return final;
+}
+
 export interface DifusionPreviewFlags {
   missing_group: boolean;
   empty_cc: boolean;